@@ -128,6 +128,7 @@ offer_status_signals_bp = safe_import_blueprint('routes.offer_status_signals', '
 link_health_bp = safe_import_blueprint('routes.link_health', 'link_health_bp')
 redirect_receiver_bp = safe_import_blueprint('routes.redirect_receiver', 'redirect_receiver_bp')
 pepperwahl_integration_bp = safe_import_blueprint('routes.pepperwahl_integration', 'pepperwahl_integration_bp')
+admin_cache_bp = safe_import_blueprint('routes.admin_cache', 'admin_cache_bp')
 
 # Custom JSON provider to handle datetime serialization with UTC 'Z' suffix
 class CustomJSONProvider(DefaultJSONProvider):
@@ -245,6 +246,7 @@ blueprints = [
     (link_health_bp, '/api/admin'),
     (redirect_receiver_bp, ''),
     (pepperwahl_integration_bp, ''),
+    (admin_cache_bp, '/api/admin'),
 ]
 
 def create_app():
@@ -512,6 +514,12 @@ import sys
 def signal_handler(sig, frame):
     """Handle shutdown signals gracefully"""
     logging.info(f"Received signal {sig}, shutting down gracefully...")
+    try:
+        # Hand back the leases of jobs that are not running (running ones get a bounded wait)
+        from services.job_scheduler import get_job_scheduler
+        get_job_scheduler().stop()
+    except Exception:
+        pass
     logging.shutdown()
     sys.exit(0)
 
@@ -522,43 +530,21 @@ signal.signal(signal.SIGTERM, signal_handler)
 # Track whether background services have been started (to avoid duplicates)
 _background_services_started = False
 
-# Start link health checker immediately (works in both debug and production)
-# Uses use_reloader check to avoid running twice in debug mode
-import os as _os
-if _os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
-    import threading as _th
-    def _start_link_health_delayed():
-        import time
-        time.sleep(15)  # Wait for DB to connect
-        try:
-            from services.link_health_service import get_link_health_service
-            svc = get_link_health_service()
-            svc.start()
-        except Exception as e:
-            print(f"⚠️ Link health auto-start failed: {e}")
-    _th.Thread(target=_start_link_health_delayed, daemon=True, name='link-health-starter').start()
-    print("🔗 Link health checker scheduled to start in 15 seconds...")
-
 def start_background_services():
     """Start background services — called once per process.
     
     Under Gunicorn with preload_app=False, each worker calls this independently.
     We use a module-level flag to ensure services start only once per worker process.
-    Only the designated background worker (RUN_BACKGROUND_SERVICES=1) will start them.
+    Every worker runs the job scheduler; the per-job lease in MongoDB makes sure
+    each job runs in exactly one process. With RUN_BACKGROUND_SERVICES=0 the
+    jobs are left to the standalone worker (worker.py) and this process only
+    ensures indexes and warms its caches.
     """
     global _background_services_started
     if _background_services_started:
         return
     _background_services_started = True
     
-    # Check if this worker is designated for background services
-    # When running under Gunicorn, only worker.age==1 sets RUN_BACKGROUND_SERVICES=1
-    # When running directly (python run.py), the env var won't exist, so default to running
-    run_bg = os.environ.get('RUN_BACKGROUND_SERVICES', '1')
-    if run_bg == '0':
-        logging.info("ℹ️ This worker is NOT the background services worker — skipping background services")
-        return
-    
     if not db_instance.is_connected():
         logging.warning("Database connection failed - skipping background services")
         return
@@ -574,6 +560,8 @@ def start_background_services():
             [('status', ASCENDING), ('deleted', ASCENDING), ('is_pinned', DESCENDING), ('created_at', DESCENDING)],
             name='publisher_offers_idx', background=True
         )
+        # Offer search index delta sync (services.offer_search_index)
+        db['offers'].create_index([('updated_at', DESCENDING)], background=True)
         # Clicks indexes
         db['clicks'].create_index([('ip_address', ASCENDING), ('timestamp', DESCENDING)], background=True)
         db['clicks'].create_index([('user_id', ASCENDING), ('offer_id', ASCENDING), ('timestamp', DESCENDING)], background=True)
@@ -600,6 +588,25 @@ def start_background_services():
         # Tracking events indexes
         db['tracking_events'].create_index([('user_id', ASCENDING)], background=True)
         
+        # Offerwall drill-down indexes (summary counts + keyset-paginated event lists)
+        for col_name, fields in (
+            ('offerwall_sessions_detailed', ('user_id',)),
+            ('offerwall_impressions_detailed', ('user_id', 'publisher_id', 'offer_id')),
+            ('offerwall_clicks_detailed', ('user_id', 'publisher_id', 'offer_id')),
+            ('offerwall_conversions_detailed', ('user_id', 'publisher_id', 'offer_id')),
+            ('offerwall_fraud_signals', ('user_id',)),
+            ('publisher_earnings', ('publisher_id',)),
+        ):
+            for field in fields:
+                db[col_name].create_index(
+                    [(field, ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)], background=True
+                )
+        
+        # One smart-rule cap counter per rule and day (RuleCapCounters upserts concurrently)
+        db['smart_rule_cap_usage'].create_index(
+            [('offer_id', ASCENDING), ('rule_id', ASCENDING), ('date', ASCENDING)], unique=True, background=True
+        )
+        
         logging.info("✅ Critical indexes ensured")
     except Exception as idx_err:
         logging.warning(f"Index creation skipped: {idx_err}")
@@ -621,13 +628,12 @@ def start_background_services():
                          'fallback_redirect_url': 1, 'fallback_redirect_timer': 1}
                     ).limit(50)
                     
-                    import time as _time
-                    from routes.simple_tracking import _offer_cache, _OFFER_CACHE_TTL
+                    from routes.simple_tracking import _offer_cache
                     count = 0
                     for offer in active_offers:
                         oid = offer.get('offer_id')
                         if oid:
-                            _offer_cache[oid] = {'data': offer, 'expires': _time.time() + _OFFER_CACHE_TTL}
+                            _offer_cache.set(oid, offer)
                             count += 1
                     logging.info(f"✅ Pre-warmed offer cache with {count} offers")
             except Exception as e:
@@ -638,167 +644,63 @@ def start_background_services():
     except Exception:
         pass
     
+    # Processes that should only serve requests set RUN_BACKGROUND_SERVICES=0
+    # (jobs then run in the standalone worker: python worker.py)
+    run_bg = os.environ.get('RUN_BACKGROUND_SERVICES', '1')
+    if run_bg == '0':
+        logging.info("ℹ️ RUN_BACKGROUND_SERVICES=0 — background jobs left to the worker process")
+        return
+
     # =========================================================================
-    # ACTIVE BACKGROUND SERVICES (4 kept — critical for platform operation)
-    # Memory optimization: disabled 11 non-critical services to stay within 512MB
-    # No data is lost — all MongoDB collections remain untouched.
-    # Disabled services can be re-enabled or moved to Render Cron Jobs later.
+    # BACKGROUND JOBS — registered in services/background_jobs.py and run by
+    # the job scheduler. Each job holds a lease document in scheduler_jobs
+    # while it runs, so any number of workers can take part without a job
+    # running twice. Admin-triggered (not scheduled): placement auto-approval,
+    # offer inactivity, automation engine, search auto-activation, invoices.
     # =========================================================================
     try:
-        # KEEP: Cap Monitoring — prevents advertiser over-delivery
-        try:
-            from services.cap_monitoring_service import CapMonitoringService
-            cap_service = CapMonitoringService()
-            cap_service.start_monitoring_service()
-            logging.info("✅ Cap monitoring service started")
-        except Exception as e:
-            logging.warning(f"⚠️ Cap monitoring service failed to start: {str(e)}")
-        
-        # KEEP: Postback Processor — core revenue tracking, non-negotiable
-        try:
-            from services.tracking_service import TrackingService
-            tracking_service = TrackingService()
-            tracking_service.start_postback_processor()
-            logging.info("✅ Tracking service started - Postbacks will be processed")
-        except Exception as e:
-            logging.warning(f"⚠️ Tracking service failed to start: {str(e)}")
-        
-        # KEEP: Schedule Activation — offers must auto-start/stop on their dates
-        try:
-            from services.schedule_activation_service import setup_activation_scheduler
-            setup_activation_scheduler()
-            logging.info("✅ Schedule activation service started")
-        except Exception as e:
-            logging.warning(f"⚠️ Schedule activation service failed to start: {str(e)}")
-        
-        # KEEP: Price Boost Expiration — checks for expired boosts
-        try:
-            from services.price_boost_service import price_boost_service
-            price_boost_service.start()
-            logging.info("✅ Price boost expiration service started")
-        except Exception as e:
-            logging.warning(f"⚠️ Price boost service failed to start: {str(e)}")
-
-        # KEEP: Scheduled Email Service — publishers need their email notifications
-        try:
-            from services.scheduled_email_service import get_scheduled_email_service
-            email_service = get_scheduled_email_service()
-            email_service.start_service()
-            logging.info("✅ Scheduled email service started")
-        except Exception as e:
-            logging.warning(f"⚠️ Scheduled email service failed to start: {str(e)}")
-        
-        # =====================================================================
-        # DISABLED SERVICES (admin manages via Automation tab buttons)
-        # All data remains in MongoDB. These can be re-enabled anytime.
-        # =====================================================================
-        
-        # DISABLED: Placement Auto-Approval — admin approves manually
-        logging.info("ℹ️ Placement auto-approval service DISABLED (admin does manually)")
-        
-        # DISABLED: Offer Inactivity — admin triggers via Automation tab button
-        logging.info("ℹ️ Offer inactivity service DISABLED (admin button in Automation tab)")
-
-        # =====================================================================
-        # RE-ENABLED SERVICES (essential for 20K offers + platform operation)
-        # =====================================================================
-        
-        # RE-ENABLED: Offer Rotation — 20K offers need rotation for visibility
-        try:
-            from services.offer_rotation_service import get_rotation_service
-            rotation_service = get_rotation_service()
-            rot_state = rotation_service._get_state()
-            if rot_state.get('enabled'):
-                rotation_service.start()
-                logging.info("✅ Offer rotation service started (was enabled)")
-            else:
-                logging.info("ℹ️ Offer rotation service loaded (currently disabled in settings)")
-        except Exception as e:
-            logging.warning(f"⚠️ Offer rotation service failed to start: {str(e)}")
-        
-        # RE-ENABLED: Campaign Processor — processes bulk email campaigns
-        try:
-            from services.campaign_processor import get_campaign_processor
-            campaign_processor = get_campaign_processor()
-            campaign_processor.start()
-            logging.info("✅ Campaign processor started (email queue processing)")
-        except Exception as e:
-            logging.warning(f"⚠️ Campaign processor failed to start: {str(e)}")
-
-        # RE-ENABLED: Location Retry — resolves failed geo lookups (15 min interval)
-        try:
-            from services.location_retry_service import get_location_retry_service
-            location_retry_service = get_location_retry_service()
-            location_retry_service.start_service()
-            logging.info("✅ Location retry service started")
-        except Exception as e:
-            logging.warning(f"⚠️ Location retry service failed to start: {str(e)}")
-
-        # DISABLED: Automation Engine — not in use
-        logging.info("ℹ️ Automation Engine DISABLED (not in use)")
-
-        # DISABLED: Search Auto-Activation — access request flow handles this
-        logging.info("ℹ️ Search auto-activation DISABLED (access request flow is used)")
-        
-        # DISABLED: Invoice Scheduler — admin triggers via Automation tab button
-        logging.info("ℹ️ Invoice scheduler DISABLED (admin button in Automation tab)")
-        
-        # RE-ENABLED: Telegram Bot — posts trending offers every 12 hours
-        try:
-            from services.telegram_trending_bot import start_scheduler as start_telegram_scheduler
-            start_telegram_scheduler()
-            logging.info("✅ Telegram trending bot scheduler started (every 12 hours)")
-        except Exception as e:
-            logging.warning(f"⚠️ Telegram trending bot failed to start: {str(e)}")
-        
-        # RE-ENABLED: Link Health Checker — checks offer links via Geekflare every 2 hours
-        try:
-            from services.link_health_service import get_link_health_service
-            link_health_svc = get_link_health_service()
-            link_health_svc.start()
-        except Exception as e:
-            logging.warning(f"⚠️ Link health service failed to start: {str(e)}")
-
-        # RE-ENABLED: Voqall Auto-Sync — imports/updates surveys every 23 hours
-        try:
-            from services.voqall_sync_service import get_voqall_sync_service
-            voqall_sync_svc = get_voqall_sync_service()
-            voqall_sync_svc.start()
-            logging.info("✅ Voqall auto-sync service started (every 23 hours)")
-        except Exception as e:
-            logging.warning(f"⚠️ Voqall auto-sync service failed to start: {str(e)}")
-
-        # RE-ENABLED: MarketXcel Auto-Sync — imports/updates surveys every 23 hours
-        try:
-            from services.market_excel_sync_service import get_market_excel_sync_service
-            market_excel_sync_svc = get_market_excel_sync_service()
-            market_excel_sync_svc.start()
-            logging.info("✅ MarketXcel auto-sync service started (every 23 hours)")
-        except Exception as e:
-            logging.warning(f"⚠️ MarketXcel auto-sync service failed to start: {str(e)}")
-
-        logging.info("✅ Background services initialization completed (9 active, 5 disabled)")
+        from services.background_jobs import register_background_jobs
+        scheduler = register_background_jobs()
+        scheduler.start()
+        logging.info(f"✅ Job scheduler started ({len(scheduler.job_names())} jobs)")
     except Exception as e:
-        logging.error(f"Error in background services initialization: {str(e)}")
+        logging.error(f"Error starting job scheduler: {str(e)}")
 
 # Start background services on first request (lazy init, safe for Gunicorn workers)
-_link_health_started = False
+_cache_bus_started = False
+_settings_snapshot_started = False
+_offer_search_started = False
 
 @app.before_request
 def _ensure_background_services():
     """Lazily start background services on the first request this worker handles."""
-    global _link_health_started
+    global _cache_bus_started, _settings_snapshot_started, _offer_search_started
     if not _background_services_started:
         start_background_services()
-    # Ensure link health starts even if main background services had issues
-    if not _link_health_started:
-        _link_health_started = True
+    # Every worker subscribes to cache invalidations (not just the background worker)
+    if not _cache_bus_started:
+        _cache_bus_started = True
+        try:
+            from services.cache_invalidation_bus import get_cache_invalidation_bus
+            get_cache_invalidation_bus().start()
+        except Exception as e:
+            logging.warning(f"⚠️ Cache invalidation bus failed to start: {str(e)}")
+    # Every worker keeps its own settings snapshot current
+    if not _settings_snapshot_started:
+        _settings_snapshot_started = True
+        try:
+            from services.settings_snapshot_service import get_settings_snapshot_service
+            get_settings_snapshot_service().start()
+        except Exception as e:
+            logging.warning(f"⚠️ Settings snapshot service failed to start: {str(e)}")
+    # Every worker serves autocomplete from its own offer search index
+    if not _offer_search_started:
+        _offer_search_started = True
         try:
-            from services.link_health_service import get_link_health_service
-            svc = get_link_health_service()
-            svc.start()
+            from services.offer_search_index import get_offer_search_index
+            get_offer_search_index().start()
         except Exception as e:
-            print(f"⚠️ Link health service start failed in before_request: {e}")
+            logging.warning(f"⚠️ Offer search index failed to start: {str(e)}")
 
 if __name__ == '__main__':
     # Running directly (not via Gunicorn) — start services immediately
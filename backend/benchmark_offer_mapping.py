@@ -0,0 +1,160 @@
+"""
+Offer mapping micro-benchmark.
+
+Maps a synthetic feed of sample offers (HasOffers, Everflow and MobPlus
+payloads, 50K by default) through NetworkFieldMapper the same way an API
+import does, and reports CPU time per offer. Run it before and after touching
+network_field_mapper / category detection:
+
+    python benchmark_offer_mapping.py
+    python benchmark_offer_mapping.py --offers 20000 --cold --budget-us 400
+
+--cold clears the text-matching memo caches before every network so the
+numbers include first-sight cost; --budget-us exits non-zero when the mean
+CPU time per offer goes over the budget.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+# Add the current directory to python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.network_field_mapper import NetworkFieldMapper, _countries_in_text, _device_in_name
+from models.offer import _detect_categories
+
+NETWORKS = ('hasoffers', 'everflow', 'mobplus')
+
+BRANDS = ['Block Blast', 'Spinarium', 'Binance', 'Crocs', 'JobScan', 'Airpaz', 'Game Zone', 'VIP Games',
+          'KingOpinion', 'Sling TV', 'Doodle', 'CashApp', 'Tinder', 'Coursera', 'Lemonade', 'Upstart',
+          'Solitaire Grand', 'Mahjong Club', 'Bingo Blitz', 'Survey Junkie', 'Swagbucks', 'NordVPN']
+PLATFORMS = ['', 'Android', 'iOS', 'iPhone', 'Desktop', 'Windows']
+GEOS = ['US', 'UK', 'CA', 'DE', 'FR', 'BR', 'TH', 'KW', 'SA', 'IN', 'MX', 'WW']
+NAME_TEMPLATES = [
+    '{brand} - {platform} - {geo} - CPI',
+    '{brand}_{geo}',
+    '{brand} [{geo}]',
+    '{brand} {platform} {geo}',
+    '{brand}-{geo}-Ooredoo-MS-2Click',
+    '{brand} {platform} (Incent)',
+]
+DESCRIPTIONS = [
+    '<p>Install and open the app. Campaign Type: Gaming.</p>',
+    '<p>Complete the survey to earn rewards. New users only.</p>',
+    '<p>Sign up and make a first deposit. Available worldwide.</p>',
+    '<p>Start a free trial, cancel anytime. <b>No incent traffic.</b></p>',
+    '<p>Enter your email for a chance to win a $1000 gift card.</p>',
+    '<p>Apply for a personal loan in minutes. Credit check required.</p>',
+    '<p>Download and reach level 10 within 7 days.</p>',
+    '',
+]
+MOBPLUS_CATEGORIES = ['Games', 'Finance', 'Pin Submit', 'Dating', 'Utilities', 'Sweepstakes', '']
+
+
+def sample_offer(network_type, i, rng):
+    """Build one raw offer payload shaped like the given network's API response."""
+    name = rng.choice(NAME_TEMPLATES).format(
+        brand=rng.choice(BRANDS), platform=rng.choice(PLATFORMS), geo=rng.choice(GEOS)
+    ).strip()
+    description = rng.choice(DESCRIPTIONS)
+    payout = round(rng.uniform(0.1, 25.0), 2)
+    preview_url = f'https://play.google.com/store/apps/details?id=com.sample.app{i % 5000}'
+
+    if network_type == 'hasoffers':
+        return {'Offer': {
+            'id': str(i),
+            'name': name,
+            'description': description,
+            'default_payout': payout,
+            'currency': 'USD',
+            'status': 'active',
+            'preview_url': preview_url,
+            'offer_url': f'https://sample.go2cloud.org/aff_c?offer_id={i}&aff_id=1',
+        }}
+    if network_type == 'everflow':
+        return {
+            'network_offer_id': i,
+            'name': name,
+            'html_description': description,
+            'offer_status': 'active',
+            'currency_id': 'USD',
+            'preview_url': preview_url,
+            'tracking_url': f'https://www.sample-eflow.com/{i}/?sub1=',
+            'relationship': {
+                'payouts': {'entries': [{'is_default': True, 'payout_type': 'cpa', 'payout_amount': payout}]},
+                'ruleset': {
+                    'countries': [{'country_code': rng.choice(GEOS[:-1]), 'targeting_type': 'include'}],
+                    'platforms': [{'label': rng.choice(['Android', 'iOS'])}],
+                },
+                'category': {'name': rng.choice(['Gaming', 'Finance', 'Survey', ''])},
+            },
+        }
+    return {
+        'id': str(i),
+        'name': name,
+        'desc': description,
+        'trackingLink': f'https://track.sample-mobplus.com/c?o={i}',
+        'previewUrl': preview_url,
+        'payout': payout,
+        'currency': 'USD',
+        'status': 'active',
+        'categories': [rng.choice(MOBPLUS_CATEGORIES)],
+    }
+
+
+def clear_memo_caches():
+    _countries_in_text.cache_clear()
+    _device_in_name.cache_clear()
+    _detect_categories.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark NetworkFieldMapper on synthetic offers')
+    parser.add_argument('--offers', type=int, default=50000, help='number of sample offers to map')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cold', action='store_true', help='clear memo caches before each network')
+    parser.add_argument('--budget-us', type=float, default=0, help='fail if mean CPU us/offer exceeds this')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = random.Random(args.seed)
+    mapper = NetworkFieldMapper()
+    per_network = max(1, args.offers // len(NETWORKS))
+
+    total_cpu = 0.0
+    total_offers = 0
+    print(f"Mapping {per_network * len(NETWORKS)} sample offers ({'cold' if args.cold else 'warm'} memo caches)")
+    for network_type in NETWORKS:
+        offers = [sample_offer(network_type, i, rng) for i in range(per_network)]
+        if args.cold:
+            clear_memo_caches()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        mapped = [mapper.map_to_db_format(offer, network_type, 'benchmark') for offer in offers]
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+        failed = sum(1 for m in mapped if not m)
+        total_cpu += cpu
+        total_offers += len(offers)
+        print(f"  {network_type:<10} {len(offers):>7} offers  cpu {cpu:7.2f}s  wall {wall:7.2f}s  "
+              f"{cpu / len(offers) * 1e6:8.1f} us/offer  {failed} failed")
+
+    mean_us = total_cpu / total_offers * 1e6
+    print(f"Total: {total_offers} offers in {total_cpu:.2f}s CPU ({mean_us:.1f} us/offer, "
+          f"{total_offers / total_cpu if total_cpu else 0:.0f} offers/s)")
+    print(f"Memo caches: countries {_countries_in_text.cache_info()}, "
+          f"categories {_detect_categories.cache_info()}, devices {_device_in_name.cache_info()}")
+
+    if args.budget_us and mean_us > args.budget_us:
+        print(f"FAIL: {mean_us:.1f} us/offer is over the {args.budget_us:.1f} us/offer budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,10 @@ import os
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
 
 # Workers — 1 sync worker for 512MB RAM on Render
-# With only 5 background services (down from 15), 1 worker is sufficient for ~22 users/day
-# Total memory: ~200-250MB (well within 512MB limit)
-workers = 1
+# 1 worker is sufficient for ~22 users/day; total memory ~200-250MB (well within 512MB limit).
+# Safe to raise: each background job runs in exactly one process, whatever the count.
+# With RUN_BACKGROUND_SERVICES=0 the jobs run in the separate worker process (worker.py).
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
 timeout = 180  # 3 minutes for bulk import operations
 
 # Prevent memory leaks — restart workers after N requests
@@ -32,11 +33,20 @@ loglevel = "info"
 graceful_timeout = 30
 keepalive = 5
 
-def post_worker_init(worker):
-    """Only the first worker (worker.age == 1) runs background services.
-    This prevents duplicate threads consuming memory across workers."""
-    import os
-    if worker.age == 1:
-        os.environ['RUN_BACKGROUND_SERVICES'] = '1'
-    else:
-        os.environ['RUN_BACKGROUND_SERVICES'] = '0'
+def worker_exit(server, worker):
+    """Release the job leases held by this worker (max_requests recycling,
+    graceful restarts) so the next worker does not wait for them to expire.
+    Jobs still running get a bounded wait and otherwise keep their lease.
+    Background jobs are spread over workers by per-job MongoDB leases
+    (services/job_scheduler.py), so no worker is special."""
+    try:
+        from services.job_scheduler import get_job_scheduler
+        get_job_scheduler().stop()
+    except Exception:
+        pass
+    # Buffered click_events writes would otherwise be lost on every recycle
+    try:
+        from models.click_events import flush_click_events
+        flush_click_events()
+    except Exception:
+        pass
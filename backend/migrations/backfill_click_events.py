@@ -0,0 +1,55 @@
+"""
+Migration: Backfill the unified click_events collection.
+
+Copies clicks from the raw click collections (offerwall_clicks_detailed,
+offerwall_clicks, clicks, dashboard_clicks, smart_link_clicks,
+redirect_router_clicks, click_tracking) into click_events, normalized to one
+schema. Run it after deploying the dual-writing code so the backfilled range
+meets the live writes; consumers switch to click_events once it covers their
+date range (or the full history, for all-time queries).
+
+Safe to re-run: events are upserted on (source, source_id).
+
+Run from backend/:
+    python migrations/backfill_click_events.py                  # full history
+    python migrations/backfill_click_events.py --days 30        # last 30 days only
+    python migrations/backfill_click_events.py --resume         # continue an interrupted run
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from database import db_instance
+from models.click_events import ClickEvents
+
+
+def backfill(start_date=None, end_date=None, resume=False):
+    if not db_instance.is_connected():
+        print("ERROR: Could not connect to database")
+        return
+
+    print(f"Backfilling click events from {start_date or 'the beginning'} to {end_date or 'now'}...")
+    written = ClickEvents().backfill(start_date, end_date, resume=resume)
+    for collection_name, count in written.items():
+        print(f"  {collection_name}: {count} events")
+    print(f"Done. {sum(written.values())} events written.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill the unified click_events collection')
+    parser.add_argument('--days', type=int, help='Only backfill the last N days')
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (overrides --days)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: now)')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args()
+
+    start = None
+    if args.start:
+        start = datetime.strptime(args.start, '%Y-%m-%d')
+    elif args.days:
+        start = datetime.utcnow() - timedelta(days=args.days)
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else None
+    backfill(start, end, args.resume)
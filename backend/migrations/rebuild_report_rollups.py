@@ -0,0 +1,49 @@
+"""
+Migration: Backfill / rebuild hourly report rollups.
+
+Recomputes report_rollups_hourly from the raw click collections
+(offerwall_clicks_detailed, offerwall_clicks, clicks, dashboard_clicks) and
+forwarded_postbacks, then records how far back rollups are complete so the
+performance reports start reading them.
+
+Run from backend/:
+    python migrations/rebuild_report_rollups.py              # last 90 days
+    python migrations/rebuild_report_rollups.py --days 365
+    python migrations/rebuild_report_rollups.py --start 2026-01-01 --end 2026-02-01
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from database import db_instance
+from models.report_rollups import ReportRollups
+
+
+def rebuild(start_date, end_date=None):
+    if not db_instance.is_connected():
+        print("ERROR: Could not connect to database")
+        return
+
+    print(f"Rebuilding report rollups from {start_date} to {end_date or 'current hour'}...")
+    result = ReportRollups().rebuild(start_date, end_date)
+    print(f"Done. Removed {result['deleted']} old buckets, wrote {result['written']} buckets.")
+    if result['covered_from']:
+        print(f"Reports from {result['covered_from']} on are served from rollups.")
+    else:
+        print("Coverage unchanged: the range does not reach the hours written live. "
+              "Rerun with an end date at or after the first full live hour.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild hourly report rollups')
+    parser.add_argument('--days', type=int, default=90, help='Days of history to rebuild (default 90)')
+    parser.add_argument('--start', help='Start date YYYY-MM-DD (overrides --days)')
+    parser.add_argument('--end', help='End date YYYY-MM-DD (default: start of current hour)')
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else datetime.utcnow() - timedelta(days=args.days)
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else None
+    rebuild(start, end)
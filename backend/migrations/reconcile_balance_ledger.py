@@ -0,0 +1,41 @@
+"""
+Migration: Reconcile the balance ledger.
+
+Re-derives every source document's contribution (forwarded_postbacks,
+bonus_earnings, gift_card_redemptions, referrals_p1, referrals_p2,
+balance_adjustments, payment_records), posts correcting ledger entries for
+anything the write paths missed (including deleted source documents), and
+rebuilds user_balances from the ledger. The first run seeds the ledger from
+the full history; balance reads switch to user_balances once it completes.
+
+Safe to re-run: documents whose posted amount already matches are skipped.
+
+Run from backend/:
+    python migrations/reconcile_balance_ledger.py
+"""
+
+import sys
+import os
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from database import db_instance
+from models.balance_ledger import BalanceLedger
+
+
+def reconcile():
+    if not db_instance.is_connected():
+        print("ERROR: Could not connect to database")
+        return
+
+    print("Reconciling balance ledger...")
+    result = BalanceLedger().reconcile()
+    for key, count in result.items():
+        print(f"  {key}: {count}")
+    print("Done.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reconcile the balance ledger against its source collections')
+    parser.parse_args()
+    reconcile()
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
+from models.click_events import record_click_event
 import re
 from collections import defaultdict
 
@@ -63,6 +64,7 @@ class Analytics:
             # Insert click record
             result = self.clicks_collection.insert_one(click_record)
             click_record['_id'] = result.inserted_id
+            record_click_event('click_tracking', click_record)
             
             # Update last_click_date on the offer (rolling 30-day inactivity window)
             try:
@@ -84,6 +86,77 @@ class Analytics:
         except Exception as e:
             return None, f"Error tracking click: {str(e)}"
     
+    def track_clicks(self, clicks):
+        """Track a batch of click events with one insert_many (used by the masked-link click batcher)"""
+        if not clicks or not self._check_db_connection():
+            return []
+        
+        now = datetime.utcnow()
+        seen = set()  # earlier clicks of this batch count against uniqueness too
+        click_records = []
+        for click_data in clicks:
+            offer_id = click_data.get('offer_id')
+            user_id = click_data.get('user_id')
+            ip_address = click_data.get('ip_address')
+            user_agent = click_data.get('user_agent')
+            fraud_score, fraud_reasons = self._detect_fraud(click_data)
+            is_unique = ((offer_id, 'user', user_id) not in seen and (offer_id, 'ip', ip_address) not in seen
+                         and self._is_unique_click(offer_id, user_id, ip_address))
+            seen.update({(offer_id, 'user', user_id), (offer_id, 'ip', ip_address)})
+            click_records.append({
+                'offer_id': offer_id,
+                'user_id': user_id,
+                'masked_link_id': click_data.get('masked_link_id'),
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'referrer': click_data.get('referrer'),
+                'subid': click_data.get('subid'),
+                'country': click_data.get('country'),
+                'device_type': self._detect_device_type(user_agent),
+                'browser': self._detect_browser(user_agent),
+                'os': self._detect_os(user_agent),
+                'fraud_score': fraud_score,
+                'fraud_reasons': fraud_reasons,
+                'is_fraud': fraud_score > 70,  # Threshold for fraud
+                'is_unique': is_unique,
+                'timestamp': click_data.get('clicked_at') or now,
+                'conversion_status': 'pending'
+            })
+        
+        # insert_many sets _id on each record
+        self.clicks_collection.insert_many(click_records, ordered=False)
+        for click_record in click_records:
+            record_click_event('click_tracking', click_record)
+        
+        # Update last_click_date on the offers (rolling 30-day inactivity window)
+        offer_ids = list({r['offer_id'] for r in click_records if r['offer_id']})
+        try:
+            offers_col = db_instance.get_collection('offers')
+            if offers_col is not None and offer_ids:
+                offers_col.update_many(
+                    {'offer_id': {'$in': offer_ids}},
+                    {'$set': {'last_click_date': now}}
+                )
+        except Exception:
+            pass
+        
+        fraud_logs = [{
+            'click_id': r['_id'],
+            'offer_id': r['offer_id'],
+            'ip_address': r['ip_address'],
+            'user_agent': r['user_agent'],
+            'fraud_score': r['fraud_score'],
+            'fraud_reasons': r['fraud_reasons'],
+            'timestamp': now
+        } for r in click_records if r['is_fraud']]
+        if fraud_logs:
+            try:
+                self.fraud_logs_collection.insert_many(fraud_logs, ordered=False)
+            except Exception:
+                pass  # Don't fail the main operation if logging fails
+        
+        return click_records
+    
     def track_conversion(self, conversion_data):
         """Track a conversion event"""
         if not self._check_db_connection():
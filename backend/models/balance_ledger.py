@@ -0,0 +1,499 @@
+"""
+Balance Ledger Model
+Append-only per-user balance ledger with a materialized running balance.
+
+A publisher's balance is made of documents spread over several collections
+(forwarded_postbacks, bonus_earnings, gift_card_redemptions, referrals_p1,
+referrals_p2, balance_adjustments, payment_records). Instead of re-aggregating
+all of them on every balance read:
+
+- balance_ledger: one immutable entry per change (credit, reversal, bonus,
+  gift card, referral, adjustment, payment), with the source document it
+  came from
+- balance_ledger_sources: the amount currently posted for each source
+  document, so a status change (e.g. a conversion being reversed) posts only
+  the difference
+- user_balances: one document per user with running totals per bucket and
+  the net balance, $inc'ed on every entry
+
+Write paths call record_balance_change() after changing a source document.
+reconcile() (migrations/reconcile_balance_ledger.py, and a periodic
+background run) compares what the ledger actually holds for every source
+document with the document's current contribution and posts the difference,
+so anything a write path missed or lost halfway (claimed but never written)
+is repaired. It then brings user_balances in line with the ledger. Readers
+use the ledger once a reconcile has completed.
+"""
+
+from datetime import datetime, timedelta
+from database import db_instance
+import logging
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LEDGER_COLLECTION = 'balance_ledger'
+SOURCES_COLLECTION = 'balance_ledger_sources'
+BALANCES_COLLECTION = 'user_balances'
+STATE_COLLECTION = 'balance_ledger_state'
+
+BUCKETS = ('conversion', 'promo', 'gift', 'referral', 'adjustments', 'paid')
+RECONCILE_BATCH_SIZE = 1000
+# Reconcile leaves sources/balances touched this recently to the live write path still finishing them
+LIVE_WRITE_GRACE_SECONDS = 300
+EPSILON = 1e-9
+
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _str_id(value):
+    return str(value) if value not in (None, '') else None
+
+
+def _conversion_amount(doc):
+    if doc.get('forward_status') == 'reversed' or doc.get('is_reversal') or doc.get('source') == 'fallback_fake':
+        return 0.0
+    return _num(doc.get('points'))
+
+
+# Source collection -> (bucket, user field, amount rule, credit kind, debit kind).
+# The amount rules are the balance queries the payment pages used to run.
+SOURCE_RULES = {
+    'forwarded_postbacks': (
+        'conversion', 'publisher_id', _conversion_amount, 'credit', 'reversal'),
+    'bonus_earnings': (
+        'promo', 'user_id', lambda d: _num(d.get('bonus_amount')) if d.get('status') == 'credited' else 0.0,
+        'bonus', 'bonus_reversal'),
+    'gift_card_redemptions': (
+        'gift', 'user_id', lambda d: _num(d.get('amount')) if d.get('status') != 'reversed' else 0.0,
+        'gift_card', 'gift_card_reversal'),
+    'referrals_p1': (
+        'referral', 'referrer_id',
+        lambda d: _num(d.get('bonus_amount')) if d.get('bonus_released') and d.get('status') != 'reversed' else 0.0,
+        'referral', 'referral_reversal'),
+    'referrals_p2': (
+        'referral', 'referrer_id', lambda d: _num(d.get('commission_earned')),
+        'referral', 'referral_reversal'),
+    'balance_adjustments': (
+        'adjustments', 'user_id', lambda d: _num(d.get('amount')) if d.get('type') != 'payment' else 0.0,
+        'adjustment', 'adjustment'),
+    'payment_records': (
+        'paid', 'user_id', lambda d: _num(d.get('amount')),
+        'payment', 'payment_reversal'),
+}
+
+# Fields each rule reads (projection for reconcile scans)
+SOURCE_FIELDS = {
+    'forwarded_postbacks': ['publisher_id', 'points', 'forward_status', 'is_reversal', 'source'],
+    'bonus_earnings': ['user_id', 'bonus_amount', 'status'],
+    'gift_card_redemptions': ['user_id', 'amount', 'status'],
+    'referrals_p1': ['referrer_id', 'bonus_amount', 'bonus_released', 'status'],
+    'referrals_p2': ['referrer_id', 'commission_earned'],
+    'balance_adjustments': ['user_id', 'amount', 'type'],
+    'payment_records': ['user_id', 'amount'],
+}
+
+
+def _contribution(collection_name, doc):
+    """(user_id, amount) a source document currently contributes to its bucket."""
+    bucket, user_field, amount_rule, _, _ = SOURCE_RULES[collection_name]
+    user_id = _str_id(doc.get(user_field))
+    return user_id, (amount_rule(doc) if user_id else 0.0)
+
+
+def _source_key(collection_name, source_id):
+    return f'{collection_name}:{source_id}'
+
+
+def _changed(posted, user_id, amount):
+    prev_user = posted.get('user_id') if posted else None
+    prev_amount = posted.get('amount', 0.0) if posted else 0.0
+    return prev_user != user_id or abs(prev_amount - amount) > 1e-9
+
+
+def _delta_entries(collection_name, source_id, booked, user_id, amount, reason):
+    """Ledger entries moving a source document from `booked` ({user_id: amount}) to `amount` for user_id.
+
+    A source re-attributed to another user is taken back from the old one.
+    """
+    bucket, _, _, credit_kind, debit_kind = SOURCE_RULES[collection_name]
+    target = {user_id: amount} if user_id else {}
+    now = datetime.utcnow()
+    entries = []
+    for uid in list(booked) + [u for u in target if u not in booked]:
+        delta = target.get(uid, 0.0) - booked.get(uid, 0.0)
+        if not uid or abs(delta) <= EPSILON:
+            continue
+        entries.append({
+            'user_id': uid,
+            'bucket': bucket,
+            'amount': delta,
+            'kind': credit_kind if delta > 0 else debit_kind,
+            'source': collection_name,
+            'source_id': source_id,
+            'reason': reason,
+            'created_at': now,
+        })
+    return entries
+
+
+def _transition_entries(collection_name, source_id, posted, user_id, amount, reason):
+    """Ledger entries moving a source document from its posted amount to `amount`."""
+    booked = {posted.get('user_id'): posted.get('amount', 0.0)} if posted and posted.get('user_id') else {}
+    return _delta_entries(collection_name, source_id, booked, user_id, amount, reason)
+
+
+def _balance_inc(entry):
+    sign = -1 if entry['bucket'] == 'paid' else 1
+    return {entry['bucket']: entry['amount'], 'balance': sign * entry['amount'], 'entries': 1}
+
+
+def balance_summary(doc: Optional[Dict]) -> Dict:
+    """Shape a user_balances document like calculate_user_earnings() output."""
+    doc = doc or {}
+    referral = doc.get('referral', 0)
+    conversion = doc.get('conversion', 0)
+    promo = doc.get('promo', 0)
+    gift = doc.get('gift', 0)
+    return {
+        'total_balance': max(0, doc.get('balance', 0)),
+        'referral_earnings': max(0, referral),
+        'conversion_earnings': max(0, conversion),
+        'promo_earnings': max(0, promo),
+        'gift_earnings': max(0, gift),
+        'manual_adjustments': doc.get('adjustments', 0),
+        'gross_earnings': conversion + promo + gift + referral,
+        'total_paid': doc.get('paid', 0),
+    }
+
+
+class BalanceLedger:
+    def __init__(self):
+        self.ledger = db_instance.get_collection(LEDGER_COLLECTION)
+        self.sources = db_instance.get_collection(SOURCES_COLLECTION)
+        self.balances = db_instance.get_collection(BALANCES_COLLECTION)
+        self.state = db_instance.get_collection(STATE_COLLECTION)
+        self._indexes_ensured = False
+        self._reconcile_lock = threading.Lock()
+
+    def _available(self):
+        return all(c is not None for c in (self.ledger, self.sources, self.balances, self.state))
+
+    def ensure_indexes(self):
+        from pymongo import ASCENDING, DESCENDING
+        if self._indexes_ensured or not self._available():
+            return
+        self.ledger.create_index([('user_id', ASCENDING), ('created_at', DESCENDING)], background=True)
+        self.ledger.create_index([('source', ASCENDING), ('source_id', ASCENDING)], background=True)
+        self.sources.create_index([('source', ASCENDING)], background=True)
+        self.balances.create_index([('balance', DESCENDING)], background=True)
+        self._indexes_ensured = True
+
+    def is_ready(self) -> bool:
+        """True once a reconcile has brought the ledger in line with the source collections."""
+        if not self._available():
+            return False
+        try:
+            state = self.state.find_one({'_id': 'ledger'})
+        except Exception:
+            return False
+        return bool(state and state.get('reconciled_at'))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_balance(self, user_id: str) -> Dict:
+        return balance_summary(self.balances.find_one({'_id': str(user_id)}))
+
+    def get_balances(self, user_ids: List[str]) -> Dict[str, Dict]:
+        docs = {d['_id']: d for d in self.balances.find({'_id': {'$in': [str(u) for u in user_ids]}})}
+        return {str(u): balance_summary(docs.get(str(u))) for u in user_ids}
+
+    def get_entries(self, user_id: str, limit: int = 100) -> List[Dict]:
+        return list(self.ledger.find({'user_id': str(user_id)}).sort('created_at', -1).limit(limit))
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def sync(self, collection_name: str, doc: Dict, reason: Optional[str] = None) -> int:
+        """Post the change in a source document's contribution. Returns the number of entries written.
+
+        Entries lost after the claim (a crash or write error before insert_many)
+        are re-derived by reconcile(), which checks the ledger sums themselves.
+        """
+        if collection_name not in SOURCE_RULES or not doc or doc.get('_id') is None or not self._available():
+            return 0
+        self.ensure_indexes()
+
+        source_id = str(doc['_id'])
+        key = _source_key(collection_name, source_id)
+        user_id, amount = _contribution(collection_name, doc)
+
+        for _ in range(3):
+            posted = self.sources.find_one({'_id': key})
+            if not _changed(posted, user_id, amount):
+                return 0
+            if not self._claim(key, collection_name, posted, user_id, amount):
+                continue
+
+            entries = _transition_entries(collection_name, source_id, posted, user_id, amount, reason)
+            if entries:
+                self.ledger.insert_many(entries)
+                now = datetime.utcnow()
+                for entry in entries:
+                    self.balances.update_one(
+                        {'_id': entry['user_id']},
+                        {'$inc': _balance_inc(entry), '$set': {'updated_at': now}},
+                        upsert=True
+                    )
+            return len(entries)
+        logger.warning(f"Balance ledger: gave up syncing {key} after concurrent updates")
+        return 0
+
+    def _claim(self, key, collection_name, posted, user_id, amount):
+        """Move a source's posted state from `posted` to the new amount (compare-and-swap).
+
+        Returns False when another writer changed it first, so the same
+        transition is never posted twice.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        new_state = {'source': collection_name, 'user_id': user_id, 'amount': amount, 'updated_at': datetime.utcnow()}
+        if posted:
+            return self.sources.update_one(
+                {'_id': key, 'user_id': posted.get('user_id'), 'amount': posted.get('amount')},
+                {'$set': new_state}
+            ).modified_count == 1
+        try:
+            self.sources.insert_one({'_id': key, **new_state})
+            return True
+        except DuplicateKeyError:
+            return False
+
+    # ------------------------------------------------------------------
+    # Reconcile
+    # ------------------------------------------------------------------
+
+    def reconcile(self) -> Dict[str, int]:
+        """Bring the ledger in line with every source collection and rebuild user_balances.
+
+        1. Scan each source collection in batches; post correcting entries for
+           documents whose contribution differs from the sum of their ledger
+           entries (a missed write path, or a claim whose entries were lost).
+        2. Reverse the ledger sums of source documents that no longer exist.
+        3. Bring user_balances in line with the ledger entries.
+
+        Sources and balances changed within LIVE_WRITE_GRACE_SECONDS are left
+        to the write in progress and picked up by the next run.
+        """
+        if not self._available():
+            return {}
+        if not self._reconcile_lock.acquire(blocking=False):
+            logger.info("Balance ledger reconcile already running")
+            return {}
+        try:
+            self.ensure_indexes()
+            reason = f'reconcile:{uuid.uuid4().hex[:12]}'
+            written = {}
+            for collection_name in SOURCE_RULES:
+                source_col = db_instance.get_collection(collection_name)
+                if source_col is None:
+                    continue
+                projection = {f: 1 for f in SOURCE_FIELDS[collection_name]}
+                count = 0
+                batch = []
+                for doc in source_col.find({}, projection).batch_size(RECONCILE_BATCH_SIZE):
+                    batch.append(doc)
+                    if len(batch) >= RECONCILE_BATCH_SIZE:
+                        count += self._reconcile_batch(collection_name, batch, reason)
+                        batch = []
+                if batch:
+                    count += self._reconcile_batch(collection_name, batch, reason)
+                count += self._reconcile_deleted(collection_name, source_col, reason)
+                written[collection_name] = count
+                logger.info(f"Balance ledger reconcile: {collection_name} done ({count} correcting entries)")
+
+            written['balances_rebuilt'] = self._rebuild_balances()
+            self.state.update_one(
+                {'_id': 'ledger'},
+                {'$set': {'reconciled_at': datetime.utcnow(), 'last_reconcile': written}},
+                upsert=True
+            )
+            return written
+        finally:
+            self._reconcile_lock.release()
+
+    def _ledger_sums(self, collection_name, source_ids=None):
+        """What the ledger holds per source document: source_id -> {user_id: amount} (non-zero only)."""
+        match = {'source': collection_name}
+        if source_ids is not None:
+            match['source_id'] = {'$in': source_ids}
+        sums = {}
+        for row in self.ledger.aggregate([
+            {'$match': match},
+            {'$group': {'_id': {'source_id': '$source_id', 'user_id': '$user_id'}, 'amount': {'$sum': '$amount'}}},
+            {'$match': {'$or': [{'amount': {'$gt': EPSILON}}, {'amount': {'$lt': -EPSILON}}]}},
+        ], allowDiskUse=True):
+            sums.setdefault(row['_id']['source_id'], {})[row['_id'].get('user_id')] = row['amount']
+        return sums
+
+    def _reconcile_batch(self, collection_name, docs, reason):
+        # One $in read of the posted states and one ledger $group per batch
+        source_ids = [str(d['_id']) for d in docs]
+        keys = [_source_key(collection_name, source_id) for source_id in source_ids]
+        posted_by_key = {p['_id']: p for p in self.sources.find({'_id': {'$in': keys}})}
+        booked_by_source = self._ledger_sums(collection_name, source_ids)
+        recent = datetime.utcnow() - timedelta(seconds=LIVE_WRITE_GRACE_SECONDS)
+
+        entries = []
+        for doc, source_id, key in zip(docs, source_ids, keys):
+            user_id, amount = _contribution(collection_name, doc)
+            posted = posted_by_key.get(key)
+            if posted and posted.get('updated_at') and posted['updated_at'] > recent:
+                continue  # a live sync may still be writing its entries
+            corrections = _delta_entries(
+                collection_name, source_id, booked_by_source.get(source_id, {}), user_id, amount, reason
+            )
+            if not corrections and not _changed(posted, user_id, amount):
+                continue
+            # The claim fails when a live sync moved the source meanwhile; it posts its own entries
+            if self._claim(key, collection_name, posted, user_id, amount):
+                entries.extend(corrections)
+        if entries:
+            self.ledger.insert_many(entries, ordered=False)
+        return len(entries)
+
+    def _reconcile_deleted(self, collection_name, source_col, reason):
+        """Reverse whatever the ledger still holds for source documents that were deleted."""
+        from bson import ObjectId
+
+        count = 0
+
+        def flush(batch):
+            lookup = [ObjectId(i) if ObjectId.is_valid(i) else i for i in batch]
+            existing = {str(d['_id']) for d in source_col.find({'_id': {'$in': lookup}}, {'_id': 1})}
+            missing = [source_id for source_id in batch if source_id not in existing]
+            if not missing:
+                return 0
+            entries = []
+            for source_id, booked in self._ledger_sums(collection_name, missing).items():
+                entries.extend(_delta_entries(collection_name, source_id, booked, None, 0.0, reason))
+            self.sources.delete_many({'_id': {'$in': [_source_key(collection_name, i) for i in missing]}})
+            if entries:
+                self.ledger.insert_many(entries, ordered=False)
+            return len(entries)
+
+        batch = []
+        for source_id in self._ledger_sums(collection_name):
+            batch.append(source_id)
+            if len(batch) >= RECONCILE_BATCH_SIZE:
+                count += flush(batch)
+                batch = []
+        if batch:
+            count += flush(batch)
+        return count
+
+    def _rebuild_balances(self):
+        """Bring user_balances in line with the sums of the ledger entries.
+
+        Live writers keep $inc'ing while this runs, so every overwrite is a
+        compare-and-swap on the document's applied-entries counter as read
+        before the ledger sums: a $inc landing in between makes it a no-op.
+        Users whose ledger has entries from the last LIVE_WRITE_GRACE_SECONDS
+        and whose counter is behind are skipped (their $inc is in flight).
+        """
+        from pymongo import DeleteOne, UpdateOne
+        from pymongo.errors import BulkWriteError
+
+        # Read the balances first: anything $inc'ed after this read changes their counter
+        current = {d['_id']: d for d in self.balances.find({}, {'updated_at': 0})}
+
+        totals = {}
+        newest = {}
+        for row in self.ledger.aggregate([
+            {'$group': {'_id': {'user_id': '$user_id', 'bucket': '$bucket'},
+                        'amount': {'$sum': '$amount'}, 'entries': {'$sum': 1}, 'newest': {'$max': '$created_at'}}},
+        ], allowDiskUse=True):
+            user_id = row['_id']['user_id']
+            doc = totals.setdefault(user_id, {**dict.fromkeys(BUCKETS, 0.0), 'balance': 0.0, 'entries': 0})
+            bucket = row['_id']['bucket']
+            doc[bucket] += row['amount']
+            doc['balance'] += -row['amount'] if bucket == 'paid' else row['amount']
+            doc['entries'] += row['entries']
+            newest[user_id] = max(newest.get(user_id) or row['newest'], row['newest'])
+
+        now = datetime.utcnow()
+        recent = now - timedelta(seconds=LIVE_WRITE_GRACE_SECONDS)
+        ops = []
+        for uid, doc in totals.items():
+            existing = current.get(uid)
+            if existing is None:
+                # Insert only if no live $inc created it meanwhile (duplicate key otherwise)
+                ops.append(UpdateOne({'_id': uid, 'entries': {'$exists': False}},
+                                     {'$set': {**doc, 'updated_at': now}}, upsert=True))
+                continue
+            if all(abs((existing.get(f) or 0) - doc[f]) <= EPSILON for f in doc):
+                continue
+            if existing.get('entries', 0) != doc['entries'] and newest.get(uid) and newest[uid] > recent:
+                continue
+            ops.append(UpdateOne({'_id': uid, 'entries': existing.get('entries')},
+                                 {'$set': {**doc, 'updated_at': now}}))
+        ops.extend(DeleteOne({'_id': uid, 'entries': d.get('entries')}) for uid, d in current.items() if uid not in totals)
+
+        for i in range(0, len(ops), RECONCILE_BATCH_SIZE):
+            try:
+                self.balances.bulk_write(ops[i:i + RECONCILE_BATCH_SIZE], ordered=False)
+            except BulkWriteError as e:
+                if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                    raise
+        return len(ops)
+
+
+_ledger = None
+
+
+def get_balance_ledger() -> BalanceLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = BalanceLedger()
+    return _ledger
+
+
+def record_balance_change(collection_name: str, doc: Dict):
+    """Post a source document that was just inserted or updated (must carry its _id)."""
+    try:
+        get_balance_ledger().sync(collection_name, doc)
+    except Exception as e:
+        logger.warning(f"Failed to record balance ledger entry: {e}")
+
+
+def record_balance_changes(collection_name: str, query: Dict):
+    """Post every source document matching query (after an update_many, or when only the filter is known)."""
+    try:
+        source_col = db_instance.get_collection(collection_name)
+        if source_col is None:
+            return
+        ledger = get_balance_ledger()
+        for doc in source_col.find(query, {f: 1 for f in SOURCE_FIELDS.get(collection_name, [])}):
+            ledger.sync(collection_name, doc)
+    except Exception as e:
+        logger.warning(f"Failed to record balance ledger entries: {e}")
+
+
+RECONCILE_INTERVAL_SECONDS = 6 * 3600
+
+
+def reconcile_balances():
+    """Periodic reconcile so changes made outside the hooked write paths are picked up
+    (scheduled every RECONCILE_INTERVAL_SECONDS as 'balance_reconcile')."""
+    result = get_balance_ledger().reconcile()
+    logger.info(f"📒 Balance ledger reconciled: {result}")
@@ -0,0 +1,364 @@
+"""
+Click Events Model
+Unified click store: one normalized document per click from every click collection.
+
+Clicks used to be spread over several raw collections with different shapes
+(offerwall_clicks_detailed with nested geo/device, camelCase clicks from the
+placement tracker, affiliate_id/click_time clicks from the tracking service...).
+click_events holds all of them in one schema with a `source` tag, so each
+click query is a single indexed query instead of a merge across collections.
+
+Migration:
+- Writers dual-write: after inserting into their raw collection they call
+  record_click_event(); events are buffered and flushed with bulk_write.
+- migrations/backfill_click_events.py copies the history. Upserts on
+  (source, source_id) make the backfill and the live writer idempotent.
+- Consumers check ClickEvents().covers(start) and fall back to the raw
+  collections until the backfill has reached their date range.
+"""
+
+from datetime import datetime
+from bson import ObjectId
+from database import db_instance
+from models.report_rollups import CLICK_SOURCES
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = 'click_events'
+STATE_COLLECTION = 'click_events_state'
+
+# Raw collection -> source tag. The first four match the report rollup tags.
+EVENT_SOURCES = {
+    **CLICK_SOURCES,
+    'smart_link_clicks': 'smart_link',
+    'redirect_router_clicks': 'redirect_router',
+    'click_tracking': 'masked_link',
+}
+# Sources whose clicks are made by the publisher themself (user_id is the publisher)
+PUBLISHER_CLICK_SOURCES = {'tracking', 'dashboard', 'masked_link'}
+# Sources shown in the performance reports and publisher level checks
+REPORT_SOURCES = list(CLICK_SOURCES.values())
+
+TIMESTAMP_FIELDS = ('timestamp', 'click_time', 'clicked_at', 'created_at', 'createdAt')
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _sub(doc, key):
+    value = doc.get(key)
+    return value if isinstance(value, dict) else {}
+
+
+def _pick(*values):
+    """First value that is not None/empty."""
+    for value in values:
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _id_str(value):
+    return str(value) if value not in (None, '') else None
+
+
+def _source_id(value):
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def normalize_click(collection_name: str, doc: Dict) -> Optional[Dict]:
+    """Map a raw click document from any click collection onto the click_events schema."""
+    source = EVENT_SOURCES.get(collection_name)
+    if not source:
+        return None
+
+    geo = _sub(doc, 'geo')
+    device = _sub(doc, 'device')
+    network = _sub(doc, 'network')
+    fraud = _sub(doc, 'fraud_indicators')
+    offer = _sub(doc, 'offer')
+    data = _sub(doc, 'data')
+    sub_ids = _sub(doc, 'sub_ids')
+
+    user_id = _pick(doc.get('user_id'), doc.get('userId'), doc.get('affiliate_id'))
+    if source in PUBLISHER_CLICK_SOURCES:
+        publisher_id = _pick(doc.get('publisher_id'), doc.get('affiliate_id'), user_id)
+    else:
+        publisher_id = doc.get('publisher_id')
+
+    timestamp = next((doc[f] for f in TIMESTAMP_FIELDS if isinstance(doc.get(f), datetime)), None)
+    if timestamp is None and isinstance(doc.get('_id'), ObjectId):
+        # Backfilled docs without a timestamp field: the ObjectId carries the insert time
+        timestamp = doc['_id'].generation_time.replace(tzinfo=None)
+    fraud_status = _pick(fraud.get('fraud_status'), doc.get('fraud_status'), doc.get('fraud_classification'))
+
+    if source == 'offerwall_detailed':
+        is_suspicious = bool(doc.get('is_suspicious'))
+        is_rejected = bool(doc.get('is_rejected'))
+    else:
+        is_suspicious = bool(doc.get('is_suspicious')) or fraud_status == 'suspicious'
+        is_rejected = bool(doc.get('is_invalid') or doc.get('is_rejected'))
+
+    event = {
+        'source': source,
+        'click_id': _id_str(doc.get('click_id')),
+        'timestamp': timestamp or datetime.utcnow(),
+        'user_id': _id_str(user_id),
+        'publisher_id': _id_str(publisher_id),
+        'username': _pick(doc.get('username'), doc.get('publisher_name')),
+        'placement_id': _id_str(_pick(doc.get('placement_id'), doc.get('placementId'))),
+        'offer_id': _id_str(_pick(doc.get('offer_id'), doc.get('offerId'))),
+        'offer_name': _pick(doc.get('offer_name'), doc.get('offerName'), data.get('offer_name')),
+        'network': _pick(offer.get('network'), doc.get('offer_network'),
+                         doc.get('network') if isinstance(doc.get('network'), str) else None),
+        'category': _pick(offer.get('category'), doc.get('offer_category'), doc.get('category')),
+        'ip_address': _pick(doc.get('ip_address'), doc.get('ip'), doc.get('userIp'),
+                            network.get('ip_address'), geo.get('ip_address')),
+        'user_agent': _pick(doc.get('user_agent'), doc.get('userAgent'), _sub(doc, 'fingerprint').get('user_agent')),
+        'referer': _pick(doc.get('referer'), doc.get('referrer')),
+        'country': _pick(doc.get('country'), geo.get('country')),
+        'country_code': _pick(doc.get('country_code'), geo.get('country_code')),
+        'city': _pick(doc.get('city'), geo.get('city')),
+        'region': _pick(doc.get('region'), geo.get('region')),
+        'isp': _pick(doc.get('isp'), network.get('isp'), geo.get('isp')),
+        'device_type': _pick(doc.get('device_type'), device.get('type'),
+                             doc.get('device') if isinstance(doc.get('device'), str) else None),
+        'browser': _pick(doc.get('browser'), device.get('browser')),
+        'os': _pick(doc.get('os'), device.get('os')),
+        'fraud_score': _pick(fraud.get('fraud_score'), doc.get('fraud_score')) or 0,
+        'fraud_status': fraud_status,
+        'is_unique': bool(doc.get('is_unique')),
+        'is_suspicious': is_suspicious,
+        'is_rejected': is_rejected,
+        'is_duplicate': bool(fraud.get('duplicate_click') or doc.get('is_duplicate')),
+    }
+    for i in range(1, 6):
+        event[f'sub_id{i}'] = _pick(doc.get(f'sub_id{i}'), sub_ids.get(f'sub{i}'),
+                                    doc.get('sub1') if i == 1 else None)
+    if doc.get('_id') is not None:
+        event['source_id'] = _source_id(doc['_id'])
+    return event
+
+
+def _event_op(event):
+    from pymongo import InsertOne, UpdateOne
+    if 'source_id' in event:
+        return UpdateOne(
+            {'source': event['source'], 'source_id': event['source_id']},
+            {'$setOnInsert': event},
+            upsert=True
+        )
+    return InsertOne(event)
+
+
+class ClickEventWriter:
+    """Buffers normalized click events in memory and flushes them with bulk_write.
+
+    Nothing is dropped: a full buffer is flushed on the caller's thread, a
+    failed flush puts its events back, and the buffer is flushed at exit.
+    """
+
+    def __init__(self, flush_interval=2, max_buffer=5000):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._indexes_ensured = False
+
+    def add(self, event):
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            # Backpressure: the writer that fills the buffer flushes it
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Click event flush failed, {len(self._buffer)} events kept buffered: {e}")
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run_loop, daemon=True, name="ClickEventWriter")
+            self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Click event flush failed: {e}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                buffer, self._buffer = self._buffer, []
+            if not buffer:
+                return
+
+            written = 0
+            try:
+                collection = db_instance.get_collection(EVENTS_COLLECTION)
+                if collection is None:
+                    raise ConnectionError("click_events collection not available")
+                if not self._indexes_ensured:
+                    ClickEvents().ensure_indexes()
+                    self._indexes_ensured = True
+
+                # Upserts on (source, source_id) make re-sending a partly written chunk safe
+                for i in range(0, len(buffer), 1000):
+                    collection.bulk_write([_event_op(event) for event in buffer[i:i + 1000]], ordered=False)
+                    written = i + 1000
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = buffer[written:]
+                raise
+
+
+_event_writer = ClickEventWriter()
+
+
+def flush_click_events():
+    """Write out buffered click events (worker shutdown / gunicorn worker_exit)."""
+    try:
+        _event_writer.flush()
+    except Exception as e:
+        logger.error(f"Click event flush at exit failed: {e}")
+
+
+atexit.register(flush_click_events)
+
+
+def record_click_event(collection_name: str, click_doc: Dict):
+    """Dual-write a click that was just inserted into one of the raw click collections."""
+    try:
+        event = normalize_click(collection_name, click_doc)
+        if event:
+            _event_writer.add(event)
+    except Exception as e:
+        logger.warning(f"Failed to record click event: {e}")
+
+
+class ClickEvents:
+    def __init__(self):
+        self.collection = db_instance.get_collection(EVENTS_COLLECTION)
+        self.state_collection = db_instance.get_collection(STATE_COLLECTION)
+
+    def ensure_indexes(self):
+        from pymongo import ASCENDING, DESCENDING
+        if self.collection is None:
+            return
+        self.collection.create_index(
+            [('source', ASCENDING), ('source_id', ASCENDING)],
+            name='source_id_unique', unique=True, background=True,
+            partialFilterExpression={'source_id': {'$exists': True}}
+        )
+        for field in ('publisher_id', 'user_id', 'username', 'placement_id', 'offer_id', 'source'):
+            self.collection.create_index([(field, ASCENDING), ('timestamp', DESCENDING)], background=True)
+        self.collection.create_index([('timestamp', DESCENDING)], background=True)
+        self.collection.create_index([('click_id', ASCENDING)], background=True)
+
+    # ------------------------------------------------------------------
+    # Coverage
+    # ------------------------------------------------------------------
+
+    def covers(self, start_date: Optional[datetime] = None) -> bool:
+        """True when the backfill reaches back to start_date (start_date=None: the full history)."""
+        if self.collection is None or self.state_collection is None:
+            return False
+        try:
+            state = self.state_collection.find_one({'_id': 'coverage'})
+        except Exception:
+            return False
+        if not state:
+            return False
+        if state.get('complete'):
+            return True
+        return bool(start_date and state.get('covered_from') and state['covered_from'] <= start_date)
+
+    @staticmethod
+    def publisher_match(publisher_id: str, username: Optional[str] = None) -> Dict:
+        """Every click attributed to a publisher, whichever ID field the source recorded."""
+        clauses = [{'publisher_id': publisher_id}, {'user_id': publisher_id}]
+        if username:
+            clauses.append({'username': username})
+        return {'$or': clauses}
+
+    # ------------------------------------------------------------------
+    # Backfill
+    # ------------------------------------------------------------------
+
+    def backfill(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                 resume: bool = False) -> Dict[str, int]:
+        """Copy raw clicks created in [start_date, end_date) into click_events.
+
+        Raw documents are walked in _id order (ObjectIds carry their creation
+        time, and every raw collection has them, unlike a common timestamp
+        field). With start_date=None the whole history is copied and the store
+        is marked complete. The last copied _id per collection is checkpointed
+        so an interrupted run can continue with resume=True.
+        """
+        end_date = end_date or datetime.utcnow()
+        self.ensure_indexes()
+        state = self.state_collection.find_one({'_id': 'coverage'}) or {}
+        checkpoints = state.get('checkpoints', {}) if resume else {}
+
+        written = {}
+        for collection_name in EVENT_SOURCES:
+            raw_col = db_instance.get_collection(collection_name)
+            if raw_col is None:
+                continue
+            id_range = {'$lt': ObjectId.from_datetime(end_date)}
+            if start_date:
+                id_range['$gte'] = ObjectId.from_datetime(start_date)
+            if checkpoints.get(collection_name):
+                id_range['$gt'] = checkpoints[collection_name]
+                id_range.pop('$gte', None)
+
+            count = 0
+            cursor = raw_col.find({'_id': id_range}).sort('_id', 1).batch_size(BACKFILL_BATCH_SIZE)
+            ops = []
+            last_id = None
+            for doc in cursor:
+                event = normalize_click(collection_name, doc)
+                ops.append(_event_op(event))
+                last_id = doc['_id']
+                if len(ops) >= BACKFILL_BATCH_SIZE:
+                    self.collection.bulk_write(ops, ordered=False)
+                    count += len(ops)
+                    ops = []
+                    self._checkpoint(collection_name, last_id)
+            if ops:
+                self.collection.bulk_write(ops, ordered=False)
+                count += len(ops)
+            if last_id is not None:
+                self._checkpoint(collection_name, last_id)
+            written[collection_name] = count
+            logger.info(f"Click events backfill: {collection_name} done ({count} events)")
+
+        update = {'backfilled_at': datetime.utcnow(), 'last_backfill_range': {'start': start_date, 'end': end_date}}
+        if start_date is None:
+            update['complete'] = True
+        else:
+            update['covered_from'] = min(filter(None, [state.get('covered_from'), start_date]))
+        self.state_collection.update_one({'_id': 'coverage'}, {'$set': update}, upsert=True)
+        return written
+
+    def _checkpoint(self, collection_name, last_id):
+        self.state_collection.update_one(
+            {'_id': 'coverage'},
+            {'$set': {f'checkpoints.{collection_name}': last_id}},
+            upsert=True
+        )
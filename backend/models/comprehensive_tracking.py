@@ -9,6 +9,8 @@ import json
 from typing import Dict, List, Optional, Tuple
 from bson import ObjectId
 import logging
+from models.report_rollups import record_click
+from models.click_events import record_click_event
 
 logger = logging.getLogger(__name__)
 
@@ -289,6 +291,8 @@ class ComprehensiveOfferwallTracker:
             }
             
             self.clicks_col.insert_one(click_doc)
+            record_click('offerwall_clicks_detailed', click_doc)
+            record_click_event('offerwall_clicks_detailed', click_doc)
             
             # Update last_click_date on the offer (rolling 30-day inactivity window)
             try:
@@ -3,13 +3,18 @@ Email Campaign Model
 Stores campaign batches and individual campaign emails for the Smart Email Campaign system.
 """
 
-from datetime import datetime
+import os
+import uuid
+from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Claims left in 'sending' longer than this (worker died mid-batch) are picked up again
+SENDING_STALE_MINUTES = int(os.environ.get('CAMPAIGN_SENDING_STALE_MINUTES', '30'))
+
 
 class EmailCampaign:
     """Model for managing email campaign batches"""
@@ -190,6 +195,18 @@ class EmailCampaign:
         docs = collection.find({'user_id': user_id}, {'offer_id': 1})
         return {d['offer_id'] for d in docs}
     
+    @classmethod
+    def get_sent_offer_ids_for_users(cls, user_ids: list) -> dict:
+        """Get previously sent offer IDs for many users in one query: {user_id: set(offer_ids)}"""
+        result = {uid: set() for uid in user_ids}
+        collection = cls.get_sends_collection()
+        if collection is None or not user_ids:
+            return result
+        
+        for d in collection.find({'user_id': {'$in': list(user_ids)}}, {'user_id': 1, 'offer_id': 1}):
+            result.setdefault(d['user_id'], set()).add(d['offer_id'])
+        return result
+    
     @classmethod
     def get_campaign(cls, campaign_id: str) -> dict:
         """Get a campaign by ID"""
@@ -255,36 +272,44 @@ class EmailCampaign:
     
     @classmethod
     def get_due_emails(cls, limit: int = 50) -> list:
-        """Get emails that are due to be sent. Uses atomic find_and_modify to prevent duplicates."""
+        """Claim emails that are due to be sent, plus stale 'sending' claims.
+
+        Candidates are claimed in one update_many guarded by the same filter, so a
+        row claimed concurrently by another worker is not claimed twice.
+        """
         collection = cls.get_emails_collection()
         if collection is None:
             return []
         
-        from pymongo import ReturnDocument
         now = datetime.utcnow()
-        claimed = []
-        
-        # Atomically claim emails one by one to prevent race conditions
-        for _ in range(limit):
-            doc = collection.find_one_and_update(
+        claimable = {
+            '$or': [
                 {
                     'status': {'$in': [cls.EMAIL_PENDING, cls.EMAIL_READY]},
                     'scheduled_at': {'$lte': now}
                 },
                 {
-                    '$set': {
-                        'status': cls.EMAIL_SENDING,
-                        'updated_at': now
-                    }
-                },
-                sort=[('scheduled_at', 1)],
-                return_document=ReturnDocument.AFTER
-            )
-            if doc is None:
-                break
-            claimed.append(doc)
+                    'status': cls.EMAIL_SENDING,
+                    'updated_at': {'$lt': now - timedelta(minutes=SENDING_STALE_MINUTES)}
+                }
+            ]
+        }
+        ids = [doc['_id'] for doc in collection.find(claimable, {'_id': 1}).sort('scheduled_at', 1).limit(limit)]
+        if not ids:
+            return []
         
-        return claimed
+        claim_id = uuid.uuid4().hex
+        collection.update_many(
+            {'_id': {'$in': ids}, **claimable},
+            {
+                '$set': {
+                    'status': cls.EMAIL_SENDING,
+                    'updated_at': now,
+                    'claim_id': claim_id
+                }
+            }
+        )
+        return list(collection.find({'claim_id': claim_id}).sort('scheduled_at', 1))
     
     @classmethod
     def update_email_status(cls, email_id, status: str, extra: dict = None):
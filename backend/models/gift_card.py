@@ -6,6 +6,7 @@ Handles creation, assignment, email sending, and redemption of gift cards
 from datetime import datetime
 from bson import ObjectId
 from database import db_instance
+from models.balance_ledger import record_balance_change
 import logging
 import secrets
 import string
@@ -363,6 +364,7 @@ class GiftCard:
             }
             
             result = self.redemptions_collection.insert_one(redemption_doc)
+            record_balance_change('gift_card_redemptions', redemption_doc)
             redemption_doc['_id'] = str(result.inserted_id)
             
             # Update gift card
@@ -159,9 +159,11 @@ class LinkMasking:
         except Exception as e:
             return [], 0
     
-    def get_masked_link_by_code(self, short_code, domain_name):
-        """Get masked link by short code and domain"""
+    def get_masked_link_by_code(self, short_code, domain_name, raise_errors=False):
+        """Get masked link by short code and domain (raise_errors: raise instead of returning None on DB errors)"""
         if not self._check_db_connection():
+            if raise_errors:
+                raise ConnectionError("Database connection not available")
             return None
         
         try:
@@ -171,7 +173,9 @@ class LinkMasking:
                 'is_active': True,
                 'status': 'active'
             })
-        except:
+        except Exception:
+            if raise_errors:
+                raise
             return None
     
     def update_masked_link(self, link_id, update_data, updated_by):
@@ -7,6 +7,11 @@ Match Key = Name + Country + Platform (iOS/Android/Web) + Payout Model
 from datetime import datetime
 from bson import ObjectId
 from database import db_instance
+from utils.cache import get_cache
+
+# Facet lists and stats for the admin filters, computed with one $facet
+# aggregation and dropped (in every worker) on each write through this model
+_facets_cache = get_cache('missing_offer_facets', ttl=300, max_size=1)
 
 
 class MissingOffer:
@@ -63,6 +68,7 @@ class MissingOffer:
                     '$inc': {'seen_count': 1}
                 }
             )
+            cls._invalidate_facets()
             existing['_id'] = str(existing['_id'])
             return existing
         
@@ -122,7 +128,46 @@ class MissingOffer:
         
         result = collection.insert_one(missing_offer)
         missing_offer['_id'] = result.inserted_id
+        cls._invalidate_facets()
         return missing_offer
+
+    @classmethod
+    def _invalidate_facets(cls):
+        _facets_cache.invalidate()
+
+    @classmethod
+    def _get_facets(cls) -> dict:
+        """
+        Distinct filter values and per-field counts for the whole collection,
+        from a single $facet aggregation (cached until the next write).
+        """
+        def load():
+            collection = cls.get_collection()
+            if collection is None:
+                return None
+
+            def group(field):
+                return [{'$group': {'_id': f'${field}', 'count': {'$sum': 1}}}]
+
+            result = next(collection.aggregate([{'$facet': {
+                'total': [{'$count': 'count'}],
+                'status': group('status'),
+                'platform': group('platform'),
+                'payout_model': group('payout_model'),
+                'network': group('network'),
+                'country': group('country'),
+            }}]), {})
+
+            facets = {'total': (result.get('total') or [{}])[0].get('count', 0)}
+            for field in ('status', 'platform', 'payout_model', 'network', 'country'):
+                facets[field] = [(doc['_id'], doc['count']) for doc in result.get(field, [])]
+            return facets
+
+        return _facets_cache.get_or_load('all', load) or {}
+
+    @classmethod
+    def _facet_values(cls, field: str) -> list:
+        return sorted((value for value, _ in cls._get_facets().get(field, []) if value is not None), key=str)
     
     @classmethod
     def get_all(cls, status: str = None, network: str = None, platform: str = None,
@@ -174,64 +219,22 @@ class MissingOffer:
         """
         Get statistics about missing offers (inventory gaps).
         """
-        collection = cls.get_collection()
-        if collection is None:
+        facets = cls._get_facets()
+        if not facets:
             return {}
-        
-        # Total counts by status (filter out None)
-        pipeline = [
-            {'$match': {'status': {'$ne': None}}},
-            {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
-        ]
-        status_counts = {}
-        for doc in collection.aggregate(pipeline):
-            if doc['_id'] is not None:
-                status_counts[doc['_id']] = doc['count']
-        
-        # Counts by platform (filter out None)
-        pipeline = [
-            {'$match': {'platform': {'$ne': None}}},
-            {'$group': {'_id': '$platform', 'count': {'$sum': 1}}}
-        ]
-        platform_counts = {}
-        for doc in collection.aggregate(pipeline):
-            if doc['_id'] is not None:
-                platform_counts[doc['_id']] = doc['count']
-        
-        # Counts by payout model (filter out None)
-        pipeline = [
-            {'$match': {'payout_model': {'$ne': None}}},
-            {'$group': {'_id': '$payout_model', 'count': {'$sum': 1}}}
-        ]
-        payout_model_counts = {}
-        for doc in collection.aggregate(pipeline):
-            if doc['_id'] is not None:
-                payout_model_counts[doc['_id']] = doc['count']
-        
-        # Counts by network (filter out None and empty)
-        pipeline = [
-            {'$match': {'network': {'$nin': [None, '']}}},
-            {'$group': {'_id': '$network', 'count': {'$sum': 1}}}
-        ]
-        network_counts = {}
-        for doc in collection.aggregate(pipeline):
-            if doc['_id'] is not None and doc['_id'] != '':
-                network_counts[doc['_id']] = doc['count']
-        
+
+        def counts(field, skip=(None,)):
+            return {value: count for value, count in facets.get(field, []) if value not in skip}
+
+        status_counts = counts('status')
+        platform_counts = counts('platform')
+        payout_model_counts = counts('payout_model')
+        network_counts = counts('network', skip=(None, ''))
         # Top countries (filter out None)
-        pipeline = [
-            {'$match': {'country': {'$ne': None}}},
-            {'$group': {'_id': '$country', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}},
-            {'$limit': 10}
-        ]
-        top_countries = {}
-        for doc in collection.aggregate(pipeline):
-            if doc['_id'] is not None:
-                top_countries[doc['_id']] = doc['count']
+        top_countries = dict(sorted(counts('country').items(), key=lambda kv: kv[1], reverse=True)[:10])
         
         return {
-            'total': collection.count_documents({}),
+            'total': facets.get('total', 0),
             'by_status': status_counts,
             'by_platform': platform_counts,
             'by_payout_model': payout_model_counts,
@@ -266,6 +269,8 @@ class MissingOffer:
             {'_id': ObjectId(offer_id)},
             {'$set': update_data}
         )
+        if result.modified_count:
+            cls._invalidate_facets()
         return result.modified_count > 0
     
     @classmethod
@@ -292,6 +297,8 @@ class MissingOffer:
             {'_id': {'$in': object_ids}},
             {'$set': update_data}
         )
+        if result.modified_count:
+            cls._invalidate_facets()
         return result.modified_count
     
     @classmethod
@@ -326,6 +333,8 @@ class MissingOffer:
             return False
         
         result = collection.delete_one({'_id': ObjectId(offer_id)})
+        if result.deleted_count:
+            cls._invalidate_facets()
         return result.deleted_count > 0
     
     @classmethod
@@ -347,44 +356,28 @@ class MissingOffer:
         """
         Get list of unique networks with missing offers.
         """
-        collection = cls.get_collection()
-        if collection is None:
-            return []
-        
-        return collection.distinct('network', {'network': {'$ne': None}})
+        return cls._facet_values('network')
     
     @classmethod
     def get_platforms(cls) -> list:
         """
         Get list of unique platforms.
         """
-        collection = cls.get_collection()
-        if collection is None:
-            return []
-        
-        return collection.distinct('platform')
+        return cls._facet_values('platform')
     
     @classmethod
     def get_payout_models(cls) -> list:
         """
         Get list of unique payout models.
         """
-        collection = cls.get_collection()
-        if collection is None:
-            return []
-        
-        return collection.distinct('payout_model')
+        return cls._facet_values('payout_model')
     
     @classmethod
     def get_countries(cls) -> list:
         """
         Get list of unique countries.
         """
-        collection = cls.get_collection()
-        if collection is None:
-            return []
-        
-        return collection.distinct('country')
+        return cls._facet_values('country')
     
     @classmethod
     def auto_resolve_if_in_inventory(cls) -> dict:
@@ -437,6 +430,9 @@ class MissingOffer:
                     'existing_offer_id': existing_offer.get('offer_id')
                 })
         
+        if resolved_count:
+            cls._invalidate_facets()
+
         return {
             'resolved_count': resolved_count,
             'resolved_offers': resolved_offers
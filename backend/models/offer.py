@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from bson import ObjectId
 from database import db_instance
+from services.cache_invalidation_bus import invalidate_offer_caches
 import re
 import sys
 import os
@@ -164,125 +166,122 @@ LEGACY_CATEGORY_MAP = {
 DEFAULT_NON_ACCESS_URL = 'https://example.com/not-available'
 
 
-def detect_categories_from_text(name, description=''):
-    """
-    Auto-detect up to 3 categories from offer name and description.
-    First checks the name for keyword matches, then falls back to description.
-    
-    Args:
-        name: Offer name/title
-        description: Offer description
-        
-    Returns:
-        List of up to 3 detected category strings (from VALID_CATEGORIES)
-    """
+# Explicit "Campaign Type: ..." values in descriptions -> category (checked in this order)
+CAMPAIGN_TYPE_MAPPING = {
+    'entertainment': 'SWEEPSTAKES', 'food delivery': 'INSTALLS', 'food': 'INSTALLS',
+    'ecommerce': 'INSTALLS', 'e-commerce': 'INSTALLS', 'shopping': 'INSTALLS',
+    'travel': 'INSTALLS', 'lifestyle': 'SWEEPSTAKES', 'utilities': 'INSTALLS',
+    'finance': 'FINANCE', 'banking': 'FINANCE', 'investment': 'FINANCE', 'crypto': 'FINANCE',
+    'loan': 'LOAN', 'lending': 'LOAN', 'credit': 'LOAN',
+    'insurance': 'INSURANCE', 'health': 'HEALTH', 'healthcare': 'HEALTH',
+    'medical': 'HEALTH', 'fitness': 'HEALTH',
+    'dating': 'DATING', 'romance': 'DATING',
+    'survey': 'SURVEY', 'surveys': 'SURVEY',
+    'sweepstakes': 'SWEEPSTAKES', 'giveaway': 'SWEEPSTAKES', 'contest': 'SWEEPSTAKES',
+    'education': 'EDUCATION', 'learning': 'EDUCATION',
+    'gaming': 'GAMES_INSTALL', 'games': 'GAMES_INSTALL', 'game': 'GAMES_INSTALL',
+    'app install': 'INSTALLS', 'mobile app': 'INSTALLS',
+    'free trial': 'FREE_TRIAL', 'trial': 'FREE_TRIAL',
+}
+
+# Priority order in which keyword categories are checked
+CATEGORY_DETECTION_ORDER = ['SWEEPSTAKES', 'GAMES_INSTALL', 'HEALTH', 'SURVEY', 'EDUCATION', 'INSURANCE', 'LOAN',
+                            'FINANCE', 'INSTALLS', 'FREE_TRIAL', 'DATING']
+
+# Broader description tags used when no keyword matched at all
+CATEGORY_TAG_FALLBACKS = {
+    'GAMES_INSTALL': ['mobilegame', 'multireward', 'casino', 'slots', 'puzzle', 'solitaire', 'arcade', 'rpg'],
+    'FINANCE': ['creditcard', 'cashback', 'payment', 'fintech', 'banking', 'crypto', 'wallet'],
+    'INSTALLS': ['app', 'ecommerce', 'shopping', 'delivery', 'food', 'streaming',
+                 'entertainment', 'music', 'video', 'social', 'utility', 'lifestyle',
+                 'travel', 'navigation', 'weather', 'news', 'photo', 'camera'],
+    'SWEEPSTAKES': ['reward', 'rewards', 'prize', 'giveaway', 'lucky'],
+    'HEALTH': ['fitness', 'wellness', 'nutrition', 'workout', 'beauty', 'skincare'],
+    'EDUCATION': ['learning', 'language', 'course', 'tutorial'],
+    'SURVEY': ['opinion', 'feedback', 'questionnaire', 'poll'],
+}
+
+CAMPAIGN_TYPE_RE = re.compile(r'campaign\s*type[:\s]+([a-zA-Z\s\-]+?)(?:\.|,|\n|$)')
+_KEYWORD_SEPARATORS = str.maketrans({'_': ' ', ',': ' ', '-': ' '})
+
+
+def _compile_category_matcher(keywords):
+    """One regex per category: single words match as whole words (plus s/ing/er/ed),
+    multi-word phrases match as plain substrings of the separator-normalized text."""
+    words = [re.escape(kw.lower()) for kw in keywords if ' ' not in kw]
+    phrases = [re.escape(kw.lower()) for kw in keywords if ' ' in kw]
+    alternatives = []
+    if words:
+        alternatives.append(r'\b(?:' + '|'.join(words) + r')(?:s|ing|er|ed)?\b')
+    alternatives.extend(phrases)
+    return re.compile('|'.join(alternatives)) if alternatives else None
+
+
+CATEGORY_MATCHERS = {category: _compile_category_matcher(keywords) for category, keywords in CATEGORY_KEYWORDS.items()}
+
+
+@lru_cache(maxsize=8192)
+def _detect_categories(name_lower, desc_lower):
     MAX_CATEGORIES = 3
     found = []
     
-    name_lower = (name or '').lower()
-    desc_lower = (description or '').lower()
-    
-    def _has_keyword(text, keyword):
-        """Check if keyword exists as a whole word/phrase in text.
-        Treats underscores, commas, hyphens as word separators (not just whitespace).
-        """
-        # Normalize separators: replace _ , - with spaces for matching
-        normalized = text.replace('_', ' ').replace(',', ' ').replace('-', ' ')
-        # For multi-word phrases, use simple substring on normalized text
-        if ' ' in keyword:
-            return keyword in normalized
-        # For single words, use word boundary regex on normalized text
-        pattern = r'\b' + re.escape(keyword) + r'(?:s|ing|er|ed)?\b'
-        return bool(re.search(pattern, normalized))
-    
     # ==================== EXPLICIT CAMPAIGN TYPE DETECTION ====================
-    campaign_type_match = re.search(r'campaign\s*type[:\s]+([a-zA-Z\s\-]+?)(?:\.|,|\n|$)', desc_lower)
+    campaign_type_match = CAMPAIGN_TYPE_RE.search(desc_lower)
     if campaign_type_match:
         campaign_type = campaign_type_match.group(1).strip()
-        campaign_type_mapping = {
-            'entertainment': 'SWEEPSTAKES', 'food delivery': 'INSTALLS', 'food': 'INSTALLS',
-            'ecommerce': 'INSTALLS', 'e-commerce': 'INSTALLS', 'shopping': 'INSTALLS',
-            'travel': 'INSTALLS', 'lifestyle': 'SWEEPSTAKES', 'utilities': 'INSTALLS',
-            'finance': 'FINANCE', 'banking': 'FINANCE', 'investment': 'FINANCE', 'crypto': 'FINANCE',
-            'loan': 'LOAN', 'lending': 'LOAN', 'credit': 'LOAN',
-            'insurance': 'INSURANCE', 'health': 'HEALTH', 'healthcare': 'HEALTH',
-            'medical': 'HEALTH', 'fitness': 'HEALTH',
-            'dating': 'DATING', 'romance': 'DATING',
-            'survey': 'SURVEY', 'surveys': 'SURVEY',
-            'sweepstakes': 'SWEEPSTAKES', 'giveaway': 'SWEEPSTAKES', 'contest': 'SWEEPSTAKES',
-            'education': 'EDUCATION', 'learning': 'EDUCATION',
-            'gaming': 'GAMES_INSTALL', 'games': 'GAMES_INSTALL', 'game': 'GAMES_INSTALL',
-            'app install': 'INSTALLS', 'mobile app': 'INSTALLS',
-            'free trial': 'FREE_TRIAL', 'trial': 'FREE_TRIAL',
-        }
-        for key, category in campaign_type_mapping.items():
+        for key, category in CAMPAIGN_TYPE_MAPPING.items():
             if key in campaign_type and category not in found:
                 found.append(category)
                 if len(found) >= MAX_CATEGORIES:
-                    return found
-    
-    # ==================== PASS 1: Check NAME for keyword matches ====================
-    all_categories_order = ['SWEEPSTAKES', 'GAMES_INSTALL', 'HEALTH', 'SURVEY', 'EDUCATION', 'INSURANCE', 'LOAN',
-                            'FINANCE', 'INSTALLS', 'FREE_TRIAL', 'DATING']
+                    return tuple(found)
     
-    for category in all_categories_order:
+    # ==================== PASS 1 / PASS 2: keyword matches in NAME, then DESCRIPTION ====================
+    # Underscores, commas and hyphens count as word separators
+    for text in (name_lower, desc_lower):
         if len(found) >= MAX_CATEGORIES:
             break
-        if category in found:
-            continue
-        keywords = CATEGORY_KEYWORDS.get(category, [])
-        for keyword in keywords:
-            if _has_keyword(name_lower, keyword.lower()):
-                found.append(category)
-                break
-    
-    # ==================== PASS 2: Check DESCRIPTION for additional matches ====================
-    if len(found) < MAX_CATEGORIES:
-        for category in all_categories_order:
+        normalized = text.translate(_KEYWORD_SEPARATORS)
+        for category in CATEGORY_DETECTION_ORDER:
             if len(found) >= MAX_CATEGORIES:
                 break
             if category in found:
                 continue
-            keywords = CATEGORY_KEYWORDS.get(category, [])
-            for keyword in keywords:
-                if _has_keyword(desc_lower, keyword.lower()):
-                    found.append(category)
-                    break
+            matcher = CATEGORY_MATCHERS.get(category)
+            if matcher is not None and matcher.search(normalized):
+                found.append(category)
     
     # ==================== PASS 3: Smart fallback for offers that would be OTHER ====================
     # If no verticals found yet, try broader tag-based matching on the full combined text
     if not found:
-        combined = name_lower + ' ' + desc_lower
-        normalized = combined.replace('_', ' ').replace(',', ' ').replace('-', ' ')
-        
-        # Map common description tags to verticals
-        tag_mappings = {
-            'GAMES_INSTALL': ['mobilegame', 'multireward', 'casino', 'slots', 'puzzle', 'solitaire', 'arcade', 'rpg'],
-            'FINANCE': ['creditcard', 'cashback', 'payment', 'fintech', 'banking', 'crypto', 'wallet'],
-            'INSTALLS': ['app', 'ecommerce', 'shopping', 'delivery', 'food', 'streaming', 
-                         'entertainment', 'music', 'video', 'social', 'utility', 'lifestyle',
-                         'travel', 'navigation', 'weather', 'news', 'photo', 'camera'],
-            'SWEEPSTAKES': ['reward', 'rewards', 'prize', 'giveaway', 'lucky'],
-            'HEALTH': ['fitness', 'wellness', 'nutrition', 'workout', 'beauty', 'skincare'],
-            'EDUCATION': ['learning', 'language', 'course', 'tutorial'],
-            'SURVEY': ['opinion', 'feedback', 'questionnaire', 'poll'],
-        }
-        
-        for category, tags in tag_mappings.items():
+        words = set((name_lower + ' ' + desc_lower).translate(_KEYWORD_SEPARATORS).split())
+        for category, tags in CATEGORY_TAG_FALLBACKS.items():
             if len(found) >= MAX_CATEGORIES:
                 break
-            if category in found:
-                continue
-            for tag in tags:
-                if tag in normalized.split():
-                    found.append(category)
-                    break
+            if any(tag in words for tag in tags):
+                found.append(category)
     
     # If still nothing found, return INSTALLS as default (most offers are app-based)
     if not found:
-        return ['INSTALLS']
+        return ('INSTALLS',)
     
-    return found
+    return tuple(found)
+
+
+def detect_categories_from_text(name, description=''):
+    """
+    Auto-detect up to 3 categories from offer name and description.
+    First checks the name for keyword matches, then falls back to description.
+    Keyword sets are precompiled per category and results are memoized, since
+    bulk imports repeat the same names and descriptions many times.
+    
+    Args:
+        name: Offer name/title
+        description: Offer description
+        
+    Returns:
+        List of up to 3 detected category strings (from VALID_CATEGORIES)
+    """
+    return list(_detect_categories((name or '').lower(), (description or '').lower()))
 
 
 def detect_category_from_text(name, description=''):
@@ -488,11 +487,61 @@ class Offer:
             'traffic_source_overrides': overrides  # Store overrides for reference
         }
     
+    def allocate_offer_ids(self, count):
+        """Reserve `count` consecutive ML-XXXXX ids with a single counter update"""
+        if count <= 0:
+            return []
+        if not self._check_db_connection():
+            return [f"ML-{n:05d}" for n in range(1, count + 1)]  # Fallback for testing
+        
+        try:
+            result = self.counter_collection.find_one_and_update(
+                {'_id': 'offer_counter'},
+                {'$inc': {'sequence_value': count}},
+                upsert=True,
+                return_document=True
+            )
+            last = result['sequence_value']
+        except Exception:
+            # Fallback: continue from the highest existing ID
+            last_offer = self.collection.find_one(
+                {'offer_id': {'$regex': '^ML-'}},
+                sort=[('offer_id', -1)]
+            )
+            start = int(last_offer['offer_id'].split('-')[1]) if last_offer else 0
+            last = start + count
+        
+        return [f"ML-{n:05d}" for n in range(last - count + 1, last + 1)]
+    
     def create_offer(self, offer_data, created_by):
         """Create a new offer with frontend field mapping support"""
         if not self._check_db_connection():
             return None, "Database connection not available"
         
+        offer_doc, error = self.build_offer_document(offer_data, created_by)
+        if error:
+            return None, error
+        
+        try:
+            # Generate unique offer ID
+            offer_doc['offer_id'] = self._get_next_offer_id()
+            
+            # Insert offer
+            result = self.collection.insert_one(offer_doc)
+            offer_doc['_id'] = str(result.inserted_id)
+            
+            return offer_doc, None
+            
+        except Exception as e:
+            return None, f"Error creating offer: {str(e)}"
+    
+    def build_offer_document(self, offer_data, created_by, verbose=True):
+        """
+        Validate offer_data and build the offer document create_offer inserts,
+        without touching the database. offer_id is left None for the caller to
+        assign (create_offer takes the next counter value, bulk imports use
+        allocate_offer_ids). Returns (offer_doc, error).
+        """
         try:
             # Validate frontend data first
             is_valid, validation_errors = validate_frontend_data(offer_data)
@@ -502,8 +551,7 @@ class Offer:
             # Map frontend fields to database schema
             mapped_data = frontend_to_database(offer_data)
             
-            # Generate unique offer ID
-            offer_id = self._get_next_offer_id()
+            offer_id = None
             
             # Validate required fields
             # Note: payout can be 0 for revenue share offers, so check for None/missing explicitly
@@ -550,7 +598,8 @@ class Offer:
                 detected_categories = detect_categories_from_text(offer_name, offer_description)
                 vertical_value = detected_categories[0]  # Primary category
                 categories_list = detected_categories
-                print(f"🔍 AUTO-DETECTED CATEGORIES: {categories_list} from name='{offer_name[:50]}...'")
+                if verbose:
+                    print(f"🔍 AUTO-DETECTED CATEGORIES: {categories_list} from name='{offer_name[:50]}...'")
             else:
                 is_valid_vertical, vertical_result = validate_vertical(vertical_input)
                 if not is_valid_vertical:
@@ -578,17 +627,17 @@ class Offer:
             # Get payout_type and auto-calculate incentive type
             payout_type = offer_data.get('payout_type', 'fixed')
             
-            # DEBUG: Print what we're receiving (visible immediately)
-            print("="*80)
-            print("🔍 INCENTIVE DEBUG:")
-            print(f"   payout_type received: '{payout_type}'")
-            print(f"   revenue_share_percent: {revenue_share_percent}")
-            
             incentive_type = calculate_incentive_type(payout_type, revenue_share_percent)
             
-            print(f"   calculated incentive_type: '{incentive_type}'")
-            print(f"   (percentage → Non-Incent, fixed/tiered → Incent)")
-            print("="*80)
+            if verbose:
+                # DEBUG: Print what we're receiving (visible immediately)
+                print("="*80)
+                print("🔍 INCENTIVE DEBUG:")
+                print(f"   payout_type received: '{payout_type}'")
+                print(f"   revenue_share_percent: {revenue_share_percent}")
+                print(f"   calculated incentive_type: '{incentive_type}'")
+                print(f"   (percentage → Non-Incent, fixed/tiered → Incent)")
+                print("="*80)
             
             # Process allowed countries for geo-restriction
             allowed_countries = offer_data.get('allowed_countries', [])
@@ -768,48 +817,50 @@ class Offer:
                 'is_active': True
             }
             
-            # Insert offer
-            result = self.collection.insert_one(offer_doc)
-            offer_doc['_id'] = str(result.inserted_id)
-            
             return offer_doc, None
             
         except Exception as e:
             return None, f"Error creating offer: {str(e)}"
     
+    def _build_offers_query(self, filters=None):
+        """Admin offer list query: non-deleted offers matching status/network/search filters"""
+        # Exclude deleted offers by default
+        query = {
+            '$or': [{'deleted': {'$exists': False}}, {'deleted': False}]
+        }
+        
+        if filters:
+            if filters.get('status'):
+                query['status'] = filters['status']
+            if filters.get('network'):
+                query['network'] = {'$regex': filters['network'], '$options': 'i'}
+            if filters.get('search'):
+                search_regex = {'$regex': filters['search'], '$options': 'i'}
+                query = {
+                    '$and': [
+                        {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]},
+                        {'$or': [
+                            {'name': search_regex},
+                            {'campaign_id': search_regex},
+                            {'offer_id': search_regex},
+                            {'categories': search_regex}
+                        ]}
+                    ]
+                }
+                if filters.get('status'):
+                    query['$and'].append({'status': filters['status']})
+                if filters.get('network'):
+                    query['$and'].append({'network': {'$regex': filters['network'], '$options': 'i'}})
+        
+        return query
+    
     def get_offers(self, filters=None, skip=0, limit=20):
         """Get offers with filtering and pagination"""
         if not self._check_db_connection():
             return [], 0
         
         try:
-            # Exclude deleted offers by default
-            query = {
-                '$or': [{'deleted': {'$exists': False}}, {'deleted': False}]
-            }
-            
-            if filters:
-                if filters.get('status'):
-                    query['status'] = filters['status']
-                if filters.get('network'):
-                    query['network'] = {'$regex': filters['network'], '$options': 'i'}
-                if filters.get('search'):
-                    search_regex = {'$regex': filters['search'], '$options': 'i'}
-                    query = {
-                        '$and': [
-                            {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]},
-                            {'$or': [
-                                {'name': search_regex},
-                                {'campaign_id': search_regex},
-                                {'offer_id': search_regex},
-                                {'categories': search_regex}
-                            ]}
-                        ]
-                    }
-                    if filters.get('status'):
-                        query['$and'].append({'status': filters['status']})
-                    if filters.get('network'):
-                        query['$and'].append({'network': {'$regex': filters['network'], '$options': 'i'}})
+            query = self._build_offers_query(filters)
             
             # Get total count (with timeout to prevent hanging)
             try:
@@ -828,6 +879,30 @@ class Offer:
         except Exception as e:
             return [], 0
     
+    def count_offers(self, filters=None):
+        """Count offers matching the admin list filters"""
+        if not self._check_db_connection():
+            return 0
+        query = self._build_offers_query(filters)
+        try:
+            return self.collection.count_documents(query, maxTimeMS=10000)
+        except Exception:
+            return self.collection.estimated_document_count()
+    
+    def iter_offers(self, filters=None, skip=0, limit=0, batch_size=1000):
+        """Iterate offers in list order from a batched cursor (limit=0 means no limit)"""
+        if not self._check_db_connection():
+            return
+        cursor = (self.collection.find(self._build_offers_query(filters))
+                  .sort([('is_pinned', -1), ('pinned_at', -1), ('created_at', -1)])
+                  .skip(skip)
+                  .limit(limit)
+                  .batch_size(batch_size))
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+    
     def clone_offer(self, offer_id, created_by):
         """Clone an existing offer"""
         if not self._check_db_connection():
@@ -1010,6 +1085,8 @@ class Offer:
                 {'offer_id': offer_id, 'is_active': True},
                 {'$set': update_data}
             )
+            if result.modified_count > 0:
+                invalidate_offer_caches([offer_id])
             
             return result.modified_count > 0, None
             
@@ -1033,6 +1110,8 @@ class Offer:
                     }
                 }
             )
+            if result.modified_count > 0:
+                invalidate_offer_caches([offer_id])
             return result.modified_count > 0
         except:
             return False
@@ -1054,6 +1133,8 @@ class Offer:
                     }
                 }
             )
+            if result.modified_count > 0:
+                invalidate_offer_caches([offer_id])
             return result.modified_count > 0
         except:
             return False
@@ -1065,6 +1146,8 @@ class Offer:
         
         try:
             result = self.collection.delete_one({'offer_id': offer_id})
+            if result.deleted_count > 0:
+                invalidate_offer_caches([offer_id])
             return result.deleted_count > 0
         except:
             return False
@@ -1202,6 +1285,8 @@ class Offer:
                 {'offer_id': offer_id, 'is_active': True},
                 {'$set': update_data}
             )
+            if result.modified_count > 0:
+                invalidate_offer_caches([offer_id])
             
             return result.modified_count > 0, None
             
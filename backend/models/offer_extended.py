@@ -6,6 +6,7 @@ Integrates with existing MongoDB structure and adds new subdocuments
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
+from services.cache_invalidation_bus import invalidate_offer_caches
 import re
 import sys
 import os
@@ -772,6 +773,7 @@ class OfferExtended:
             )
             
             if result.modified_count > 0:
+                invalidate_offer_caches([offer_id])
                 return True, None
             else:
                 return False, "No changes were made to the offer"
@@ -3,6 +3,8 @@ import datetime
 from typing import Dict, List, Optional, Tuple, Any
 from pymongo import MongoClient
 import logging
+from models.report_rollups import record_click
+from models.click_events import record_click_event
 
 logger = logging.getLogger(__name__)
 
@@ -192,6 +194,8 @@ class OfferwallTracking:
             }
             
             self.clicks_col.insert_one(click_doc)
+            record_click('offerwall_clicks', click_doc)
+            record_click_event('offerwall_clicks', click_doc)
             
             # Update last_click_date on the offer (rolling 30-day inactivity window)
             try:
@@ -6,6 +6,7 @@ Handles creation, validation, and management of promotional codes
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
+from models.balance_ledger import record_balance_change
 import re
 import logging
 
@@ -424,6 +425,7 @@ class PromoCode:
             }
             
             result = self.bonus_earnings_collection.insert_one(bonus_earning_doc)
+            record_balance_change('bonus_earnings', bonus_earning_doc)
             bonus_earning_doc['_id'] = str(result.inserted_id)
             
             # Update user promo code stats
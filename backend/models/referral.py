@@ -6,6 +6,7 @@ Handles referral links, P1 (Balance Booster), P2 (Commission Share), and fraud l
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
+from models.balance_ledger import record_balance_change, record_balance_changes
 import logging
 import secrets
 import string
@@ -139,6 +140,7 @@ class Referral:
                 'bonus_released_at': None
             }
             result = self.referrals_p1.insert_one(doc)
+            record_balance_change('referrals_p1', doc)
             doc['_id'] = str(result.inserted_id)
             return doc, None
         except Exception as e:
@@ -198,6 +200,7 @@ class Referral:
                     'updated_at': datetime.utcnow()
                 }}
             )
+            record_balance_changes('referrals_p1', {'_id': ObjectId(referral_id)})
             return True, None
         except Exception as e:
             logger.error(f"Error releasing P1 bonus: {e}")
@@ -210,6 +213,7 @@ class Referral:
                 {'_id': ObjectId(referral_id)},
                 {'$set': {'status': 'rejected', 'updated_at': datetime.utcnow()}}
             )
+            record_balance_changes('referrals_p1', {'_id': ObjectId(referral_id)})
             return True, None
         except Exception as e:
             return False, str(e)
@@ -221,6 +225,7 @@ class Referral:
                 {'_id': ObjectId(referral_id)},
                 {'$set': {'status': 'pending_review', 'updated_at': datetime.utcnow()}}
             )
+            record_balance_changes('referrals_p1', {'_id': ObjectId(referral_id)})
             return True, None
         except Exception as e:
             return False, str(e)
@@ -284,6 +289,7 @@ class Referral:
                 'positive_quality_months': 0
             }
             result = self.referrals_p2.insert_one(doc)
+            record_balance_change('referrals_p2', doc)
             doc['_id'] = str(result.inserted_id)
             return doc, None
         except Exception as e:
@@ -335,6 +341,7 @@ class Referral:
                 {'_id': p2_record['_id']},
                 {'$set': update_fields}
             )
+            record_balance_change('referrals_p2', {**p2_record, **update_fields})
 
             # If commission earned, add to referrer's pending commission
             if commission > 0:
@@ -0,0 +1,407 @@
+"""
+Report Rollups Model
+Hourly pre-aggregated click/conversion counters used by the performance reports.
+
+One document per (hour, source, publisher_id, placement_id, offer_id, country,
+device_type, sub_id1) in the report_rollups_hourly collection, holding:
+    clicks, unique_clicks, suspicious_clicks, rejected_clicks,
+    conversions, payout, revenue
+
+Ingestion paths call record_click() / record_conversion(); increments are
+buffered in memory and flushed with one bulk_write every few seconds.
+rebuild() recomputes a date range from the raw collections
+(see migrations/rebuild_report_rollups.py).
+
+Coverage: the writer records the hour it started in (live_since), so rollups
+are complete from the next full hour on. A rebuild extends coverage back only
+when its range reaches the already covered period, so a gap between the two is
+never reported as covered.
+
+Scope: the advertiser and offerwall-analytics dashboards are not served from
+rollups. They read impressions, sessions, the conversions and
+offerwall_conversions collections and per-user fraud counts, none of which
+are rollup metrics.
+"""
+
+from datetime import datetime, timedelta
+from database import db_instance
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = 'report_rollups_hourly'
+STATE_COLLECTION = 'report_rollup_state'
+
+DIMENSIONS = ('source', 'publisher_id', 'placement_id', 'offer_id', 'country', 'device_type', 'sub_id1')
+METRICS = ('clicks', 'unique_clicks', 'suspicious_clicks', 'rejected_clicks', 'conversions', 'payout', 'revenue')
+
+# Report group_by fields that can be answered from rollups
+GROUPABLE_FIELDS = {'date', 'offer_id', 'country', 'device_type', 'publisher_id', 'placement_id', 'sub_id1'}
+# (no 'status': rollup buckets are not split by status, so status-filtered reports read raw events)
+FILTERABLE_FIELDS = {'offer_id', 'country', 'device_type', 'publisher_id', 'sub_id1', 'source', 'granularity'}
+
+# Raw collection -> rollup source tag. 'offerwall' sources are the ones the
+# reports scope by placement; the others are scoped by the publisher's user_id.
+CLICK_SOURCES = {
+    'offerwall_clicks_detailed': 'offerwall_detailed',
+    'offerwall_clicks': 'offerwall',
+    'clicks': 'tracking',
+    'dashboard_clicks': 'dashboard',
+}
+OFFERWALL_SOURCES = ['offerwall_detailed', 'offerwall']
+CONVERSION_SOURCE = 'postback'
+
+
+def _hour(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _str_or_empty(value):
+    return str(value) if value not in (None, '') else ''
+
+
+def _click_dimensions(source, doc):
+    """Normalize a raw click document from any click collection into rollup dimensions."""
+    geo = doc.get('geo') if isinstance(doc.get('geo'), dict) else {}
+    device = doc.get('device') if isinstance(doc.get('device'), dict) else {}
+
+    if source in ('tracking', 'dashboard'):
+        publisher_id = doc.get('user_id')
+    else:
+        publisher_id = doc.get('publisher_id')
+
+    return {
+        'source': source,
+        'publisher_id': _str_or_empty(publisher_id),
+        'placement_id': _str_or_empty(doc.get('placement_id')),
+        'offer_id': _str_or_empty(doc.get('offer_id')),
+        'country': _str_or_empty(doc.get('country') or geo.get('country')),
+        'device_type': _str_or_empty(doc.get('device_type') or device.get('type')),
+        'sub_id1': _str_or_empty(doc.get('sub_id1')),
+    }
+
+
+def _click_metrics(source, doc):
+    fraud = doc.get('fraud_indicators') if isinstance(doc.get('fraud_indicators'), dict) else {}
+    if source == 'offerwall_detailed':
+        unique = 1 if doc.get('is_unique') else 0
+        suspicious = 1 if doc.get('is_suspicious') else 0
+        rejected = 1 if doc.get('is_rejected') else 0
+    else:
+        # Other sources flag repeats instead: offerwall is_duplicate, dashboard
+        # fraud_indicators.duplicate_click, tracking a 'duplicate_click' fraud signal
+        signals = doc.get('fraud_signals') if isinstance(doc.get('fraud_signals'), list) else []
+        duplicate = doc.get('is_duplicate') or fraud.get('duplicate_click') or 'duplicate_click' in signals
+        unique = 0 if duplicate else 1
+        suspicious = 1 if fraud.get('fraud_status') == 'suspicious' or doc.get('fraud_classification') == 'suspicious' else 0
+        rejected = 1 if doc.get('is_invalid') else 0
+    return {'clicks': 1, 'unique_clicks': unique, 'suspicious_clicks': suspicious, 'rejected_clicks': rejected}
+
+
+class RollupWriter:
+    """Buffers rollup increments in memory and flushes them with bulk_write."""
+
+    def __init__(self, flush_interval=5):
+        self.flush_interval = flush_interval
+        self._buffer = {}  # (hour, *dimensions) -> {metric: delta}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._indexes_ensured = False
+
+    def add(self, timestamp, dimensions, metrics):
+        key = (_hour(timestamp),) + tuple(dimensions[d] for d in DIMENSIONS)
+        with self._lock:
+            bucket = self._buffer.setdefault(key, {})
+            for metric, value in metrics.items():
+                if value:
+                    bucket[metric] = bucket.get(metric, 0) + value
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run_loop, daemon=True, name="ReportRollupWriter")
+            self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Report rollup flush failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return
+
+        collection = db_instance.get_collection(ROLLUP_COLLECTION)
+        if collection is None:
+            return
+        if not self._indexes_ensured:
+            rollups = ReportRollups()
+            rollups.ensure_indexes()
+            rollups.record_live_since(min(key[0] for key in buffer))
+            self._indexes_ensured = True
+
+        from pymongo import UpdateOne
+        ops = [
+            UpdateOne(_key_filter(key), {'$inc': deltas}, upsert=True)
+            for key, deltas in buffer.items() if deltas
+        ]
+        for i in range(0, len(ops), 1000):
+            collection.bulk_write(ops[i:i + 1000], ordered=False)
+
+
+def _key_filter(key):
+    doc = {'hour': key[0]}
+    doc.update(zip(DIMENSIONS, key[1:]))
+    return doc
+
+
+_rollup_writer = RollupWriter()
+
+
+def record_click(collection_name: str, click_doc: Dict):
+    """Count a click that was just inserted into one of the raw click collections."""
+    try:
+        source = CLICK_SOURCES.get(collection_name)
+        if not source:
+            return
+        timestamp = click_doc.get('timestamp') or datetime.utcnow()
+        _rollup_writer.add(timestamp, _click_dimensions(source, click_doc), _click_metrics(source, click_doc))
+    except Exception as e:
+        logger.warning(f"Failed to record click rollup: {e}")
+
+
+def record_conversion(forwarded_doc: Dict):
+    """Count a forwarded_postbacks record. Only successful forwards are conversions."""
+    try:
+        if forwarded_doc.get('forward_status') != 'success':
+            return
+        points = forwarded_doc.get('points') or 0
+        dimensions = _click_dimensions(CONVERSION_SOURCE, forwarded_doc)
+        _rollup_writer.add(
+            forwarded_doc.get('timestamp') or datetime.utcnow(),
+            dimensions,
+            {'conversions': 1, 'payout': points, 'revenue': forwarded_doc.get('revenue') or points}
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record conversion rollup: {e}")
+
+
+class ReportRollups:
+    def __init__(self):
+        self.collection = db_instance.get_collection(ROLLUP_COLLECTION)
+        self.state_collection = db_instance.get_collection(STATE_COLLECTION)
+
+    def ensure_indexes(self):
+        from pymongo import ASCENDING
+        if self.collection is None:
+            return
+        self.collection.create_index(
+            [('hour', ASCENDING)] + [(d, ASCENDING) for d in DIMENSIONS],
+            name='rollup_key_unique', unique=True, background=True
+        )
+        self.collection.create_index([('publisher_id', ASCENDING), ('hour', ASCENDING)], background=True)
+        self.collection.create_index([('placement_id', ASCENDING), ('hour', ASCENDING)], background=True)
+        self.collection.create_index([('offer_id', ASCENDING), ('hour', ASCENDING)], background=True)
+
+    # ------------------------------------------------------------------
+    # Coverage
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _covered_from(state: Dict) -> Optional[datetime]:
+        """Start of the complete period that runs up to now: the oldest rebuild
+        contiguous with live writing, else the first full hour written live."""
+        if state.get('covered_from'):
+            return state['covered_from']
+        if state.get('live_since'):
+            return state['live_since'] + timedelta(hours=1)
+        return None
+
+    def covers(self, start_date: datetime) -> bool:
+        """True when rollups are complete from start_date up to now."""
+        if self.collection is None or self.state_collection is None:
+            return False
+        try:
+            state = self.state_collection.find_one({'_id': 'hourly'}) or {}
+        except Exception:
+            return False
+        covered_from = self._covered_from(state)
+        return bool(covered_from and covered_from <= start_date)
+
+    def record_live_since(self, hour: datetime):
+        """Remember the (possibly partial) hour live writing started in."""
+        if self.state_collection is None:
+            return
+        try:
+            self.state_collection.update_one({'_id': 'hourly'}, {'$min': {'live_since': hour}}, upsert=True)
+        except Exception as e:
+            logger.warning(f"Failed to record rollup live_since: {e}")
+
+    @staticmethod
+    def can_answer(group_by: List[str], filters: Dict) -> bool:
+        """True when every requested grouping and filter exists as a rollup dimension."""
+        if not set(group_by) <= GROUPABLE_FIELDS:
+            return False
+        return all(key in FILTERABLE_FIELDS for key, value in filters.items() if value)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def query(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        match: Optional[Dict] = None,
+        group_by: Optional[List[str]] = None,
+        date_format: str = '%Y-%m-%d'
+    ) -> List[Dict[str, Any]]:
+        """Aggregate rollup buckets in [start_date, end_date] grouped by the given fields."""
+        group_by = group_by or ['date']
+        match_query = {'hour': {'$gte': _hour(start_date), '$lte': end_date}}
+        match_query.update(match or {})
+
+        group_id = {}
+        for field in group_by:
+            if field == 'date':
+                group_id['date'] = {'$dateToString': {'format': date_format, 'date': '$hour'}}
+            else:
+                group_id[field] = f'${field}'
+
+        pipeline = [
+            {'$match': match_query},
+            {'$group': {'_id': group_id, **{m: {'$sum': f'${m}'} for m in METRICS}}},
+        ]
+        return list(self.collection.aggregate(pipeline, allowDiskUse=True))
+
+    @staticmethod
+    def scope_to_publisher(user_id: str, placement_ids: List[str]) -> Dict:
+        """Match clause mirroring the raw reports' publisher isolation:
+        offerwall clicks by placement, everything else by the publisher's user ID."""
+        return {'$or': [
+            {'source': {'$in': OFFERWALL_SOURCES}, 'placement_id': {'$in': placement_ids}},
+            {'source': {'$nin': OFFERWALL_SOURCES}, 'publisher_id': user_id},
+        ]}
+
+    # ------------------------------------------------------------------
+    # Backfill / rebuild
+    # ------------------------------------------------------------------
+
+    def rebuild(self, start_date: datetime, end_date: Optional[datetime] = None) -> Dict[str, int]:
+        """Recompute rollups for [start_date, end_date) from the raw collections.
+
+        end_date defaults to the start of the current hour so the live writer's
+        current bucket is never double counted.
+        """
+        from pymongo import UpdateOne
+
+        start_date = _hour(start_date)
+        end_date = _hour(end_date or datetime.utcnow())
+        self.ensure_indexes()
+        deleted = self.collection.delete_many({'hour': {'$gte': start_date, '$lt': end_date}}).deleted_count
+
+        hour_expr = {'$dateFromString': {'dateString': {
+            '$dateToString': {'format': '%Y-%m-%dT%H:00:00Z', 'date': '$timestamp'}
+        }}}
+
+        def str_expr(*paths):
+            expr = ''
+            for path in reversed(paths):
+                expr = {'$ifNull': [path, expr]}
+            return {'$toString': expr}
+
+        sources = []
+        for collection_name, source in CLICK_SOURCES.items():
+            publisher_path = '$user_id' if source in ('tracking', 'dashboard') else '$publisher_id'
+            if source == 'offerwall_detailed':
+                metrics = {
+                    'clicks': {'$sum': 1},
+                    'unique_clicks': {'$sum': {'$cond': [{'$eq': ['$is_unique', True]}, 1, 0]}},
+                    'suspicious_clicks': {'$sum': {'$cond': [{'$eq': ['$is_suspicious', True]}, 1, 0]}},
+                    'rejected_clicks': {'$sum': {'$cond': [{'$eq': ['$is_rejected', True]}, 1, 0]}},
+                }
+            else:
+                duplicate = {'$or': [
+                    {'$eq': ['$is_duplicate', True]},
+                    {'$eq': ['$fraud_indicators.duplicate_click', True]},
+                    {'$in': ['duplicate_click', {'$cond': [{'$isArray': '$fraud_signals'}, '$fraud_signals', []]}]},
+                ]}
+                metrics = {
+                    'clicks': {'$sum': 1},
+                    'unique_clicks': {'$sum': {'$cond': [duplicate, 0, 1]}},
+                    'suspicious_clicks': {'$sum': {'$cond': [{'$or': [
+                        {'$eq': ['$fraud_indicators.fraud_status', 'suspicious']},
+                        {'$eq': ['$fraud_classification', 'suspicious']},
+                    ]}, 1, 0]}},
+                    'rejected_clicks': {'$sum': {'$cond': [{'$eq': ['$is_invalid', True]}, 1, 0]}},
+                }
+            sources.append((collection_name, source, {}, publisher_path, metrics))
+
+        sources.append(('forwarded_postbacks', CONVERSION_SOURCE, {'forward_status': 'success'}, '$publisher_id', {
+            'conversions': {'$sum': 1},
+            'payout': {'$sum': {'$ifNull': ['$points', 0]}},
+            'revenue': {'$sum': {'$ifNull': ['$revenue', {'$ifNull': ['$points', 0]}]}},
+        }))
+
+        written = 0
+        for collection_name, source, extra_match, publisher_path, metrics in sources:
+            raw_col = db_instance.get_collection(collection_name)
+            if raw_col is None:
+                continue
+            match = {'timestamp': {'$gte': start_date, '$lt': end_date}, **extra_match}
+            pipeline = [
+                {'$match': match},
+                {'$group': {
+                    '_id': {
+                        'hour': hour_expr,
+                        'publisher_id': str_expr(publisher_path),
+                        'placement_id': str_expr('$placement_id'),
+                        'offer_id': str_expr('$offer_id'),
+                        'country': str_expr('$country', '$geo.country'),
+                        'device_type': str_expr('$device_type', '$device.type'),
+                        'sub_id1': str_expr('$sub_id1'),
+                    },
+                    **metrics
+                }},
+            ]
+
+            ops = []
+            for row in raw_col.aggregate(pipeline, allowDiskUse=True):
+                key = row.pop('_id')
+                key['source'] = source
+                ops.append(UpdateOne(key, {'$inc': row}, upsert=True))
+                if len(ops) >= 1000:
+                    self.collection.bulk_write(ops, ordered=False)
+                    written += len(ops)
+                    ops = []
+            if ops:
+                self.collection.bulk_write(ops, ordered=False)
+                written += len(ops)
+            logger.info(f"Rollup rebuild: {collection_name} done ({written} buckets written so far)")
+
+        # Coverage only extends back when the rebuilt range reaches the covered
+        # period; otherwise the hours between end_date and it are still missing
+        state = self.state_collection.find_one({'_id': 'hourly'}) or {}
+        update = {'rebuilt_at': datetime.utcnow(), 'last_rebuild_range': {'start': start_date, 'end': end_date}}
+        covered_from = self._covered_from(state)
+        if covered_from and end_date >= covered_from:
+            update['covered_from'] = min(covered_from, start_date)
+        else:
+            logger.warning(
+                f"Rollup rebuild {start_date} - {end_date} does not reach the covered period "
+                f"(from {covered_from}); coverage unchanged"
+            )
+        self.state_collection.update_one({'_id': 'hourly'}, {'$set': update}, upsert=True)
+        return {'deleted': deleted, 'written': written, 'covered_from': update.get('covered_from')}
@@ -2,6 +2,7 @@ from datetime import datetime
 from bson import ObjectId
 from database import db_instance
 from pymongo import ReturnDocument
+from models.click_events import record_click_event
 
 class SmartLink:
     """Smart Link model for automatic offer redirection"""
@@ -192,6 +193,7 @@ class ClickLog:
 
             result = self.collection.insert_one(click_data)
             click_data['_id'] = result.inserted_id
+            record_click_event('smart_link_clicks', click_data)
 
             return click_data, ""
 
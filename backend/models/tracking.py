@@ -1,6 +1,7 @@
 from datetime import datetime
 from bson import ObjectId
 from database import db_instance
+from models.click_events import record_click_event
 import logging
 
 logger = logging.getLogger(__name__)
@@ -62,6 +63,7 @@ class Tracking:
             }
             
             result = self.clicks_collection.insert_one(click_doc)
+            record_click_event('clicks', click_doc)
             return str(result.inserted_id), None
             
         except Exception as e:
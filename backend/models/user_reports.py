@@ -7,11 +7,19 @@ from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
 from utils.metrics_calculator import MetricsCalculator
+from models.report_rollups import ReportRollups, OFFERWALL_SOURCES, CONVERSION_SOURCE
+from models.click_events import ClickEvents, REPORT_SOURCES
 import logging
 from typing import Dict, List, Optional, Any
 
 logger = logging.getLogger(__name__)
 
+# Performance report group_by fields stored flat on click_events
+EVENT_GROUPABLE_FIELDS = {
+    'date', 'offer_id', 'country', 'browser', 'device_type', 'publisher_id', 'user_id',
+    'network', 'category', 'source', 'sub_id1', 'sub_id2', 'sub_id3', 'sub_id4', 'sub_id5',
+}
+
 
 class UserReports:
     def __init__(self):
@@ -24,6 +32,8 @@ class UserReports:
         self.placements_collection = db_instance.get_collection('placements')  # To get user's placements
         self.offers_collection = db_instance.get_collection('offers')
         self.users_collection = db_instance.get_collection('users')
+        self.rollups = ReportRollups()  # Hourly pre-aggregated clicks/conversions
+        self.click_events = ClickEvents()  # Unified click store (all click collections)
     
     def _check_db_connection(self):
         """Check if database is connected"""
@@ -75,6 +85,12 @@ class UserReports:
             user = self.users_collection.find_one({'_id': ObjectId(user_id)})
             is_admin = user and user.get('role') == 'admin' if not force_publisher_view else False
             
+            # Serve from hourly rollups when they cover the range and dimensions
+            if self.rollups.can_answer(group_by, filters) and self.rollups.covers(start_date):
+                return self._performance_report_from_rollups(
+                    user, user_id, is_admin, date_range, filters, group_by, sort_config, pagination
+                )
+            
             # Build match query - Filter by user's placements unless admin
             match_query = {
                 'timestamp': {  # offerwall_clicks_detailed uses 'timestamp' not 'click_time'
@@ -185,153 +201,160 @@ class UserReports:
                 if ff not in group_id:
                     extra_accumulators[f'_first_{ff}'] = {'$first': f'${ff}'}
 
-            # Aggregation pipeline
-            pipeline = [
-                {'$match': match_query},
-                {
-                    '$group': {
-                        '_id': group_id,
-                        'clicks': {'$sum': 1},
-                        'gross_clicks': {'$sum': 1},
-                        'unique_clicks': {
-                            '$sum': {'$cond': [{'$eq': ['$is_unique', True]}, 1, 0]}
-                        },
-                        'suspicious_clicks': {
-                            '$sum': {'$cond': [{'$eq': ['$is_suspicious', True]}, 1, 0]}
-                        },
-                        'rejected_clicks': {
-                            '$sum': {'$cond': [{'$eq': ['$is_rejected', True]}, 1, 0]}
-                        },
-                        **extra_accumulators
-                    }
-                }
-            ]
-            
-            # Get aggregated click data from offerwall_clicks_detailed
-            click_results = list(self.clicks_collection.aggregate(pipeline)) if self.clicks_collection is not None else []
-            logger.info(f"📊 offerwall_clicks_detailed: {len(click_results)} groups")
-            
-            # Also get clicks from offerwall_clicks (regular collection)
-            offerwall_click_results = []
-            if self.offerwall_clicks_collection is not None:
-                offerwall_click_results = list(self.offerwall_clicks_collection.aggregate(pipeline))
-                logger.info(f"📊 offerwall_clicks: {len(offerwall_click_results)} groups")
-            
-            # Also get clicks from simple 'clicks' collection
-            simple_click_results = []
-            if self.simple_clicks_collection is not None and filters.get('source') != 'offerwall':
-                # Simple clicks use different field names, adjust query
-                simple_match_query = {
-                    'timestamp': {
-                        '$gte': start_date,
-                        '$lte': end_date
-                    }
-                }
-                if not is_admin:
-                    simple_match_query['user_id'] = user_id
-                elif filters.get('publisher_id'):
-                    simple_match_query['user_id'] = filters['publisher_id']
-                if filters.get('offer_id'):
-                    simple_match_query['offer_id'] = match_query.get('offer_id')
-                if filters.get('country'):
-                    simple_match_query['country'] = match_query.get('country')
-                if filters.get('device_type'):
-                    simple_match_query['device_type'] = filters['device_type']
-                
-                simple_pipeline = [
-                    {'$match': simple_match_query},
+            click_results = offerwall_click_results = simple_click_results = dashboard_click_results = []
+            if self.click_events.covers(start_date) and set(group_by) <= EVENT_GROUPABLE_FIELDS:
+                # One aggregation over the unified click store
+                click_results = self._click_event_groups(
+                    user, user_id, is_admin, filters, start_date, end_date, group_by, date_format, first_fields
+                )
+            else:
+                # Aggregation pipeline
+                pipeline = [
+                    {'$match': match_query},
                     {
                         '$group': {
                             '_id': group_id,
                             'clicks': {'$sum': 1},
                             'gross_clicks': {'$sum': 1},
-                            'unique_clicks': {'$sum': 0},
-                            'suspicious_clicks': {'$sum': 0},
-                            'rejected_clicks': {'$sum': 0},
+                            'unique_clicks': {
+                                '$sum': {'$cond': [{'$eq': ['$is_unique', True]}, 1, 0]}
+                            },
+                            'suspicious_clicks': {
+                                '$sum': {'$cond': [{'$eq': ['$is_suspicious', True]}, 1, 0]}
+                            },
+                            'rejected_clicks': {
+                                '$sum': {'$cond': [{'$eq': ['$is_rejected', True]}, 1, 0]}
+                            },
                             **extra_accumulators
                         }
                     }
                 ]
-                simple_click_results = list(self.simple_clicks_collection.aggregate(simple_pipeline))
-                logger.info(f"📊 clicks (simple): {len(simple_click_results)} groups")
             
-            # Also get clicks from dashboard_clicks collection (Offers page clicks)
-            dashboard_click_results = []
-            if self.dashboard_clicks_collection is not None and filters.get('source') != 'offerwall':
-                dashboard_match_query = {
-                    'timestamp': {
-                        '$gte': start_date,
-                        '$lte': end_date
+                # Get aggregated click data from offerwall_clicks_detailed
+                click_results = list(self.clicks_collection.aggregate(pipeline)) if self.clicks_collection is not None else []
+                logger.info(f"📊 offerwall_clicks_detailed: {len(click_results)} groups")
+            
+                # Also get clicks from offerwall_clicks (regular collection)
+                offerwall_click_results = []
+                if self.offerwall_clicks_collection is not None:
+                    offerwall_click_results = list(self.offerwall_clicks_collection.aggregate(pipeline))
+                    logger.info(f"📊 offerwall_clicks: {len(offerwall_click_results)} groups")
+            
+                # Also get clicks from simple 'clicks' collection
+                simple_click_results = []
+                if self.simple_clicks_collection is not None and filters.get('source') != 'offerwall':
+                    # Simple clicks use different field names, adjust query
+                    simple_match_query = {
+                        'timestamp': {
+                            '$gte': start_date,
+                            '$lte': end_date
+                        }
                     }
-                }
+                    if not is_admin:
+                        simple_match_query['user_id'] = user_id
+                    elif filters.get('publisher_id'):
+                        simple_match_query['user_id'] = filters['publisher_id']
+                    if filters.get('offer_id'):
+                        simple_match_query['offer_id'] = match_query.get('offer_id')
+                    if filters.get('country'):
+                        simple_match_query['country'] = match_query.get('country')
+                    if filters.get('device_type'):
+                        simple_match_query['device_type'] = filters['device_type']
                 
-                # Filter by user_id for dashboard clicks
-                if not is_admin:
-                    dashboard_match_query['user_id'] = user_id
-                elif filters.get('publisher_id'):
-                    dashboard_match_query['user_id'] = filters['publisher_id']
+                    simple_pipeline = [
+                        {'$match': simple_match_query},
+                        {
+                            '$group': {
+                                '_id': group_id,
+                                'clicks': {'$sum': 1},
+                                'gross_clicks': {'$sum': 1},
+                                'unique_clicks': {'$sum': 0},
+                                'suspicious_clicks': {'$sum': 0},
+                                'rejected_clicks': {'$sum': 0},
+                                **extra_accumulators
+                            }
+                        }
+                    ]
+                    simple_click_results = list(self.simple_clicks_collection.aggregate(simple_pipeline))
+                    logger.info(f"📊 clicks (simple): {len(simple_click_results)} groups")
+            
+                # Also get clicks from dashboard_clicks collection (Offers page clicks)
+                dashboard_click_results = []
+                if self.dashboard_clicks_collection is not None and filters.get('source') != 'offerwall':
+                    dashboard_match_query = {
+                        'timestamp': {
+                            '$gte': start_date,
+                            '$lte': end_date
+                        }
+                    }
                 
-                if filters.get('offer_id'):
-                    dashboard_match_query['offer_id'] = match_query.get('offer_id')
-                if filters.get('country'):
-                    dashboard_match_query['geo.country'] = match_query.get('country')
-                if filters.get('device_type'):
-                    dashboard_match_query['device.type'] = filters['device_type']
+                    # Filter by user_id for dashboard clicks
+                    if not is_admin:
+                        dashboard_match_query['user_id'] = user_id
+                    elif filters.get('publisher_id'):
+                        dashboard_match_query['user_id'] = filters['publisher_id']
                 
-                # Dashboard clicks use nested fields: geo.country, device.type, device.browser
-                dash_group_id = {}
-                for field in group_by:
-                    if field == 'date':
-                        dash_group_id['date'] = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}}
-                    elif field == 'offer_id':
-                        dash_group_id['offer_id'] = '$offer_id'
-                    elif field == 'country':
-                        dash_group_id['country'] = '$geo.country'
-                    elif field == 'browser':
-                        dash_group_id['browser'] = '$device.browser'
-                    elif field == 'device_type':
-                        dash_group_id['device_type'] = '$device.type'
-                    elif field == 'source':
-                        dash_group_id['source'] = '$referrer'
-                    elif field.startswith('sub_id'):
-                        dash_group_id[field] = f'${field}'
+                    if filters.get('offer_id'):
+                        dashboard_match_query['offer_id'] = match_query.get('offer_id')
+                    if filters.get('country'):
+                        dashboard_match_query['geo.country'] = match_query.get('country')
+                    if filters.get('device_type'):
+                        dashboard_match_query['device.type'] = filters['device_type']
                 
-                # Dashboard $first accumulators use nested paths
-                dash_extra = {}
-                dash_field_map = {
-                    'country': '$geo.country',
-                    'country_code': '$geo.country_code',
-                    'city': '$geo.city',
-                    'region': '$geo.region',
-                    'browser': '$device.browser',
-                    'device_type': '$device.type',
-                    'os': '$device.os',
-                    'ip_address': '$network.ip_address',
-                    'referer': '$referrer',
-                    'user_id': '$user_id',
-                    'click_id': '$click_id',
-                    'offer_name': '$offer_name',
-                }
-                for ff in first_fields:
-                    if ff not in dash_group_id:
-                        dash_extra[f'_first_{ff}'] = {'$first': dash_field_map.get(ff, f'${ff}')}
+                    # Dashboard clicks use nested fields: geo.country, device.type, device.browser
+                    dash_group_id = {}
+                    for field in group_by:
+                        if field == 'date':
+                            dash_group_id['date'] = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}}
+                        elif field == 'offer_id':
+                            dash_group_id['offer_id'] = '$offer_id'
+                        elif field == 'country':
+                            dash_group_id['country'] = '$geo.country'
+                        elif field == 'browser':
+                            dash_group_id['browser'] = '$device.browser'
+                        elif field == 'device_type':
+                            dash_group_id['device_type'] = '$device.type'
+                        elif field == 'source':
+                            dash_group_id['source'] = '$referrer'
+                        elif field.startswith('sub_id'):
+                            dash_group_id[field] = f'${field}'
                 
-                dashboard_pipeline = [
-                    {'$match': dashboard_match_query},
-                    {
-                        '$group': {
-                            '_id': dash_group_id,
-                            'clicks': {'$sum': 1},
-                            'gross_clicks': {'$sum': 1},
-                            'unique_clicks': {'$sum': 0},
-                            'suspicious_clicks': {'$sum': 0},
-                            'rejected_clicks': {'$sum': 0},
-                            **dash_extra
-                        }
+                    # Dashboard $first accumulators use nested paths
+                    dash_extra = {}
+                    dash_field_map = {
+                        'country': '$geo.country',
+                        'country_code': '$geo.country_code',
+                        'city': '$geo.city',
+                        'region': '$geo.region',
+                        'browser': '$device.browser',
+                        'device_type': '$device.type',
+                        'os': '$device.os',
+                        'ip_address': '$network.ip_address',
+                        'referer': '$referrer',
+                        'user_id': '$user_id',
+                        'click_id': '$click_id',
+                        'offer_name': '$offer_name',
                     }
-                ]
+                    for ff in first_fields:
+                        if ff not in dash_group_id:
+                            dash_extra[f'_first_{ff}'] = {'$first': dash_field_map.get(ff, f'${ff}')}
+                
+                    dashboard_pipeline = [
+                        {'$match': dashboard_match_query},
+                        {
+                            '$group': {
+                                '_id': dash_group_id,
+                                'clicks': {'$sum': 1},
+                                'gross_clicks': {'$sum': 1},
+                                'unique_clicks': {'$sum': 0},
+                                'suspicious_clicks': {'$sum': 0},
+                                'rejected_clicks': {'$sum': 0},
+                                **dash_extra
+                            }
+                        }
+                    ]
                 
-                dashboard_click_results = list(self.dashboard_clicks_collection.aggregate(dashboard_pipeline))
+                    dashboard_click_results = list(self.dashboard_clicks_collection.aggregate(dashboard_pipeline))
             
             logger.info(f"📊 Performance: offerwall={len(click_results)}, offerwall_reg={len(offerwall_click_results)}, simple={len(simple_click_results)}, dashboard={len(dashboard_click_results)} groups")
             
@@ -508,148 +531,277 @@ class UserReports:
                             'avg_time_spent_seconds': conv_row.get('avg_time_spent_seconds', 0)
                         }
             
-            # ===== BATCH ENRICHMENT (avoid N+1 queries) =====
-            # Collect unique offer_ids and user_ids from all merged rows
-            all_offer_ids = set()
-            all_user_ids = set()
-            for row in merged_data.values():
-                if row.get('offer_id'):
-                    all_offer_ids.add(row['offer_id'])
-                if row.get('user_id'):
-                    all_user_ids.add(str(row['user_id']))
-                if row.get('publisher_id'):
-                    all_user_ids.add(str(row['publisher_id']))
+            return self._finalize_performance_report(merged_data, sort_config, pagination)
+            
+        except Exception as e:
+            logger.error(f"Error generating performance report: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+    
+    def _rollup_match(self, user, user_id: str, is_admin: bool, filters: Dict) -> Dict:
+        """Build the rollup $match for a report's filters and publisher isolation"""
+        match = {}
+        if not is_admin:
+            username = user.get('username') if user else None
+            placement_ids = []
+            if username:
+                placement_ids = [str(p['_id']) for p in self.placements_collection.find(
+                    {'created_by': username}, {'_id': 1}
+                )]
+            match.update(ReportRollups.scope_to_publisher(user_id, placement_ids))
+        elif filters.get('publisher_id'):
+            match['publisher_id'] = filters['publisher_id']
+        
+        if filters.get('offer_id'):
+            match['offer_id'] = {'$in': filters['offer_id'] if isinstance(filters['offer_id'], list) else [filters['offer_id']]}
+        if filters.get('country'):
+            match['country'] = {'$in': filters['country'] if isinstance(filters['country'], list) else [filters['country']]}
+        if filters.get('device_type'):
+            match['device_type'] = filters['device_type']
+        if filters.get('sub_id1'):
+            match['sub_id1'] = filters['sub_id1']
+        if filters.get('source') == 'offerwall':
+            match['source'] = {'$in': OFFERWALL_SOURCES + [CONVERSION_SOURCE]}
+        return match
+    
+    def _click_event_groups(
+        self,
+        user,
+        user_id: str,
+        is_admin: bool,
+        filters: Dict,
+        start_date: datetime,
+        end_date: datetime,
+        group_by: List[str],
+        date_format: str,
+        first_fields: List[str]
+    ) -> List[Dict]:
+        """Click groups for the performance report from click_events, shaped like the raw aggregations"""
+        # click_events shares the rollup source tags and flat dimensions, so the
+        # publisher isolation and filters are the same as for rollups
+        match = self._rollup_match(user, user_id, is_admin, filters)
+        match['source'] = {'$in': OFFERWALL_SOURCES if filters.get('source') == 'offerwall' else REPORT_SOURCES}
+        match['timestamp'] = {'$gte': start_date, '$lte': end_date}
+        for i in range(2, 6):
+            if filters.get(f'sub_id{i}'):
+                match[f'sub_id{i}'] = filters[f'sub_id{i}']
+        
+        group_id = {}
+        for field in group_by:
+            if field == 'date':
+                group_id['date'] = {'$dateToString': {'format': date_format, 'date': '$timestamp'}}
+            elif field == 'source':
+                group_id['source'] = '$referer'  # "source" in the reports means traffic source
+            else:
+                group_id[field] = f'${field}'
+        
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': group_id,
+                'clicks': {'$sum': 1},
+                'gross_clicks': {'$sum': 1},
+                'unique_clicks': {'$sum': {'$cond': ['$is_unique', 1, 0]}},
+                'suspicious_clicks': {'$sum': {'$cond': ['$is_suspicious', 1, 0]}},
+                'rejected_clicks': {'$sum': {'$cond': ['$is_rejected', 1, 0]}},
+                **{f'_first_{ff}': {'$first': f'${ff}'} for ff in first_fields if ff not in group_id},
+            }},
+        ]
+        results = list(self.click_events.collection.aggregate(pipeline, allowDiskUse=True))
+        logger.info(f"📊 click_events: {len(results)} groups")
+        return results
+    
+    def _performance_report_from_rollups(
+        self,
+        user,
+        user_id: str,
+        is_admin: bool,
+        date_range: Dict[str, datetime],
+        filters: Dict,
+        group_by: List[str],
+        sort_config: Dict,
+        pagination: Dict
+    ) -> Dict[str, Any]:
+        """Performance report answered from report_rollups_hourly instead of raw clicks"""
+        granularity = filters.get('granularity', 'daily')
+        date_format = {
+            'hourly': '%Y-%m-%dT%H:00',
+            'weekly': '%Y-W%V',
+            'monthly': '%Y-%m',
+        }.get(granularity, '%Y-%m-%d')
+        
+        rows = self.rollups.query(
+            date_range['start'],
+            date_range['end'],
+            match=self._rollup_match(user, user_id, is_admin, filters),
+            group_by=group_by,
+            date_format=date_format
+        )
+        
+        merged_data = {}
+        for row in rows:
+            merged_data[str(row['_id'])] = {
+                **row['_id'],
+                'clicks': row['clicks'],
+                'gross_clicks': row['clicks'],
+                'unique_clicks': row['unique_clicks'],
+                'suspicious_clicks': row['suspicious_clicks'],
+                'rejected_clicks': row['rejected_clicks'],
+                'conversions': row['conversions'],
+                'approved_conversions': row['conversions'],
+                'pending_conversions': 0,
+                'rejected_conversions': 0,
+                'total_payout': float(row['payout']),
+                'total_revenue': float(row['revenue'])
+            }
+        
+        logger.info(f"📊 Performance (rollups): {len(merged_data)} groups")
+        return self._finalize_performance_report(merged_data, sort_config, pagination)
+    
+    def _finalize_performance_report(
+        self,
+        merged_data: Dict[str, Dict],
+        sort_config: Dict,
+        pagination: Dict
+    ) -> Dict[str, Any]:
+        """Enrich merged report rows with offer/publisher data, then sort, summarize and paginate"""
+        # ===== BATCH ENRICHMENT (avoid N+1 queries) =====
+        # Collect unique offer_ids and user_ids from all merged rows
+        all_offer_ids = set()
+        all_user_ids = set()
+        for row in merged_data.values():
+            if row.get('offer_id'):
+                all_offer_ids.add(row['offer_id'])
+            if row.get('user_id'):
+                all_user_ids.add(str(row['user_id']))
+            if row.get('publisher_id'):
+                all_user_ids.add(str(row['publisher_id']))
 
-            # Batch-load offers
-            offers_cache = {}
-            if all_offer_ids:
-                offer_cursor = self.offers_collection.find(
-                    {'offer_id': {'$in': list(all_offer_ids)}},
-                    {'offer_id': 1, 'name': 1, 'network': 1, 'url': 1, 'target_url': 1,
-                     'category': 1, 'currency': 1, 'ad_group': 1, 'goal': 1,
-                     'promo_code': 1, 'postback_url': 1}
-                )
-                for o in offer_cursor:
-                    offers_cache[o['offer_id']] = o
+        # Batch-load offers
+        offers_cache = {}
+        if all_offer_ids:
+            offer_cursor = self.offers_collection.find(
+                {'offer_id': {'$in': list(all_offer_ids)}},
+                {'offer_id': 1, 'name': 1, 'network': 1, 'url': 1, 'target_url': 1,
+                 'category': 1, 'currency': 1, 'ad_group': 1, 'goal': 1,
+                 'promo_code': 1, 'postback_url': 1}
+            )
+            for o in offer_cursor:
+                offers_cache[o['offer_id']] = o
 
-            # Batch-load users (try ObjectId first, then username)
-            users_cache = {}
-            if all_user_ids:
-                valid_oids = [ObjectId(uid) for uid in all_user_ids if ObjectId.is_valid(uid)]
-                non_oid_ids = [uid for uid in all_user_ids if not ObjectId.is_valid(uid)]
-                user_query = []
-                if valid_oids:
-                    user_query.append({'_id': {'$in': valid_oids}})
-                if non_oid_ids:
-                    user_query.append({'username': {'$in': non_oid_ids}})
-                if user_query:
-                    user_cursor = self.users_collection.find(
-                        {'$or': user_query} if len(user_query) > 1 else user_query[0],
-                        {'username': 1, 'name': 1, 'email': 1, 'role': 1, 'postback_url': 1}
-                    )
-                    for u in user_cursor:
-                        users_cache[str(u['_id'])] = u
-                        if u.get('username'):
-                            users_cache[u['username']] = u
+        # Batch-load users (try ObjectId first, then username)
+        users_cache = {}
+        if all_user_ids:
+            valid_oids = [ObjectId(uid) for uid in all_user_ids if ObjectId.is_valid(uid)]
+            non_oid_ids = [uid for uid in all_user_ids if not ObjectId.is_valid(uid)]
+            user_query = []
+            if valid_oids:
+                user_query.append({'_id': {'$in': valid_oids}})
+            if non_oid_ids:
+                user_query.append({'username': {'$in': non_oid_ids}})
+            if user_query:
+                user_cursor = self.users_collection.find(
+                    {'$or': user_query} if len(user_query) > 1 else user_query[0],
+                    {'username': 1, 'name': 1, 'email': 1, 'role': 1, 'postback_url': 1}
+                )
+                for u in user_cursor:
+                    users_cache[str(u['_id'])] = u
+                    if u.get('username'):
+                        users_cache[u['username']] = u
 
-            # Convert to list and enrich with metrics
-            report_data = []
+        # Convert to list and enrich with metrics
+        report_data = []
 
-            for row in merged_data.values():
-                # Enrich with offer data from cache
-                if 'offer_id' in row:
-                    offer = offers_cache.get(row['offer_id'])
-                    if offer:
-                        raw_name = offer.get('name', 'Unknown')
-                        row['offer_name'] = self._clean_offer_name(raw_name)
-                        row['network'] = offer.get('network', 'Unknown')
-                        row['offer_url'] = offer.get('url', offer.get('target_url', ''))
-                        row['category'] = offer.get('category', 'Uncategorized')
-                        row['currency'] = offer.get('currency', 'USD')
-                        row['ad_group'] = offer.get('ad_group', '')
-                        row['goal'] = offer.get('goal', '')
-                        row['promo_code'] = offer.get('promo_code', '')
-                        row['postback_url'] = offer.get('postback_url', '')
-                    else:
-                        row['offer_name'] = 'Unknown Offer'
-                        row['offer_url'] = ''
-                        row['category'] = 'Unknown'
-                        row['currency'] = 'USD'
-                        row['ad_group'] = ''
-                        row['goal'] = ''
-                        row['promo_code'] = ''
-                        row['postback_url'] = ''
+        for row in merged_data.values():
+            # Enrich with offer data from cache
+            if 'offer_id' in row:
+                offer = offers_cache.get(row['offer_id'])
+                if offer:
+                    raw_name = offer.get('name', 'Unknown')
+                    row['offer_name'] = self._clean_offer_name(raw_name)
+                    row['network'] = offer.get('network', 'Unknown')
+                    row['offer_url'] = offer.get('url', offer.get('target_url', ''))
+                    row['category'] = offer.get('category', 'Uncategorized')
+                    row['currency'] = offer.get('currency', 'USD')
+                    row['ad_group'] = offer.get('ad_group', '')
+                    row['goal'] = offer.get('goal', '')
+                    row['promo_code'] = offer.get('promo_code', '')
+                    row['postback_url'] = offer.get('postback_url', '')
                 else:
-                    row['offer_name'] = 'All Offers'
+                    row['offer_name'] = 'Unknown Offer'
                     row['offer_url'] = ''
-                    row['category'] = 'All'
+                    row['category'] = 'Unknown'
                     row['currency'] = 'USD'
                     row['ad_group'] = ''
                     row['goal'] = ''
                     row['promo_code'] = ''
                     row['postback_url'] = ''
+            else:
+                row['offer_name'] = 'All Offers'
+                row['offer_url'] = ''
+                row['category'] = 'All'
+                row['currency'] = 'USD'
+                row['ad_group'] = ''
+                row['goal'] = ''
+                row['promo_code'] = ''
+                row['postback_url'] = ''
 
-                # Enrich with publisher data from cache
-                # Try publisher_id first (for offerwall clicks where publisher_id = actual publisher ObjectId)
-                pub_user_id = str(row.get('publisher_id', '') or '') or str(row.get('user_id', '') or '')
-                if pub_user_id:
-                    pub_user = users_cache.get(pub_user_id)
-                    if pub_user:
-                        row['publisher_name'] = pub_user.get('name', pub_user.get('username', 'Unknown'))
-                        row['publisher_id'] = str(pub_user.get('_id', ''))
-                        row['publisher_email'] = pub_user.get('email', '')
-                        row['publisher_role'] = pub_user.get('role', '')
-                        row['postback_url'] = pub_user.get('postback_url', '') or 'Not Configured'
-                if not row.get('publisher_name'):
-                    # Fallback: try user_id if publisher_id didn't resolve
-                    fallback_id = row.get('user_id', '')
-                    if fallback_id and fallback_id != pub_user_id:
-                        fb_user = users_cache.get(fallback_id)
-                        if fb_user:
-                            row['publisher_name'] = fb_user.get('name', fb_user.get('username', 'Unknown'))
-                            row['publisher_id'] = str(fb_user.get('_id', ''))
-                            row['publisher_email'] = fb_user.get('email', '')
-                            row['publisher_role'] = fb_user.get('role', '')
-                if not row.get('publisher_name'):
-                    row['publisher_name'] = pub_user_id[:20] if pub_user_id else ''
-                    row['publisher_email'] = ''
-                    row['publisher_role'] = ''
+            # Enrich with publisher data from cache
+            # Try publisher_id first (for offerwall clicks where publisher_id = actual publisher ObjectId)
+            pub_user_id = str(row.get('publisher_id', '') or '') or str(row.get('user_id', '') or '')
+            if pub_user_id:
+                pub_user = users_cache.get(pub_user_id)
+                if pub_user:
+                    row['publisher_name'] = pub_user.get('name', pub_user.get('username', 'Unknown'))
+                    row['publisher_id'] = str(pub_user.get('_id', ''))
+                    row['publisher_email'] = pub_user.get('email', '')
+                    row['publisher_role'] = pub_user.get('role', '')
+                    row['postback_url'] = pub_user.get('postback_url', '') or 'Not Configured'
+            if not row.get('publisher_name'):
+                # Fallback: try user_id if publisher_id didn't resolve
+                fallback_id = row.get('user_id', '')
+                if fallback_id and fallback_id != pub_user_id:
+                    fb_user = users_cache.get(fallback_id)
+                    if fb_user:
+                        row['publisher_name'] = fb_user.get('name', fb_user.get('username', 'Unknown'))
+                        row['publisher_id'] = str(fb_user.get('_id', ''))
+                        row['publisher_email'] = fb_user.get('email', '')
+                        row['publisher_role'] = fb_user.get('role', '')
+            if not row.get('publisher_name'):
+                row['publisher_name'] = pub_user_id[:20] if pub_user_id else ''
+                row['publisher_email'] = ''
+                row['publisher_role'] = ''
 
-                enriched_row = MetricsCalculator.enrich_with_metrics(row)
-                report_data.append(enriched_row)
-            
-            # Sort data
-            sort_field = sort_config.get('field', 'date')
-            sort_order = -1 if sort_config.get('order', 'desc') == 'desc' else 1
-            report_data.sort(key=lambda x: x.get(sort_field, 0), reverse=(sort_order == -1))
-            
-            # Calculate summary
-            summary = self._calculate_summary(report_data)
-            
-            logger.info(f"📊 Performance Report Summary: {len(report_data)} rows, {summary['total_clicks']} clicks, {summary['total_conversions']} conversions, ${summary['total_payout']} payout")
-            
-            # Paginate
-            page = pagination['page']
-            per_page = pagination['per_page']
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            
-            paginated_data = report_data[start_idx:end_idx]
-            
-            return {
-                'data': paginated_data,
-                'summary': summary,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': len(report_data),
-                    'pages': (len(report_data) + per_page - 1) // per_page
-                }
+            enriched_row = MetricsCalculator.enrich_with_metrics(row)
+            report_data.append(enriched_row)
+        
+        # Sort data
+        sort_field = sort_config.get('field', 'date')
+        sort_order = -1 if sort_config.get('order', 'desc') == 'desc' else 1
+        report_data.sort(key=lambda x: x.get(sort_field, 0), reverse=(sort_order == -1))
+        
+        # Calculate summary
+        summary = self._calculate_summary(report_data)
+        
+        logger.info(f"📊 Performance Report Summary: {len(report_data)} rows, {summary['total_clicks']} clicks, {summary['total_conversions']} conversions, ${summary['total_payout']} payout")
+        
+        # Paginate
+        page = pagination['page']
+        per_page = pagination['per_page']
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        
+        paginated_data = report_data[start_idx:end_idx]
+        
+        return {
+            'data': paginated_data,
+            'summary': summary,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': len(report_data),
+                'pages': (len(report_data) + per_page - 1) // per_page
             }
-            
-        except Exception as e:
-            logger.error(f"Error generating performance report: {str(e)}", exc_info=True)
-            return {'error': str(e)}
+        }
     
     def get_conversion_report(
         self,
@@ -681,64 +833,7 @@ class UserReports:
             filters = filters or {}
             pagination = pagination or {'page': 1, 'per_page': 20}
             
-            # Get user info to check if admin
-            user = self.users_collection.find_one({'_id': ObjectId(user_id)})
-            is_admin = user and user.get('role') == 'admin' if not force_publisher_view else False
-            
-            # Build query - Filter by publisher_id unless admin
-            # Only show REAL conversions — exclude flagged fakes
-            # Include success, failed, and no_url (user has no postback URL but conversion is real)
-            # Support status filter: 'reversed' shows only reversed, 'approved'/'active' shows non-reversed
-            status_filter = filters.get('status', '')
-            
-            if status_filter == 'reversed':
-                query = {
-                    'timestamp': {
-                        '$gte': start_date,
-                        '$lte': end_date
-                    },
-                    'forward_status': 'reversed',
-                    'source': {'$nin': ['fallback_fake']}
-                }
-            elif status_filter in ('approved', 'active'):
-                query = {
-                    'timestamp': {
-                        '$gte': start_date,
-                        '$lte': end_date
-                    },
-                    'forward_status': {'$in': ['success', 'failed', 'no_url']},
-                    'source': {'$nin': ['fallback_fake']}
-                }
-            else:
-                # Default: show all including reversed
-                query = {
-                    'timestamp': {
-                        '$gte': start_date,
-                        '$lte': end_date
-                    },
-                    'forward_status': {'$in': ['success', 'failed', 'no_url', 'reversed']},
-                    'source': {'$nin': ['fallback_fake']}
-                }
-            
-            # Filter by publisher_id if not admin
-            if not is_admin:
-                query['publisher_id'] = user_id
-            
-            logger.info(f"📊 Conversion Report Query: {query}")
-            
-            # Apply filters (only fields that exist in forwarded_postbacks)
-            # Note: country, device_type, browser are NOT stored in forwarded_postbacks
-            # They are enriched from click records post-query in admin_reports.py
-            if filters.get('offer_id'):
-                query['offer_id'] = filters['offer_id']
-            if filters.get('transaction_id'):
-                query['username'] = filters['transaction_id']
-            if filters.get('publisher_id'):
-                query['publisher_id'] = filters['publisher_id']
-            if filters.get('publisher_name'):
-                query['publisher_name'] = filters['publisher_name']
-            if filters.get('click_id'):
-                query['click_id'] = filters['click_id']
+            query = self._conversion_query(user_id, start_date, end_date, filters, force_publisher_view)
             
             # Count total
             total = self.conversions_collection.count_documents(query) if self.conversions_collection is not None else 0
@@ -753,50 +848,10 @@ class UserReports:
             conversions_cursor = self.conversions_collection.find(query).sort('timestamp', -1).skip(skip).limit(per_page)
             conversions = list(conversions_cursor)
             
-            # Enrich with offer names from offers collection
+            # Enrich with offer names from offers collection (one $in lookup per page)
+            offers_by_id = self._offers_by_id(conversions)
             for conv in conversions:
-                # Get offer details
-                offer = self.offers_collection.find_one({'offer_id': conv.get('offer_id')})
-                if offer:
-                    # Clean offer name to remove country codes
-                    raw_name = offer.get('name', 'Unknown')
-                    conv['offer_name'] = self._clean_offer_name(raw_name)
-                else:
-                    # Use the offer_name already stored in the record (from postback's cname param)
-                    # Only default to 'Unknown Offer' if nothing is stored
-                    stored_name = conv.get('offer_name', '')
-                    conv['offer_name'] = stored_name if stored_name and stored_name != 'Unknown Offer' else (conv.get('offer_name') or 'Unknown Offer')
-                
-                # Format datetime (forwarded_postbacks uses 'timestamp')
-                conv['time'] = conv['timestamp'].strftime('%Y-%m-%d %H:%M:%S') if conv.get('timestamp') else ''
-                
-                # Set payout from points field
-                conv['payout'] = conv.get('points', 0)
-                
-                # Set status based on forward_status
-                if conv.get('forward_status') == 'reversed':
-                    conv['status'] = 'reversed'
-                else:
-                    conv['status'] = 'approved'
-                
-                # Show the Transaction ID - use placement_id from the conversion record
-                # This is the same value shown in "Placement/Source" column of click tracking
-                # It's what the publisher passes as sub1 in their tracking URL
-                conv['transaction_id'] = conv.get('placement_id', '') or conv.get('sub_id1', '') or ''
-                
-                # Add publisher_name for display
-                conv['publisher_name'] = conv.get('publisher_name', '')
-
-                # Add reversal metadata if reversed
-                if conv.get('forward_status') == 'reversed':
-                    reversed_at = conv.get('reversed_at')
-                    conv['reversed_at'] = reversed_at.isoformat() + 'Z' if hasattr(reversed_at, 'isoformat') else str(reversed_at) if reversed_at else ''
-                    conv['reversed_by'] = conv.get('reversed_by', '')
-                    conv['reversal_reason'] = conv.get('reversal_reason', '')
-
-                
-                # Convert ObjectIds to strings
-                conv['_id'] = str(conv['_id'])
+                self._enrich_conversion(conv, offers_by_id.get(conv.get('offer_id')))
             
             # Calculate summary
             summary_pipeline = [
@@ -869,6 +924,155 @@ class UserReports:
             logger.error(f"Error generating conversion report: {str(e)}", exc_info=True)
             return {'error': str(e)}
     
+    def _conversion_query(self, user_id, start_date, end_date, filters, force_publisher_view=False):
+        """Build the forwarded_postbacks query for the conversion report"""
+        # Get user info to check if admin
+        user = self.users_collection.find_one({'_id': ObjectId(user_id)})
+        is_admin = user and user.get('role') == 'admin' if not force_publisher_view else False
+
+        # Build query - Filter by publisher_id unless admin
+        # Only show REAL conversions — exclude flagged fakes
+        # Include success, failed, and no_url (user has no postback URL but conversion is real)
+        # Support status filter: 'reversed' shows only reversed, 'approved'/'active' shows non-reversed
+        status_filter = filters.get('status', '')
+
+        if status_filter == 'reversed':
+            query = {
+                'timestamp': {
+                    '$gte': start_date,
+                    '$lte': end_date
+                },
+                'forward_status': 'reversed',
+                'source': {'$nin': ['fallback_fake']}
+            }
+        elif status_filter in ('approved', 'active'):
+            query = {
+                'timestamp': {
+                    '$gte': start_date,
+                    '$lte': end_date
+                },
+                'forward_status': {'$in': ['success', 'failed', 'no_url']},
+                'source': {'$nin': ['fallback_fake']}
+            }
+        else:
+            # Default: show all including reversed
+            query = {
+                'timestamp': {
+                    '$gte': start_date,
+                    '$lte': end_date
+                },
+                'forward_status': {'$in': ['success', 'failed', 'no_url', 'reversed']},
+                'source': {'$nin': ['fallback_fake']}
+            }
+
+        # Filter by publisher_id if not admin
+        if not is_admin:
+            query['publisher_id'] = user_id
+
+        logger.info(f"📊 Conversion Report Query: {query}")
+
+        # Apply filters (only fields that exist in forwarded_postbacks)
+        # Note: country, device_type, browser are NOT stored in forwarded_postbacks
+        # They are enriched from click records post-query in admin_reports.py
+        if filters.get('offer_id'):
+            query['offer_id'] = filters['offer_id']
+        if filters.get('transaction_id'):
+            query['username'] = filters['transaction_id']
+        if filters.get('publisher_id'):
+            query['publisher_id'] = filters['publisher_id']
+        if filters.get('publisher_name'):
+            query['publisher_name'] = filters['publisher_name']
+        if filters.get('click_id'):
+            query['click_id'] = filters['click_id']
+        
+        return query
+    
+    def _offers_by_id(self, conversions):
+        """Fetch the offers referenced by a batch of conversions in one query"""
+        offer_ids = list({conv.get('offer_id') for conv in conversions if conv.get('offer_id')})
+        if not offer_ids:
+            return {}
+        return {
+            offer['offer_id']: offer
+            for offer in self.offers_collection.find({'offer_id': {'$in': offer_ids}}, {'offer_id': 1, 'name': 1})
+        }
+    
+    def _enrich_conversion(self, conv, offer):
+        """Add display fields to a forwarded_postbacks record"""
+        if offer:
+            # Clean offer name to remove country codes
+            raw_name = offer.get('name', 'Unknown')
+            conv['offer_name'] = self._clean_offer_name(raw_name)
+        else:
+            # Use the offer_name already stored in the record (from postback's cname param)
+            # Only default to 'Unknown Offer' if nothing is stored
+            stored_name = conv.get('offer_name', '')
+            conv['offer_name'] = stored_name if stored_name and stored_name != 'Unknown Offer' else (conv.get('offer_name') or 'Unknown Offer')
+
+        # Format datetime (forwarded_postbacks uses 'timestamp')
+        conv['time'] = conv['timestamp'].strftime('%Y-%m-%d %H:%M:%S') if conv.get('timestamp') else ''
+
+        # Set payout from points field
+        conv['payout'] = conv.get('points', 0)
+
+        # Set status based on forward_status
+        if conv.get('forward_status') == 'reversed':
+            conv['status'] = 'reversed'
+        else:
+            conv['status'] = 'approved'
+
+        # Show the Transaction ID - use placement_id from the conversion record
+        # This is the same value shown in "Placement/Source" column of click tracking
+        # It's what the publisher passes as sub1 in their tracking URL
+        conv['transaction_id'] = conv.get('placement_id', '') or conv.get('sub_id1', '') or ''
+
+        # Add publisher_name for display
+        conv['publisher_name'] = conv.get('publisher_name', '')
+
+        # Add reversal metadata if reversed
+        if conv.get('forward_status') == 'reversed':
+            reversed_at = conv.get('reversed_at')
+            conv['reversed_at'] = reversed_at.isoformat() + 'Z' if hasattr(reversed_at, 'isoformat') else str(reversed_at) if reversed_at else ''
+            conv['reversed_by'] = conv.get('reversed_by', '')
+            conv['reversal_reason'] = conv.get('reversal_reason', '')
+
+        # Convert ObjectIds to strings
+        conv['_id'] = str(conv['_id'])
+    
+    def iter_conversion_export(
+        self,
+        user_id: str,
+        date_range: Dict[str, datetime],
+        filters: Optional[Dict] = None,
+        batch_size: int = 1000
+    ):
+        """
+        Yield every enriched conversion for the report query, newest first.
+        Reads the cursor in batches so exports of any size run in flat memory.
+        """
+        if not self._check_db_connection() or self.conversions_collection is None:
+            return
+        
+        query = self._conversion_query(user_id, date_range['start'], date_range['end'], filters or {})
+        cursor = self.conversions_collection.find(query).sort('timestamp', -1).batch_size(batch_size)
+        try:
+            batch = []
+            for conv in cursor:
+                batch.append(conv)
+                if len(batch) >= batch_size:
+                    yield from self._enrich_batch(batch)
+                    batch = []
+            if batch:
+                yield from self._enrich_batch(batch)
+        finally:
+            cursor.close()
+    
+    def _enrich_batch(self, conversions):
+        offers_by_id = self._offers_by_id(conversions)
+        for conv in conversions:
+            self._enrich_conversion(conv, offers_by_id.get(conv.get('offer_id')))
+            yield conv
+    
     def _clean_offer_name(self, name: str) -> str:
         """
         Remove country codes from offer names for cleaner display.
@@ -942,6 +1146,25 @@ class UserReports:
             user = self.users_collection.find_one({'_id': ObjectId(user_id)})
             is_admin = user and user.get('role') == 'admin' if not force_publisher_view else False
             
+            # Serve from hourly rollups when they cover the range
+            if self.rollups.covers(start_date) and set(filters) <= {'offer_id'}:
+                date_formats = {
+                    'hour': '%Y-%m-%d %H:00',
+                    'day': '%Y-%m-%d',
+                    'week': '%Y-W%U',
+                    'month': '%Y-%m'
+                }
+                value_field = {'revenue': 'payout', 'conversions': 'conversions'}.get(metric, 'clicks')
+                rows = self.rollups.query(
+                    start_date,
+                    end_date,
+                    match=self._rollup_match(user, user_id, is_admin, filters),
+                    group_by=['date'],
+                    date_format=date_formats.get(granularity, '%Y-%m-%d')
+                )
+                rows.sort(key=lambda r: r['_id']['date'])
+                return {'chart_data': [{'date': r['_id']['date'], 'value': r[value_field]} for r in rows]}
+            
             # Determine collection and field based on metric
             if metric in ['clicks', 'unique_clicks']:
                 collection = self.clicks_collection  # offerwall_clicks_detailed
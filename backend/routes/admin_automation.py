@@ -271,6 +271,54 @@ def get_automation_status():
         return jsonify({'error': str(e)}), 500
 
 
+@admin_automation_bp.route('/api/admin/automation/jobs', methods=['GET'])
+@token_required
+@admin_required
+def get_scheduler_jobs():
+    """
+    Get the background job scheduler state: schedule, lease holder and
+    run-time metrics (cluster-wide and for this worker) of every job.
+    """
+    try:
+        from services.job_scheduler import get_job_scheduler
+        return jsonify({'success': True, 'scheduler': get_job_scheduler().stats()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_automation_bp.route('/api/admin/automation/jobs/<job_name>/run', methods=['POST'])
+@token_required
+@admin_required
+def run_scheduler_job(job_name):
+    """Run a background job right away, unless a run already holds its lease."""
+    try:
+        from services.job_scheduler import get_job_scheduler
+        scheduler = get_job_scheduler()
+        if not scheduler.is_registered(job_name):
+            return jsonify({'error': f'Unknown job: {job_name}'}), 404
+        if not scheduler.run_now(job_name):
+            return jsonify({'error': f'Job {job_name} is already running'}), 409
+        return jsonify({'success': True, 'message': f'Job {job_name} started'}), 200
+    except Exception as e:
+        logger.error(f"Manual run of job {job_name} failed: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_automation_bp.route('/api/admin/automation/email-delivery', methods=['GET'])
+@token_required
+@admin_required
+def get_email_delivery_metrics():
+    """
+    Get the SMTP delivery engine's throughput metrics (sent, failed, retried,
+    emails/second) per campaign. Counters are kept per process.
+    """
+    try:
+        from services.smtp_delivery import get_smtp_delivery_engine
+        return jsonify({'success': True, 'delivery': get_smtp_delivery_engine().metrics()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_automation_bp.route('/api/admin/automation/voqall-sync/run', methods=['POST'])
 @token_required
 @admin_required
@@ -0,0 +1,70 @@
+"""
+Admin Cache API Routes
+Exposes per-namespace stats for the shared cache framework (utils.cache),
+the cache invalidation bus, the settings snapshot and the in-memory offer
+indexes, and lets admins clear a namespace or force a settings reload.
+"""
+
+from flask import Blueprint, jsonify
+from utils.auth import token_required, admin_required
+from utils.cache import cache_stats, has_cache, invalidate
+from services.cache_invalidation_bus import get_cache_invalidation_bus
+from services.settings_snapshot_service import get_settings_snapshot_service, SECTIONS, bump_settings_version
+from services.offer_search_index import get_offer_search_index
+from services.offer_catalog import get_offer_catalog
+from services.offer_similarity_index import get_offer_similarity_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+admin_cache_bp = Blueprint('admin_cache', __name__)
+
+
+@admin_cache_bp.route('/cache/stats', methods=['GET'])
+@token_required
+@admin_required
+def get_cache_stats():
+    """Hit/miss/eviction counters and sizes for every registered cache namespace (this worker)."""
+    try:
+        return jsonify({
+            'success': True,
+            'namespaces': cache_stats(),
+            'invalidation_bus': get_cache_invalidation_bus().stats(),
+            'settings_snapshot': get_settings_snapshot_service().stats(),
+            'offer_search_index': get_offer_search_index().stats(),
+            'offer_catalog': get_offer_catalog().stats(),
+            'offer_similarity_index': get_offer_similarity_index().stats()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting cache stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_cache_bp.route('/cache/<namespace>/clear', methods=['POST'])
+@token_required
+@admin_required
+def clear_cache_namespace(namespace):
+    """Drop every entry in one cache namespace, in every worker."""
+    try:
+        if not has_cache(namespace):
+            return jsonify({'error': f'Unknown cache namespace: {namespace}'}), 404
+        invalidate(namespace)
+        logger.info(f"🧹 Cleared cache namespace {namespace}")
+        return jsonify({'success': True, 'namespace': namespace}), 200
+    except Exception as e:
+        logger.error(f"Error clearing cache namespace {namespace}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_cache_bp.route('/cache/settings/reload', methods=['POST'])
+@token_required
+@admin_required
+def reload_settings_snapshot():
+    """Bump every settings section so all workers reload their snapshot (e.g. after a manual DB edit)."""
+    try:
+        for section in SECTIONS:
+            bump_settings_version(section)
+        return jsonify({'success': True, 'settings_snapshot': get_settings_snapshot_service().stats()}), 200
+    except Exception as e:
+        logger.error(f"Error reloading settings snapshot: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -7,6 +7,7 @@ Auto-generates invoices on 1st of every month for previous month's conversions.
 from flask import Blueprint, request, jsonify
 from utils.auth import token_required, admin_required
 from database import db_instance
+from services.settings_snapshot_service import get_platform_setting, bump_settings_version
 from bson import ObjectId
 from datetime import datetime, timedelta
 import logging
@@ -193,11 +194,7 @@ def mark_invoice_paid(invoice_id):
 def get_threshold():
     """Get the global payment threshold."""
     try:
-        col = get_collection('platform_settings')
-        if col is None:
-            return jsonify({'success': True, 'threshold': 50}), 200
-
-        setting = col.find_one({'key': 'payment_threshold'})
+        setting = get_platform_setting('payment_threshold')
         threshold = setting.get('value', 50) if setting else 50
 
         return jsonify({'success': True, 'threshold': threshold}), 200
@@ -228,6 +225,7 @@ def set_threshold():
             {'$set': {'key': 'payment_threshold', 'value': float(threshold), 'updated_at': datetime.utcnow()}},
             upsert=True
         )
+        bump_settings_version('platform')
 
         return jsonify({'success': True, 'message': f'Threshold updated to ${threshold}', 'threshold': threshold}), 200
 
@@ -269,12 +267,7 @@ def get_invoice_stats():
                 stats[status] = {'count': r['count'], 'amount': r['total_amount']}
 
         # Get threshold
-        settings_col = get_collection('platform_settings')
-        threshold = 50
-        if settings_col is not None:
-            s = settings_col.find_one({'key': 'payment_threshold'})
-            if s:
-                threshold = s.get('value', 50)
+        threshold = (get_platform_setting('payment_threshold') or {}).get('value', 50)
 
         return jsonify({
             'success': True,
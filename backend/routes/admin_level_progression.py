@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify
 from utils.auth import token_required
 from database import db_instance
+from models.click_events import ClickEvents, REPORT_SOURCES
 from bson import ObjectId
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +38,7 @@ def determine_correct_level(user_stats):
     """
     offers_viewed = user_stats.get('offers_viewed', 0)
     offers_requested = user_stats.get('offers_requested', 0)
-    approved_offers_count = len(user_stats.get('approved_offers', []))
+    approved_offers_count = user_stats.get('approved_offers_count', len(user_stats.get('approved_offers', [])))
     suspicious = user_stats.get('suspicious', False)
     conversions = user_stats.get('conversions', 0)
     logins_7d = user_stats.get('logins_7d', 0)
@@ -96,7 +97,7 @@ def check_level_upgrade_eligibility(user, user_stats):
     # Extract stats
     offers_viewed = user_stats.get('offers_viewed', 0)
     offers_requested = user_stats.get('offers_requested', 0)
-    approved_offers_count = len(user_stats.get('approved_offers', []))
+    approved_offers_count = user_stats.get('approved_offers_count', len(user_stats.get('approved_offers', [])))
     suspicious = user_stats.get('suspicious', False)
     conversions = user_stats.get('conversions', 0)
     logins_7d = user_stats.get('logins_7d', 0)
@@ -202,6 +203,120 @@ def check_level_upgrade_eligibility(user, user_stats):
     }
 
 
+# Legacy click collections and the fields that attribute a click to a publisher
+# (publisher ID fields, username fields). Used until click_events is backfilled.
+LEGACY_CLICK_ATTRIBUTION = {
+    'clicks': (['user_id', 'affiliate_id', 'publisher_id'], ['username']),
+    'offerwall_clicks': (['user_id', 'publisher_id'], ['username']),
+    'dashboard_clicks': (['user_id'], ['username']),
+    'offerwall_clicks_detailed': (['user_id'], ['publisher_name']),
+}
+
+
+def _attributed_counts(col, publishers, id_fields, name_fields=(), match=None, sums=None):
+    """
+    Count documents per publisher in one $group pass.
+    
+    A document belongs to every publisher whose ID appears in one of id_fields
+    (as string or ObjectId) or whose username appears in one of name_fields,
+    the same as the per-publisher $or queries this replaces.
+    
+    Args:
+        publishers: {publisher_id: username}
+        sums: extra {name: $sum expression} accumulators
+    
+    Returns:
+        {publisher_id: {'count': int, **sums}}
+    """
+    totals = {}
+    if col is None or not publishers:
+        return totals
+    
+    ids = list(publishers)
+    id_values = ids + [ObjectId(pid) for pid in ids if ObjectId.is_valid(pid)]
+    pids_by_name = {}
+    for pid, username in publishers.items():
+        if username:
+            pids_by_name.setdefault(username, []).append(pid)
+    
+    clauses = [{field: {'$in': id_values}} for field in id_fields]
+    if pids_by_name:
+        clauses += [{field: {'$in': list(pids_by_name)}} for field in name_fields]
+    query = {'$or': clauses}
+    if match:
+        query = {'$and': [match, query]}
+    
+    group_id = {f'id{i}': {'$toString': f'${field}'} for i, field in enumerate(id_fields)}
+    group_id.update({f'name{i}': f'${field}' for i, field in enumerate(name_fields)})
+    accumulators = {'count': {'$sum': 1}, **(sums or {})}
+    
+    for row in col.aggregate([
+        {'$match': query},
+        {'$group': {'_id': group_id, **accumulators}},
+    ], allowDiskUse=True):
+        key = row['_id']
+        owners = {key.get(f'id{i}') for i in range(len(id_fields))} & publishers.keys()
+        for i in range(len(name_fields)):
+            owners.update(pids_by_name.get(key.get(f'name{i}'), []))
+        for pid in owners:
+            bucket = totals.setdefault(pid, dict.fromkeys(accumulators, 0))
+            for name in accumulators:
+                bucket[name] += row.get(name) or 0
+    return totals
+
+
+def collect_level_stats(publishers):
+    """
+    Level metrics for many publishers at once: one aggregation per source
+    collection instead of several count queries per publisher.
+    
+    Returns:
+        {publisher_id: user_stats} in the shape check_level_upgrade_eligibility expects
+    """
+    by_id = {str(p['_id']): p.get('username') or '' for p in publishers}
+    
+    offers_viewed = {}
+    click_events = ClickEvents()
+    if click_events.covers():
+        # Unified click store: one aggregation across every click source
+        counts = _attributed_counts(
+            click_events.collection, by_id, ['publisher_id', 'user_id'], ['username'],
+            match={'source': {'$in': REPORT_SOURCES}}
+        )
+        offers_viewed = {pid: row['count'] for pid, row in counts.items()}
+    else:
+        for col_name, (id_fields, name_fields) in LEGACY_CLICK_ATTRIBUTION.items():
+            counts = _attributed_counts(db_instance.get_collection(col_name), by_id, id_fields, name_fields)
+            for pid, row in counts.items():
+                offers_viewed[pid] = offers_viewed.get(pid, 0) + row['count']
+    
+    requests = _attributed_counts(
+        db_instance.get_collection('affiliate_requests'), by_id, ['user_id'], ['username'],
+        sums={'approved': {'$sum': {'$cond': [{'$eq': ['$status', 'approved']}, 1, 0]}}}
+    )
+    
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    logins = _attributed_counts(
+        db_instance.get_collection('login_logs'), by_id, ['user_id'], ['username'],
+        match={'status': 'success', 'login_time': {'$gte': seven_days_ago}}
+    )
+    
+    conversions = _attributed_counts(db_instance.get_collection('forwarded_postbacks'), by_id, ['publisher_id'])
+    
+    stats = {}
+    for publisher in publishers:
+        pid = str(publisher['_id'])
+        stats[pid] = {
+            'offers_viewed': offers_viewed.get(pid, 0),
+            'offers_requested': requests.get(pid, {}).get('count', 0),
+            'approved_offers_count': requests.get(pid, {}).get('approved', 0),
+            'suspicious': publisher.get('suspicious', False),
+            'conversions': conversions.get(pid, {}).get('count', 0),
+            'logins_7d': logins.get(pid, {}).get('count', 0),
+        }
+    return stats
+
+
 @admin_level_progression_bp.route('/api/admin/publishers/level-check', methods=['POST'])
 @token_required
 @admin_required
@@ -218,10 +333,6 @@ def check_publisher_levels():
             return jsonify({'error': 'No publishers provided'}), 400
         
         users_col = db_instance.get_collection('users')
-        clicks_col = db_instance.get_collection('clicks')
-        affiliate_requests_col = db_instance.get_collection('affiliate_requests')
-        login_logs_col = db_instance.get_collection('login_logs')
-        
         if users_col is None:
             return jsonify({'error': 'Database not available'}), 503
         
@@ -231,100 +342,19 @@ def check_publisher_levels():
             {'username': 1, 'level': 1, 'previous_level': 1, 'level_updated_at': 1, 'suspicious': 1}
         ))
         
+        # All publishers' activity in a handful of aggregations
+        stats_by_publisher = collect_level_stats(publishers)
+        
         results = []
         
         for publisher in publishers:
-            publisher_id = str(publisher['_id'])
-            
-            # Get actual stats from database
-            username = publisher.get('username', '')
-            
-            # Count offers viewed (from ALL click collections)
-            offers_viewed = 0
-            if clicks_col is not None:
-                # Check multiple field variations
-                offers_viewed += clicks_col.count_documents({'$or': [
-                    {'user_id': publisher_id},
-                    {'affiliate_id': publisher_id},
-                    {'publisher_id': publisher_id},
-                    {'username': username}
-                ]})
-            
-            # Also check offerwall_clicks
-            offerwall_clicks_col = db_instance.get_collection('offerwall_clicks')
-            if offerwall_clicks_col is not None:
-                offers_viewed += offerwall_clicks_col.count_documents({'$or': [
-                    {'user_id': publisher_id},
-                    {'publisher_id': publisher_id},
-                    {'username': username}
-                ]})
-            
-            # Check dashboard_clicks
-            dashboard_clicks_col = db_instance.get_collection('dashboard_clicks')
-            if dashboard_clicks_col is not None:
-                offers_viewed += dashboard_clicks_col.count_documents({'$or': [
-                    {'user_id': publisher_id},
-                    {'username': username}
-                ]})
-            
-            # Check offerwall_clicks_detailed
-            offerwall_detailed_col = db_instance.get_collection('offerwall_clicks_detailed')
-            if offerwall_detailed_col is not None:
-                offers_viewed += offerwall_detailed_col.count_documents({'$or': [
-                    {'user_id': publisher_id},
-                    {'publisher_name': username}
-                ]})
-            
-            # Count offers requested from affiliate_requests
-            offers_requested = 0
-            approved_offers = []
-            if affiliate_requests_col is not None:
-                # Check multiple field variations for affiliate_requests
-                offers_requested = affiliate_requests_col.count_documents({'$or': [
-                    {'user_id': publisher_id},
-                    {'user_id': ObjectId(publisher_id)},
-                    {'username': username}
-                ]})
-                approved_offers = list(affiliate_requests_col.find({
-                    '$or': [
-                        {'user_id': publisher_id},
-                        {'user_id': ObjectId(publisher_id)},
-                        {'username': username}
-                    ],
-                    'status': 'approved'
-                }))
-            
-            # Count logins in last 7 days
-            logins_7d = 0
-            if login_logs_col is not None:
-                from datetime import timedelta
-                seven_days_ago = datetime.utcnow() - timedelta(days=7)
-                logins_7d = login_logs_col.count_documents({
-                    '$or': [
-                        {'user_id': publisher_id},
-                        {'username': username}
-                    ],
-                    'status': 'success',
-                    'login_time': {'$gte': seven_days_ago}
-                })
-            
-            # Get suspicious flag
-            suspicious = publisher.get('suspicious', False)
-            
-            # Count conversions from forwarded_postbacks or conversions collection
-            conversions = 0
-            conversions_col = db_instance.get_collection('forwarded_postbacks')
-            if conversions_col is not None:
-                conversions = conversions_col.count_documents({'publisher_id': publisher_id})
-            
-            user_stats = {
-                'offers_viewed': offers_viewed,
-                'offers_requested': offers_requested,
-                'approved_offers': approved_offers,
-                'suspicious': suspicious,
-                'conversions': conversions,
-                'logins_7d': logins_7d
-            }
+            user_stats = stats_by_publisher[str(publisher['_id'])]
+            offers_viewed = user_stats['offers_viewed']
+            offers_requested = user_stats['offers_requested']
+            approved_count = user_stats['approved_offers_count']
+            suspicious = user_stats['suspicious']
+            conversions = user_stats['conversions']
+            logins_7d = user_stats['logins_7d']
             
             # Check upgrade eligibility
             upgrade_info = check_level_upgrade_eligibility(publisher, user_stats)
@@ -335,13 +365,13 @@ def check_publisher_levels():
                 'L2_browsed_offers': offers_viewed > 0,
                 'L3_active_account': logins_7d > 0,
                 'L4_requested_offers': offers_requested > 0,
-                'L5_approved_offers': len(approved_offers) > 0,
+                'L5_approved_offers': approved_count > 0,
                 'L6_suspicious_activity': suspicious,
-                'L7_genuine_cleared': not suspicious and len(approved_offers) > 0 and conversions == 0,
+                'L7_genuine_cleared': not suspicious and approved_count > 0 and conversions == 0,
                 # Additional data for debugging
                 'offers_viewed': offers_viewed,
                 'offers_requested': offers_requested,
-                'approved_offers_count': len(approved_offers),
+                'approved_offers_count': approved_count,
                 'suspicious': suspicious,
                 'conversions': conversions,
                 'logins_7d': logins_7d
@@ -365,7 +395,7 @@ def check_publisher_levels():
                 'debug': {
                     'offers_viewed': offers_viewed,
                     'offers_requested': offers_requested,
-                    'approved_count': len(approved_offers),
+                    'approved_count': approved_count,
                     'logins_7d': logins_7d,
                     'suspicious': suspicious,
                     'conversions': conversions
@@ -462,22 +492,14 @@ def get_upgrade_eligible_publishers():
         # Get all approved publishers
         publishers = list(users_col.find(
             {'account_status': 'approved'},
-            {'username': 1, 'level': 1, 'email': 1}
+            {'username': 1, 'level': 1, 'email': 1, 'suspicious': 1}
         ))
         
+        stats_by_publisher = collect_level_stats(publishers)
         eligible_publishers = []
         
         for publisher in publishers:
-            # Get stats (simplified - you'll need actual stats)
-            user_stats = {
-                'offers_viewed': 0,
-                'offers_requested': 0,
-                'approved_offers': [],
-                'suspicious': False,
-                'conversions': 0,
-                'logins_7d': 0
-            }
-            
+            user_stats = stats_by_publisher[str(publisher['_id'])]
             upgrade_info = check_level_upgrade_eligibility(publisher, user_stats)
             
             if upgrade_info['qualifies_for_upgrade']:
@@ -8,10 +8,19 @@ from utils.frontend_mapping import FrontendDatabaseMapper
 from services.email_service import get_email_service
 from services.health_check_service import HealthCheckService
 from services.admin_activity_log_service import log_admin_activity
+from services.streaming_export import json_chunks, start_export, stream_response
+from services.cache_invalidation_bus import invalidate_offer_caches
+from services.offer_catalog import get_offer_catalog
+from services.network_offer_sync import (
+    get_network_offer_sync, build_import_options, apply_import_options, map_network_offers,
+    build_network_pattern, extract_partner_id, stored_partner_id
+)
 from database import db_instance
 from models.smart_link import SmartLink
+import json
 import logging
 import threading
+import time
 import uuid
 from datetime import datetime
 
@@ -121,11 +130,37 @@ def run_expired_pin_cleanup(offers_col):
         logging.error(f"Error running expired pin cleanup: {e}")
 
 
-def merge_pinned_and_organic_offers(pinned_offers, organic_query, skip_original, limit_original, sort_field, sort_dir, offers_col, projection=None):
+# GET /offers runs the pin cleanup at most this often per worker; the offer catalog
+# already treats pins past their end time as unpinned in between.
+PIN_CLEANUP_INTERVAL_SECONDS = 60
+_last_pin_cleanup = 0.0
+
+
+def run_expired_pin_cleanup_throttled(offers_col):
+    global _last_pin_cleanup
+    if time.time() - _last_pin_cleanup < PIN_CLEANUP_INTERVAL_SECONDS:
+        return
+    _last_pin_cleanup = time.time()
+    run_expired_pin_cleanup(offers_col)
+
+
+def fetch_offers_in_order(offers_col, offer_ids, projection=None):
+    """Offer documents for offer_ids (one $in query), in the order of offer_ids."""
+    if not offer_ids:
+        return []
+    by_id = {}
+    for doc in offers_col.find({'offer_id': {'$in': list(offer_ids)}}, projection):
+        by_id.setdefault(doc.get('offer_id'), doc)
+    return [by_id[offer_id] for offer_id in offer_ids if offer_id in by_id]
+
+
+def merge_pinned_and_organic_offers(pinned_offers, organic_query, skip_original, limit_original, sort_field, sort_dir, offers_col, projection=None, organic_fetch=None):
     """
     Seamlessly merges pinned offers and organic offers using a cinema-seat style
     fixed-position placement. Pinned offers are placed exactly at pinnedPosition (1-indexed).
     Offers without a pinnedPosition are prepended before organic results.
+    organic_fetch(skip, limit), when given, supplies the organic page instead of
+    querying offers_col with organic_query.
     """
     pinned_by_pos = {}
     pinned_no_pos = []  # Pinned offers without a specific position
@@ -161,19 +196,22 @@ def merge_pinned_and_organic_offers(pinned_offers, organic_query, skip_original,
                 page_slots.append(None)
         v_idx += 1
 
-    organic_query = dict(organic_query)
-    organic_query['is_pinned'] = {'$ne': True}
-
-    if projection:
-        if sort_field:
-            organic_docs = list(offers_col.find(organic_query, projection).sort([(sort_field, sort_dir)]).skip(organic_skip).limit(organic_limit))
-        else:
-            organic_docs = list(offers_col.find(organic_query, projection).skip(organic_skip).limit(organic_limit))
+    if organic_fetch is not None:
+        organic_docs = organic_fetch(organic_skip, organic_limit) if organic_limit else []
     else:
-        if sort_field:
-            organic_docs = list(offers_col.find(organic_query).sort([(sort_field, sort_dir)]).skip(organic_skip).limit(organic_limit))
+        organic_query = dict(organic_query)
+        organic_query['is_pinned'] = {'$ne': True}
+
+        if projection:
+            if sort_field:
+                organic_docs = list(offers_col.find(organic_query, projection).sort([(sort_field, sort_dir)]).skip(organic_skip).limit(organic_limit))
+            else:
+                organic_docs = list(offers_col.find(organic_query, projection).skip(organic_skip).limit(organic_limit))
         else:
-            organic_docs = list(offers_col.find(organic_query).skip(organic_skip).limit(organic_limit))
+            if sort_field:
+                organic_docs = list(offers_col.find(organic_query).sort([(sort_field, sort_dir)]).skip(organic_skip).limit(organic_limit))
+            else:
+                organic_docs = list(offers_col.find(organic_query).skip(organic_skip).limit(organic_limit))
 
     final_offers = []
     # Prepend pinned-without-position on page 1 only
@@ -736,25 +774,29 @@ def export_offers():
             filters['search'] = search
         
         # Get total count first
-        _, total = offer_model.get_offers(filters, 0, 1)
+        total = offer_model.count_offers(filters)
         
         if export_type == 'all':
-            # Fetch all offers (no limit)
-            offers, _ = offer_model.get_offers(filters, 0, total if total > 0 else 10000)
+            # Stream all offers (no limit)
+            skip, limit = 0, 0
         else:
-            # Fetch range
-            limit = end - start if end > start else 100
-            offers, _ = offer_model.get_offers(filters, start, limit)
+            # Stream range
+            skip, limit = start, (end - start if end > start else 100)
         
-        return safe_json_response({
-            'offers': offers,
-            'total': total,
-            'exported_count': len(offers),
-            'range': {
-                'start': start,
-                'end': start + len(offers)
-            }
-        })
+        # Offers are streamed from a batched cursor, so exporting the whole
+        # catalog never holds more than one batch in memory
+        progress = start_export('offers_export', total if export_type == 'all' else limit)
+        offers = (serialize_for_json(offer) for offer in offer_model.iter_offers(filters, skip, limit))
+        
+        def suffix(count):
+            return '], ' + json.dumps({
+                'total': total,
+                'exported_count': count,
+                'range': {'start': skip, 'end': skip + count}
+            })[1:]
+        
+        return stream_response(json_chunks(offers, progress, prefix='{"offers": [', suffix=suffix),
+                               None, 'application/json', progress)
         
     except Exception as e:
         logging.error(f"Export offers error: {str(e)}", exc_info=True)
@@ -1242,6 +1284,56 @@ def check_offers_running():
 
 
 
+# Admin grid category filter — each key maps to a list of accepted values in DB
+CATEGORY_MAPPINGS = {
+    'HEALTH':       ['HEALTH', 'HEALTHCARE', 'MEDICAL'],
+    'SURVEY':       ['SURVEY', 'SURVEYS'],
+    'SWEEPSTAKES':  ['SWEEPSTAKES', 'SWEEPS', 'GIVEAWAY', 'PRIZE', 'LOTTERY', 'RAFFLE', 'CONTEST'],
+    'EDUCATION':    ['EDUCATION', 'LEARNING'],
+    'INSURANCE':    ['INSURANCE'],
+    'LOAN':         ['LOAN', 'LOANS', 'LENDING'],
+    'FINANCE':      ['FINANCE', 'FINANCIAL'],
+    'DATING':       ['DATING', 'RELATIONSHIPS'],
+    'FREE_TRIAL':   ['FREE_TRIAL', 'FREETRIAL', 'TRIAL'],
+    'INSTALLS':     ['INSTALLS', 'INSTALL', 'APP', 'APPS'],
+    'GAMES_INSTALL':['GAMES_INSTALL', 'GAMESINSTALL', 'GAME', 'GAMES', 'GAMING'],
+}
+
+# Health filter values answered by a plain field condition (no health evaluation)
+FLAG_HEALTH_FILTERS = ('has_levels', 'in_offerwall', 'offerwall_exclusive', 'ai_refined', 'not_refined', 'bulk_refined')
+
+
+def _select_from_offer_catalog(filters, offer_source, sort_by, sort_dir):
+    """
+    Run the grid filters against the in-memory offer catalog; None while it is
+    loading or on error. The catalog is started by the first grid request a
+    worker handles, so workers that never serve the admin grid don't hold it.
+    """
+    catalog = get_offer_catalog()
+    catalog.start()
+    if not catalog.is_ready():
+        return None
+    health = filters.get('health')
+    categories = filters.get('categories')
+    countries = [c.strip().upper() for c in (filters.get('country') or '').split(',') if c.strip()]
+    try:
+        return catalog.select(
+            status=filters.get('status'),
+            network=filters.get('network'),
+            search=filters.get('search'),
+            category_aliases=CATEGORY_MAPPINGS.get(categories.upper(), [categories.upper()]) if categories else None,
+            countries=countries or None,
+            offer_source=offer_source,
+            flag=health if health in FLAG_HEALTH_FILTERS else None,
+            sort_by=sort_by,
+            sort_dir=sort_dir,
+            category_facets=CATEGORY_MAPPINGS
+        )
+    except Exception as e:
+        logging.warning(f"Offer catalog query failed, falling back to Mongo: {e}")
+        return None
+
+
 @admin_offers_bp.route('/offers', methods=['GET'])
 @token_required
 @subadmin_or_admin_required('offers')
@@ -1257,6 +1349,10 @@ def get_offers():
         categories = request.args.get('categories')  # e.g. "GAMES_INSTALL"
         country = request.args.get('country')         # e.g. "US"
         health_filter = request.args.get('health')    # healthy / unhealthy / no_image / etc.
+        sort_by = request.args.get('sort_by', 'created_at')
+        if sort_by not in ('created_at', 'payout'):
+            sort_by = 'created_at'
+        sort_dir = 1 if request.args.get('sort_order') == 'asc' else -1
         
         # Build filters
         filters = {}
@@ -1281,198 +1377,199 @@ def get_offers():
         if offers_col is None:
             return jsonify({'error': 'Database connection failed'}), 500
 
+        offer_source = request.args.get('offer_source')
+
+        # Filter, count and facet in memory when the offer catalog is loaded; only the page is read from Mongo
+        selection = _select_from_offer_catalog(filters, offer_source, sort_by, sort_dir)
+
         # Run expired pin cleanup first
-        run_expired_pin_cleanup(offers_col)
+        if selection is None:
+            run_expired_pin_cleanup(offers_col)
+        else:
+            run_expired_pin_cleanup_throttled(offers_col)
 
-        # Category mappings — each key maps to a list of accepted values in DB
-        CATEGORY_MAPPINGS = {
-            'HEALTH':       ['HEALTH', 'HEALTHCARE', 'MEDICAL'],
-            'SURVEY':       ['SURVEY', 'SURVEYS'],
-            'SWEEPSTAKES':  ['SWEEPSTAKES', 'SWEEPS', 'GIVEAWAY', 'PRIZE', 'LOTTERY', 'RAFFLE', 'CONTEST'],
-            'EDUCATION':    ['EDUCATION', 'LEARNING'],
-            'INSURANCE':    ['INSURANCE'],
-            'LOAN':         ['LOAN', 'LOANS', 'LENDING'],
-            'FINANCE':      ['FINANCE', 'FINANCIAL'],
-            'DATING':       ['DATING', 'RELATIONSHIPS'],
-            'FREE_TRIAL':   ['FREE_TRIAL', 'FREETRIAL', 'TRIAL'],
-            'INSTALLS':     ['INSTALLS', 'INSTALL', 'APP', 'APPS'],
-            'GAMES_INSTALL':['GAMES_INSTALL', 'GAMESINSTALL', 'GAME', 'GAMES', 'GAMING'],
-        }
+        if selection is not None:
+            query = None
+            pinned_offers = fetch_offers_in_order(offers_col, selection.pinned_ids)
+            if filters.get('health') in FLAG_HEALTH_FILTERS:
+                del filters['health']
+        else:
+            def build_category_condition(cat_key):
+                """Build a MongoDB $or condition matching any alias of the category."""
+                import re as _re
+                aliases = CATEGORY_MAPPINGS.get(cat_key.upper(), [cat_key.upper()])
+                pattern = '|'.join(f'^{a}$' for a in aliases)
+                return {'$or': [
+                    {'categories': {'$elemMatch': {'$in': [_re.compile(f'^{a}$', _re.IGNORECASE) for a in aliases]}}},
+                    {'vertical':   {'$regex': pattern, '$options': 'i'}},
+                    {'category':   {'$regex': pattern, '$options': 'i'}},
+                ]}
 
-        def build_category_condition(cat_key):
-            """Build a MongoDB $or condition matching any alias of the category."""
-            import re as _re
-            aliases = CATEGORY_MAPPINGS.get(cat_key.upper(), [cat_key.upper()])
-            pattern = '|'.join(f'^{a}$' for a in aliases)
-            return {'$or': [
-                {'categories': {'$elemMatch': {'$in': [_re.compile(f'^{a}$', _re.IGNORECASE) for a in aliases]}}},
-                {'vertical':   {'$regex': pattern, '$options': 'i'}},
-                {'category':   {'$regex': pattern, '$options': 'i'}},
-            ]}
-
-        # Build mongo query matches from filters
-        query = {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]}
-        offer_source = request.args.get('offer_source')
-        if offer_source == 'advertiser':
-            query['offer_source'] = 'advertiser'
-        elif offer_source == 'upward_partner':
-            query['offer_source'] = {'$ne': 'advertiser'}
-        if filters:
-            if filters.get('status'):
-                query['status'] = filters['status']
-            if filters.get('network'):
-                query['network'] = {'$regex': filters['network'], '$options': 'i'}
-            if filters.get('categories'):
-                cat_cond = build_category_condition(filters['categories'])
-                existing = dict(query)
-                query = {'$and': [existing, cat_cond]}
-            if filters.get('country'):
-                country_codes = [c.strip().upper() for c in filters['country'].split(',') if c.strip()]
-                if country_codes:
-                    country_conditions = []
-                    for cc in country_codes:
-                        country_conditions.append({'countries': {'$regex': f'^{cc}$', '$options': 'i'}})
-                        country_conditions.append({'allowed_countries': {'$regex': f'^{cc}$', '$options': 'i'}})
-                    existing = dict(query)
-                    query = {'$and': [existing, {'$or': country_conditions}]}
-            if filters.get('search'):
-                search_regex = {'$regex': filters['search'], '$options': 'i'}
-                existing = dict(query)
-                query = {
-                    '$and': [
-                        existing,
-                        {'$or': [
-                            {'name': search_regex},
-                            {'campaign_id': search_regex},
-                            {'offer_id': search_regex},
-                            {'categories': search_regex}
-                        ]}
-                    ]
-                }
+            # Build mongo query matches from filters
+            query = {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]}
+            if offer_source == 'advertiser':
+                query['offer_source'] = 'advertiser'
+            elif offer_source == 'upward_partner':
+                query['offer_source'] = {'$ne': 'advertiser'}
+            if filters:
                 if filters.get('status'):
-                    query['$and'].append({'status': filters['status']})
+                    query['status'] = filters['status']
                 if filters.get('network'):
-                    query['$and'].append({'network': {'$regex': filters['network'], '$options': 'i'}})
-
-        # Fetch active pinned offers that match filters
-        pinned_query = dict(query)
-        pinned_query['is_pinned'] = True
-        pinned_offers = list(offers_col.find(pinned_query).limit(50))
-
-        # --- "Has Levels" filter: direct DB query, no health evaluation needed ---
-        if filters.get('health') == 'has_levels':
-            # Add level_payouts.enabled condition to query
-            level_condition = {'level_payouts.enabled': True}
-            if '$and' in query:
-                query['$and'].append(level_condition)
-            else:
-                existing = dict(query)
-                query = {'$and': [existing, level_condition]}
-            
-            # Remove health from filters so it doesn't go into the health pipeline
-            del filters['health']
-            
-            # Re-fetch pinned with level condition
+                    query['network'] = {'$regex': filters['network'], '$options': 'i'}
+                if filters.get('categories'):
+                    cat_cond = build_category_condition(filters['categories'])
+                    existing = dict(query)
+                    query = {'$and': [existing, cat_cond]}
+                if filters.get('country'):
+                    country_codes = [c.strip().upper() for c in filters['country'].split(',') if c.strip()]
+                    if country_codes:
+                        country_conditions = []
+                        for cc in country_codes:
+                            country_conditions.append({'countries': {'$regex': f'^{cc}$', '$options': 'i'}})
+                            country_conditions.append({'allowed_countries': {'$regex': f'^{cc}$', '$options': 'i'}})
+                        existing = dict(query)
+                        query = {'$and': [existing, {'$or': country_conditions}]}
+                if filters.get('search'):
+                    search_regex = {'$regex': filters['search'], '$options': 'i'}
+                    existing = dict(query)
+                    query = {
+                        '$and': [
+                            existing,
+                            {'$or': [
+                                {'name': search_regex},
+                                {'campaign_id': search_regex},
+                                {'offer_id': search_regex},
+                                {'categories': search_regex}
+                            ]}
+                        ]
+                    }
+                    if filters.get('status'):
+                        query['$and'].append({'status': filters['status']})
+                    if filters.get('network'):
+                        query['$and'].append({'network': {'$regex': filters['network'], '$options': 'i'}})
+
+            # Fetch active pinned offers that match filters
             pinned_query = dict(query)
             pinned_query['is_pinned'] = True
             pinned_offers = list(offers_col.find(pinned_query).limit(50))
 
-        # --- "In Offerwall" filter: matches the exact offerwall query logic ---
-        if filters.get('health') == 'in_offerwall':
-            offerwall_conditions = [
-                {'$or': [{'show_in_offerwall': True}, {'show_in_offerwall': {'$exists': False}}]},
-                {'$or': [{'is_active': True}, {'is_active': {'$exists': False}}]},
-                {'status': {'$in': ['active', 'running', 'rotating']}}
-            ]
-            if '$and' in query:
-                query['$and'].extend(offerwall_conditions)
-            else:
-                existing = dict(query)
-                query = {'$and': [existing] + offerwall_conditions}
+            # --- "Has Levels" filter: direct DB query, no health evaluation needed ---
+            if filters.get('health') == 'has_levels':
+                # Add level_payouts.enabled condition to query
+                level_condition = {'level_payouts.enabled': True}
+                if '$and' in query:
+                    query['$and'].append(level_condition)
+                else:
+                    existing = dict(query)
+                    query = {'$and': [existing, level_condition]}
             
-            del filters['health']
+                # Remove health from filters so it doesn't go into the health pipeline
+                del filters['health']
             
-            pinned_query = dict(query)
-            pinned_query['is_pinned'] = True
-            pinned_offers = list(offers_col.find(pinned_query).limit(50))
-
-        # --- "Offerwall Exclusive" filter: direct DB query ---
-        if filters.get('health') == 'offerwall_exclusive':
-            exclusive_condition = {'offerwall_exclusive': True}
-            if '$and' in query:
-                query['$and'].append(exclusive_condition)
-            else:
-                existing = dict(query)
-                query = {'$and': [existing, exclusive_condition]}
+                # Re-fetch pinned with level condition
+                pinned_query = dict(query)
+                pinned_query['is_pinned'] = True
+                pinned_offers = list(offers_col.find(pinned_query).limit(50))
+
+            # --- "In Offerwall" filter: matches the exact offerwall query logic ---
+            if filters.get('health') == 'in_offerwall':
+                offerwall_conditions = [
+                    {'$or': [{'show_in_offerwall': True}, {'show_in_offerwall': {'$exists': False}}]},
+                    {'$or': [{'is_active': True}, {'is_active': {'$exists': False}}]},
+                    {'status': {'$in': ['active', 'running', 'rotating']}}
+                ]
+                if '$and' in query:
+                    query['$and'].extend(offerwall_conditions)
+                else:
+                    existing = dict(query)
+                    query = {'$and': [existing] + offerwall_conditions}
             
-            del filters['health']
+                del filters['health']
             
-            pinned_query = dict(query)
-            pinned_query['is_pinned'] = True
-            pinned_offers = list(offers_col.find(pinned_query).limit(50))
-
-        # --- "AI Refined" filter: offers refined via admin dialog ---
-        if filters.get('health') == 'ai_refined':
-            refined_condition = {'refined_via_admin': True}
-            if '$and' in query:
-                query['$and'].append(refined_condition)
-            else:
-                existing = dict(query)
-                query = {'$and': [existing, refined_condition]}
+                pinned_query = dict(query)
+                pinned_query['is_pinned'] = True
+                pinned_offers = list(offers_col.find(pinned_query).limit(50))
+
+            # --- "Offerwall Exclusive" filter: direct DB query ---
+            if filters.get('health') == 'offerwall_exclusive':
+                exclusive_condition = {'offerwall_exclusive': True}
+                if '$and' in query:
+                    query['$and'].append(exclusive_condition)
+                else:
+                    existing = dict(query)
+                    query = {'$and': [existing, exclusive_condition]}
             
-            del filters['health']
+                del filters['health']
             
-            pinned_query = dict(query)
-            pinned_query['is_pinned'] = True
-            pinned_offers = list(offers_col.find(pinned_query).limit(50))
-
-        # --- "Not Refined" filter: offers not refined via admin ---
-        if filters.get('health') == 'not_refined':
-            not_refined_condition = {'$and': [
-                {'$or': [
-                    {'refined_via_admin': {'$exists': False}},
-                    {'refined_via_admin': False},
-                    {'refined_via_admin': None},
-                ]},
-                {'$or': [
-                    {'refinement_count': {'$exists': False}},
-                    {'refinement_count': 0},
-                    {'refinement_count': None},
+                pinned_query = dict(query)
+                pinned_query['is_pinned'] = True
+                pinned_offers = list(offers_col.find(pinned_query).limit(50))
+
+            # --- "AI Refined" filter: offers refined via admin dialog ---
+            if filters.get('health') == 'ai_refined':
+                refined_condition = {'refined_via_admin': True}
+                if '$and' in query:
+                    query['$and'].append(refined_condition)
+                else:
+                    existing = dict(query)
+                    query = {'$and': [existing, refined_condition]}
+            
+                del filters['health']
+            
+                pinned_query = dict(query)
+                pinned_query['is_pinned'] = True
+                pinned_offers = list(offers_col.find(pinned_query).limit(50))
+
+            # --- "Not Refined" filter: offers not refined via admin ---
+            if filters.get('health') == 'not_refined':
+                not_refined_condition = {'$and': [
+                    {'$or': [
+                        {'refined_via_admin': {'$exists': False}},
+                        {'refined_via_admin': False},
+                        {'refined_via_admin': None},
+                    ]},
+                    {'$or': [
+                        {'refinement_count': {'$exists': False}},
+                        {'refinement_count': 0},
+                        {'refinement_count': None},
+                    ]}
                 ]}
-            ]}
-            if '$and' in query:
-                query['$and'].append(not_refined_condition)
-            else:
-                existing = dict(query)
-                query = {'$and': [existing, not_refined_condition]}
+                if '$and' in query:
+                    query['$and'].append(not_refined_condition)
+                else:
+                    existing = dict(query)
+                    query = {'$and': [existing, not_refined_condition]}
             
-            del filters['health']
+                del filters['health']
             
-            pinned_query = dict(query)
-            pinned_query['is_pinned'] = True
-            pinned_offers = list(offers_col.find(pinned_query).limit(50))
-
-        # --- "Bulk Refined" filter: offers that were bulk-refined and pending review ---
-        if filters.get('health') == 'bulk_refined':
-            bulk_refined_condition = {'bulk_refined': True}
-            if '$and' in query:
-                query['$and'].append(bulk_refined_condition)
-            else:
-                existing = dict(query)
-                query = {'$and': [existing, bulk_refined_condition]}
+                pinned_query = dict(query)
+                pinned_query['is_pinned'] = True
+                pinned_offers = list(offers_col.find(pinned_query).limit(50))
+
+            # --- "Bulk Refined" filter: offers that were bulk-refined and pending review ---
+            if filters.get('health') == 'bulk_refined':
+                bulk_refined_condition = {'bulk_refined': True}
+                if '$and' in query:
+                    query['$and'].append(bulk_refined_condition)
+                else:
+                    existing = dict(query)
+                    query = {'$and': [existing, bulk_refined_condition]}
             
-            del filters['health']
+                del filters['health']
             
-            pinned_query = dict(query)
-            pinned_query['is_pinned'] = True
-            pinned_offers = list(offers_col.find(pinned_query).limit(50))
+                pinned_query = dict(query)
+                pinned_query['is_pinned'] = True
+                pinned_offers = list(offers_col.find(pinned_query).limit(50))
 
         # --- Health filter requires fetching all matches, evaluating, then paginating ---
         if filters.get('health'):
             # Fetch matching offers with a reasonable limit to avoid timeout
-            all_organic_query = dict(query)
-            all_organic_query['is_pinned'] = {'$ne': True}
-            all_organic = list(offers_col.find(all_organic_query).sort('created_at', -1).limit(500))
+            if selection is not None:
+                all_organic = fetch_offers_in_order(offers_col, selection.organic_ids(0, 500))
+            else:
+                all_organic_query = dict(query)
+                all_organic_query['is_pinned'] = {'$ne': True}
+                all_organic = list(offers_col.find(all_organic_query).sort(sort_by, sort_dir).limit(500))
             all_offers = pinned_offers + all_organic
 
             # Convert ObjectIds
@@ -1514,7 +1611,7 @@ def get_offers():
             total = len(all_offers)
             offers = all_offers[skip: skip + per_page]
 
-            return safe_json_response({
+            response = {
                 'offers': offers,
                 'pagination': {
                     'page': page,
@@ -1522,7 +1619,10 @@ def get_offers():
                     'total': total,
                     'pages': (total + per_page - 1) // per_page if per_page else 1
                 }
-            })
+            }
+            if selection is not None:
+                response['facets'] = selection.facets
+            return safe_json_response(response)
 
         # Merge them
         offers = merge_pinned_and_organic_offers(
@@ -1530,9 +1630,14 @@ def get_offers():
             organic_query=query,
             skip_original=skip,
             limit_original=per_page,
-            sort_field='created_at',
-            sort_dir=-1,
-            offers_col=offers_col
+            sort_field=sort_by,
+            sort_dir=sort_dir,
+            offers_col=offers_col,
+            organic_fetch=(
+                (lambda organic_skip, organic_limit: fetch_offers_in_order(
+                    offers_col, selection.organic_ids(organic_skip, organic_limit)))
+                if selection is not None else None
+            )
         )
 
         for offer in offers:
@@ -1583,10 +1688,13 @@ def get_offers():
                         offer['advertiser_name'] = 'Unknown'
 
         # Calculate accurate totals
-        organic_query = dict(query)
-        organic_query['is_pinned'] = {'$ne': True}
-        total_organic = offers_col.count_documents(organic_query)
-        total = total_organic + len(pinned_offers)
+        if selection is not None:
+            total = selection.organic_total + len(pinned_offers)
+        else:
+            organic_query = dict(query)
+            organic_query['is_pinned'] = {'$ne': True}
+            total_organic = offers_col.count_documents(organic_query)
+            total = total_organic + len(pinned_offers)
         
         # Attach health status to each offer
         try:
@@ -1597,7 +1705,7 @@ def get_offers():
         except Exception as e:
             logging.warning(f"Health check failed for admin offers: {e}")
         
-        return safe_json_response({
+        response = {
             'offers': offers,
             'pagination': {
                 'page': page,
@@ -1605,7 +1713,10 @@ def get_offers():
                 'total': total,
                 'pages': (total + per_page - 1) // per_page
             }
-        })
+        }
+        if selection is not None:
+            response['facets'] = selection.facets
+        return safe_json_response(response)
         
     except Exception as e:
         logging.error(f"Get offers error: {str(e)}", exc_info=True)
@@ -1617,6 +1728,10 @@ def get_offers():
 def get_networks():
     """Return distinct network values from the offers collection."""
     try:
+        catalog = get_offer_catalog()
+        if catalog.is_ready():
+            return jsonify({'networks': catalog.networks()})
+
         offers_collection = db_instance.get_collection('offers')
         if offers_collection is None:
             return jsonify({'error': 'Database connection failed'}), 500
@@ -2038,6 +2153,7 @@ def bulk_delete_offers():
                 }
             }
         )
+        invalidate_offer_caches(offer_ids)
         
         deleted_count = result.modified_count
         failed_count = len(offer_ids) - deleted_count
@@ -2110,6 +2226,7 @@ def bulk_update_status():
             query,
             {'$set': update_set}
         )
+        invalidate_offer_caches(offer_ids)
 
         # Log activity
         log_admin_activity(
@@ -2167,6 +2284,7 @@ def bulk_update_payout():
             query,
             {'$set': {'payout': new_payout, 'updated_at': datetime.utcnow()}}
         )
+        invalidate_offer_caches(offer_ids)
 
         log_admin_activity(
             action='bulk_payout_update',
@@ -3417,6 +3535,7 @@ def clear_all_offers():
                 }
             }
         )
+        invalidate_offer_caches(all_ids)
 
         # Cascade cleanup: remove from user requests, notifications, etc.
         if all_ids:
@@ -3475,6 +3594,7 @@ def bulk_restore_offers():
                 }
             }
         )
+        invalidate_offer_caches(offer_ids)
         
         restored_count = result.modified_count
         failed_count = len(offer_ids) - restored_count
@@ -3741,22 +3861,29 @@ def assign_promo_code_to_offer(offer_id):
 @token_required
 @subadmin_or_admin_required('offers')
 def bulk_upload_offers_async():
-    """Async bulk upload offers with background processing and real-time progress tracking"""
+    """
+    Async bulk upload offers with background processing and real-time progress tracking.
+    
+    Uploaded files are streamed: the background job reads, validates, checks
+    duplicates for and inserts BULK_UPLOAD_CHUNK_SIZE rows at a time and updates
+    the job document after every chunk, so memory stays flat for files of any size.
+    """
     import os
     import tempfile
     from werkzeug.utils import secure_filename
     from utils.bulk_offer_upload import (
-        parse_excel_file,
-        parse_csv_file,
         fetch_google_sheet,
+        iter_spreadsheet_rows,
+        estimate_spreadsheet_rows,
     )
 
     try:
         user = request.current_user
         options = {}
-        rows = []
+        rows = None
+        temp_path = None
 
-        # STEP 1: Parse file/URL only (fast) — no validation yet
+        # STEP 1: Fetch the sheet URL, or store the uploaded file for the background job
         if request.content_type and 'application/json' in request.content_type:
             data = request.get_json()
             sheet_url = data.get('url')
@@ -3767,6 +3894,9 @@ def bulk_upload_offers_async():
             rows, error = fetch_google_sheet(sheet_url)
             if error:
                 return jsonify({'error': error}), 400
+            if not rows:
+                return jsonify({'error': 'No rows found in file'}), 400
+            total_estimate = len(rows)
         else:
             if 'file' not in request.files:
                 return jsonify({'error': 'No file uploaded'}), 400
@@ -3783,25 +3913,23 @@ def bulk_upload_offers_async():
             file_ext = os.path.splitext(filename)[1].lower()
             if file_ext not in ['.xlsx', '.xls', '.csv']:
                 return jsonify({'error': 'Only Excel (.xlsx, .xls) and CSV files are supported'}), 400
-            temp_dir = tempfile.gettempdir()
-            temp_path = os.path.join(temp_dir, filename)
+            fd, temp_path = tempfile.mkstemp(suffix=file_ext, prefix='bulk_upload_')
+            os.close(fd)
             file.save(temp_path)
-            try:
-                logging.info(f"📊 [ASYNC] Parsing file: {filename}")
-                if file_ext in ['.xlsx', '.xls']:
-                    rows, error = parse_excel_file(temp_path)
-                else:
-                    rows, error = parse_csv_file(temp_path)
-                if error:
-                    return jsonify({'error': error}), 400
-            finally:
-                try:
-                    os.remove(temp_path)
-                except Exception:
-                    pass
 
-        if not rows:
-            return jsonify({'error': 'No rows found in file'}), 400
+            # Read just the header and first row so unreadable/empty files still fail fast
+            try:
+                first_row = next(iter_spreadsheet_rows(temp_path), None)
+            except Exception as e:
+                os.remove(temp_path)
+                kind = 'Excel' if file_ext in ['.xlsx', '.xls'] else 'CSV'
+                logging.error(f"{kind} parsing error: {str(e)}", exc_info=True)
+                return jsonify({'error': f'Error parsing {kind} file: {str(e)}'}), 400
+            if first_row is None:
+                os.remove(temp_path)
+                return jsonify({'error': 'No rows found in file'}), 400
+            total_estimate = estimate_spreadsheet_rows(temp_path)
+            logging.info(f"📊 [ASYNC] Stored {filename} for streaming (~{total_estimate} rows)")
 
         # STEP 2: Create job immediately — return fast
         job_id = str(uuid.uuid4())[:8]
@@ -3809,10 +3937,11 @@ def bulk_upload_offers_async():
         job_doc = {
             'job_id': job_id,
             'status': 'validating',
-            'total': len(rows),
+            'total': total_estimate,
             'processed': 0,
             'succeeded': 0,
             'failed': 0,
+            'chunks_done': 0,
             'current_offer': 'Validating spreadsheet...',
             'errors': [],
             'created_ids': [],
@@ -3823,60 +3952,21 @@ def bulk_upload_offers_async():
         }
         jobs_col.insert_one(job_doc)
 
-        # STEP 3: ALL heavy work in background thread
-        def process_in_background(raw_rows, user_id, jid, opts):
+        # STEP 3: ALL heavy work in background thread, one chunk of rows at a time
+        def process_in_background(raw_rows, file_path, user_id, jid, opts):
+            _jobs_col = None
             try:
                 from database import db_instance as _db
-                from utils.bulk_offer_upload import validate_spreadsheet_data
-                from utils.bulk_operations import get_bulk_offer_processor
+                from utils.bulk_offer_upload import (
+                    BULK_UPLOAD_CHUNK_SIZE,
+                    bulk_create_offers,
+                    chunked,
+                    iter_spreadsheet_rows,
+                    iter_validated_rows,
+                )
 
                 _jobs_col = _db.get_collection('bulk_upload_jobs')
 
-                # --- Validation phase ---
-                _jobs_col.update_one({'job_id': jid}, {'$set': {'current_offer': 'Validating & mapping fields...'}})
-                logging.info(f"🔍 [ASYNC-BG] Validating {len(raw_rows)} rows...")
-
-                valid_rows, error_rows, missing_rows = validate_spreadsheet_data(raw_rows, store_missing=True)
-                logging.info(f"✅ [ASYNC-BG] Validated: {len(valid_rows)} valid, {len(error_rows)} errors")
-
-                skip_invalid = opts.get('skip_invalid_rows', False)
-                if not valid_rows:
-                    # Build detailed error info for the user
-                    validation_errors = []
-                    for er in (error_rows + missing_rows)[:50]:
-                        row_num = er.get('row', er.get('row_number', '?'))
-                        name = er.get('data', {}).get('name', '') or er.get('data', {}).get('title', '') or 'Unknown'
-                        missing = er.get('missing_fields', [])
-                        errs = er.get('errors', [])
-                        reason = ', '.join(errs) if errs else f"Missing: {', '.join(missing)}" if missing else 'Validation failed'
-                        validation_errors.append({'row': row_num, 'name': name, 'error': reason})
-                    _jobs_col.update_one({'job_id': jid}, {'$set': {
-                        'status': 'failed', 'current_offer': '',
-                        'validation_errors_count': len(error_rows) + len(missing_rows),
-                        'missing_data_count': len(missing_rows),
-                        'validation_errors_sample': validation_errors,
-                        'errors': validation_errors[:10] if validation_errors else [{'error': f'No valid rows. {len(error_rows)} errors, {len(missing_rows)} missing data.'}]
-                    }})
-                    return
-
-                # Always proceed with valid rows, skip invalid ones
-                if error_rows or missing_rows:
-                    logging.info(f"⚠️ [ASYNC-BG] Skipping {len(error_rows)} errors + {len(missing_rows)} missing, proceeding with {len(valid_rows)} valid rows")
-                    # Store validation stats so frontend can show them
-                    validation_errors = []
-                    for er in (error_rows + missing_rows)[:50]:
-                        row_num = er.get('row', er.get('row_number', '?'))
-                        name = er.get('data', {}).get('name', '') or er.get('data', {}).get('title', '') or 'Unknown'
-                        missing = er.get('missing_fields', [])
-                        errs = er.get('errors', [])
-                        reason = ', '.join(errs) if errs else f"Missing: {', '.join(missing)}" if missing else 'Validation failed'
-                        validation_errors.append({'row': row_num, 'name': name, 'error': reason})
-                    _jobs_col.update_one({'job_id': jid}, {'$set': {
-                        'validation_errors_count': len(error_rows) + len(missing_rows),
-                        'validation_errors_sample': validation_errors,
-                        'missing_data_count': len(missing_rows),
-                    }})
-
                 # --- Apply options ---
                 approval_type = opts.get('approval_type', 'auto_approve')
                 if approval_type in ['direct', 'instant', 'immediate', 'auto']: approval_type = 'auto_approve'
@@ -3896,7 +3986,7 @@ def bulk_upload_offers_async():
                 show_in_offerwall = opts.get('show_in_offerwall', True)
                 dup_strategy = opts.get('duplicate_strategy', 'skip')
 
-                for row in valid_rows:
+                def apply_options(row):
                     row['show_in_offerwall'] = show_in_offerwall
                     row['status'] = default_status
                     if opts.get('approval_type'):
@@ -3906,52 +3996,89 @@ def bulk_upload_offers_async():
                         row['require_approval'] = require_approval
                         if require_approval: row['affiliates'] = 'request'
 
-                # --- Processing phase ---
+                def summarize_invalid(er):
+                    row_num = er.get('row', er.get('row_number', '?'))
+                    name = er.get('data', {}).get('name', '') or er.get('data', {}).get('title', '') or 'Unknown'
+                    missing = er.get('missing_fields', [])
+                    errs = er.get('errors', [])
+                    reason = ', '.join(errs) if errs else f"Missing: {', '.join(missing)}" if missing else 'Validation failed'
+                    return {'row': row_num, 'name': name, 'error': reason}
+
+                _jobs_col.update_one({'job_id': jid}, {'$set': {'status': 'processing', 'current_offer': 'Validating & mapping fields...'}})
+
+                source = raw_rows if raw_rows is not None else iter_spreadsheet_rows(file_path)
+                counts = {'raw': 0, 'valid': 0, 'error': 0, 'missing': 0}
+                validation_errors = []  # first 50 only, for the status endpoint
+
+                for chunk_no, chunk in enumerate(chunked(iter_validated_rows(source, store_missing=True), BULK_UPLOAD_CHUNK_SIZE), start=1):
+                    # --- Validation phase (this chunk) ---
+                    valid_rows = []
+                    for kind, entry in chunk:
+                        counts['raw'] += 1
+                        counts[kind] += 1
+                        if kind == 'valid':
+                            apply_options(entry)
+                            valid_rows.append(entry)
+                        elif len(validation_errors) < 50:
+                            validation_errors.append(summarize_invalid(entry))
+
+                    # --- Processing phase (this chunk) ---
+                    created_ids, skipped, errors = [], [], []
+                    name = ''
+                    if valid_rows:
+                        name = valid_rows[-1].get('name', '')
+                        created_ids, chunk_errors, chunk_skipped = bulk_create_offers(valid_rows, user_id, dup_strategy)
+                        skipped = [{
+                            'row': s['row'], 'name': s.get('data', {}).get('name', ''),
+                            'reason': s['reason'], 'existing_offer_id': s.get('existing_offer_id'),
+                        } for s in chunk_skipped]
+                        errors = [{
+                            'row': e['row'], 'name': e.get('data', {}).get('name', ''), 'error': e['error'],
+                        } for e in chunk_errors]
+
+                    update = {
+                        '$inc': {
+                            'processed': len(chunk),
+                            'succeeded': len(created_ids),
+                            'failed': len(skipped) + len(errors),
+                            'validation_skipped': len(chunk) - len(valid_rows),
+                            'chunks_done': 1,
+                        },
+                        '$max': {'total': counts['raw']},  # the up-front row count is only an estimate
+                        '$set': {
+                            'current_offer': name,
+                            'valid_count': counts['valid'],
+                            'validation_errors_count': counts['error'] + counts['missing'],
+                            'missing_data_count': counts['missing'],
+                            'validation_errors_sample': validation_errors,
+                        },
+                    }
+                    push = {}
+                    if created_ids:
+                        push['created_ids'] = {'$each': created_ids}
+                    if skipped:
+                        push['skipped_duplicates'] = {'$each': skipped}
+                    if errors:
+                        push['errors'] = {'$each': errors, '$slice': -200}
+                    if push:
+                        update['$push'] = push
+                    _jobs_col.update_one({'job_id': jid}, update)
+                    logging.info(f"📦 [ASYNC-BG] Job {jid} chunk {chunk_no}: {counts['raw']} rows read, {len(created_ids)} created, {len(skipped)} duplicates, {len(errors)} errors")
+
+                if not counts['valid']:
+                    _jobs_col.update_one({'job_id': jid}, {'$set': {
+                        'status': 'failed', 'current_offer': '',
+                        'total': counts['raw'], 'total_raw': counts['raw'],
+                        'completed_at': datetime.utcnow(),
+                        'errors': validation_errors[:10] if validation_errors else [{'error': f"No valid rows. {counts['error']} errors, {counts['missing']} missing data."}]
+                    }})
+                    return
+
                 _jobs_col.update_one({'job_id': jid}, {'$set': {
-                    'status': 'processing', 'total': len(valid_rows),
-                    'total_raw': len(raw_rows),
-                    'valid_count': len(valid_rows),
-                    'validation_skipped': len(error_rows) + len(missing_rows),
-                    'current_offer': 'Starting offer creation...'
+                    'status': 'completed', 'completed_at': datetime.utcnow(), 'current_offer': '',
+                    'total': counts['raw'], 'total_raw': counts['raw'],
                 }})
-
-                processor = get_bulk_offer_processor(_db)
-                duplicates_map = processor.bulk_check_duplicates(valid_rows)
-
-                for i, offer_data in enumerate(valid_rows):
-                    try:
-                        row_number = offer_data.pop('_row_number', i + 1)
-                        name = offer_data.get('name', f'Row {row_number}')
-                        _jobs_col.update_one({'job_id': jid}, {'$set': {'current_offer': name}})
-
-                        is_dup, existing_id, _ = processor.is_duplicate(offer_data, duplicates_map)
-                        if is_dup and dup_strategy == 'skip':
-                            _jobs_col.update_one({'job_id': jid}, {
-                                '$inc': {'processed': 1, 'failed': 1},
-                                '$push': {'skipped_duplicates': {'row': row_number, 'name': name, 'reason': 'duplicate', 'existing_offer_id': existing_id}}
-                            })
-                            continue
-
-                        prepared = processor._prepare_offer_for_insert(offer_data, user_id, row_number)
-                        if prepared:
-                            processor.offers_collection.insert_one(prepared)
-                            _jobs_col.update_one({'job_id': jid}, {
-                                '$inc': {'processed': 1, 'succeeded': 1},
-                                '$push': {'created_ids': prepared.get('offer_id')}
-                            })
-                        else:
-                            _jobs_col.update_one({'job_id': jid}, {
-                                '$inc': {'processed': 1, 'failed': 1},
-                                '$push': {'errors': {'row': row_number, 'name': name, 'error': 'Failed to prepare'}}
-                            })
-                    except Exception as e:
-                        _jobs_col.update_one({'job_id': jid}, {
-                            '$inc': {'processed': 1, 'failed': 1},
-                            '$push': {'errors': {'row': row_number, 'name': name, 'error': str(e)}}
-                        })
-
-                _jobs_col.update_one({'job_id': jid}, {'$set': {'status': 'completed', 'completed_at': datetime.utcnow(), 'current_offer': ''}})
-                logging.info(f"✅ [ASYNC-BG] Job {jid} completed")
+                logging.info(f"✅ [ASYNC-BG] Job {jid} completed: {counts['raw']} rows, {counts['valid']} valid")
 
             except Exception as e:
                 logging.error(f"❌ [ASYNC-BG] Job {jid} failed: {str(e)}", exc_info=True)
@@ -3959,13 +4086,19 @@ def bulk_upload_offers_async():
                     _jobs_col.update_one({'job_id': jid}, {'$set': {'status': 'failed', 'current_offer': ''}, '$push': {'errors': {'error': str(e)}}})
                 except Exception:
                     pass
+            finally:
+                if file_path:
+                    try:
+                        os.remove(file_path)
+                    except Exception:
+                        pass
 
-        thread = threading.Thread(target=process_in_background, args=(rows, str(user['_id']), job_id, options))
+        thread = threading.Thread(target=process_in_background, args=(rows, temp_path, str(user['_id']), job_id, options))
         thread.daemon = False
         thread.start()
 
-        logging.info(f"🚀 [ASYNC] Job {job_id} started for {len(rows)} raw rows")
-        return jsonify({'job_id': job_id, 'total': len(rows), 'status': 'validating'}), 202
+        logging.info(f"🚀 [ASYNC] Job {job_id} started for ~{total_estimate} raw rows")
+        return jsonify({'job_id': job_id, 'total': total_estimate, 'status': 'validating'}), 202
 
     except Exception as e:
         logging.error(f"Async bulk upload error: {str(e)}", exc_info=True)
@@ -3998,6 +4131,7 @@ def bulk_upload_status(job_id):
         'succeeded': job['succeeded'],
         'failed': job['failed'],
         'current_offer': job.get('current_offer', ''),
+        'chunks_done': job.get('chunks_done', 0),
         'errors': job.get('errors', [])[-10:],
         'created_ids': job.get('created_ids', []),
         'skipped_duplicates': job.get('skipped_duplicates', []),
@@ -4184,25 +4318,18 @@ def bulk_upload_offers():
             else:
                 return jsonify(response_data), 400
         
-        # Use OPTIMIZED bulk processor for large datasets (avoids Render timeout)
-        logging.info(f"🔨 Creating {len(valid_rows)} offers with OPTIMIZED bulk processor...")
+        # Batched creation: set-based duplicate checks, one id block, insert_many (avoids Render timeout)
+        logging.info(f"🔨 Creating {len(valid_rows)} offers with batched bulk create...")
         
         from database import db_instance
-        from utils.bulk_operations import get_bulk_offer_processor
         
-        bulk_processor = get_bulk_offer_processor(db_instance)
-        result = bulk_processor.bulk_create_offers_optimized(
+        started = datetime.utcnow()
+        created_offer_ids, creation_errors, skipped_duplicates = bulk_create_offers(
             valid_rows, 
             str(user['_id']),
             duplicate_strategy
         )
-        
-        created_offer_ids = result['created_ids']
-        creation_errors = result['errors']
-        skipped_duplicates = result['skipped_duplicates']
-        stats = result['stats']
-        
-        logging.info(f"✅ Bulk create complete: {stats['created']} created, {stats['skipped']} skipped, {stats['errors']} errors in {stats['elapsed_seconds']}s")
+        elapsed_seconds = round((datetime.utcnow() - started).total_seconds(), 2)
         
         # Prepare response
         response_data = {
@@ -4211,7 +4338,7 @@ def bulk_upload_offers():
             'created_offer_ids': created_offer_ids,
             'total_rows': len(rows),
             'success': True,
-            'processing_time': stats['elapsed_seconds']
+            'processing_time': elapsed_seconds
         }
         
         if skipped_duplicates:
@@ -4806,7 +4933,6 @@ def import_api_offers():
         
         # Import services
         from services.network_api_service import network_api_service
-        from services.network_field_mapper import network_field_mapper
         from utils.bulk_operations import get_bulk_offer_processor
         
         # Get current user
@@ -4829,97 +4955,19 @@ def import_api_offers():
         # Get options
         skip_duplicates = options.get('skip_duplicates', True)
         update_existing = options.get('update_existing', False)
-        default_status = options.get('default_status', 'active')
-        show_in_offerwall = options.get('show_in_offerwall', True)
-        
-        # Get approval workflow settings
-        approval_type = options.get('approval_type', 'auto_approve')
-        auto_approve_delay = options.get('auto_approve_delay', 0)
-        require_approval = options.get('require_approval', False)
-        
-        # Normalize approval_type
-        if approval_type in ['direct', 'instant', 'immediate', 'auto']:
-            approval_type = 'auto_approve'
-        elif approval_type in ['time', 'timed', 'delay', 'delayed']:
-            approval_type = 'time_based'
-        elif approval_type in ['admin', 'approval']:
-            approval_type = 'manual'
-        
-        if approval_type in ['time_based', 'manual']:
-            require_approval = True
-        
-        approval_settings = {
-            'type': approval_type,
-            'require_approval': require_approval,
-            'auto_approve_delay': int(auto_approve_delay) if auto_approve_delay else 0,
-            'approval_message': options.get('approval_message', ''),
-            'max_inactive_days': options.get('max_inactive_days', 0)
-        }
+        import_options = build_import_options(options)
         
         duplicate_strategy = 'skip' if skip_duplicates else ('update' if update_existing else 'create_new')
         
-        # Step 1: Map all offers to DB format (fast, no DB calls)
-        mapped_offers = []
-        mapping_errors = []
-        
-        for idx, offer_data in enumerate(offers):
-            try:
-                mapped_offer = network_field_mapper.map_to_db_format(offer_data, network_type, network_id)
-                
-                if not mapped_offer:
-                    mapping_errors.append({'row': idx + 1, 'error': 'Failed to map offer data'})
-                    continue
-                
-                # Override network field with admin-specified network_name
-                mapped_offer['network'] = network_name
-                
-                # Validate
-                is_valid, validation_errors = network_field_mapper.validate_mapped_offer(mapped_offer)
-                if not is_valid:
-                    mapping_errors.append({
-                        'row': idx + 1,
-                        'name': mapped_offer.get('name', 'Unknown'),
-                        'error': ', '.join(validation_errors)
-                    })
-                    continue
-                
-                # Apply default status and offerwall visibility from options
-                mapped_offer['status'] = default_status
-                mapped_offer['show_in_offerwall'] = show_in_offerwall
-                
-                # Track source of offerwall visibility
-                if show_in_offerwall:
-                    mapped_offer['show_in_offerwall_source'] = 'api_import'
-                    mapped_offer['show_in_offerwall_added_at'] = datetime.utcnow()
-                    mapped_offer['show_in_offerwall_added_by'] = created_by
-                
-                mapped_offer['approval_settings'] = approval_settings
-                mapped_offer['approval_type'] = approval_type
-                mapped_offer['auto_approve_delay'] = approval_settings['auto_approve_delay']
-                mapped_offer['require_approval'] = require_approval
-                mapped_offer['_row_number'] = idx + 1
-                
-                if require_approval or approval_type in ['time_based', 'manual']:
-                    mapped_offer['affiliates'] = 'request'
-                
-                mapped_offers.append(mapped_offer)
-                
-            except Exception as e:
-                mapping_errors.append({
-                    'row': idx + 1,
-                    'error': str(e)
-                })
+        # Step 1: Map, validate and hash all offers, apply Upward Partner network params
+        # (no per-offer DB calls; sync_hash lets later incremental syncs skip unchanged offers)
+        mapped_offers, mapping_errors, params_injected = map_network_offers(
+            offers, network_type, network_id, network_name
+        )
+        for mapped_offer in mapped_offers:
+            apply_import_options(mapped_offer, import_options, created_by)
         
         logging.info(f"✅ Mapped {len(mapped_offers)} offers, {len(mapping_errors)} mapping errors")
-        
-        # Step 1.5: Apply Upward Partner network params to all mapped offers
-        from services.tracking_link_generator import apply_network_offer_params
-        params_injected = 0
-        for offer in mapped_offers:
-            original_url = offer.get('target_url', '')
-            offer.update(apply_network_offer_params(offer))
-            if offer.get('target_url', '') != original_url:
-                params_injected += 1
         if params_injected > 0:
             logging.info(f"🔗 Injected partner params into {params_injected} offer URLs")
         
@@ -4948,140 +4996,31 @@ def import_api_offers():
         
         # Step 3: Detect stale offers (in DB but not in API response)
         # Find offers in our system from this network that were NOT returned by the API
-        # IMPORTANT: Only check ACTIVE offers for stale detection (don't flag already-expired ones)
+        # IMPORTANT: Only ACTIVE offers can be stale (don't flag already-expired ones)
         try:
             offers_collection = db_instance.get_collection('offers')
-            # Get all campaign_ids from the fetched API offers
-            # Normalize all IDs to stripped strings for consistent comparison
-            fetched_campaign_ids = set()
-            for offer_data in offers:
-                # Different networks use different ID fields
-                if network_type == 'adscendmedia':
-                    oid = str(offer_data.get('offer_id', ''))
-                elif network_type == 'everflow':
-                    oid = str(offer_data.get('network_offer_id', '') or offer_data.get('offer_id', '') or offer_data.get('id', ''))
-                elif network_type == 'mobplus':
-                    oid = str(offer_data.get('id', '') or offer_data.get('offer_id', ''))
-                elif network_type == 'marketxcel':
-                    oid = str(offer_data.get('project_id', '') or offer_data.get('survey_id', '') or offer_data.get('id', ''))
-                elif network_type == 'lootably':
-                    oid = str(offer_data.get('offerID', '') or offer_data.get('offer_id', '') or offer_data.get('id', ''))
-                elif network_type == 'voqall':
-                    oid = str(offer_data.get('SurveyId', '') or offer_data.get('survey_id', '') or offer_data.get('id', ''))
-                else:  # hasoffers — offers are wrapped: {"Offer": {"id": "2816", ...}}
-                    if isinstance(offer_data, dict) and 'Offer' in offer_data:
-                        oid = str(offer_data['Offer'].get('id', '') or offer_data['Offer'].get('offer_id', ''))
-                    else:
-                        oid = str(offer_data.get('id', '') or offer_data.get('offer_id', ''))
-                oid = oid.strip()
-                if oid:
-                    fetched_campaign_ids.add(oid)
-            
-            logging.info(f"🔍 Stale detection: {len(fetched_campaign_ids)} unique offer IDs from API")
-            logging.info(f"🔍 Sample fetched IDs (first 10): {sorted(list(fetched_campaign_ids))[:10]}")
-            
-            # Query DB for offers from this same network that are active/running
-            # Use admin-specified network_name for matching (case-insensitive)
-            network_match_values = list(set([network_name, network_id]))
-            # Also add space/no-space variations to catch "cpa merchant" vs "cpamerchant"
-            for val in [network_name, network_id]:
-                no_space = val.replace(' ', '')
-                with_space = val  # already has space if it has one
-                if no_space != val:
-                    network_match_values.append(no_space)
-                # If no spaces, try common word breaks (e.g. "cpamerchant" -> "cpa merchant" won't be guessed,
-                # but the regex is case-insensitive so "CpaMerchant" matches "cpamerchant")
-            network_match_values = list(set(network_match_values))
-            if network_type == 'adscendmedia':
-                network_match_values.append('adscendmedia')
-            elif network_type == 'marketxcel':
-                network_match_values.append('marketxcel')
-                network_match_values.append('MarketXcel')
-            elif network_type == 'lootably':
-                network_match_values.append('lootably')
-                network_match_values.append('Lootably')
-            
-            # Build network regex for case-insensitive match
-            # Use alternation pattern that matches all variations (with/without spaces)
-            escaped_values = []
-            for v in network_match_values:
-                # Escape regex special chars, then replace spaces with optional space pattern
-                import re as re_mod
-                escaped = re_mod.escape(v)
-                # Allow optional spaces between characters where a space exists
-                escaped_values.append(f'^{escaped}$')
-                # Also add version without any spaces
-                no_space_version = re_mod.escape(v.replace(' ', ''))
-                if no_space_version != escaped:
-                    escaped_values.append(f'^{no_space_version}$')
-            
-            network_pattern = '|'.join(escaped_values)
-            
-            # CRITICAL: Only query ACTIVE/RUNNING offers for stale detection
-            # Do NOT include expired/inactive offers — those are handled separately in Feature 3
-            db_query = {
-                'network': {'$regex': network_pattern, '$options': 'i'},
-                'status': {'$in': ['active', 'running', 'paused', 'pending']},
-                '$or': [{'deleted': {'$exists': False}}, {'deleted': False}],
-            }
-            
-            db_offers = list(offers_collection.find(
-                db_query,
-                {'campaign_id': 1, 'network_offer_id': 1, 'name': 1, 'payout': 1, 'countries': 1, 'vertical': 1, 'offer_id': 1, 'status': 1, 'image_url': 1}
-            ))
+            plan = get_network_offer_sync().plan(
+                offers, network_type, network_id, network_name,
+                mapped=(mapped_offers, mapping_errors, params_injected)
+            )
             
-            logging.info(f"🔍 Stale detection: {len(db_offers)} ACTIVE DB offers from network '{network_match_values}'")
+            logging.info(f"🔍 Stale detection: {len(plan['fetched_ids'])} unique offer IDs from API, "
+                         f"{len(plan['matched']) + len(plan['stale'])} ACTIVE DB offers from network '{network_name}'")
             
-            # Find stale offers (in DB but not in API)
-            # Compare campaign_id (the upward partner's offer ID) against fetched API IDs
-            stale_offers = []
-            matched_count = 0
-            for db_offer in db_offers:
-                db_campaign_id = str(db_offer.get('campaign_id', '')).strip()
-                db_network_offer_id = str(db_offer.get('network_offer_id', '')).strip()
-                db_offer_id = db_offer.get('offer_id', '')
-                
-                # Skip our internal ML-XXXX offers that don't have partner IDs
-                if db_campaign_id.startswith('ML-') or not db_campaign_id:
-                    # Try network_offer_id as fallback
-                    if not db_network_offer_id or db_network_offer_id.startswith('ML-'):
-                        continue
-                    check_id = db_network_offer_id
-                else:
-                    check_id = db_campaign_id
-                
-                # Normalize the check_id for comparison (strip whitespace, remove leading zeros for numeric IDs)
-                check_id = check_id.strip()
-                
-                # Check if this offer's partner ID exists in the API response
-                # Try exact match first, then try numeric match (some networks return "2816" vs "02816")
-                found_in_api = check_id in fetched_campaign_ids
-                if not found_in_api and check_id.isdigit():
-                    # Try matching without leading zeros
-                    normalized = str(int(check_id))
-                    found_in_api = normalized in fetched_campaign_ids or any(
-                        cid.isdigit() and str(int(cid)) == normalized for cid in fetched_campaign_ids
-                    )
-                
-                if found_in_api:
-                    matched_count += 1
-                else:
-                    stale_offers.append({
-                        'offer_id': db_offer_id or str(db_offer.get('_id', '')),
-                        'campaign_id': db_campaign_id,
-                        'name': db_offer.get('name', 'Unknown'),
-                        'payout': db_offer.get('payout', 0),
-                        'countries': db_offer.get('countries', [])[:5],
-                        'vertical': db_offer.get('vertical', ''),
-                        'status': db_offer.get('status', ''),
-                        'image_url': db_offer.get('image_url', ''),
-                    })
+            stale_offers = [{
+                'offer_id': db_offer.get('offer_id') or str(db_offer.get('_id', '')),
+                'campaign_id': str(db_offer.get('campaign_id', '')).strip(),
+                'name': db_offer.get('name', 'Unknown'),
+                'payout': db_offer.get('payout', 0),
+                'countries': db_offer.get('countries', [])[:5],
+                'vertical': db_offer.get('vertical', ''),
+                'status': db_offer.get('status', ''),
+                'image_url': db_offer.get('image_url', ''),
+            } for db_offer in plan['stale']]
             
-            logging.info(f"🔍 Stale detection result: {matched_count} matched (still in API), {len(stale_offers)} stale (NOT in API)")
+            logging.info(f"🔍 Stale detection result: {len(plan['matched'])} matched (still in API), {len(stale_offers)} stale (NOT in API)")
             if stale_offers:
                 logging.info(f"🔍 Sample stale campaign_ids: {[s['campaign_id'] for s in stale_offers[:5]]}")
-            if db_offers:
-                logging.info(f"🔍 Sample DB campaign_ids: {[str(o.get('campaign_id','')) for o in db_offers[:5]]}")
             
             response_data['stale_offers'] = stale_offers
             response_data['summary']['stale_count'] = len(stale_offers)
@@ -5114,86 +5053,33 @@ def import_api_offers():
             
             response_data['summary']['auto_expired_count'] = auto_expired_count
             
-            # Feature 3: Detect EXPIRED offers that are back in the API (reactivatable)
-            # NOTE: Only check 'expired' status — 'inactive' offers can still participate in rotation
+            # Feature 3: EXPIRED offers that are back in the API (reactivatable)
+            # NOTE: Only 'expired' status — 'inactive' offers can still participate in rotation
             # and get activated by the system, so they don't need manual reactivation
             reactivatable_offers = []
-            try:
-                # Find offers in DB that are EXPIRED (not inactive!) but whose campaign_id IS in fetched API data
-                expired_query = {
-                    'network': {'$regex': network_pattern, '$options': 'i'},
-                    'status': 'expired',
-                    '$or': [{'deleted': {'$exists': False}}, {'deleted': False}],
-                }
-                expired_db_offers = list(offers_collection.find(
-                    expired_query,
-                    {'campaign_id': 1, 'network_offer_id': 1, 'name': 1, 'payout': 1, 
-                     'countries': 1, 'vertical': 1, 'offer_id': 1, 'status': 1, 
-                     'image_url': 1, 'description': 1, 'target_url': 1}
-                ))
-                
-                logging.info(f"🔍 Reactivation check: {len(expired_db_offers)} expired/inactive DB offers for this network")
-                
-                for db_offer in expired_db_offers:
-                    db_campaign_id = str(db_offer.get('campaign_id', '')).strip()
-                    db_network_offer_id = str(db_offer.get('network_offer_id', '')).strip()
-                    
-                    if db_campaign_id.startswith('ML-') or not db_campaign_id:
-                        if not db_network_offer_id or db_network_offer_id.startswith('ML-'):
-                            continue
-                        check_id = db_network_offer_id
-                    else:
-                        check_id = db_campaign_id
-                    
-                    check_id = check_id.strip()
-                    
-                    # If this expired offer IS in the API response, it can be reactivated
-                    # Use same normalized matching as stale detection
-                    found_in_api = check_id in fetched_campaign_ids
-                    if not found_in_api and check_id.isdigit():
-                        normalized = str(int(check_id))
-                        found_in_api = normalized in fetched_campaign_ids or any(
-                            cid.isdigit() and str(int(cid)) == normalized for cid in fetched_campaign_ids
-                        )
-                    
-                    if found_in_api:
-                        # Find matching API offer data to provide updated info
-                        api_payout = None
-                        api_description = None
-                        api_countries = None
-                        api_target_url = None
-                        
-                        for api_offer in mapped_offers:
-                            api_cid = str(api_offer.get('campaign_id', '')).strip()
-                            if api_cid == check_id or (api_cid.isdigit() and check_id.isdigit() and int(api_cid) == int(check_id)):
-                                api_payout = api_offer.get('payout')
-                                api_description = api_offer.get('description')
-                                api_countries = api_offer.get('countries')
-                                api_target_url = api_offer.get('target_url')
-                                break
-                        
-                        reactivatable_offers.append({
-                            'offer_id': db_offer.get('offer_id', str(db_offer.get('_id', ''))),
-                            'campaign_id': db_campaign_id,
-                            'name': db_offer.get('name', 'Unknown'),
-                            'current_status': db_offer.get('status', ''),
-                            'payout': db_offer.get('payout', 0),
-                            'api_payout': api_payout,
-                            'countries': db_offer.get('countries', [])[:5],
-                            'api_countries': api_countries[:5] if api_countries else None,
-                            'vertical': db_offer.get('vertical', ''),
-                            'image_url': db_offer.get('image_url', ''),
-                            'api_description': (api_description or '')[:100],
-                            'api_target_url': api_target_url or '',
-                        })
-                
-                if reactivatable_offers:
-                    logging.info(f"🔄 Found {len(reactivatable_offers)} expired offers that are back in API (reactivatable)")
-                    logging.info(f"🔄 Sample: {[r['name'][:30] for r in reactivatable_offers[:3]]}")
-                else:
-                    logging.info(f"✅ No expired offers found back in API")
-            except Exception as react_err:
-                logging.warning(f"Reactivatable detection error (non-critical): {react_err}")
+            for db_offer, api_offer in plan['reactivatable']:
+                api_offer = api_offer or {}
+                api_countries = api_offer.get('countries')
+                reactivatable_offers.append({
+                    'offer_id': db_offer.get('offer_id', str(db_offer.get('_id', ''))),
+                    'campaign_id': str(db_offer.get('campaign_id', '')).strip(),
+                    'name': db_offer.get('name', 'Unknown'),
+                    'current_status': db_offer.get('status', ''),
+                    'payout': db_offer.get('payout', 0),
+                    'api_payout': api_offer.get('payout'),
+                    'countries': db_offer.get('countries', [])[:5],
+                    'api_countries': api_countries[:5] if api_countries else None,
+                    'vertical': db_offer.get('vertical', ''),
+                    'image_url': db_offer.get('image_url', ''),
+                    'api_description': (api_offer.get('description') or '')[:100],
+                    'api_target_url': api_offer.get('target_url') or '',
+                })
+            
+            if reactivatable_offers:
+                logging.info(f"🔄 Found {len(reactivatable_offers)} expired offers that are back in API (reactivatable)")
+                logging.info(f"🔄 Sample: {[r['name'][:30] for r in reactivatable_offers[:3]]}")
+            else:
+                logging.info(f"✅ No expired offers found back in API")
             
             response_data['reactivatable_offers'] = reactivatable_offers
             response_data['summary']['reactivatable_count'] = len(reactivatable_offers)
@@ -5474,6 +5360,7 @@ def update_stale_offers_status():
             update_filter,
             {'$set': {'status': new_status, 'updated_at': datetime.utcnow()}}
         )
+        invalidate_offer_caches()
         
         updated_count = result.modified_count
         
@@ -5617,118 +5504,22 @@ def sync_check_offers():
         if error:
             return jsonify({'success': False, 'error': error}), 400
         
-        # Extract campaign IDs from API response
-        fetched_campaign_ids = set()
-        api_id_samples = []
-        for offer_data in offers:
-            if network_type == 'adscendmedia':
-                oid = str(offer_data.get('offer_id', ''))
-            elif network_type == 'everflow':
-                oid = str(offer_data.get('network_offer_id', '') or offer_data.get('offer_id', '') or offer_data.get('id', ''))
-            elif network_type == 'mobplus':
-                oid = str(offer_data.get('id', '') or offer_data.get('offer_id', ''))
-            elif network_type == 'marketxcel':
-                oid = str(offer_data.get('project_id', '') or offer_data.get('survey_id', '') or offer_data.get('id', ''))
-            elif network_type == 'lootably':
-                oid = str(offer_data.get('offerID', '') or offer_data.get('offer_id', '') or offer_data.get('id', ''))
-            else:
-                if isinstance(offer_data, dict) and 'Offer' in offer_data:
-                    oid = str(offer_data['Offer'].get('id', '') or offer_data['Offer'].get('offer_id', ''))
-                else:
-                    oid = str(offer_data.get('id', '') or offer_data.get('offer_id', ''))
-            oid = oid.strip()
-            if oid:
-                fetched_campaign_ids.add(oid)
-                if len(api_id_samples) < 20:
-                    api_id_samples.append(oid)
-        
-        # Query DB
-        offers_collection = db_instance.get_collection('offers')
-        network_match_values = list(set([network_name, network_id]))
-        # Add space/no-space variations
-        for val in [network_name, network_id]:
-            no_space = val.replace(' ', '')
-            if no_space != val:
-                network_match_values.append(no_space)
-        network_match_values = list(set(network_match_values))
-        if network_type == 'adscendmedia':
-            network_match_values.append('adscendmedia')
-        elif network_type == 'marketxcel':
-            network_match_values.extend(['marketxcel', 'MarketXcel'])
-        elif network_type == 'lootably':
-            network_match_values.extend(['lootably', 'Lootably'])
+        # One diff against the network's DB offers (read-only)
+        plan = get_network_offer_sync().plan(offers, network_type, network_id, network_name)
         
-        network_pattern = '|'.join([f'^{v}$' for v in network_match_values])
-        
-        # Get ACTIVE offers
-        active_db_offers = list(offers_collection.find(
-            {
-                'network': {'$regex': network_pattern, '$options': 'i'},
-                'status': {'$in': ['active', 'running', 'paused', 'pending']},
-                '$or': [{'deleted': {'$exists': False}}, {'deleted': False}],
-            },
-            {'campaign_id': 1, 'network_offer_id': 1, 'name': 1, 'payout': 1, 'offer_id': 1, 'status': 1}
-        ))
-        
-        # Get EXPIRED offers only (inactive can still participate in rotation)
-        expired_db_offers = list(offers_collection.find(
-            {
-                'network': {'$regex': network_pattern, '$options': 'i'},
-                'status': 'expired',
-                '$or': [{'deleted': {'$exists': False}}, {'deleted': False}],
-            },
-            {'campaign_id': 1, 'network_offer_id': 1, 'name': 1, 'payout': 1, 'offer_id': 1, 'status': 1}
-        ))
-        
-        # Stale detection (dry run)
-        stale = []
-        matched = []
-        for db_offer in active_db_offers:
-            db_cid = str(db_offer.get('campaign_id', '')).strip()
-            if db_cid.startswith('ML-') or not db_cid:
-                db_cid = str(db_offer.get('network_offer_id', '')).strip()
-                if not db_cid or db_cid.startswith('ML-'):
-                    continue
-            
-            found = db_cid in fetched_campaign_ids
-            if not found and db_cid.isdigit():
-                normalized = str(int(db_cid))
-                found = normalized in fetched_campaign_ids
-            
-            entry = {
+        def summarize(db_offer):
+            return {
                 'offer_id': db_offer.get('offer_id', ''),
-                'campaign_id': db_cid,
+                'campaign_id': stored_partner_id(db_offer),
                 'name': db_offer.get('name', ''),
                 'status': db_offer.get('status', ''),
                 'payout': db_offer.get('payout', 0),
             }
-            if found:
-                matched.append(entry)
-            else:
-                stale.append(entry)
-        
-        # Reactivatable detection (dry run)
-        reactivatable = []
-        for db_offer in expired_db_offers:
-            db_cid = str(db_offer.get('campaign_id', '')).strip()
-            if db_cid.startswith('ML-') or not db_cid:
-                db_cid = str(db_offer.get('network_offer_id', '')).strip()
-                if not db_cid or db_cid.startswith('ML-'):
-                    continue
-            
-            found = db_cid in fetched_campaign_ids
-            if not found and db_cid.isdigit():
-                normalized = str(int(db_cid))
-                found = normalized in fetched_campaign_ids
-            
-            if found:
-                reactivatable.append({
-                    'offer_id': db_offer.get('offer_id', ''),
-                    'campaign_id': db_cid,
-                    'name': db_offer.get('name', ''),
-                    'status': db_offer.get('status', ''),
-                    'payout': db_offer.get('payout', 0),
-                })
+        
+        stale = [summarize(o) for o in plan['stale']]
+        matched = [summarize(o) for o in plan['matched'][:10]]
+        reactivatable = [summarize(o) for o, _ in plan['reactivatable']]
+        api_id_samples = [i for i in (extract_partner_id(o, network_type) for o in offers[:50]) if i][:20]
         
         return jsonify({
             'success': True,
@@ -5736,24 +5527,30 @@ def sync_check_offers():
             'message': 'This is a DRY RUN — no offers were modified',
             'api_stats': {
                 'total_fetched': len(offers),
-                'unique_campaign_ids': len(fetched_campaign_ids),
+                'unique_campaign_ids': len(plan['fetched_ids']),
                 'sample_api_ids': sorted(api_id_samples)[:20],
             },
             'db_stats': {
-                'active_offers_in_db': len(active_db_offers),
-                'expired_offers_in_db': len(expired_db_offers),
-                'network_pattern': network_pattern,
+                'active_offers_in_db': len(plan['matched']) + len(plan['stale']),
+                'expired_offers_in_db': plan['expired_count'],
+                'network_pattern': build_network_pattern(network_name, network_id, network_type),
             },
             'stale_detection': {
-                'matched_count': len(matched),
+                'matched_count': len(plan['matched']),
                 'stale_count': len(stale),
                 'stale_offers': stale[:50],
-                'matched_offers_sample': matched[:10],
+                'matched_offers_sample': matched,
             },
             'reactivation_detection': {
                 'reactivatable_count': len(reactivatable),
                 'reactivatable_offers': reactivatable[:50],
             },
+            'sync_diff': {
+                'new': len(plan['new']),
+                'changed': len(plan['changed']),
+                'unchanged': plan['unchanged'],
+                'mapping_errors': len(plan['mapping_errors']),
+            },
         }), 200
         
     except Exception as e:
@@ -5761,6 +5558,111 @@ def sync_check_offers():
         return jsonify({'error': f'Sync check failed: {str(e)}'}), 500
 
 
+# ==================== INCREMENTAL NETWORK SYNC ENDPOINTS ====================
+
+@admin_offers_bp.route('/offers/api-import/sync', methods=['POST'])
+@token_required
+@subadmin_or_admin_required('offers')
+def sync_network_offers():
+    """
+    Incremental sync of one network: creates new offers, updates only offers whose
+    content changed, optionally expires stale ones (options.auto_expire_stale).
+    Takes the same body as /offers/api-import.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        network_id = data.get('network_id')
+        api_key = data.get('api_key')
+        if not network_id or not api_key:
+            return jsonify({'error': 'network_id and api_key are required'}), 400
+        
+        current_user = request.current_user
+        created_by = str(current_user.get('_id', current_user.get('username', 'admin')))
+        
+        result = get_network_offer_sync().sync_network(
+            network_id, api_key,
+            data.get('network_type', 'hasoffers'),
+            data.get('network_name', '').strip() or network_id,
+            data.get('fetch_mode', 'my_offers'),
+            data.get('filters', {}),
+            data.get('options', {}),
+            created_by
+        )
+        if result.get('error'):
+            return jsonify({'success': False, 'error': result['error']}), 400
+        
+        if result.get('created') or result.get('updated') or result.get('deactivated'):
+            try:
+                log_admin_activity(
+                    action='api_sync',
+                    category='offer',
+                    admin_user=current_user,
+                    details={
+                        'network_id': network_id,
+                        'network_type': result['network_type'],
+                        'total_fetched': result['fetched'],
+                        'created': result['created'],
+                        'updated': result['updated'],
+                        'deactivated': result['deactivated'],
+                        'offer_ids': result['created_ids'][:10],
+                    },
+                    request_obj=request
+                )
+            except Exception as log_err:
+                logging.warning(f"Activity log error (non-critical): {log_err}")
+        
+        return jsonify({'success': True, 'summary': result}), 200
+        
+    except Exception as e:
+        logging.error(f"Network sync failed: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Network sync failed: {str(e)}'}), 500
+
+
+@admin_offers_bp.route('/offers/api-import/sync-all', methods=['POST'])
+@token_required
+@subadmin_or_admin_required('offers')
+def sync_all_network_presets():
+    """
+    Start an incremental sync of every saved network preset (or preset_ids) in the
+    background. resume_within_minutes skips networks synced successfully within that
+    window, so a run that failed part way can be resumed. Poll /offers/api-import/sync-status.
+    """
+    try:
+        data = request.get_json() or {}
+        current_user = request.current_user
+        created_by = str(current_user.get('_id', current_user.get('username', 'admin')))
+        skip_synced_within = int(data.get('resume_within_minutes', 0) or 0) * 60
+        
+        thread = threading.Thread(
+            target=get_network_offer_sync().sync_presets,
+            args=(data.get('preset_ids'), data.get('options', {}), created_by, skip_synced_within),
+            daemon=True,
+            name='network-sync-all'
+        )
+        thread.start()
+        
+        return jsonify({'success': True, 'message': 'Network sync started'}), 202
+        
+    except Exception as e:
+        logging.error(f"Failed to start network sync: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Failed to start network sync: {str(e)}'}), 500
+
+
+@admin_offers_bp.route('/offers/api-import/sync-status', methods=['GET'])
+@token_required
+@subadmin_or_admin_required('offers')
+def get_network_sync_status():
+    """Per-network sync checkpoints plus the last sync-all result of this worker."""
+    try:
+        return jsonify({'success': True, **get_network_offer_sync().get_status()}), 200
+    except Exception as e:
+        logging.error(f"Get network sync status error: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Failed to get sync status: {str(e)}'}), 500
+
+
 # ==================== NETWORK PRESETS ENDPOINTS ====================
 
 @admin_offers_bp.route('/offers/network-presets', methods=['GET'])
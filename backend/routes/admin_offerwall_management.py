@@ -8,6 +8,7 @@ from flask import Blueprint, request, jsonify
 from utils.auth import token_required
 from database import db_instance
 from services.health_check_service import HealthCheckService
+from services.settings_snapshot_service import get_offerwall_settings, bump_settings_version
 from datetime import datetime
 from bson import ObjectId
 import logging
@@ -46,6 +47,9 @@ def get_default_settings():
 
 def get_settings_doc():
     """Get the singleton offerwall settings document, creating if not exists."""
+    settings = get_offerwall_settings()
+    if settings:
+        return settings
     collection = get_collection('offerwall_settings')
     if collection is None:
         return None
@@ -54,6 +58,7 @@ def get_settings_doc():
         default = get_default_settings()
         collection.insert_one(default)
         settings = collection.find_one({})
+        bump_settings_version('offerwall')
     return settings
 
 
@@ -62,11 +67,7 @@ def get_offerwall_base_query(hidden_offers=None):
     # Fetch starter offer IDs so they are always included regardless of status
     starter_offer_ids = []
     try:
-        settings_col = get_collection('offerwall_settings')
-        if settings_col is not None:
-            settings_doc = settings_col.find_one({})
-            if settings_doc:
-                starter_offer_ids = settings_doc.get('new_user_offer_ids', [])
+        starter_offer_ids = list(get_offerwall_settings().get('new_user_offer_ids', []))
     except Exception:
         pass
 
@@ -92,12 +93,10 @@ def get_offerwall_base_query(hidden_offers=None):
 def count_offerwall_visible():
     """Count offers actually visible on the offerwall (after health check)."""
     offers_collection = get_collection('offers')
-    settings_collection = get_collection('offerwall_settings')
     if offers_collection is None:
         return 0
 
-    settings = settings_collection.find_one({}) if settings_collection is not None else {}
-    hidden_offers = (settings or {}).get('hidden_offers', [])
+    hidden_offers = list(get_offerwall_settings().get('hidden_offers', []))
     query_filter = get_offerwall_base_query(hidden_offers)
 
     # Fetch all matching offers for health check (need full docs for evaluation)
@@ -181,14 +180,14 @@ def get_display_settings():
                 'announcements': []
             }), 200
 
-        theme = settings.get('theme', {
+        theme = dict(settings.get('theme', {
             'primary_color': '#6366f1',
             'background_color': '#0f172a',
             'layout': 'grid',
             'cards_per_row': 3,
             'show_categories': True,
             'show_search': True
-        })
+        }))
         # Ensure background_color has a default
         if 'background_color' not in theme:
             theme['background_color'] = '#0f172a'
@@ -242,6 +241,7 @@ def update_settings():
 
         # Upsert the singleton settings document
         collection.update_one({}, {'$set': update_fields}, upsert=True)
+        bump_settings_version('offerwall')
 
         return jsonify({'message': 'Settings updated successfully'}), 200
     except Exception as e:
@@ -298,6 +298,7 @@ def pin_offers():
                 },
                 upsert=True
             )
+        bump_settings_version('offerwall')
 
         return jsonify({'message': f'Offers {action}ned successfully'}), 200
     except Exception as e:
@@ -354,6 +355,7 @@ def set_visibility():
                 },
                 upsert=True
             )
+        bump_settings_version('offerwall')
 
         return jsonify({'message': f'Offers visibility updated ({action})'}), 200
     except Exception as e:
@@ -393,6 +395,7 @@ def reorder_offers():
             },
             upsert=True
         )
+        bump_settings_version('offerwall')
 
         return jsonify({'message': 'Offer order updated successfully'}), 200
     except Exception as e:
@@ -450,14 +453,12 @@ def get_offerwall_offers():
         status_filter = request.args.get('status', '')
 
         offers_collection = get_collection('offers')
-        settings_collection = get_collection('offerwall_settings')
 
         if offers_collection is None:
             return jsonify({'error': 'Database connection failed'}), 500
 
         # Get hidden offers from settings to exclude them
-        settings = settings_collection.find_one({}) if settings_collection is not None else None
-        hidden_offers = (settings or {}).get('hidden_offers', [])
+        hidden_offers = list(get_offerwall_settings().get('hidden_offers', []))
 
         # Use the same base query as the actual offerwall (active + show_in_offerwall + not deleted)
         # This ensures Offer Controls shows exactly what's live in the offerwall
@@ -536,7 +537,7 @@ def get_offerwall_offers():
             ]})
         elif visibility_filter == 'starter':
             # Only starter offers
-            starter_ids = (settings or {}).get('new_user_offer_ids', [])
+            starter_ids = list(get_offerwall_settings().get('new_user_offer_ids', []))
             if starter_ids:
                 query_filter['$and'].append({'offer_id': {'$in': starter_ids}})
             else:
@@ -771,12 +772,7 @@ def get_offerwall_offers():
 def get_new_user_offers():
     """GET: returns the list of new_user_offer_ids (public)."""
     try:
-        collection = get_collection('offerwall_settings')
-        if collection is None:
-            return jsonify({'offer_ids': []}), 200
-
-        settings = collection.find_one({})
-        offer_ids = (settings or {}).get('new_user_offer_ids', [])
+        offer_ids = list(get_offerwall_settings().get('new_user_offer_ids', []))
         return jsonify({'offer_ids': offer_ids, 'new_user_offer_ids': offer_ids}), 200
     except Exception as e:
         logger.error(f"Error getting new user offers: {str(e)}")
@@ -809,6 +805,7 @@ def update_new_user_offers():
             }},
             upsert=True
         )
+        bump_settings_version('offerwall')
 
         # Also set show_in_offerwall=True and status=running for these offers so they appear in the offerwall
         offers_collection = get_collection('offers')
@@ -834,17 +831,16 @@ def get_stats():
             return jsonify({'error': 'Admin access required'}), 403
 
         offers_collection = get_collection('offers')
-        settings_collection = get_collection('offerwall_settings')
         affiliate_requests_col = get_collection('affiliate_requests')
         offer_grants_col = get_collection('offer_grants')
         exclusive_log_col = get_collection('offerwall_exclusive_log')
         users_col = get_collection('users')
 
-        if offers_collection is None or settings_collection is None:
+        if offers_collection is None:
             return jsonify({'error': 'Database connection failed'}), 500
 
         # Get settings for hidden/pinned/featured counts
-        settings = settings_collection.find_one({}) or {}
+        settings = get_offerwall_settings()
         hidden_offers = settings.get('hidden_offers', [])
         pinned_offers = settings.get('pinned_offers', [])
         featured_offers = settings.get('featured_offers', [])
@@ -1853,6 +1849,7 @@ def bulk_remove_from_offerwall():
                 },
                 upsert=True
             )
+            bump_settings_version('offerwall')
 
         return jsonify({
             'message': f'Removed {result.modified_count} offers from offerwall',
@@ -2328,6 +2325,7 @@ def hide_offer_by_id():
                 {'$addToSet': {'hidden_offers': offer_id}},
                 upsert=True
             )
+            bump_settings_version('offerwall')
 
         return jsonify({
             'success': True,
@@ -4,6 +4,7 @@ from datetime import datetime
 from bson import ObjectId
 import logging
 from routes.user_payments import calculate_user_earnings, fetch_user_transactions
+from models.balance_ledger import get_balance_ledger, record_balance_change
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,59 @@ def get_collection(collection_name):
         return None
     return db_instance.get_collection(collection_name)
 
+def _aggregate_balances(user_ids_str, user_ids_obj):
+    """Per-user balances from the source collections (used until the balance ledger is reconciled)."""
+    conversions_col = get_collection('forwarded_postbacks')
+    promo_col = get_collection('bonus_earnings')
+    gift_col = get_collection('gift_card_redemptions')
+    ref_p1_col = get_collection('referrals_p1')
+    ref_p2_col = get_collection('referrals_p2')
+    adj_col = get_collection('balance_adjustments')
+    
+    conv_res = list(conversions_col.aggregate([{'$match': {'publisher_id': {'$in': user_ids_str}, 'forward_status': {'$nin': ['reversed']}, 'is_reversal': {'$ne': True}, 'source': {'$nin': ['fallback_fake']}}}, {'$group': {'_id': '$publisher_id', 'total': {'$sum': '$points'}}}])) if conversions_col is not None else []
+    conv_map = {r['_id']: r['total'] for r in conv_res}
+    
+    promo_res = list(promo_col.aggregate([{'$match': {'user_id': {'$in': user_ids_obj}, 'status': 'credited'}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$bonus_amount'}}}])) if promo_col is not None else []
+    promo_map = {str(r['_id']): r['total'] for r in promo_res}
+    
+    # gift_card_redemptions can unexpectedly store string or objectId user_ids depending on route histories
+    gift_res = list(gift_col.aggregate([{'$match': {'user_id': {'$in': user_ids_str + user_ids_obj}, 'status': {'$ne': 'reversed'}}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$amount'}}}])) if gift_col is not None else []
+    gift_map = {str(r['_id']): r['total'] for r in gift_res}
+    
+    p1_res = list(ref_p1_col.aggregate([{'$match': {'referrer_id': {'$in': user_ids_str}, 'bonus_released': True, 'status': {'$ne': 'reversed'}}}, {'$group': {'_id': '$referrer_id', 'total': {'$sum': '$bonus_amount'}}}])) if ref_p1_col is not None else []
+    p1_map = {r['_id']: r['total'] for r in p1_res}
+    
+    p2_res = list(ref_p2_col.aggregate([{'$match': {'referrer_id': {'$in': user_ids_str}}}, {'$group': {'_id': '$referrer_id', 'total': {'$sum': '$commission_earned'}}}])) if ref_p2_col is not None else []
+    p2_map = {r['_id']: r['total'] for r in p2_res}
+    
+    adj_res = list(adj_col.aggregate([{'$match': {'user_id': {'$in': user_ids_obj}, 'type': {'$ne': 'payment'}}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$amount'}}}])) if adj_col is not None else []
+    adj_map = {str(r['_id']): r['total'] for r in adj_res}
+    
+    # Batch fetch total paid from payment_records
+    payments_col = get_collection('payment_records')
+    paid_res = list(payments_col.aggregate([{'$match': {'user_id': {'$in': user_ids_str}}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$amount'}}}])) if payments_col is not None else []
+    paid_map = {r['_id']: r['total'] for r in paid_res}
+
+    balances = {}
+    for uid in user_ids_str:
+        conv = conv_map.get(uid, 0)
+        promo = promo_map.get(uid, 0)
+        gift = gift_map.get(uid, 0)
+        ref = p1_map.get(uid, 0) + p2_map.get(uid, 0)
+        adj = adj_map.get(uid, 0)
+        total_paid = paid_map.get(uid, 0)
+        balances[uid] = {
+            'total_balance': max(0, conv + promo + gift + ref + adj - total_paid),
+            'referral_earnings': max(0, ref),
+            'conversion_earnings': max(0, conv),
+            'promo_earnings': max(0, promo),
+            'gift_earnings': max(0, gift),
+            'manual_adjustments': adj,
+            'gross_earnings': conv + promo + gift + ref,
+            'total_paid': total_paid
+        }
+    return balances
+
 @admin_payments_bp.route('/users', methods=['GET'])
 @token_required
 @admin_required
@@ -24,42 +78,37 @@ def get_all_users_payments():
         if users_col is None:
             return jsonify({'error': 'Database unavailable'}), 500
             
-        users = list(users_col.find({'role': {'$nin': ['admin', 'subadmin']}}))
+        users_query = {'role': {'$nin': ['admin', 'subadmin']}}
+        users_cursor = users_col.find(users_query).sort('_id', 1)
+
+        # Optional pagination; without page/per_page the full list is returned
+        pagination = None
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', type=int)
+        if page or per_page:
+            page = max(1, page or 1)
+            per_page = min(max(1, per_page or 50), 500)
+            total_users = users_col.count_documents(users_query)
+            users_cursor = users_cursor.skip((page - 1) * per_page).limit(per_page)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total': total_users,
+                'pages': (total_users + per_page - 1) // per_page
+            }
+        users = list(users_cursor)
         
         # Batch Fetch logic
         user_ids_str = [str(u['_id']) for u in users]
         user_ids_obj = [u['_id'] for u in users]
-        
-        conversions_col = get_collection('forwarded_postbacks')
-        promo_col = get_collection('bonus_earnings')
-        gift_col = get_collection('gift_card_redemptions')
-        ref_p1_col = get_collection('referrals_p1')
-        ref_p2_col = get_collection('referrals_p2')
-        adj_col = get_collection('balance_adjustments')
-        pm_col = get_collection('payout_methods')
-        
-        conv_res = list(conversions_col.aggregate([{'$match': {'publisher_id': {'$in': user_ids_str}, 'forward_status': {'$nin': ['reversed']}, 'is_reversal': {'$ne': True}, 'source': {'$nin': ['fallback_fake']}}}, {'$group': {'_id': '$publisher_id', 'total': {'$sum': '$points'}}}])) if conversions_col is not None else []
-        conv_map = {r['_id']: r['total'] for r in conv_res}
-        
-        rev_conv_res = list(conversions_col.aggregate([{'$match': {'publisher_id': {'$in': user_ids_str}, '$or': [{'forward_status': 'reversed'}, {'status': 'reversed'}, {'is_reversal': True}], 'source': {'$nin': ['fallback_fake']}}}, {'$group': {'_id': '$publisher_id', 'total': {'$sum': '$points'}}}])) if conversions_col is not None else []
-        rev_conv_map = {r['_id']: r['total'] for r in rev_conv_res}
 
-        promo_res = list(promo_col.aggregate([{'$match': {'user_id': {'$in': user_ids_obj}, 'status': 'credited'}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$bonus_amount'}}}])) if promo_col is not None else []
-        promo_map = {str(r['_id']): r['total'] for r in promo_res}
-        
-        # gift_card_redemptions can unexpectedly store string or objectId user_ids depending on route histories
-        gift_res = list(gift_col.aggregate([{'$match': {'user_id': {'$in': user_ids_str + user_ids_obj}, 'status': {'$ne': 'reversed'}}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$amount'}}}])) if gift_col is not None else []
-        gift_map = {str(r['_id']): r['total'] for r in gift_res}
-        
-        p1_res = list(ref_p1_col.aggregate([{'$match': {'referrer_id': {'$in': user_ids_str}, 'bonus_released': True, 'status': {'$ne': 'reversed'}}}, {'$group': {'_id': '$referrer_id', 'total': {'$sum': '$bonus_amount'}}}])) if ref_p1_col is not None else []
-        p1_map = {r['_id']: r['total'] for r in p1_res}
-        
-        p2_res = list(ref_p2_col.aggregate([{'$match': {'referrer_id': {'$in': user_ids_str}}}, {'$group': {'_id': '$referrer_id', 'total': {'$sum': '$commission_earned'}}}])) if ref_p2_col is not None else []
-        p2_map = {r['_id']: r['total'] for r in p2_res}
-        
-        adj_res = list(adj_col.aggregate([{'$match': {'user_id': {'$in': user_ids_obj}, 'type': {'$ne': 'payment'}}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$amount'}}}])) if adj_col is not None else []
-        adj_map = {str(r['_id']): r['total'] for r in adj_res}
-        
+        ledger = get_balance_ledger()
+        if ledger.is_ready():
+            balances = ledger.get_balances(user_ids_str)
+        else:
+            balances = _aggregate_balances(user_ids_str, user_ids_obj)
+
+        pm_col = get_collection('payout_methods')
         ups_col = get_collection('user_payout_settings')
         ups_list = list(ups_col.find({'user_id': {'$in': user_ids_obj}})) if ups_col is not None else []
         ups_map = {str(r['user_id']): r for r in ups_list}
@@ -67,23 +116,11 @@ def get_all_users_payments():
         pms = list(pm_col.find({'user_id': {'$in': user_ids_obj}})) if pm_col is not None else []
         pm_map = {str(pm['user_id']): pm for pm in pms}
         
-        # Batch fetch total paid from payment_records
-        payments_col = get_collection('payment_records')
-        paid_res = list(payments_col.aggregate([{'$match': {'user_id': {'$in': user_ids_str}}}, {'$group': {'_id': '$user_id', 'total': {'$sum': '$amount'}}}])) if payments_col is not None else []
-        paid_map = {r['_id']: r['total'] for r in paid_res}
-        
         results = []
 
         for u in users:
             uid = str(u['_id'])
-            
-            conv = conv_map.get(uid, 0)
-            promo = promo_map.get(uid, 0)
-            gift = gift_map.get(uid, 0)
-            ref = p1_map.get(uid, 0) + p2_map.get(uid, 0)
-            adj = adj_map.get(uid, 0)
-            total_paid = paid_map.get(uid, 0)
-            total = conv + promo + gift + ref + adj - total_paid
+            balance = balances[uid]
             
             pm = pm_map.get(uid)
             payout_method = None
@@ -129,23 +166,26 @@ def get_all_users_payments():
                 'username': u.get('username'),
                 'email': u.get('email'),
                 'country': u.get('country', 'N/A'),
-                'total_balance': max(0, total),
-                'gross_earnings': conv + promo + gift + ref,
+                'total_balance': balance['total_balance'],
+                'gross_earnings': balance['gross_earnings'],
                 'breakdown': {
-                    'referral': max(0, ref),
-                    'conversion': max(0, conv),
-                    'promo': max(0, promo),
-                    'gift': max(0, gift),
-                    'manual_adjustments': adj
+                    'referral': balance['referral_earnings'],
+                    'conversion': balance['conversion_earnings'],
+                    'promo': balance['promo_earnings'],
+                    'gift': balance['gift_earnings'],
+                    'manual_adjustments': balance['manual_adjustments']
                 },
                 'payout_method': payout_method,
                 'net_terms_settings': net_terms_settings
             })
             
-        return jsonify({
+        response = {
             'success': True,
             'data': results
-        }), 200
+        }
+        if pagination is not None:
+            response['pagination'] = pagination
+        return jsonify(response), 200
 
     except Exception as e:
         logger.error(f"Error getting admin payments: {str(e)}")
@@ -173,6 +213,7 @@ def adjust_user_balance(user_id):
         }
         
         adj_col.insert_one(doc)
+        record_balance_change('balance_adjustments', doc)
         
         # Clear dashboard cache so numbers refresh instantly on their dashboard
         try:
@@ -513,6 +554,7 @@ def pay_user(user_id):
             'paid_at': now
         }
         payments_col.insert_one(payment_doc)
+        record_balance_change('payment_records', payment_doc)
 
         # 2. Mark eligible invoices as paid
         invoices_col = get_collection('invoices')
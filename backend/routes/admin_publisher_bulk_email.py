@@ -4,10 +4,10 @@ from database import db_instance
 from bson import ObjectId
 import logging
 from datetime import datetime, timedelta
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+from services.smtp_delivery import get_smtp_delivery_engine
 
 logger = logging.getLogger(__name__)
 
@@ -250,107 +250,94 @@ def calculate_match_score(offer, publisher):
     return min(score, 100)
 
 
-def send_bulk_email_with_offers(recipient_email, recipient_name, subject, message, offers, sender_name):
-    """Send email with personalized offer list"""
-    try:
-        smtp_host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
-        smtp_port = int(os.getenv('SMTP_PORT', 587))
-        smtp_user = os.getenv('SMTP_USER', 'business@moustacheleads.com')
-        smtp_pass = os.getenv('SMTP_PASS', '').strip()
-        from_email = os.getenv('FROM_EMAIL', 'business@moustacheleads.com')
-        
-        logger.info(f"Attempting to send email to {recipient_email}")
-        logger.info(f"SMTP Config: host={smtp_host}, port={smtp_port}, user={smtp_user}")
-        logger.info(f"SMTP_PASS configured: {bool(smtp_pass)}")
-        
-        if not smtp_pass:
-            logger.error("SMTP_PASS not configured in .env file")
-            return False, "Email configuration missing"
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = f"{sender_name} <{from_email}>"
-        msg['To'] = recipient_email
-        
-        # Build offers HTML
-        offers_html = ""
-        if offers:
-            offers_html = '<div style="margin: 20px 0;"><h3 style="color: #667eea; margin-bottom: 15px;">🎯 Recommended Offers for You</h3>'
-            for offer in offers:
-                countries_str = ', '.join(offer.get('countries', [])[:3])
-                offers_html += f'''
-                <div style="background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); border-radius: 8px; padding: 15px; margin-bottom: 10px; border-left: 4px solid #667eea;">
-                    <div style="display: flex; justify-content: space-between; align-items: start;">
-                        <div style="flex: 1;">
-                            <h4 style="margin: 0 0 5px 0; color: #333; font-size: 16px;">{offer.get('name', 'Unnamed Offer')}</h4>
-                            <p style="margin: 5px 0; color: #666; font-size: 13px;">
-                                <strong>Vertical:</strong> {offer.get('vertical', 'N/A')} | 
-                                <strong>Geo:</strong> {countries_str or 'Global'}
-                            </p>
+def build_bulk_email_message(recipient_email, recipient_name, subject, message, offers, sender_name):
+    """Build the email with personalized offer list"""
+    from_email = os.getenv('FROM_EMAIL', 'business@moustacheleads.com')
+    
+    # Create message
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = f"{sender_name} <{from_email}>"
+    msg['To'] = recipient_email
+    
+    # Build offers HTML
+    offers_html = ""
+    if offers:
+        offers_html = '<div style="margin: 20px 0;"><h3 style="color: #667eea; margin-bottom: 15px;">🎯 Recommended Offers for You</h3>'
+        for offer in offers:
+            countries_str = ', '.join(offer.get('countries', [])[:3])
+            offers_html += f'''
+            <div style="background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); border-radius: 8px; padding: 15px; margin-bottom: 10px; border-left: 4px solid #667eea;">
+                <div style="display: flex; justify-content: space-between; align-items: start;">
+                    <div style="flex: 1;">
+                        <h4 style="margin: 0 0 5px 0; color: #333; font-size: 16px;">{offer.get('name', 'Unnamed Offer')}</h4>
+                        <p style="margin: 5px 0; color: #666; font-size: 13px;">
+                            <strong>Vertical:</strong> {offer.get('vertical', 'N/A')} | 
+                            <strong>Geo:</strong> {countries_str or 'Global'}
+                        </p>
+                    </div>
+                    <div style="text-align: right; margin-left: 15px;">
+                        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 8px 15px; border-radius: 6px; font-weight: bold; font-size: 14px;">
+                            ${offer.get('payout', 0):.2f}
                         </div>
-                        <div style="text-align: right; margin-left: 15px;">
-                            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 8px 15px; border-radius: 6px; font-weight: bold; font-size: 14px;">
-                                ${offer.get('payout', 0):.2f}
-                            </div>
-                            <div style="margin-top: 5px; font-size: 11px; color: #667eea; font-weight: 600;">
-                                {offer.get('match_score', 0)}% Match
-                            </div>
+                        <div style="margin-top: 5px; font-size: 11px; color: #667eea; font-weight: 600;">
+                            {offer.get('match_score', 0)}% Match
                         </div>
                     </div>
                 </div>
-                '''
-            offers_html += '</div>'
-        
-        # Create HTML email
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        </head>
-        <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 0; padding: 0; background-color: #f4f4f4;">
-            <div style="max-width: 600px; margin: 20px auto; background: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center;">
-                    <h1 style="margin: 0; font-size: 24px; font-weight: 600;">🎯 Moustache Leads</h1>
-                </div>
-                <div style="padding: 30px;">
-                    <div style="font-size: 18px; font-weight: 600; color: #333; margin-bottom: 20px;">Hi {recipient_name},</div>
-                    <div style="color: #555; line-height: 1.8; white-space: pre-wrap; word-wrap: break-word;">{message}</div>
-                    
-                    {offers_html}
-                    
-                    <div style="height: 1px; background: #e9ecef; margin: 20px 0;"></div>
-                    <p style="color: #6c757d; font-size: 14px; margin-top: 20px;">
-                        Best regards,<br>
-                        <strong>{sender_name}</strong><br>
-                        Moustache Leads Team
-                    </p>
-                    <a href="https://moustacheleads.com/dashboard" style="display: inline-block; padding: 12px 30px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: 600;">Go to Dashboard</a>
-                </div>
-                <div style="background: #f8f9fa; padding: 20px 30px; text-align: center; border-top: 1px solid #e9ecef;">
-                    <p style="margin: 5px 0; color: #6c757d; font-size: 14px;"><strong>Moustache Leads</strong></p>
-                    <p style="margin: 5px 0; color: #6c757d; font-size: 14px;">Your trusted affiliate marketing platform</p>
-                </div>
             </div>
-        </body>
-        </html>
-        """
-        
-        # Plain text version
-        offers_text = ""
-        if offers:
-            offers_text = "\n\n🎯 RECOMMENDED OFFERS FOR YOU:\n" + "="*50 + "\n"
-            for i, offer in enumerate(offers, 1):
-                countries_str = ', '.join(offer.get('countries', [])[:3])
-                offers_text += f"\n{i}. {offer.get('name', 'Unnamed Offer')}\n"
-                offers_text += f"   Payout: ${offer.get('payout', 0):.2f}\n"
-                offers_text += f"   Vertical: {offer.get('vertical', 'N/A')}\n"
-                offers_text += f"   Geo: {countries_str or 'Global'}\n"
-                offers_text += f"   Match: {offer.get('match_score', 0)}%\n"
-        
-        text_body = f"""
+            '''
+        offers_html += '</div>'
+    
+    # Create HTML email
+    html_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    </head>
+    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 0; padding: 0; background-color: #f4f4f4;">
+        <div style="max-width: 600px; margin: 20px auto; background: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center;">
+                <h1 style="margin: 0; font-size: 24px; font-weight: 600;">🎯 Moustache Leads</h1>
+            </div>
+            <div style="padding: 30px;">
+                <div style="font-size: 18px; font-weight: 600; color: #333; margin-bottom: 20px;">Hi {recipient_name},</div>
+                <div style="color: #555; line-height: 1.8; white-space: pre-wrap; word-wrap: break-word;">{message}</div>
+                
+                {offers_html}
+                
+                <div style="height: 1px; background: #e9ecef; margin: 20px 0;"></div>
+                <p style="color: #6c757d; font-size: 14px; margin-top: 20px;">
+                    Best regards,<br>
+                    <strong>{sender_name}</strong><br>
+                    Moustache Leads Team
+                </p>
+                <a href="https://moustacheleads.com/dashboard" style="display: inline-block; padding: 12px 30px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: 600;">Go to Dashboard</a>
+            </div>
+            <div style="background: #f8f9fa; padding: 20px 30px; text-align: center; border-top: 1px solid #e9ecef;">
+                <p style="margin: 5px 0; color: #6c757d; font-size: 14px;"><strong>Moustache Leads</strong></p>
+                <p style="margin: 5px 0; color: #6c757d; font-size: 14px;">Your trusted affiliate marketing platform</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Plain text version
+    offers_text = ""
+    if offers:
+        offers_text = "\n\n🎯 RECOMMENDED OFFERS FOR YOU:\n" + "="*50 + "\n"
+        for i, offer in enumerate(offers, 1):
+            countries_str = ', '.join(offer.get('countries', [])[:3])
+            offers_text += f"\n{i}. {offer.get('name', 'Unnamed Offer')}\n"
+            offers_text += f"   Payout: ${offer.get('payout', 0):.2f}\n"
+            offers_text += f"   Vertical: {offer.get('vertical', 'N/A')}\n"
+            offers_text += f"   Geo: {countries_str or 'Global'}\n"
+            offers_text += f"   Match: {offer.get('match_score', 0)}%\n"
+    
+    text_body = f"""
 Hi {recipient_name},
 
 {message}
@@ -363,35 +350,30 @@ Moustache Leads Team
 ---
 Moustache Leads
 Your trusted affiliate marketing platform
-        """
-        
-        # Attach both versions
-        part1 = MIMEText(text_body, 'plain')
-        part2 = MIMEText(html_body, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send email
-        logger.info(f"Connecting to SMTP server {smtp_host}:{smtp_port}...")
-        with smtplib.SMTP(smtp_host, smtp_port, timeout=30) as server:
-            logger.info("Starting TLS...")
-            server.starttls()
-            logger.info(f"Logging in as {smtp_user}...")
-            server.login(smtp_user, smtp_pass)
-            logger.info("Sending message...")
-            server.send_message(msg)
-            logger.info(f"Email sent successfully to {recipient_email}")
+    """
+    
+    # Attach both versions
+    part1 = MIMEText(text_body, 'plain')
+    part2 = MIMEText(html_body, 'html')
+    msg.attach(part1)
+    msg.attach(part2)
+    
+    return msg
+
+
+def send_bulk_email_with_offers(recipient_email, recipient_name, subject, message, offers, sender_name):
+    """Send email with personalized offer list"""
+    try:
+        if not os.getenv('SMTP_PASS', '').strip():
+            logger.error("SMTP_PASS not configured in .env file")
+            return False, "Email configuration missing"
         
-        return True, None
+        msg = build_bulk_email_message(recipient_email, recipient_name, subject, message, offers, sender_name)
+        if get_smtp_delivery_engine().send(msg, campaign='publisher_bulk_email'):
+            logger.info(f"Email sent successfully to {recipient_email}")
+            return True, None
+        return False, "SMTP error"
         
-    except smtplib.SMTPAuthenticationError as e:
-        error_msg = f"SMTP Authentication failed: {str(e)}"
-        logger.error(error_msg)
-        return False, error_msg
-    except smtplib.SMTPException as e:
-        error_msg = f"SMTP error: {str(e)}"
-        logger.error(error_msg)
-        return False, error_msg
     except Exception as e:
         error_msg = f"Failed to send email: {str(e)}"
         logger.error(error_msg, exc_info=True)
@@ -439,10 +421,24 @@ def send_bulk_email_to_publishers():
         if not publishers:
             return jsonify({'error': 'No valid publishers found'}), 404
         
-        # Send emails
+        if not os.getenv('SMTP_PASS', '').strip():
+            logger.error("SMTP_PASS not configured in .env file")
+            return jsonify({'error': 'Email configuration missing'}), 503
+        
+        # Custom selection: load the offers once instead of per publisher
+        custom_offers = []
+        if 'custom' in offer_types and custom_offer_ids:
+            offers_col = db_instance.get_collection('offers')
+            if offers_col is not None:
+                found = {o['offer_id']: o for o in offers_col.find({'offer_id': {'$in': custom_offer_ids}})}
+                custom_offers = [(oid, found[oid]) for oid in custom_offer_ids if oid in found]
+        
+        # Build emails
         success_count = 0
         failed_count = 0
         results = []
+        pending = []  # (publisher, recipient_email, recipient_name, matched_offers)
+        messages = []
         
         email_logs_col = db_instance.get_collection('email_logs')
         
@@ -462,36 +458,44 @@ def send_bulk_email_to_publishers():
             # Get matched offers for this publisher
             if 'custom' in offer_types and custom_offer_ids:
                 # Use custom selected offers
-                offers_col = db_instance.get_collection('offers')
-                if offers_col is None:
-                    matched_offers = []
-                else:
-                    matched_offers = []
-                    for offer_id in custom_offer_ids:
-                        offer = offers_col.find_one({'offer_id': offer_id})
-                        if offer:
-                            matched_offers.append({
-                            'offer_id': offer_id,
-                            'name': offer.get('name'),
-                            'payout': offer.get('payout'),
-                            'vertical': offer.get('vertical') or offer.get('category'),
-                            'countries': offer.get('allowed_countries') or offer.get('countries', []),
-                            'match_type': 'custom',
-                            'match_score': calculate_match_score(offer, publisher)
-                        })
+                matched_offers = [{
+                    'offer_id': offer_id,
+                    'name': offer.get('name'),
+                    'payout': offer.get('payout'),
+                    'vertical': offer.get('vertical') or offer.get('category'),
+                    'countries': offer.get('allowed_countries') or offer.get('countries', []),
+                    'match_type': 'custom',
+                    'match_score': calculate_match_score(offer, publisher)
+                } for offer_id, offer in custom_offers]
             else:
                 matched_offers = get_matched_offers_for_publisher(publisher, offer_types)
             
-            # Send email
-            success, error_msg = send_bulk_email_with_offers(
-                recipient_email=recipient_email,
-                recipient_name=recipient_name,
-                subject=subject,
-                message=message,
-                offers=matched_offers,
-                sender_name=admin_name
-            )
-            
+            try:
+                messages.append(build_bulk_email_message(
+                    recipient_email=recipient_email,
+                    recipient_name=recipient_name,
+                    subject=subject,
+                    message=message,
+                    offers=matched_offers,
+                    sender_name=admin_name
+                ))
+            except Exception as e:
+                logger.error(f"Failed to build email for {recipient_email}: {e}")
+                failed_count += 1
+                results.append({
+                    'publisher_id': str(publisher['_id']),
+                    'email': recipient_email,
+                    'status': 'failed',
+                    'reason': str(e)
+                })
+                continue
+            pending.append((publisher, recipient_email, recipient_name, matched_offers))
+        
+        # Send all emails concurrently over pooled SMTP connections
+        delivery = get_smtp_delivery_engine().send_many(messages, campaign='publisher_bulk_email')
+        
+        logs = []
+        for (publisher, recipient_email, recipient_name, matched_offers), (success, error_msg) in zip(pending, delivery):
             if success:
                 success_count += 1
                 results.append({
@@ -503,7 +507,7 @@ def send_bulk_email_to_publishers():
                 
                 # Log email
                 if email_logs_col is not None:
-                    email_logs_col.insert_one({
+                    logs.append({
                         'type': 'admin_bulk_email_with_offers',
                         'from_user_id': str(current_user['_id']),
                         'from_name': admin_name,
@@ -528,6 +532,9 @@ def send_bulk_email_to_publishers():
                     'reason': error_msg or 'SMTP error'
                 })
         
+        if logs:
+            email_logs_col.insert_many(logs)
+        
         return jsonify({
             'success': True,
             'message': f'Sent {success_count} emails successfully, {failed_count} failed',
@@ -11,8 +11,7 @@ from database import db_instance
 from bson import ObjectId
 from datetime import datetime, timedelta
 import logging
-import csv
-import io
+from services.streaming_export import get_export_progress, stream_csv
 
 logger = logging.getLogger(__name__)
 
@@ -1554,7 +1553,7 @@ def admin_report_filters():
 @token_required
 @subadmin_or_admin_required('tracking')
 def admin_export_report():
-    """Export admin report as CSV"""
+    """Export admin report as CSV (streamed row by row)"""
     try:
         user = request.current_user
         user_id = str(user['_id'])
@@ -1573,8 +1572,8 @@ def admin_export_report():
             return jsonify({'error': 'Invalid date format'}), 400
 
         date_range = {'start': start_date, 'end': end_date}
-        output = io.StringIO()
-        writer = csv.writer(output)
+        is_subadmin = user.get('role') == 'subadmin'
+        filename = f'admin_{report_type}_report_{start_date.strftime("%Y%m%d")}.csv'
 
         if report_type == 'performance':
             filters = {}
@@ -1598,35 +1597,29 @@ def admin_export_report():
                        'Browser', 'Device', 'OS', 'IP Address',
                        'Clicks', 'Unique Clicks', 'Suspicious', 'Conversions',
                        'Approved', 'Payout', 'Revenue', 'Profit', 'CR%', 'EPC', 'Currency']
-            writer.writerow(headers)
-            is_subadmin = user.get('role') == 'subadmin'
-            for row in report['data']:
-                revenue = row.get('total_payout', 0) if is_subadmin else row.get('total_revenue', 0)
-                profit = 0.0 if is_subadmin else row.get('profit', 0)
-                writer.writerow([
-                    row.get('date', ''), row.get('publisher_name', ''), row.get('publisher_email', ''),
-                    row.get('publisher_role', ''), row.get('publisher_id', row.get('user_id', '')),
-                    row.get('offer_id', ''), row.get('offer_name', ''),
-                    row.get('network', ''), row.get('category', ''), row.get('promo_code', ''),
-                    row.get('click_id', ''), row.get('referer', ''),
-                    row.get('country', ''), row.get('city', ''), row.get('region', ''),
-                    row.get('browser', ''), row.get('device_type', ''), row.get('os', ''),
-                    row.get('ip_address', ''),
-                    row.get('clicks', 0), row.get('unique_clicks', 0),
-                    row.get('suspicious_clicks', 0), row.get('conversions', 0),
-                    row.get('approved_conversions', 0), row.get('total_payout', 0),
-                    revenue, profit,
-                    row.get('cr', 0), row.get('epc', 0), row.get('currency', 'USD')
-                ])
-        else:
-            report = user_reports_model.get_conversion_report(
-                user_id=user_id,
-                date_range=date_range,
-                pagination={'page': 1, 'per_page': 5000}
-            )
-            if 'error' in report:
-                return jsonify({'error': report['error']}), 500
 
+            def performance_rows():
+                for row in report['data']:
+                    revenue = row.get('total_payout', 0) if is_subadmin else row.get('total_revenue', 0)
+                    profit = 0.0 if is_subadmin else row.get('profit', 0)
+                    yield [
+                        row.get('date', ''), row.get('publisher_name', ''), row.get('publisher_email', ''),
+                        row.get('publisher_role', ''), row.get('publisher_id', row.get('user_id', '')),
+                        row.get('offer_id', ''), row.get('offer_name', ''),
+                        row.get('network', ''), row.get('category', ''), row.get('promo_code', ''),
+                        row.get('click_id', ''), row.get('referer', ''),
+                        row.get('country', ''), row.get('city', ''), row.get('region', ''),
+                        row.get('browser', ''), row.get('device_type', ''), row.get('os', ''),
+                        row.get('ip_address', ''),
+                        row.get('clicks', 0), row.get('unique_clicks', 0),
+                        row.get('suspicious_clicks', 0), row.get('conversions', 0),
+                        row.get('approved_conversions', 0), row.get('total_payout', 0),
+                        revenue, profit,
+                        row.get('cr', 0), row.get('epc', 0), row.get('currency', 'USD')
+                    ]
+
+            return stream_csv(filename, headers, performance_rows(), total=len(report['data']))
+        else:
             headers = ['Time', 'Click Time', 'Publisher', 'Publisher Email', 'Role',
                        'Username', 'Offer', 'Offer ID', 'Click ID', 'Conversion ID',
                        'Source', 'Payout', 'Revenue', 'Profit', 'Currency',
@@ -1636,43 +1629,49 @@ def admin_export_report():
                        'Fraud Status', 'Fraud Score', 'VPN', 'Proxy', 'Tor',
                        'Placement', 'Referrer', 'Forward Status',
                        'Sub ID 1', 'Sub ID 2', 'Sub ID 3']
-            writer.writerow(headers)
-            is_subadmin = user.get('role') == 'subadmin'
-            for conv in report['conversions']:
-                revenue = conv.get('points', 0) if is_subadmin else conv.get('revenue', 0)
-                profit = 0.0 if is_subadmin else conv.get('profit', 0)
-                writer.writerow([
-                    conv.get('time', ''), conv.get('click_time', ''),
-                    conv.get('publisher_name', ''), conv.get('user_email', ''),
-                    conv.get('user_role', ''), conv.get('username', ''),
-                    conv.get('offer_name', ''), conv.get('offer_id', ''),
-                    conv.get('click_id', ''), conv.get('_id', ''),
-                    conv.get('click_source', ''),
-                    conv.get('points', 0), revenue, profit,
-                    conv.get('currency', 'USD'), conv.get('status', ''),
-                    conv.get('country', ''), conv.get('city', ''), conv.get('region', ''),
-                    conv.get('postal_code', ''),
-                    conv.get('device_type', ''), conv.get('browser', ''), conv.get('os', ''),
-                    conv.get('ip_address', ''),
-                    conv.get('asn', ''), conv.get('isp', ''), conv.get('organization', ''),
-                    conv.get('fraud_status', ''), conv.get('fraud_score', ''),
-                    conv.get('vpn_detected', ''), conv.get('proxy_detected', ''),
-                    conv.get('tor_detected', ''),
-                    conv.get('placement_title', ''), conv.get('referer', ''),
-                    conv.get('forward_status', ''),
-                    conv.get('sub_id1', ''), conv.get('sub_id2', ''), conv.get('sub_id3', '')
-                ])
-
-        output.seek(0)
-        return output.getvalue(), 200, {
-            'Content-Type': 'text/csv',
-            'Content-Disposition': f'attachment; filename=admin_{report_type}_report_{start_date.strftime("%Y%m%d")}.csv'
-        }
+
+            def conversion_rows():
+                for conv in user_reports_model.iter_conversion_export(user_id, date_range):
+                    revenue = conv.get('points', 0) if is_subadmin else conv.get('revenue', 0)
+                    profit = 0.0 if is_subadmin else conv.get('profit', 0)
+                    yield [
+                        conv.get('time', ''), conv.get('click_time', ''),
+                        conv.get('publisher_name', ''), conv.get('user_email', ''),
+                        conv.get('user_role', ''), conv.get('username', ''),
+                        conv.get('offer_name', ''), conv.get('offer_id', ''),
+                        conv.get('click_id', ''), conv.get('_id', ''),
+                        conv.get('click_source', ''),
+                        conv.get('points', 0), revenue, profit,
+                        conv.get('currency', 'USD'), conv.get('status', ''),
+                        conv.get('country', ''), conv.get('city', ''), conv.get('region', ''),
+                        conv.get('postal_code', ''),
+                        conv.get('device_type', ''), conv.get('browser', ''), conv.get('os', ''),
+                        conv.get('ip_address', ''),
+                        conv.get('asn', ''), conv.get('isp', ''), conv.get('organization', ''),
+                        conv.get('fraud_status', ''), conv.get('fraud_score', ''),
+                        conv.get('vpn_detected', ''), conv.get('proxy_detected', ''),
+                        conv.get('tor_detected', ''),
+                        conv.get('placement_title', ''), conv.get('referer', ''),
+                        conv.get('forward_status', ''),
+                        conv.get('sub_id1', ''), conv.get('sub_id2', ''), conv.get('sub_id3', '')
+                    ]
+
+            return stream_csv(filename, headers, conversion_rows())
 
     except Exception as e:
         logger.error(f"Error in admin_export_report: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@admin_reports_bp.route('/api/admin/reports/export/progress/<export_id>', methods=['GET'])
+@token_required
+@subadmin_or_admin_required('tracking')
+def admin_export_progress(export_id):
+    """Rows written so far for a streamed export (id from the X-Export-Id header)"""
+    progress = get_export_progress(export_id)
+    if not progress:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify({'success': True, 'progress': progress}), 200
+
 @admin_reports_bp.route('/api/admin/users/bulk-stats', methods=['POST'])
 @token_required
 def get_bulk_user_stats():
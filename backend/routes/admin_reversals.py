@@ -8,6 +8,8 @@ and optionally send a notification to the publisher.
 from flask import Blueprint, request, jsonify
 from utils.auth import token_required, admin_required
 from database import db_instance
+from models.balance_ledger import record_balance_change
+from services.settings_snapshot_service import get_platform_setting
 from bson import ObjectId
 from datetime import datetime
 import logging
@@ -63,6 +65,7 @@ def reverse_single_conversion():
             update_fields['reversal_reason'] = reason
 
         col.update_one({'_id': ObjectId(conversion_id)}, {'$set': update_fields})
+        record_balance_change('forwarded_postbacks', {**conv, **update_fields})
 
         # If reason provided, send notification to publisher
         if reason:
@@ -133,6 +136,7 @@ def reverse_bulk_conversions():
                     update_fields['reversal_reason'] = reason
 
                 col.update_one({'_id': ObjectId(cid)}, {'$set': update_fields})
+                record_balance_change('forwarded_postbacks', {**conv, **update_fields})
                 reversed_count += 1
 
                 publisher_id = conv.get('publisher_id', '')
@@ -232,12 +236,7 @@ def _update_invoice_on_reversal(conv, reversed_at):
             }
 
             # Check threshold
-            settings_col = get_collection('platform_settings')
-            threshold = 50  # default
-            if settings_col:
-                s = settings_col.find_one({'key': 'payment_threshold'})
-                if s:
-                    threshold = s.get('value', 50)
+            threshold = (get_platform_setting('payment_threshold') or {}).get('value', 50)
 
             if new_net < threshold:
                 update['status'] = 'held'
@@ -92,6 +92,9 @@ def manage_postback_url():
             postback_url = data.get('postback_url', '').strip()
             
             users_col.update_one({'_id': user_id}, {'$set': {'postback_url': postback_url}})
+            if request.current_user.get('role') == 'partner':
+                from services.settings_snapshot_service import bump_settings_version
+                bump_settings_version('partners')
             return jsonify({'success': True, 'message': 'Postback URL updated successfully', 'postback_url': postback_url}), 200
             
     except Exception as e:
@@ -3,6 +3,7 @@ from models.user import User
 from utils.auth import generate_token, token_required
 from services.email_verification_service import get_email_verification_service
 from services.pdf_service import PDFService
+from services.settings_snapshot_service import bump_settings_version
 from utils.agreement_content import AGREEMENT_TEXT
 import re
 import os
@@ -832,6 +833,9 @@ def update_profile():
         user_model = User()
         success = user_model.update_user(str(user['_id']), update_doc)
         
+        if success and user.get('role') == 'partner' and ('postback_url' in update_doc or 'postback_method' in update_doc):
+            bump_settings_version('partners')
+        
         if success:
             # Get updated user data
             updated_user = user_model.find_by_id(str(user['_id']))
@@ -8,6 +8,13 @@ import logging
 from datetime import datetime, timedelta
 from bson import ObjectId
 from utils.auth import token_required, subadmin_or_admin_required
+from models.report_rollups import record_click
+from models.click_events import ClickEvents, record_click_event
+from models.report_rollups import OFFERWALL_SOURCES
+from services.streaming_export import (
+    cell_value, dict_rows, iter_documents, json_chunks, send_spooled_file,
+    start_export, stream_csv, stream_response, write_xlsx
+)
 
 logger = logging.getLogger(__name__)
 
@@ -125,38 +132,129 @@ def get_detailed_events():
         return jsonify({'error': str(e)}), 500
 
 
+# ----------------------------------------------------------------------------
+# Drill-down helpers: summaries come from server-side counts/aggregations and
+# event lists are keyset-paginated on (timestamp, _id), newest first.
+#   ?limit=50            page size (max 500)
+#   ?list=clicks&cursor= next page of a single list (cursor from pagination)
+# ----------------------------------------------------------------------------
+
+EVENT_PAGE_SIZE = 50
+EVENT_PAGE_MAX = 500
+
+
+def _encode_event_cursor(doc):
+    ts = doc.get('timestamp')
+    return f"{ts.isoformat() if isinstance(ts, datetime) else ''}_{doc['_id']}"
+
+
+def _event_cursor_filter(token):
+    """Filter for events strictly after the cursor in (timestamp desc, _id desc) order."""
+    ts_part, _, id_part = token.rpartition('_')
+    try:
+        oid = ObjectId(id_part)
+        ts = datetime.fromisoformat(ts_part) if ts_part else None
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if ts is None:
+        return {'timestamp': None, '_id': {'$lt': oid}}
+    return {'$or': [
+        {'timestamp': {'$lt': ts}},
+        {'timestamp': ts, '_id': {'$lt': oid}},
+        {'timestamp': None},
+    ]}
+
+
+def _event_page(col, match, limit, cursor=None):
+    """One page of events plus its pagination metadata."""
+    if col is None:
+        return [], {'next_cursor': None, 'has_more': False, 'limit': limit}
+    query = {'$and': [match, _event_cursor_filter(cursor)]} if cursor else match
+    docs = list(col.find(query).sort([('timestamp', -1), ('_id', -1)]).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = _encode_event_cursor(docs[-1]) if has_more else None
+    for doc in docs:
+        doc['_id'] = str(doc['_id'])
+    return docs, {'next_cursor': next_cursor, 'has_more': has_more, 'limit': limit}
+
+
+def _drilldown_lists(lists):
+    """
+    Fetch event pages for a drill-down.
+    Returns (pages, pagination) for every list, or for just ?list= when given.
+    """
+    limit = min(max(int(request.args.get('limit', EVENT_PAGE_SIZE)), 1), EVENT_PAGE_MAX)
+    only = request.args.get('list')
+    cursor = request.args.get('cursor')
+    if only and only not in lists:
+        raise ValueError(f"Unknown list '{only}'. Expected one of: {', '.join(lists)}")
+
+    pages, pagination = {}, {}
+    for name, (col, match) in lists.items():
+        if only and name != only:
+            continue
+        pages[name], pagination[name] = _event_page(col, match, limit, cursor if only else None)
+    return pages, pagination, bool(only)
+
+
+def _count(col, match):
+    return col.count_documents(match) if col is not None else 0
+
+
+def _sum_field(col, match, field):
+    """Count and sum of a numeric field via $group (no documents shipped to Python)."""
+    if col is None:
+        return 0, 0
+    result = list(col.aggregate([
+        {'$match': match},
+        {'$group': {'_id': None, 'count': {'$sum': 1}, 'total': {'$sum': {'$ifNull': [f'${field}', 0]}}}},
+    ]))
+    if not result:
+        return 0, 0
+    return result[0]['count'], result[0]['total']
+
+
+def _offerwall_click_events(match, limit):
+    """Latest offerwall clicks from the unified click store, or None until it is backfilled."""
+    click_events = ClickEvents()
+    if not click_events.covers():
+        return None
+    clicks = []
+    seen_click_ids = set()
+    query = {'source': {'$in': OFFERWALL_SOURCES}, **match}
+    # A click can be logged in both offerwall collections; over-fetch to make up for dropped duplicates
+    for event in click_events.collection.find(query).sort('timestamp', -1).limit(limit * 2):
+        click_id = event.get('click_id')
+        if click_id:
+            if click_id in seen_click_ids:
+                continue
+            seen_click_ids.add(click_id)
+        clicks.append(event)
+        if len(clicks) >= limit:
+            break
+    return clicks
+
+
 @comprehensive_analytics_bp.route('/api/admin/offerwall/user-tracking/<user_id>', methods=['GET'])
 def get_user_tracking_details(user_id):
-    """Get complete tracking details for a specific user"""
+    """Get tracking summary and paginated events for a specific user"""
     try:
-        # Get all sessions for user
-        sessions_col = db_instance.get_collection('offerwall_sessions_detailed')
-        sessions = list(sessions_col.find({'user_id': user_id}))
-        
-        # Get all impressions
-        impressions_col = db_instance.get_collection('offerwall_impressions_detailed')
-        impressions = list(impressions_col.find({'user_id': user_id}))
-        
-        # Get all clicks
-        clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
-        clicks = list(clicks_col.find({'user_id': user_id}))
-        
-        # Get all conversions
-        conversions_col = db_instance.get_collection('offerwall_conversions_detailed')
-        conversions = list(conversions_col.find({'user_id': user_id}))
-        
-        # Get fraud signals
-        fraud_col = db_instance.get_collection('offerwall_fraud_signals')
-        fraud_signals = list(fraud_col.find({'user_id': user_id}))
+        match = {'user_id': user_id}
+        lists = {
+            'sessions': (db_instance.get_collection('offerwall_sessions_detailed'), match),
+            'impressions': (db_instance.get_collection('offerwall_impressions_detailed'), match),
+            'clicks': (db_instance.get_collection('offerwall_clicks_detailed'), match),
+            'conversions': (db_instance.get_collection('offerwall_conversions_detailed'), match),
+            'fraud_signals': (db_instance.get_collection('offerwall_fraud_signals'), match),
+        }
+        pages, pagination, single_list = _drilldown_lists(lists)
+        if single_list:
+            return jsonify({'success': True, 'data': {'user_id': user_id, **pages, 'pagination': pagination}}), 200
         
         # Get user points
         points_col = db_instance.get_collection('user_points')
         user_points = points_col.find_one({'user_id': user_id})
-        
-        # Convert ObjectIds to strings
-        for item in sessions + impressions + clicks + conversions + fraud_signals:
-            item['_id'] = str(item['_id'])
-        
         if user_points:
             user_points['_id'] = str(user_points['_id'])
         
@@ -164,23 +262,22 @@ def get_user_tracking_details(user_id):
             'success': True,
             'data': {
                 'user_id': user_id,
-                'sessions': sessions,
-                'impressions': impressions,
-                'clicks': clicks,
-                'conversions': conversions,
-                'fraud_signals': fraud_signals,
+                **pages,
                 'points': user_points,
+                'pagination': pagination,
                 'summary': {
-                    'total_sessions': len(sessions),
-                    'total_impressions': len(impressions),
-                    'total_clicks': len(clicks),
-                    'total_conversions': len(conversions),
-                    'total_fraud_signals': len(fraud_signals),
+                    'total_sessions': _count(*lists['sessions']),
+                    'total_impressions': _count(*lists['impressions']),
+                    'total_clicks': _count(*lists['clicks']),
+                    'total_conversions': _count(*lists['conversions']),
+                    'total_fraud_signals': _count(*lists['fraud_signals']),
                     'total_points': user_points.get('total_points', 0) if user_points else 0,
                 }
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"❌ Error getting user tracking: {e}")
         return jsonify({'error': str(e)}), 500
@@ -188,53 +285,50 @@ def get_user_tracking_details(user_id):
 
 @comprehensive_analytics_bp.route('/api/admin/offerwall/publisher-tracking/<publisher_id>', methods=['GET'])
 def get_publisher_tracking_details(publisher_id):
-    """Get complete tracking details for a specific publisher"""
+    """Get tracking summary and paginated events for a specific publisher"""
     try:
-        # Get all placements
+        match = {'publisher_id': publisher_id}
+        lists = {
+            'clicks': (db_instance.get_collection('offerwall_clicks_detailed'), match),
+            'conversions': (db_instance.get_collection('offerwall_conversions_detailed'), match),
+            'earnings': (db_instance.get_collection('publisher_earnings'), match),
+        }
+        pages, pagination, single_list = _drilldown_lists(lists)
+        if single_list:
+            return jsonify({'success': True, 'data': {'publisher_id': publisher_id, **pages, 'pagination': pagination}}), 200
+        
+        # Placements are configuration, not history - a publisher has a handful
         placements_col = db_instance.get_collection('placements')
         placements = list(placements_col.find({'publisherId': ObjectId(publisher_id)}))
+        for item in placements:
+            item['_id'] = str(item['_id'])
         
-        # Get all clicks for publisher
-        clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
-        clicks = list(clicks_col.find({'publisher_id': publisher_id}))
-        
-        # Get all conversions
-        conversions_col = db_instance.get_collection('offerwall_conversions_detailed')
-        conversions = list(conversions_col.find({'publisher_id': publisher_id}))
-        
-        # Get publisher earnings
-        earnings_col = db_instance.get_collection('publisher_earnings')
-        earnings = list(earnings_col.find({'publisher_id': publisher_id}))
-        
-        # Calculate totals
-        total_clicks = len(clicks)
-        total_conversions = len(conversions)
-        total_earnings = sum(e['earnings'] for e in earnings)
-        
-        # Convert ObjectIds
-        for item in placements + clicks + conversions + earnings:
-            if '_id' in item:
-                item['_id'] = str(item['_id'])
+        # Calculate totals server-side
+        total_impressions = _count(db_instance.get_collection('offerwall_impressions_detailed'), match)
+        total_clicks = _count(*lists['clicks'])
+        total_conversions = _count(*lists['conversions'])
+        _, total_earnings = _sum_field(*lists['earnings'], 'earnings')
         
         return jsonify({
             'success': True,
             'data': {
                 'publisher_id': publisher_id,
                 'placements': placements,
-                'clicks': clicks,
-                'conversions': conversions,
-                'earnings': earnings,
+                **pages,
+                'pagination': pagination,
                 'summary': {
                     'total_placements': len(placements),
                     'total_clicks': total_clicks,
                     'total_conversions': total_conversions,
                     'total_earnings': round(total_earnings, 2),
-                    'ctr': round((total_clicks / len(clicks)) * 100, 2) if clicks else 0,
+                    'ctr': round((total_clicks / total_impressions) * 100, 2) if total_impressions else 0,
                     'cvr': round((total_conversions / total_clicks) * 100, 2) if total_clicks > 0 else 0,
                 }
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"❌ Error getting publisher tracking: {e}")
         return jsonify({'error': str(e)}), 500
@@ -242,41 +336,32 @@ def get_publisher_tracking_details(publisher_id):
 
 @comprehensive_analytics_bp.route('/api/admin/offerwall/offer-tracking/<offer_id>', methods=['GET'])
 def get_offer_tracking_details(offer_id):
-    """Get complete tracking details for a specific offer"""
+    """Get tracking summary and paginated events for a specific offer"""
     try:
-        # Get all clicks for offer
-        clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
-        clicks = list(clicks_col.find({'offer_id': offer_id}))
-        
-        # Get all conversions
-        conversions_col = db_instance.get_collection('offerwall_conversions_detailed')
-        conversions = list(conversions_col.find({'offer_id': offer_id}))
-        
-        # Get impressions
-        impressions_col = db_instance.get_collection('offerwall_impressions_detailed')
-        impressions = list(impressions_col.find({'offer_id': offer_id}))
+        match = {'offer_id': offer_id}
+        lists = {
+            'impressions': (db_instance.get_collection('offerwall_impressions_detailed'), match),
+            'clicks': (db_instance.get_collection('offerwall_clicks_detailed'), match),
+            'conversions': (db_instance.get_collection('offerwall_conversions_detailed'), match),
+        }
+        pages, pagination, single_list = _drilldown_lists(lists)
+        if single_list:
+            return jsonify({'success': True, 'data': {'offer_id': offer_id, **pages, 'pagination': pagination}}), 200
         
-        # Calculate metrics
-        total_impressions = len(impressions)
-        total_clicks = len(clicks)
-        total_conversions = len(conversions)
-        total_payout = sum(c['payout']['network_payout'] for c in conversions)
+        # Calculate metrics server-side
+        total_impressions = _count(*lists['impressions'])
+        total_clicks = _count(*lists['clicks'])
+        total_conversions, total_payout = _sum_field(*lists['conversions'], 'payout.network_payout')
         
         ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
         cvr = (total_conversions / total_clicks * 100) if total_clicks > 0 else 0
         
-        # Convert ObjectIds
-        for item in clicks + conversions + impressions:
-            if '_id' in item:
-                item['_id'] = str(item['_id'])
-        
         return jsonify({
             'success': True,
             'data': {
                 'offer_id': offer_id,
-                'impressions': impressions,
-                'clicks': clicks,
-                'conversions': conversions,
+                **pages,
+                'pagination': pagination,
                 'summary': {
                     'total_impressions': total_impressions,
                     'total_clicks': total_clicks,
@@ -289,6 +374,8 @@ def get_offer_tracking_details(offer_id):
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"❌ Error getting offer tracking: {e}")
         return jsonify({'error': str(e)}), 500
@@ -441,45 +528,40 @@ def get_revenue_analysis():
 
 @comprehensive_analytics_bp.route('/api/admin/offerwall/export-report', methods=['POST'])
 def export_report():
-    """Export detailed report as CSV/JSON"""
+    """
+    Export detailed report as CSV/XLSX/JSON.
+    Streams straight from a batched cursor so large collections never sit in memory.
+    Optional 'fields' limits the exported columns (applied as a projection).
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         report_type = data.get('report_type', 'conversions')
-        format_type = data.get('format', 'json')  # json or csv
+        format_type = data.get('format', 'json')  # json, csv or xlsx
+        fields = data.get('fields')
         
-        if report_type == 'conversions':
-            conversions_col = db_instance.get_collection('offerwall_conversions_detailed')
-            records = list(conversions_col.find({}))
-        elif report_type == 'clicks':
-            clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
-            records = list(clicks_col.find({}))
-        else:
-            records = []
-        
-        # Convert ObjectIds to strings
-        for record in records:
-            record['_id'] = str(record['_id'])
+        collections = {
+            'conversions': 'offerwall_conversions_detailed',
+            'clicks': 'offerwall_clicks_detailed',
+        }
+        col = db_instance.get_collection(collections[report_type]) if report_type in collections else None
+        projection = {field: 1 for field in fields} if fields else None
+        docs = iter_documents(col, projection=projection) if col is not None else iter(())
+        filename = f'offerwall_{report_type}'
         
         if format_type == 'csv':
-            # Convert to CSV
-            import csv
-            import io
-            
-            output = io.StringIO()
-            if records:
-                writer = csv.DictWriter(output, fieldnames=records[0].keys())
-                writer.writeheader()
-                writer.writerows(records)
-            
-            return output.getvalue(), 200, {
-                'Content-Disposition': f'attachment; filename="offerwall_{report_type}.csv"',
-                'Content-Type': 'text/csv'
-            }
+            header, rows = dict_rows(docs)
+            return stream_csv(f'{filename}.csv', header, rows)
+        elif format_type == 'xlsx':
+            header, rows = dict_rows(docs)
+            progress = start_export(f'{filename}.xlsx')
+            spool = write_xlsx([(report_type.title(), header, ([cell_value(v) for v in row] for row in rows))], progress)
+            return send_spooled_file(
+                spool, f'{filename}.xlsx',
+                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', progress
+            )
         else:
-            return jsonify({
-                'success': True,
-                'data': records
-            }), 200
+            progress = start_export(f'{filename}.json')
+            return stream_response(json_chunks(docs, progress), None, 'application/json', progress)
         
     except Exception as e:
         logger.error(f"❌ Error exporting report: {e}")
@@ -594,38 +676,41 @@ def get_click_history():
         if offer_id:
             filters['offer_id'] = offer_id
         
-        # Get offerwall click collections (NOT simple tracking - those are affiliate link clicks)
-        clicks_detailed_col = db_instance.get_collection('offerwall_clicks_detailed')
-        clicks_offerwall_col = db_instance.get_collection('offerwall_clicks')
-        
-        all_clicks = []
-        
-        # 1. Get clicks from offerwall_clicks_detailed
-        if clicks_detailed_col is not None:
-            detailed_clicks = list(clicks_detailed_col.find(filters)
-                                  .sort('timestamp', -1)
-                                  .limit(limit))
-            all_clicks.extend(detailed_clicks)
-        
-        # 2. Get clicks from offerwall_clicks (basic)
-        if clicks_offerwall_col is not None:
-            offerwall_clicks = list(clicks_offerwall_col.find(filters)
-                                   .sort('timestamp', -1)
-                                   .limit(limit))
-            all_clicks.extend(offerwall_clicks)
-        
-        # Remove duplicates by click_id and sort by timestamp
-        seen_click_ids = set()
-        unique_clicks = []
-        for click in all_clicks:
-            click_id = click.get('click_id')
-            if click_id and click_id not in seen_click_ids:
-                seen_click_ids.add(click_id)
-                unique_clicks.append(click)
-        
-        # Sort by timestamp descending
-        unique_clicks.sort(key=lambda x: x.get('timestamp') or datetime.min, reverse=True)
-        unique_clicks = unique_clicks[:limit]
+        # Offerwall clicks only (NOT simple tracking - those are affiliate link clicks)
+        unique_clicks = _offerwall_click_events({**filters, 'click_id': {'$ne': None}}, limit)
+        if unique_clicks is None:
+            # Raw offerwall collections until click_events is backfilled
+            clicks_detailed_col = db_instance.get_collection('offerwall_clicks_detailed')
+            clicks_offerwall_col = db_instance.get_collection('offerwall_clicks')
+        
+            all_clicks = []
+        
+            # 1. Get clicks from offerwall_clicks_detailed
+            if clicks_detailed_col is not None:
+                detailed_clicks = list(clicks_detailed_col.find(filters)
+                                      .sort('timestamp', -1)
+                                      .limit(limit))
+                all_clicks.extend(detailed_clicks)
+        
+            # 2. Get clicks from offerwall_clicks (basic)
+            if clicks_offerwall_col is not None:
+                offerwall_clicks = list(clicks_offerwall_col.find(filters)
+                                       .sort('timestamp', -1)
+                                       .limit(limit))
+                all_clicks.extend(offerwall_clicks)
+        
+            # Remove duplicates by click_id and sort by timestamp
+            seen_click_ids = set()
+            unique_clicks = []
+            for click in all_clicks:
+                click_id = click.get('click_id')
+                if click_id and click_id not in seen_click_ids:
+                    seen_click_ids.add(click_id)
+                    unique_clicks.append(click)
+        
+            # Sort by timestamp descending
+            unique_clicks.sort(key=lambda x: x.get('timestamp') or datetime.min, reverse=True)
+            unique_clicks = unique_clicks[:limit]
         
         # Look up offer status to support UI logic
         offers_collection = db_instance.get_collection('offers')
@@ -698,7 +783,7 @@ def get_click_history():
                 'click_id': click.get('click_id'),
                 'user_id': click.get('user_id'),
                 'publisher_id': pub_id,
-                'publisher_name': click.get('publisher_name', 'Unknown'),
+                'publisher_name': click.get('publisher_name') or click.get('username') or 'Unknown',
                 'offer_id': click.get('offer_id'),
                 'offer_name': offer_name,
                 'placement_id': click.get('placement_id') or click.get('sub_id1', ''),
@@ -983,19 +1068,21 @@ def get_user_click_timeline(user_id):
     try:
         limit = int(request.args.get('limit', 100))
         
-        clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
-        clicks_basic_col = db_instance.get_collection('offerwall_clicks')
-        
-        # Get all clicks for this user from detailed collection
-        clicks = list(clicks_col.find({'user_id': user_id})
-                     .sort('timestamp', -1)
-                     .limit(limit))
-        
-        # If no clicks in detailed, try basic collection
-        if not clicks:
-            clicks = list(clicks_basic_col.find({'user_id': user_id})
+        clicks = _offerwall_click_events({'user_id': user_id}, limit)
+        if clicks is None:
+            clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
+            clicks_basic_col = db_instance.get_collection('offerwall_clicks')
+            
+            # Get all clicks for this user from detailed collection
+            clicks = list(clicks_col.find({'user_id': user_id})
                          .sort('timestamp', -1)
                          .limit(limit))
+            
+            # If no clicks in detailed, try basic collection
+            if not clicks:
+                clicks = list(clicks_basic_col.find({'user_id': user_id})
+                             .sort('timestamp', -1)
+                             .limit(limit))
         
         # Format as timeline
         timeline = []
@@ -1031,19 +1118,21 @@ def get_publisher_click_timeline(publisher_id):
     try:
         limit = int(request.args.get('limit', 100))
         
-        clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
-        clicks_basic_col = db_instance.get_collection('offerwall_clicks')
-        
-        # Get all clicks for this publisher from detailed collection
-        clicks = list(clicks_col.find({'publisher_id': publisher_id})
-                     .sort('timestamp', -1)
-                     .limit(limit))
-        
-        # If no clicks in detailed, try basic collection
-        if not clicks:
-            clicks = list(clicks_basic_col.find({'publisher_id': publisher_id})
+        clicks = _offerwall_click_events({'publisher_id': publisher_id}, limit)
+        if clicks is None:
+            clicks_col = db_instance.get_collection('offerwall_clicks_detailed')
+            clicks_basic_col = db_instance.get_collection('offerwall_clicks')
+            
+            # Get all clicks for this publisher from detailed collection
+            clicks = list(clicks_col.find({'publisher_id': publisher_id})
                          .sort('timestamp', -1)
                          .limit(limit))
+            
+            # If no clicks in detailed, try basic collection
+            if not clicks:
+                clicks = list(clicks_basic_col.find({'publisher_id': publisher_id})
+                             .sort('timestamp', -1)
+                             .limit(limit))
         
         # Format as timeline
         timeline = []
@@ -1285,6 +1374,8 @@ def track_dashboard_click():
         # Insert into dashboard_clicks collection
         dashboard_clicks_col = db_instance.get_collection('dashboard_clicks')
         result = dashboard_clicks_col.insert_one(click_record)
+        record_click('dashboard_clicks', click_record)
+        record_click_event('dashboard_clicks', click_record)
         
         # Update last_click_date on the offer (rolling 30-day inactivity window)
         try:
@@ -14,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import db_instance
 from utils.auth import token_required
+from models.balance_ledger import record_balance_change
 
 forwarded_postbacks_bp = Blueprint('forwarded_postbacks', __name__)
 
@@ -179,6 +180,9 @@ def bulk_delete_forwarded_postbacks():
         
         # Delete logs
         result = forwarded_postbacks_collection.delete_many({'_id': {'$in': object_ids}})
+        # Deleted conversions no longer count towards balances
+        for object_id in object_ids:
+            record_balance_change('forwarded_postbacks', {'_id': object_id})
         
         logger.info(f"✅ Bulk deleted {result.deleted_count} forwarded postback logs")
         
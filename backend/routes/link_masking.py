@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, redirect
 from models.link_masking import LinkMasking
 from models.offer import Offer
 from utils.auth import token_required, admin_required
+from services.link_redirect_service import get_masked_link_resolver, get_click_batcher
 import logging
 import random
 from datetime import datetime
@@ -10,6 +11,8 @@ link_masking_bp = Blueprint('link_masking', __name__)
 link_redirect_bp = Blueprint('link_redirect', __name__)
 link_masking_model = LinkMasking()
 offer_model = Offer()
+masked_link_resolver = get_masked_link_resolver()
+click_batcher = get_click_batcher()
 
 # Masked Link Routes
 
@@ -45,6 +48,9 @@ def create_masked_link():
         if error:
             return jsonify({'error': error}), 400
         
+        # Drop any negative-cache entry for this code
+        masked_link_resolver.invalidate(masked_link['short_code'], masked_link['domain_name'])
+        
         # Convert ObjectId to string for JSON serialization
         masked_link['_id'] = str(masked_link['_id'])
         masked_link['domain_id'] = str(masked_link['domain_id'])
@@ -125,6 +131,7 @@ def update_masked_link(link_id):
         if not success:
             return jsonify({'error': error or 'Failed to update masked link'}), 400
         
+        masked_link_resolver.invalidate()
         return jsonify({'message': 'Masked link updated successfully'}), 200
         
     except Exception as e:
@@ -142,6 +149,7 @@ def delete_masked_link(link_id):
         if not success:
             return jsonify({'error': 'Masked link not found or already deleted'}), 404
         
+        masked_link_resolver.invalidate()
         return jsonify({'message': 'Masked link deleted successfully'}), 200
         
     except Exception as e:
@@ -218,6 +226,7 @@ def update_masking_domain(domain_id):
         if not success:
             return jsonify({'error': error or 'Failed to update masking domain'}), 400
         
+        masked_link_resolver.invalidate()
         return jsonify({'message': 'Masking domain updated successfully'}), 200
         
     except Exception as e:
@@ -235,6 +244,7 @@ def delete_masking_domain(domain_id):
         if not success:
             return jsonify({'error': 'Masking domain not found or already deleted'}), 404
         
+        masked_link_resolver.invalidate()
         return jsonify({'message': 'Masking domain deleted successfully'}), 200
         
     except Exception as e:
@@ -251,8 +261,11 @@ def redirect_masked_link(short_code):
         # Extract domain from request host
         domain_name = request.host.split(':')[0]  # Remove port if present
         
-        # Get masked link
-        masked_link = link_masking_model.get_masked_link_by_code(short_code, domain_name)
+        # Resolve from memory (unknown codes are cached briefly, lookup errors never)
+        masked_link = masked_link_resolver.resolve(
+            short_code, domain_name,
+            lambda code, domain: link_masking_model.get_masked_link_by_code(code, domain, raise_errors=True)
+        )
         
         if not masked_link:
             return jsonify({'error': 'Link not found'}), 404
@@ -283,30 +296,17 @@ def redirect_masked_link(short_code):
                 separator = '&' if '?' in target_url else '?'
                 target_url = f"{target_url}{separator}subid={subid}"
         
-        # Track click with analytics
+        # Queue click analytics — written in batches off the request path
         try:
-            from models.analytics import Analytics
-            analytics_model = Analytics()
-            
-            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR'))
-            user_agent = request.headers.get('User-Agent', '')
-            referrer = request.headers.get('Referer', '')
-            
-            # Track click in analytics system
-            click_data = {
+            click_batcher.enqueue({
                 'offer_id': masked_link['offer_id'],
                 'masked_link_id': str(masked_link['_id']),
-                'ip_address': client_ip,
-                'user_agent': user_agent,
-                'referrer': referrer,
-                'subid': subid if masked_link.get('subid_append') else None
-            }
-            
-            analytics_model.track_click(click_data)
-            
-            # Also increment the simple counter
-            link_masking_model.increment_click_count(masked_link['_id'], True)
-            
+                'ip_address': request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR')),
+                'user_agent': request.headers.get('User-Agent', ''),
+                'referrer': request.headers.get('Referer', ''),
+                'subid': subid if masked_link.get('subid_append') else None,
+                'clicked_at': datetime.utcnow()
+            })
         except Exception as e:
             logging.warning(f"Failed to track click: {str(e)}")
         
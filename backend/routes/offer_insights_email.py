@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import logging
 from database import db_instance
 from utils.auth import token_required, admin_required
+from services.settings_snapshot_service import get_email_exclusions as get_email_exclusion_docs, bump_settings_version
 from services.email_verification_service import EmailVerificationService
 
 offer_insights_bp = Blueprint('offer_insights', __name__)
@@ -1465,11 +1466,7 @@ def delete_offer_view_logs():
 def get_email_exclusions():
     """Get list of permanently excluded emails."""
     try:
-        from database import db_instance
-        col = db_instance.get_collection('email_exclusions')
-        if col is None:
-            return jsonify({'excluded_emails': []}), 200
-        docs = list(col.find({}, {'_id': 0, 'email': 1, 'name': 1, 'excluded_at': 1, 'reason': 1}))
+        docs = get_email_exclusion_docs()
         return jsonify({'excluded_emails': docs}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1506,6 +1503,8 @@ def add_email_exclusions():
                 upsert=True
             )
             added += 1
+        if added:
+            bump_settings_version('email_exclusions')
         
         return jsonify({'message': f'{added} email(s) added to permanent exclusion', 'added': added}), 200
     except Exception as e:
@@ -1529,6 +1528,8 @@ def remove_email_exclusions():
             return jsonify({'error': 'Database error'}), 500
         
         result = col.delete_many({'email': {'$in': [e.strip().lower() for e in emails]}})
+        if result.deleted_count:
+            bump_settings_version('email_exclusions')
         return jsonify({'message': f'{result.deleted_count} email(s) removed from exclusion', 'removed': result.deleted_count}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
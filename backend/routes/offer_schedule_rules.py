@@ -7,6 +7,7 @@ from flask import Blueprint, request, jsonify
 from models.offer_extended import OfferExtended
 from utils.auth import token_required
 from utils.frontend_mapping import frontend_to_database, database_to_frontend, validate_frontend_data
+from services.smart_rules_resolver import get_resolver_service
 from bson import ObjectId
 from datetime import datetime
 import logging
@@ -265,6 +266,9 @@ def create_smart_rule(offer_id):
         if result.modified_count == 0:
             return jsonify({'error': 'Failed to add smart rule'}), 500
         
+        # Recompile this offer's rules on the next click
+        get_resolver_service().invalidate_offer(offer_id)
+        
         # Return created rule in frontend format
         frontend_rule = database_to_frontend({'smartRules': [db_rule]})['smartRules'][0]
         
@@ -384,6 +388,9 @@ def update_smart_rule(offer_id, rule_id):
         if result.modified_count == 0:
             return jsonify({'error': 'No changes made to smart rule'}), 400
         
+        # Recompile this offer's rules on the next click
+        get_resolver_service().invalidate_offer(offer_id)
+        
         # Return updated rule in frontend format
         db_rule['_id'] = rule_object_id
         frontend_rule = database_to_frontend({'smartRules': [db_rule]})['smartRules'][0]
@@ -433,6 +440,9 @@ def delete_smart_rule(offer_id, rule_id):
         if result.modified_count == 0:
             return jsonify({'error': 'Failed to delete smart rule'}), 500
         
+        # Recompile this offer's rules on the next click
+        get_resolver_service().invalidate_offer(offer_id)
+        
         return jsonify({
             'message': 'Smart rule deleted successfully',
             'rule_id': rule_id
@@ -3,7 +3,10 @@ from models.placement import Placement
 from models.tracking import Tracking
 from models.offers import OffersService
 from models.offerwall_tracking import OfferwallTracking
+from models.report_rollups import record_click
+from models.click_events import record_click_event
 from services.health_check_service import HealthCheckService
+from services.settings_snapshot_service import get_offerwall_settings
 from database import db_instance
 from datetime import datetime, timedelta
 from bson import ObjectId
@@ -137,6 +140,8 @@ class OfferwallTracker:
             })
         
         self.clicks_col.insert_one(click_doc)
+        record_click('offerwall_clicks', click_doc)
+        record_click_event('offerwall_clicks', click_doc)
         
         # Update last_click_date on the offer (rolling 30-day inactivity window)
         try:
@@ -1997,14 +2002,11 @@ def get_offers():
         is_admin_mode = False
         if api_key:
             try:
-                settings_col = db_instance.get_collection('offerwall_settings')
-                if settings_col is not None:
-                    settings_doc = settings_col.find_one({}, {'admin_api_key': 1})
-                    stored_admin_key = (settings_doc or {}).get('admin_api_key', '')
-                    # Fallback: check against the known admin placement key
-                    if not stored_admin_key:
-                        stored_admin_key = 'iK66hQRakcvRVj08CX7qfqNzE1Zqt0uF'
-                    is_admin_mode = (api_key == stored_admin_key)
+                stored_admin_key = get_offerwall_settings().get('admin_api_key', '')
+                # Fallback: check against the known admin placement key
+                if not stored_admin_key:
+                    stored_admin_key = 'iK66hQRakcvRVj08CX7qfqNzE1Zqt0uF'
+                is_admin_mode = (api_key == stored_admin_key)
             except Exception:
                 is_admin_mode = (api_key == 'iK66hQRakcvRVj08CX7qfqNzE1Zqt0uF')
         
@@ -2071,11 +2073,7 @@ def get_offers():
         # Fetch starter offer IDs from offerwall_settings so they always appear
         starter_offer_ids = []
         try:
-            settings_col = db_instance.get_collection('offerwall_settings')
-            if settings_col is not None:
-                settings_doc = settings_col.find_one({})
-                if settings_doc:
-                    starter_offer_ids = settings_doc.get('new_user_offer_ids', [])
+            starter_offer_ids = list(get_offerwall_settings().get('new_user_offer_ids', []))
         except Exception as e:
             logger.warning(f"Failed to fetch starter offer IDs: {e}")
         
@@ -2659,11 +2657,7 @@ def get_offers():
         # Get featured offer IDs from settings
         featured_offer_ids = []
         try:
-            settings_col = db_instance.get_collection('offerwall_settings')
-            if settings_col is not None:
-                settings_doc = settings_col.find_one({}, {'featured_offers': 1})
-                if settings_doc:
-                    featured_offer_ids = settings_doc.get('featured_offers', [])
+            featured_offer_ids = list(get_offerwall_settings().get('featured_offers', []))
         except Exception:
             pass
 
@@ -4126,7 +4120,7 @@ def track_offer_start():
                 )
             else:
                 # New record
-                clicks_col.insert_one({
+                start_doc = {
                     'user_id': user_id,
                     'placement_id': placement_id,
                     'offer_id': offer_id,
@@ -4137,7 +4131,9 @@ def track_offer_start():
                     'user_agent': data.get('user_agent', ''),
                     'is_duplicate': False,
                     'is_invalid': False,
-                })
+                }
+                clicks_col.insert_one(start_doc)
+                record_click_event('offerwall_clicks', start_doc)
 
         # Update pick status to clicked
         picks_col = db_instance.get_collection('offer_picks')
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from bson import ObjectId
 from database import db_instance
 from utils.auth import token_required, subadmin_or_admin_required
+from services.settings_snapshot_service import get_offerwall_settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -240,13 +241,11 @@ def get_analytics_dashboard():
         no_offer_links = 0
 
         # Custom-picked = pinned offers from offerwall_settings
-        settings_col = db_instance.get_collection('offerwall_settings')
-        if settings_col is not None:
-            settings_doc = settings_col.find_one({})
-            if settings_doc:
-                pinned = settings_doc.get('pinned_offers', [])
-                custom_picked = len(pinned)
-                custom_picked_latest = settings_doc.get('updated_at')
+        settings_doc = get_offerwall_settings()
+        if settings_doc:
+            pinned = settings_doc.get('pinned_offers', [])
+            custom_picked = len(pinned)
+            custom_picked_latest = settings_doc.get('updated_at')
 
         # No-offer links: not currently tracked, keep as 0
         no_offer_links = 0
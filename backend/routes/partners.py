@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from database import db_instance
 from bson import ObjectId
 from utils.auth import token_required, subadmin_or_admin_required
+from utils.cache import invalidate
+from services.settings_snapshot_service import bump_settings_version
 import logging
 import uuid
 from datetime import datetime
@@ -119,6 +121,7 @@ def create_partner():
         # Insert into database
         partners_collection = db_instance.get_collection('partners')
         result = partners_collection.insert_one(partner_doc)
+        invalidate('partner_names')
         partner_doc['_id'] = str(result.inserted_id)
         
         logger.info(f"✅ Upward partner created: {partner_doc['partner_name']} - URL: {postback_receiver_url}")
@@ -264,6 +267,7 @@ def update_partner(partner_id):
             {'partner_id': partner_id},
             {'$set': update_doc}
         )
+        invalidate('partner_names')
         
         # Fetch updated partner
         updated_partner = partners_collection.find_one({'partner_id': partner_id})
@@ -304,6 +308,7 @@ def delete_partner(partner_id):
         
         # Delete partner
         partners_collection.delete_one({'partner_id': partner_id})
+        invalidate('partner_names')
         
         logger.info(f"✅ Partner deleted: {partner_id}")
         
@@ -452,6 +457,8 @@ def update_user_postback(user_id):
                 'updated_at': datetime.utcnow()
             }}
         )
+        if user.get('role') == 'partner':
+            bump_settings_version('partners')
         
         logger.info(f"✅ Postback URL updated for user: {user_id}")
         
@@ -29,6 +29,7 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from bson import ObjectId
 from database import db_instance
+from services.settings_snapshot_service import get_platform_setting, bump_settings_version
 import logging
 import os
 import hmac
@@ -732,8 +733,7 @@ def get_email_settings():
     Returns the current Pepperwahl auto-email settings stored in `platform_settings`.
     If no settings exist yet, returns safe defaults (toggle OFF).
     """
-    col = db_instance.get_collection('platform_settings')
-    doc = col.find_one({'key': 'pepperwahl_email_settings'}) or {}
+    doc = get_platform_setting('pepperwahl_email_settings') or {}
     settings = doc.get('value', {})
     return jsonify({
         'success': True,
@@ -778,6 +778,7 @@ def save_email_settings():
         }},
         upsert=True,
     )
+    bump_settings_version('platform')
     return jsonify({'success': True, 'message': 'Email settings saved'})
 
 
@@ -788,8 +789,7 @@ def _send_pepperwahl_offer_email(offer_id: str, funnel_id: str, survey_name: str
     Uses the same generate_multi_offer_email_html template as the offer insights system.
     """
     try:
-        col = db_instance.get_collection('platform_settings')
-        settings_doc = col.find_one({'key': 'pepperwahl_email_settings'}) or {}
+        settings_doc = get_platform_setting('pepperwahl_email_settings') or {}
         settings = settings_doc.get('value', {})
 
         if not settings.get('enabled', False):
@@ -7,6 +7,7 @@ Stored in MongoDB collection 'platform_settings' as a single document with key='
 from flask import Blueprint, request, jsonify
 from database import db_instance
 from utils.auth import token_required, admin_required
+from services.settings_snapshot_service import get_platform_setting, bump_settings_version
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,10 +38,7 @@ def _get_settings_col():
 def get_search_wizard_settings():
     """Get current search wizard toggle settings (admin only)."""
     try:
-        col = _get_settings_col()
-        if col is None:
-            return jsonify({**DEFAULT_SEARCH_WIZARD}), 200
-        doc = col.find_one({'key': 'search_wizard'})
+        doc = get_platform_setting('search_wizard')
         if not doc:
             return jsonify({**DEFAULT_SEARCH_WIZARD}), 200
         return jsonify({
@@ -71,6 +69,7 @@ def update_search_wizard_settings():
                 update[field] = bool(data[field])
 
         col.update_one({'key': 'search_wizard'}, {'$set': update}, upsert=True)
+        bump_settings_version('platform')
         logger.info(f"Search wizard settings updated: {update}")
         return jsonify({'success': True, 'message': 'Search wizard settings updated'}), 200
     except Exception as e:
@@ -82,10 +81,7 @@ def update_search_wizard_settings():
 def get_search_wizard_settings_public():
     """Public endpoint — publishers need to know which wizard steps are enabled."""
     try:
-        col = _get_settings_col()
-        if col is None:
-            return jsonify({**DEFAULT_SEARCH_WIZARD}), 200
-        doc = col.find_one({'key': 'search_wizard'})
+        doc = get_platform_setting('search_wizard')
         if not doc:
             return jsonify({**DEFAULT_SEARCH_WIZARD}), 200
         return jsonify({
@@ -114,10 +110,7 @@ DEFAULT_REVIEW_US = {
 def get_review_us_settings():
     """Get current Review Us settings (admin only)."""
     try:
-        col = _get_settings_col()
-        if col is None:
-            return jsonify({**DEFAULT_REVIEW_US}), 200
-        doc = col.find_one({'key': 'review_us'})
+        doc = get_platform_setting('review_us')
         if not doc:
             return jsonify({**DEFAULT_REVIEW_US}), 200
         return jsonify({
@@ -148,6 +141,7 @@ def update_review_us_settings():
         }
 
         col.update_one({'key': 'review_us'}, {'$set': update}, upsert=True)
+        bump_settings_version('platform')
         logger.info(f"Review Us settings updated: {update}")
         return jsonify({'success': True, 'message': 'Review Us URL updated successfully'}), 200
     except Exception as e:
@@ -158,10 +152,7 @@ def update_review_us_settings():
 def get_review_us_settings_public():
     """Public endpoint for user dashboard to get the Review Us URL and reward config."""
     try:
-        col = _get_settings_col()
-        if col is None:
-            return jsonify({**DEFAULT_REVIEW_US}), 200
-        doc = col.find_one({'key': 'review_us'})
+        doc = get_platform_setting('review_us')
         if not doc:
             return jsonify({**DEFAULT_REVIEW_US}), 200
         return jsonify({
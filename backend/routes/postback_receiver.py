@@ -9,6 +9,8 @@ from bson import ObjectId
 import logging
 import secrets
 from utils.auth import token_required
+from models.report_rollups import record_conversion
+from models.balance_ledger import record_balance_change
 
 postback_receiver_bp = Blueprint('postback_receiver', __name__)
 logger = logging.getLogger(__name__)
@@ -962,6 +964,8 @@ def receive_postback(unique_key, event_type):
                         'sub_id5': click.get('sub_id5', '') if click else '',
                     }
                     forwarded_postbacks_col.insert_one(fwd_record)
+                    record_conversion(fwd_record)
+                    record_balance_change('forwarded_postbacks', fwd_record)
                     logger.info(f"📝 Created forwarded_postbacks record (status={forward_status})")
 
                 # Award points regardless of forward status (publisher earned the conversion)
@@ -1696,6 +1700,7 @@ def run_cleanup():
                 fwd_flagged += 1
                 if not dry_run:
                     fwd_col.update_one({'_id': fwd['_id']}, {'$set': {'source': 'fallback_fake', 'flagged_at': datetime.utcnow()}})
+                    record_balance_change('forwarded_postbacks', {**fwd, 'source': 'fallback_fake'})
             else:
                 fwd_verified += 1
                 if not dry_run and fwd.get('source') != 'verified_postback':
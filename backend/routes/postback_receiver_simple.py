@@ -7,6 +7,8 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 import logging
 import requests
+from models.report_rollups import record_conversion
+from models.balance_ledger import record_balance_change
 
 postback_receiver_simple_bp = Blueprint('postback_receiver_simple', __name__)
 logger = logging.getLogger(__name__)
@@ -104,7 +106,7 @@ def receive_postback_simple(key):
                 # Log forwarded
                 forwarded_postbacks = get_collection('forwarded_postbacks')
                 if forwarded_postbacks:
-                    forwarded_postbacks.insert_one({
+                    fwd_doc = {
                         'timestamp': datetime.utcnow(),
                         'publisher_name': username,
                         'forward_url': final_url,
@@ -112,7 +114,10 @@ def receive_postback_simple(key):
                         'response_code': response.status_code,
                         'survey_id': survey_id,
                         'transaction_id': transaction_id
-                    })
+                    }
+                    forwarded_postbacks.insert_one(fwd_doc)
+                    record_conversion(fwd_doc)
+                    record_balance_change('forwarded_postbacks', fwd_doc)
                     
             except Exception as e:
                 logger.error(f"   ❌ Error forwarding to {username}: {e}")
@@ -12,6 +12,8 @@ from services.offer_visibility_service import offer_visibility_service
 from utils.json_serializer import safe_json_response, serialize_for_json
 from routes.search_logs import log_search_async
 from models.search_session import SearchSession
+from services.offer_search_index import get_offer_search_index
+from utils.cache import get_cache
 import logging
 import re
 
@@ -1213,6 +1215,98 @@ def mark_offer_clicked():
         return jsonify({'success': True}), 200
 
 
+_autocomplete_grants_cache = get_cache('autocomplete_grants', ttl=60, max_size=5000)
+
+
+def _autocomplete_from_mongo(offers_col, q, visible_statuses, granted_offer_ids):
+    """Regex fallback for autocomplete while the in-memory offer search index is still building."""
+    # Build fuzzy regex: insert optional char between each letter for typo tolerance
+    # e.g. "survy" -> "s.?u.?r.?v.?y" which matches "survey"
+    escaped = [re.escape(c) for c in q.lower()]
+    fuzzy_pattern = '.?'.join(escaped)
+
+    search_regex = {'$regex': fuzzy_pattern, '$options': 'i'}
+
+    # Also try exact substring for better ranking
+    exact_regex = {'$regex': re.escape(q), '$options': 'i'}
+
+    # Build visibility filter
+    if granted_offer_ids:
+        visibility = {'$or': [
+            {'status': {'$in': visible_statuses}},
+            {'offer_id': {'$in': granted_offer_ids}},
+        ]}
+    else:
+        visibility = {'status': {'$in': visible_statuses}}
+
+    not_deleted = {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]}
+
+    # Search across name, category, categories, network, offer_id
+    search_fields = [
+        {'name': search_regex},
+        {'category': search_regex},
+        {'categories': search_regex},
+        {'network': search_regex},
+        {'offer_id': search_regex},
+        {'description': search_regex},
+    ]
+
+    query = {
+        '$and': [
+            visibility,
+            not_deleted,
+            {'$or': search_fields},
+        ]
+    }
+
+    projection = {
+        'offer_id': 1, 'name': 1, 'countries': 1,
+        'category': 1, 'vertical': 1, 'categories': 1,
+        'payout': 1, 'publisher_payout_override': 1, 'currency': 1, 'status': 1,
+    }
+
+    # Fetch up to 30 candidates, then rank and return top 10
+    candidates = list(offers_col.find(query, projection).limit(30))
+
+    # Determine autocorrected query if fuzzy matched but exact didn't
+    autocorrected_to = None
+    if candidates:
+        exact_query = {
+            '$and': [
+                visibility,
+                not_deleted,
+                {'$or': [
+                    {'name': exact_regex},
+                    {'category': exact_regex},
+                    {'categories': exact_regex},
+                ]},
+            ]
+        }
+        exact_count = offers_col.count_documents(exact_query)
+        if exact_count == 0:
+            # The fuzzy matched but exact didn't — this is a typo correction
+            autocorrected_to = candidates[0].get('name', q)
+
+    # Rank: exact name match first, then category match, then others
+    q_lower = q.lower()
+
+    def rank_score(offer):
+        name = (offer.get('name') or '').lower()
+        if q_lower in name:
+            if name.startswith(q_lower):
+                return 0  # Best: starts with query
+            return 1  # Good: contains query
+        cats = offer.get('categories') or [offer.get('category') or '']
+        for c in cats:
+            if q_lower in (c or '').lower():
+                return 2  # Category match
+        return 3  # Fuzzy match only
+
+    candidates.sort(key=rank_score)
+    top = candidates[:10]
+    return top, autocorrected_to
+
+
 @publisher_offers_bp.route('/offers/autocomplete', methods=['GET', 'OPTIONS'])
 @token_required
 def autocomplete_offers():
@@ -1235,99 +1329,26 @@ def autocomplete_offers():
 
         visible_statuses = ['active', 'running', 'rotating']
 
-        # Build fuzzy regex: insert optional char between each letter for typo tolerance
-        # e.g. "survy" -> "s.?u.?r.?v.?y" which matches "survey"
-        escaped = [re.escape(c) for c in q.lower()]
-        fuzzy_pattern = '.?'.join(escaped)
-
-        search_regex = {'$regex': fuzzy_pattern, '$options': 'i'}
-
-        # Also try exact substring for better ranking
-        exact_regex = {'$regex': re.escape(q), '$options': 'i'}
-
-        # Get user-specific offer grants
+        # Get user-specific offer grants (cached briefly: autocomplete fires on every keystroke)
         granted_offer_ids = []
         try:
             from models.offer_grant import OfferGrant
-            grant_model = OfferGrant()
-            granted_offer_ids = grant_model.get_granted_offer_ids(str(user_id))
+            granted_offer_ids = _autocomplete_grants_cache.get_or_load(
+                str(user_id), lambda: OfferGrant().get_granted_offer_ids(str(user_id))
+            )
         except Exception:
             pass
 
-        # Build visibility filter
-        if granted_offer_ids:
-            visibility = {'$or': [
-                {'status': {'$in': visible_statuses}},
-                {'offer_id': {'$in': granted_offer_ids}},
-            ]}
-        else:
-            visibility = {'status': {'$in': visible_statuses}}
-
-        not_deleted = {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]}
-
-        # Search across name, category, categories, network, offer_id
-        search_fields = [
-            {'name': search_regex},
-            {'category': search_regex},
-            {'categories': search_regex},
-            {'network': search_regex},
-            {'offer_id': search_regex},
-            {'description': search_regex},
-        ]
+        index = get_offer_search_index()
+        if index.is_ready():
+            granted = set(granted_offer_ids)
 
-        query = {
-            '$and': [
-                visibility,
-                not_deleted,
-                {'$or': search_fields},
-            ]
-        }
+            def is_visible(offer):
+                return offer.get('status') in visible_statuses or offer.get('offer_id') in granted
 
-        projection = {
-            'offer_id': 1, 'name': 1, 'countries': 1,
-            'category': 1, 'vertical': 1, 'categories': 1,
-            'payout': 1, 'publisher_payout_override': 1, 'currency': 1, 'status': 1,
-        }
-
-        # Fetch up to 30 candidates, then rank and return top 10
-        candidates = list(offers_col.find(query, projection).limit(30))
-
-        # Determine autocorrected query if fuzzy matched but exact didn't
-        autocorrected_to = None
-        if candidates:
-            exact_query = {
-                '$and': [
-                    visibility,
-                    not_deleted,
-                    {'$or': [
-                        {'name': exact_regex},
-                        {'category': exact_regex},
-                        {'categories': exact_regex},
-                    ]},
-                ]
-            }
-            exact_count = offers_col.count_documents(exact_query)
-            if exact_count == 0:
-                # The fuzzy matched but exact didn't — this is a typo correction
-                autocorrected_to = candidates[0].get('name', q)
-
-        # Rank: exact name match first, then category match, then others
-        q_lower = q.lower()
-
-        def rank_score(offer):
-            name = (offer.get('name') or '').lower()
-            if q_lower in name:
-                if name.startswith(q_lower):
-                    return 0  # Best: starts with query
-                return 1  # Good: contains query
-            cats = offer.get('categories') or [offer.get('category') or '']
-            for c in cats:
-                if q_lower in (c or '').lower():
-                    return 2  # Category match
-            return 3  # Fuzzy match only
-
-        candidates.sort(key=rank_score)
-        top = candidates[:10]
+            top, autocorrected_to = index.search(q, is_visible, limit=10)
+        else:
+            top, autocorrected_to = _autocomplete_from_mongo(offers_col, q, visible_statuses, granted_offer_ids)
 
         suggestions = []
         for offer in top:
@@ -7,6 +7,7 @@ Admin can create redirect rules that route users based on geo, device, time, and
 from flask import Blueprint, request, jsonify, redirect as flask_redirect, render_template_string
 from utils.auth import token_required
 from database import db_instance
+from models.click_events import record_click_event
 from datetime import datetime, timedelta
 from bson import ObjectId
 import logging
@@ -669,6 +670,7 @@ def _record_click(clicks_col, route_id, dest_index, click_id, ip_address, user_a
         }
 
         clicks_col.insert_one(click_doc)
+        record_click_event('redirect_router_clicks', click_doc)
     except Exception as e:
         logger.warning(f"Failed to record router click: {e}")
 
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from utils.auth import token_required, admin_required
 from database import db_instance
+from models.balance_ledger import record_balance_change
+from services.settings_snapshot_service import get_platform_setting
 from datetime import datetime
 from bson import ObjectId
 import logging
@@ -11,8 +13,8 @@ logger = logging.getLogger(__name__)
 def _get_submissions_col():
     return db_instance.get_collection('review_submissions')
 
-def _get_settings_col():
-    return db_instance.get_collection('platform_settings')
+def _get_review_us_settings():
+    return get_platform_setting('review_us') or {}
 
 def _get_users_col():
     return db_instance.get_collection('users')
@@ -32,8 +34,7 @@ def create_submission():
             return jsonify({'error': 'Database unavailable'}), 500
 
         # Get current Review Us settings
-        settings_col = _get_settings_col()
-        settings = (settings_col.find_one({'key': 'review_us'}) or {}) if settings_col is not None else {}
+        settings = _get_review_us_settings()
         current_url = settings.get('url', '').strip()
 
         # Check if user already has a pending or approved submission for this URL
@@ -92,8 +93,7 @@ def get_user_submission():
             return jsonify({'error': 'Database unavailable'}), 500
 
         # Get current Review Us settings
-        settings_col = _get_settings_col()
-        settings = (settings_col.find_one({'key': 'review_us'}) or {}) if settings_col is not None else {}
+        settings = _get_review_us_settings()
         current_url = settings.get('url', '').strip()
 
         query = {
@@ -156,10 +156,9 @@ def approve_submission(sub_id):
     """Admin: Approve submission and apply reward."""
     try:
         col = _get_submissions_col()
-        settings_col = _get_settings_col()
         users_col = _get_users_col()
         
-        if None in [col, settings_col, users_col]:
+        if None in [col, users_col]:
             return jsonify({'error': 'Database unavailable'}), 500
 
         sub = col.find_one({'_id': ObjectId(sub_id)})
@@ -170,7 +169,7 @@ def approve_submission(sub_id):
             return jsonify({'error': 'Already approved'}), 400
 
         # Get reward config
-        settings = settings_col.find_one({'key': 'review_us'}) or {}
+        settings = _get_review_us_settings()
         reward_fixed = float(settings.get('reward_fixed', 5.0))
         reward_percentage = float(settings.get('reward_percentage', 10.0))
 
@@ -208,12 +207,14 @@ def approve_submission(sub_id):
         # Insert into balance_adjustments so it shows up in dashboard earnings and transactions
         adj_col = db_instance.get_collection('balance_adjustments')
         if adj_col is not None:
-            adj_col.insert_one({
+            adj_doc = {
                 'user_id': ObjectId(sub['user_id']) if isinstance(sub['user_id'], str) else sub['user_id'],
                 'amount': total_reward,
                 'reason': f'Review Us Reward (Fixed: ${reward_fixed}, Bonus: {reward_percentage}%)',
                 'created_at': datetime.utcnow()
-            })
+            }
+            adj_col.insert_one(adj_doc)
+            record_balance_change('balance_adjustments', adj_doc)
 
         # Clear dashboard cache so numbers refresh instantly on their dashboard
         try:
@@ -333,12 +334,14 @@ def deduct_submission(sub_id):
         # Insert negative adjustment into balance_adjustments
         adj_col = db_instance.get_collection('balance_adjustments')
         if adj_col is not None:
-            adj_col.insert_one({
+            adj_doc = {
                 'user_id': ObjectId(sub['user_id']) if isinstance(sub['user_id'], str) else sub['user_id'],
                 'amount': -deduct_amount,
                 'reason': f'Review Us Reward Deduction (Reversed submission {sub_id})' if not is_partial else f'Review Us Reward Partial Deduction (Reversed submission {sub_id})',
                 'created_at': datetime.utcnow()
-            })
+            }
+            adj_col.insert_one(adj_doc)
+            record_balance_change('balance_adjustments', adj_doc)
 
         # Clear dashboard cache so numbers refresh instantly on their dashboard
         try:
@@ -429,12 +432,14 @@ def add_reward_submission(sub_id):
         # Insert positive adjustment into balance_adjustments
         adj_col = db_instance.get_collection('balance_adjustments')
         if adj_col is not None:
-            adj_col.insert_one({
+            adj_doc = {
                 'user_id': ObjectId(sub['user_id']) if isinstance(sub['user_id'], str) else sub['user_id'],
                 'amount': add_amount,
                 'reason': f'Review Us Reward Re-credited (Submission {sub_id})',
                 'created_at': datetime.utcnow()
-            })
+            }
+            adj_col.insert_one(adj_doc)
+            record_balance_change('balance_adjustments', adj_doc)
 
         # Clear dashboard cache so numbers refresh instantly on their dashboard
         try:
@@ -471,8 +476,7 @@ def track_review_button_click():
             return jsonify({'error': 'Database unavailable'}), 500
 
         # Get current Review Us settings to log which URL was clicked
-        settings_col = _get_settings_col()
-        settings = (settings_col.find_one({'key': 'review_us'}) or {}) if settings_col is not None else {}
+        settings = _get_review_us_settings()
         current_url = settings.get('url', '').strip()
 
         doc = {
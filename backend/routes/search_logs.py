@@ -4,6 +4,7 @@ Search Logs API - Tracks what publishers search for in offers
 from flask import Blueprint, request, jsonify
 from database import db_instance
 from utils.auth import token_required
+from services.offer_search_index import get_offer_search_index
 from datetime import datetime, timedelta
 from bson import ObjectId
 import logging
@@ -27,7 +28,17 @@ def log_search(user_id, username, keyword, results_count, matched_offer_ids=None
         total_inventory_count = 0
         active_inventory_count = 0
 
-        if offers_col is not None and keyword:
+        index = get_offer_search_index()
+        if keyword and index.is_ready():
+            matches = index.match_keywords([keyword], fields=('name', 'offer_id', 'category'))
+            total_inventory_count = len(matches)
+            active_inventory_count = sum(
+                1 for offer, _ in matches.values()
+                if offer.get('status') == 'active'
+                and offer.get('is_active', True) is True
+                and offer.get('show_in_offerwall', True) is True
+            )
+        elif offers_col is not None and keyword:
             search_regex = {'$regex': keyword, '$options': 'i'}
             # Total inventory (all offers matching keyword regardless of status)
             total_inventory_count = offers_col.count_documents({
@@ -55,6 +66,7 @@ def log_search(user_id, username, keyword, results_count, matched_offer_ids=None
                 ]
             })
 
+        if keyword:
             if total_inventory_count > 0 and active_inventory_count > 0:
                 inventory_status = 'available'
             elif total_inventory_count > 0 and active_inventory_count == 0:
@@ -660,6 +672,33 @@ def send_inventory_email():
         return jsonify({'error': str(e)}), 500
 
 
+def _payout_value(offer):
+    try:
+        return float(offer.get('payout') or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _related_offers_from_mongo(offers_col, keyword, projection):
+    """Regex fallback for related offers while the offer search index is still building."""
+    search_regex = {'$regex': keyword, '$options': 'i'}
+    # Find offers matching the keyword (any status, not deleted)
+    return list(offers_col.find(
+        {
+            '$or': [
+                {'name': search_regex},
+                {'offer_id': search_regex},
+                {'category': search_regex},
+                {'vertical': search_regex},
+                {'tags': search_regex},
+                {'keywords': search_regex}
+            ],
+            '$and': [{'$or': [{'deleted': {'$exists': False}}, {'deleted': False}, {'deleted': None}]}]
+        },
+        projection
+    ).sort('payout', -1).limit(20))
+
+
 @search_logs_bp.route('/search-logs/related-offers', methods=['GET'])
 @token_required
 def get_related_offers():
@@ -680,28 +719,24 @@ def get_related_offers():
         if offers_col is None:
             return jsonify({'error': 'Database connection failed'}), 500
 
-        search_regex = {'$regex': keyword, '$options': 'i'}
+        related_projection = {
+            'offer_id': 1, 'name': 1, 'image_url': 1, 'thumbnail_url': 1,
+            'target_url': 1, 'preview_url': 1, 'payout': 1, 'status': 1,
+            'category': 1, 'vertical': 1, 'countries': 1, 'network': 1,
+            'description': 1, 'currency': 1
+        }
 
-        # Find offers matching the keyword (any status, not deleted)
-        matching = list(offers_col.find(
-            {
-                '$or': [
-                    {'name': search_regex},
-                    {'offer_id': search_regex},
-                    {'category': search_regex},
-                    {'vertical': search_regex},
-                    {'tags': search_regex},
-                    {'keywords': search_regex}
-                ],
-                '$and': [{'$or': [{'deleted': {'$exists': False}}, {'deleted': False}, {'deleted': None}]}]
-            },
-            {
-                'offer_id': 1, 'name': 1, 'image_url': 1, 'thumbnail_url': 1,
-                'target_url': 1, 'preview_url': 1, 'payout': 1, 'status': 1,
-                'category': 1, 'vertical': 1, 'countries': 1, 'network': 1,
-                'description': 1, 'currency': 1
-            }
-        ).sort('payout', -1).limit(20))
+        index = get_offer_search_index()
+        if index.is_ready():
+            # Keyword candidates from the shared offer index, top 20 by payout, one fetch for the docs
+            matches = index.match_keywords(
+                [keyword], fields=('name', 'offer_id', 'category', 'vertical', 'tags')
+            )
+            top_ids = sorted(matches, key=lambda oid: -_payout_value(matches[oid][0]))[:20]
+            matching = list(offers_col.find({'offer_id': {'$in': top_ids}}, related_projection)) if top_ids else []
+            matching.sort(key=lambda o: -_payout_value(o))
+        else:
+            matching = _related_offers_from_mongo(offers_col, keyword, related_projection)
 
         # If we have fewer than 20, try to find more by category of the first match
         if len(matching) < 20 and matching:
@@ -717,12 +752,7 @@ def get_related_offers():
                         'offer_id': {'$nin': list(existing_ids)},
                         '$and': [{'$or': [{'deleted': {'$exists': False}}, {'deleted': False}, {'deleted': None}]}]
                     },
-                    {
-                        'offer_id': 1, 'name': 1, 'image_url': 1, 'thumbnail_url': 1,
-                        'target_url': 1, 'preview_url': 1, 'payout': 1, 'status': 1,
-                        'category': 1, 'vertical': 1, 'countries': 1, 'network': 1,
-                        'description': 1, 'currency': 1
-                    }
+                    related_projection
                 ).sort('payout', -1).limit(20 - len(matching)))
                 matching.extend(extra)
 
@@ -7,7 +7,10 @@ Format: /track/{offer_id}?user_id={publisher_id}&sub1=...
 from flask import Blueprint, request, redirect, jsonify, render_template_string
 from models.analytics import Analytics
 from database import db_instance
+from models.report_rollups import record_click
+from models.click_events import record_click_event
 from services.macro_replacement_service import macro_service
+from utils.cache import get_cache
 import logging
 from datetime import datetime
 import secrets
@@ -17,20 +20,17 @@ simple_tracking_bp = Blueprint('simple_tracking', __name__)
 analytics_model = Analytics()
 logger = logging.getLogger(__name__)
 
-# In-memory offer cache (offer_id -> {offer_data, expires_at})
+# Offer cache (offer_id -> offer)
 # Avoids hitting MongoDB on every single click
-_offer_cache = {}
-_OFFER_CACHE_TTL = 300  # 5 minutes
+_OFFER_CACHE_TTL = 60  # Short: not every offer write publishes to the cache bus
 _OFFER_CACHE_MAX = 500  # Max 500 offers in cache (was 2000)
+_offer_cache = get_cache('tracking_offers', ttl=_OFFER_CACHE_TTL, max_size=_OFFER_CACHE_MAX)
 
 def _get_offer_cached(offer_id):
-    """Get offer from cache or DB. Caches for 5 minutes."""
-    import time
-    now = time.time()
-    
+    """Get offer from cache or DB (invalidated on offer writes)."""
     cached = _offer_cache.get(offer_id)
-    if cached and cached['expires'] > now:
-        return cached['data']
+    if cached is not None:
+        return cached
     
     offers_collection = db_instance.get_collection('offers')
     if offers_collection is None:
@@ -48,17 +48,7 @@ def _get_offer_cached(offer_id):
     )
     
     if offer:
-        _offer_cache[offer_id] = {'data': offer, 'expires': now + _OFFER_CACHE_TTL}
-        # Evict old entries if cache grows too large
-        if len(_offer_cache) > _OFFER_CACHE_MAX:
-            expired = [k for k, v in _offer_cache.items() if v['expires'] < now]
-            for k in expired:
-                del _offer_cache[k]
-            # If still too large after evicting expired, remove oldest
-            if len(_offer_cache) > _OFFER_CACHE_MAX:
-                oldest_keys = sorted(_offer_cache.keys(), key=lambda k: _offer_cache[k]['expires'])[:100]
-                for k in oldest_keys:
-                    del _offer_cache[k]
+        _offer_cache.set(offer_id, offer)
     
     return offer
 
@@ -730,6 +720,8 @@ def _save_click_sync(click_id, offer_id, offer, user_id, ip_address, user_agent,
         clicks_collection = db_instance.get_collection('clicks')
         if clicks_collection is not None:
             clicks_collection.insert_one(click_data)
+            record_click('clicks', click_data)
+            record_click_event('clicks', click_data)
 
         # Update last_click_date (lightweight update)
         try:
@@ -8,6 +8,7 @@ All user responses and funnel history are saved.
 from flask import Blueprint, request, jsonify, redirect as flask_redirect
 from utils.auth import token_required
 from database import db_instance
+from models.click_events import record_click_event
 from datetime import datetime
 from bson import ObjectId
 import logging
@@ -141,7 +142,8 @@ def track_funnel_click(funnel_id):
                 funnel_clicks_col.insert_one(dict(click_doc))
             clicks_col = get_collection('clicks')
             if clicks_col is not None:
-                clicks_col.insert_one(dict(click_doc))
+                result = clicks_col.insert_one(dict(click_doc))
+                record_click_event('clicks', {**click_doc, '_id': result.inserted_id})
             logger.info(f"📊 Funnel click logged: {click_id} | funnel={funnel_id} | publisher={publisher_username or user_id}")
         except Exception as e:
             logger.error(f"Funnel click save error: {e}")
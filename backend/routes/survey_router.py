@@ -14,6 +14,8 @@ Collections used:
 
 from flask import Blueprint, request, jsonify, redirect, render_template_string
 from database import db_instance
+from models.report_rollups import record_conversion
+from models.balance_ledger import record_balance_change
 from datetime import datetime
 from bson import ObjectId
 import logging
@@ -745,7 +747,7 @@ def _credit_publisher_background(session, payout, postback_log_id=None, raw_para
             # ── Record in forwarded_postbacks (conversion report) ───────
             forwarded_col = get_collection('forwarded_postbacks')
             if forwarded_col is not None:
-                forwarded_col.insert_one({
+                fwd_doc = {
                     'timestamp': datetime.utcnow(),
                     'original_postback_id': postback_log_id,
                     'received_postback_id': str(postback_log_id) if postback_log_id else '',
@@ -776,7 +778,10 @@ def _credit_publisher_background(session, payout, postback_log_id=None, raw_para
                     'sub_id5': '',
                     'funnel_id': funnel_id or '',
                     'session_id': session.get('session_id', ''),
-                })
+                }
+                forwarded_col.insert_one(fwd_doc)
+                record_conversion(fwd_doc)
+                record_balance_change('forwarded_postbacks', fwd_doc)
                 logger.info(f"📝 Survey router: forwarded_postbacks record created for {publisher_username}")
 
             # ── Referral P2 commission ──────────────────────────────────
@@ -4,6 +4,7 @@ from bson import ObjectId
 from datetime import datetime
 import logging
 from database import db_instance
+from services.settings_snapshot_service import get_top_offers_config, bump_settings_version
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +25,7 @@ def _get_collection(name):
 def get_top_offers_settings():
     """Get current Top Offers settings (Admin only)."""
     try:
-        col = _get_collection('top_offers_settings')
-        if col is None:
-            return jsonify({**DEFAULT_SETTINGS}), 200
-        doc = col.find_one({'key': 'config'})
+        doc = get_top_offers_config()
         if not doc:
             return jsonify({**DEFAULT_SETTINGS}), 200
         return jsonify({
@@ -64,6 +62,7 @@ def update_top_offers_settings():
             'updated_at': datetime.utcnow()
         }
         col.update_one({'key': 'config'}, {'$set': update}, upsert=True)
+        bump_settings_version('top_offers')
         return jsonify({'success': True, 'message': 'Top Offers settings updated successfully'}), 200
     except Exception as e:
         logger.error(f"Error updating top offers settings: {e}")
@@ -76,13 +75,11 @@ def get_admin_top_offers():
     """Get curated manual Top Offers, current settings, and all active offers for selection (Admin only)."""
     try:
         # 1. Fetch settings
-        settings_col = _get_collection('top_offers_settings')
         settings = DEFAULT_SETTINGS.copy()
-        if settings_col is not None:
-            doc = settings_col.find_one({'key': 'config'})
-            if doc:
-                settings['mode'] = doc.get('mode', DEFAULT_SETTINGS['mode'])
-                settings['auto_criteria'] = doc.get('auto_criteria', DEFAULT_SETTINGS['auto_criteria'])
+        doc = get_top_offers_config()
+        if doc:
+            settings['mode'] = doc.get('mode', DEFAULT_SETTINGS['mode'])
+            settings['auto_criteria'] = doc.get('auto_criteria', DEFAULT_SETTINGS['auto_criteria'])
 
         # 2. Fetch manual curated offers
         top_offers_col = _get_collection('top_offers')
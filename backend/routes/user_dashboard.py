@@ -9,6 +9,8 @@ Provides real-time statistics for user dashboard
 
 from flask import Blueprint, request, jsonify
 from utils.auth import token_required
+from utils.cache import get_cache
+from services.settings_snapshot_service import get_top_offers_config
 from datetime import datetime, timedelta
 from bson import ObjectId
 import logging
@@ -55,17 +57,16 @@ def _generate_fake_epc(offer_id: str, payout: float) -> str:
     epc = min_epc + (max_epc - min_epc) * hash_val
     return f"${epc:.2f}"
 
-# Per-user dashboard cache (60 second TTL)
-_dashboard_cache = {}  # user_id -> {'stats': data, 'chart': data, 'top_offers': data, 'expires': timestamp}
+# Per-user dashboard stats cache (60 second TTL)
 _DASHBOARD_CACHE_TTL = 60  # seconds
+_dashboard_cache = get_cache('dashboard_stats', ttl=_DASHBOARD_CACHE_TTL, max_size=5000)  # user_id -> stats response
 
 def clear_dashboard_cache(user_id):
     """Clear dashboard cache for a specific user"""
     try:
         user_id_str = str(user_id)
-        if user_id_str in _dashboard_cache:
-            _dashboard_cache.pop(user_id_str, None)
-            logger.debug(f"🧹 Cleared dashboard cache for user {user_id_str}")
+        _dashboard_cache.invalidate(user_id_str)
+        logger.debug(f"🧹 Cleared dashboard cache for user {user_id_str}")
     except Exception as e:
         logger.error(f"Error clearing dashboard cache: {e}")
 
@@ -90,8 +91,8 @@ def get_dashboard_stats():
         
         # Check cache
         cached = _dashboard_cache.get(user_id)
-        if cached and cached.get('stats') and _time.time() < cached.get('stats_expires', 0):
-            return jsonify(cached['stats']), 200
+        if cached is not None:
+            return jsonify(cached), 200
         
         logger.debug(f"📊 Getting dashboard stats for user: {username} ({user_id})")
         
@@ -334,10 +335,7 @@ def get_dashboard_stats():
         }
         
         # Cache the result
-        if user_id not in _dashboard_cache:
-            _dashboard_cache[user_id] = {}
-        _dashboard_cache[user_id]['stats'] = result
-        _dashboard_cache[user_id]['stats_expires'] = _time.time() + _DASHBOARD_CACHE_TTL
+        _dashboard_cache.set(user_id, result)
         
         return jsonify(result), 200
         
@@ -1020,7 +1018,6 @@ def get_top_offers():
         logger.debug(f"🏆 Getting top offers for user: {username} ({user_id})")
         
         # Get database collections
-        settings_col = get_collection('top_offers_settings')
         top_offers_col = get_collection('top_offers')
         offers_col = get_collection('offers')
         clicks_col = get_collection('offerwall_clicks_detailed')
@@ -1035,11 +1032,10 @@ def get_top_offers():
             'mode': 'hybrid',
             'auto_criteria': 'conversions'
         }
-        if settings_col is not None:
-            doc = settings_col.find_one({'key': 'config'})
-            if doc:
-                settings['mode'] = doc.get('mode', 'hybrid')
-                settings['auto_criteria'] = doc.get('auto_criteria', 'conversions')
+        doc = get_top_offers_config()
+        if doc:
+            settings['mode'] = doc.get('mode', 'hybrid')
+            settings['auto_criteria'] = doc.get('auto_criteria', 'conversions')
                 
         mode = settings.get('mode', 'hybrid')
         auto_criteria = settings.get('auto_criteria', 'conversions')
@@ -3,6 +3,8 @@ from utils.auth import token_required
 from datetime import datetime, timedelta
 from bson import ObjectId
 import logging
+from models.balance_ledger import get_balance_ledger
+from services.settings_snapshot_service import get_platform_setting
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,11 @@ def get_collection(collection_name):
 def calculate_user_earnings(user_id):
     """Calculates all earnings for a user across different tables."""
     try:
+        # Single indexed read from the materialized balance once the ledger is reconciled
+        ledger = get_balance_ledger()
+        if ledger.is_ready():
+            return ledger.get_balance(user_id)
+
         user_obj_id = ObjectId(user_id)
         
         # 1. CONVERSIONS
@@ -539,12 +546,7 @@ def get_user_invoices():
         conversions_col = get_collection('forwarded_postbacks')
 
         # Get threshold from platform settings
-        settings_col = get_collection('platform_settings')
-        threshold = 50
-        if settings_col is not None:
-            s = settings_col.find_one({'key': 'payment_threshold'})
-            if s:
-                threshold = s.get('value', 50)
+        threshold = (get_platform_setting('payment_threshold') or {}).get('value', 50)
 
         # Try to get formal invoices first
         formal_invoices = []
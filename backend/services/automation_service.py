@@ -4,14 +4,13 @@ from models.automation_state import AutomationState
 from models.offer import Offer
 from models.user import User
 from database import db_instance
+from utils.cache import get_cache
 import threading
 import time
 
 logger = logging.getLogger(__name__)
 
-_active_offers_cache = None
-_active_offers_cache_expiry = 0
-_active_offers_cache_ttl = 300 # Cache for 5 minutes
+_active_offers_cache = get_cache('automation_active_offers', ttl=300, max_size=1)  # Cache for 5 minutes
 
 class AutomationService:
     _instance = None
@@ -40,10 +39,9 @@ class AutomationService:
             logger.error(f"Failed to start pre-warm thread: {e}")
 
     def _get_active_offers_cached(self):
-        global _active_offers_cache, _active_offers_cache_expiry
-        now = time.time()
-        if _active_offers_cache is not None and now < _active_offers_cache_expiry:
-            return _active_offers_cache
+        offers = _active_offers_cache.get('active')
+        if offers is not None:
+            return offers
         
         db = db_instance.get_db()
         projection = {
@@ -65,13 +63,10 @@ class AutomationService:
         }
         try:
             offers = list(db.offers.find({'status': 'active'}, projection))
-            _active_offers_cache = offers
-            _active_offers_cache_expiry = now + _active_offers_cache_ttl
+            _active_offers_cache.set('active', offers)
             return offers
         except Exception as e:
             logger.error(f"Error fetching active offers for cache: {e}")
-            if _active_offers_cache is not None:
-                return _active_offers_cache
             return []
 
     def handle_user_activity(self, user_id, activity_type='Login', username=None, force_reset=False):
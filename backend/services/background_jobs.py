@@ -0,0 +1,143 @@
+"""
+Background Jobs
+The registry of periodic background work run by services.job_scheduler.
+
+Each entry wraps one pass of a service (check caps, deliver postbacks,
+rotate offers, ...); the scheduler decides when it is due and which process
+in the cluster runs it. Per-worker subscribers (cache invalidation bus,
+settings snapshot, offer search index) are not jobs: every worker needs
+its own copy, so app.py starts them directly.
+
+Set SCHEDULER_DISABLED_JOBS=name1,name2 to keep individual jobs off.
+"""
+
+import logging
+from services.job_scheduler import JobScheduler, get_job_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def _cap_monitoring(scheduler: JobScheduler):
+    from services.cap_monitoring_service import CapMonitoringService
+    scheduler.register('cap_monitoring', CapMonitoringService().check_caps, interval=600, jitter=30,
+                       description='Monitors offer click/conversion caps and pauses when hit')
+
+
+def _postback_processor(scheduler: JobScheduler):
+    from services.tracking_service import TrackingService
+    scheduler.register('postback_processor', TrackingService().run_postback_processor, interval=60, jitter=5,
+                       description='Processes incoming conversion postbacks from ad networks')
+
+
+def _schedule_activation(scheduler: JobScheduler):
+    from services.schedule_activation_service import get_activation_service
+    activation_service = get_activation_service()
+    scheduler.register('schedule_activation', activation_service.run_activation_check, interval=60,
+                       description='Auto-activates/deactivates offers based on start/end dates')
+    scheduler.register('schedule_activation_cleanup', activation_service.daily_cleanup, cron='0 0 * * *',
+                       description='Daily cleanup of expired offer schedules (midnight UTC)')
+
+
+def _price_boost(scheduler: JobScheduler):
+    from services.price_boost_service import price_boost_service
+    scheduler.register('price_boost', price_boost_service.check_expired_boosts,
+                       interval=price_boost_service.CHECK_INTERVAL, jitter=15,
+                       description='Reverts expired offer price boosts')
+
+
+def _scheduled_emails(scheduler: JobScheduler):
+    from services.scheduled_email_service import get_scheduled_email_service, ScheduledEmailService
+    email_service = get_scheduled_email_service()
+    scheduler.register('scheduled_emails', email_service.process_due, interval=ScheduledEmailService.CHECK_INTERVAL,
+                       description='Sends queued notification emails to publishers')
+    email_service.log_pending_emails()
+
+
+def _offer_rotation(scheduler: JobScheduler):
+    from services.offer_rotation_service import get_rotation_service, OfferRotationService
+    scheduler.register('offer_rotation', get_rotation_service().run_cycle, interval=OfferRotationService.CHECK_INTERVAL,
+                       description='Rotates inactive offers in batches (no-op while disabled in settings)')
+
+
+def _campaign_processor(scheduler: JobScheduler):
+    from services.campaign_processor import get_campaign_processor, CampaignProcessor
+    scheduler.register('campaign_processor', get_campaign_processor().process_due_emails,
+                       interval=CampaignProcessor.CHECK_INTERVAL,
+                       description='Processes bulk email campaign queue')
+
+
+def _location_retry(scheduler: JobScheduler):
+    from services.location_retry_service import get_location_retry_service, LocationRetryService
+    scheduler.register('location_retry', get_location_retry_service().retry_locations,
+                       interval=LocationRetryService.CHECK_INTERVAL, jitter=30,
+                       description='Retries failed IP geolocation lookups')
+
+
+def _telegram_trending(scheduler: JobScheduler):
+    from services.telegram_trending_bot import run_trending_update
+    # First run 5 minutes after the job is first registered; later deploys keep the stored schedule
+    scheduler.register('telegram_trending', run_trending_update, interval=12 * 3600, initial_delay=300,
+                       description='Posts trending offers to Telegram every 12 hours')
+
+
+def _link_health(scheduler: JobScheduler):
+    from services.link_health_service import get_link_health_service, LinkHealthService
+    scheduler.register('link_health', get_link_health_service().run_check, interval=LinkHealthService.INTERVAL_SECONDS,
+                       jitter=300, initial_delay=LinkHealthService.INITIAL_DELAY,
+                       description='Sweeps offer links for broken or expired landing pages every 2 hours')
+
+
+def _voqall_sync(scheduler: JobScheduler):
+    from services.voqall_sync_service import get_voqall_sync_service, VoqallSyncService
+    scheduler.register('voqall_sync', get_voqall_sync_service().run_scheduled,
+                       interval=VoqallSyncService.INTERVAL_SECONDS, jitter=600,
+                       description='Fetches & updates Voqall surveys every 23 hours')
+
+
+def _market_excel_sync(scheduler: JobScheduler):
+    from services.market_excel_sync_service import get_market_excel_sync_service, MarketExcelSyncService
+    scheduler.register('market_excel_sync', get_market_excel_sync_service().run_scheduled,
+                       interval=MarketExcelSyncService.INTERVAL_SECONDS, jitter=600,
+                       description='Fetches & updates MarketXcel surveys every 23 hours')
+
+
+def _overview_stats(scheduler: JobScheduler):
+    from services.overview_stats_service import get_overview_stats_service
+    overview_service = get_overview_stats_service()
+    scheduler.register('overview_stats', overview_service.refresh, interval=overview_service.refresh_interval,
+                       description='Recomputes the admin dashboard overview boxes')
+
+
+def _balance_reconcile(scheduler: JobScheduler):
+    from models.balance_ledger import reconcile_balances, RECONCILE_INTERVAL_SECONDS
+    scheduler.register('balance_reconcile', reconcile_balances, interval=RECONCILE_INTERVAL_SECONDS, jitter=600,
+                       description='Reconciles the balance ledger with its source collections')
+
+
+JOB_REGISTRARS = (
+    _cap_monitoring,
+    _postback_processor,
+    _schedule_activation,
+    _price_boost,
+    _scheduled_emails,
+    _offer_rotation,
+    _campaign_processor,
+    _location_retry,
+    _telegram_trending,
+    _link_health,
+    _voqall_sync,
+    _market_excel_sync,
+    _overview_stats,
+    _balance_reconcile,
+)
+
+
+def register_background_jobs(scheduler: JobScheduler = None) -> JobScheduler:
+    """Register every background job; one failing import does not keep the others off."""
+    scheduler = scheduler or get_job_scheduler()
+    for registrar in JOB_REGISTRARS:
+        try:
+            registrar(scheduler)
+        except Exception as e:
+            logger.warning(f"⚠️ Background job {registrar.__name__.lstrip('_')} failed to register: {e}")
+    return scheduler
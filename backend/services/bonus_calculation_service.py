@@ -6,6 +6,7 @@ Integrates with conversion tracking system
 
 from database import db_instance
 from models.promo_code import PromoCode
+from models.balance_ledger import record_balance_change, record_balance_changes
 from datetime import datetime
 from bson import ObjectId
 import logging
@@ -167,6 +168,7 @@ class BonusCalculationService:
                     }
                     
                     result = self.bonus_earnings_collection.insert_one(bonus_earning)
+                    record_balance_change('bonus_earnings', bonus_earning)
                     
                     # Update user promo code stats
                     self.user_promo_codes_collection.update_one(
@@ -260,6 +262,7 @@ class BonusCalculationService:
                     }
                 }
             )
+            record_balance_changes('bonus_earnings', {'conversion_id': conversion_id})
             
             # Update user balance
             self.users_collection.update_one(
@@ -0,0 +1,238 @@
+"""
+Cache Invalidation Bus
+Cross-process eviction for the utils.cache namespaces.
+
+Writers call cache.invalidate(key) (or invalidate_offer_caches() for offer
+writes). The key is evicted locally right away and an invalidation message is
+appended to the capped collection cache_invalidations; every worker on every
+node subscribes to it and evicts the same namespace/key from its own caches.
+One message carries every key of a write (cache.invalidate_many), so a bulk
+offer update costs one publish rather than one per key and namespace. Not
+every offer write path publishes yet, so offer caches keep short TTLs.
+
+Subscription uses a change stream when the deployment supports it (replica
+set / Atlas) and falls back to a tailable cursor on the capped collection.
+Messages carry a sequence number from a counter document, so a subscriber
+that reconnects resumes after the last message it applied instead of relying
+on ObjectId ordering across hosts.
+"""
+
+from datetime import datetime
+from database import db_instance
+from utils.cache import evict_local, invalidate_many, set_invalidation_publisher
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUS_COLLECTION = 'cache_invalidations'
+COUNTERS_COLLECTION = 'cache_invalidation_counters'
+BUS_SIZE_BYTES = 8 * 1024 * 1024
+BUS_MAX_DOCS = 50000
+BUS_MODE = os.environ.get('CACHE_BUS_MODE', 'auto')  # auto | change_stream | tailable
+
+# Namespaces holding offer documents (see routes.simple_tracking, services.smart_rules_resolver,
+# services.offer_search_index, services.offer_catalog, services.offer_similarity_index)
+OFFER_CACHE_NAMESPACES = ('tracking_offers', 'smart_rules', 'offer_search', 'offer_catalog', 'offer_similarity')
+# Bulk writes touching more offers than this clear the namespaces instead of publishing per key
+BULK_INVALIDATION_THRESHOLD = 100
+
+
+class CacheInvalidationBus:
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.mode = None
+        self._last_seq = None
+        self._resume_token = None
+        self._thread = None
+        self._running = False
+        self._capped_ready = False
+        self._stats_lock = threading.Lock()
+        self._counts = {'published': 0, 'received': 0, 'applied': 0, 'errors': 0}
+
+    def _count(self, field):
+        with self._stats_lock:
+            self._counts[field] += 1
+
+    def _collection(self):
+        db = db_instance.get_db()
+        if db is None:
+            return None
+        if not self._capped_ready:
+            from pymongo.errors import CollectionInvalid
+            try:
+                if BUS_COLLECTION not in db.list_collection_names():
+                    db.create_collection(BUS_COLLECTION, capped=True, size=BUS_SIZE_BYTES, max=BUS_MAX_DOCS)
+            except CollectionInvalid:
+                pass  # created by another worker in the meantime
+            self._capped_ready = True
+        return db[BUS_COLLECTION]
+
+    def _next_seq(self):
+        from pymongo import ReturnDocument
+        counter = db_instance.get_collection(COUNTERS_COLLECTION).find_one_and_update(
+            {'_id': BUS_COLLECTION},
+            {'$inc': {'seq': 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['seq']
+
+    def _current_seq(self):
+        counter = db_instance.get_collection(COUNTERS_COLLECTION).find_one({'_id': BUS_COLLECTION})
+        return counter['seq'] if counter else 0
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def publish(self, namespace: str, key=None):
+        """Broadcast an eviction of key (or the whole namespace when key is None)."""
+        self.publish_many([(namespace, key)])
+
+    def publish_many(self, pairs: List[Tuple[str, object]]):
+        """Broadcast several (namespace, key) evictions as a single message."""
+        if not pairs:
+            return
+        try:
+            col = self._collection()
+            if col is None:
+                return
+            col.insert_one({
+                'seq': self._next_seq(),
+                'keys': [[ns, None if key is None else str(key)] for ns, key in pairs],
+                'origin': self.origin,
+                'created_at': datetime.utcnow(),
+            })
+            self._count('published')
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Failed to publish cache invalidation for {len(pairs)} key(s): {e}")
+
+    # ------------------------------------------------------------------
+    # Subscribing
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        set_invalidation_publisher(self.publish_many)
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="CacheInvalidationBus")
+        self._thread.start()
+        logger.info(f"✅ Cache invalidation bus started ({self.origin})")
+
+    def stop(self):
+        self._running = False
+        set_invalidation_publisher(None)
+
+    def _run_loop(self):
+        while self._running:
+            try:
+                col = self._collection()
+                if col is None:
+                    time.sleep(30)
+                    continue
+                if self._last_seq is None:
+                    self._last_seq = self._current_seq()
+                if BUS_MODE != 'tailable' and self.mode != 'tailable':
+                    if self._watch(col):
+                        continue
+                self._tail(col)
+            except Exception as e:
+                self._count('errors')
+                logger.warning(f"Cache invalidation bus error: {e}")
+                time.sleep(5)
+
+    def _watch(self, col) -> bool:
+        """Follow inserts with a change stream; False when change streams are unavailable."""
+        from pymongo.errors import OperationFailure
+        try:
+            with col.watch(
+                [{'$match': {'operationType': 'insert'}}],
+                resume_after=self._resume_token,
+                max_await_time_ms=1000
+            ) as stream:
+                self.mode = 'change_stream'
+                while self._running and stream.alive:
+                    change = stream.try_next()
+                    if change is None:
+                        continue
+                    self._resume_token = stream.resume_token
+                    self._apply(change['fullDocument'])
+            return True
+        except OperationFailure as e:
+            if BUS_MODE == 'change_stream':
+                raise
+            logger.info(f"Change streams unavailable for cache invalidation, tailing capped collection: {e}")
+            self.mode = 'tailable'
+            return False
+
+    def _tail(self, col):
+        from pymongo import CursorType
+        self.mode = 'tailable'
+        cursor = col.find(
+            {'seq': {'$gt': self._last_seq}},
+            cursor_type=CursorType.TAILABLE_AWAIT
+        ).max_await_time_ms(1000)
+        while self._running and cursor.alive:
+            for doc in cursor:
+                self._apply(doc)
+        if self._running:
+            time.sleep(1)  # empty collection or cursor invalidated; reopen
+
+    def _apply(self, doc: Dict):
+        self._count('received')
+        seq = doc.get('seq')
+        if seq is not None and (self._last_seq is None or seq > self._last_seq):
+            self._last_seq = seq
+        if doc.get('origin') == self.origin:
+            return  # already evicted locally by the publisher
+        pairs = doc.get('keys') or []
+        for ns, key in pairs:
+            evict_local(ns, key)
+        if pairs:
+            self._count('applied')
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            counts = dict(self._counts)
+        return {
+            'origin': self.origin,
+            'running': self._running,
+            'mode': self.mode,
+            'last_seq': self._last_seq,
+            **counts,
+        }
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_cache_invalidation_bus() -> CacheInvalidationBus:
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = CacheInvalidationBus()
+        return _bus
+
+
+def invalidate_offer_caches(offer_ids: Optional[Iterable[str]] = None):
+    """Evict offers from the offer caches in every worker; all offers when offer_ids is None."""
+    if offer_ids is not None:
+        offer_ids = [o for o in offer_ids if o]
+        if len(offer_ids) > BULK_INVALIDATION_THRESHOLD:
+            offer_ids = None
+    try:
+        if offer_ids is None:
+            invalidate_many([(namespace, None) for namespace in OFFER_CACHE_NAMESPACES])
+        else:
+            invalidate_many([(namespace, offer_id) for namespace in OFFER_CACHE_NAMESPACES for offer_id in offer_ids])
+    except Exception as e:
+        logger.warning(f"Failed to invalidate offer caches: {e}")
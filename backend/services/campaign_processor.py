@@ -5,8 +5,8 @@ Integrates with existing EmailService and ScheduledEmailService.
 """
 
 import logging
+import os
 import threading
-import time
 from datetime import datetime, timedelta
 from models.email_campaign import EmailCampaign
 from services.email_service import get_email_service
@@ -14,12 +14,17 @@ from database import db_instance
 
 logger = logging.getLogger(__name__)
 
+# Emails claimed per pass; they are sent concurrently by the SMTP delivery engine
+CAMPAIGN_SEND_BATCH = int(os.environ.get('CAMPAIGN_SEND_BATCH', '500'))
+MAX_SEND_ATTEMPTS = 3
+
 
 class CampaignProcessor:
     """Background service for processing campaign email queues"""
     
     _instance = None
     _lock = threading.Lock()
+    CHECK_INTERVAL = 30  # Check every 30 seconds
     
     def __new__(cls):
         if cls._instance is None:
@@ -33,62 +38,43 @@ class CampaignProcessor:
         if self._initialized:
             return
         self._initialized = True
-        self._running = False
-        self._thread = None
-        self._check_interval = 30  # Check every 30 seconds
         logger.info("CampaignProcessor initialized")
     
-    def start(self):
-        """Start the background processor"""
-        if self._running:
-            return
-        self._running = True
-        self._thread = threading.Thread(target=self._process_loop, daemon=True)
-        self._thread.start()
-        logger.info("📧 CampaignProcessor started")
-    
-    def stop(self):
-        """Stop the background processor"""
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=5)
-        logger.info("📧 CampaignProcessor stopped")
-    
-    def _process_loop(self):
-        """Main processing loop"""
-        while self._running:
-            try:
-                self._process_due_emails()
-            except Exception as e:
-                logger.error(f"CampaignProcessor error: {e}", exc_info=True)
-            time.sleep(self._check_interval)
-    
-    def _process_due_emails(self):
-        """Find and send emails that are due"""
-        due_emails = EmailCampaign.get_due_emails(limit=20)
+    def process_due_emails(self):
+        """Find and send emails that are due (scheduled every CHECK_INTERVAL seconds as 'campaign_processor')"""
+        due_emails = EmailCampaign.get_due_emails(limit=CAMPAIGN_SEND_BATCH)
         
         if not due_emails:
             return
         
         logger.info(f"📧 Processing {len(due_emails)} due campaign emails")
         
+        campaigns = {}
+        to_send = []
+        queued_users = set()  # Users already getting an email this pass count as recently sent
         for email_doc in due_emails:
-            if not self._running:
-                break
-            
             try:
                 # Check if campaign is still active (not paused/cancelled)
-                campaign = EmailCampaign.get_campaign(email_doc.get('campaign_id'))
+                campaign_id = email_doc.get('campaign_id')
+                if campaign_id not in campaigns:
+                    campaigns[campaign_id] = EmailCampaign.get_campaign(campaign_id)
+                campaign = campaigns[campaign_id]
                 if not campaign:
                     EmailCampaign.update_email_status(email_doc['_id'], EmailCampaign.EMAIL_CANCELLED)
                     continue
                 
-                if campaign.get('status') in (EmailCampaign.STATUS_PAUSED, EmailCampaign.STATUS_CANCELLED):
+                # Release the claim so the email is not left in 'sending'
+                if campaign.get('status') == EmailCampaign.STATUS_PAUSED:
+                    EmailCampaign.update_email_status(email_doc['_id'], EmailCampaign.EMAIL_PENDING)
+                    continue
+                if campaign.get('status') == EmailCampaign.STATUS_CANCELLED:
+                    EmailCampaign.update_email_status(email_doc['_id'], EmailCampaign.EMAIL_CANCELLED)
                     continue
                 
                 # Check cooldown - don't send if user received email too recently
                 cooldown_days = campaign.get('cooldown_days', 1)
-                if self._check_cooldown(email_doc.get('user_id'), cooldown_days):
+                user_id = email_doc.get('user_id')
+                if (cooldown_days > 0 and user_id in queued_users) or self._check_cooldown(user_id, cooldown_days):
                     # Reschedule for later
                     new_time = datetime.utcnow() + timedelta(hours=cooldown_days * 24)
                     EmailCampaign.update_email_status(
@@ -98,8 +84,9 @@ class CampaignProcessor:
                     )
                     continue
                 
-                # Send the email
-                self._send_email(email_doc, campaign)
+                to_send.append((email_doc, campaign))
+                if user_id:
+                    queued_users.add(user_id)
                 
             except Exception as e:
                 logger.error(f"Error processing email {email_doc.get('_id')}: {e}")
@@ -109,6 +96,9 @@ class CampaignProcessor:
                     {'error_message': str(e), 'retry_count': email_doc.get('retry_count', 0) + 1}
                 )
         
+        # Send the batch concurrently over the pooled SMTP connections
+        self._send_emails(to_send)
+        
         # Update campaign progress for affected campaigns
         campaign_ids = set(e.get('campaign_id') for e in due_emails if e.get('campaign_id'))
         for cid in campaign_ids:
@@ -132,40 +122,55 @@ class CampaignProcessor:
         
         return recent is not None
     
-    def _send_email(self, email_doc: dict, campaign: dict):
-        """Send a single campaign email"""
-        recipient_email = email_doc.get('email', '')
-        subject = email_doc.get('subject', '')
-        html_body = email_doc.get('html_body', '')
-        
-        if not recipient_email or not html_body:
-            EmailCampaign.update_email_status(
-                email_doc['_id'],
-                EmailCampaign.EMAIL_FAILED,
-                {'error_message': 'Missing recipient email or body'}
-            )
-            return
-        
+    def _send_emails(self, to_send: list):
+        """Send claimed campaign emails; each (email_doc, campaign) is settled as its delivery finishes"""
         # Status already set to 'sending' by atomic get_due_emails claim
+        ready = []
+        for email_doc, campaign in to_send:
+            if not email_doc.get('email', '') or not email_doc.get('html_body', ''):
+                EmailCampaign.update_email_status(
+                    email_doc['_id'],
+                    EmailCampaign.EMAIL_FAILED,
+                    {'error_message': 'Missing recipient email or body'}
+                )
+            else:
+                ready.append((email_doc, campaign))
+        if not ready:
+            return
         
         # Send via EmailService
         email_service = get_email_service()
         
         if not email_service.is_configured:
             logger.error(f"❌ Campaign email FAILED: EmailService not configured (SMTP credentials missing)")
-            EmailCampaign.update_email_status(
-                email_doc['_id'],
-                EmailCampaign.EMAIL_FAILED,
-                {'error_message': 'SMTP not configured on server', 'retry_count': email_doc.get('retry_count', 0) + 1}
-            )
+            for email_doc, _ in ready:
+                EmailCampaign.update_email_status(
+                    email_doc['_id'],
+                    EmailCampaign.EMAIL_FAILED,
+                    {'error_message': 'SMTP not configured on server', 'retry_count': email_doc.get('retry_count', 0) + 1}
+                )
             return
         
-        try:
-            success = email_service._send_email(recipient_email, subject, html_body)
-        except Exception as send_err:
-            logger.error(f"❌ Campaign email send exception: {send_err}")
-            success = False
+        # One send per campaign so throughput metrics are kept per campaign
+        by_campaign = {}
+        for email_doc, campaign in ready:
+            by_campaign.setdefault(email_doc.get('campaign_id'), []).append((email_doc, campaign))
         
+        for campaign_id, batch in by_campaign.items():
+            messages = [
+                email_service.build_message(email_doc['email'], email_doc.get('subject', ''), email_doc['html_body'])
+                for email_doc, _ in batch
+            ]
+            
+            def on_result(index, success, error, batch=batch):
+                email_doc, campaign = batch[index]
+                self._record_result(email_doc, campaign, success, error)
+            
+            email_service.send_messages(messages, campaign=f"campaign:{campaign_id}", on_result=on_result)
+    
+    def _record_result(self, email_doc: dict, campaign: dict, success: bool, error: str = None):
+        """Mark one campaign email sent, or reschedule / fail it"""
+        recipient_email = email_doc.get('email', '')
         if success:
             EmailCampaign.update_email_status(
                 email_doc['_id'],
@@ -185,12 +190,12 @@ class CampaignProcessor:
             logger.info(f"✅ Campaign email sent to {recipient_email} ({len(email_doc.get('offer_ids', []))} offers)")
         else:
             retry_count = email_doc.get('retry_count', 0) + 1
-            logger.warning(f"⚠️ Campaign email FAILED to {recipient_email} (attempt {retry_count})")
-            if retry_count >= 3:
+            logger.warning(f"⚠️ Campaign email FAILED to {recipient_email} (attempt {retry_count}): {error}")
+            if retry_count >= MAX_SEND_ATTEMPTS:
                 EmailCampaign.update_email_status(
                     email_doc['_id'],
                     EmailCampaign.EMAIL_FAILED,
-                    {'error_message': 'Max retries exceeded', 'retry_count': retry_count}
+                    {'error_message': error or 'Max retries exceeded', 'retry_count': retry_count}
                 )
             else:
                 # Retry in 5 minutes
@@ -1,14 +1,13 @@
-import smtplib
-import ssl
 import os
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict
 import threading
 from pathlib import Path
 from dotenv import load_dotenv
+from services.smtp_delivery import TRANSACTIONAL, get_smtp_delivery_engine, preferred_ports
 
 # Load environment variables from the backend/.env file
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -30,8 +29,7 @@ class EmailService:
         self.email_debug = os.getenv('EMAIL_DEBUG', 'false').lower() == 'true'
 
         # Prefer SSL 465 for Hostinger, STARTTLS 587 for Gmail
-        self._is_hostinger = 'hostinger' in self.smtp_host.lower()
-        self._preferred_ports = [(465, 'SSL'), (587, 'STARTTLS')] if self._is_hostinger else [(587, 'STARTTLS'), (465, 'SSL')]
+        self._preferred_ports = preferred_ports(self.smtp_host)
 
         logger.info(f"📧 EmailService — host={self.smtp_host} user={self.smtp_user or 'NOT SET'} pass_set={bool(self.smtp_pass)} from={self.from_email or 'NOT SET'}")
 
@@ -48,40 +46,61 @@ class EmailService:
         else:
             logger.info(f"✅ Email service ready: {self.smtp_host} (user={self.smtp_user})")
     
-    def _send_email_smtp(self, msg) -> bool:
+    def _send_email_smtp(self, msg, campaign: str = TRANSACTIONAL) -> bool:
         """
-        Send email using SMTP.
-        Port order is determined by host: Hostinger prefers SSL 465, Gmail prefers STARTTLS 587.
+        Send email using the pooled SMTP delivery engine (persistent authenticated
+        connections, remembered working port, retries on transient failures).
         """
         if not self.is_configured:
             logger.error("❌ SMTP not configured — cannot send email")
             return False
+        return get_smtp_delivery_engine().send(msg, campaign=campaign)
+
+    def build_message(self, to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        msg.attach(MIMEText(html_content, 'html'))
+        return msg
+
+    def send_messages(self, messages: List, campaign: str,
+                      on_result: Callable[[int, bool, str], None] = None) -> List:
+        """Send many messages on the delivery engine's concurrent senders; [(ok, error)] in input order."""
+        if not self.is_configured:
+            logger.error("❌ SMTP not configured — cannot send email")
+            results = [(False, 'SMTP not configured')] * len(messages)
+        elif self.email_debug:
+            logger.info(f"📧 [DEBUG MODE] Would send {len(messages)} emails ({campaign})")
+            results = [(True, None)] * len(messages)
+        else:
+            return get_smtp_delivery_engine().send_many(messages, campaign=campaign, on_result=on_result)
+        if on_result:
+            for index, (ok, error) in enumerate(results):
+                on_result(index, ok, error)
+        return results
+
+    def _send_bcc_batches(self, recipients: List[str], subject: str, html_content: str, campaign: str, batch_size: int = 50):
+        """BCC html_content to recipients in batches of batch_size (sent concurrently); returns (sent, failed)."""
+        batches = [recipients[i:i + batch_size] for i in range(0, len(recipients), batch_size)]
+        messages = []
+        for batch in batches:
+            msg = self.build_message(self.from_email, subject, html_content)  # Send to self
+            msg['Bcc'] = ', '.join(batch)
+            messages.append(msg)
 
-        ctx = ssl.create_default_context()
-
-        for port, method in self._preferred_ports:
-            try:
-                if method == 'STARTTLS':
-                    logger.info(f"📧 Trying SMTP STARTTLS on {self.smtp_host}:{port}...")
-                    with smtplib.SMTP(self.smtp_host, port, timeout=30) as server:
-                        server.starttls(context=ctx)
-                        server.login(self.smtp_user, self.smtp_pass)
-                        server.send_message(msg)
-                else:
-                    logger.info(f"📧 Trying SMTP SSL on {self.smtp_host}:{port}...")
-                    with smtplib.SMTP_SSL(self.smtp_host, port, context=ctx, timeout=30) as server:
-                        server.login(self.smtp_user, self.smtp_pass)
-                        server.send_message(msg)
-                logger.info(f"✅ Email sent via {method} port {port}")
-                return True
-            except Exception as e:
-                logger.warning(f"⚠️ {method} {port} failed: {e}")
-
-        logger.error(f"❌ All SMTP attempts failed. host={self.smtp_host}, user={self.smtp_user}")
-        return False
+        sent_count = 0
+        failed_count = 0
+        for batch, (ok, error) in zip(batches, self.send_messages(messages, campaign=campaign)):
+            if ok:
+                sent_count += len(batch)
+            else:
+                failed_count += len(batch)
+                logger.error(f"❌ BCC batch failed for {len(batch)} recipients: {error}")
+        return sent_count, failed_count
     
     def _send_email(self, to_email: str, subject: str, html_content: str) -> bool:
-        """Send email using SMTP - creates connection, sends, closes immediately"""
+        """Send email using SMTP over a pooled connection"""
         try:
             if not self.is_configured:
                 logger.error(f"❌ Email service not configured! Cannot send to {to_email}")
@@ -92,14 +111,7 @@ class EmailService:
                 return False
 
             # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            
-            # Attach HTML content
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
+            msg = self.build_message(to_email, subject, html_content)
             
             # Debug mode - just log
             if self.email_debug:
@@ -351,36 +363,7 @@ class EmailService:
         
         # Send as a single email with all recipients in BCC
         # Process in batches of 50 to avoid SMTP limits
-        batch_size = 50
-        sent_count = 0
-        failed_count = 0
-        
-        for i in range(0, len(recipients), batch_size):
-            batch = recipients[i:i + batch_size]
-            try:
-                msg = MIMEMultipart('alternative')
-                msg['Subject'] = subject
-                msg['From'] = self.from_email
-                msg['To'] = self.from_email  # Send to self
-                msg['Bcc'] = ', '.join(batch)
-                
-                html_part = MIMEText(html_content, 'html')
-                msg.attach(html_part)
-                
-                if self.email_debug:
-                    logger.info(f"📧 [DEBUG MODE] Would BCC email to {len(batch)} recipients")
-                    sent_count += len(batch)
-                    continue
-                
-                if self._send_email_smtp(msg):
-                    sent_count += len(batch)
-                    logger.info(f"✅ BCC batch sent to {len(batch)} recipients")
-                else:
-                    failed_count += len(batch)
-                    logger.error(f"❌ BCC batch failed for {len(batch)} recipients")
-            except Exception as e:
-                failed_count += len(batch)
-                logger.error(f"❌ BCC batch error: {str(e)}")
+        sent_count, failed_count = self._send_bcc_batches(recipients, subject, html_content, campaign='new_offer')
         
         logger.info(f"📊 Email notification results: {sent_count} sent, {failed_count} failed (via BCC)")
         return {'total': len(recipients), 'sent': sent_count, 'failed': failed_count, 'offer_name': offer_name}
@@ -511,36 +494,7 @@ class EmailService:
 
         logger.info(f"📧 Sending batch email ({count} offers) to {len(recipients)} recipients via BCC...")
 
-        batch_size = 50
-        sent_count = 0
-        failed_count = 0
-
-        for i in range(0, len(recipients), batch_size):
-            batch = recipients[i:i + batch_size]
-            try:
-                msg = MIMEMultipart('alternative')
-                msg['Subject'] = subject
-                msg['From'] = self.from_email
-                msg['To'] = self.from_email
-                msg['Bcc'] = ', '.join(batch)
-
-                html_part = MIMEText(html_content, 'html')
-                msg.attach(html_part)
-
-                if self.email_debug:
-                    logger.info(f"📧 [DEBUG MODE] Would BCC batch email to {len(batch)} recipients")
-                    sent_count += len(batch)
-                    continue
-
-                if self._send_email_smtp(msg):
-                    sent_count += len(batch)
-                    logger.info(f"✅ Batch BCC sent to {len(batch)} recipients")
-                else:
-                    failed_count += len(batch)
-                    logger.error(f"❌ Batch BCC failed for {len(batch)} recipients")
-            except Exception as e:
-                failed_count += len(batch)
-                logger.error(f"❌ Batch BCC error: {str(e)}")
+        sent_count, failed_count = self._send_bcc_batches(recipients, subject, html_content, campaign='new_offers_batch')
 
         logger.info(f"📊 Batch email results: {sent_count} sent, {failed_count} failed")
         return {'total': len(recipients), 'sent': sent_count, 'failed': failed_count, 'offer_count': count}
@@ -578,33 +532,7 @@ class EmailService:
         html_content = self._create_offer_update_email_html(offer_data, update_type)
         
         # Use BCC batches instead of individual emails
-        batch_size = 50
-        sent_count = 0
-        failed_count = 0
-        
-        for i in range(0, len(recipients), batch_size):
-            batch = recipients[i:i + batch_size]
-            try:
-                msg = MIMEMultipart('alternative')
-                msg['Subject'] = subject
-                msg['From'] = self.from_email
-                msg['To'] = self.from_email
-                msg['Bcc'] = ', '.join(batch)
-                msg.attach(MIMEText(html_content, 'html'))
-                
-                if self.email_debug:
-                    logger.info(f"📧 [DEBUG] Would BCC offer update to {len(batch)} recipients")
-                    sent_count += len(batch)
-                    continue
-                
-                if self._send_email_smtp(msg):
-                    sent_count += len(batch)
-                    logger.info(f"✅ Offer update BCC sent to {len(batch)} recipients")
-                else:
-                    failed_count += len(batch)
-            except Exception as e:
-                failed_count += len(batch)
-                logger.error(f"❌ Offer update BCC error: {str(e)}")
+        sent_count, failed_count = self._send_bcc_batches(recipients, subject, html_content, campaign='offer_update')
         
         return {'total': len(recipients), 'sent': sent_count, 'failed': failed_count, 'offer_name': offer_name, 'update_type': update_type}
     
@@ -866,27 +794,7 @@ class EmailService:
 </body>
 </html>
 """
-        batch_size = 50
-        sent_count = 0
-        failed_count = 0
-
-        for i in range(0, len(recipients), batch_size):
-            batch = recipients[i:i + batch_size]
-            try:
-                msg = MIMEMultipart('alternative')
-                msg['Subject'] = subject
-                msg['From'] = self.from_email
-                msg['To'] = self.from_email
-                msg['Bcc'] = ', '.join(batch)
-                msg.attach(MIMEText(html_content, 'html'))
-
-                if self._send_email_smtp(msg):
-                    sent_count += len(batch)
-                else:
-                    failed_count += len(batch)
-            except Exception as e:
-                failed_count += len(batch)
-                logger.error(f"❌ Promo BCC error: {str(e)}")
+        sent_count, failed_count = self._send_bcc_batches(recipients, subject, html_content, campaign='promo_code')
 
         logger.info(f"📧 Promo code BCC: {sent_count} sent, {failed_count} failed")
         return {'sent': sent_count, 'failed': failed_count}
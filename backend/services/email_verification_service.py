@@ -5,8 +5,6 @@ import logging
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import smtplib
-import ssl
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -14,7 +12,8 @@ env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
 from database import db_instance
-from typing import Tuple, Optional, Dict
+from services.smtp_delivery import TRANSACTIONAL, get_smtp_delivery_engine, preferred_ports
+from typing import Tuple, Optional, List
 
 logger = logging.getLogger(__name__)
 LOGO_URL = 'https://moustacheleads.com/logo.png'
@@ -32,8 +31,7 @@ class EmailVerificationService:
 
         # Determine preferred port order based on host
         # Hostinger works best with SSL 465 first; Gmail needs STARTTLS 587 first
-        self._is_hostinger = 'hostinger' in self.smtp_host.lower()
-        self._preferred_ports = [(465, 'SSL'), (587, 'STARTTLS')] if self._is_hostinger else [(587, 'STARTTLS'), (465, 'SSL')]
+        self._preferred_ports = preferred_ports(self.smtp_host)
 
         logger.info(f'📧 SMTP Config — host={self.smtp_host} port={self.smtp_port} user={self.smtp_user or "NOT SET"} pass_set={bool(self.smtp_pass)} from={self.from_email or "NOT SET"}')
         self.is_configured = all([self.smtp_host, self.smtp_user, self.smtp_pass, self.from_email])
@@ -44,40 +42,23 @@ class EmailVerificationService:
             logger.warning(f'❌ Email NOT configured — missing vars: {missing}')
         # NOTE: We get fresh collection references in each method call
 
-    def _send_smtp(self, msg):
-        ctx = ssl.create_default_context()
-        max_retries = 2
-        for attempt in range(max_retries):
-            for port, method in self._preferred_ports:
-                try:
-                    if method == 'STARTTLS':
-                        with smtplib.SMTP(self.smtp_host, port, timeout=30) as s:
-                            s.starttls(context=ctx)
-                            s.login(self.smtp_user, self.smtp_pass)
-                            s.send_message(msg)
-                    else:
-                        with smtplib.SMTP_SSL(self.smtp_host, port, context=ctx, timeout=30) as s:
-                            s.login(self.smtp_user, self.smtp_pass)
-                            s.send_message(msg)
-                    logger.info(f'✅ Email sent via {method} port {port}')
-                    return True
-                except Exception as e:
-                    logger.warning(f'SMTP {method} {port} failed (attempt {attempt+1}): {e}')
-            if attempt < max_retries - 1:
-                import time
-                time.sleep(2)
-        logger.error(f'All SMTP attempts failed for host={self.smtp_host}, user={self.smtp_user}')
-        return False
+    def _send_smtp(self, msg, campaign=TRANSACTIONAL):
+        # Pooled connection with the remembered working port; transient failures are retried
+        return get_smtp_delivery_engine().send(msg, campaign=campaign)
+
+    def build_message(self, to, subj, html, plain_text=None):
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subj
+        msg['From'] = self.from_email
+        msg['To'] = to
+        if plain_text:
+            msg.attach(MIMEText(plain_text, 'plain'))
+        msg.attach(MIMEText(html, 'html'))
+        return msg
 
     def _send_email(self, to, subj, html, plain_text=None):
         try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subj
-            msg['From'] = self.from_email
-            msg['To'] = to
-            if plain_text:
-                msg.attach(MIMEText(plain_text, 'plain'))
-            msg.attach(MIMEText(html, 'html'))
+            msg = self.build_message(to, subj, html, plain_text)
             if self.email_debug:
                 logger.info(f"[DEBUG] Would send to: {to}")
                 return True
@@ -85,6 +66,14 @@ class EmailVerificationService:
         except Exception as e:
             logger.error(f"Send error: {e}")
             return False
+
+    def send_messages(self, messages: List, campaign: str) -> List[Tuple[bool, Optional[str]]]:
+        """Send built messages concurrently on the delivery engine; [(ok, error)] in input order."""
+        if self.email_debug:
+            logger.info(f"[DEBUG] Would send {len(messages)} emails ({campaign})")
+            return [(True, None)] * len(messages)
+        return get_smtp_delivery_engine().send_many(messages, campaign=campaign)
+
     def generate_verification_token(self, email, user_id, frontend_url=None):
         """Generate a verification token and store it in the database."""
         token = secrets.token_urlsafe(32)
@@ -1,11 +1,13 @@
 """Export Service for Offer Access Requests."""
-import io
 import logging
+import tempfile
 from datetime import datetime, timedelta
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from database import db_instance
+from services.streaming_export import EXPORT_BATCH_SIZE, XLSX_SPOOL_BYTES, iter_batches
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,8 @@ STATUS_FILLS = {
     "review": PatternFill(start_color="FEF3C7", end_color="FEF3C7", fill_type="solid"),
 }
 
+ROW_ALIGNMENT = Alignment(vertical="center")
+
 ALL_COLUMNS = {
     "offer_name": {"label": "Offer Name", "width": 30},
     "status": {"label": "Status", "width": 12},
@@ -55,6 +59,27 @@ ALL_COLUMNS = {
 }
 
 
+class _TabSummary:
+    """Running totals for the summary sheet, so tab rows never need to be kept."""
+
+    def __init__(self):
+        self.count = 0
+        self.payout_sum = 0
+        self.payout_count = 0
+        self.networks = {}
+
+    def track(self, rows, progress=None):
+        for r in rows:
+            self.count += 1
+            if isinstance(r.get("offer_payout"), (int, float)):
+                self.payout_sum += r["offer_payout"]
+                self.payout_count += 1
+            n = r.get("offer_network", "") or "Unknown"
+            self.networks[n] = self.networks.get(n, 0) + 1
+            if progress: progress.advance()
+            yield r
+
+
 class ExportService:
     def __init__(self):
         self.requests_col = db_instance.get_collection("affiliate_requests")
@@ -62,7 +87,13 @@ class ExportService:
         self.users_col = db_instance.get_collection("users")
         self.proofs_col = db_instance.get_collection("placement_proofs")
 
-    def generate_export(self, config):
+    def generate_export(self, config, progress=None):
+        """
+        Build the export workbook in openpyxl write-only mode.
+        Ungrouped tabs are streamed from the requests cursor batch by batch;
+        grouped tabs still need all rows of the tab to bucket them.
+        Returns a temp file (spooled to disk when large) positioned at the start.
+        """
         tabs = config.get("tabs", ["approved"])
         columns = config.get("columns", list(ALL_COLUMNS.keys())[:8])
         group_by = config.get("group_by", "none")
@@ -72,29 +103,42 @@ class ExportService:
         freeze_headers = config.get("freeze_headers", True)
         color_code_rows = config.get("color_code_rows", True)
         auto_fit = config.get("auto_fit_columns", True)
-        wb = Workbook()
-        wb.remove(wb.active)
+        wb = Workbook(write_only=True)
         summary_data = {}
-        for tab in tabs:
-            data = self._fetch_tab_data(tab, date_range) if tab != "most_requested" else self._fetch_most_requested(self._build_date_filter(date_range))
-            summary_data[tab] = {"count": len(data), "data": data}
-            if group_by != "none" and separate_sheets:
-                groups = self._group_data(data, group_by)
-                for gn, gr in groups.items():
-                    ws = wb.create_sheet(title=self._safe_sheet_name(f"{tab} - {gn}"))
-                    self._write_sheet(ws, gr, columns, freeze_headers, color_code_rows, auto_fit)
-            elif group_by != "none":
-                ws = wb.create_sheet(title=self._safe_sheet_name(tab.replace("_", " ").title()))
-                self._write_grouped_sheet(ws, self._group_data(data, group_by), columns, group_by, freeze_headers, color_code_rows, auto_fit)
-            else:
-                ws = wb.create_sheet(title=self._safe_sheet_name(tab.replace("_", " ").title()))
-                self._write_sheet(ws, data, columns, freeze_headers, color_code_rows, auto_fit)
-        if include_summary:
-            self._create_summary_sheet(wb, summary_data, tabs, columns, config)
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        return buffer
+        spool = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES)
+        try:
+            for tab in tabs:
+                if tab == "most_requested":
+                    rows = self._fetch_most_requested(self._build_date_filter(date_range))
+                elif group_by != "none":
+                    rows = self._fetch_tab_data(tab, date_range)
+                else:
+                    rows = self._iter_tab_data(tab, date_range)
+                summary = summary_data[tab] = _TabSummary()
+                rows = summary.track(rows, progress)
+                if group_by != "none" and separate_sheets:
+                    groups = self._group_data(list(rows), group_by)
+                    for gn, gr in groups.items():
+                        ws = wb.create_sheet(title=self._safe_sheet_name(f"{tab} - {gn}"))
+                        self._write_sheet(ws, gr, columns, freeze_headers, color_code_rows, auto_fit)
+                elif group_by != "none":
+                    ws = wb.create_sheet(title=self._safe_sheet_name(tab.replace("_", " ").title()))
+                    self._write_grouped_sheet(ws, self._group_data(list(rows), group_by), columns, group_by, freeze_headers, color_code_rows, auto_fit)
+                else:
+                    ws = wb.create_sheet(title=self._safe_sheet_name(tab.replace("_", " ").title()))
+                    self._write_sheet(ws, rows, columns, freeze_headers, color_code_rows, auto_fit)
+            if include_summary:
+                self._create_summary_sheet(wb, summary_data, tabs, columns, config)
+            wb.save(spool)
+        except Exception as e:
+            spool.close()
+            if progress:
+                progress.fail(e)
+            raise
+        spool.seek(0)
+        if progress:
+            progress.finish()
+        return spool
 
     def _build_date_filter(self, date_range):
         df = {}
@@ -114,7 +158,10 @@ class ExportService:
         return None
 
     def _fetch_tab_data(self, tab, date_range=None):
-        from bson import ObjectId
+        return list(self._iter_tab_data(tab, date_range, limit=10000))
+
+    def _iter_tab_data(self, tab, date_range=None, limit=0):
+        """Yield export rows for a tab, enriching the requests cursor one batch at a time."""
         date_filter = self._build_date_filter(date_range)
         status_map = {"approved": "approved", "rejected": "rejected", "in_review": ["pending", "review"], "all_requests": None}
         mapped = status_map.get(tab)
@@ -123,8 +170,15 @@ class ExportService:
             q["status"] = {"$in": mapped} if isinstance(mapped, list) else mapped
         if date_filter:
             q["requested_at"] = date_filter
-        reqs = list(self.requests_col.find(q).sort("requested_at", -1).limit(10000))
-        if not reqs: return []
+        cursor = self.requests_col.find(q).sort("requested_at", -1).limit(limit).batch_size(EXPORT_BATCH_SIZE)
+        try:
+            for reqs in iter_batches(cursor, EXPORT_BATCH_SIZE):
+                yield from self._enrich_requests(reqs)
+        finally:
+            cursor.close()
+
+    def _enrich_requests(self, reqs):
+        from bson import ObjectId
         offer_ids = list({r.get("offer_id") for r in reqs if r.get("offer_id")})
         user_ids = list({str(r.get("user_id")) for r in reqs if r.get("user_id")})
         # Offer cache
@@ -180,7 +234,6 @@ class ExportService:
             for doc in conv_col.aggregate([{"$match": {"user_id": {"$in": user_ids}}}, {"$group": {"_id": "$user_id", "c": {"$sum": 1}}}]):
                 conv_cache[doc["_id"]] = doc["c"]
         now = datetime.utcnow()
-        results = []
         for r in reqs:
             oid = r.get("offer_id")
             offer = offer_cache.get(oid, {})
@@ -193,8 +246,7 @@ class ExportService:
             created = usr.get("created_at")
             acct_age = f"{(now - created).days} days" if isinstance(created, datetime) else ""
             os = offer_stats.get(oid, {"total": 0, "approved": 0, "rejected": 0, "unique": 0, "rate": 0})
-            results.append({"offer_name": offer.get("name", r.get("offer_name", "Unknown")), "status": r.get("status", ""), "publisher_username": usr.get("username", r.get("username", "")), "publisher_email": usr.get("email", r.get("email", "")), "offer_network": offer.get("network", ""), "offer_category": offer.get("category", offer.get("vertical", "")), "offer_countries": countries, "offer_payout": offer.get("payout", 0), "requested_at": req_at, "approved_at": r.get("approved_at"), "rejected_at": r.get("rejected_at"), "approved_by_username": r.get("approved_by_username", ""), "rejected_by_username": r.get("rejected_by_username", ""), "rejection_reason": r.get("rejection_reason", ""), "rejection_category": r.get("rejection_category", ""), "offer_status": offer.get("status", ""), "has_placement_proof": "Yes" if f"{uid}:{oid}" in proof_set else "No", "request_count": 1, "total_requests": os["total"], "approved_count": os["approved"], "rejected_count": os["rejected"], "unique_users": os["unique"], "offer_health": "", "approval_rate": f"{os['rate']}%", "unique_requesters": os["unique"], "offer_total_requests": os["total"], "days_since_request": days_since, "last_mail_sent": mail_cache.get(uid), "publisher_account_age": acct_age, "publisher_clicks": clicks_cache.get(uid, 0), "publisher_conversions": conv_cache.get(uid, 0), "message": r.get("message", "")})
-        return results
+            yield {"offer_name": offer.get("name", r.get("offer_name", "Unknown")), "status": r.get("status", ""), "publisher_username": usr.get("username", r.get("username", "")), "publisher_email": usr.get("email", r.get("email", "")), "offer_network": offer.get("network", ""), "offer_category": offer.get("category", offer.get("vertical", "")), "offer_countries": countries, "offer_payout": offer.get("payout", 0), "requested_at": req_at, "approved_at": r.get("approved_at"), "rejected_at": r.get("rejected_at"), "approved_by_username": r.get("approved_by_username", ""), "rejected_by_username": r.get("rejected_by_username", ""), "rejection_reason": r.get("rejection_reason", ""), "rejection_category": r.get("rejection_category", ""), "offer_status": offer.get("status", ""), "has_placement_proof": "Yes" if f"{uid}:{oid}" in proof_set else "No", "request_count": 1, "total_requests": os["total"], "approved_count": os["approved"], "rejected_count": os["rejected"], "unique_users": os["unique"], "offer_health": "", "approval_rate": f"{os['rate']}%", "unique_requesters": os["unique"], "offer_total_requests": os["total"], "days_since_request": days_since, "last_mail_sent": mail_cache.get(uid), "publisher_account_age": acct_age, "publisher_clicks": clicks_cache.get(uid, 0), "publisher_conversions": conv_cache.get(uid, 0), "message": r.get("message", "")}
 
     def _fetch_most_requested(self, date_filter):
         match = {"requested_at": date_filter} if date_filter else {}
@@ -251,94 +303,88 @@ class ExportService:
         if col_key == "offer_payout" and isinstance(value, (int, float)): return f"${value:.2f}"
         return value
 
-    def _write_sheet(self, ws, data, columns, freeze, color_code, auto_fit):
-        hf = Font(bold=True, color=COLORS["header_font"], size=11)
-        hfill = PatternFill(start_color=COLORS["header_bg"], end_color=COLORS["header_bg"], fill_type="solid")
-        valid = [c for c in columns if c in ALL_COLUMNS]
-        for ci, ck in enumerate(valid, 1):
-            cell = ws.cell(row=1, column=ci, value=ALL_COLUMNS[ck]["label"])
-            cell.font, cell.fill, cell.alignment = hf, hfill, Alignment(horizontal="center", vertical="center")
-        for ri, rd in enumerate(data, 2):
-            st = str(rd.get("status", "")).lower()
-            for ci, ck in enumerate(valid, 1):
-                cell = ws.cell(row=ri, column=ci, value=self._format_value(ck, rd.get(ck, "")))
-                cell.alignment = Alignment(vertical="center")
-                if color_code and st in STATUS_FILLS: cell.fill = STATUS_FILLS[st]
+    def _prepare_sheet(self, ws, valid, freeze, auto_fit):
+        # Write-only sheets take layout settings before the first row is appended
         if freeze: ws.freeze_panes = "A2"
         if auto_fit:
             for ci, ck in enumerate(valid, 1):
                 ws.column_dimensions[get_column_letter(ci)].width = ALL_COLUMNS[ck]["width"]
-
-    def _write_grouped_sheet(self, ws, groups, columns, group_by, freeze, color_code, auto_fit):
         hf = Font(bold=True, color=COLORS["header_font"], size=11)
         hfill = PatternFill(start_color=COLORS["header_bg"], end_color=COLORS["header_bg"], fill_type="solid")
+        header = []
+        for ck in valid:
+            cell = WriteOnlyCell(ws, value=ALL_COLUMNS[ck]["label"])
+            cell.font, cell.fill, cell.alignment = hf, hfill, Alignment(horizontal="center", vertical="center")
+            header.append(cell)
+        ws.append(header)
+
+    def _data_row(self, ws, rd, valid, color_code):
+        st = str(rd.get("status", "")).lower()
+        fill = STATUS_FILLS.get(st) if color_code else None
+        row = []
+        for ck in valid:
+            cell = WriteOnlyCell(ws, value=self._format_value(ck, rd.get(ck, "")))
+            cell.alignment = ROW_ALIGNMENT
+            if fill: cell.fill = fill
+            row.append(cell)
+        return row
+
+    def _write_sheet(self, ws, data, columns, freeze, color_code, auto_fit):
+        valid = [c for c in columns if c in ALL_COLUMNS]
+        self._prepare_sheet(ws, valid, freeze, auto_fit)
+        for rd in data:
+            ws.append(self._data_row(ws, rd, valid, color_code))
+
+    def _write_grouped_sheet(self, ws, groups, columns, group_by, freeze, color_code, auto_fit):
         sf = Font(bold=True, color=COLORS["section_font"], size=11)
         sfill = PatternFill(start_color=COLORS["section_bg"], end_color=COLORS["section_bg"], fill_type="solid")
         valid = [c for c in columns if c in ALL_COLUMNS]
-        for ci, ck in enumerate(valid, 1):
-            cell = ws.cell(row=1, column=ci, value=ALL_COLUMNS[ck]["label"])
-            cell.font, cell.fill, cell.alignment = hf, hfill, Alignment(horizontal="center", vertical="center")
-        cr = 2
+        self._prepare_sheet(ws, valid, freeze, auto_fit)
         for gn, gr in groups.items():
-            cell = ws.cell(row=cr, column=1, value=f"{group_by.title()}: {gn} ({len(gr)} records)")
-            cell.font, cell.fill = sf, sfill
-            if len(valid) > 1: ws.merge_cells(start_row=cr, start_column=1, end_row=cr, end_column=len(valid))
-            for c in range(1, len(valid)+1): ws.cell(row=cr, column=c).fill = sfill
-            cr += 1
+            # Write-only sheets cannot merge cells, so the section row is filled across instead
+            section = []
+            for ci in range(len(valid)):
+                cell = WriteOnlyCell(ws, value=f"{group_by.title()}: {gn} ({len(gr)} records)" if ci == 0 else None)
+                cell.font, cell.fill = sf, sfill
+                section.append(cell)
+            ws.append(section)
             for rd in gr:
-                st = str(rd.get("status", "")).lower()
-                for ci, ck in enumerate(valid, 1):
-                    cell = ws.cell(row=cr, column=ci, value=self._format_value(ck, rd.get(ck, "")))
-                    cell.alignment = Alignment(vertical="center")
-                    if color_code and st in STATUS_FILLS: cell.fill = STATUS_FILLS[st]
-                cr += 1
-            cr += 1
-        if freeze: ws.freeze_panes = "A2"
-        if auto_fit:
-            for ci, ck in enumerate(valid, 1):
-                ws.column_dimensions[get_column_letter(ci)].width = ALL_COLUMNS[ck]["width"]
+                ws.append(self._data_row(ws, rd, valid, color_code))
+            ws.append([])
 
     def _create_summary_sheet(self, wb, summary_data, tabs, columns, config):
         ws = wb.create_sheet(title="Summary", index=0)
-        ws.cell(row=1, column=1, value="Export Summary").font = Font(bold=True, size=16, color=COLORS["summary_title"])
-        ws.cell(row=2, column=1, value=f"Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}")
-        ws.cell(row=3, column=1, value=f"Tabs: {', '.join(tabs)}")
-        ws.cell(row=4, column=1, value=f"Grouped by: {config.get('group_by', 'None')}")
-        row = 6
-        ws.cell(row=row, column=1, value="Tab").font = Font(bold=True)
-        ws.cell(row=row, column=2, value="Records").font = Font(bold=True)
-        ws.cell(row=row, column=3, value="Avg Payout").font = Font(bold=True)
-        row += 1
+        ws.column_dimensions["A"].width = 25
+        ws.column_dimensions["B"].width = 15
+        ws.column_dimensions["C"].width = 15
+
+        def bold(value, **font):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = Font(bold=True, **font)
+            return cell
+
+        ws.append([bold("Export Summary", size=16, color=COLORS["summary_title"])])
+        ws.append([f"Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}"])
+        ws.append([f"Tabs: {', '.join(tabs)}"])
+        ws.append([f"Grouped by: {config.get('group_by', 'None')}"])
+        ws.append([])
+        ws.append([bold("Tab"), bold("Records"), bold("Avg Payout")])
         total = 0
+        nets = {}
         for tab in tabs:
-            info = summary_data.get(tab, {})
-            cnt = info.get("count", 0)
-            total += cnt
-            payouts = [r.get("offer_payout", 0) for r in info.get("data", []) if isinstance(r.get("offer_payout"), (int, float))]
-            avg = sum(payouts)/len(payouts) if payouts else 0
-            ws.cell(row=row, column=1, value=tab.replace("_", " ").title())
-            ws.cell(row=row, column=2, value=cnt)
-            ws.cell(row=row, column=3, value=f"${avg:.2f}")
-            row += 1
-        ws.cell(row=row, column=1, value="TOTAL").font = Font(bold=True)
-        ws.cell(row=row, column=2, value=total).font = Font(bold=True)
-        row += 2
+            info = summary_data.get(tab) or _TabSummary()
+            total += info.count
+            avg = info.payout_sum/info.payout_count if info.payout_count else 0
+            ws.append([tab.replace("_", " ").title(), info.count, f"${avg:.2f}"])
+            for n, c in info.networks.items():
+                nets[n] = nets.get(n, 0) + c
+        ws.append([bold("TOTAL"), bold(total)])
+        ws.append([])
         # Top networks
-        nets = {}
-        for info in summary_data.values():
-            for r in info.get("data", []):
-                n = r.get("offer_network", "") or "Unknown"
-                nets[n] = nets.get(n, 0) + 1
         if nets:
-            ws.cell(row=row, column=1, value="Top Networks").font = Font(bold=True, size=12)
-            row += 1
+            ws.append([bold("Top Networks", size=12)])
             for n, c in sorted(nets.items(), key=lambda x: x[1], reverse=True)[:10]:
-                ws.cell(row=row, column=1, value=n)
-                ws.cell(row=row, column=2, value=c)
-                row += 1
-        ws.column_dimensions["A"].width = 25
-        ws.column_dimensions["B"].width = 15
-        ws.column_dimensions["C"].width = 15
+                ws.append([n, c])
 
     def _safe_sheet_name(self, name):
         for ch in ["\\", "/", "*", "?", ":", "[", "]"]: name = name.replace(ch, "")
@@ -15,6 +15,7 @@ Criteria:
 
 import logging
 from database import db_instance
+from utils.cache import get_cache
 
 logger = logging.getLogger(__name__)
 
@@ -31,8 +32,9 @@ FAILURE_DESCRIPTIONS = {
 class HealthCheckService:
     """Evaluates offers against six health criteria."""
 
-    # Class-level cache for partner names (shared across instances)
-    _partner_cache = {'names': None, 'expires': 0}
+    # Class-level cache for partner names (shared across instances); partner writes
+    # invalidate it through the cache invalidation bus, so the TTL is only a backstop
+    _partner_cache = get_cache('partner_names', ttl=3600, max_size=1)
 
     def __init__(self):
         try:
@@ -65,25 +67,22 @@ class HealthCheckService:
 
     def evaluate_offers_batch(self, offers: list) -> dict:
         """
-        Evaluate multiple offers. Caches partner names for 5 minutes,
+        Evaluate multiple offers. Caches partner names (invalidated on partner writes),
         then checks if each offer's network exists as a partner (case-insensitive).
         """
-        import time
-        
-        # Use cached partner names if fresh (5 minute TTL)
-        partner_names_lower = set()
-        if time.time() < HealthCheckService._partner_cache['expires'] and HealthCheckService._partner_cache['names'] is not None:
-            partner_names_lower = HealthCheckService._partner_cache['names']
-        elif self.partners_collection is not None:
-            try:
-                for pdoc in self.partners_collection.find({}, {'partner_name': 1}):
-                    pname = pdoc.get('partner_name', '')
-                    if pname and isinstance(pname, str):
-                        partner_names_lower.add(pname.strip().lower())
-                HealthCheckService._partner_cache['names'] = partner_names_lower
-                HealthCheckService._partner_cache['expires'] = time.time() + 300  # 5 min cache
-            except Exception as e:
-                logger.warning(f"Failed to fetch partners: {e}")
+        # Use cached partner names if fresh
+        partner_names_lower = HealthCheckService._partner_cache.get('names')
+        if partner_names_lower is None:
+            partner_names_lower = set()
+            if self.partners_collection is not None:
+                try:
+                    for pdoc in self.partners_collection.find({}, {'partner_name': 1}):
+                        pname = pdoc.get('partner_name', '')
+                        if pname and isinstance(pname, str):
+                            partner_names_lower.add(pname.strip().lower())
+                    HealthCheckService._partner_cache.set('names', partner_names_lower)
+                except Exception as e:
+                    logger.warning(f"Failed to fetch partners: {e}")
 
         results = {}
         for offer in offers:
@@ -5,7 +5,7 @@ Provides IP intelligence including VPN/proxy detection, ISP identification, and
 
 import requests
 import logging
-from datetime import datetime, timedelta
+from utils.cache import get_cache
 import os
 
 logger = logging.getLogger(__name__)
@@ -15,7 +15,7 @@ class IP2LocationService:
         self.api_key = os.environ.get('IP2LOCATION_API_KEY', '')
         self.api_url = os.environ.get('IP2LOCATION_API_URL', 'https://api.ip2location.io/')
         self.cache_ttl = int(os.environ.get('IP2LOCATION_CACHE_TTL', 86400))  # 24 hours default
-        self.cache = {}  # In-memory cache (use Redis in production)
+        self.cache = get_cache('ip2location', ttl=self.cache_ttl, max_size=10000)  # IP -> lookup result
         self.enabled = bool(self.api_key)
         
         if not self.enabled:
@@ -227,27 +227,16 @@ class IP2LocationService:
     
     def _get_from_cache(self, ip_address):
         """Get IP data from cache"""
-        if ip_address in self.cache:
-            cached_entry = self.cache[ip_address]
-            # Check if cache is still valid
-            if datetime.utcnow() < cached_entry['expires_at']:
-                return cached_entry['data']
-            else:
-                # Cache expired, remove it
-                del self.cache[ip_address]
-        return None
+        return self.cache.get(ip_address)
     
     def _save_to_cache(self, ip_address, data):
-        """Save IP data to cache"""
-        self.cache[ip_address] = {
-            'data': data,
-            'expires_at': datetime.utcnow() + timedelta(seconds=self.cache_ttl)
-        }
+        """Save IP data to cache (LRU-bounded)"""
+        self.cache.set(ip_address, data)
         logger.debug(f"💾 Cached IP data for {ip_address} (TTL: {self.cache_ttl}s)")
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.cache = {}
+        self.cache.clear()
         logger.info("🗑️ IP2Location cache cleared")
 
 
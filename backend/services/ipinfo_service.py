@@ -6,7 +6,7 @@ Provides superior IP intelligence including VPN/proxy detection, ISP identificat
 import requests
 import logging
 import threading
-from datetime import datetime, timedelta
+from utils.cache import get_cache
 import os
 
 logger = logging.getLogger(__name__)
@@ -17,7 +17,7 @@ class IPinfoService:
         self.api_url = 'https://ipinfo.io'
         self.cache_ttl = int(os.environ.get('IPINFO_CACHE_TTL', 86400))  # 24 hours default
         self.timeout = int(os.environ.get('IPINFO_TIMEOUT', 5))  # 5 seconds default
-        self.cache = {}  # In-memory cache (use Redis in production)
+        self.cache = get_cache('ipinfo', ttl=self.cache_ttl, max_size=1000)  # IP -> lookup result
         self._lock = threading.Lock()
         self.enabled = bool(self.api_token)
         
@@ -545,40 +545,16 @@ class IPinfoService:
     
     def _get_from_cache(self, ip_address):
         """Get IP data from cache"""
-        if ip_address in self.cache:
-            cached_entry = self.cache[ip_address]
-            # Check if cache is still valid
-            if datetime.utcnow() < cached_entry['expires_at']:
-                return cached_entry['data']
-            else:
-                # Cache expired, remove it
-                del self.cache[ip_address]
-        return None
+        return self.cache.get(ip_address)
     
     def _save_to_cache(self, ip_address, data):
         """Save IP data to cache (max 1000 entries to prevent memory bloat)"""
-        # Evict if cache is too large
-        if len(self.cache) > 1000:
-            # Remove oldest 200 entries
-            now = datetime.utcnow()
-            expired = [k for k, v in self.cache.items() if now >= v['expires_at']]
-            for k in expired:
-                del self.cache[k]
-            # If still too large, clear half
-            if len(self.cache) > 1000:
-                keys_to_remove = list(self.cache.keys())[:500]
-                for k in keys_to_remove:
-                    del self.cache[k]
-        
-        self.cache[ip_address] = {
-            'data': data,
-            'expires_at': datetime.utcnow() + timedelta(seconds=self.cache_ttl)
-        }
-        logger.debug(f"💾 Cached IP data for {ip_address} (TTL: {self.cache_ttl}s, cache size: {len(self.cache)})")
+        self.cache.set(ip_address, data)
+        logger.debug(f"💾 Cached IP data for {ip_address} (TTL: {self.cache_ttl}s)")
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.cache = {}
+        self.cache.clear()
         logger.info("🗑️ IPinfo cache cleared")
 
 
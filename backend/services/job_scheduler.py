@@ -0,0 +1,514 @@
+"""
+Background Job Scheduler
+One registry for the periodic background work (cap monitoring, postbacks,
+schedule activation, emails, rotation, syncs, ...) instead of one
+`while True: ...; time.sleep(N)` daemon thread per service.
+
+Jobs run on an interval (with optional jitter) or on a 5-field cron
+expression. Every process that starts the scheduler takes part, and a lease
+document per job in scheduler_jobs makes sure exactly one process in the
+cluster runs each due slot:
+
+- A process claims a run with a compare-and-set on the job's next_run_at while
+  the lease is free, and advances next_run_at in the same write. A process
+  that loses the race just re-reads the schedule.
+- The owner renews lease_until while the job runs and clears it when it
+  finishes. A new run is never started while the lease is held, so runs do
+  not overlap (locally or across nodes). When a process dies mid-run, the
+  lease expires and the next slot is picked up elsewhere.
+- The schedule lives in the document, so restarts and deploys neither
+  re-run a job early nor lose its next slot.
+
+Per-job metrics (runs, failures, skipped overlaps, last/avg/max duration,
+last error) are kept per process and cluster-wide on the job document.
+"""
+
+from datetime import datetime, timedelta
+from database import db_instance
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = 'scheduler_jobs'
+TICK_SECONDS = float(os.environ.get('SCHEDULER_TICK_SECONDS', '1'))
+DEFAULT_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', '120'))
+# How often a process re-checks a job whose lease is held by someone else
+LEASE_POLL_SECONDS = 15
+# How long stop() waits for running jobs to finish before leaving their leases to expire
+STOP_GRACE_SECONDS = float(os.environ.get('SCHEDULER_STOP_GRACE_SECONDS', '10'))
+# Comma-separated job names that this deployment should not run at all
+DISABLED_JOBS = {name.strip() for name in os.environ.get('SCHEDULER_DISABLED_JOBS', '').split(',') if name.strip()}
+
+CRON_MACROS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+
+class CronSchedule:
+    """Standard 5-field cron expression (minute hour day-of-month month day-of-week), UTC.
+
+    Fields accept *, n, a-b, */s, a-b/s and comma lists; day-of-week 0 and 7
+    are Sunday. As in Vixie cron, when both day fields are restricted a day
+    matches if either one does.
+    """
+
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = CRON_MACROS.get(expression.strip(), expression.strip())
+        fields = self.expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        parsed = [self._parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, lo: int, hi: int) -> set:
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/', 1)
+                step = int(step_str)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: {field!r}")
+            if part == '*':
+                start, end = lo, hi
+            elif '-' in part:
+                start, end = (int(x) for x in part.split('-', 1))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if start < lo or end > hi or start > end:
+                raise ValueError(f"Cron field {field!r} out of range {lo}-{hi}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, t: datetime) -> bool:
+        day_ok = t.day in self.days
+        weekday_ok = (t.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        if self.days_restricted:
+            return day_ok
+        if self.weekdays_restricted:
+            return weekday_ok
+        return True
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit_year = after.year + 5
+        while t.year <= limit_year:
+            if t.month not in self.months:
+                t = datetime(t.year + (t.month == 12), t.month % 12 + 1, 1)
+            elif not self._day_matches(t):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = datetime(t.year, t.month, t.day, t.hour) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+class Job:
+    """A registered job: what to run, when, and its per-process metrics."""
+
+    def __init__(self, name: str, func: Callable, interval: Optional[float] = None, cron: Optional[str] = None,
+                 jitter: float = 0, initial_delay: float = 0, lease_seconds: Optional[int] = None,
+                 description: str = ''):
+        if (interval is None) == (cron is None):
+            raise ValueError(f"Job {name} needs exactly one of interval or cron")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.initial_delay = initial_delay
+        self.lease_seconds = lease_seconds or DEFAULT_LEASE_SECONDS
+        self.description = description
+
+        # Scheduler-thread state
+        self.next_check_at: Optional[datetime] = None
+        self.scheduled_at: Optional[datetime] = None  # next_run_at as last read from the job document
+        self.running = False
+        self.lease_renewed_at = 0.0
+
+        # Per-process metrics
+        self.runs = 0
+        self.failures = 0
+        self.skipped_overlaps = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_duration = None
+        self.last_started_at = None
+        self.last_finished_at = None
+        self.last_error = None
+
+    @property
+    def schedule(self) -> str:
+        if self.cron:
+            return f"cron {self.cron.expression}"
+        return f"every {self.interval:g}s" + (f" +{self.jitter:g}s jitter" if self.jitter else '')
+
+    def _jitter(self) -> timedelta:
+        return timedelta(seconds=random.uniform(0, self.jitter)) if self.jitter else timedelta(0)
+
+    def first_run_at(self, now: datetime) -> datetime:
+        if self.cron:
+            return self.cron.next_after(now + timedelta(seconds=self.initial_delay)) + self._jitter()
+        return now + timedelta(seconds=self.initial_delay) + self._jitter()
+
+    def next_run_after(self, scheduled: datetime, now: datetime) -> datetime:
+        """Next slot once the run scheduled at `scheduled` starts at `now` (no drift, no catch-up bursts)."""
+        if self.cron:
+            return self.cron.next_after(now) + self._jitter()
+        next_run = scheduled + timedelta(seconds=self.interval)
+        if next_run <= now:
+            next_run = now + timedelta(seconds=self.interval)
+        return next_run + self._jitter()
+
+
+class JobScheduler:
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.RLock()
+        self._thread = None
+        self._running = False
+
+    def _collection(self):
+        return db_instance.get_collection(JOBS_COLLECTION)
+
+    # ------------------------------------------------------------------
+    # Registry
+    # ------------------------------------------------------------------
+
+    def register(self, name: str, func: Callable, interval: Optional[float] = None, cron: Optional[str] = None,
+                 jitter: float = 0, initial_delay: float = 0, lease_seconds: Optional[int] = None,
+                 description: str = '') -> Optional[Job]:
+        """Add (or replace) a job. Exactly one of interval (seconds) or cron must be given."""
+        if name in DISABLED_JOBS:
+            logger.info(f"ℹ️ Job {name} disabled via SCHEDULER_DISABLED_JOBS")
+            return None
+        job = Job(name, func, interval=interval, cron=cron, jitter=jitter, initial_delay=initial_delay,
+                  lease_seconds=lease_seconds, description=description)
+        with self._lock:
+            previous = self._jobs.get(name)
+            if previous is not None and previous.running:
+                job.running = True  # keep overlap protection for the in-flight run
+            self._jobs[name] = job
+        logger.info(f"🗓️ Registered job {name} ({job.schedule})")
+        return job
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._jobs
+
+    def job_names(self) -> List[str]:
+        return list(self._jobs)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="JobScheduler")
+        self._thread.start()
+        logger.info(f"✅ Job scheduler started with {len(self._jobs)} jobs ({self.origin})")
+
+    def stop(self, grace_seconds: float = STOP_GRACE_SECONDS):
+        """Stop scheduling on shutdown.
+
+        Running jobs get up to grace_seconds to finish (and release their own
+        lease). Leases of jobs still running after that are kept, so no other
+        process starts an overlapping run while this one may still be going;
+        they expire lease_seconds after their last renewal. Any other lease
+        this process holds is released right away.
+        """
+        self._running = False
+        deadline = time.time() + grace_seconds
+        while True:
+            with self._lock:
+                running = [job.name for job in self._jobs.values() if job.running]
+            if not running or time.time() >= deadline:
+                break
+            time.sleep(0.1)
+        if running:
+            logger.warning(f"⚠️ Job scheduler stopping with jobs still running, leases left to expire: {running}")
+        try:
+            col = self._collection()
+            if col is not None:
+                col.update_many(
+                    {'_id': {'$nin': running}, 'lease_owner': self.origin, 'lease_until': {'$ne': None}},
+                    {'$set': {'lease_until': None}}
+                )
+        except Exception as e:
+            logger.warning(f"Failed to release scheduler leases: {e}")
+
+    def _run_loop(self):
+        while self._running:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.warning(f"Job scheduler tick failed: {e}")
+            time.sleep(TICK_SECONDS)
+
+    def tick(self, now: Optional[datetime] = None):
+        """Claim and start due jobs and renew the leases of running ones."""
+        col = self._collection()
+        if col is None:
+            return
+        now = now or datetime.utcnow()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            try:
+                if job.running:
+                    self._renew_lease(col, job)
+                elif job.next_check_at is None or job.next_check_at <= now:
+                    self._try_run(col, job, now)
+            except Exception as e:
+                logger.warning(f"Scheduling job {job.name} failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Leases
+    # ------------------------------------------------------------------
+
+    def _load(self, col, job: Job, now: datetime) -> Dict:
+        """Read the job document, creating it (or resetting a changed schedule) on first sight."""
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+        try:
+            doc = col.find_one_and_update(
+                {'_id': job.name},
+                {'$setOnInsert': {
+                    'schedule': job.schedule, 'next_run_at': job.first_run_at(now), 'lease_until': None,
+                    'runs': 0, 'failures': 0, 'total_duration': 0.0, 'max_duration': 0.0,
+                    'created_at': now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            doc = col.find_one({'_id': job.name})
+        if doc.get('schedule') != job.schedule:
+            # Interval/cron changed in code: start the new schedule instead of waiting out the old one
+            next_run = min(doc.get('next_run_at') or now, job.first_run_at(now))
+            col.update_one({'_id': job.name}, {'$set': {'schedule': job.schedule, 'next_run_at': next_run}})
+            doc['schedule'], doc['next_run_at'] = job.schedule, next_run
+        return doc
+
+    def _try_run(self, col, job: Job, now: datetime):
+        from pymongo import ReturnDocument
+        if job.scheduled_at is None:
+            doc = self._load(col, job, now)
+            job.scheduled_at = doc['next_run_at']
+            if job.scheduled_at > now:
+                job.next_check_at = job.scheduled_at
+                return
+
+        claimed = col.find_one_and_update(
+            {
+                '_id': job.name,
+                'next_run_at': job.scheduled_at,
+                '$or': [{'lease_until': None}, {'lease_until': {'$lte': now}}],
+            },
+            {'$set': {
+                'next_run_at': job.next_run_after(job.scheduled_at, now),
+                'lease_owner': self.origin,
+                'lease_until': now + timedelta(seconds=job.lease_seconds),
+                'last_started_at': now,
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        if claimed is not None:
+            job.scheduled_at = claimed['next_run_at']
+            job.next_check_at = job.scheduled_at
+            self._start_run(job)
+            return
+
+        # Lost the race or the lease is held: follow the shared schedule
+        doc = self._load(col, job, now)
+        job.scheduled_at = doc['next_run_at']
+        lease_until = doc.get('lease_until')
+        if lease_until and lease_until > now and job.scheduled_at <= now:
+            # Due, but the previous run is still going somewhere
+            job.skipped_overlaps += 1
+            job.next_check_at = min(lease_until, now + timedelta(seconds=LEASE_POLL_SECONDS))
+        else:
+            job.next_check_at = max(job.scheduled_at, now + timedelta(seconds=TICK_SECONDS))
+
+    def _renew_lease(self, col, job: Job):
+        if time.time() - job.lease_renewed_at < job.lease_seconds / 3:
+            return
+        col.update_one(
+            {'_id': job.name, 'lease_owner': self.origin},
+            {'$set': {'lease_until': datetime.utcnow() + timedelta(seconds=job.lease_seconds)}}
+        )
+        job.lease_renewed_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def _start_run(self, job: Job):
+        job.running = True
+        job.lease_renewed_at = time.time()
+        threading.Thread(target=self._execute, args=(job,), daemon=True, name=f"job-{job.name}").start()
+
+    def _execute(self, job: Job):
+        started_at = datetime.utcnow()
+        started = time.time()
+        error = None
+        job.last_started_at = started_at
+        try:
+            job.func()
+        except Exception as e:
+            error = str(e)
+            logger.error(f"❌ Job {job.name} failed: {e}", exc_info=True)
+        duration = time.time() - started
+
+        job.runs += 1
+        job.failures += 1 if error else 0
+        job.total_duration += duration
+        job.max_duration = max(job.max_duration, duration)
+        job.last_duration = duration
+        job.last_finished_at = datetime.utcnow()
+        job.last_error = error
+        try:
+            col = self._collection()
+            if col is not None:
+                col.update_one(
+                    {'_id': job.name, 'lease_owner': self.origin},
+                    {
+                        '$set': {
+                            'lease_until': None,
+                            'last_finished_at': job.last_finished_at,
+                            'last_duration': round(duration, 3),
+                            'last_status': 'failed' if error else 'success',
+                            'last_error': error,
+                        },
+                        '$inc': {'runs': 1, 'failures': 1 if error else 0, 'total_duration': duration},
+                        '$max': {'max_duration': round(duration, 3)},
+                    }
+                )
+        except Exception as e:
+            logger.warning(f"Failed to release lease for job {job.name}: {e}")
+        finally:
+            job.running = False
+
+    def run_now(self, name: str) -> bool:
+        """Start a job immediately (outside its schedule) if no run holds its lease."""
+        job = self._jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        col = self._collection()
+        if col is None or job.running:
+            return False
+        now = datetime.utcnow()
+        self._load(col, job, now)
+        claimed = col.find_one_and_update(
+            {'_id': name, '$or': [{'lease_until': None}, {'lease_until': {'$lte': now}}]},
+            {'$set': {
+                'lease_owner': self.origin,
+                'lease_until': now + timedelta(seconds=job.lease_seconds),
+                'last_started_at': now,
+            }}
+        )
+        if claimed is None:
+            return False
+        self._start_run(job)
+        return True
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self, names: Optional[List[str]] = None) -> Dict:
+        names = [n for n in (names or self._jobs) if n in self._jobs]
+        docs = {}
+        try:
+            col = self._collection()
+            if col is not None:
+                docs = {d['_id']: d for d in col.find({'_id': {'$in': names}})}
+        except Exception as e:
+            logger.warning(f"Failed to read scheduler job documents: {e}")
+
+        jobs = []
+        for name in sorted(names):
+            job = self._jobs[name]
+            doc = docs.get(name, {})
+            cluster_runs = doc.get('runs', 0)
+            jobs.append({
+                'name': name,
+                'description': job.description,
+                'schedule': job.schedule,
+                'next_run_at': doc.get('next_run_at'),
+                'lease_owner': doc.get('lease_owner') if doc.get('lease_until') else None,
+                'lease_until': doc.get('lease_until'),
+                'cluster': {
+                    'runs': cluster_runs,
+                    'failures': doc.get('failures', 0),
+                    'avg_duration': round(doc.get('total_duration', 0) / cluster_runs, 3) if cluster_runs else None,
+                    'max_duration': doc.get('max_duration'),
+                    'last_duration': doc.get('last_duration'),
+                    'last_status': doc.get('last_status'),
+                    'last_error': doc.get('last_error'),
+                    'last_started_at': doc.get('last_started_at'),
+                    'last_finished_at': doc.get('last_finished_at'),
+                },
+                'local': {
+                    'running': job.running,
+                    'runs': job.runs,
+                    'failures': job.failures,
+                    'skipped_overlaps': job.skipped_overlaps,
+                    'avg_duration': round(job.total_duration / job.runs, 3) if job.runs else None,
+                    'max_duration': round(job.max_duration, 3),
+                    'last_duration': round(job.last_duration, 3) if job.last_duration is not None else None,
+                    'last_error': job.last_error,
+                    'last_started_at': job.last_started_at,
+                    'last_finished_at': job.last_finished_at,
+                },
+            })
+        return {
+            'origin': self.origin,
+            'running': self._running,
+            'jobs': jobs,
+        }
+
+    def job_status(self, name: str) -> Optional[Dict]:
+        """Stats for one job, or None when it is not registered in this process."""
+        if name not in self._jobs:
+            return None
+        return self.stats([name])['jobs'][0]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler() -> JobScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        return _scheduler
@@ -5,23 +5,36 @@ Checks offer tracking links for:
 1. Hard failures: 4xx/5xx, timeouts, SSL errors (via redirect check)
 2. Soft failures: 200 but wrong page content (via web scrape + keyword matching)
 
-Runs as a background thread every 2 hours, checking ~50 links per batch.
-Results are saved to the offer document in MongoDB (link_health field).
+The scheduled 'link_health' job sweeps the whole catalog with LinkSweeper,
+which follows redirect chains itself (no API credits): many links in flight
+at once, but at most a few per host and throttled by a token bucket per host,
+so no single network gets hammered. Manual checks from the admin panel still
+go through Geekflare. Results are saved to the offer document in MongoDB
+(link_health field).
 
 Credit budget (free tier = 3000 credits/month):
 - Redirect check = 1 credit
 - Web scrape = 2 credits
-- 50 links × 12 runs/day = 600 checks/day → ~1800/month (well within limit)
-- Deep scrape only for suspicious links (~5-10% of checks)
+- Only manual / bulk (max 20) checks from the admin panel use credits
 """
 
+import ipaddress
+import itertools
 import logging
+import os
+import re
+import socket
 import threading
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit
+from pymongo import UpdateOne
+from requests.adapters import HTTPAdapter
 from database import db_instance
 from config import Config
+from utils.rate_limit import HostRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -79,6 +92,65 @@ BAD_DOMAINS = [
     'namecheap.com/domains/forwarding',
 ]
 
+# Sweep tuning: total concurrency, per-host concurrency and request rate
+SWEEP_WORKERS = int(os.environ.get('LINK_HEALTH_WORKERS', '32'))
+HOST_CONCURRENCY = int(os.environ.get('LINK_HEALTH_HOST_CONCURRENCY', '4'))
+HOST_REQUESTS_PER_SECOND = float(os.environ.get('LINK_HEALTH_HOST_RPS', '5'))
+HOST_REQUEST_BURST = int(os.environ.get('LINK_HEALTH_HOST_BURST', '5'))
+# Offers are re-checked once their last check is older than this
+RECHECK_AFTER_HOURS = float(os.environ.get('LINK_HEALTH_RECHECK_HOURS', '12'))
+SWEEP_MAX_OFFERS = int(os.environ.get('LINK_HEALTH_SWEEP_MAX_OFFERS', '50000'))
+# Offers not reached within this budget are picked up (first) by the next sweep
+SWEEP_MAX_SECONDS = int(os.environ.get('LINK_HEALTH_SWEEP_MAX_SECONDS', str(50 * 60)))
+REQUEST_TIMEOUT = 10
+MAX_REDIRECTS = 10
+CONTENT_SNIFF_BYTES = 10000
+MAX_RETRY_AFTER_SECONDS = 30
+RESULT_CACHE_SECONDS = 3600  # definitive results only; timeouts, connection errors and 5xx/429 are retried
+WRITE_BATCH_SIZE = 500
+
+# Servers that answer HEAD with these (or any 4xx/5xx) get a GET before we believe them
+HEAD_UNSUPPORTED_STATUSES = (405, 501)
+
+# Query parameters that only carry click / sub-id data. They are left out of the
+# template key, so offers sharing a tracking template share one redirect check.
+CLICK_PARAM_RE = re.compile(
+    r'^(sub\d*|sub_?id\d*|aff_?sub\d*|s\d|click_?id|aff_click_id|transaction_id|tid|source|gclid|fbclid|utm_\w+)$',
+    re.IGNORECASE
+)
+MACRO_RE = re.compile(r'\{[^}]+\}')
+BRACKET_MACRO_RE = re.compile(r'\[[^\]]+\]')
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+def fill_tracking_macros(target_url):
+    """Replace tracking macros ({sub1}, {click_id}, [aff_sub], ...) with dummy values so the URL is checkable."""
+    return BRACKET_MACRO_RE.sub('test123', MACRO_RE.sub('test123', target_url))
+
+
+def link_template_key(url):
+    """Cache key for a tracking link: scheme, domain, path and the non-click query parameters (sorted)."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not CLICK_PARAM_RE.match(k))
+    return (parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query))
+
+
+def _no_url_result(checked_by):
+    return {
+        'status': 'no_url',
+        'last_checked': datetime.utcnow(),
+        'final_url': None,
+        'failure_reason': 'No target_url set on offer',
+        'redirect_count': 0,
+        'checked_by': checked_by,
+    }
+
+
 # ============================================================
 # GEEKFLARE API CLIENT
 # ============================================================
@@ -164,11 +236,7 @@ def scrape_page_content(url):
         response = requests.get(
             url,
             timeout=20,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            },
+            headers=BROWSER_HEADERS,
             allow_redirects=True,
         )
 
@@ -245,26 +313,12 @@ def check_single_offer_link(offer):
     Check a single offer's tracking link health.
     Returns a link_health dict to store on the offer document.
     """
-    import re
-
-    offer_id = offer.get('offer_id', '')
     target_url = offer.get('target_url', '')
 
     if not target_url or not target_url.strip():
-        return {
-            'status': 'no_url',
-            'last_checked': datetime.utcnow(),
-            'final_url': None,
-            'failure_reason': 'No target_url set on offer',
-            'redirect_count': 0,
-            'checked_by': 'geekflare',
-        }
+        return _no_url_result('geekflare')
 
-    # Replace tracking macros with dummy values so the URL is valid for checking
-    # Common macros: {sub1}, {sub_id1}, {click_id}, {offer_id}, {aff_sub}, etc.
-    check_url = re.sub(r'\{[^}]+\}', 'test123', target_url)
-    # Also handle [macros] format
-    check_url = re.sub(r'\[[^\]]+\]', 'test123', check_url)
+    check_url = fill_tracking_macros(target_url)
 
     # Step 1: Check redirect chain (1 credit)
     redirect_result = check_redirect_chain(check_url)
@@ -339,6 +393,280 @@ def check_single_offer_link(offer):
     }
 
 
+# ============================================================
+# CONCURRENT SWEEP CHECKER (direct HTTP, no API credits)
+# ============================================================
+
+def _interleave_by_host(offers):
+    """Round-robin offers over their tracking hosts so the pool works on many hosts at once."""
+    by_host = {}
+    for offer in offers:
+        host = urlsplit((offer.get('target_url') or '').strip()).netloc.lower()
+        by_host.setdefault(host, []).append(offer)
+    return [offer for group in itertools.zip_longest(*by_host.values()) for offer in group if offer is not None]
+
+
+class BlockedAddressError(Exception):
+    """A link (or one of its redirects) points at a non-public address."""
+
+
+def _check_public_url(url):
+    """Raise BlockedAddressError unless url is http(s) and its host resolves only to public addresses.
+
+    Offer URLs are admin/network supplied and redirects are followed blindly, so every hop is
+    checked before connecting to keep the sweeper off loopback, private and link-local ranges
+    (cloud metadata endpoints included).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise BlockedAddressError(f'Unsupported URL: {url[:100]}')
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80),
+                                   proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise requests.ConnectionError(f'Could not resolve {parts.hostname}')
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%', 1)[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise BlockedAddressError(f'Blocked non-public address {address} for {parts.hostname}')
+
+
+class LinkSweeper:
+    """Checks many offer links concurrently by following their redirect chains directly.
+
+    - Every request waits for one of HOST_CONCURRENCY slots and a token from its
+      host's bucket; HTTP 429 is waited out (Retry-After) while holding the slot.
+    - Each hop is probed with HEAD; GET is only sent when HEAD is refused or
+      reports an error, or when a landing page's content has to be read.
+    - Results are cached per tracking template, hop URL and landing page, so
+      offers sharing a template or landing page are fetched once. Concurrent
+      lookups of the same key wait for the first one instead of refetching.
+      Transient failures are not cached, so the next offer retries them.
+    - Every hop is resolved first and refused if it points at a non-public
+      address (see _check_public_url).
+    """
+
+    def __init__(self, workers=SWEEP_WORKERS, host_concurrency=HOST_CONCURRENCY,
+                 rate=HOST_REQUESTS_PER_SECOND, burst=HOST_REQUEST_BURST):
+        self.workers = max(1, workers)
+        self.host_concurrency = max(1, host_concurrency)
+        self.rate_limiter = HostRateLimiter(rate, burst)
+        self.session = requests.Session()
+        self.session.headers.update(BROWSER_HEADERS)
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=max(10, self.workers))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._cache = {}
+        self._inflight = {}
+        self._public_hosts = set()  # hosts already resolved to public addresses in this sweep
+        self.counters = {'head': 0, 'get': 0, 'rate_limited': 0, 'cache_hits': 0}
+
+    # ---------------- caching ----------------
+
+    def _cached(self, key, compute, keep=None):
+        """compute() once per key; the value is cached unless keep(value) is False."""
+        while True:
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self.counters['cache_hits'] += 1
+                    return entry[1]
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    waiter = self._inflight[key] = threading.Event()
+                    break
+            waiter.wait()
+        try:
+            value = compute()
+            if keep is None or keep(value):
+                with self._lock:
+                    self._cache[key] = (time.monotonic() + RESULT_CACHE_SECONDS, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+    # ---------------- HTTP ----------------
+
+    def _host_slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return slot
+
+    def _request(self, method, url, stream=False):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._public_hosts:
+            _check_public_url(url)
+            with self._lock:
+                self._public_hosts.add(host)
+        with self._host_slot(host):
+            for attempt in range(2):
+                self.rate_limiter.acquire(host)
+                with self._lock:
+                    self.counters[method.lower()] += 1
+                response = self.session.request(method, url, allow_redirects=False, timeout=REQUEST_TIMEOUT,
+                                                stream=stream)
+                if response.status_code != 429 or attempt:
+                    return response
+                response.close()
+                with self._lock:
+                    self.counters['rate_limited'] += 1
+                retry_after = response.headers.get('Retry-After', '')
+                time.sleep(min(float(retry_after) if retry_after.isdigit() else 5, MAX_RETRY_AFTER_SECONDS))
+
+    @staticmethod
+    def _request_error(e):
+        if isinstance(e, BlockedAddressError):
+            return str(e)
+        if isinstance(e, requests.Timeout):
+            return f'Request timeout ({REQUEST_TIMEOUT}s)'
+        if isinstance(e, requests.exceptions.SSLError):
+            return 'SSL error'
+        if isinstance(e, requests.ConnectionError):
+            return 'Connection error'
+        return str(e)
+
+    def _probe(self, url):
+        """One hop: {status, location, html} or {error}. HEAD first, GET when HEAD is inconclusive."""
+        try:
+            response = self._request('HEAD', url)
+            response.close()
+            if response.status_code in HEAD_UNSUPPORTED_STATUSES or response.status_code >= 400:
+                response = self._request('GET', url, stream=True)
+                response.close()
+            return {
+                'status': response.status_code,
+                'location': response.headers.get('Location') if response.is_redirect else None,
+                'html': 'html' in response.headers.get('Content-Type', 'text/html').lower(),
+            }
+        except Exception as e:
+            return {'error': self._request_error(e), 'transient': not isinstance(e, BlockedAddressError)}
+
+    @staticmethod
+    def _definitive_hop(hop):
+        return not hop.get('transient') and hop.get('status') != 429 and hop.get('status', 0) < 500
+
+    def _scan_page(self, url):
+        """Read the first CONTENT_SNIFF_BYTES of a landing page and look for bad keywords."""
+        try:
+            response = self._request('GET', url, stream=True)
+            try:
+                if response.status_code >= 400:
+                    content = f'HTTP ERROR {response.status_code}'
+                else:
+                    raw = response.raw.read(CONTENT_SNIFF_BYTES, decode_content=True) or b''
+                    content = raw.decode(response.encoding or 'utf-8', errors='replace')
+            finally:
+                response.close()
+        except Exception as e:
+            return {'success': False, 'error': self._request_error(e)}
+        return dict(check_content_for_bad_keywords(content), success=True, http_status=response.status_code)
+
+    # ---------------- checks ----------------
+
+    def resolve(self, url):
+        """Follow the redirect chain of url; {final_url, final_status, hops, redirect_chain, html} or {error}."""
+        chain = []
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            hop = self._cached(('hop', current), lambda u=current: self._probe(u), keep=self._definitive_hop)
+            if 'error' in hop:
+                return {'error': hop['error'], 'redirect_chain': chain}
+            chain.append({'url': current, 'status': hop['status']})
+            if not hop['location']:
+                return {
+                    'final_url': current,
+                    'final_status': hop['status'],
+                    'hops': len(chain),
+                    'redirect_chain': chain,
+                    'html': hop['html'],
+                }
+            current = urljoin(current, hop['location'])
+        return {'error': f'Too many redirects (>{MAX_REDIRECTS})', 'redirect_chain': chain}
+
+    def _check_url(self, check_url):
+        chain = self.resolve(check_url)
+        if 'error' in chain:
+            return {
+                'status': 'error',
+                'final_url': None,
+                'failure_reason': chain['error'],
+                'redirect_count': len(chain['redirect_chain']),
+                'checked_by': 'direct',
+            }
+
+        final_url = chain['final_url']
+        final_status = chain['final_status']
+        result = {
+            'final_url': final_url,
+            'final_status': final_status,
+            'redirect_count': chain['hops'],
+            'checked_by': 'direct',
+        }
+        if final_status >= 400:
+            return dict(result, status='broken', failure_reason=f'HTTP {final_status} error',
+                        redirect_chain=chain['redirect_chain'])
+
+        if final_status == 200 and chain['html']:
+            scan = self._cached(('page', final_url), lambda: self._scan_page(final_url),
+                                keep=lambda s: s['success'] and s['http_status'] < 500 and s['http_status'] != 429)
+            if not scan['success']:
+                return dict(result, status='warning',
+                            failure_reason=f"Scrape failed: {scan['error']} (page content could not be verified)")
+            result['checked_by'] = 'direct_deep'
+            if scan['is_bad']:
+                return dict(result, status='soft_broken',
+                            failure_reason=f"Page contains bad keywords: {', '.join(scan['matched_keywords'])}",
+                            matched_keywords=scan['matched_keywords'],
+                            redirect_chain=chain['redirect_chain'])
+
+        return dict(result, status='healthy', failure_reason=None)
+
+    def check_offer(self, offer):
+        """link_health dict for one offer (same shape as check_single_offer_link)."""
+        target_url = (offer.get('target_url') or '').strip()
+        if not target_url:
+            return _no_url_result('direct')
+        check_url = fill_tracking_macros(target_url)
+        result = self._cached(('template', link_template_key(check_url)), lambda: self._check_url(check_url),
+                              keep=lambda r: r['status'] not in ('error', 'warning') and (r.get('final_status') or 0) < 500
+                              and r.get('final_status') != 429)
+        return dict(result, last_checked=datetime.utcnow())
+
+    def sweep(self, offers, on_result, deadline=None):
+        """Check offers on the worker pool; on_result(offer, result) runs on the calling thread.
+
+        Offers not started by `deadline` (time.monotonic()) are skipped.
+        Returns the number of offers checked.
+        """
+        def check(offer):
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            return self.check_offer(offer)
+
+        checked = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(check, offer): offer for offer in _interleave_by_host(offers)}
+            for future in as_completed(futures):
+                offer = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Error checking offer {offer.get('offer_id')}: {e}")
+                    continue
+                if result is not None:
+                    checked += 1
+                    on_result(offer, result)
+        return checked
+
+
 # ============================================================
 # BACKGROUND SERVICE (runs every 2 hours)
 # ============================================================
@@ -348,116 +676,81 @@ _instance_lock = threading.Lock()
 
 
 class LinkHealthService:
-    """Background service that checks offer link health every 2 hours."""
+    """Background service that sweeps offer link health every 2 hours."""
 
-    BATCH_SIZE = 50  # Links per run
     INTERVAL_SECONDS = 2 * 60 * 60  # 2 hours
     INITIAL_DELAY = 10  # Wait 10 seconds after startup before first run
 
     def __init__(self):
         self.offers_col = db_instance.get_collection('offers')
-        self._thread = None
-        self._stop_event = threading.Event()
 
-    def start(self):
-        """Start the background health check thread."""
-        if not _get_api_key():
-            logger.warning("⚠️ Link health service NOT started — GEEKFLARE_API_KEY not set")
-            return
-
-        if self._thread and self._thread.is_alive():
-            logger.info("Link health service already running")
-            return
-
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run_loop, daemon=True, name='link-health-checker')
-        self._thread.start()
-        logger.info("✅ Link health service started (every 2 hours, batch of 50)")
-        print("✅ Link health service started (every 2 hours, batch of 50)")  # Force print to console
-
-    def stop(self):
-        """Stop the background thread."""
-        self._stop_event.set()
-        if self._thread:
-            self._thread.join(timeout=5)
-
-    def _run_loop(self):
-        """Main loop: sleep → check batch → repeat."""
-        # Initial delay
-        print(f"🔗 Link health: waiting {self.INITIAL_DELAY}s before first check...")
-        self._stop_event.wait(self.INITIAL_DELAY)
-
-        while not self._stop_event.is_set():
-            try:
-                print("🔗 Link health: starting batch check now...")
-                self._check_batch()
-            except Exception as e:
-                logger.error(f"Link health batch error: {e}")
-                print(f"❌ Link health batch error: {e}")
-
-            # Wait for next interval
-            self._stop_event.wait(self.INTERVAL_SECONDS)
+    def run_check(self):
+        """Scheduled every INTERVAL_SECONDS as 'link_health' (first run INITIAL_DELAY after startup)."""
+        logger.info("🔗 Link health: starting sweep now...")
+        self._check_batch()
 
     def _check_batch(self):
-        """Pick the oldest-checked offers and check them. Prioritizes running offers."""
+        """Sweep every offer not checked in the last RECHECK_AFTER_HOURS, never-checked / oldest first."""
         if self.offers_col is None:
             return
 
-        # Find offers that need checking:
-        # Prioritize running offers (serving traffic), then active, then rotating
+        cutoff = datetime.utcnow() - timedelta(hours=RECHECK_AFTER_HOURS)
         query = {
             'status': {'$in': ['running', 'active', 'rotating']},
             'target_url': {'$exists': True, '$ne': ''},
             'deleted': {'$ne': True},
+            '$or': [
+                {'link_health.last_checked': {'$exists': False}},
+                {'link_health.last_checked': {'$lt': cutoff}},
+            ],
         }
 
-        # Sort: never-checked first, then oldest checked
         offers = list(self.offers_col.find(
             query,
-            {'offer_id': 1, 'name': 1, 'target_url': 1, 'network': 1, 'status': 1, 'link_health': 1}
+            {'offer_id': 1, 'target_url': 1}
         ).sort([
             ('link_health.last_checked', 1),  # None/oldest first
-        ]).limit(self.BATCH_SIZE))
+        ]).limit(SWEEP_MAX_OFFERS))
 
         if not offers:
             logger.info("Link health: no offers to check")
             return
 
-        logger.info(f"🔗 Link health: checking {len(offers)} offers...")
-
-        checked = 0
-        broken_count = 0
-
-        for offer in offers:
-            if self._stop_event.is_set():
-                break
-
-            try:
-                result = check_single_offer_link(offer)
-
-                # Save result to offer document
-                self.offers_col.update_one(
-                    {'_id': offer['_id']},
-                    {'$set': {'link_health': result}}
-                )
+        logger.info(f"🔗 Link health: sweeping {len(offers)} offers...")
+        started = time.monotonic()
+        sweeper = LinkSweeper()
+        status_counts = {}
+        pending = []
 
-                checked += 1
-                if result['status'] in ('broken', 'soft_broken'):
-                    broken_count += 1
-                    logger.warning(
-                        f"🔴 Broken link: {offer.get('offer_id')} — {result['failure_reason']}"
-                    )
+        def record(offer, result):
+            status_counts[result['status']] = status_counts.get(result['status'], 0) + 1
+            if result['status'] in ('broken', 'soft_broken'):
+                logger.warning(f"🔴 Broken link: {offer.get('offer_id')} — {result['failure_reason']}")
+            pending.append(UpdateOne({'_id': offer['_id']}, {'$set': {'link_health': result}}))
+            if len(pending) >= WRITE_BATCH_SIZE:
+                self._write_results(pending)
 
-                # Small delay between API calls to avoid rate limits
-                time.sleep(1.5)
-
-            except Exception as e:
-                logger.error(f"Error checking offer {offer.get('offer_id')}: {e}")
+        checked = sweeper.sweep(offers, record, deadline=started + SWEEP_MAX_SECONDS)
+        self._write_results(pending)
 
+        counters = sweeper.counters
         logger.info(
-            f"✅ Link health batch complete: {checked} checked, {broken_count} broken"
+            f"✅ Link health sweep complete: {checked}/{len(offers)} checked in {time.monotonic() - started:.0f}s, "
+            f"{status_counts.get('broken', 0) + status_counts.get('soft_broken', 0)} broken {status_counts} — "
+            f"{counters['head']} HEAD, {counters['get']} GET, {counters['cache_hits']} cache hits, "
+            f"{counters['rate_limited']} rate-limited"
         )
 
+    def _write_results(self, pending):
+        """Bulk-write buffered link_health updates and clear the buffer."""
+        if not pending:
+            return
+        try:
+            self.offers_col.bulk_write(pending, ordered=False)
+        except Exception as e:
+            logger.error(f"Error saving {len(pending)} link health results: {e}")
+        pending.clear()
+
     def check_offer_manually(self, offer_id):
         """Manually trigger a check for a specific offer (called from admin API)."""
         if self.offers_col is None:
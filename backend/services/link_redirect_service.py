@@ -0,0 +1,192 @@
+"""
+Link Redirect Service
+Serves masked-link redirects from memory.
+
+- Resolution cache keyed by (domain, short_code), with short negative caching
+  for unknown codes so scanners hammering random paths don't reach MongoDB.
+  Lookups that fail (database errors) are never cached. Invalidations are
+  published on the cache invalidation bus, so every worker drops the entry.
+- Click analytics are queued in-process and flushed by a background thread in
+  batches: one insert_many of click records plus a single aggregated $inc per
+  masked link, instead of two synchronous writes on every redirect.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+from bson import ObjectId
+from database import db_instance
+from utils.cache import add_eviction_listener, invalidate
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Cache bus namespace; keys are "<domain>\t<short_code>", "<domain>\t" for a whole domain
+MASKED_LINK_NAMESPACE = 'masked_links'
+
+
+class MaskedLinkResolver:
+    """TTL + LRU cache of masked link documents keyed by (domain, short_code)."""
+
+    def __init__(self, ttl=300, negative_ttl=10, max_entries=5000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (domain, code) -> (link or None, expires)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_errors = 0
+        add_eviction_listener(MASKED_LINK_NAMESPACE, self._evict)
+
+    def resolve(self, short_code, domain_name, loader):
+        """Return the masked link for (domain, code), calling loader(code, domain) on a miss.
+
+        loader raises on database errors; those results are not cached so a
+        transient failure doesn't turn a valid link into cached 404s.
+        """
+        key = (domain_name.lower(), short_code)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        try:
+            link = loader(short_code, domain_name)
+        except Exception as e:
+            self.load_errors += 1
+            logger.warning(f"Masked link lookup failed for {domain_name}/{short_code}: {e}")
+            return None
+        expires = now + (self.ttl if link else self.negative_ttl)
+        with self._lock:
+            self._entries[key] = (link, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return link
+
+    def invalidate(self, short_code=None, domain_name=None):
+        """Evict one (domain, code) entry, every entry for a domain, or everything — in every worker."""
+        key = None
+        if domain_name:
+            key = f"{domain_name.lower()}\t{short_code if short_code else ''}"
+        invalidate(MASKED_LINK_NAMESPACE, key)
+
+    def _evict(self, key):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                return
+            domain, _, short_code = key.partition('\t')
+            if short_code:
+                self._entries.pop((domain, short_code), None)
+            else:
+                for entry_key in [k for k in self._entries if k[0] == domain]:
+                    del self._entries[entry_key]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'load_errors': self.load_errors}
+
+
+class ClickAnalyticsBatcher:
+    """Queues masked-link clicks and writes them from a background thread."""
+
+    def __init__(self, flush_interval=2, batch_size=500, max_queue=50000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.flushed = 0
+
+    def enqueue(self, click_data):
+        """Queue a click for tracking. Never blocks the redirect."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(click_data)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Masked link click queue full — dropped {self.dropped} clicks so far")
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run_loop, daemon=True, name="MaskedLinkClickBatcher")
+            self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self.flush(batch)
+                except Exception as e:
+                    logger.error(f"Masked link click flush failed: {e}")
+
+    def flush(self, batch):
+        """Insert the batch's click records at once and apply one aggregated counter update per link."""
+        from models.analytics import Analytics
+        try:
+            Analytics().track_clicks(batch)
+        except Exception as e:
+            logger.warning(f"Failed to track {len(batch)} clicks: {str(e)}")
+
+        per_link = defaultdict(int)
+        last_clicked = {}
+        for click_data in batch:
+            link_id = click_data.get('masked_link_id')
+            if link_id:
+                per_link[link_id] += 1
+                last_clicked[link_id] = click_data.get('clicked_at') or datetime.utcnow()
+
+        links_col = db_instance.get_collection('masked_links')
+        if links_col is not None and per_link:
+            from pymongo import UpdateOne
+            ops = [
+                UpdateOne(
+                    {'_id': ObjectId(link_id)},
+                    {'$inc': {'click_count': count, 'unique_clicks': count},
+                     '$max': {'last_clicked': last_clicked[link_id]}}
+                )
+                for link_id, count in per_link.items()
+            ]
+            links_col.bulk_write(ops, ordered=False)
+
+        self.flushed += len(batch)
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'flushed': self.flushed, 'dropped': self.dropped}
+
+
+_masked_link_resolver = MaskedLinkResolver()
+_click_batcher = ClickAnalyticsBatcher()
+
+
+def get_masked_link_resolver():
+    return _masked_link_resolver
+
+
+def get_click_batcher():
+    return _click_batcher
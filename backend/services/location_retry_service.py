@@ -1,5 +1,4 @@
 import logging
-import threading
 import time
 from database import db_instance
 from services.ipinfo_service import get_ipinfo_service
@@ -7,42 +6,9 @@ from services.ipinfo_service import get_ipinfo_service
 logger = logging.getLogger(__name__)
 
 class LocationRetryService:
-    def __init__(self):
-        self.thread = None
-        self.stop_event = threading.Event()
-        self.running = False
+    CHECK_INTERVAL = 300  # Scheduled every 5 minutes as 'location_retry'
 
-    def start_service(self):
-        if self.running:
-            return
-        
-        self.running = True
-        self.stop_event.clear()
-        self.thread = threading.Thread(target=self._run_loop, daemon=True)
-        self.thread.start()
-        logger.info("Location retry service started")
-
-    def stop_service(self):
-        if not self.running:
-            return
-        
-        self.stop_event.set()
-        self.running = False
-        if self.thread:
-            self.thread.join(timeout=2.0)
-        logger.info("Location retry service stopped")
-
-    def _run_loop(self):
-        while not self.stop_event.is_set():
-            try:
-                self._retry_locations()
-            except Exception as e:
-                logger.error(f"Error in location retry service: {e}")
-            
-            # Wait 5 minutes before next check
-            self.stop_event.wait(300)
-
-    def _retry_locations(self):
+    def retry_locations(self):
         if not db_instance.is_connected():
             return
 
@@ -66,9 +32,6 @@ class LocationRetryService:
         updated_count = 0
 
         for log in unknown_logs:
-            if self.stop_event.is_set():
-                break
-
             ip = log.get('ip_address')
             if not ip:
                 continue
@@ -15,8 +15,7 @@ Identical pattern to VoqallSyncService.
 
 import logging
 import threading
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -27,6 +26,7 @@ class MarketExcelSyncService:
 
     _instance = None
     _lock = threading.Lock()
+    INTERVAL_SECONDS = 23 * 3600          # 23 hours in seconds
 
     def __new__(cls):
         if cls._instance is None:
@@ -40,39 +40,22 @@ class MarketExcelSyncService:
         if self._initialized:
             return
         self._initialized = True
-        self._running = False
-        self._thread = None
-        self._interval = 23 * 3600          # 23 hours in seconds
         self._last_run: Optional[datetime] = None
         self._last_result: Optional[dict] = None
         logger.info('MarketExcelSyncService initialized')
 
     # ── Public API ────────────────────────────────────────────────────────────
 
-    def start(self):
-        if self._running:
-            logger.warning('MarketExcelSyncService is already running')
-            return
-        self._running = True
-        self._thread = threading.Thread(
-            target=self._loop, daemon=True, name='market-excel-sync'
-        )
-        self._thread.start()
-        logger.info('✅ MarketXcel auto-sync service started (every 23 hours)')
-
-    def stop(self):
-        self._running = False
-        logger.info('MarketExcelSyncService stopped')
-
     def get_status(self) -> dict:
+        from services.job_scheduler import get_job_scheduler
+        job = get_job_scheduler().job_status('market_excel_sync')
+        last_run = (job['cluster']['last_finished_at'] if job else None) or self._last_run
+        next_run = job['next_run_at'] if job else None
         return {
-            'running': self._running,
-            'interval_hours': self._interval / 3600,
-            'last_run': self._last_run.isoformat() + 'Z' if self._last_run else None,
-            'next_run': (
-                (self._last_run + timedelta(seconds=self._interval)).isoformat() + 'Z'
-                if self._last_run else 'on next loop'
-            ),
+            'running': job is not None,
+            'interval_hours': self.INTERVAL_SECONDS / 3600,
+            'last_run': last_run.isoformat() + 'Z' if last_run else None,
+            'next_run': next_run.isoformat() + 'Z' if next_run else 'not scheduled',
             'last_result': self._last_result,
         }
 
@@ -81,18 +64,13 @@ class MarketExcelSyncService:
         logger.info('🔄 MarketXcel sync triggered manually')
         return self._sync_all_marketxcel_presets()
 
-    # ── Background loop ───────────────────────────────────────────────────────
+    # ── Scheduled job ─────────────────────────────────────────────────────────
 
-    def _loop(self):
-        logger.info('🔄 MarketXcel sync loop started')
-        while self._running:
-            try:
-                result = self._sync_all_marketxcel_presets()
-                self._last_run = datetime.utcnow()
-                self._last_result = result
-            except Exception as e:
-                logger.error(f'MarketXcel sync loop error: {e}', exc_info=True)
-            time.sleep(self._interval)
+    def run_scheduled(self):
+        """Scheduled every INTERVAL_SECONDS as 'market_excel_sync' (services.background_jobs)."""
+        result = self._sync_all_marketxcel_presets()
+        self._last_run = datetime.utcnow()
+        self._last_result = result
 
     # ── Core sync logic ───────────────────────────────────────────────────────
 
@@ -5,11 +5,32 @@ Handles API calls to different affiliate networks (HasOffers, CJ, ShareASale, et
 
 import requests
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, Any
 from datetime import datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from utils.rate_limit import HostRateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Paged networks (HasOffers, Everflow, MobPlus): once the page count is known the remaining
+# pages are fetched by a small pool. Every request is throttled per API host with a token
+# bucket shared by all threads, so concurrent syncs of the same network stay within its limits.
+PAGE_FETCH_WORKERS = int(os.environ.get('NETWORK_PAGE_FETCH_WORKERS', '4'))
+HOST_REQUESTS_PER_SECOND = float(os.environ.get('NETWORK_API_REQUESTS_PER_SECOND', '4'))
+HOST_REQUEST_BURST = int(os.environ.get('NETWORK_API_REQUEST_BURST', '4'))
+RATE_LIMIT_RETRIES = 3        # retries on HTTP 429, honouring Retry-After
+MAX_RETRY_AFTER_SECONDS = 30
+HASOFFERS_PAGE_SIZE = 1000
+HASOFFERS_MAX_PAGES = 50
+
+
+class NetworkAPIError(Exception):
+    """API-level failure inside a page fetch; the message is returned to the caller as the error."""
+
 
 class NetworkAPIService:
     """Base class for network API integration"""
@@ -21,6 +42,33 @@ class NetworkAPIService:
             'User-Agent': 'MoustacheLeads/1.0',
             'Accept': 'application/json'
         })
+        # Enough pooled connections for the page pools of a few networks syncing at once
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=max(10, PAGE_FETCH_WORKERS * 4))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.rate_limiter = HostRateLimiter(HOST_REQUESTS_PER_SECOND, HOST_REQUEST_BURST)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Session request throttled per host; waits out HTTP 429 (Retry-After) a few times."""
+        host = urlparse(url).netloc
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.rate_limiter.acquire(host)
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                return response
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+            logger.warning(f"⏳ {host} rate limited the request, retrying in {min(delay, MAX_RETRY_AFTER_SECONDS)}s")
+            time.sleep(min(delay, MAX_RETRY_AFTER_SECONDS))
+        return response
+
+    def _fetch_pages(self, fetch_page: Callable[[int], Any], pages: Iterable[int]) -> List[Any]:
+        """Run fetch_page over pages on the page pool; results in page order, first error re-raised."""
+        pages = list(pages)
+        if len(pages) <= 1 or PAGE_FETCH_WORKERS <= 1:
+            return [fetch_page(page) for page in pages]
+        with ThreadPoolExecutor(max_workers=min(PAGE_FETCH_WORKERS, len(pages))) as pool:
+            return list(pool.map(fetch_page, pages))
     
     def test_connection(self, network_id: str, api_key: str, network_type: str = 'hasoffers', fetch_mode: str = 'my_offers') -> Tuple[bool, Optional[int], Optional[str]]:
         """
@@ -62,7 +110,7 @@ class NetworkAPIService:
     
     def fetch_offers(self, network_id: str, api_key: str, network_type: str = 'hasoffers', 
                     filters: Optional[Dict] = None, limit: Optional[int] = None,
-                    fetch_mode: str = 'my_offers') -> Tuple[List[Dict], Optional[str]]:
+                    fetch_mode: str = 'my_offers', fetch_info: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
         """
         Fetch offers from network API
         
@@ -73,17 +121,22 @@ class NetworkAPIService:
             filters: Optional filters (status, countries, etc.)
             limit: Optional limit on number of offers
             fetch_mode: 'my_offers' (approved for your account) or 'all_offers' (all network offers)
+            fetch_info: Optional dict; set to truncated=True (with fetched/available) when a
+                page or offer cap stopped the fetch before the end of the catalog
             
         Returns:
             Tuple of (offers_list, error_message)
         """
+        if fetch_info is None:
+            fetch_info = {}
+        fetch_info['truncated'] = False
         try:
             if network_type == 'hasoffers':
-                return self._fetch_hasoffers_offers(network_id, api_key, filters, limit, fetch_mode)
+                return self._fetch_hasoffers_offers(network_id, api_key, filters, limit, fetch_mode, fetch_info)
             elif network_type == 'everflow':
-                return self._fetch_everflow_offers(network_id, api_key, filters, limit, fetch_mode)
+                return self._fetch_everflow_offers(network_id, api_key, filters, limit, fetch_mode, fetch_info)
             elif network_type == 'mobplus':
-                return self._fetch_mobplus_offers(network_id, api_key, filters, limit)
+                return self._fetch_mobplus_offers(network_id, api_key, filters, limit, fetch_info)
             elif network_type == 'adscendmedia':
                 return self._fetch_adscendmedia_offers(network_id, api_key, filters, limit)
             elif network_type == 'marketxcel':
@@ -166,7 +219,8 @@ class NetworkAPIService:
     def _fetch_hasoffers_offers(self, network_id: str, api_key: str, 
                                filters: Optional[Dict] = None, 
                                limit: Optional[int] = None,
-                               fetch_mode: str = 'my_offers') -> Tuple[List[Dict], Optional[str]]:
+                               fetch_mode: str = 'my_offers',
+                               fetch_info: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
         """Fetch offers from HasOffers API — resilient per-offer parsing"""
         try:
             url = f"https://{network_id}.api.hasoffers.com/Apiv3/json"
@@ -184,7 +238,7 @@ class NetworkAPIService:
                 'Target': target,
                 'Method': method,
                 'api_key': api_key,
-                'limit': limit or 1000,
+                'limit': limit or HASOFFERS_PAGE_SIZE,
                 'contain[]': ['Country', 'Thumbnail']
             }
 
@@ -194,9 +248,9 @@ class NetworkAPIService:
                 if filters.get('countries'):
                     params['filters[countries]'] = filters['countries']
 
-            logger.info(f"Fetching HasOffers offers from {network_id} (limit: {limit or 1000}, mode: {fetch_mode})")
+            logger.info(f"Fetching HasOffers offers from {network_id} (limit: {limit or HASOFFERS_PAGE_SIZE}, mode: {fetch_mode})")
 
-            response = self.session.get(url, params=params, timeout=self.timeout)
+            response = self._request('GET', url, params=params, timeout=self.timeout)
             response.raise_for_status()
 
             data = response.json()
@@ -205,34 +259,36 @@ class NetworkAPIService:
                 error_msg = data.get('response', {}).get('errorMessage', 'Unknown error')
                 return [], f"API Error: {error_msg}"
 
-            # Parse offers from response — HasOffers has nested data structure
-            response_data = data.get('response', {}).get('data', {})
+            offers, skipped, page_count = self._parse_hasoffers_page(data)
 
-            # Check if there's a nested 'data' key (pagination structure)
-            if isinstance(response_data, dict) and 'data' in response_data:
-                offers_data = response_data.get('data', {})
-            else:
-                offers_data = response_data
+            # Without an explicit limit, fetch the remaining pages concurrently
+            if not limit and page_count > 1:
+                last_page = min(page_count, HASOFFERS_MAX_PAGES)
 
-            offers = []
-            skipped = 0
+                def fetch_page(page: int):
+                    page_response = self._request('GET', url, params={**params, 'page': page}, timeout=self.timeout)
+                    page_response.raise_for_status()
+                    page_data = page_response.json()
+                    if page_data.get('response', {}).get('status') != 1:
+                        error_msg = page_data.get('response', {}).get('errorMessage', 'Unknown error')
+                        raise NetworkAPIError(f"API Error: {error_msg}")
+                    return self._parse_hasoffers_page(page_data)
 
-            if isinstance(offers_data, dict):
-                for offer_id, offer_info in offers_data.items():
-                    try:
-                        if isinstance(offer_info, dict) and 'Offer' in offer_info:
-                            offers.append(offer_info)
-                        else:
-                            skipped += 1
-                            logger.debug(f"Skipped offer {offer_id}: missing 'Offer' key or not a dict")
-                    except Exception as e:
-                        skipped += 1
-                        logger.warning(f"Error parsing offer {offer_id}: {e}")
+                for page_offers, page_skipped, _ in self._fetch_pages(fetch_page, range(2, last_page + 1)):
+                    offers.extend(page_offers)
+                    skipped += page_skipped
+                logger.info(f"HasOffers {network_id}: fetched {last_page} of {page_count} pages")
+                if last_page < page_count:
+                    logger.warning(f"⚠️ HasOffers {network_id}: stopped at HASOFFERS_MAX_PAGES ({last_page} of {page_count} pages)")
+            if page_count > 1 and (limit or page_count > HASOFFERS_MAX_PAGES) and fetch_info is not None:
+                fetch_info.update({'truncated': True, 'fetched_pages': 1 if limit else HASOFFERS_MAX_PAGES, 'available_pages': page_count})
 
             logger.info(f"Fetched {len(offers)} offers from {network_id} ({skipped} skipped)")
 
             return offers, None
 
+        except NetworkAPIError as e:
+            return [], str(e)
         except requests.exceptions.Timeout:
             return [], "Connection timeout. Please try again."
         except requests.exceptions.ConnectionError:
@@ -243,6 +299,39 @@ class NetworkAPIService:
             logger.error(f"Error fetching HasOffers offers: {str(e)}", exc_info=True)
             return [], f"Error: {str(e)}"
 
+    def _parse_hasoffers_page(self, data: Dict) -> Tuple[List[Dict], int, int]:
+        """Offers, skipped count and page count from one HasOffers response"""
+        # Parse offers from response — HasOffers has nested data structure
+        response_data = data.get('response', {}).get('data', {})
+        page_count = 1
+
+        # Check if there's a nested 'data' key (pagination structure)
+        if isinstance(response_data, dict) and 'data' in response_data:
+            offers_data = response_data.get('data', {})
+            try:
+                page_count = int(response_data.get('pageCount') or 1)
+            except (TypeError, ValueError):
+                page_count = 1
+        else:
+            offers_data = response_data
+
+        offers = []
+        skipped = 0
+
+        if isinstance(offers_data, dict):
+            for offer_id, offer_info in offers_data.items():
+                try:
+                    if isinstance(offer_info, dict) and 'Offer' in offer_info:
+                        offers.append(offer_info)
+                    else:
+                        skipped += 1
+                        logger.debug(f"Skipped offer {offer_id}: missing 'Offer' key or not a dict")
+                except Exception as e:
+                    skipped += 1
+                    logger.warning(f"Error parsing offer {offer_id}: {e}")
+
+        return offers, skipped, page_count
+
     
     # ==================== Everflow Implementation ====================
     
@@ -326,7 +415,8 @@ class NetworkAPIService:
     def _fetch_everflow_offers(self, api_url: str, api_key: str,
                                filters: Optional[Dict] = None,
                                limit: Optional[int] = None,
-                               fetch_mode: str = 'my_offers') -> Tuple[List[Dict], Optional[str]]:
+                               fetch_mode: str = 'my_offers',
+                               fetch_info: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
         """Fetch offers from Everflow API with pagination.
         Uses offersrunnable (GET) endpoint which returns full offer data with relationship objects
         (payouts, ruleset with countries, category, etc.)
@@ -349,93 +439,78 @@ class NetworkAPIService:
             page_size = min(limit or 100, 100)  # Everflow max page size is typically 100
             max_offers = limit or 5000  # Safety cap
             
-            all_offers = []
-            page = 1
-            use_get = True  # offersrunnable uses GET
-            
-            logger.info(f"Fetching Everflow offers from {base_url} (limit: {max_offers})")
+            # offersrunnable uses GET; page 1 may switch this to the offerstable POST fallback
+            endpoint = {'url': base_url, 'use_get': True}
+            payload = {
+                'filters': {'affiliate_status': '__all'} if fetch_mode == 'all_offers' else {},
+                'search_terms': []
+            }
             
-            while len(all_offers) < max_offers:
+            def fetch_page(page: int):
                 params = {
                     'page': page,
                     'page_size': page_size
                 }
                 
-                if use_get:
-                    response = self.session.get(base_url, headers=headers, params=params, timeout=self.timeout)
+                if endpoint['use_get']:
+                    response = self._request('GET', endpoint['url'], headers=headers, params=params, timeout=self.timeout)
                     
                     if response.status_code == 405:
                         # offersrunnable not available, fallback to offerstable (POST)
-                        use_get = False
-                        fallback_url = base_url.replace('offersrunnable', 'offerstable')
-                        logger.info(f"Falling back to offerstable endpoint: {fallback_url}")
-                        base_url = fallback_url
-                        payload = {
-                            'filters': {'affiliate_status': '__all'} if fetch_mode == 'all_offers' else {},
-                            'search_terms': []
-                        }
-                        params['order_field'] = 'id'
-                        params['order_direction'] = 'desc'
-                        response = self.session.post(base_url, headers=headers, params=params, json=payload, timeout=self.timeout)
-                else:
+                        endpoint['use_get'] = False
+                        endpoint['url'] = endpoint['url'].replace('offersrunnable', 'offerstable')
+                        logger.info(f"Falling back to offerstable endpoint: {endpoint['url']}")
+                
+                if not endpoint['use_get']:
                     # POST to offerstable (fallback)
-                    payload = {
-                        'filters': {'affiliate_status': '__all'} if fetch_mode == 'all_offers' else {},
-                        'search_terms': []
-                    }
                     params['order_field'] = 'id'
                     params['order_direction'] = 'desc'
-                    response = self.session.post(base_url, headers=headers, params=params, json=payload, timeout=self.timeout)
+                    response = self._request('POST', endpoint['url'], headers=headers, params=params, json=payload, timeout=self.timeout)
                 
                 if response.status_code == 401:
-                    return [], "Invalid API key"
+                    raise NetworkAPIError("Invalid API key")
                 
                 response.raise_for_status()
-                data = response.json()
-                
-                # Parse response - handle different Everflow response formats
-                offers_batch = []
-                has_more = False
-                
-                if isinstance(data, dict):
-                    if 'offers' in data:
-                        offers_batch = data['offers']
-                    elif 'data' in data:
-                        offers_batch = data['data']
-                    else:
-                        # The dict itself might contain offer-like data
-                        offers_batch = [data] if 'offer_id' in data or 'network_offer_id' in data else []
-                    
-                    # Check pagination
-                    paging = data.get('paging', {})
-                    total_count = paging.get('total_count', 0)
-                    if total_count > 0:
-                        has_more = (page * page_size) < total_count
-                    else:
-                        # No paging info — check if we got a full page (means more might exist)
-                        has_more = len(offers_batch) == page_size
-                elif isinstance(data, list):
-                    # offersrunnable returns a direct array
-                    offers_batch = data
-                    has_more = len(data) == page_size  # If full page, might be more
-                
-                if not offers_batch:
-                    break
-                
-                all_offers.extend(offers_batch)
-                
-                if not has_more or len(all_offers) >= max_offers:
-                    break
-                
-                page += 1
+                return self._parse_everflow_page(response.json(), page, page_size)
+            
+            logger.info(f"Fetching Everflow offers from {base_url} (limit: {max_offers})")
+            
+            offers_batch, total_count, has_more = fetch_page(1)
+            all_offers = list(offers_batch)
+            page = 1
+            
+            if offers_batch and has_more and len(all_offers) < max_offers:
+                if total_count > 0:
+                    # Page count is known: fetch the rest concurrently
+                    page = (min(total_count, max_offers) + page_size - 1) // page_size
+                    for offers_batch, _, _ in self._fetch_pages(fetch_page, range(2, page + 1)):
+                        all_offers.extend(offers_batch)
+                else:
+                    # No paging info — walk pages until a short or empty one
+                    while has_more and len(all_offers) < max_offers:
+                        page += 1
+                        offers_batch, _, has_more = fetch_page(page)
+                        if not offers_batch:
+                            break
+                        all_offers.extend(offers_batch)
+            
+            # More offers than the cap: known from the total, or the page walk stopped with pages left
+            truncated = total_count > max_offers if total_count > 0 else (has_more and len(all_offers) >= max_offers)
             
             # Trim to limit
             if limit and len(all_offers) > limit:
                 all_offers = all_offers[:limit]
+                truncated = True
             
+            if truncated:
+                logger.warning(f"⚠️ Everflow {base_url}: stopped at {max_offers} offers (total: {total_count or 'unknown'})")
+                if fetch_info is not None:
+                    fetch_info.update({'truncated': True, 'fetched': len(all_offers), 'available': total_count or None})
             logger.info(f"Fetched {len(all_offers)} offers from Everflow ({page} pages)")
             return all_offers, None
             
+        except NetworkAPIError as e:
+            return [], str(e)
         except requests.exceptions.Timeout:
             return [], "Connection timeout. Please try again."
         except requests.exceptions.ConnectionError:
@@ -446,6 +521,37 @@ class NetworkAPIService:
             logger.error(f"Error fetching Everflow offers: {str(e)}", exc_info=True)
             return [], f"Error: {str(e)}"
     
+    def _parse_everflow_page(self, data: Any, page: int, page_size: int) -> Tuple[List[Dict], int, bool]:
+        """Offers, total_count (0 when unknown) and has_more from one Everflow response"""
+        offers_batch = []
+        total_count = 0
+        has_more = False
+        
+        # Parse response - handle different Everflow response formats
+        if isinstance(data, dict):
+            if 'offers' in data:
+                offers_batch = data['offers']
+            elif 'data' in data:
+                offers_batch = data['data']
+            else:
+                # The dict itself might contain offer-like data
+                offers_batch = [data] if 'offer_id' in data or 'network_offer_id' in data else []
+            
+            # Check pagination
+            paging = data.get('paging', {})
+            total_count = paging.get('total_count', 0)
+            if total_count > 0:
+                has_more = (page * page_size) < total_count
+            else:
+                # No paging info — check if we got a full page (means more might exist)
+                has_more = len(offers_batch) == page_size
+        elif isinstance(data, list):
+            # offersrunnable returns a direct array
+            offers_batch = data
+            has_more = len(data) == page_size  # If full page, might be more
+        
+        return offers_batch, total_count, has_more
+    
     # ==================== MobPlus Implementation ====================
     
     def _test_mobplus_connection(self, api_url: str, api_key: str) -> Tuple[bool, Optional[int], Optional[str]]:
@@ -522,7 +628,8 @@ class NetworkAPIService:
     
     def _fetch_mobplus_offers(self, api_url: str, api_key: str,
                               filters: Optional[Dict] = None,
-                              limit: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+                              limit: Optional[int] = None,
+                              fetch_info: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
         """Fetch offers from MobPlus API using POST with form-encoded body.
         Paginates through all pages with pageSize=5000 to get all offers."""
         try:
@@ -548,18 +655,15 @@ class NetworkAPIService:
             
             logger.info(f"Fetching MobPlus offers from {base_url} (pageSize: {page_size}, max: {max_offers})")
             
-            all_offers = []
-            page = 1
-            
-            while page <= max_pages and len(all_offers) < max_offers:
+            def fetch_page(page: int) -> List[Dict]:
                 form_data = {
                     'q': json.dumps({"page": page, "pageSize": page_size})
                 }
                 
-                response = self.session.post(base_url, headers=headers, data=form_data, timeout=90)
+                response = self._request('POST', base_url, headers=headers, data=form_data, timeout=90)
                 
                 if response.status_code == 401:
-                    return [], "Invalid API key"
+                    raise NetworkAPIError("Invalid API key")
                 
                 response.raise_for_status()
                 data = response.json()
@@ -573,38 +677,57 @@ class NetworkAPIService:
                         offers_batch = data['data'] if isinstance(data['data'], list) else []
                     elif 'offers' in data:
                         offers_batch = data['offers'] if isinstance(data['offers'], list) else []
-                    else:
-                        offers_batch = []
                 
                 logger.info(f"MobPlus page {page}: got {len(offers_batch)} offers")
-                
-                if not offers_batch:
-                    break
-                
-                # Filter by status if requested
-                if filters and filters.get('status'):
-                    status_filter = filters['status'].lower()
-                    offers_batch = [o for o in offers_batch if (o.get('status', '') or '').lower() == status_filter]
-                
-                all_offers.extend(offers_batch)
-                
-                # If we got fewer than page_size, we've reached the end
-                if len(offers_batch) < page_size:
-                    break
-                
-                # If we already have enough
-                if limit and len(all_offers) >= limit:
-                    break
-                
-                page += 1
+                return offers_batch
+            
+            all_offers = []
+            page = 1
+            done = False
+            window_size = 1 if limit else max(1, PAGE_FETCH_WORKERS)
+            
+            while not done and page <= max_pages and len(all_offers) < max_offers:
+                # MobPlus has no total count, so fetch a window of pages at once and stop at the
+                # first short page (costs at most PAGE_FETCH_WORKERS - 1 extra requests per sync)
+                window = range(page, min(page + window_size, max_pages + 1))
+                for page, offers_batch in zip(window, self._fetch_pages(fetch_page, window)):
+                    if not offers_batch:
+                        done = True
+                        break
+                    
+                    # If we got fewer than page_size, we've reached the end
+                    last_page = len(offers_batch) < page_size
+                    
+                    # Filter by status if requested
+                    if filters and filters.get('status'):
+                        status_filter = filters['status'].lower()
+                        offers_batch = [o for o in offers_batch if (o.get('status', '') or '').lower() == status_filter]
+                    
+                    all_offers.extend(offers_batch)
+                    
+                    # If we already have enough
+                    if last_page or (limit and len(all_offers) >= limit):
+                        done = True
+                        break
+                else:
+                    page += 1
+            
+            # Stopped by max_pages / max_offers / limit rather than by a short page
+            truncated = not done or (limit and len(all_offers) > limit)
             
             # Trim to limit
             if limit and len(all_offers) > limit:
                 all_offers = all_offers[:limit]
             
+            if truncated:
+                logger.warning(f"⚠️ MobPlus {base_url}: stopped after {page} page(s) / {len(all_offers)} offers, more may exist")
+                if fetch_info is not None:
+                    fetch_info.update({'truncated': True, 'fetched': len(all_offers)})
             logger.info(f"Fetched {len(all_offers)} total offers from MobPlus ({page} page(s))")
             return all_offers, None
             
+        except NetworkAPIError as e:
+            return [], str(e)
         except requests.exceptions.Timeout:
             return [], "Connection timeout. MobPlus API may be slow — try again."
         except requests.exceptions.ConnectionError:
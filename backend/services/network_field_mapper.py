@@ -4,6 +4,8 @@ Maps fields from different affiliate networks to database format
 """
 
 import logging
+import re
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from utils.html_cleaner import clean_html_description, format_offer_name
@@ -11,6 +13,142 @@ from services.tracking_link_generator import process_offer_tracking_link
 
 logger = logging.getLogger(__name__)
 
+# Full ISO 3166-1 alpha-2 country codes
+ALL_ISO_CODES = frozenset({
+    'AD','AE','AF','AG','AI','AL','AM','AO','AQ','AR','AS','AT','AU','AW','AX','AZ',
+    'BA','BB','BD','BE','BF','BG','BH','BI','BJ','BL','BM','BN','BO','BQ','BR','BS','BT','BV','BW','BY','BZ',
+    'CA','CC','CD','CF','CG','CH','CI','CK','CL','CM','CN','CO','CR','CU','CV','CW','CX','CY','CZ',
+    'DE','DJ','DK','DM','DO','DZ',
+    'EC','EE','EG','EH','ER','ES','ET',
+    'FI','FJ','FK','FM','FO','FR',
+    'GA','GB','GD','GE','GF','GG','GH','GI','GL','GM','GN','GP','GQ','GR','GS','GT','GU','GW','GY',
+    'HK','HM','HN','HR','HT','HU',
+    'ID','IE','IL','IM','IN','IO','IQ','IR','IS','IT',
+    'JE','JM','JO','JP',
+    'KE','KG','KH','KI','KM','KN','KP','KR','KW','KY','KZ',
+    'LA','LB','LC','LI','LK','LR','LS','LT','LU','LV','LY',
+    'MA','MC','MD','ME','MF','MG','MH','MK','ML','MM','MN','MO','MP','MQ','MR','MS','MT','MU','MV','MW','MX','MY','MZ',
+    'NA','NC','NE','NF','NG','NI','NL','NO','NP','NR','NU','NZ',
+    'OM',
+    'PA','PE','PF','PG','PH','PK','PL','PM','PN','PR','PS','PT','PW','PY',
+    'QA',
+    'RE','RO','RS','RU','RW',
+    'SA','SB','SC','SD','SE','SG','SH','SI','SJ','SK','SL','SM','SN','SO','SR','SS','ST','SV','SX','SY','SZ',
+    'TC','TD','TF','TG','TH','TJ','TK','TL','TM','TN','TO','TR','TT','TV','TW','TZ',
+    'UA','UG','UM','US','UY','UZ',
+    'VA','VC','VE','VG','VI','VN','VU',
+    'WF','WS',
+    'XK',
+    'YE','YT',
+    'ZA','ZM','ZW',
+    'UK','WW'
+})
+
+# STRICT false positives — codes that commonly appear in offer names but are NOT countries
+STRICT_FALSE_POSITIVES = frozenset({
+    'OK', 'CC', 'AI', 'BE', 'AT', 'BY', 'IN', 'IS', 'IT', 'TO', 'ME',
+    'NO', 'OR', 'SO', 'DO', 'AN', 'ON', 'UP',
+    # Additional false positives identified from bad migration
+    'AM', 'PM',  # Time formats (8AM-8PM)
+    'TV',        # Product names (Sling TV, Fubo TV)
+    'IO',        # Domain extensions (.io)
+    'CO',        # Domain extensions (.co), "Contractors", "Company"
+    'MY',        # "My" in English names
+    'RS',        # "RevShare", "RS" suffix
+    'MS',        # "Microsoft", "MS" abbreviation (except in MobPlus pattern)
+})
+
+# Extra false positives only for Pattern 5 (last-token) — more ambiguous context
+LAST_TOKEN_FALSE_POSITIVES = STRICT_FALSE_POSITIVES | {'US'}  # US at end is usually part of the name
+
+# Codes never taken from the MobPlus "Name-CC-Carrier" pattern
+MOBPLUS_FALSE_POSITIVES = frozenset({'MS', 'OK', 'CC', 'AI'})
+
+# Geo/device patterns for offer names and descriptions, compiled once
+WORLDWIDE_RE = re.compile(r'\bWW\b|\bWORLDWIDE\b|\bGLOBAL\b|\bALL\s*GEOS?\b|\bALL\s*COUNTRIES\b')
+MOBPLUS_CODE_RE = re.compile(r'-([A-Z]{2})-')
+UNDERSCORE_CODE_RE = re.compile(r'_([A-Z]{2})(?=_|$)')
+BRACKET_CODES_RE = re.compile(r'\[([A-Z]{2}(?:\s*,\s*[A-Z]{2})*)\]')
+TWO_LETTER_RE = re.compile(r'[A-Z]{2}')
+DASH_SPLIT_RE = re.compile(r'\s*[-–—]\s*')
+IOS_RE = re.compile(r'ios|iphone|ipad|apple')
+DESKTOP_RE = re.compile(r'desktop|windows|mac os|macos')
+
+# Text extraction runs on every name and description of every imported offer;
+# networks repeat the same names/descriptions across pages and re-syncs
+TEXT_MATCH_CACHE_SIZE = 8192
+
+
+def _country_code(code: str) -> str:
+    return 'GB' if code == 'UK' else code
+
+
+@lru_cache(maxsize=TEXT_MATCH_CACHE_SIZE)
+def _countries_in_text(text: str) -> tuple:
+    """Memoized core of NetworkFieldMapper._extract_countries_from_text."""
+    countries = set()
+    name_upper = text.upper()
+    
+    # Check for worldwide indicators first
+    if WORLDWIDE_RE.search(name_upper):
+        countries.add('WW')
+    
+    # Pattern 1: MobPlus style "Name-CC-Carrier"
+    # e.g., "Game Zone-KW-Ooredoo-MS-2Click", "VIP Games-SA-Mobily-MS-2Click"
+    for code in MOBPLUS_CODE_RE.findall(name_upper):
+        if code in ALL_ISO_CODES and code not in MOBPLUS_FALSE_POSITIVES:
+            countries.add(_country_code(code))
+    
+    # Pattern 2: Underscore-separated codes "Brand_CC" or "Brand_CC_CC_CC"
+    # e.g., "Airpaz_WW", "JobScan_US_CA_AU_UK_DE", "Crocs_FI"
+    for code in UNDERSCORE_CODE_RE.findall(name_upper):
+        if code in ALL_ISO_CODES and code not in STRICT_FALSE_POSITIVES:
+            countries.add(_country_code(code))
+    
+    # Pattern 3: Bracketed codes "[CC]" or "[CC, CC]"
+    # e.g., "Binance [CH]", "Spinarium [AR]", "Offer [US, CA]"
+    for match in BRACKET_CODES_RE.findall(name_upper):
+        for code in TWO_LETTER_RE.findall(match):
+            if code in ALL_ISO_CODES and code not in STRICT_FALSE_POSITIVES:
+                countries.add(_country_code(code))
+    
+    # Pattern 4: Dash-separated with country code as a standalone segment
+    # e.g., "Block Blast! - Android - TH - CPI", "Doodle - CH"
+    for segment in DASH_SPLIT_RE.split(text):
+        segment_stripped = segment.strip().upper()
+        if len(segment_stripped) == 2 and segment_stripped.isalpha():
+            if segment_stripped in ALL_ISO_CODES and segment_stripped not in STRICT_FALSE_POSITIVES:
+                countries.add(_country_code(segment_stripped))
+    
+    # Pattern 5: Last token is a 2-letter country code (space-separated)
+    # e.g., "Crocs FI", "KingOpinion_Survey CO"
+    # But NOT "Sling TV", "My App", "RevShare RS"
+    tokens = text.strip().split()
+    if len(tokens) >= 2:
+        last_token = tokens[-1].upper()
+        if len(last_token) == 2 and last_token.isalpha():
+            if last_token in ALL_ISO_CODES and last_token not in LAST_TOKEN_FALSE_POSITIVES:
+                countries.add(_country_code(last_token))
+    
+    return tuple(countries)
+
+
+@lru_cache(maxsize=TEXT_MATCH_CACHE_SIZE)
+def _device_in_name(name_lower: str) -> str:
+    """Memoized core of NetworkFieldMapper._detect_device_from_name."""
+    has_ios = IOS_RE.search(name_lower) is not None
+    has_android = 'android' in name_lower
+    
+    if has_ios and has_android:
+        return 'mobile'
+    elif has_ios:
+        return 'ios'
+    elif has_android:
+        return 'android'
+    elif DESKTOP_RE.search(name_lower):
+        return 'desktop'
+    else:
+        return 'all'
 
 class NetworkFieldMapper:
     """Maps network API fields to database fields"""
@@ -99,6 +237,9 @@ class NetworkFieldMapper:
         'Ukraine': 'UA',
     }
     
+    # Code values above, for O(1) membership checks in _parse_geo_string
+    COUNTRY_CODES = frozenset(COUNTRY_NAME_TO_CODE.values())
+    
     # Payout type mapping
     PAYOUT_TYPE_MAPPING = {
         'cpa': 'CPA',
@@ -497,7 +638,7 @@ class NetworkFieldMapper:
             for part in parts:
                 if len(part) == 2 and part.isalpha():
                     countries.append(part)
-                elif part in self.COUNTRY_NAME_TO_CODE.values():
+                elif part in self.COUNTRY_CODES:
                     countries.append(part)
         elif isinstance(geo_value, list):
             for item in geo_value:
@@ -534,112 +675,7 @@ class NetworkFieldMapper:
         """
         if not text:
             return []
-        
-        countries = []
-        
-        import re
-        
-        # Check for worldwide indicators first
-        text_upper = text.upper()
-        worldwide_patterns = [r'\bWW\b', r'\bWORLDWIDE\b', r'\bGLOBAL\b', r'\bALL\s*GEOS?\b', r'\bALL\s*COUNTRIES\b']
-        for pattern in worldwide_patterns:
-            if re.search(pattern, text_upper):
-                countries.append('WW')
-                break
-        
-        # Full ISO 3166-1 alpha-2 country codes
-        ALL_ISO_CODES = {
-            'AD','AE','AF','AG','AI','AL','AM','AO','AQ','AR','AS','AT','AU','AW','AX','AZ',
-            'BA','BB','BD','BE','BF','BG','BH','BI','BJ','BL','BM','BN','BO','BQ','BR','BS','BT','BV','BW','BY','BZ',
-            'CA','CC','CD','CF','CG','CH','CI','CK','CL','CM','CN','CO','CR','CU','CV','CW','CX','CY','CZ',
-            'DE','DJ','DK','DM','DO','DZ',
-            'EC','EE','EG','EH','ER','ES','ET',
-            'FI','FJ','FK','FM','FO','FR',
-            'GA','GB','GD','GE','GF','GG','GH','GI','GL','GM','GN','GP','GQ','GR','GS','GT','GU','GW','GY',
-            'HK','HM','HN','HR','HT','HU',
-            'ID','IE','IL','IM','IN','IO','IQ','IR','IS','IT',
-            'JE','JM','JO','JP',
-            'KE','KG','KH','KI','KM','KN','KP','KR','KW','KY','KZ',
-            'LA','LB','LC','LI','LK','LR','LS','LT','LU','LV','LY',
-            'MA','MC','MD','ME','MF','MG','MH','MK','ML','MM','MN','MO','MP','MQ','MR','MS','MT','MU','MV','MW','MX','MY','MZ',
-            'NA','NC','NE','NF','NG','NI','NL','NO','NP','NR','NU','NZ',
-            'OM',
-            'PA','PE','PF','PG','PH','PK','PL','PM','PN','PR','PS','PT','PW','PY',
-            'QA',
-            'RE','RO','RS','RU','RW',
-            'SA','SB','SC','SD','SE','SG','SH','SI','SJ','SK','SL','SM','SN','SO','SR','SS','ST','SV','SX','SY','SZ',
-            'TC','TD','TF','TG','TH','TJ','TK','TL','TM','TN','TO','TR','TT','TV','TW','TZ',
-            'UA','UG','UM','US','UY','UZ',
-            'VA','VC','VE','VG','VI','VN','VU',
-            'WF','WS',
-            'XK',
-            'YE','YT',
-            'ZA','ZM','ZW',
-            'UK','WW'
-        }
-        
-        # STRICT false positives — codes that commonly appear in offer names but are NOT countries
-        STRICT_FALSE_POSITIVES = {
-            'OK', 'CC', 'AI', 'BE', 'AT', 'BY', 'IN', 'IS', 'IT', 'TO', 'ME',
-            'NO', 'OR', 'SO', 'DO', 'AN', 'ON', 'UP',
-            # Additional false positives identified from bad migration
-            'AM', 'PM',  # Time formats (8AM-8PM)
-            'TV',        # Product names (Sling TV, Fubo TV)
-            'IO',        # Domain extensions (.io)
-            'CO',        # Domain extensions (.co), "Contractors", "Company"
-            'MY',        # "My" in English names
-            'RS',        # "RevShare", "RS" suffix
-            'MS',        # "Microsoft", "MS" abbreviation (except in MobPlus pattern)
-        }
-        
-        # Extra false positives only for Pattern 5 (last-token) — more ambiguous context
-        LAST_TOKEN_FALSE_POSITIVES = STRICT_FALSE_POSITIVES | {'US'}  # US at end is usually part of the name
-        
-        name_upper = text.upper()
-        
-        # Pattern 1: MobPlus style "Name-CC-Carrier"
-        # e.g., "Game Zone-KW-Ooredoo-MS-2Click", "VIP Games-SA-Mobily-MS-2Click"
-        mobplus_match = re.findall(r'-([A-Z]{2})-', name_upper)
-        for code in mobplus_match:
-            if code in ALL_ISO_CODES and code not in {'MS', 'OK', 'CC', 'AI'}:
-                countries.append('GB' if code == 'UK' else code)
-        
-        # Pattern 2: Underscore-separated codes "Brand_CC" or "Brand_CC_CC_CC"
-        # e.g., "Airpaz_WW", "JobScan_US_CA_AU_UK_DE", "Crocs_FI"
-        underscore_match = re.findall(r'_([A-Z]{2})(?=_|$)', name_upper)
-        for code in underscore_match:
-            if code in ALL_ISO_CODES and code not in STRICT_FALSE_POSITIVES:
-                countries.append('GB' if code == 'UK' else code)
-        
-        # Pattern 3: Bracketed codes "[CC]" or "[CC, CC]"
-        # e.g., "Binance [CH]", "Spinarium [AR]", "Offer [US, CA]"
-        bracket_match = re.findall(r'\[([A-Z]{2}(?:\s*,\s*[A-Z]{2})*)\]', name_upper)
-        for match in bracket_match:
-            codes = re.findall(r'[A-Z]{2}', match)
-            for code in codes:
-                if code in ALL_ISO_CODES and code not in STRICT_FALSE_POSITIVES:
-                    countries.append('GB' if code == 'UK' else code)
-        
-        # Pattern 4: Dash-separated with country code as a standalone segment
-        # e.g., "Block Blast! - Android - TH - CPI", "Doodle - CH"
-        dash_segments = re.split(r'\s*[-–—]\s*', text)
-        for segment in dash_segments:
-            segment_stripped = segment.strip().upper()
-            if len(segment_stripped) == 2 and segment_stripped.isalpha():
-                if segment_stripped in ALL_ISO_CODES and segment_stripped not in STRICT_FALSE_POSITIVES:
-                    countries.append('GB' if segment_stripped == 'UK' else segment_stripped)
-        
-        # Pattern 5: Last token is a 2-letter country code (space-separated)
-        # e.g., "Crocs FI", "KingOpinion_Survey CO"
-        # But NOT "Sling TV", "My App", "RevShare RS"
-        tokens = text.strip().split()
-        if len(tokens) >= 2:
-            last_token = tokens[-1].upper()
-            if len(last_token) == 2 and last_token.isalpha():
-                if last_token in ALL_ISO_CODES and last_token not in LAST_TOKEN_FALSE_POSITIVES:
-                    countries.append('GB' if last_token == 'UK' else last_token)
-        
-        return list(set(countries))
+        return list(_countries_in_text(text))
     
     def _extract_incentive_type(self, offer_name: str) -> str:
         """
@@ -668,23 +704,7 @@ class NetworkFieldMapper:
         """
         if not offer_name:
             return 'all'
-        
-        name_lower = offer_name.lower()
-        
-        has_ios = any(kw in name_lower for kw in ['ios', 'iphone', 'ipad', 'apple'])
-        has_android = 'android' in name_lower
-        has_desktop = any(kw in name_lower for kw in ['desktop', 'windows', 'mac os', 'macos'])
-        
-        if has_ios and has_android:
-            return 'mobile'
-        elif has_ios:
-            return 'ios'
-        elif has_android:
-            return 'android'
-        elif has_desktop:
-            return 'desktop'
-        else:
-            return 'all'
+        return _device_in_name(offer_name.lower())
     
     def _map_everflow_offer(self, offer_data: Dict, network_id: str = None) -> Dict[str, Any]:
         """Map Everflow offer to database format — based on real Everflow API response structure"""
@@ -1253,53 +1273,53 @@ class NetworkFieldMapper:
             logger.error(f"Error mapping MobPlus offer: {str(e)}", exc_info=True)
             return {}
     
+    # MobPlus category to vertical mapping
+    MOBPLUS_CATEGORY_VERTICAL_MAP = {
+        'adult': 'DATING',
+        'dating': 'DATING',
+        'finance': 'FINANCE',
+        'loan': 'LOAN',
+        'insurance': 'INSURANCE',
+        'health': 'HEALTH',
+        'beauty': 'HEALTH',
+        'nutra': 'HEALTH',
+        'gaming': 'GAMES_INSTALL',
+        'games': 'GAMES_INSTALL',
+        'casino': 'GAMBLING',
+        'gambling': 'GAMBLING',
+        'betting': 'GAMBLING',
+        'sweepstakes': 'SWEEPSTAKES',
+        'sweeps': 'SWEEPSTAKES',
+        'survey': 'SURVEY',
+        'surveys': 'SURVEY',
+        'education': 'EDUCATION',
+        'crypto': 'CRYPTO',
+        'cryptocurrency': 'CRYPTO',
+        'shopping': 'SHOPPING',
+        'ecommerce': 'SHOPPING',
+        'travel': 'TRAVEL',
+        'entertainment': 'ENTERTAINMENT',
+        'streaming': 'ENTERTAINMENT',
+        'install': 'INSTALLS',
+        'installs': 'INSTALLS',
+        'app': 'INSTALLS',
+        'mobile': 'INSTALLS',
+        'pin submit': 'INSTALLS',
+        'pin': 'INSTALLS',
+        'direct': 'INSTALLS',
+        'free trial': 'FREE_TRIAL',
+        'trial': 'FREE_TRIAL',
+        'subscription': 'FREE_TRIAL',
+    }
+    
     def _map_mobplus_category_to_vertical(self, categories: list, name: str, description: str) -> str:
         """Map MobPlus categories to our vertical system"""
-        # MobPlus category to vertical mapping
-        category_vertical_map = {
-            'adult': 'DATING',
-            'dating': 'DATING',
-            'finance': 'FINANCE',
-            'loan': 'LOAN',
-            'insurance': 'INSURANCE',
-            'health': 'HEALTH',
-            'beauty': 'HEALTH',
-            'nutra': 'HEALTH',
-            'gaming': 'GAMES_INSTALL',
-            'games': 'GAMES_INSTALL',
-            'casino': 'GAMBLING',
-            'gambling': 'GAMBLING',
-            'betting': 'GAMBLING',
-            'sweepstakes': 'SWEEPSTAKES',
-            'sweeps': 'SWEEPSTAKES',
-            'survey': 'SURVEY',
-            'surveys': 'SURVEY',
-            'education': 'EDUCATION',
-            'crypto': 'CRYPTO',
-            'cryptocurrency': 'CRYPTO',
-            'shopping': 'SHOPPING',
-            'ecommerce': 'SHOPPING',
-            'travel': 'TRAVEL',
-            'entertainment': 'ENTERTAINMENT',
-            'streaming': 'ENTERTAINMENT',
-            'install': 'INSTALLS',
-            'installs': 'INSTALLS',
-            'app': 'INSTALLS',
-            'mobile': 'INSTALLS',
-            'pin submit': 'INSTALLS',
-            'pin': 'INSTALLS',
-            'direct': 'INSTALLS',
-            'free trial': 'FREE_TRIAL',
-            'trial': 'FREE_TRIAL',
-            'subscription': 'FREE_TRIAL',
-        }
-        
         # Try to match from categories array
         for cat in categories:
             if isinstance(cat, str):
                 cat_lower = cat.lower().strip()
-                if cat_lower in category_vertical_map:
-                    return category_vertical_map[cat_lower]
+                if cat_lower in self.MOBPLUS_CATEGORY_VERTICAL_MAP:
+                    return self.MOBPLUS_CATEGORY_VERTICAL_MAP[cat_lower]
         
         # Fallback: detect from name/description
         from models.offer import detect_vertical_from_text
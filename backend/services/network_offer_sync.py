@@ -0,0 +1,705 @@
+"""
+Network Offer Sync
+Incremental sync of affiliate network API offers into the offers collection.
+
+A sync of one network:
+1. Fetches the catalog through services.network_api_service (paged networks
+   fetch their pages concurrently, throttled per API host).
+2. Hashes every raw API offer (sync_source_hash); offers whose raw payload is
+   unchanged since the last sync are not even mapped. The rest are mapped,
+   validated and hashed on their mapped content (sync_hash). Fields the admin
+   manages after import (status, offerwall visibility, approval settings) and
+   generated dates are left out of that hash.
+3. Loads the network's offers with one projected query and diffs by partner
+   offer id: new offers go through the bulk offer processor (duplicate checks
+   unchanged), offers whose hash changed get one UpdateOne each, unchanged
+   offers are not written at all, and active offers missing from the API are
+   expired in the same bulk_write when auto_expire_stale is set (never after
+   a fetch a page/offer cap cut short: missing offers may just be unfetched).
+4. Records a checkpoint per network in network_sync_checkpoints (status,
+   counts, timings, last success) so a multi-network run that failed part way
+   can be resumed by skipping networks synced recently.
+
+Offers imported before sync_hash existed have no hash, so the first sync
+rewrites them once; later syncs only touch what changed. Changes to Upward
+Partner param config reach an offer the next time its API payload changes
+(a regular /offers/api-import with update_existing re-applies them).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from database import db_instance
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_COLLECTION = 'network_sync_checkpoints'
+NETWORK_SYNC_WORKERS = int(os.environ.get('NETWORK_SYNC_WORKERS', '3'))
+SYNC_WRITE_BATCH = 1000
+
+ACTIVE_STATUSES = ('active', 'running', 'paused', 'pending')
+# Networks with their own auto-sync services (enrichment, stale handling), skipped by sync_presets
+SELF_SYNCED_NETWORK_TYPES = ('voqall', 'marketxcel')
+
+# Set by the import options / admin after import, or regenerated on every mapping
+# (default expiration dates are "now + N days"); excluded from the hash and never synced
+ADMIN_MANAGED_FIELDS = (
+    'status', 'is_active', 'show_in_offerwall', 'show_in_offerwall_source',
+    'show_in_offerwall_added_at', 'show_in_offerwall_added_by', 'approval_settings',
+    'approval_type', 'auto_approve_delay', 'require_approval', 'affiliates',
+)
+VOLATILE_FIELDS = ('created_at', 'updated_at', 'expiration_date', '_row_number', '_preserve_name')
+# Stored on the offer but not part of its content hash
+HASH_FIELDS = ('sync_hash', 'sync_source_hash')
+# Never overwritten on existing offers (same as BulkOfferProcessor._update_existing_offer)
+PROTECTED_FIELDS = ('_id', 'offer_id', 'created_at', 'created_by')
+
+OFFER_PROJECTION = {
+    'offer_id': 1, 'campaign_id': 1, 'network_offer_id': 1, 'name': 1, 'payout': 1,
+    'countries': 1, 'vertical': 1, 'status': 1, 'image_url': 1, 'sync_hash': 1, 'sync_source_hash': 1,
+}
+
+
+# ==================== Partner offer ids ====================
+
+def extract_partner_id(offer_data: Dict, network_type: str) -> str:
+    """The partner's offer id from a raw API offer (field names differ per network)."""
+    if network_type == 'adscendmedia':
+        oid = offer_data.get('offer_id', '')
+    elif network_type == 'everflow':
+        oid = offer_data.get('network_offer_id', '') or offer_data.get('offer_id', '') or offer_data.get('id', '')
+    elif network_type == 'mobplus':
+        oid = offer_data.get('id', '') or offer_data.get('offer_id', '')
+    elif network_type == 'marketxcel':
+        oid = offer_data.get('project_id', '') or offer_data.get('survey_id', '') or offer_data.get('id', '')
+    elif network_type == 'lootably':
+        oid = offer_data.get('offerID', '') or offer_data.get('offer_id', '') or offer_data.get('id', '')
+    elif network_type == 'voqall':
+        oid = offer_data.get('SurveyId', '') or offer_data.get('survey_id', '') or offer_data.get('id', '')
+    elif isinstance(offer_data, dict) and 'Offer' in offer_data:
+        # hasoffers — offers are wrapped: {"Offer": {"id": "2816", ...}}
+        oid = offer_data['Offer'].get('id', '') or offer_data['Offer'].get('offer_id', '')
+    else:
+        oid = offer_data.get('id', '') or offer_data.get('offer_id', '')
+    return str(oid).strip()
+
+
+def normalize_partner_id(partner_id: Any) -> str:
+    """Comparison key for partner ids: stripped, numeric ids without leading zeros ("02816" == "2816")."""
+    partner_id = str(partner_id or '').strip()
+    if partner_id.isdigit():
+        return str(int(partner_id))
+    return partner_id
+
+
+def stored_partner_id(db_offer: Dict) -> str:
+    """Partner id of a stored offer: campaign_id, else network_offer_id; '' for internal ML- offers."""
+    partner_id = str(db_offer.get('campaign_id', '')).strip()
+    if partner_id.startswith('ML-') or not partner_id:
+        partner_id = str(db_offer.get('network_offer_id', '')).strip()
+        if not partner_id or partner_id.startswith('ML-'):
+            return ''
+    return partner_id
+
+
+def build_network_pattern(network_name: str, network_id: str, network_type: str) -> str:
+    """Case-insensitive regex matching the network values stored for offers of this network."""
+    values = {network_name, network_id}
+    for value in (network_name, network_id):
+        values.add(value.replace(' ', ''))
+    if network_type == 'adscendmedia':
+        values.add('adscendmedia')
+    elif network_type == 'marketxcel':
+        values.add('marketxcel')
+    elif network_type == 'lootably':
+        values.add('lootably')
+    return '|'.join(f'^{re.escape(v)}$' for v in sorted(values) if v)
+
+
+# ==================== Mapping and hashing ====================
+
+def offer_source_hash(offer_data: Dict, network_name: str) -> str:
+    """Hash of a raw API offer as returned by the network (plus the name it is imported under)."""
+    encoded = json.dumps(offer_data, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(f"{network_name}\n{encoded}".encode('utf-8')).hexdigest()
+
+
+def offer_content_hash(mapped_offer: Dict) -> str:
+    """Stable hash of the synced content of a mapped offer."""
+    content = {
+        k: v for k, v in mapped_offer.items()
+        if k not in ADMIN_MANAGED_FIELDS and k not in VOLATILE_FIELDS and k not in HASH_FIELDS
+    }
+    encoded = json.dumps(content, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def build_import_options(options: Dict) -> Dict:
+    """Normalize the api-import options (status, offerwall visibility, approval workflow)."""
+    approval_type = options.get('approval_type', 'auto_approve')
+    auto_approve_delay = options.get('auto_approve_delay', 0)
+    require_approval = options.get('require_approval', False)
+
+    if approval_type in ['direct', 'instant', 'immediate', 'auto']:
+        approval_type = 'auto_approve'
+    elif approval_type in ['time', 'timed', 'delay', 'delayed']:
+        approval_type = 'time_based'
+    elif approval_type in ['admin', 'approval']:
+        approval_type = 'manual'
+
+    if approval_type in ['time_based', 'manual']:
+        require_approval = True
+
+    return {
+        'default_status': options.get('default_status', 'active'),
+        'show_in_offerwall': options.get('show_in_offerwall', True),
+        'approval_type': approval_type,
+        'require_approval': require_approval,
+        'approval_settings': {
+            'type': approval_type,
+            'require_approval': require_approval,
+            'auto_approve_delay': int(auto_approve_delay) if auto_approve_delay else 0,
+            'approval_message': options.get('approval_message', ''),
+            'max_inactive_days': options.get('max_inactive_days', 0)
+        },
+    }
+
+
+def apply_import_options(mapped_offer: Dict, import_options: Dict, created_by: str) -> Dict:
+    """Set status, offerwall visibility and approval fields on an offer about to be created."""
+    show_in_offerwall = import_options['show_in_offerwall']
+    approval_type = import_options['approval_type']
+    require_approval = import_options['require_approval']
+
+    mapped_offer['status'] = import_options['default_status']
+    mapped_offer['show_in_offerwall'] = show_in_offerwall
+
+    # Track source of offerwall visibility
+    if show_in_offerwall:
+        mapped_offer['show_in_offerwall_source'] = 'api_import'
+        mapped_offer['show_in_offerwall_added_at'] = datetime.utcnow()
+        mapped_offer['show_in_offerwall_added_by'] = created_by
+
+    mapped_offer['approval_settings'] = import_options['approval_settings']
+    mapped_offer['approval_type'] = approval_type
+    mapped_offer['auto_approve_delay'] = import_options['approval_settings']['auto_approve_delay']
+    mapped_offer['require_approval'] = require_approval
+
+    if require_approval or approval_type in ['time_based', 'manual']:
+        mapped_offer['affiliates'] = 'request'
+    return mapped_offer
+
+
+def map_network_offers(offers: List[Dict], network_type: str, network_id: str, network_name: str,
+                       row_numbers: Optional[List[int]] = None) -> Tuple[List[Dict], List[Dict], int]:
+    """
+    Map and validate raw API offers, inject Upward Partner params and hash each offer.
+
+    Returns (mapped_offers, mapping_errors, params_injected); mapped offers carry
+    _row_number (row_numbers[i] when mapping a subset), sync_source_hash and sync_hash.
+    """
+    from services.network_field_mapper import network_field_mapper
+    from services.tracking_link_generator import apply_network_offer_params
+
+    mapped_offers = []
+    mapping_errors = []
+    params_injected = 0
+    partner_cache = {}
+
+    for idx, offer_data in enumerate(offers):
+        row = row_numbers[idx] if row_numbers else idx + 1
+        try:
+            mapped_offer = network_field_mapper.map_to_db_format(offer_data, network_type, network_id)
+
+            if not mapped_offer:
+                mapping_errors.append({'row': row, 'error': 'Failed to map offer data'})
+                continue
+
+            # Override network field with admin-specified network_name
+            mapped_offer['network'] = network_name
+
+            is_valid, validation_errors = network_field_mapper.validate_mapped_offer(mapped_offer)
+            if not is_valid:
+                mapping_errors.append({
+                    'row': row,
+                    'name': mapped_offer.get('name', 'Unknown'),
+                    'error': ', '.join(validation_errors)
+                })
+                continue
+
+            # Apply Upward Partner network params (one partner lookup per host for the whole batch)
+            original_url = mapped_offer.get('target_url', '')
+            mapped_offer.update(apply_network_offer_params(mapped_offer, partner_cache))
+            if mapped_offer.get('target_url', '') != original_url:
+                params_injected += 1
+
+            mapped_offer['sync_source_hash'] = offer_source_hash(offer_data, network_name)
+            mapped_offer['sync_hash'] = offer_content_hash(mapped_offer)
+            mapped_offer['_row_number'] = row
+            mapped_offers.append(mapped_offer)
+
+        except Exception as e:
+            mapping_errors.append({
+                'row': row,
+                'error': str(e)
+            })
+
+    return mapped_offers, mapping_errors, params_injected
+
+
+def _sync_update_fields(mapped_offer: Dict, now: datetime) -> Dict:
+    """$set document for an existing offer whose content changed."""
+    skip = set(PROTECTED_FIELDS) | set(ADMIN_MANAGED_FIELDS) | set(VOLATILE_FIELDS)
+    if mapped_offer.get('_preserve_name'):
+        skip.add('name')
+    update = {k: v for k, v in mapped_offer.items() if k not in skip and v is not None}
+    # Don't overwrite images with empty values (network APIs often drop them on re-fetch)
+    for field in ('image_url', 'thumbnail_url'):
+        if not update.get(field):
+            update.pop(field, None)
+    update['updated_at'] = now
+    update['last_synced_at'] = now
+    return update
+
+
+# ==================== Sync engine ====================
+
+class NetworkOfferSync:
+    """Diff-based network offer sync with per-network checkpoints."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_progress = set()
+        self._last_run: Optional[datetime] = None
+        self._last_result: Optional[Dict] = None
+
+    # ------------------------------------------------------------------
+    # Diff
+    # ------------------------------------------------------------------
+
+    def plan(self, offers: List[Dict], network_type: str, network_id: str, network_name: str,
+             mapped: Optional[Tuple[List[Dict], List[Dict], int]] = None) -> Dict[str, Any]:
+        """
+        Diff fetched offers against the network's offers in the DB. Read-only.
+
+        Returns a dict with mapped_offers, mapping_errors, params_injected, fetched_ids,
+        new (mapped offers), changed ((db_offer, mapped) pairs), unchanged (count),
+        rehashed ((db_offer, sync_source_hash) pairs: content unchanged, raw payload not),
+        matched / stale (active DB offers present in / missing from the API) and
+        reactivatable ((expired db_offer, mapped or None) pairs back in the API) and expired_count.
+
+        Unless mapped offers are passed in, raw offers whose sync_source_hash matches
+        every stored offer with the same partner id count as unchanged without mapping.
+        """
+        db_offers = []
+        offers_collection = db_instance.get_collection('offers')
+        if offers_collection is not None:
+            db_offers = list(offers_collection.find(
+                {
+                    'network': {'$regex': build_network_pattern(network_name, network_id, network_type), '$options': 'i'},
+                    '$or': [{'deleted': {'$exists': False}}, {'deleted': False}],
+                },
+                OFFER_PROJECTION
+            ))
+
+        # Raw API ids too, so offers that failed mapping are not reported as stale
+        raw_keys = [normalize_partner_id(extract_partner_id(o, network_type)) for o in offers]
+        fetched_ids = set(raw_keys)
+        fetched_ids.discard('')
+
+        source_unchanged = set()
+        if mapped is None:
+            stored_source_hashes = {}
+            for db_offer in db_offers:
+                key = normalize_partner_id(stored_partner_id(db_offer))
+                if key:
+                    stored_source_hashes.setdefault(key, set()).add(db_offer.get('sync_source_hash'))
+            to_map = []
+            row_numbers = []
+            for idx, (key, offer_data) in enumerate(zip(raw_keys, offers)):
+                hashes = stored_source_hashes.get(key)
+                if hashes and len(hashes) == 1 and offer_source_hash(offer_data, network_name) in hashes:
+                    source_unchanged.add(key)
+                    continue
+                to_map.append(offer_data)
+                row_numbers.append(idx + 1)
+            mapped = map_network_offers(to_map, network_type, network_id, network_name, row_numbers)
+        mapped_offers, mapping_errors, params_injected = mapped
+
+        by_key = {}
+        keyless = []
+        for mapped_offer in mapped_offers:
+            key = normalize_partner_id(mapped_offer.get('campaign_id'))
+            if key:
+                by_key[key] = mapped_offer
+            else:
+                keyless.append(mapped_offer)
+
+        fetched_ids.update(by_key)
+
+        seen = set()
+        changed = []
+        rehashed = []
+        unchanged = 0
+        matched = []
+        stale = []
+        reactivatable = []
+        expired_count = 0
+        for db_offer in db_offers:
+            key = normalize_partner_id(stored_partner_id(db_offer))
+            if not key:
+                continue  # internal ML- offers without a partner id
+            status = db_offer.get('status', '')
+            in_api = key in fetched_ids
+            mapped_offer = by_key.get(key)
+
+            if status == 'expired':
+                # 'inactive' offers still take part in rotation, so only expired ones are reactivatable
+                expired_count += 1
+                if in_api:
+                    reactivatable.append((db_offer, mapped_offer))
+            elif status in ACTIVE_STATUSES:
+                (matched if in_api else stale).append(db_offer)
+
+            if key in source_unchanged:
+                seen.add(key)
+                unchanged += 1
+            elif mapped_offer is not None:
+                seen.add(key)
+                if db_offer.get('sync_hash') == mapped_offer['sync_hash']:
+                    unchanged += 1
+                    # Store the new raw hash so the next sync can skip mapping this offer
+                    if mapped_offer.get('sync_source_hash') and db_offer.get('sync_source_hash') != mapped_offer['sync_source_hash']:
+                        rehashed.append((db_offer, mapped_offer['sync_source_hash']))
+                else:
+                    changed.append((db_offer, mapped_offer))
+
+        new = [m for key, m in by_key.items() if key not in seen] + keyless
+
+        return {
+            'mapped_offers': mapped_offers,
+            'mapping_errors': mapping_errors,
+            'params_injected': params_injected,
+            'fetched_ids': fetched_ids,
+            'db_offer_count': len(db_offers),
+            'expired_count': expired_count,
+            'new': new,
+            'changed': changed,
+            'rehashed': rehashed,
+            'unchanged': unchanged,
+            'matched': matched,
+            'stale': stale,
+            'reactivatable': reactivatable,
+        }
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def apply(self, plan: Dict[str, Any], options: Dict, created_by: str) -> Dict[str, Any]:
+        """Create new offers, update changed ones and (optionally) expire stale ones."""
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+        from utils.bulk_operations import get_bulk_offer_processor
+        from services.cache_invalidation_bus import invalidate_offer_caches
+
+        result = {'created': 0, 'created_ids': [], 'updated': 0, 'deactivated': 0,
+                  'skipped': 0, 'skipped_duplicates': [], 'errors': []}
+
+        offers_collection = db_instance.get_collection('offers')
+        if offers_collection is None:
+            result['errors'].append({'error': 'Database not connected'})
+            return result
+
+        # 1. New offers: same duplicate handling as a regular API import
+        if plan['new']:
+            import_options = build_import_options(options)
+            for mapped_offer in plan['new']:
+                apply_import_options(mapped_offer, import_options, created_by)
+            skip_duplicates = options.get('skip_duplicates', True)
+            update_existing = options.get('update_existing', False)
+            duplicate_strategy = 'skip' if skip_duplicates else ('update' if update_existing else 'create_new')
+            created = get_bulk_offer_processor(db_instance).bulk_create_offers_optimized(
+                plan['new'], created_by, duplicate_strategy
+            )
+            result['created'] = created['stats']['created']
+            result['created_ids'] = created['created_ids']
+            result['skipped'] = created['stats']['skipped']
+            result['skipped_duplicates'] = created['skipped_duplicates']
+            result['errors'].extend(created['errors'])
+
+        # 2. Changed offers + stale deactivations in one unordered bulk_write
+        now = datetime.utcnow()
+        operations = []
+        touched_ids = []
+        for db_offer, mapped_offer in plan['changed']:
+            operations.append(UpdateOne({'_id': db_offer['_id']}, {'$set': _sync_update_fields(mapped_offer, now)}))
+            touched_ids.append(db_offer.get('offer_id'))
+        n_updates = len(operations)
+        # Hash-only writes: no updated_at bump and no cache invalidation, the offer content is unchanged
+        for db_offer, source_hash in plan.get('rehashed', []):
+            operations.append(UpdateOne({'_id': db_offer['_id']}, {'$set': {'sync_source_hash': source_hash}}))
+        n_rehashed = len(operations) - n_updates
+
+        if options.get('auto_expire_stale', False):
+            for db_offer in plan['stale']:
+                operations.append(UpdateOne(
+                    {'_id': db_offer['_id'], 'status': {'$ne': 'expired'}},
+                    {'$set': {
+                        'status': 'expired',
+                        'is_active': False,
+                        'auto_expired_at': now,
+                        'auto_expired_reason': 'not_found_in_api',
+                        'updated_at': now
+                    }}
+                ))
+                touched_ids.append(db_offer.get('offer_id'))
+
+        failed = set()
+        for start in range(0, len(operations), SYNC_WRITE_BATCH):
+            batch = operations[start:start + SYNC_WRITE_BATCH]
+            try:
+                offers_collection.bulk_write(batch, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get('writeErrors', []):
+                    failed.add(start + write_error['index'])
+                    result['errors'].append({'error': f"Sync write failed: {write_error.get('errmsg', '')}"})
+        result['updated'] = n_updates - sum(1 for i in failed if i < n_updates)
+        n_writes = n_updates + n_rehashed
+        result['deactivated'] = (len(operations) - n_writes) - sum(1 for i in failed if i >= n_writes)
+
+        if touched_ids:
+            invalidate_offer_caches(touched_ids)
+        return result
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+
+    def _checkpoint(self, checkpoint_id: str, fields: Dict):
+        try:
+            col = db_instance.get_collection(CHECKPOINT_COLLECTION)
+            if col is not None:
+                col.update_one({'_id': checkpoint_id}, {'$set': fields}, upsert=True)
+        except Exception as e:
+            logger.warning(f"Failed to write sync checkpoint {checkpoint_id}: {e}")
+
+    def get_checkpoints(self) -> List[Dict]:
+        col = db_instance.get_collection(CHECKPOINT_COLLECTION)
+        if col is None:
+            return []
+        checkpoints = []
+        for doc in col.find({}).sort('network_name', 1):
+            doc['id'] = doc.pop('_id')
+            for field in ('started_at', 'finished_at', 'last_success_at'):
+                if isinstance(doc.get(field), datetime):
+                    doc[field] = doc[field].isoformat() + 'Z'
+            checkpoints.append(doc)
+        return checkpoints
+
+    def _recently_synced(self, since: datetime) -> set:
+        col = db_instance.get_collection(CHECKPOINT_COLLECTION)
+        if col is None:
+            return set()
+        return {doc['_id'] for doc in col.find({'last_success_at': {'$gte': since}}, {'_id': 1})}
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync_network(self, network_id: str, api_key: str, network_type: str, network_name: str,
+                     fetch_mode: str = 'my_offers', filters: Optional[Dict] = None,
+                     options: Optional[Dict] = None, created_by: str = 'network_sync',
+                     run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Fetch, diff and write one network. Returns the summary also stored as its checkpoint."""
+        from services.network_api_service import network_api_service
+
+        options = options or {}
+        network_name = (network_name or network_id).strip().lower()
+        checkpoint_id = f"{network_type}:{network_name}"
+
+        with self._lock:
+            if checkpoint_id in self._in_progress:
+                return {'network': network_name, 'error': 'Sync already running for this network'}
+            self._in_progress.add(checkpoint_id)
+
+        started = time.time()
+        self._checkpoint(checkpoint_id, {
+            'network_type': network_type,
+            'network_id': network_id,
+            'network_name': network_name,
+            'status': 'running',
+            'run_id': run_id,
+            'started_at': datetime.utcnow(),
+            'error': None,
+        })
+        try:
+            fetch_info = {}
+            offers, error = network_api_service.fetch_offers(
+                network_id, api_key, network_type, filters or {}, None, fetch_mode, fetch_info=fetch_info
+            )
+            fetch_seconds = round(time.time() - started, 2)
+            if error:
+                raise RuntimeError(error)
+            logger.info(f"🔄 Network sync {network_name}: fetched {len(offers)} offers in {fetch_seconds}s")
+
+            plan = self.plan(offers, network_type, network_id, network_name)
+            if not offers:
+                # An empty response is far more likely an API hiccup than a network with no offers
+                plan['stale'] = []
+            elif fetch_info.get('truncated'):
+                # Offers past the fetch cap were never seen; they are not stale
+                logger.warning(f"⚠️ Network sync {network_name}: fetch truncated ({fetch_info}), skipping stale expiry")
+                plan['stale'] = []
+            written = self.apply(plan, options, created_by)
+
+            summary = {
+                'network': network_name,
+                'network_type': network_type,
+                'fetched': len(offers),
+                'fetch_truncated': bool(fetch_info.get('truncated')),
+                'fetch_seconds': fetch_seconds,
+                'created': written['created'],
+                'updated': written['updated'],
+                'unchanged': plan['unchanged'],
+                'skipped': written['skipped'],
+                'stale': len(plan['stale']),
+                'deactivated': written['deactivated'],
+                'reactivatable': len(plan['reactivatable']),
+                'errors': len(plan['mapping_errors']) + len(written['errors']),
+                'duration_seconds': round(time.time() - started, 2),
+            }
+            self._checkpoint(checkpoint_id, {
+                **summary,
+                'status': 'completed',
+                'finished_at': datetime.utcnow(),
+                'last_success_at': datetime.utcnow(),
+            })
+            logger.info(
+                f"✅ Network sync {network_name}: {summary['created']} created, {summary['updated']} updated, "
+                f"{summary['unchanged']} unchanged, {summary['deactivated']} expired in {summary['duration_seconds']}s"
+            )
+            summary.update({
+                'created_ids': written['created_ids'],
+                'skipped_duplicates': written['skipped_duplicates'],
+                'error_details': (plan['mapping_errors'] + written['errors'])[:10],
+            })
+            return summary
+        except Exception as e:
+            logger.error(f"Network sync {network_name} failed: {e}", exc_info=True)
+            self._checkpoint(checkpoint_id, {
+                'status': 'failed',
+                'error': str(e),
+                'finished_at': datetime.utcnow(),
+                'duration_seconds': round(time.time() - started, 2),
+            })
+            return {'network': network_name, 'network_type': network_type, 'error': str(e)}
+        finally:
+            with self._lock:
+                self._in_progress.discard(checkpoint_id)
+
+    def sync_presets(self, preset_ids: Optional[Iterable[str]] = None, options: Optional[Dict] = None,
+                     created_by: str = 'network_sync', skip_synced_within: int = 0) -> Dict[str, Any]:
+        """
+        Sync every saved network preset (or the given ones), several networks at a time.
+
+        skip_synced_within (seconds) resumes an interrupted run: networks whose checkpoint
+        shows a successful sync within that window are skipped.
+        """
+        from bson import ObjectId
+
+        presets_col = db_instance.get_collection('network_presets')
+        if presets_col is None:
+            return {'error': 'DB not available', 'synced': 0}
+
+        query = {'network_type': {'$nin': list(SELF_SYNCED_NETWORK_TYPES)}}
+        if preset_ids:
+            query['_id'] = {'$in': [ObjectId(p) for p in preset_ids if ObjectId.is_valid(p)]}
+        presets = [p for p in presets_col.find(query) if p.get('api_key')]
+
+        skipped = []
+        if skip_synced_within:
+            recent = self._recently_synced(datetime.utcnow() - timedelta(seconds=skip_synced_within))
+            skipped = [p for p in presets if self._preset_checkpoint_id(p) in recent]
+            presets = [p for p in presets if self._preset_checkpoint_id(p) not in recent]
+
+        run_id = uuid.uuid4().hex[:12]
+        started = time.time()
+        logger.info(f"🔄 Network sync run {run_id}: {len(presets)} preset(s), {len(skipped)} skipped as recently synced")
+
+        def sync_preset(preset):
+            return self.sync_network(
+                preset.get('network_id', ''), preset.get('api_key', ''),
+                preset.get('network_type', 'hasoffers'), self._preset_network_name(preset),
+                preset.get('fetch_mode', 'my_offers'), {}, options, created_by, run_id
+            )
+
+        results = []
+        if presets:
+            with ThreadPoolExecutor(max_workers=max(1, min(NETWORK_SYNC_WORKERS, len(presets)))) as pool:
+                results = list(pool.map(sync_preset, presets))
+
+        for result in results:
+            for field in ('created_ids', 'skipped_duplicates', 'error_details'):
+                result.pop(field, None)
+
+        summary = {
+            'run_id': run_id,
+            'run_at': datetime.utcnow().isoformat() + 'Z',
+            'presets_synced': len(presets),
+            'presets_skipped': [self._preset_network_name(p) for p in skipped],
+            'total_fetched': sum(r.get('fetched', 0) for r in results),
+            'total_created': sum(r.get('created', 0) for r in results),
+            'total_updated': sum(r.get('updated', 0) for r in results),
+            'total_unchanged': sum(r.get('unchanged', 0) for r in results),
+            'total_deactivated': sum(r.get('deactivated', 0) for r in results),
+            'failed': [r['network'] for r in results if r.get('error')],
+            'duration_seconds': round(time.time() - started, 2),
+            'preset_details': results,
+        }
+        self._last_run = datetime.utcnow()
+        self._last_result = summary
+        logger.info(
+            f"✅ Network sync run {run_id} complete: fetched={summary['total_fetched']}, "
+            f"created={summary['total_created']}, updated={summary['total_updated']}, "
+            f"unchanged={summary['total_unchanged']}, expired={summary['total_deactivated']}, "
+            f"failed={len(summary['failed'])} in {summary['duration_seconds']}s"
+        )
+        return summary
+
+    @staticmethod
+    def _preset_network_name(preset: Dict) -> str:
+        return (preset.get('display_name') or preset.get('network_id') or '').strip().lower()
+
+    def _preset_checkpoint_id(self, preset: Dict) -> str:
+        return f"{preset.get('network_type', 'hasoffers')}:{self._preset_network_name(preset)}"
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            in_progress = sorted(self._in_progress)
+        return {
+            'in_progress': in_progress,
+            'last_run': self._last_run.isoformat() + 'Z' if self._last_run else None,
+            'last_result': self._last_result,
+            'checkpoints': self.get_checkpoints(),
+        }
+
+
+_sync = None
+_sync_lock = threading.Lock()
+
+
+def get_network_offer_sync() -> NetworkOfferSync:
+    global _sync
+    with _sync_lock:
+        if _sync is None:
+            _sync = NetworkOfferSync()
+        return _sync
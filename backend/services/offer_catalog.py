@@ -0,0 +1,614 @@
+"""
+Offer Catalog
+Columnar in-memory copy of the offers collection for the admin offers grid
+(routes.admin_offers: GET /offers and /offers/networks).
+
+Every offer is one row. Sort keys live in typed arrays (created_at, payout,
+pin expiry), and every categorical value - status, network, country,
+category token and the boolean filter flags - has a bitset: a Python int with
+bit `row` set for each row holding that value. A filter is an AND/OR of
+bitsets, a facet count is (filter & value).bit_count() and a page is read off
+the set bits, so filtering, counting and paging never touch a document. NumPy
+is not a dependency of the backend; int bitsets give the same vectorised
+boolean masks using only the standard library.
+
+Free-text search runs str.find over one joined, lowercased text blob and maps
+hit offsets back to rows. Rows are kept in created_at order, so the grid's
+default sort (newest first) is the bit order read from the top; only the
+offers on the requested page are then fetched from Mongo.
+
+Sync follows services.offer_search_index: offer writes publish on the
+'offer_catalog' cache namespace (see invalidate_offer_caches) and the listener
+queues the offer ids; before answering a query the catalog re-reads queued
+offers and runs a delta query on updated_at when its last sync is older than
+OFFER_CATALOG_FRESHNESS_SECONDS. A periodic full rebuild restores row order
+and drops tombstones.
+"""
+
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from database import db_instance
+from utils.cache import add_eviction_listener
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'offer_catalog'
+FRESHNESS_SECONDS = float(os.environ.get('OFFER_CATALOG_FRESHNESS_SECONDS', '2'))
+REBUILD_SECONDS = float(os.environ.get('OFFER_CATALOG_REBUILD_SECONDS', '1800'))
+
+PROJECTION = {
+    'offer_id': 1, 'name': 1, 'campaign_id': 1, 'categories': 1, 'category': 1,
+    'vertical': 1, 'network': 1, 'status': 1, 'payout': 1, 'created_at': 1,
+    'countries': 1, 'allowed_countries': 1, 'deleted': 1, 'offer_source': 1,
+    'is_pinned': 1, 'pinEndTime': 1, 'pin_expires_at': 1, 'level_payouts.enabled': 1,
+    'show_in_offerwall': 1, 'is_active': 1, 'offerwall_exclusive': 1,
+    'refined_via_admin': 1, 'refinement_count': 1, 'bulk_refined': 1,
+}
+
+# Boolean filters, one bitset each (same conditions as the Mongo queries in admin_offers.get_offers)
+FLAGS = (
+    'listed',               # deleted missing or False
+    'advertiser',           # offer_source == 'advertiser'
+    'pinned',               # is_pinned True (expiry checked at query time)
+    'has_levels',           # level_payouts.enabled True
+    'in_offerwall',         # shown in offerwall, active and in a visible status
+    'offerwall_exclusive',
+    'ai_refined',           # refined_via_admin True
+    'not_refined',          # neither refined_via_admin nor refinement_count set
+    'bulk_refined',
+)
+_FLAG_BIT = {name: 1 << i for i, name in enumerate(FLAGS)}
+
+DIMENSIONS = ('status', 'network', 'country', 'token')
+SORT_FIELDS = ('created_at', 'payout')
+OFFERWALL_STATUSES = ('active', 'running', 'rotating')
+
+_EPOCH = datetime(1970, 1, 1)
+_NO_DATE = float('-inf')
+_NON_DATE = -1e15  # created_at stored as something other than a date: sorts after every real date
+_FIELD_SEP = '\x1f'
+_ROW_SEP = '\x1e'
+_REGEX_CHARS = set('.^$*+?{}[]\\|()')
+
+_POPCOUNT = bytes(bin(i).count('1') for i in range(256))
+_BITS_DESC = tuple(tuple(b for b in range(7, -1, -1) if i >> b & 1) for i in range(256))
+
+
+def _bitset(rows: Iterable[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for row in rows:
+        buf[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _rows_desc(mask: int, skip: int = 0, limit: Optional[int] = None) -> List[int]:
+    """Set bits of mask from the highest row down, after skipping `skip` of them."""
+    rows: List[int] = []
+    if mask <= 0 or limit == 0:
+        return rows
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for i in range(len(data) - 1, -1, -1):
+        byte = data[i]
+        if not byte:
+            continue
+        if skip >= _POPCOUNT[byte]:
+            skip -= _POPCOUNT[byte]
+            continue
+        base = i << 3
+        for bit in _BITS_DESC[byte]:
+            if skip:
+                skip -= 1
+                continue
+            rows.append(base + bit)
+            if limit is not None and len(rows) >= limit:
+                return rows
+    return rows
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - _EPOCH).total_seconds()
+    return _NO_DATE if value is None else _NON_DATE
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _strings(*values) -> List[str]:
+    return [v for value in values for v in _as_list(value) if isinstance(v, str)]
+
+
+def _payout(value) -> float:
+    try:
+        return float(value or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class _Dictionary:
+    """Value <-> integer code for one categorical column."""
+    __slots__ = ('codes', 'values')
+
+    def __init__(self):
+        self.codes: Dict = {}
+        self.values: List = []
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class OfferSelection:
+    """
+    Result of OfferCatalog.select(): the matching rows split into pinned and
+    organic, plus facet counts. Holds references to the column objects it was
+    computed from, so paging stays consistent if the catalog is rebuilt meanwhile.
+    """
+
+    def __init__(self, organic: int, pinned_ids: List[str], offer_ids: List[str], order: Optional[List[int]],
+                 facets: Dict[str, Dict]):
+        self._organic = organic
+        self._offer_ids = offer_ids
+        self._order = order
+        self.pinned_ids = pinned_ids
+        self.organic_total = organic.bit_count()
+        self.total = self.organic_total + len(pinned_ids)
+        self.facets = facets
+
+    def organic_ids(self, skip: int, limit: int) -> List[str]:
+        """offer_ids of organic (non-pinned) matches skip..skip+limit in sort order."""
+        if self._order is None:
+            rows = _rows_desc(self._organic, skip, limit)
+        else:
+            rows = self._order[skip:skip + limit]
+        return [self._offer_ids[row] for row in rows]
+
+
+class OfferCatalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._reset()
+        self._ready = False
+        self._dirty: Set[str] = set()
+        self._dirty_all = False
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._last_build = 0.0
+        self._last_sync = 0.0
+        self._last_delta: Optional[datetime] = None
+        self._counts = {'queries': 0, 'updates': 0, 'rebuilds': 0}
+
+    def _reset(self):
+        self._rows: Dict[str, int] = {}            # offer_id -> row
+        self._offer_ids: List[str] = []            # row -> offer_id
+        self._created = array('d')
+        self._payout = array('d')
+        self._pin_end = array('d')                 # 0.0 when the pin never expires
+        self._flags = array('l')
+        self._codes: Dict[str, list] = {dim: [] for dim in DIMENSIONS}   # row -> tuple of codes
+        self._text: List[str] = []
+        self._dicts: Dict[str, _Dictionary] = {dim: _Dictionary() for dim in DIMENSIONS}
+        self._bits: Dict[str, Dict[int, int]] = {dim: {} for dim in DIMENSIONS}
+        self._flag_bits: Dict[str, int] = {name: 0 for name in FLAGS}
+        self._alive = 0
+        self._ordered = True
+        self._blob: Optional[str] = None
+        self._blob_starts: List[int] = []
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    # ------------------------------------------------------------------
+    # Row encoding
+    # ------------------------------------------------------------------
+
+    def _encode(self, doc: Dict):
+        status = doc.get('status')
+        if not isinstance(status, (str, int, float, bool, type(None))):
+            status = str(status)
+        network = doc.get('network')
+        codes = {
+            'status': (self._dicts['status'].code(status),),
+            'network': (self._dicts['network'].code(network),) if isinstance(network, str) else (),
+            'country': tuple({self._dicts['country'].code(c.upper())
+                              for c in _strings(doc.get('countries'), doc.get('allowed_countries'))}),
+            'token': tuple({self._dicts['token'].code(t.upper())
+                            for t in _strings(doc.get('categories'), doc.get('vertical'), doc.get('category'))}),
+        }
+
+        flags = 0
+        if 'deleted' not in doc or doc['deleted'] is False:
+            flags |= _FLAG_BIT['listed']
+        if doc.get('offer_source') == 'advertiser':
+            flags |= _FLAG_BIT['advertiser']
+        if doc.get('is_pinned') is True:
+            flags |= _FLAG_BIT['pinned']
+        if isinstance(doc.get('level_payouts'), dict) and doc['level_payouts'].get('enabled') is True:
+            flags |= _FLAG_BIT['has_levels']
+        if (('show_in_offerwall' not in doc or doc['show_in_offerwall'] is True)
+                and ('is_active' not in doc or doc['is_active'] is True)
+                and status in OFFERWALL_STATUSES):
+            flags |= _FLAG_BIT['in_offerwall']
+        if doc.get('offerwall_exclusive') is True:
+            flags |= _FLAG_BIT['offerwall_exclusive']
+        if doc.get('refined_via_admin') is True:
+            flags |= _FLAG_BIT['ai_refined']
+        if doc.get('refined_via_admin') in (None, False) and doc.get('refinement_count') in (None, 0):
+            flags |= _FLAG_BIT['not_refined']
+        if doc.get('bulk_refined') is True:
+            flags |= _FLAG_BIT['bulk_refined']
+
+        pin_ends = [_timestamp(doc.get(f)) for f in ('pinEndTime', 'pin_expires_at') if isinstance(doc.get(f), datetime)]
+        text = _FIELD_SEP.join(_strings(doc.get('name'), doc.get('campaign_id'), doc.get('offer_id'),
+                                        doc.get('categories'))).lower().replace(_ROW_SEP, ' ')
+        return (_timestamp(doc.get('created_at')), _payout(doc.get('payout')),
+                min(pin_ends) if pin_ends else 0.0, flags, codes, text)
+
+    def _append(self, offer_id: str, encoded) -> int:
+        created, payout, pin_end, flags, codes, text = encoded
+        row = len(self._offer_ids)
+        if row and created < self._created[row - 1]:
+            self._ordered = False
+        self._rows[offer_id] = row
+        self._offer_ids.append(offer_id)
+        self._created.append(created)
+        self._payout.append(payout)
+        self._pin_end.append(pin_end)
+        self._flags.append(flags)
+        for dim in DIMENSIONS:
+            self._codes[dim].append(codes[dim])
+        self._text.append(text)
+        return row
+
+    def _set_bits(self, row: int, on: bool):
+        bit = 1 << row
+        for dim in DIMENSIONS:
+            bits = self._bits[dim]
+            for code in self._codes[dim][row]:
+                bits[code] = bits.get(code, 0) | bit if on else bits.get(code, 0) & ~bit
+        flags = self._flags[row]
+        for name in FLAGS:
+            if flags & _FLAG_BIT[name]:
+                self._flag_bits[name] = self._flag_bits[name] | bit if on else self._flag_bits[name] & ~bit
+        self._alive = self._alive | bit if on else self._alive & ~bit
+
+    def _upsert(self, doc: Dict):
+        offer_id = str(doc.get('offer_id') or '')
+        if not offer_id:
+            return
+        encoded = self._encode(doc)
+        row = self._rows.get(offer_id)
+        if row is None:
+            row = self._append(offer_id, encoded)
+        else:
+            self._set_bits(row, False)
+            created, payout, pin_end, flags, codes, text = encoded
+            if created != self._created[row]:
+                self._ordered = False
+            self._created[row] = created
+            self._payout[row] = payout
+            self._pin_end[row] = pin_end
+            self._flags[row] = flags
+            for dim in DIMENSIONS:
+                self._codes[dim][row] = codes[dim]
+            self._text[row] = text
+        self._set_bits(row, True)
+        self._blob = None
+
+    def _remove(self, offer_id: str):
+        row = self._rows.pop(offer_id, None)
+        if row is not None:
+            self._set_bits(row, False)
+
+    # ------------------------------------------------------------------
+    # Building and sync
+    # ------------------------------------------------------------------
+
+    def build(self):
+        """Full rebuild from Mongo in created_at order; swaps in atomically."""
+        col = db_instance.get_collection('offers')
+        if col is None:
+            return
+        started = time.time()
+        sync_from = datetime.utcnow()
+        docs = list(col.find({}, PROJECTION))
+        fresh = OfferCatalog.__new__(OfferCatalog)
+        OfferCatalog._reset(fresh)
+        encoded = []
+        for doc in docs:
+            offer_id = str(doc.get('offer_id') or '')
+            if offer_id:
+                encoded.append((offer_id, OfferCatalog._encode(fresh, doc)))
+        encoded.sort(key=lambda item: item[1][0])
+        for offer_id, enc in encoded:
+            old = fresh._rows.get(offer_id)
+            if old is not None:
+                fresh._offer_ids[old] = None  # duplicate offer_id: the newest row wins
+            OfferCatalog._append(fresh, offer_id, enc)
+        size = len(fresh._offer_ids)
+        live = [row for row, offer_id in enumerate(fresh._offer_ids) if offer_id is not None]
+        for dim in DIMENSIONS:
+            postings: Dict[int, List[int]] = {}
+            for row in live:
+                for code in fresh._codes[dim][row]:
+                    postings.setdefault(code, []).append(row)
+            fresh._bits[dim] = {code: _bitset(rows, size) for code, rows in postings.items()}
+        for name in FLAGS:
+            bit = _FLAG_BIT[name]
+            fresh._flag_bits[name] = _bitset((row for row in live if fresh._flags[row] & bit), size)
+        fresh._alive = _bitset(live, size)
+        fresh._ordered = True
+        with self._lock:
+            for attr in ('_rows', '_offer_ids', '_created', '_payout', '_pin_end', '_flags', '_codes', '_text',
+                         '_dicts', '_bits', '_flag_bits', '_alive', '_ordered', '_blob', '_blob_starts'):
+                setattr(self, attr, getattr(fresh, attr))
+            self._ready = True
+        self._last_build = time.time()
+        self._last_sync = time.time()
+        self._last_delta = sync_from
+        self._counts['rebuilds'] += 1
+        logger.info(f"📇 Offer catalog built: {len(live)} offers in {time.time() - started:.1f}s")
+
+    def refresh_offers(self, offer_ids: Iterable[str]):
+        """Re-read the given offers from Mongo; offers that no longer exist are dropped."""
+        offer_ids = [o for o in offer_ids if o]
+        col = db_instance.get_collection('offers')
+        if not offer_ids or col is None:
+            return
+        docs = {str(d.get('offer_id')): d for d in col.find({'offer_id': {'$in': offer_ids}}, PROJECTION)}
+        with self._lock:
+            for offer_id in offer_ids:
+                if offer_id in docs:
+                    self._upsert(docs[offer_id])
+                else:
+                    self._remove(offer_id)
+        self._counts['updates'] += len(offer_ids)
+
+    def _apply_delta(self):
+        col = db_instance.get_collection('offers')
+        if col is None or self._last_delta is None:
+            return
+        since = self._last_delta - timedelta(seconds=5)  # clock skew between app hosts
+        self._last_delta = datetime.utcnow()
+        docs = list(col.find({'updated_at': {'$gte': since}}, PROJECTION))
+        if docs:
+            with self._lock:
+                for doc in docs:
+                    self._upsert(doc)
+            self._counts['updates'] += len(docs)
+
+    def _catch_up(self):
+        """Apply queued evictions and recent writes; called before queries and by the sync thread."""
+        if not self._sync_lock.acquire(blocking=False):
+            return  # another thread is syncing; answer from the current state
+        try:
+            with self._dirty_lock:
+                dirty, dirty_all = self._dirty, self._dirty_all
+                self._dirty, self._dirty_all = set(), False
+            if dirty_all or not self._ordered:
+                self._wake.set()  # full rebuild happens on the sync thread
+            if dirty:
+                self.refresh_offers(dirty)
+            self._apply_delta()
+            self._last_sync = time.time()
+        finally:
+            self._sync_lock.release()
+
+    # ------------------------------------------------------------------
+    # Change notifications
+    # ------------------------------------------------------------------
+
+    def _on_evict(self, key=None):
+        with self._dirty_lock:
+            if key is None:
+                self._dirty_all = True
+            else:
+                self._dirty.add(str(key))
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        add_eviction_listener(NAMESPACE, self._on_evict)
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="OfferCatalog")
+        self._thread.start()
+        logger.info("✅ Offer catalog service started")
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run_loop(self):
+        while self._running:
+            try:
+                if (not self._ready or self._dirty_all or not self._ordered
+                        or time.time() - self._last_build > REBUILD_SECONDS):
+                    with self._dirty_lock:
+                        self._dirty_all = False
+                    self.build()
+                elif self._dirty or time.time() - self._last_sync > 30:
+                    self._catch_up()
+            except Exception as e:
+                logger.warning(f"Offer catalog update failed: {e}")
+                time.sleep(10)
+            self._wake.wait(5 if self._ready else 30)
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _search_rows(self, search: str) -> int:
+        """Bitset of rows whose name, campaign_id, offer_id or a category matches search (case-insensitive)."""
+        size = len(self._offer_ids)
+        if _REGEX_CHARS.intersection(search):
+            pattern = re.compile(search, re.IGNORECASE)
+            return _bitset((row for row, text in enumerate(self._text)
+                            if any(pattern.search(field) for field in text.split(_FIELD_SEP))), size)
+        needle = search.lower()
+        if self._blob is None:
+            starts, pos = [], 0
+            for text in self._text:
+                starts.append(pos)
+                pos += len(text) + 1
+            self._blob_starts = starts
+            self._blob = _ROW_SEP.join(self._text)
+        blob, starts = self._blob, self._blob_starts
+        rows = []
+        pos = blob.find(needle)
+        while pos != -1:
+            row = bisect_right(starts, pos) - 1
+            rows.append(row)
+            if row + 1 >= len(starts):
+                break
+            pos = blob.find(needle, starts[row + 1])
+        return _bitset(rows, size)
+
+    def _union(self, dim: str, codes: Iterable[int]) -> int:
+        bits = self._bits[dim]
+        mask = 0
+        for code in codes:
+            mask |= bits.get(code, 0)
+        return mask
+
+    def _facet(self, dim: str, base: int, limit: Optional[int] = None) -> Dict:
+        values = self._dicts[dim].values
+        counts = []
+        for code, bits in self._bits[dim].items():
+            n = (base & bits).bit_count()
+            if n:
+                counts.append((values[code], n))
+        counts.sort(key=lambda kv: kv[1], reverse=True)
+        return {str(value): n for value, n in counts[:limit]}
+
+    def select(self, status: Optional[str] = None, network: Optional[str] = None,
+               search: Optional[str] = None, category_aliases: Optional[Sequence[str]] = None,
+               countries: Optional[Sequence[str]] = None, offer_source: Optional[str] = None,
+               flag: Optional[str] = None, sort_by: str = 'created_at', sort_dir: int = -1,
+               category_facets: Optional[Mapping[str, Sequence[str]]] = None,
+               max_pinned: int = 50) -> OfferSelection:
+        """
+        Filter the catalog with the admin grid's filters (same semantics as the
+        Mongo query in admin_offers.get_offers) and return the pinned/organic
+        split with facet counts for status, network, country and category.
+        Raises re.error for an invalid search or network pattern.
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f'Unsupported sort field: {sort_by}')
+        if time.time() - self._last_sync > FRESHNESS_SECONDS:
+            self._catch_up()
+        self._counts['queries'] += 1
+
+        with self._lock:
+            base = self._alive & self._flag_bits['listed']
+            if offer_source == 'advertiser':
+                base &= self._flag_bits['advertiser']
+            elif offer_source == 'upward_partner':
+                base &= ~self._flag_bits['advertiser']
+            if flag:
+                base &= self._flag_bits[flag]
+            if search:
+                base &= self._search_rows(search)
+
+            # Filters that have a facet are kept apart so each facet can be counted without its own filter
+            filters: Dict[str, int] = {}
+            if status:
+                filters['status'] = self._bits['status'].get(self._dicts['status'].codes.get(status), 0)
+            if network:
+                pattern = re.compile(network, re.IGNORECASE)
+                filters['network'] = self._union('network', (
+                    code for code, value in enumerate(self._dicts['network'].values) if pattern.search(value)))
+            if countries:
+                codes = self._dicts['country'].codes
+                filters['country'] = self._union('country', (codes[c] for c in countries if c in codes))
+            if category_aliases:
+                codes = self._dicts['token'].codes
+                filters['token'] = self._union('token', (codes[a] for a in category_aliases if a in codes))
+
+            def without(dim):
+                mask = base
+                for name, bits in filters.items():
+                    if name != dim:
+                        mask &= bits
+                return mask
+
+            matched = without(None)
+
+            pinned_ids = []
+            now = (datetime.utcnow() - _EPOCH).total_seconds()
+            pinned = 0
+            for row in _rows_desc(matched & self._flag_bits['pinned']):
+                if self._pin_end[row] and self._pin_end[row] <= now:
+                    continue  # expired, pending run_expired_pin_cleanup
+                pinned |= 1 << row
+                if len(pinned_ids) < max_pinned:
+                    pinned_ids.append(self._offer_ids[row])
+            organic = matched & ~pinned
+
+            order = None
+            if sort_by != 'created_at' or sort_dir != -1 or not self._ordered:
+                column = self._created if sort_by == 'created_at' else self._payout
+                order = sorted(_rows_desc(organic), key=column.__getitem__, reverse=sort_dir == -1)
+
+            facets = {
+                'status': self._facet('status', without('status')),
+                'network': self._facet('network', without('network')),
+                'country': self._facet('country', without('country')),
+            }
+            if category_facets:
+                category_base = without('token')
+                codes = self._dicts['token'].codes
+                facets['category'] = {}
+                for key, aliases in category_facets.items():
+                    n = (category_base & self._union('token', (codes[a] for a in aliases if a in codes))).bit_count()
+                    if n:
+                        facets['category'][key] = n
+            return OfferSelection(organic, pinned_ids, self._offer_ids, order, facets)
+
+    def networks(self) -> List[str]:
+        """Distinct non-empty network names across all offers (including deleted ones)."""
+        with self._lock:
+            values = self._dicts['network'].values
+            return sorted(values[code] for code, bits in self._bits['network'].items()
+                          if bits & self._alive and values[code].strip())
+
+    def stats(self) -> Dict:
+        return {
+            'ready': self._ready,
+            'offers': len(self._rows),
+            'rows': len(self._offer_ids),
+            'ordered': self._ordered,
+            'networks': len(self._dicts['network'].values),
+            'countries': len(self._dicts['country'].values),
+            'last_build_age_seconds': round(time.time() - self._last_build, 1) if self._last_build else None,
+            **self._counts,
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_offer_catalog() -> OfferCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = OfferCatalog()
+        return _catalog
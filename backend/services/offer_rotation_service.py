@@ -9,9 +9,9 @@ Automatically rotates inactive offers in batches.
 
 import logging
 import threading
-import time
 from datetime import datetime, timedelta
 from database import db_instance
+from services.settings_snapshot_service import get_rotation_state, bump_settings_version, thaw
 
 logger = logging.getLogger(__name__)
 
@@ -23,17 +23,24 @@ class OfferRotationService:
     DEFAULT_BATCH_SIZE = 1000
     DEFAULT_WINDOW_HOURS = 7
     DEFAULT_WINDOW_MINUTES = 420  # 7 hours in minutes
+    CHECK_INTERVAL = 60  # Rotation window check, scheduled as 'offer_rotation'
 
     def __init__(self):
         self.offers_col = db_instance.get_collection('offers')
         self.rotation_col = db_instance.get_collection('offer_rotation_state')
-        self._thread = None
-        self._stop_event = threading.Event()
 
     # ------------------------------------------------------------------ helpers
     def _get_state(self):
+        """Rotation state from the settings snapshot (mutable copy); falls back to Mongo."""
+        state = get_rotation_state()
+        if state and 'window_minutes' in state and 'selected_networks' in state:
+            return thaw(state)
+        return self._load_state()
+
+    def _load_state(self):
         """Get or create the singleton rotation state document."""
         state = self.rotation_col.find_one({'_id': 'rotation_config'})
+        migrated = False
         if not state:
             state = {
                 '_id': 'rotation_config',
@@ -53,15 +60,20 @@ class OfferRotationService:
                 'updated_at': datetime.utcnow(),
             }
             self.rotation_col.insert_one(state)
+            migrated = True
         # Migrate old docs that only have window_hours
         if 'window_minutes' not in state:
             wm = state.get('window_hours', self.DEFAULT_WINDOW_HOURS) * 60
             self.rotation_col.update_one({'_id': 'rotation_config'}, {'$set': {'window_minutes': wm}})
             state['window_minutes'] = wm
+            migrated = True
         # Migrate old docs without selected_networks
         if 'selected_networks' not in state:
             self.rotation_col.update_one({'_id': 'rotation_config'}, {'$set': {'selected_networks': []}})
             state['selected_networks'] = []
+            migrated = True
+        if migrated:
+            bump_settings_version('rotation')
         return state
 
     def _save_state(self, update_fields: dict):
@@ -70,45 +82,79 @@ class OfferRotationService:
             {'_id': 'rotation_config'},
             {'$set': update_fields}
         )
+        bump_settings_version('rotation')
 
     # --------------------------------------------------------- deduplication
-    def _calculate_best_score(self, doc):
+    @staticmethod
+    def _number(field):
+        return {'$convert': {'input': field, 'to': 'double', 'onError': 0, 'onNull': 0}}
+
+    def _fetch_candidates(self, query, skip, limit):
         """
-        Calculate a composite 'best offer' score for deduplication ranking.
-        Factors (weighted):
+        Candidates in payout order, projected to offer_id, dedup group key and
+        a composite 'best offer' score, all computed in one aggregation.
+        Score factors (weighted):
           - Highest payout (40%)
           - Most clicked (25%)
           - Most approved/conversions (20%)
           - Most requested (15%)
-        All values are normalized per-group, so we use raw values and let
-        the comparison pick the highest composite.
         """
-        payout = float(doc.get('payout', 0) or 0)
-        clicks = int(doc.get('clicks', 0) or doc.get('hits', 0) or 0)
-        conversions = int(doc.get('conversions', 0) or 0)
-        requests_count = int(doc.get('request_count', 0) or doc.get('requests', 0) or 0)
-        return (payout * 0.40) + (clicks * 0.25) + (conversions * 0.20) + (requests_count * 0.15)
-
-    def _deduplicate_candidates(self, candidates):
+        num = self._number
+        clicks, hits = num('$clicks'), num('$hits')
+        request_count, requests_field = num('$request_count'), num('$requests')
+        countries = {'$cond': [
+            {'$and': [{'$isArray': '$allowed_countries'}, {'$gt': [{'$size': '$allowed_countries'}, 0]}]},
+            '$allowed_countries',
+            {'$cond': [{'$isArray': '$countries'}, '$countries', []]},
+        ]}
+        pipeline = [{'$match': query}, {'$sort': {'payout': -1}}]
+        if skip:
+            pipeline.append({'$skip': skip})
+        pipeline += [
+            {'$limit': limit},
+            {'$project': {
+                '_id': 0,
+                'offer_id': 1,
+                'name_key': {'$toLower': {'$trim': {'input': {'$toString': {'$ifNull': ['$name', '']}}}}},
+                'country_key': {'$let': {'vars': {'c': countries}, 'in': {'$cond': [
+                    {'$gt': [{'$size': '$$c'}, 0]}, {'$toUpper': {'$arrayElemAt': ['$$c', 0]}}, '__global__'
+                ]}}},
+                'score': {'$add': [
+                    {'$multiply': [num('$payout'), 0.40]},
+                    {'$multiply': [{'$cond': [{'$gt': [clicks, 0]}, clicks, hits]}, 0.25]},
+                    {'$multiply': [num('$conversions'), 0.20]},
+                    {'$multiply': [{'$cond': [{'$gt': [request_count, 0]}, request_count, requests_field]}, 0.15]},
+                ]},
+            }},
+        ]
+        return list(self.offers_col.aggregate(pipeline, allowDiskUse=True))
+
+    @staticmethod
+    def _deduplicate_candidates(candidates):
         """
-        Given a list of offer docs, group by (name_lower, first_country).
-        Keep only the BEST offer per group using composite scoring:
-        highest payout, most clicked, most approved, most requested.
+        Given scored candidates (see _fetch_candidates), keep only the BEST
+        offer per (name_lower, first_country) group, in first-seen order.
         Returns list of offer_id strings.
         """
-        groups = {}  # (name, country) -> (best_score, best_doc)
+        groups = {}  # (name, country) -> best candidate
         for doc in candidates:
-            name_key = (doc.get('name') or '').strip().lower()
-            countries = doc.get('allowed_countries') or doc.get('countries') or []
-            country_key = countries[0].upper() if countries else '__global__'
-            group_key = (name_key, country_key)
-
-            score = self._calculate_best_score(doc)
+            group_key = (doc.get('name_key', ''), doc.get('country_key', '__global__'))
             existing = groups.get(group_key)
-            if not existing or score > existing[0]:
-                groups[group_key] = (score, doc)
+            if existing is None or doc['score'] > existing['score']:
+                groups[group_key] = doc
+        return [doc['offer_id'] for doc in groups.values()]
 
-        return [item[1]['offer_id'] for item in groups.values()]
+    def _protected_offer_ids(self):
+        """offer_ids with approved or pending access requests — rotation never deactivates these."""
+        try:
+            requests_col = db_instance.get_collection('affiliate_requests')
+            if requests_col is None:
+                return set()
+            active_requests = requests_col.distinct('offer_id', {'status': {'$in': ['approved', 'pending']}})
+            return {str(oid) for oid in active_requests if oid}
+        except Exception as req_err:
+            logger.warning(f"Failed to fetch active requests for rotation protection: {req_err}")
+            return set()
 
     # --------------------------------------------------- click promotion
     def promote_to_running(self, offer_id: str):
@@ -152,22 +198,15 @@ class OfferRotationService:
         previous_batch = state.get('current_batch_ids', [])
         batch_index = state.get('batch_index', 0)
 
+        # Offers with approved or pending access requests (publishers are using them)
+        protected_offer_ids = self._protected_offer_ids()
+
         # 1. Deactivate previous batch (skip running offers AND offers with approved/pending requests)
-        #    Also deactivate any orphaned rotation-activated offers not in the new batch
+        deactivated_count = 0
         if previous_batch:
-            # Get offers with approved or pending access requests — these should NEVER be deactivated by rotation
-            batch_protected_ids = set()
-            try:
-                requests_col = db_instance.get_collection('affiliate_requests')
-                if requests_col is not None:
-                    for oid in previous_batch:
-                        has_active_request = requests_col.find_one({'offer_id': oid, 'status': {'$in': ['approved', 'pending']}})
-                        if has_active_request:
-                            batch_protected_ids.add(oid)
-            except Exception:
-                pass
-            
-            ids_to_deactivate = [oid for oid in previous_batch if oid not in running_ids and oid not in batch_protected_ids]
+            ids_to_deactivate = [
+                oid for oid in previous_batch if oid not in running_ids and oid not in protected_offer_ids
+            ]
             if ids_to_deactivate:
                 result = self.offers_col.update_many(
                     {
@@ -180,50 +219,25 @@ class OfferRotationService:
                         'updated_at': datetime.utcnow(),
                     }}
                 )
-                logger.info(f"🔄 Deactivated {result.modified_count} offers from previous batch (skipped {len(previous_batch) - len(ids_to_deactivate)} running/protected)")
+                deactivated_count = result.modified_count
+                logger.info(f"🔄 Deactivated {deactivated_count} offers from previous batch (skipped {len(previous_batch) - len(ids_to_deactivate)} running/protected)")
 
         # 1b. Cleanup: deactivate any orphaned rotation-activated offers
         #     These are offers that were activated by rotation in past cycles
         #     but are no longer tracked in current/previous batch state
-        #     IMPORTANT: Skip offers that have approved access requests (publishers are using them)
+        #     IMPORTANT: Skip running offers, offers with approved/pending requests
+        #     and offers that received a click recently (last 30 days)
         orphan_query = {
             'status': 'active',
             'rotation_activated_at': {'$exists': True},
             'rotation_running': {'$ne': True},
             '$or': [{'deleted': {'$exists': False}}, {'deleted': False}],
+            '$nor': [{'last_click_date': {'$gte': datetime.utcnow() - timedelta(days=30)}}],
         }
-        # Exclude offers in the current running list
-        if running_ids:
-            orphan_query['offer_id'] = {'$nin': list(running_ids)}
-        
-        # Also exclude offers that have approved OR pending affiliate requests (publishers need them)
-        protected_offer_ids = set()
-        try:
-            requests_col = db_instance.get_collection('affiliate_requests')
-            if requests_col is not None:
-                active_requests = requests_col.distinct('offer_id', {'status': {'$in': ['approved', 'pending']}})
-                protected_offer_ids.update([str(oid) for oid in active_requests if oid])
-        except Exception as req_err:
-            logger.warning(f"Failed to fetch active requests for orphan protection: {req_err}")
-        
-        # Also protect offers that received a click recently (last 30 days)
-        try:
-            from datetime import timezone
-            recent_cutoff = datetime.utcnow() - timedelta(days=30)
-            offers_with_recent_clicks = self.offers_col.distinct(
-                'offer_id',
-                {'last_click_date': {'$gte': recent_cutoff}, 'status': 'active', 'rotation_activated_at': {'$exists': True}}
-            )
-            protected_offer_ids.update([str(oid) for oid in offers_with_recent_clicks if oid])
-        except Exception:
-            pass
-        
-        # Exclude protected offers from orphan cleanup
-        if protected_offer_ids:
-            existing_nin = orphan_query.get('offer_id', {}).get('$nin', [])
-            all_excluded = list(set(existing_nin) | protected_offer_ids)
-            orphan_query['offer_id'] = {'$nin': all_excluded}
-        
+        excluded_ids = running_ids | protected_offer_ids
+        if excluded_ids:
+            orphan_query['offer_id'] = {'$nin': list(excluded_ids)}
+
         orphan_result = self.offers_col.update_many(
             orphan_query,
             {'$set': {
@@ -234,7 +248,7 @@ class OfferRotationService:
             }}
         )
         if orphan_result.modified_count > 0:
-            logger.info(f"🧹 Cleaned up {orphan_result.modified_count} orphaned rotation-activated offers (protected {len(protected_offer_ids)} with approved requests/recent clicks)")
+            logger.info(f"🧹 Cleaned up {orphan_result.modified_count} orphaned rotation-activated offers (protected {len(protected_offer_ids)} with approved/pending requests)")
 
         # 2. Get all inactive, non-deleted, non-running candidates
         query = {
@@ -263,27 +277,18 @@ class OfferRotationService:
             })
             return
 
-        # 3. Fetch candidates with skip for pagination through the pool
+        # 3. Fetch scored candidates with skip for pagination through the pool
         skip_count = (batch_index * batch_size) % max(total_inactive, 1)
-        candidates = list(
-            self.offers_col.find(query, allow_disk_use=True)
-            .sort('payout', -1)
-            .skip(skip_count)
-            .limit(batch_size * 3)  # Fetch extra for dedup headroom
-        )
+        fetch_count = batch_size * 3  # Fetch extra for dedup headroom
+        candidates = self._fetch_candidates(query, skip_count, fetch_count)
 
-        # If we got fewer than batch_size, wrap around
-        if len(candidates) < batch_size * 3 and skip_count > 0:
-            remaining = batch_size * 3 - len(candidates)
-            wrap_candidates = list(
-                self.offers_col.find(query, allow_disk_use=True)
-                .sort('payout', -1)
-                .limit(remaining)
-            )
+        # If we got fewer than requested, wrap around
+        if len(candidates) < fetch_count and skip_count > 0:
             seen = {c['offer_id'] for c in candidates}
-            for c in wrap_candidates:
-                if c['offer_id'] not in seen:
-                    candidates.append(c)
+            candidates += [
+                c for c in self._fetch_candidates(query, 0, fetch_count - len(candidates))
+                if c['offer_id'] not in seen
+            ]
 
         # 4. Deduplicate
         deduped_ids = self._deduplicate_candidates(candidates)
@@ -333,15 +338,15 @@ class OfferRotationService:
             # Fetch activated offer details for the log
             activated_docs = list(self.offers_col.find(
                 {'offer_id': {'$in': new_batch}},
-                {'offer_id': 1, 'name': 1, 'network': 1, 'payout': 1, 'category': 1, 'status': 1, 'clicks': 1, 'conversions': 1}
-            ))
+                {'offer_id': 1, 'name': 1, 'network': 1, 'payout': 1, 'clicks': 1, 'conversions': 1}
+            ).limit(50))  # Cap at 50 to avoid huge docs
             log_admin_activity(
                 action='rotation_batch_activated',
                 category='rotation',
                 details={
                     'batch_index': batch_index + 1,
                     'activated_count': result.modified_count,
-                    'deactivated_count': len(previous_batch) - len([oid for oid in previous_batch if oid in running_ids]) if previous_batch else 0,
+                    'deactivated_count': deactivated_count,
                     'total_inactive_remaining': total_inactive - len(new_batch),
                     'window_minutes': window_minutes,
                     'batch_size': batch_size,
@@ -353,35 +358,16 @@ class OfferRotationService:
                     'payout': d.get('payout', 0),
                     'clicks': d.get('clicks', 0),
                     'conversions': d.get('conversions', 0),
-                } for d in activated_docs[:50]],  # Cap at 50 to avoid huge docs
+                } for d in activated_docs],
                 affected_count=result.modified_count,
             )
         except Exception as log_err:
             logger.error(f"Failed to log rotation activity: {log_err}")
 
-    # --------------------------------------------------- service lifecycle
-    def start(self):
-        """Start the background rotation thread."""
-        if self._thread and self._thread.is_alive():
-            logger.warning("Rotation service already running")
-            return
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
-        logger.info("🔄 Offer rotation service thread started")
-
-    def stop(self):
-        self._stop_event.set()
-        logger.info("🔄 Offer rotation service stopped")
-
-    def _run_loop(self):
-        while not self._stop_event.is_set():
-            try:
-                self._rotate_batch()
-            except Exception as e:
-                logger.error(f"Rotation loop error: {e}", exc_info=True)
-            # Check every 60 seconds
-            self._stop_event.wait(60)
+    # --------------------------------------------------- scheduled job
+    def run_cycle(self):
+        """Scheduler entry point; a no-op while rotation is disabled in settings."""
+        self._rotate_batch()
 
     # --------------------------------------------------- admin API helpers
     def get_status(self):
@@ -455,7 +441,6 @@ class OfferRotationService:
 
     def enable(self):
         self._save_state({'enabled': True})
-        self.start()
         # Trigger immediate rotation if no active batch
         state = self._get_state()
         if not state.get('batch_activated_at'):
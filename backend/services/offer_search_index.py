@@ -0,0 +1,486 @@
+"""
+Offer Search Index
+In-memory search index over the offer catalog, shared by /offers/autocomplete
+(search) and the keyword matchers - campaign offer matching, search-log
+inventory lookups and search auto-activation (match_keywords).
+
+- Trigram postings per field (name, category, network, offer_id, vertical,
+  tags) for substring
+  matching, plus 2/3-character token-prefix postings for short queries and
+  start-of-word matches. Posting lists hold integer doc ids, built in order of
+  name length so the first verified hits are also the tightest matches.
+- A SymSpell-style deletion dictionary over the name/category/network
+  vocabulary (max edit distance 2, prefix length 7) for typo correction.
+- Field-weighted ranking as ordered tiers: name prefix > word prefix in name >
+  name substring > category > network > offer_id > description word. Tiers are
+  scanned in order and the scan stops once `limit` visible hits are collected.
+- Incremental updates: offer writes publish on the 'offer_search' cache
+  namespace (see services.cache_invalidation_bus.invalidate_offer_caches); the
+  listener queues the offer ids and the index thread re-reads just those
+  offers. A delta poll on updated_at picks up new offers and a periodic full
+  rebuild compacts tombstoned postings.
+
+Until the first build finishes is_ready() is False and callers use their Mongo
+query instead.
+"""
+
+from datetime import datetime, timedelta
+from database import db_instance
+from utils.cache import add_eviction_listener
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'offer_search'
+DELTA_POLL_SECONDS = float(os.environ.get('OFFER_SEARCH_DELTA_SECONDS', '30'))
+REBUILD_SECONDS = float(os.environ.get('OFFER_SEARCH_REBUILD_SECONDS', '1800'))
+
+MAX_EDIT_DISTANCE = 2
+SYMSPELL_PREFIX_LENGTH = 7
+MIN_CORRECTABLE_LENGTH = 4
+DESCRIPTION_WORDS = 64
+
+INDEXED_FIELDS = ('name', 'category', 'network', 'offer_id', 'vertical', 'tags')
+
+# (tier weight, field, match kind) in ranking order
+RANK_TIERS = (
+    (10, 'name', 'start'),
+    (8, 'name', 'word'),
+    (6, 'name', 'substring'),
+    (5, 'category', 'word'),
+    (4, 'category', 'substring'),
+    (3, 'network', 'substring'),
+    (2, 'offer_id', 'substring'),
+    (1, 'description', 'word'),
+)
+
+PROJECTION = {
+    'offer_id': 1, 'name': 1, 'countries': 1, 'category': 1, 'vertical': 1,
+    'categories': 1, 'network': 1, 'description': 1, 'payout': 1,
+    'publisher_payout_override': 1, 'currency': 1, 'status': 1, 'deleted': 1,
+    'tags': 1, 'keywords': 1, 'is_active': 1, 'show_in_offerwall': 1,
+}
+
+# Fields kept per offer and handed back to callers
+RESULT_FIELDS = (
+    'offer_id', 'name', 'countries', 'category', 'vertical', 'categories',
+    'payout', 'publisher_payout_override', 'currency', 'status',
+    'is_active', 'show_in_offerwall',
+)
+_FIELD_POS = {f: i for i, f in enumerate(INDEXED_FIELDS)}
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text) -> str:
+    """Lowercase, collapse every run of non-alphanumerics to one space."""
+    return _NON_WORD.sub(' ', str(text or '').lower()).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _word_prefixes(text: str) -> Set[str]:
+    return {word[:n] for word in text.split() for n in (2, 3) if len(word) >= n}
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings reachable from word by deleting up to max_distance characters."""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        nxt = set()
+        for w in frontier:
+            if len(w) <= 1:
+                continue
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        nxt -= result
+        result |= nxt
+        frontier = nxt
+    return result
+
+
+def _edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, short-circuited above max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[len(b)]
+
+
+class _Entry:
+    __slots__ = ('offer_id', 'fields', 'desc_words', 'doc')
+
+    def __init__(self, doc: Dict):
+        cats = doc.get('categories') or []
+        if not isinstance(cats, list):
+            cats = [cats]
+        tags = []
+        for key in ('tags', 'keywords'):
+            value = doc.get(key) or []
+            tags.extend(value if isinstance(value, list) else [value])
+        self.offer_id = str(doc.get('offer_id') or '')
+        # Normalized texts in INDEXED_FIELDS order
+        self.fields = (
+            normalize(doc.get('name')),
+            normalize(' '.join(str(c) for c in [doc.get('category'), *cats] if c)),
+            normalize(doc.get('network')),
+            normalize(self.offer_id),
+            normalize(doc.get('vertical')),
+            normalize(' '.join(str(t) for t in tags if t)),
+        )
+        # Description only feeds the lowest tier: first DESCRIPTION_WORDS distinct words, not kept on the entry
+        words = dict.fromkeys(w for w in normalize(doc.get('description')).split() if len(w) >= 3)
+        self.desc_words = list(words)[:DESCRIPTION_WORDS]
+        self.doc = {k: doc[k] for k in RESULT_FIELDS if k in doc}
+
+
+class OfferSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._ready = False
+        self._dirty: Set[str] = set()
+        self._dirty_all = False
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._last_build = 0.0
+        self._last_delta: Optional[datetime] = None
+        self._counts = {'queries': 0, 'corrections': 0, 'updates': 0, 'rebuilds': 0}
+
+    def _reset(self):
+        self._entries: Dict[int, _Entry] = {}
+        self._ids: Dict[str, int] = {}
+        self._next_id = 0
+        self._grams: Dict[str, Dict[str, List[int]]] = {f: {} for f in INDEXED_FIELDS}
+        self._prefixes: Dict[str, Dict[str, List[int]]] = {f: {} for f in INDEXED_FIELDS}
+        self._desc: Dict[str, List[int]] = {}
+        self._vocab: Dict[str, int] = {}
+        self._symspell: Dict[str, List[str]] = {}
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _add_word(self, word: str):
+        if len(word) < 3 or word.isdigit():
+            return
+        if word in self._vocab:
+            self._vocab[word] += 1
+            return
+        self._vocab[word] = 1
+        for d in _deletes(word[:SYMSPELL_PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+            self._symspell.setdefault(d, []).append(word)
+
+    def _add(self, doc: Dict):
+        """Index one offer (replacing any previous version; the old doc id becomes a tombstone)."""
+        entry = _Entry(doc)
+        if not entry.offer_id:
+            return
+        old = self._ids.pop(entry.offer_id, None)
+        if old is not None:
+            self._entries.pop(old, None)
+        if doc.get('deleted') is True:
+            return
+        doc_id = self._next_id
+        self._next_id += 1
+        self._entries[doc_id] = entry
+        self._ids[entry.offer_id] = doc_id
+        for field, text in zip(INDEXED_FIELDS, entry.fields):
+            if not text:
+                continue
+            grams = self._grams[field]
+            for g in _trigrams(text):
+                grams.setdefault(g, []).append(doc_id)
+            prefixes = self._prefixes[field]
+            for p in _word_prefixes(text):
+                prefixes.setdefault(p, []).append(doc_id)
+            if field != 'offer_id':
+                for word in text.split():
+                    self._add_word(word)
+        for word in entry.desc_words:
+            self._desc.setdefault(word, []).append(doc_id)
+        entry.desc_words = None
+
+    def _remove(self, offer_id: str):
+        doc_id = self._ids.pop(offer_id, None)
+        if doc_id is not None:
+            self._entries.pop(doc_id, None)
+
+    def build(self):
+        """Full rebuild from Mongo; swaps in atomically so queries never see a half-built index."""
+        col = db_instance.get_collection('offers')
+        if col is None:
+            return
+        started = time.time()
+        sync_from = datetime.utcnow()
+        docs = list(col.find(
+            {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]},
+            PROJECTION
+        ))
+        docs.sort(key=lambda d: len(str(d.get('name') or '')))
+        fresh = OfferSearchIndex.__new__(OfferSearchIndex)
+        OfferSearchIndex._reset(fresh)
+        for doc in docs:
+            OfferSearchIndex._add(fresh, doc)
+        with self._lock:
+            for attr in ('_entries', '_ids', '_next_id', '_grams', '_prefixes', '_desc', '_vocab', '_symspell'):
+                setattr(self, attr, getattr(fresh, attr))
+            self._ready = True
+        self._last_build = time.time()
+        self._last_delta = sync_from
+        self._counts['rebuilds'] += 1
+        logger.info(f"🔎 Offer search index built: {len(docs)} offers, {len(self._vocab)} words in {time.time() - started:.1f}s")
+
+    def refresh_offers(self, offer_ids: Iterable[str]):
+        """Re-read the given offers from Mongo and reindex them."""
+        offer_ids = [o for o in offer_ids if o]
+        col = db_instance.get_collection('offers')
+        if not offer_ids or col is None:
+            return
+        docs = {d.get('offer_id'): d for d in col.find({'offer_id': {'$in': offer_ids}}, PROJECTION)}
+        with self._lock:
+            for offer_id in offer_ids:
+                if offer_id in docs:
+                    self._add(docs[offer_id])
+                else:
+                    self._remove(offer_id)
+        self._counts['updates'] += len(offer_ids)
+
+    def _apply_delta(self):
+        col = db_instance.get_collection('offers')
+        if col is None or self._last_delta is None:
+            return
+        since = self._last_delta - timedelta(seconds=5)  # clock skew between app hosts
+        self._last_delta = datetime.utcnow()
+        docs = list(col.find({'updated_at': {'$gte': since}}, PROJECTION))
+        if docs:
+            with self._lock:
+                for doc in docs:
+                    self._add(doc)
+            self._counts['updates'] += len(docs)
+
+    # ------------------------------------------------------------------
+    # Change notifications
+    # ------------------------------------------------------------------
+
+    def _on_evict(self, key=None):
+        with self._dirty_lock:
+            if key is None:
+                self._dirty_all = True
+            else:
+                self._dirty.add(str(key))
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        add_eviction_listener(NAMESPACE, self._on_evict)
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="OfferSearchIndex")
+        self._thread.start()
+        logger.info("✅ Offer search index service started")
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run_loop(self):
+        last_delta = time.time()
+        while self._running:
+            try:
+                with self._dirty_lock:
+                    dirty, dirty_all = self._dirty, self._dirty_all
+                    self._dirty, self._dirty_all = set(), False
+                if not self._ready or dirty_all or time.time() - self._last_build > REBUILD_SECONDS:
+                    self.build()
+                elif dirty:
+                    self.refresh_offers(dirty)
+                if self._ready and time.time() - last_delta > DELTA_POLL_SECONDS:
+                    last_delta = time.time()
+                    self._apply_delta()
+            except Exception as e:
+                logger.warning(f"Offer search index update failed: {e}")
+                time.sleep(10)
+            self._wake.wait(5 if self._ready else 30)
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _candidates(self, field: str, kind: str, q: str) -> List[int]:
+        if field == 'description':
+            words = q.split()
+            return self._desc.get(words[0], []) if len(words) == 1 else []
+        best = None
+        if kind in ('start', 'word'):
+            best = self._prefixes[field].get(q[:3], [])
+        if len(q) < 3:
+            return best or []
+        # Any match contains every trigram of q, so the shortest posting list bounds the scan
+        grams = self._grams[field]
+        for g in _trigrams(q):
+            posting = grams.get(g)
+            if posting is None:
+                return []
+            if best is None or len(posting) < len(best):
+                best = posting
+        return best or []
+
+    @staticmethod
+    def _matches(entry: _Entry, field: str, kind: str, q: str) -> bool:
+        if field == 'description':
+            return True  # candidates come straight from the word's posting list
+        text = entry.fields[_FIELD_POS[field]]
+        if kind == 'start':
+            return text.startswith(q)
+        if kind == 'word':
+            return text.startswith(q) or (' ' + q) in text
+        return q in text
+
+    def _search(self, q: str, visible: Callable[[_Entry], bool], limit: int) -> List[Tuple[int, _Entry]]:
+        hits: List[Tuple[int, _Entry]] = []
+        seen: Set[int] = set()
+        entries = self._entries
+        for weight, field, kind in RANK_TIERS:
+            for doc_id in self._candidates(field, kind, q):
+                if doc_id in seen:
+                    continue
+                entry = entries.get(doc_id)
+                if entry is None or not self._matches(entry, field, kind, q):
+                    continue
+                seen.add(doc_id)
+                if not visible(entry):
+                    continue
+                hits.append((weight, entry))
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def match_keywords(self, keywords: Iterable[str], fields: Iterable[str] = ('name',),
+                       statuses: Optional[Iterable[str]] = None) -> Dict[str, Tuple[Dict, int]]:
+        """
+        Indexed equivalent of a case-insensitive $regex $or scan: offers whose
+        normalized text in any of fields contains a keyword, mapped to
+        (offer doc, number of keywords matched). Keywords shorter than three
+        characters only match at the start of a word.
+        """
+        statuses = set(statuses) if statuses is not None else None
+        fields = tuple(fields)
+        matched: Dict[int, int] = {}
+        with self._lock:
+            entries = self._entries
+            for keyword in dict.fromkeys(normalize(k) for k in keywords):
+                if not keyword:
+                    continue
+                kind = 'substring' if len(keyword) >= 3 else 'word'
+                hit: Set[int] = set()
+                for field in fields:
+                    for doc_id in self._candidates(field, kind, keyword):
+                        if doc_id in hit:
+                            continue
+                        entry = entries.get(doc_id)
+                        if entry is not None and self._matches(entry, field, kind, keyword):
+                            hit.add(doc_id)
+                for doc_id in hit:
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+            result = {}
+            for doc_id, count in matched.items():
+                entry = entries.get(doc_id)
+                if entry is None or (statuses is not None and entry.doc.get('status') not in statuses):
+                    continue
+                result[entry.offer_id] = (entry.doc, count)
+        return result
+
+    def correct(self, q: str) -> str:
+        """SymSpell lookup per word; words already in the vocabulary are kept."""
+        corrected = []
+        for word in q.split():
+            if len(word) < MIN_CORRECTABLE_LENGTH or word in self._vocab or word.isdigit():
+                corrected.append(word)
+                continue
+            best, best_key = word, None
+            for d in _deletes(word[:SYMSPELL_PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+                for candidate in self._symspell.get(d, ()):
+                    distance = _edit_distance(word, candidate, MAX_EDIT_DISTANCE)
+                    if distance > MAX_EDIT_DISTANCE:
+                        continue
+                    key = (distance, -self._vocab.get(candidate, 0))
+                    if best_key is None or key < best_key:
+                        best, best_key = candidate, key
+            corrected.append(best)
+        return ' '.join(corrected)
+
+    def search(self, query: str, visible: Callable[[Dict], bool], limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Ranked offers matching query, filtered by visible(offer_doc).
+        Returns (offer docs, corrected query or None when no correction was needed).
+        """
+        q = normalize(query)
+        if len(q) < 2:
+            return [], None
+        self._counts['queries'] += 1
+
+        def is_visible(entry):
+            return visible(entry.doc)
+
+        with self._lock:
+            hits = self._search(q, is_visible, limit)
+            corrected = None
+            if not hits:
+                fixed = self.correct(q)
+                if fixed != q:
+                    hits = self._search(fixed, is_visible, limit)
+                    if hits:
+                        corrected = fixed
+                        self._counts['corrections'] += 1
+        return [entry.doc for _, entry in hits], corrected
+
+    def stats(self) -> Dict:
+        return {
+            'ready': self._ready,
+            'offers': len(self._ids),
+            'tombstones': self._next_id - len(self._entries),
+            'vocabulary': len(self._vocab),
+            'symspell_keys': len(self._symspell),
+            'last_build_age_seconds': round(time.time() - self._last_build, 1) if self._last_build else None,
+            **self._counts,
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_offer_search_index() -> OfferSearchIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = OfferSearchIndex()
+        return _index
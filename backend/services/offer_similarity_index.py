@@ -0,0 +1,439 @@
+"""
+Offer Similarity Index
+In-memory near-duplicate index over offer names and target URLs, used by
+utils.duplicate_detection (per-row import checks) and utils.duplicate_remover
+(/offers/duplicates/check).
+
+- Names are grouped by their lowercased form (the exact duplicate key used by
+  the remover) and every distinct name gets a MinHash signature over the
+  character trigrams of its normalized form. Signatures are split into
+  LSH_BANDS bands of LSH_ROWS rows; names sharing any band bucket are
+  candidates, which are then verified with the same SequenceMatcher ratio the
+  duplicate detector always used. A lookup touches a handful of buckets
+  instead of every offer of the network.
+- Target URLs are keyed by canonical form (lowercased host without www.,
+  path without trailing slash; scheme, query and fragment dropped).
+- Kept current like the offer search index: offer writes publish on the
+  'offer_similarity' cache namespace, the listener queues the offer ids and
+  the index thread re-reads them; a delta poll on updated_at picks up new
+  offers and a periodic full rebuild compacts tombstones.
+
+Deleted offers stay indexed (flagged) because the import duplicate checks
+have always matched them; the remover skips them.
+
+Until the first build finishes is_ready() is False and callers use their Mongo
+queries instead.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from urllib.parse import urlsplit
+from database import db_instance
+from services.offer_search_index import normalize
+from utils.cache import add_eviction_listener
+import logging
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'offer_similarity'
+DELTA_POLL_SECONDS = float(os.environ.get('OFFER_SIMILARITY_DELTA_SECONDS', '30'))
+REBUILD_SECONDS = float(os.environ.get('OFFER_SIMILARITY_REBUILD_SECONDS', '3600'))
+
+# 16 bands x 4 rows: names with trigram Jaccard 0.7 collide in some band ~99% of the time,
+# 0.5 ~64%, 0.3 (shared boilerplate like " - iOS - US") ~12%
+LSH_BANDS = 16
+LSH_ROWS = 4
+NUM_PERM = LSH_BANDS * LSH_ROWS
+# Buckets larger than this are skipped when clustering the whole catalog (boilerplate names)
+MAX_BUCKET_SIZE = 200
+# Names with SequenceMatcher ratio >= 0.85 share at least ~47% of their trigrams in practice;
+# candidate pairs below this overlap are rejected before running SequenceMatcher
+TRIGRAM_OVERLAP = 0.4
+
+PROJECTION = {'_id': 0, 'offer_id': 1, 'name': 1, 'network': 1, 'target_url': 1, 'deleted': 1}
+
+_MASK64 = (1 << 64) - 1
+_rng = random.Random(0x0FFE5)
+_PERMS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+_MULTI_SLASH = re.compile(r'/{2,}')
+
+
+def canonical_url(url) -> str:
+    """host[:port]/path of a target URL; '' when it has no host."""
+    try:
+        parts = urlsplit(str(url or '').strip())
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return ''
+    if not host:
+        return ''
+    if host.startswith('www.'):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    return host + _MULTI_SLASH.sub('/', parts.path).rstrip('/')
+
+
+def _shingles(name: str) -> Set[str]:
+    text = f" {normalize(name)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _trigrams(name_key: str) -> Set[str]:
+    text = f" {name_key} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similar(a: str, b: str, grams_a: Set[str], grams_b: Set[str], threshold: float) -> bool:
+    """SequenceMatcher(None, a, b).ratio() >= threshold, with the cheap bounds checked first."""
+    # ratio() <= 2 * min(len) / (len_a + len_b)
+    if 2 * min(len(a), len(b)) < threshold * (len(a) + len(b)):
+        return False
+    if len(grams_a & grams_b) < TRIGRAM_OVERLAP * min(len(grams_a), len(grams_b)):
+        return False
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+class _Entry:
+    __slots__ = ('offer_id', 'name', 'name_key', 'network', 'url_key', 'deleted')
+
+    def __init__(self, doc: Dict):
+        self.offer_id = doc.get('offer_id')
+        name = doc.get('name')
+        self.name = name if isinstance(name, str) else ''
+        self.name_key = self.name.lower()
+        self.network = doc.get('network')
+        self.url_key = canonical_url(doc.get('target_url'))
+        self.deleted = doc.get('deleted') is True
+
+
+class OfferSimilarityIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._reset()
+        self._perm_cache: Dict[str, array] = {}  # shingle -> permuted hashes
+        self._ready = False
+        self._dirty: Set[str] = set()
+        self._dirty_all = False
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._last_build = 0.0
+        self._last_delta: Optional[datetime] = None
+        self._counts = {'lookups': 0, 'candidates': 0, 'verified': 0, 'updates': 0, 'rebuilds': 0}
+        self._version = 0
+        self._clusters = None  # (version, threshold, groups) of the last near_duplicate_groups()
+
+    def _reset(self):
+        self._entries: Dict[int, _Entry] = {}
+        self._ids: Dict[str, int] = {}
+        self._next_id = 0
+        self._names: Dict[str, List[int]] = {}       # lowercased name -> doc ids
+        self._name_keys: List[str] = []               # name id -> lowercased name
+        self._name_ids: Dict[str, int] = {}
+        self._bands: List[Dict[int, List[int]]] = [{} for _ in range(LSH_BANDS)]
+        self._urls: Dict[str, List[int]] = {}
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    # ------------------------------------------------------------------
+    # MinHash
+    # ------------------------------------------------------------------
+
+    def _perm_row(self, shingle: str) -> array:
+        row = self._perm_cache.get(shingle)
+        if row is None:
+            h = zlib.crc32(shingle.encode('utf-8'))
+            row = array('I', [((a * h + b) & _MASK64) >> 32 for a, b in _PERMS])
+            self._perm_cache[shingle] = row
+        return row
+
+    def _band_keys(self, name: str) -> List[int]:
+        shingles = _shingles(name)
+        if not shingles:
+            return []
+        signature = list(map(min, zip(*(self._perm_row(s) for s in shingles))))
+        return [hash(tuple(signature[b * LSH_ROWS:(b + 1) * LSH_ROWS])) for b in range(LSH_BANDS)]
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _add(self, doc: Dict):
+        """Index one offer (replacing any previous version; the old doc id becomes a tombstone)."""
+        entry = _Entry(doc)
+        if not entry.offer_id:
+            return
+        current = self._entries.get(self._ids.get(entry.offer_id))
+        if current is not None and all(getattr(current, f) == getattr(entry, f) for f in _Entry.__slots__):
+            return  # unchanged (delta polls re-read recent offers); keeps _version and cached clusters
+        old = self._ids.pop(entry.offer_id, None)
+        if old is not None:
+            self._entries.pop(old, None)
+        doc_id = self._next_id
+        self._next_id += 1
+        self._entries[doc_id] = entry
+        self._ids[entry.offer_id] = doc_id
+        self._version += 1
+        if entry.name_key:
+            members = self._names.get(entry.name_key)
+            if members is None:
+                members = self._names[entry.name_key] = []
+                name_id = len(self._name_keys)
+                self._name_keys.append(entry.name_key)
+                self._name_ids[entry.name_key] = name_id
+                for band, key in zip(self._bands, self._band_keys(entry.name_key)):
+                    band.setdefault(key, []).append(name_id)
+            members.append(doc_id)
+        if entry.url_key:
+            self._urls.setdefault(entry.url_key, []).append(doc_id)
+
+    def _remove(self, offer_id: str):
+        doc_id = self._ids.pop(offer_id, None)
+        if doc_id is not None:
+            self._entries.pop(doc_id, None)
+            self._version += 1
+
+    def build(self):
+        """Full rebuild from Mongo; swaps in atomically so lookups never see a half-built index."""
+        col = db_instance.get_collection('offers')
+        if col is None:
+            return
+        started = time.time()
+        sync_from = datetime.utcnow()
+        fresh = OfferSimilarityIndex.__new__(OfferSimilarityIndex)
+        OfferSimilarityIndex._reset(fresh)
+        fresh._perm_cache = self._perm_cache
+        fresh._version = 0
+        for doc in col.find({}, PROJECTION):
+            OfferSimilarityIndex._add(fresh, doc)
+        with self._lock:
+            for attr in ('_entries', '_ids', '_next_id', '_names', '_name_keys', '_name_ids', '_bands', '_urls'):
+                setattr(self, attr, getattr(fresh, attr))
+            self._version += 1
+            self._ready = True
+        self._last_build = time.time()
+        self._last_delta = sync_from
+        self._counts['rebuilds'] += 1
+        logger.info(f"🧬 Offer similarity index built: {len(self._ids)} offers, {len(self._name_keys)} names in {time.time() - started:.1f}s")
+
+    def ensure_built(self):
+        """Build synchronously if no build has finished yet, and start the sync thread."""
+        if not self._ready:
+            with self._build_lock:
+                if not self._ready:
+                    self.build()
+        self.start()
+
+    def refresh_offers(self, offer_ids: Iterable[str]):
+        """Re-read the given offers from Mongo and reindex them."""
+        offer_ids = [o for o in offer_ids if o]
+        col = db_instance.get_collection('offers')
+        if not offer_ids or col is None:
+            return
+        docs = {d.get('offer_id'): d for d in col.find({'offer_id': {'$in': offer_ids}}, PROJECTION)}
+        with self._lock:
+            for offer_id in offer_ids:
+                if offer_id in docs:
+                    self._add(docs[offer_id])
+                else:
+                    self._remove(offer_id)
+        self._counts['updates'] += len(offer_ids)
+
+    def _apply_delta(self):
+        col = db_instance.get_collection('offers')
+        if col is None or self._last_delta is None:
+            return
+        since = self._last_delta - timedelta(seconds=5)  # clock skew between app hosts
+        self._last_delta = datetime.utcnow()
+        docs = list(col.find({'updated_at': {'$gte': since}}, PROJECTION))
+        if docs:
+            with self._lock:
+                for doc in docs:
+                    self._add(doc)
+            self._counts['updates'] += len(docs)
+
+    # ------------------------------------------------------------------
+    # Change notifications
+    # ------------------------------------------------------------------
+
+    def _on_evict(self, key=None):
+        with self._dirty_lock:
+            if key is None:
+                self._dirty_all = True
+            else:
+                self._dirty.add(str(key))
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        add_eviction_listener(NAMESPACE, self._on_evict)
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="OfferSimilarityIndex")
+        self._thread.start()
+        logger.info("✅ Offer similarity index service started")
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run_loop(self):
+        last_delta = time.time()
+        while self._running:
+            try:
+                with self._dirty_lock:
+                    dirty, dirty_all = self._dirty, self._dirty_all
+                    self._dirty, self._dirty_all = set(), False
+                if not self._ready or dirty_all or time.time() - self._last_build > REBUILD_SECONDS:
+                    with self._build_lock:
+                        self.build()
+                elif dirty:
+                    self.refresh_offers(dirty)
+                if self._ready and time.time() - last_delta > DELTA_POLL_SECONDS:
+                    last_delta = time.time()
+                    self._apply_delta()
+            except Exception as e:
+                logger.warning(f"Offer similarity index update failed: {e}")
+                time.sleep(10)
+            self._wake.wait(5 if self._ready else 30)
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _live(self, doc_ids: Iterable[int]) -> List[_Entry]:
+        entries = self._entries
+        return [entries[d] for d in doc_ids if d in entries]
+
+    def _candidate_names(self, name: str) -> List[int]:
+        seen = set()
+        for band, key in zip(self._bands, self._band_keys(name)):
+            seen.update(band.get(key, ()))
+        return sorted(seen)
+
+    def find_similar(self, name: str, network=None, threshold: float = 0.85) -> Optional[str]:
+        """offer_id of the first indexed offer (optionally of `network`) whose name has SequenceMatcher ratio >= threshold."""
+        if not name:
+            return None
+        name_lower = name.lower()
+        grams = _trigrams(name_lower)
+        with self._lock:
+            self._counts['lookups'] += 1
+            name_ids = self._candidate_names(name_lower)
+            if name_lower in self._name_ids:
+                name_ids.insert(0, self._name_ids[name_lower])
+            self._counts['candidates'] += len(name_ids)
+            best = None
+            for name_id in name_ids:
+                other = self._name_keys[name_id]
+                members = [e for e in self._live(self._names[other]) if network is None or e.network == network]
+                if not members or not _similar(name_lower, other, grams, _trigrams(other), threshold):
+                    continue
+                self._counts['verified'] += 1
+                first = min(self._ids[e.offer_id] for e in members)
+                if best is None or first < best:
+                    best = first
+            return self._entries[best].offer_id if best is not None else None
+
+    def offers_with_url(self, target_url) -> List[str]:
+        """offer_ids whose target URL has the same canonical form, in index order."""
+        key = canonical_url(target_url)
+        if not key:
+            return []
+        with self._lock:
+            return [e.offer_id for e in self._live(self._urls.get(key, ()))]
+
+    def name_groups(self) -> Dict[str, List[str]]:
+        """Lowercased name -> offer_ids, for names shared by more than one non-deleted offer."""
+        with self._lock:
+            groups = {}
+            for name_key, doc_ids in self._names.items():
+                members = [e.offer_id for e in self._live(doc_ids) if not e.deleted]
+                if len(members) > 1:
+                    groups[name_key] = members
+            return groups
+
+    def near_duplicate_groups(self, threshold: float = 0.85) -> List[List[str]]:
+        """
+        Clusters of non-deleted offers whose names differ but are near-duplicates
+        (SequenceMatcher ratio >= threshold between linked names).
+        """
+        with self._lock:
+            if self._clusters is not None and self._clusters[:2] == (self._version, threshold):
+                return self._clusters[2]
+            live = {}
+            for name_key, doc_ids in self._names.items():
+                members = [e.offer_id for e in self._live(doc_ids) if not e.deleted]
+                if members:
+                    live[self._name_ids[name_key]] = members
+            parent = {}
+
+            def find(x):
+                while parent.get(x, x) != x:
+                    x = parent[x]
+                return x
+
+            checked = set()
+            for band in self._bands:
+                for bucket in band.values():
+                    bucket = [n for n in bucket if n in live]
+                    if len(bucket) < 2 or len(bucket) > MAX_BUCKET_SIZE:
+                        continue
+                    grams = [_trigrams(self._name_keys[n]) for n in bucket]
+                    for i, a in enumerate(bucket):
+                        for j in range(i + 1, len(bucket)):
+                            b = bucket[j]
+                            pair = (a, b) if a < b else (b, a)
+                            if pair in checked or find(a) == find(b):
+                                continue
+                            checked.add(pair)
+                            if _similar(self._name_keys[a], self._name_keys[b], grams[i], grams[j], threshold):
+                                parent[find(a)] = find(b)
+            clusters: Dict[int, List[int]] = {}
+            for name_id in set(parent) | set(parent.values()):
+                clusters.setdefault(find(name_id), []).append(name_id)
+            groups = []
+            for name_ids in clusters.values():
+                if len(name_ids) > 1:
+                    groups.append([offer_id for n in sorted(name_ids) for offer_id in live[n]])
+            self._counts['candidates'] += len(checked)
+            self._clusters = (self._version, threshold, groups)
+            return groups
+
+    def stats(self) -> Dict:
+        return {
+            'ready': self._ready,
+            'offers': len(self._ids),
+            'names': len(self._name_keys),
+            'tombstones': self._next_id - len(self._entries),
+            'urls': len(self._urls),
+            'last_build_age_seconds': round(time.time() - self._last_build, 1) if self._last_build else None,
+            **self._counts,
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_offer_similarity_index() -> OfferSimilarityIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = OfferSimilarityIndex()
+        return _index
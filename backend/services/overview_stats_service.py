@@ -0,0 +1,557 @@
+"""
+Overview Stats Service
+Materializes the admin dashboard overview boxes into a single document.
+
+Instead of ~50 count_documents calls per /api/admin/overview-stats request,
+a background refresher runs one aggregation per source collection (every
+time window computed in the same pass) and stores the result in
+admin_overview_stats. The endpoint and its /<box_name> drill-downs serve that
+document together with its computed_at timestamp.
+
+Each aggregation starts with an indexed $match on the widest window, since
+$facet sub-pipelines cannot use indexes; all-time totals are separate
+count_documents calls. Unfiltered totals use estimated_document_count()
+(collection metadata).
+Click windows come from the unified click_events store once it is backfilled.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import db_instance
+from models.click_events import ClickEvents, EVENT_SOURCES
+
+logger = logging.getLogger(__name__)
+
+TIME_RANGES = {
+    '30m': timedelta(minutes=30),
+    '1h': timedelta(hours=1),
+    '6h': timedelta(hours=6),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+OVERVIEW_BOXES = [
+    'error_summary', 'total_users', 'active_users', 'fraud_users', 'failed_signups',
+    'total_offers', 'requested_offers', 'active_placements', 'iframes_installed',
+    'clicks', 'unique_clicks', 'suspicious_clicks', 'conversions', 'revenue',
+    'reversals', 'postback_failures',
+]
+ADMIN_ONLY_BOXES = ['error_summary', 'fraud_users', 'revenue', 'reversals', 'postback_failures']
+
+FAILED_STATUSES = ['failed', 'error']
+SERVER_ERROR_TYPES = ['server_error', '500', 'internal_error']
+IFRAME_PLACEMENT = {'$or': [{'type': 'iframe'}, {'iframe_installed': True}, {'integration_type': 'iframe'}]}
+
+
+def _ts_expr(fields):
+    """Latest of several timestamp fields, so `ts >= start` matches the old $or filters."""
+    if len(fields) == 1:
+        return f'${fields[0]}'
+    return {'$max': [f'${field}' for field in fields]}
+
+
+def _since_match(fields, since):
+    if len(fields) == 1:
+        return {fields[0]: {'$gte': since}}
+    return {'$or': [{f: {'$gte': since}} for f in fields]}
+
+
+def _window_accumulators(fields, starts, value=1, prefix=''):
+    """$group accumulators summing `value` for documents inside each time window."""
+    ts = _ts_expr(fields)
+    return {
+        f'{prefix}{rk}': {'$sum': {'$cond': [{'$gte': [ts, start]}, value, 0]}}
+        for rk, start in starts.items()
+    }
+
+
+def _windows(fields, starts, oldest, match=None, group_key=None, value=1):
+    """Facet sub-pipeline returning per-window sums, optionally grouped by group_key."""
+    match_stage = dict(match or {})
+    since = _since_match(fields, oldest)
+    if match_stage:
+        match_stage = {'$and': [match_stage, since]}
+    else:
+        match_stage = since
+    return [
+        {'$match': match_stage},
+        {'$group': {'_id': group_key, **_window_accumulators(fields, starts, value)}},
+    ]
+
+
+def _facet(col, fields, oldest, facets):
+    """Run window facets over only the documents inside the widest window.
+
+    `fields` must cover every timestamp field the facets filter on, so the
+    leading $match (which can use indexes) never drops a document they count.
+    """
+    return next(col.aggregate([
+        {'$match': _since_match(fields, oldest)},
+        {'$facet': facets},
+    ], allowDiskUse=True), {})
+
+
+def _window_row(facet_doc, name, starts, key=None):
+    for row in facet_doc.get(name) or []:
+        if row.get('_id') == key:
+            return {rk: row.get(rk, 0) for rk in starts}
+    return {rk: 0 for rk in starts}
+
+
+def _distinct_windows(col, match, fields, starts, oldest, id_field='user_id'):
+    """Set of distinct ids seen in each time window."""
+    per_window = {rk: set() for rk in starts}
+    pipeline = [
+        {'$match': {'$and': [match, _since_match(fields, oldest)]} if match else _since_match(fields, oldest)},
+        {'$group': {'_id': f'${id_field}', 'last_seen': {'$max': _ts_expr(fields)}}},
+    ]
+    for row in col.aggregate(pipeline, allowDiskUse=True):
+        if not row['_id']:
+            continue
+        for rk, start in starts.items():
+            if row['last_seen'] and row['last_seen'] >= start:
+                per_window[rk].add(str(row['_id']))
+    return per_window
+
+
+def _click_pair_stages(starts):
+    """Per-source window counts and distinct (user, offer) pairs per window, counted server-side.
+
+    Input documents carry src, user_id, offer_id and ts. Returns one document
+    with 'per_source' rows ({_id: src, <rk>: clicks, unique_<rk>: pairs}) and an
+    'all' row with the distinct pairs across every source.
+    """
+    def seen_since(field, start):
+        return {'$sum': {'$cond': [{'$gte': [field, start]}, 1, 0]}}
+
+    return [
+        {'$group': {
+            '_id': {
+                'src': '$src',
+                'user_id': {'$ifNull': ['$user_id', '']},
+                'offer_id': {'$ifNull': ['$offer_id', '']},
+            },
+            'last_click': {'$max': '$ts'},
+            **{rk: seen_since('$ts', start) for rk, start in starts.items()},
+        }},
+        {'$facet': {
+            'per_source': [{'$group': {
+                '_id': '$_id.src',
+                **{rk: {'$sum': f'${rk}'} for rk in starts},
+                **{f'unique_{rk}': seen_since('$last_click', start) for rk, start in starts.items()},
+            }}],
+            'all': [
+                {'$group': {
+                    '_id': {'user_id': '$_id.user_id', 'offer_id': '$_id.offer_id'},
+                    'last_click': {'$max': '$last_click'},
+                }},
+                {'$group': {
+                    '_id': None,
+                    **{f'unique_{rk}': seen_since('$last_click', start) for rk, start in starts.items()},
+                }},
+            ],
+        }},
+    ]
+
+
+class OverviewStatsService:
+    """Computes and caches the admin overview document."""
+
+    def __init__(self, refresh_interval=60, max_age=300):
+        self.refresh_interval = refresh_interval  # 'overview_stats' job interval
+        self.max_age = max_age
+        self._compute_lock = threading.Lock()
+        self._snapshot = None
+
+    def _col(self, name):
+        if not db_instance.is_connected():
+            return None
+        return db_instance.get_collection(name)
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+
+    def get_snapshot(self, force_refresh=False):
+        """Return the materialized overview document, refreshing it if missing or older than max_age."""
+        now = datetime.utcnow()
+        snapshot = self._snapshot
+
+        def stale(doc):
+            return doc is None or (now - doc['computed_at']).total_seconds() > self.max_age
+
+        if stale(snapshot) and not force_refresh:
+            # The refresh job (usually in another process) may already have a newer document
+            col = self._col('admin_overview_stats')
+            if col is not None:
+                stored = col.find_one({'_id': 'overview'})
+                if stored is not None and (snapshot is None or stored['computed_at'] > snapshot['computed_at']):
+                    snapshot = self._snapshot = stored
+
+        if force_refresh or stale(snapshot):
+            snapshot = self.refresh() or snapshot
+        return snapshot
+
+    def refresh(self):
+        """Recompute every box for every time range and persist the document."""
+        if not self._compute_lock.acquire(blocking=False):
+            # Another thread is already computing; wait for it and reuse its result
+            with self._compute_lock:
+                return self._snapshot
+        try:
+            started = time.time()
+            now = datetime.utcnow()
+            starts = {rk: now - delta for rk, delta in TIME_RANGES.items()}
+            oldest = min(starts.values())
+
+            boxes = {}
+            for name, fn in (
+                ('errors', self._compute_errors),
+                ('users', self._compute_users),
+                ('fraud_users', self._compute_fraud_users),
+                ('catalog', self._compute_catalog),
+                ('clicks', self._compute_clicks),
+                ('conversions', self._compute_conversions),
+            ):
+                try:
+                    boxes.update(fn(starts, oldest))
+                except Exception as e:
+                    logger.error(f"Overview stats: {name} failed: {e}")
+
+            # Pivot into one stats dict per time range
+            ranges = {rk: {box: data[rk] for box, data in boxes.items()} for rk in TIME_RANGES}
+            snapshot = {
+                '_id': 'overview',
+                'computed_at': now,
+                'duration_ms': round((time.time() - started) * 1000),
+                'ranges': ranges,
+            }
+
+            col = self._col('admin_overview_stats')
+            if col is not None:
+                col.replace_one({'_id': 'overview'}, snapshot, upsert=True)
+            self._snapshot = snapshot
+            logger.info(f"📊 Overview stats materialized in {snapshot['duration_ms']}ms")
+            return snapshot
+        finally:
+            self._compute_lock.release()
+
+    # ------------------------------------------------------------------
+    # Box computations. Each returns {box_name: {time_range: data}}.
+    # ------------------------------------------------------------------
+
+    def _compute_errors(self, starts, oldest):
+        categories = [
+            'api_failures', 'offer_import_failures', 'category_mismatches', 'server_errors',
+            'cors_issues', 'incoming_postback_failures', 'outgoing_postback_failures',
+        ]
+        counts = {c: {rk: 0 for rk in starts} for c in categories}
+        pb_totals = 0
+        pb_windows = {rk: 0 for rk in starts}
+
+        error_logs = self._col('error_logs')
+        if error_logs is not None:
+            doc = _facet(error_logs, ['timestamp'], oldest, {
+                'api_failures': _windows(['timestamp'], starts, oldest, {'type': 'api_error'}),
+                'server_errors': _windows(['timestamp'], starts, oldest, {'type': {'$in': SERVER_ERROR_TYPES}}),
+                'cors_issues': _windows(['timestamp'], starts, oldest, {'type': 'cors_error'}),
+            })
+            for c in ('api_failures', 'server_errors', 'cors_issues'):
+                counts[c] = _window_row(doc, c, starts)
+
+        system_events = self._col('system_events')
+        if system_events is not None:
+            doc = _facet(system_events, ['timestamp'], oldest, {
+                'offer_import_failures': _windows(['timestamp'], starts, oldest, {'event_type': 'offer_import_failed'}),
+                'category_mismatches': _windows(['timestamp'], starts, oldest, {'event_type': 'category_mismatch'}),
+            })
+            for c in ('offer_import_failures', 'category_mismatches'):
+                counts[c] = _window_row(doc, c, starts)
+
+        postback_logs = self._col('postback_logs')
+        if postback_logs is not None:
+            failed = {'status': {'$in': FAILED_STATUSES}}
+            doc = _facet(postback_logs, ['timestamp'], oldest, {
+                'incoming': _windows(['timestamp'], starts, oldest, {**failed, 'direction': 'incoming'}),
+                'all_windows': _windows(['timestamp'], starts, oldest, failed),
+            })
+            counts['incoming_postback_failures'] = _window_row(doc, 'incoming', starts)
+            pb_totals += postback_logs.count_documents(failed)
+            for rk, v in _window_row(doc, 'all_windows', starts).items():
+                pb_windows[rk] += v
+
+        forwarded = self._col('forwarded_postbacks')
+        if forwarded is not None:
+            failed = {'forward_status': {'$in': FAILED_STATUSES}}
+            doc = _facet(forwarded, ['timestamp'], oldest, {
+                'windows': _windows(['timestamp'], starts, oldest, failed),
+            })
+            counts['outgoing_postback_failures'] = _window_row(doc, 'windows', starts)
+            pb_totals += forwarded.count_documents(failed)
+            for rk, v in counts['outgoing_postback_failures'].items():
+                pb_windows[rk] += v
+
+        error_summary = {}
+        for rk in starts:
+            summary = {}
+            for c in categories:
+                summary[f'{c}_24h'] = counts[c][rk]
+                summary[f'{c}_7d'] = counts[c]['7d']
+            summary['total_24h'] = sum(counts[c][rk] for c in categories)
+            summary['total_7d'] = sum(counts[c]['7d'] for c in categories)
+            error_summary[rk] = summary
+
+        return {
+            'error_summary': error_summary,
+            'postback_failures': {rk: {'total': pb_totals, 'last_24h': pb_windows[rk]} for rk in starts},
+        }
+
+    def _compute_users(self, starts, oldest):
+        result = {}
+
+        users = self._col('users')
+        if users is not None:
+            total = users.estimated_document_count()
+            fields = ['created_at', 'createdAt', 'signup_date']
+            doc = _facet(users, fields, oldest, {'windows': _windows(fields, starts, oldest)})
+            windows = _window_row(doc, 'windows', starts)
+            result['total_users'] = {rk: {'total': total, 'last_24h': windows[rk]} for rk in starts}
+
+        login_logs = self._col('login_logs')
+        if login_logs is not None:
+            total = next(login_logs.aggregate([
+                {'$match': {'status': 'success'}},
+                {'$group': {'_id': '$user_id'}},
+                {'$count': 'n'},
+            ], allowDiskUse=True), {}).get('n', 0)
+            row = next(login_logs.aggregate([
+                {'$match': {'status': 'success', 'login_time': {'$gte': oldest}}},
+                {'$group': {'_id': '$user_id', 'last_login': {'$max': '$login_time'}}},
+                {'$group': {'_id': None, **{
+                    rk: {'$sum': {'$cond': [{'$gte': ['$last_login', start]}, 1, 0]}}
+                    for rk, start in starts.items()
+                }}},
+            ], allowDiskUse=True), {})
+            windows = {rk: row.get(rk, 0) for rk in starts}
+            result['active_users'] = {rk: {'total': total, 'last_24h': windows[rk]} for rk in starts}
+
+        signup_attempts = self._col('signup_attempts')
+        if signup_attempts is not None:
+            failed = {'status': {'$in': ['error', 'started']}}
+            doc = _facet(signup_attempts, ['timestamp'], oldest, {
+                'windows': _windows(['timestamp'], starts, oldest, failed),
+            })
+            total = signup_attempts.count_documents(failed)
+            windows = _window_row(doc, 'windows', starts)
+            result['failed_signups'] = {rk: {'total': total, 'last_24h': windows[rk]} for rk in starts}
+
+        return result
+
+    def _compute_fraud_users(self, starts, oldest):
+        total_ids = set()
+        window_ids = {rk: set() for rk in starts}
+
+        login_logs = self._col('login_logs')
+        if login_logs is not None:
+            fraud_match = {'$or': [{'fraud_score': {'$gte': 50}}, {'risk_level': {'$in': ['medium', 'high']}}]}
+            for row in login_logs.aggregate([
+                {'$match': fraud_match},
+                {'$group': {'_id': '$user_id', 'last_login': {'$max': '$login_time'}}},
+            ], allowDiskUse=True):
+                if not row['_id']:
+                    continue
+                uid = str(row['_id'])
+                total_ids.add(uid)
+                for rk, start in starts.items():
+                    if row.get('last_login') and row['last_login'] >= start:
+                        window_ids[rk].add(uid)
+
+        fraud_signals = self._col('offerwall_fraud_signals')
+        if fraud_signals is not None:
+            total_ids.update(str(u) for u in fraud_signals.distinct('user_id') if u)
+            for rk, ids in _distinct_windows(fraud_signals, {}, ['timestamp'], starts, oldest).items():
+                window_ids[rk].update(ids)
+
+        return {'fraud_users': {
+            rk: {'total': len(total_ids), 'last_24h': len(window_ids[rk])} for rk in starts
+        }}
+
+    def _compute_catalog(self, starts, oldest):
+        result = {}
+
+        offers = self._col('offers')
+        if offers is not None:
+            total = offers.estimated_document_count()
+            fields = ['created_at', 'createdAt', 'date_added']
+            doc = _facet(offers, fields, oldest, {'windows': _windows(fields, starts, oldest)})
+            windows = _window_row(doc, 'windows', starts)
+            result['total_offers'] = {rk: {'total': total, 'last_24h': windows[rk]} for rk in starts}
+
+        requests_col = self._col('affiliate_requests')
+        if requests_col is not None:
+            total = requests_col.estimated_document_count()
+            fields = ['requested_at', 'created_at', 'createdAt']
+            doc = _facet(requests_col, fields, oldest, {'windows': _windows(fields, starts, oldest)})
+            windows = _window_row(doc, 'windows', starts)
+            result['requested_offers'] = {rk: {'total': total, 'last_24h': windows[rk]} for rk in starts}
+
+        placements = self._col('placements')
+        iframe_total = 0
+        iframe_windows = {rk: 0 for rk in starts}
+        if placements is not None:
+            fields = ['createdAt', 'created_at']
+            doc = _facet(placements, fields, oldest, {
+                'created': _windows(fields, starts, oldest),
+                'iframe_windows': _windows(fields, starts, oldest, IFRAME_PLACEMENT),
+            })
+            approved = placements.count_documents({'approvalStatus': {'$in': ['APPROVED', 'approved']}})
+            created = _window_row(doc, 'created', starts)
+            result['active_placements'] = {rk: {'total': approved, 'last_24h': created[rk]} for rk in starts}
+            iframe_total = placements.count_documents(IFRAME_PLACEMENT)
+            iframe_windows = _window_row(doc, 'iframe_windows', starts)
+
+        system_events = self._col('system_events')
+        if system_events is not None:
+            installed = {'event_type': 'iframe_installed'}
+            doc = _facet(system_events, ['timestamp'], oldest, {
+                'windows': _windows(['timestamp'], starts, oldest, installed),
+            })
+            iframe_total += system_events.count_documents(installed)
+            for rk, v in _window_row(doc, 'windows', starts).items():
+                iframe_windows[rk] += v
+
+        result['iframes_installed'] = {rk: {'total': iframe_total, 'last_24h': iframe_windows[rk]} for rk in starts}
+        return result
+
+    def _compute_clicks(self, starts, oldest):
+        click_fields = ['timestamp', 'clicked_at', 'created_at']
+        sources = {
+            'clicks': 'tracking_links',
+            'offerwall_clicks': 'offerwall',
+            'dashboard_clicks': 'dashboard',
+        }
+
+        totals = {label: 0 for label in sources.values()}
+        windows = {label: {rk: 0 for rk in starts} for label in sources.values()}
+        unique_counts = {label: {rk: 0 for rk in starts} for label in sources.values()}
+        unique_all = {rk: 0 for rk in starts}
+
+        for col_name, label in sources.items():
+            col = self._col(col_name)
+            if col is not None:
+                totals[label] = col.estimated_document_count()
+
+        events = ClickEvents()
+        if events.covers(oldest):
+            doc = self._click_windows_from_events(events, sources, starts, oldest)
+            labels = {EVENT_SOURCES[col_name]: label for col_name, label in sources.items()}
+        else:
+            doc = self._click_windows_from_raw(sources, click_fields, starts, oldest)
+            labels = {label: label for label in sources.values()}
+        for row in (doc or {}).get('per_source') or []:
+            label = labels.get(row['_id'])
+            if label is None:
+                continue
+            windows[label] = {rk: row.get(rk, 0) for rk in starts}
+            unique_counts[label] = {rk: row.get(f'unique_{rk}', 0) for rk in starts}
+        all_row = _window_row(doc or {}, 'all', {f'unique_{rk}': None for rk in starts})
+        unique_all = {rk: all_row[f'unique_{rk}'] for rk in starts}
+
+        suspicious = {rk: 0 for rk in starts}
+        fraud_signals = self._col('fraud_signals')
+        if fraud_signals is not None:
+            fields = ['timestamp', 'created_at']
+            doc = _facet(fraud_signals, fields, oldest, {'windows': _windows(fields, starts, oldest)})
+            for rk, v in _window_row(doc, 'windows', starts).items():
+                suspicious[rk] += v
+        clicks_col = self._col('clicks')
+        if clicks_col is not None:
+            flagged = {'$or': [{'is_suspicious': True}, {'fraud_score': {'$gte': 50}}]}
+            fields = ['timestamp', 'clicked_at']
+            doc = _facet(clicks_col, fields, oldest, {'windows': _windows(fields, starts, oldest, flagged)})
+            for rk, v in _window_row(doc, 'windows', starts).items():
+                suspicious[rk] += v
+
+        result = {'clicks': {}, 'unique_clicks': {}, 'suspicious_clicks': {}}
+        for rk in starts:
+            result['clicks'][rk] = {
+                'total': sum(totals.values()),
+                'last_24h': sum(windows[label][rk] for label in totals),
+                'breakdown': {label: {'total': totals[label], 'last_24h': windows[label][rk]} for label in totals},
+            }
+            result['unique_clicks'][rk] = {
+                'last_24h': unique_all[rk],
+                'breakdown': {label: unique_counts[label][rk] for label in totals},
+            }
+            result['suspicious_clicks'][rk] = {'last_24h': suspicious[rk]}
+        return result
+
+    def _click_windows_from_events(self, events, sources, starts, oldest):
+        """Per-source windows and unique (user, offer) pairs in one pass over click_events."""
+        return next(events.collection.aggregate([
+            {'$match': {'source': {'$in': [EVENT_SOURCES[col_name] for col_name in sources]},
+                        'timestamp': {'$gte': oldest}}},
+            {'$project': {'src': '$source', 'user_id': 1, 'offer_id': 1, 'ts': '$timestamp'}},
+            *_click_pair_stages(starts),
+        ], allowDiskUse=True), None)
+
+    def _click_windows_from_raw(self, sources, click_fields, starts, oldest):
+        """Same as _click_windows_from_events, straight from the raw click collections ($unionWith)."""
+        def source_stages(label):
+            return [
+                {'$match': _since_match(click_fields, oldest)},
+                {'$project': {'src': {'$literal': label}, 'user_id': 1, 'offer_id': 1, 'ts': _ts_expr(click_fields)}},
+            ]
+
+        (first_col, first_label), *others = sources.items()
+        col = self._col(first_col)
+        if col is None:
+            return None
+        return next(col.aggregate([
+            *source_stages(first_label),
+            *[{'$unionWith': {'coll': col_name, 'pipeline': source_stages(label)}} for col_name, label in others],
+            *_click_pair_stages(starts),
+        ], allowDiskUse=True), None)
+
+    def _compute_conversions(self, starts, oldest):
+        result = {}
+
+        conversions = self._col('conversions')
+        if conversions is not None:
+            reversed_match = {'$or': [{'status': 'reversed'}, {'is_reversal': True}]}
+            total = conversions.estimated_document_count()
+            doc = _facet(conversions, ['timestamp', 'created_at', 'converted_at', 'reversed_at'], oldest, {
+                'windows': _windows(['timestamp', 'created_at', 'converted_at'], starts, oldest),
+                'reversal_windows': _windows(['timestamp', 'reversed_at'], starts, oldest, reversed_match),
+            })
+            windows = _window_row(doc, 'windows', starts)
+            result['conversions'] = {rk: {'total': total, 'last_24h': windows[rk]} for rk in starts}
+            reversals_total = conversions.count_documents(reversed_match)
+            reversal_windows = _window_row(doc, 'reversal_windows', starts)
+            result['reversals'] = {rk: {'total': reversals_total, 'last_24h': reversal_windows[rk]} for rk in starts}
+
+        ow_conversions = self._col('offerwall_conversions')
+        if ow_conversions is not None:
+            payout = {'$ifNull': ['$payout_amount', 0]}
+            doc = _facet(ow_conversions, ['timestamp'], oldest, {
+                'windows': _windows(['timestamp'], starts, oldest, value=payout),
+            })
+            total = next(ow_conversions.aggregate([
+                {'$group': {'_id': None, 'n': {'$sum': payout}}},
+            ]), {}).get('n', 0)
+            windows = _window_row(doc, 'windows', starts)
+            result['revenue'] = {
+                rk: {'total': round(total, 2), 'last_24h': round(windows[rk], 2)} for rk in starts
+            }
+
+        return result
+
+
+_overview_stats_service = OverviewStatsService()
+
+
+def get_overview_stats_service():
+    return _overview_stats_service
@@ -7,6 +7,7 @@ import logging
 import requests
 from datetime import datetime
 from typing import Dict, List, Any, Optional
+from services.settings_snapshot_service import get_active_partners
 import time
 
 logger = logging.getLogger(__name__)
@@ -19,19 +20,9 @@ class PartnerPostbackService:
         self.max_retries = 3  # Maximum retry attempts
         
     def get_active_partners(self, db_instance) -> List[Dict[str, Any]]:
-        """Get all active partners with postback URLs configured"""
+        """Get all active partners with postback URLs configured (from the settings snapshot)"""
         try:
-            users_collection = db_instance.get_collection('users')
-            if users_collection is None:
-                logger.error("Users collection not available")
-                return []
-            
-            # Find all active partners with postback URLs
-            partners = list(users_collection.find({
-                'role': 'partner',
-                'is_active': True,
-                'postback_url': {'$exists': True, '$ne': ''}
-            }))
+            partners = get_active_partners()
             
             logger.info(f"📋 Found {len(partners)} active partners with postback URLs")
             return partners
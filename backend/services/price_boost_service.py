@@ -5,8 +5,6 @@ Checks for expired boosts and reverts them automatically.
 """
 
 import logging
-import threading
-import time
 from datetime import datetime, timedelta
 from database import db_instance
 
@@ -16,39 +14,10 @@ logger = logging.getLogger(__name__)
 class PriceBoostService:
     """Background service that monitors and expires price boosts on offers."""
 
-    def __init__(self):
-        self._running = False
-        self._thread = None
-        self._check_interval = 300  # Check every 5 minutes (sufficient for boost expiry)
-
-    def start(self):
-        """Start the background expiration checker."""
-        if self._running:
-            logger.info("Price boost service already running")
-            return
-        self._running = True
-        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="PriceBoostService")
-        self._thread.start()
-        logger.info("✅ Price boost expiration service started")
-
-    def stop(self):
-        """Stop the background service."""
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=5)
-        logger.info("Price boost service stopped")
-
-    def _run_loop(self):
-        """Main loop that checks for expired boosts."""
-        while self._running:
-            try:
-                self._check_expired_boosts()
-            except Exception as e:
-                logger.error(f"Price boost expiration check failed: {e}")
-            time.sleep(self._check_interval)
+    CHECK_INTERVAL = 300  # Check every 5 minutes (sufficient for boost expiry)
 
-    def _check_expired_boosts(self):
-        """Find and revert expired price boosts."""
+    def check_expired_boosts(self):
+        """Find and revert expired price boosts (scheduled every CHECK_INTERVAL seconds as 'price_boost')."""
         try:
             offers_col = db_instance.get_collection('offers')
             if offers_col is None:
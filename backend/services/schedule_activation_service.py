@@ -2,15 +2,14 @@
 Schedule Activation Service
 Handles automated offer activation/deactivation based on schedule configuration
 
-NOTE: Uses simple threading.Timer instead of the 'schedule' library to avoid
-an extra dependency that was missing from requirements.txt.
+Scheduled through services.job_scheduler: 'schedule_activation' runs
+run_activation_check every minute and 'schedule_activation_cleanup' runs
+daily_cleanup at midnight UTC.
 """
 
 from datetime import datetime, timedelta
 from models.offer_extended import OfferExtended
 import logging
-import time
-import threading
 
 class ScheduleActivationService:
     
@@ -270,35 +269,6 @@ def get_activation_service():
         _activation_service = ScheduleActivationService()
     return _activation_service
 
-def setup_activation_scheduler():
-    """Setup scheduler for offer activation using simple threading (no external deps)"""
-    
-    activation_service = get_activation_service()
-    
-    last_cleanup = {'date': None}
-    
-    def run_scheduler():
-        while True:
-            try:
-                # Run activation check every 60 seconds
-                activation_service.run_activation_check()
-                
-                # Daily cleanup at midnight UTC
-                today = datetime.utcnow().date()
-                if last_cleanup['date'] != today and datetime.utcnow().hour == 0:
-                    activation_service.daily_cleanup()
-                    last_cleanup['date'] = today
-                    
-            except Exception as e:
-                logging.error(f"Error in activation scheduler: {e}")
-            
-            time.sleep(60)  # Check every 60 seconds
-    
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    
-    logging.info("📅 Schedule activation service started")
-
 if __name__ == "__main__":
     # Test the service
     logging.basicConfig(level=logging.INFO)
@@ -5,7 +5,6 @@ Background service that processes and sends scheduled emails at their scheduled
 
 import logging
 import threading
-import time
 from datetime import datetime, timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -21,6 +20,7 @@ class ScheduledEmailService:
     
     _instance = None
     _lock = threading.Lock()
+    CHECK_INTERVAL = 60  # Check every 60 seconds
     
     def __new__(cls):
         if cls._instance is None:
@@ -35,10 +35,8 @@ class ScheduledEmailService:
             return
         
         self._initialized = True
-        self._running = False
         self._paused = False  # START ACTIVE BY DEFAULT
-        self._thread = None
-        self._check_interval = 60  # Check every 60 seconds
+        self._cycle_count = 0
         self._load_pause_state()
         logger.info(f"ScheduledEmailService initialized (paused: {self._paused})")
     
@@ -108,10 +106,11 @@ class ScheduledEmailService:
     
     def get_status(self):
         """Get current service status with pending email diagnostics"""
+        from services.job_scheduler import get_job_scheduler
         status = {
-            'running': self._running,
+            'running': get_job_scheduler().is_registered('scheduled_emails'),
             'paused': self._paused,
-            'check_interval': self._check_interval,
+            'check_interval': self.CHECK_INTERVAL,
             'current_utc': datetime.utcnow().isoformat() + 'Z'
         }
         
@@ -142,18 +141,8 @@ class ScheduledEmailService:
         
         return status
     
-    def start_service(self):
-        """Start the background email processing service"""
-        if self._running:
-            logger.warning("Scheduled email service is already running")
-            return
-        
-        self._running = True
-        self._thread = threading.Thread(target=self._process_loop, daemon=True)
-        self._thread.start()
-        logger.info(f"✅ Scheduled email service started (paused={self._paused}, interval={self._check_interval}s)")
-        
-        # Log pending scheduled emails on startup for diagnostics
+    def log_pending_emails(self):
+        """Log pending scheduled emails on startup for diagnostics"""
         try:
             from database import db_instance
             now = datetime.utcnow()
@@ -184,34 +173,20 @@ class ScheduledEmailService:
         except Exception as e:
             logger.warning(f"📧 Could not check pending emails on startup: {e}")
     
-    def stop_service(self):
-        """Stop the background email processing service"""
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=5)
-        logger.info("Scheduled email service stopped")
-    
-    def _process_loop(self):
-        """Main processing loop that checks for due emails"""
-        logger.info("📧 Scheduled email processing loop started")
-        cycle_count = 0
-        while self._running:
-            try:
-                cycle_count += 1
-                # Check if paused
-                if self._paused:
-                    if cycle_count % 5 == 1:  # Log every 5 cycles (~5 min) to avoid spam
-                        logger.info("📧 Email service is PAUSED - skipping email processing")
-                else:
-                    if cycle_count % 5 == 1:  # Log heartbeat every 5 cycles
-                        logger.debug(f"📧 Email service heartbeat - cycle #{cycle_count}, UTC now: {datetime.utcnow().isoformat()}")
-                    self._process_due_emails()
-                    self._process_due_insight_emails()
-            except Exception as e:
-                logger.error(f"Error in scheduled email processing loop: {e}")
-            
-            # Sleep for the check interval
-            time.sleep(self._check_interval)
+    def process_due(self):
+        """One processing cycle (scheduled every CHECK_INTERVAL seconds as 'scheduled_emails')"""
+        self._cycle_count += 1
+        # The pause may have been toggled in another process; the DB flag is authoritative
+        self._load_pause_state()
+        # Check if paused
+        if self._paused:
+            if self._cycle_count % 5 == 1:  # Log every 5 cycles (~5 min) to avoid spam
+                logger.info("📧 Email service is PAUSED - skipping email processing")
+            return
+        if self._cycle_count % 5 == 1:  # Log heartbeat every 5 cycles
+            logger.debug(f"📧 Email service heartbeat - cycle #{self._cycle_count}, UTC now: {datetime.utcnow().isoformat()}")
+        self._process_due_emails()
+        self._process_due_insight_emails()
     
     def _process_due_emails(self):
         """Process all emails that are due to be sent"""
@@ -360,36 +335,41 @@ class ScheduledEmailService:
 
         sent_count = 0
         failed_count = 0
+        messages = []
 
         # Import the HTML generator from the route module
         from routes.offer_insights_email import generate_custom_campaign_html
 
-        # Send to registered partners
+        # Build messages for registered partners (one users query for the batch)
+        partner_object_ids = []
         for partner_id in partner_ids:
             try:
-                partner = users_collection.find_one({'_id': ObjectId(partner_id)})
-                if not partner:
-                    failed_count += 1
-                    continue
-
-                partner_email = partner.get('email')
-                partner_name = partner.get('username', 'Partner')
-
+                partner_object_ids.append(ObjectId(partner_id))
+            except Exception:
+                logger.error(f"Invalid partner id {partner_id}")
+                failed_count += 1
+        partners = {
+            p['_id']: p for p in users_collection.find(
+                {'_id': {'$in': partner_object_ids}}, {'email': 1, 'username': 1}
+            )
+        } if partner_object_ids else {}
+        for partner_oid in partner_object_ids:
+            partner = partners.get(partner_oid)
+            if not partner or not partner.get('email'):
+                failed_count += 1
+                continue
+            try:
                 email_html = generate_custom_campaign_html(
                     subject=subject,
                     content=content,
-                    partner_name=partner_name
+                    partner_name=partner.get('username', 'Partner')
                 )
-
-                if email_service._send_email(partner_email, subject, email_html):
-                    sent_count += 1
-                else:
-                    failed_count += 1
+                messages.append(email_service.build_message(partner['email'], subject, email_html))
             except Exception as e:
-                logger.error(f"Error sending to partner {partner_id}: {e}")
+                logger.error(f"Error building email for partner {partner_oid}: {e}")
                 failed_count += 1
 
-        # Send to custom email addresses
+        # Build messages for custom email addresses
         import re
         email_regex = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
         for raw_email in (custom_emails or []):
@@ -404,13 +384,16 @@ class ScheduledEmailService:
                     content=content,
                     partner_name=email_addr.split('@')[0]
                 )
-
-                if email_service._send_email(email_addr, subject, email_html):
-                    sent_count += 1
-                else:
-                    failed_count += 1
+                messages.append(email_service.build_message(email_addr, subject, email_html))
             except Exception as e:
-                logger.error(f"Error sending to custom email {raw_email}: {e}")
+                logger.error(f"Error building email for {raw_email}: {e}")
+                failed_count += 1
+
+        # Send the whole batch over the pooled, rate-limited concurrent senders
+        for ok, _ in email_service.send_messages(messages, campaign=f"custom:{email_doc['_id']}"):
+            if ok:
+                sent_count += 1
+            else:
                 failed_count += 1
 
         # Update status
@@ -22,6 +22,8 @@ from threading import Thread
 import time
 from database import db_instance
 from models.offer_grant import OfferGrant
+from services.settings_snapshot_service import get_platform_setting, bump_settings_version
+from services.offer_search_index import get_offer_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +32,7 @@ DEFAULT_DELAY_HOURS = 3
 DEFAULT_MAX_OFFERS = 7
 CHECK_INTERVAL_SECONDS = 30 * 60  # Check every 30 minutes
 GRANT_DURATION_DAYS = 30
+INDEX_CANDIDATE_LIMIT = 200  # keyword-index matches fetched in full for scoring
 
 
 class SearchAutoActivationService:
@@ -53,10 +56,8 @@ class SearchAutoActivationService:
             'max_offers': DEFAULT_MAX_OFFERS,
             'grant_duration_days': GRANT_DURATION_DAYS,
         }
-        if self.settings_col is None:
-            return defaults
         try:
-            doc = self.settings_col.find_one({'key': 'search_auto_activation'})
+            doc = get_platform_setting('search_auto_activation')
             if doc:
                 return {
                     'enabled': doc.get('enabled', True),
@@ -78,6 +79,7 @@ class SearchAutoActivationService:
                 {'$set': {**updates, 'updated_at': datetime.utcnow()}},
                 upsert=True
             )
+            bump_settings_version('platform')
             return True
         except Exception as e:
             logger.error(f"Failed to update auto-activation settings: {e}")
@@ -111,23 +113,9 @@ class SearchAutoActivationService:
 
         already_activated = self._get_already_activated_offers(user_id)
 
-        # Search for offers matching the keyword (inactive ones)
-        search_regex = {'$regex': keyword, '$options': 'i'}
-        query = {
-            '$or': [
-                {'name': search_regex},
-                {'offer_id': search_regex},
-                {'category': search_regex},
-                {'vertical': search_regex},
-                {'categories': search_regex},
-            ],
-            'status': {'$in': ['inactive', 'paused']},
-            '$and': [
-                {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}, {'deleted': None}]},
-            ]
-        }
-
-        candidates = list(self.offers_col.find(query).limit(50))
+        candidates = self._find_candidates_from_index(keyword, already_activated)
+        if candidates is None:
+            candidates = self._find_candidates_from_mongo(keyword)
 
         if not candidates:
             return []
@@ -161,12 +149,7 @@ class SearchAutoActivationService:
             score += min(total_clicks, 100)  # Cap at 100 points
 
             # Payout value
-            payout = 0
-            try:
-                payout = float(offer.get('payout', 0) or 0)
-            except (ValueError, TypeError):
-                pass
-            score += min(payout * 10, 50)  # Cap at 50 points
+            score += min(self._payout_value(offer) * 10, 50)  # Cap at 50 points
 
             scored.append((score, offer))
 
@@ -174,6 +157,64 @@ class SearchAutoActivationService:
         scored.sort(key=lambda x: x[0], reverse=True)
         return [item[1] for item in scored[:max_offers]]
 
+    @staticmethod
+    def _payout_value(offer) -> float:
+        try:
+            return float(offer.get('payout', 0) or 0)
+        except (ValueError, TypeError):
+            return 0.0
+
+    def _find_candidates_from_index(self, keyword: str, already_activated) -> list:
+        """
+        Inactive/paused offers matching keyword via the shared in-memory keyword index.
+        Returns None when the index is not ready yet (caller falls back to Mongo).
+        """
+        index = get_offer_search_index()
+        if not index.is_ready():
+            return None
+        try:
+            matches = index.match_keywords(
+                [keyword],
+                fields=('name', 'offer_id', 'category', 'vertical'),
+                statuses={'inactive', 'paused'}
+            )
+        except Exception as e:
+            logger.warning(f"Keyword index lookup failed for '{keyword}', using Mongo: {e}")
+            return None
+        # Score needs click counts, which the index does not hold: fetch the best-paying
+        # candidates in full with one query
+        ranked = sorted(
+            (oid for oid in matches if oid not in already_activated),
+            key=lambda oid: self._payout_value(matches[oid][0]),
+            reverse=True
+        )[:INDEX_CANDIDATE_LIMIT]
+        if not ranked:
+            return []
+        return list(self.offers_col.find({
+            'offer_id': {'$in': ranked},
+            'status': {'$in': ['inactive', 'paused']},
+            '$or': [{'deleted': {'$exists': False}}, {'deleted': False}, {'deleted': None}]
+        }))
+
+    def _find_candidates_from_mongo(self, keyword: str) -> list:
+        # Search for offers matching the keyword (inactive ones)
+        search_regex = {'$regex': keyword, '$options': 'i'}
+        query = {
+            '$or': [
+                {'name': search_regex},
+                {'offer_id': search_regex},
+                {'category': search_regex},
+                {'vertical': search_regex},
+                {'categories': search_regex},
+            ],
+            'status': {'$in': ['inactive', 'paused']},
+            '$and': [
+                {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}, {'deleted': None}]},
+            ]
+        }
+
+        return list(self.offers_col.find(query).limit(50))
+
     def _send_activation_email(self, user_id: str, username: str, keywords: list, offers: list):
         """Send an email to the publisher notifying them about the auto-activated offers."""
         try:
@@ -0,0 +1,312 @@
+"""
+Settings Snapshot Service
+Immutable, versioned in-memory copy of the configuration documents read on
+hot request paths:
+- offerwall       offerwall_settings singleton (admin_api_key, new_user_offer_ids, featured_offers, ...)
+- platform        platform_settings documents keyed by their 'key' field
+- top_offers      top_offers_settings {key: 'config'}
+- partners        active partner users with a postback URL
+- email_exclusions permanent email exclusions
+- rotation        offer_rotation_state {_id: 'rotation_config'}
+
+Settings write endpoints call bump_settings_version(section) after writing.
+That increments a per-section counter in the settings_versions collection and
+reloads the section in the calling worker right away; every other worker polls
+only the counter document and reloads the sections whose counter moved. Readers
+never touch Mongo: they get frozen dicts/tuples from the current snapshot, which
+is swapped atomically on reload.
+
+A full reload also happens every SETTINGS_SNAPSHOT_MAX_AGE seconds as a backstop
+for writes that bypass the endpoints (scripts, manual DB edits).
+"""
+
+from datetime import datetime
+from database import db_instance
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = 'settings_versions'
+VERSION_DOC_ID = 'settings'
+POLL_SECONDS = float(os.environ.get('SETTINGS_SNAPSHOT_POLL_SECONDS', '2'))
+MAX_AGE_SECONDS = float(os.environ.get('SETTINGS_SNAPSHOT_MAX_AGE', '300'))
+
+SECTIONS = ('offerwall', 'platform', 'top_offers', 'partners', 'email_exclusions', 'rotation')
+
+
+class FrozenDict(dict):
+    """Read-only dict; still a dict, so jsonify and BSON encoding work unchanged."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('settings snapshot is read-only; use thaw() for a mutable copy')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """Recursively convert dicts to FrozenDict and lists to tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Mutable deep copy of a frozen value (dicts and lists)."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class SettingsSnapshot:
+    """One immutable generation of the configuration documents."""
+
+    __slots__ = ('version', 'section_versions', 'sections', 'loaded_at')
+
+    def __init__(self, version: int, section_versions: Mapping[str, int], sections: Mapping[str, Any], loaded_at: float):
+        self.version = version
+        self.section_versions = FrozenDict(section_versions)
+        self.sections = FrozenDict(sections)
+        self.loaded_at = loaded_at
+
+    def get(self, section: str, default=None):
+        value = self.sections.get(section)
+        return default if value is None else value
+
+
+# ----------------------------------------------------------------------
+# Section loaders (one Mongo read each)
+# ----------------------------------------------------------------------
+
+def _load_offerwall():
+    col = db_instance.get_collection('offerwall_settings')
+    return col.find_one({}) if col is not None else None
+
+
+def _load_platform():
+    col = db_instance.get_collection('platform_settings')
+    if col is None:
+        return None
+    return {doc['key']: doc for doc in col.find({'key': {'$exists': True}}) if doc.get('key')}
+
+
+def _load_top_offers():
+    col = db_instance.get_collection('top_offers_settings')
+    return col.find_one({'key': 'config'}) if col is not None else None
+
+
+def _load_partners():
+    col = db_instance.get_collection('users')
+    if col is None:
+        return None
+    return list(col.find({
+        'role': 'partner',
+        'is_active': True,
+        'postback_url': {'$exists': True, '$ne': ''}
+    }))
+
+
+def _load_email_exclusions():
+    col = db_instance.get_collection('email_exclusions')
+    if col is None:
+        return None
+    return list(col.find({}, {'_id': 0, 'email': 1, 'name': 1, 'excluded_at': 1, 'reason': 1}))
+
+
+def _load_rotation():
+    col = db_instance.get_collection('offer_rotation_state')
+    return col.find_one({'_id': 'rotation_config'}) if col is not None else None
+
+
+_LOADERS = {
+    'offerwall': _load_offerwall,
+    'platform': _load_platform,
+    'top_offers': _load_top_offers,
+    'partners': _load_partners,
+    'email_exclusions': _load_email_exclusions,
+    'rotation': _load_rotation,
+}
+
+
+class SettingsSnapshotService:
+    def __init__(self):
+        self._snapshot = SettingsSnapshot(0, {}, {}, 0.0)
+        self._loaded = set()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._last_attempt = 0.0
+        self._counts = {'polls': 0, 'reloads': 0, 'bumps': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> SettingsSnapshot:
+        """Current snapshot; loads synchronously the first time (or while Mongo was unreachable)."""
+        if len(self._loaded) < len(SECTIONS) and time.time() - self._last_attempt > POLL_SECONDS:
+            self.refresh()
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Versioning
+    # ------------------------------------------------------------------
+
+    def _versions_col(self):
+        return db_instance.get_collection(VERSIONS_COLLECTION)
+
+    def _read_versions(self) -> Optional[Dict]:
+        col = self._versions_col()
+        if col is None:
+            return None
+        doc = col.find_one({'_id': VERSION_DOC_ID})
+        return doc or {'version': 0, 'sections': {}}
+
+    def bump(self, section: str):
+        """Record a write to section and reload it in this worker immediately."""
+        if section not in _LOADERS:
+            raise ValueError(f'Unknown settings section: {section}')
+        try:
+            col = self._versions_col()
+            if col is None:
+                return
+            col.update_one(
+                {'_id': VERSION_DOC_ID},
+                {'$inc': {'version': 1, f'sections.{section}': 1}, '$set': {'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+            self._counts['bumps'] += 1
+            self.refresh()
+        except Exception as e:
+            self._counts['errors'] += 1
+            logger.warning(f"Failed to bump settings version for {section}: {e}")
+
+    def refresh(self, force: bool = False):
+        """Reload the sections whose version changed (all sections when force)."""
+        with self._refresh_lock:
+            self._last_attempt = time.time()
+            try:
+                versions = self._read_versions()
+                self._counts['polls'] += 1
+                if versions is None:
+                    return
+                current = self._snapshot
+                section_versions = versions.get('sections') or {}
+                stale = [
+                    name for name in SECTIONS
+                    if force or name not in self._loaded
+                    or section_versions.get(name, 0) != current.section_versions.get(name, 0)
+                ]
+                if not stale:
+                    return
+                sections = dict(current.sections)
+                new_versions = dict(current.section_versions)
+                for name in stale:
+                    try:
+                        sections[name] = freeze(_LOADERS[name]())
+                        new_versions[name] = section_versions.get(name, 0)
+                        self._loaded.add(name)
+                    except Exception as e:
+                        self._counts['errors'] += 1
+                        logger.warning(f"Failed to load settings section {name}: {e}")
+                self._snapshot = SettingsSnapshot(versions.get('version', 0), new_versions, sections, time.time())
+                self._counts['reloads'] += 1
+                logger.debug(f"Settings snapshot v{self._snapshot.version} reloaded: {', '.join(stale)}")
+            except Exception as e:
+                self._counts['errors'] += 1
+                logger.warning(f"Settings snapshot refresh failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Poller
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="SettingsSnapshot")
+        self._thread.start()
+        logger.info(f"✅ Settings snapshot service started (poll every {POLL_SECONDS:g}s)")
+
+    def stop(self):
+        self._running = False
+
+    def _run_loop(self):
+        while self._running:
+            try:
+                self.refresh(force=time.time() - self._snapshot.loaded_at > MAX_AGE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Settings snapshot poller error: {e}")
+            time.sleep(POLL_SECONDS)
+
+    def stats(self) -> Dict:
+        snap = self._snapshot
+        return {
+            'running': self._running,
+            'version': snap.version,
+            'section_versions': dict(snap.section_versions),
+            'loaded_sections': sorted(self._loaded),
+            'age_seconds': round(time.time() - snap.loaded_at, 1) if snap.loaded_at else None,
+            **self._counts,
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_settings_snapshot_service() -> SettingsSnapshotService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SettingsSnapshotService()
+        return _service
+
+
+def get_settings_snapshot() -> SettingsSnapshot:
+    return get_settings_snapshot_service().snapshot()
+
+
+def bump_settings_version(section: str):
+    get_settings_snapshot_service().bump(section)
+
+
+# ----------------------------------------------------------------------
+# Accessors used on the request path
+# ----------------------------------------------------------------------
+
+def get_offerwall_settings() -> Mapping:
+    """The offerwall_settings singleton ({} when none exists yet)."""
+    return get_settings_snapshot().get('offerwall', FrozenDict())
+
+
+def get_platform_setting(key: str) -> Optional[Mapping]:
+    """The platform_settings document with the given key, or None."""
+    return get_settings_snapshot().get('platform', FrozenDict()).get(key)
+
+
+def get_top_offers_config() -> Optional[Mapping]:
+    return get_settings_snapshot().get('top_offers')
+
+
+def get_active_partners() -> List[Mapping]:
+    return list(get_settings_snapshot().get('partners', ()))
+
+
+def get_email_exclusions() -> List[Mapping]:
+    return list(get_settings_snapshot().get('email_exclusions', ()))
+
+
+def get_rotation_state() -> Optional[Mapping]:
+    return get_settings_snapshot().get('rotation')
@@ -2,6 +2,11 @@
 Smart Offer Matcher Service
 Picks unique, relevant, unsent offers for each user based on their profile and request history.
 Uses the SAME logic as inventory-matches to find offers from each user's related offers list.
+
+When the shared offer search index (services.offer_search_index) is ready, a whole
+campaign is matched in one pass: latest requests, sent-offer history and grants are
+bulk-loaded for all users, keyword candidates come from the in-memory index (scored
+once per distinct keyword set), and the selected offers are fetched in a single query.
 """
 
 import logging
@@ -9,6 +14,7 @@ import re
 from datetime import datetime, timedelta
 from database import db_instance
 from models.email_campaign import EmailCampaign
+from services.offer_search_index import get_offer_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +38,12 @@ class SmartOfferMatcher:
         source_tab = config.get('source_tab', 'all')
         user_offer_names = config.get('user_offer_names', {})  # {user_id: latest_offer_name}
         
+        if get_offer_search_index().is_ready():
+            try:
+                return self._match_batch(user_ids, total_per_user, per_email, user_offer_names)
+            except Exception as e:
+                logger.error(f"Batched offer matching failed, falling back to per-user matching: {e}", exc_info=True)
+        
         result = {}
         campaign_assigned_offers = set()
         
@@ -54,6 +66,140 @@ class SmartOfferMatcher:
         
         return result
     
+    # Same stop words as inventory-matches
+    STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+                  'of', 'with', 'by', '&', '-', '+', 'all', 'geos', 'global', 'incent', 'allowed'}
+    
+    def _extract_keywords(self, offer_name: str) -> list:
+        """Keywords from an offer name (SAME logic as inventory-matches endpoint)"""
+        keywords = [w.lower() for w in offer_name.split() if w.lower() not in self.STOP_WORDS and len(w) > 2] if offer_name else []
+        if not keywords:
+            keywords = [offer_name.lower()] if offer_name else []
+        return keywords
+    
+    def _latest_offer_names(self, user_ids: list) -> dict:
+        """Latest requested offer name per user, one aggregation for all users"""
+        if not user_ids or self.requests_collection is None:
+            return {}
+        pipeline = [
+            {'$match': {'user_id': {'$in': list(user_ids)}}},
+            {'$sort': {'requested_at': -1}},
+            {'$group': {'_id': '$user_id', 'offer_name': {'$first': '$offer_name'}}},
+        ]
+        return {d['_id']: d.get('offer_name') or '' for d in self.requests_collection.aggregate(pipeline, allowDiskUse=True)}
+    
+    def _granted_offer_ids(self, user_ids: list) -> dict:
+        """All granted offer IDs per user, one query for all users"""
+        result = {}
+        try:
+            from models.offer_grant import OfferGrant
+            grant_model = OfferGrant()
+            if grant_model.collection is not None and user_ids:
+                for g in grant_model.collection.find({'user_id': {'$in': list(user_ids)}}, {'user_id': 1, 'offer_id': 1}):
+                    result.setdefault(g.get('user_id'), set()).add(g.get('offer_id', ''))
+        except Exception as e:
+            logger.warning(f"Failed to bulk-load offer grants: {e}")
+        return result
+    
+    @staticmethod
+    def _payout_value(payout) -> float:
+        try:
+            return float(payout or 0)
+        except (ValueError, TypeError):
+            return 0.0
+    
+    @classmethod
+    def _keyword_score(cls, status, payout, match_count: int) -> float:
+        score = match_count * 20
+        if status == 'active':
+            score += 3
+        score += min(5, cls._payout_value(payout) * 0.2)
+        return score
+    
+    def _match_batch(self, user_ids: list, total_offers: int, per_email: int, user_offer_names: dict) -> dict:
+        """
+        Match a whole campaign in one pass (same selection rules as _match_for_user).
+        Users are processed in order so offers assigned to earlier users are still
+        excluded for later ones.
+        """
+        index = get_offer_search_index()
+        missing_names = [uid for uid in user_ids if not user_offer_names.get(uid)]
+        latest_names = self._latest_offer_names(missing_names)
+        sent_by_user = EmailCampaign.get_sent_offer_ids_for_users(user_ids)
+        grants_by_user = self._granted_offer_ids(user_ids)
+        
+        ranked_by_keywords = {}
+        fallback = None
+        campaign_assigned_offers = set()
+        picks = {}
+        
+        for user_id in user_ids:
+            offer_name = user_offer_names.get(user_id) or latest_names.get(user_id, '')
+            keywords = tuple(self._extract_keywords(offer_name))
+            
+            ranked = ranked_by_keywords.get(keywords)
+            if ranked is None:
+                ranked = []
+                if keywords:
+                    matches = index.match_keywords(keywords, fields=('name',))
+                    ranked = sorted(
+                        ((self._keyword_score(doc.get('status'), doc.get('payout'), count),
+                          self._payout_value(doc.get('payout')), offer_id)
+                         for offer_id, (doc, count) in matches.items()),
+                        key=lambda r: (-r[0], -r[1])
+                    )
+                ranked_by_keywords[keywords] = ranked
+            
+            candidates = ranked
+            if not candidates:
+                # Fallback: recent active offers, loaded once per campaign
+                if fallback is None:
+                    fallback = []
+                    for offer in self.offers_collection.find(
+                        {'status': {'$in': ['active', 'running']}}, {'offer_id': 1, 'status': 1, 'payout': 1}
+                    ).sort('created_at', -1).limit(30):
+                        fallback.append((self._keyword_score(offer.get('status'), offer.get('payout'), 0),
+                                         self._payout_value(offer.get('payout')), offer.get('offer_id')))
+                    fallback.sort(key=lambda r: (-r[0], -r[1]))
+                candidates = fallback
+            
+            exclude_ids = sent_by_user.get(user_id, set()) | grants_by_user.get(user_id, set())
+            selected = []
+            for score, _payout, offer_id in candidates:
+                if offer_id in exclude_ids or offer_id in campaign_assigned_offers:
+                    continue
+                selected.append((offer_id, score))
+                if len(selected) >= total_offers:
+                    break
+            picks[user_id] = selected
+            campaign_assigned_offers.update(offer_id for offer_id, _ in selected)
+        
+        # One query for every selected offer's full projection
+        offers_by_id = {}
+        if campaign_assigned_offers:
+            for offer in self.offers_collection.find(
+                {'offer_id': {'$in': list(campaign_assigned_offers)}}, self._offer_projection()
+            ):
+                offers_by_id[offer.get('offer_id')] = offer
+        
+        result = {}
+        for user_id in user_ids:
+            selected = []
+            for offer_id, score in picks.get(user_id, []):
+                offer = offers_by_id.get(offer_id)
+                if offer is not None:
+                    selected.append({**offer, '_score': score})
+            emails = []
+            for i in range(0, len(selected), per_email):
+                batch = selected[i:i + per_email]
+                if batch:
+                    emails.append({
+                        'email_number': len(emails) + 1,
+                        'offers': batch,
+                    })
+            result[user_id] = {'emails': emails, 'total_offers': len(selected)}
+        return result
+    
     def _match_for_user(self, user_id: str, total_offers: int, per_email: int, source_tab: str, exclude_campaign_offers: set = None, offer_name: str = '') -> dict:
         """
         Match offers for a single user using the SAME logic as inventory-matches endpoint.
@@ -88,13 +234,7 @@ class SmartOfferMatcher:
             pass
         
         # 3. Extract keywords from the offer name (SAME logic as inventory-matches endpoint)
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-                      'of', 'with', 'by', '&', '-', '+', 'all', 'geos', 'global', 'incent', 'allowed'}
-        
-        keywords = [w.lower() for w in offer_name.split() if w.lower() not in stop_words and len(w) > 2] if offer_name else []
-        
-        if not keywords:
-            keywords = [offer_name.lower()] if offer_name else []
+        keywords = self._extract_keywords(offer_name)
         
         # 4. Find related offers using regex (SAME as inventory-matches)
         candidates = []
@@ -232,90 +372,17 @@ class SmartOfferMatcher:
         
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         
+        users_info = self._bulk_user_info(users_col, user_ids)
+        stats_by_user = self._bulk_user_stats(
+            user_ids, users_info, today_start,
+            clicks_col, conversions_col, email_activity_col, offer_send_col, push_mail_col
+        )
+        
         preview = []
         
         for user_id in user_ids:
             user_data = matches.get(user_id, {'emails': [], 'total_offers': 0})
-            
-            # Get user info
-            user_info = {'username': 'Unknown', 'email': '', 'first_name': ''}
-            try:
-                from bson import ObjectId
-                user = users_col.find_one({'_id': ObjectId(user_id)}, {'username': 1, 'email': 1, 'first_name': 1})
-                if user:
-                    user_info = {
-                        'username': user.get('username', ''),
-                        'email': user.get('email', ''),
-                        'first_name': user.get('first_name', ''),
-                    }
-            except:
-                pass
-            
-            # Get user stats
-            uid_str = str(user_id)
-            total_clicks = 0
-            total_conversions = 0
-            total_mail_sent = 0
-            mail_sent_today = 0
-            last_mail_sent = None
-            total_offers_sent = 0
-            offers_sent_today = 0
-            
-            try:
-                if clicks_col is not None:
-                    total_clicks = clicks_col.count_documents({'user_id': uid_str})
-                if conversions_col is not None:
-                    total_conversions = conversions_col.count_documents({'user_id': uid_str})
-                
-                # Mail stats from multiple collections
-                user_email = user_info.get('email', '')
-                def _user_mail_query():
-                    conditions = [{'user_id': uid_str}, {'recipient_user_ids': uid_str}, {'recipient_ids': uid_str}]
-                    if user_email:
-                        conditions.append({'recipient_emails': user_email})
-                    return {'$or': conditions}
-                
-                uq = _user_mail_query()
-                
-                if email_activity_col is not None:
-                    total_mail_sent += email_activity_col.count_documents(uq)
-                    mail_sent_today += email_activity_col.count_documents({**uq, 'created_at': {'$gte': today_start}})
-                    last_doc = email_activity_col.find_one(uq, sort=[('created_at', -1)])
-                    if last_doc:
-                        last_mail_sent = last_doc.get('created_at')
-                    for doc in email_activity_col.find(uq, {'offer_ids': 1, 'offer_count': 1, 'created_at': 1}):
-                        oc = doc.get('offer_count', len(doc.get('offer_ids', [])))
-                        total_offers_sent += oc
-                        if doc.get('created_at') and doc['created_at'] >= today_start:
-                            offers_sent_today += oc
-                
-                if offer_send_col is not None:
-                    for doc in offer_send_col.find(uq, {'offer_ids': 1, 'offer_count': 1, 'created_at': 1}):
-                        total_mail_sent += 1
-                        oc = doc.get('offer_count', len(doc.get('offer_ids', [])))
-                        total_offers_sent += oc
-                        dt = doc.get('created_at')
-                        if dt:
-                            if dt >= today_start:
-                                mail_sent_today += 1
-                                offers_sent_today += oc
-                            if last_mail_sent is None or dt > last_mail_sent:
-                                last_mail_sent = dt
-                
-                if push_mail_col is not None:
-                    for doc in push_mail_col.find(uq, {'offer_ids': 1, 'created_at': 1}):
-                        total_mail_sent += 1
-                        oc = len(doc.get('offer_ids', []))
-                        total_offers_sent += oc
-                        dt = doc.get('created_at')
-                        if dt:
-                            if dt >= today_start:
-                                mail_sent_today += 1
-                                offers_sent_today += oc
-                            if last_mail_sent is None or dt > last_mail_sent:
-                                last_mail_sent = dt
-            except Exception as stats_err:
-                logger.warning(f"Error fetching stats for user {user_id}: {stats_err}")
+            user_info = users_info.get(user_id, {'username': 'Unknown', 'email': '', 'first_name': ''})
             
             preview.append({
                 'user_id': user_id,
@@ -324,15 +391,123 @@ class SmartOfferMatcher:
                 'first_name': user_info.get('first_name', ''),
                 'total_offers': user_data['total_offers'],
                 'emails': user_data['emails'],
-                'stats': {
-                    'total_mail_sent': total_mail_sent,
-                    'mail_sent_today': mail_sent_today,
-                    'last_mail_sent': last_mail_sent,
-                    'total_offers_sent': total_offers_sent,
-                    'offers_sent_today': offers_sent_today,
-                    'total_clicks': total_clicks,
-                    'total_conversions': total_conversions,
-                },
+                'stats': stats_by_user[str(user_id)],
             })
         
         return {'preview': preview, 'total_users': len(user_ids)}
+
+    def _bulk_user_info(self, users_col, user_ids: list) -> dict:
+        """username/email/first_name for every user in one query"""
+        info = {}
+        if users_col is None:
+            return info
+        try:
+            from bson import ObjectId
+            object_ids = {}
+            for uid in user_ids:
+                try:
+                    object_ids[ObjectId(uid)] = uid
+                except Exception:
+                    continue
+            for user in users_col.find({'_id': {'$in': list(object_ids)}}, {'username': 1, 'email': 1, 'first_name': 1}):
+                info[object_ids[user['_id']]] = {
+                    'username': user.get('username', ''),
+                    'email': user.get('email', ''),
+                    'first_name': user.get('first_name', ''),
+                }
+        except Exception as e:
+            logger.warning(f"Error bulk-loading campaign users: {e}")
+        return info
+    
+    def _bulk_user_stats(self, user_ids: list, users_info: dict, today_start: datetime,
+                         clicks_col, conversions_col, email_activity_col, offer_send_col, push_mail_col) -> dict:
+        """
+        Preview stats for every user with one aggregation per collection instead of
+        several queries per user. A mail document counts for each preview user it is
+        addressed to (user_id, recipient_user_ids, recipient_ids or recipient_emails).
+        """
+        uid_strs = [str(uid) for uid in user_ids]
+        stats = {uid: {
+            'total_mail_sent': 0,
+            'mail_sent_today': 0,
+            'last_mail_sent': None,
+            'total_offers_sent': 0,
+            'offers_sent_today': 0,
+            'total_clicks': 0,
+            'total_conversions': 0,
+        } for uid in uid_strs}
+        if not uid_strs:
+            return stats
+        
+        def count_by_user(col, field):
+            if col is None:
+                return
+            pipeline = [
+                {'$match': {'user_id': {'$in': uid_strs}}},
+                {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
+            ]
+            for row in col.aggregate(pipeline, allowDiskUse=True):
+                if row['_id'] in stats:
+                    stats[row['_id']][field] = row['count']
+        
+        email_to_uid = {}
+        for uid, info in users_info.items():
+            if info.get('email'):
+                email_to_uid.setdefault(info['email'], set()).add(str(uid))
+        mail_query = {'$or': [
+            {'user_id': {'$in': uid_strs}},
+            {'recipient_user_ids': {'$in': uid_strs}},
+            {'recipient_ids': {'$in': uid_strs}},
+        ]}
+        if email_to_uid:
+            mail_query['$or'].append({'recipient_emails': {'$in': list(email_to_uid)}})
+        wanted = set(uid_strs)
+        
+        def recipients(doc):
+            found = set()
+            if doc.get('user_id') in wanted:
+                found.add(doc['user_id'])
+            for field in ('recipient_user_ids', 'recipient_ids'):
+                values = doc.get(field) or []
+                if isinstance(values, str):
+                    values = [values]
+                found.update(v for v in values if v in wanted)
+            emails = doc.get('recipient_emails') or []
+            if isinstance(emails, str):
+                emails = [emails]
+            for email in emails:
+                found.update(email_to_uid.get(email, ()))
+            return found
+        
+        projection = {'user_id': 1, 'recipient_user_ids': 1, 'recipient_ids': 1, 'recipient_emails': 1,
+                      'offer_ids': 1, 'offer_count': 1, 'created_at': 1}
+        
+        def tally(col, use_offer_count):
+            if col is None:
+                return
+            for doc in col.find(mail_query, projection):
+                if use_offer_count:
+                    oc = doc.get('offer_count', len(doc.get('offer_ids', [])))
+                else:
+                    oc = len(doc.get('offer_ids', []))
+                dt = doc.get('created_at')
+                for uid in recipients(doc):
+                    s = stats[uid]
+                    s['total_mail_sent'] += 1
+                    s['total_offers_sent'] += oc
+                    if dt:
+                        if dt >= today_start:
+                            s['mail_sent_today'] += 1
+                            s['offers_sent_today'] += oc
+                        if s['last_mail_sent'] is None or dt > s['last_mail_sent']:
+                            s['last_mail_sent'] = dt
+        
+        try:
+            count_by_user(clicks_col, 'total_clicks')
+            count_by_user(conversions_col, 'total_conversions')
+            tally(email_activity_col, True)
+            tally(offer_send_col, True)
+            tally(push_mail_col, False)
+        except Exception as stats_err:
+            logger.warning(f"Error fetching campaign preview stats: {stats_err}")
+        return stats
@@ -0,0 +1,293 @@
+"""
+Smart Rules Compiler
+Turns an offer's smartRules into a precomputed decision table so a click is
+resolved with a couple of dict/list lookups instead of re-evaluating every rule.
+
+Table layout:  geo -> hour slot -> rotation bucket (1-100) -> RuleDecision
+- geo:    one table per country named in any rule, plus a wildcard table
+- hour:   24 slots when Time rules have constraints, otherwise a single slot
+- bucket: 100 slots when Rotation rules exist, otherwise a single slot
+
+Rule cap usage is tracked by RuleCapCounters: in-memory per-day counters that
+are flushed to the smart_rule_cap_usage collection on an interval, so cap
+checks never query MongoDB on the click path.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+
+from database import db_instance
+
+logger = logging.getLogger(__name__)
+
+WILDCARD_GEO = '*'
+ROTATION_BUCKETS = 100
+
+
+class RuleDecision:
+    """Outcome for one (geo, hour, bucket) cell: primary rule plus capped fallbacks."""
+
+    __slots__ = ('rule', 'backups')
+
+    def __init__(self, rule, backups):
+        self.rule = rule
+        self.backups = backups
+
+
+def _priority(rule):
+    return rule.get('priority', 999)
+
+
+def _hour_in_window(rule, hour):
+    """Same semantics as SmartRulesResolver.check_time_constraints, for a bare hour."""
+    time_constraints = rule.get('timeConstraints', {})
+    if not time_constraints:
+        return True
+
+    start_hour = time_constraints.get('startHour', 0)
+    end_hour = time_constraints.get('endHour', 23)
+
+    if start_hour <= end_hour:
+        return start_hour <= hour <= end_hour
+    return hour >= start_hour or hour <= end_hour
+
+
+class CompiledRuleSet:
+    """Precomputed smart-rule decisions for a single offer."""
+
+    def __init__(self, offer_id, smart_rules):
+        self.offer_id = offer_id
+        self.rule_count = 0
+        self.has_time_slots = False
+        self.has_rotation = False
+        self._tables = {}
+        self._compile(smart_rules or [])
+
+    # ------------------------------------------------------------------ compile
+
+    def _compile(self, smart_rules):
+        rules = sorted((r for r in smart_rules if r.get('active', True)), key=_priority)
+        self.rule_count = len(rules)
+        if not rules:
+            return
+
+        self.has_time_slots = any(r.get('type') == 'Time' and r.get('timeConstraints') for r in rules)
+        self.has_rotation = any(r.get('type') == 'Rotation' for r in rules)
+
+        geos = {geo for r in rules for geo in (r.get('geo') or [])}
+        hours = range(24) if self.has_time_slots else (0,)
+
+        # Identical applicable-rule lists share one compiled bucket row
+        row_cache = {}
+        for geo in list(geos) + [WILDCARD_GEO]:
+            slots = []
+            for hour in hours:
+                applicable = [
+                    r for r in rules
+                    if (not r.get('geo') or geo in r['geo'])
+                    and (r.get('type') != 'Time' or _hour_in_window(r, hour))
+                ]
+                signature = tuple(id(r) for r in applicable)
+                row = row_cache.get(signature)
+                if row is None:
+                    row = self._compile_buckets(applicable, geo)
+                    row_cache[signature] = row
+                slots.append(row)
+            self._tables[geo] = slots
+
+    def _compile_buckets(self, applicable, geo):
+        """Build the per-bucket decisions for one ordered list of applicable rules."""
+        if not applicable:
+            return None
+
+        backups = tuple(r for r in applicable if r.get('type') == 'Backup')
+        fallback = RuleDecision(backups[0] if backups else None, backups[1:])
+        bucket_count = ROTATION_BUCKETS if self.has_rotation else 1
+        row = [None] * bucket_count
+
+        # Walk rules in priority order, assigning each still-undecided bucket
+        # to the first rule that would select it. A Rotation rule claims its
+        # percentage of the buckets still undecided (like an independent roll
+        # per rule); every other selecting rule claims all that remain.
+        decided = 0
+        for rule in applicable:
+            rule_type = rule.get('type')
+            if rule_type == 'GEO':
+                if geo == WILDCARD_GEO or geo not in (rule.get('geo') or []):
+                    continue
+                claim = bucket_count
+            elif rule_type == 'Rotation':
+                percentage = rule.get('percentage', 0) or 0
+                if percentage <= 0:
+                    continue
+                if percentage >= 100:
+                    claim = bucket_count
+                else:
+                    claim = decided + (bucket_count - decided) * int(percentage) // 100
+            elif rule_type == 'Time':
+                claim = bucket_count
+            else:
+                continue
+
+            if claim > decided:
+                decision = RuleDecision(rule, backups)
+                for i in range(decided, claim):
+                    row[i] = decision
+                decided = claim
+            if decided >= bucket_count:
+                break
+
+        for i in range(decided, bucket_count):
+            row[i] = fallback
+        return row
+
+    # ------------------------------------------------------------------ lookup
+
+    def bucket_for(self, user_context):
+        """Sticky rotation bucket (1-100) for this visitor on this offer."""
+        if not self.has_rotation:
+            return 1
+        hash_input = f"{self.offer_id}_{user_context.get('subid')}_{user_context.get('ip')}"
+        return (int(hashlib.md5(hash_input.encode()).hexdigest()[:8], 16) % ROTATION_BUCKETS) + 1
+
+    def decide(self, user_context):
+        """Return the RuleDecision for this click, or None if no rule applies."""
+        slots = self._tables.get(user_context.get('geo')) or self._tables.get(WILDCARD_GEO)
+        if not slots:
+            return None
+        row = slots[user_context['timestamp'].hour if self.has_time_slots else 0]
+        if row is None:
+            return None
+        return row[self.bucket_for(user_context) - 1 if self.has_rotation else 0]
+
+
+class RuleCapCounters:
+    """Per-day smart-rule usage counters kept in memory and flushed periodically."""
+
+    def __init__(self, flush_interval=10):
+        self.collection = db_instance.get_collection('smart_rule_cap_usage')
+        self.flush_interval = flush_interval
+        self._baseline = {}  # (offer_id, rule_id, day) -> count persisted as of last sync
+        self._pending = {}   # (offer_id, rule_id, day) -> clicks not yet flushed
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _key(offer_id, rule):
+        return (offer_id, str(rule['_id']), datetime.utcnow().strftime('%Y-%m-%d'))
+
+    def _load_baseline(self, key):
+        count = 0
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one(
+                    {'offer_id': key[0], 'rule_id': key[1], 'date': key[2]}, {'count': 1}
+                )
+                count = (doc or {}).get('count', 0)
+            except Exception as e:
+                logger.error(f"Error loading rule cap usage: {str(e)}")
+        return count
+
+    def usage(self, offer_id, rule):
+        key = self._key(offer_id, rule)
+        with self._lock:
+            baseline = self._baseline.get(key)
+        if baseline is None:
+            baseline = self._load_baseline(key)
+            with self._lock:
+                baseline = self._baseline.setdefault(key, baseline)
+        with self._lock:
+            return baseline + self._pending.get(key, 0)
+
+    def has_capacity(self, offer_id, rule):
+        cap = rule.get('cap', 0) or 0
+        if cap <= 0:
+            return True
+        return self.usage(offer_id, rule) < cap
+
+    def record(self, offer_id, rule):
+        if (rule.get('cap', 0) or 0) <= 0:
+            return
+        key = self._key(offer_id, rule)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run_loop, daemon=True, name="SmartRuleCapFlusher")
+            self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Rule cap flush failed: {e}")
+
+    def flush(self):
+        """Persist pending deltas and refresh baselines with other workers' usage."""
+        if self.collection is None:
+            return
+        with self._lock:
+            pending = dict(self._pending)
+
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        for key, delta in pending.items():
+            query = {'offer_id': key[0], 'rule_id': key[1], 'date': key[2]}
+            update = {'$inc': {'count': delta}, '$set': {'updated_at': datetime.utcnow()}}
+            try:
+                try:
+                    doc = self.collection.find_one_and_update(
+                        query, update, upsert=True, return_document=ReturnDocument.AFTER
+                    )
+                except DuplicateKeyError:
+                    # Another worker inserted the day's counter first; it exists now
+                    doc = self.collection.find_one_and_update(
+                        query, update, return_document=ReturnDocument.AFTER
+                    )
+            except Exception as e:
+                logger.error(f"Error flushing rule cap usage: {str(e)}")
+                continue
+            # Move the delta from pending into the baseline in one step so usage() never undercounts
+            with self._lock:
+                remaining = self._pending.get(key, 0) - delta
+                if remaining > 0:
+                    self._pending[key] = remaining
+                else:
+                    self._pending.pop(key, None)
+                self._baseline[key] = (doc or {}).get('count', 0)
+
+        # Forget previous days, then pick up other workers' usage for today
+        with self._lock:
+            for key in [k for k in self._baseline if k[2] != today]:
+                del self._baseline[key]
+            offer_ids = list({k[0] for k in self._baseline})
+        if not offer_ids:
+            return
+        try:
+            docs = self.collection.find(
+                {'date': today, 'offer_id': {'$in': offer_ids}},
+                {'offer_id': 1, 'rule_id': 1, 'count': 1}
+            )
+            with self._lock:
+                for doc in docs:
+                    key = (doc['offer_id'], doc['rule_id'], today)
+                    if key in self._baseline:
+                        self._baseline[key] = doc.get('count', 0)
+        except Exception as e:
+            logger.error(f"Error refreshing rule cap usage: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {'tracked_rules': len(self._baseline), 'pending_keys': len(self._pending)}
@@ -1,11 +1,17 @@
 """
 Smart Rules Resolver Service
-Handles real-time destination URL resolution based on smart rules logic
+Handles real-time destination URL resolution based on smart rules logic.
+
+Each offer's rules are compiled once (see services.smart_rules_compiler) and the
+compiled table is cached alongside the offer, so per-click resolution cost does
+not grow with the number of rules.
 """
 
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from models.offer_extended import OfferExtended
 from services.tracking_service import TrackingService
+from services.smart_rules_compiler import CompiledRuleSet, RuleCapCounters
+from utils.cache import get_cache
 import logging
 import hashlib
 import random
@@ -16,8 +22,11 @@ class SmartRulesResolver:
         self.offer_model = OfferExtended()
         self.tracking_service = TrackingService()
         self.logger = logging.getLogger(__name__)
-        self.cache = {}  # Simple in-memory cache
-        self.cache_ttl = 60  # 60 seconds cache TTL
+        self.cache_ttl = 60  # Short: not every offer write publishes to the cache bus
+        self.cache_max = 2000
+        # offer_id -> (offer, compiled rules); compiled rule sets stay in-process
+        self.cache = get_cache('smart_rules', ttl=self.cache_ttl, max_size=self.cache_max, backend='memory')
+        self.cap_counters = RuleCapCounters()
     
     def resolve_destination_url(self, offer_id, user_context):
         """
@@ -47,32 +56,31 @@ class SmartRulesResolver:
         try:
             start_time = datetime.utcnow()
             
-            # STEP 1: Get offer and validate
-            offer = self.get_active_offer(offer_id)
+            # STEP 1: Get offer and its compiled rules
+            offer, compiled = self.get_compiled_offer(offer_id)
             if not offer:
                 return self.get_error_response("Offer not found or inactive")
             
-            # STEP 2: Get applicable smart rules
-            applicable_rules = self.get_applicable_rules(offer, user_context)
-            if not applicable_rules:
+            # STEP 2: Look up the precomputed decision for geo / hour / rotation bucket
+            decision = compiled.decide(user_context)
+            if decision is None:
                 return self.get_fallback_response(offer, "No applicable rules found")
             
-            # STEP 3: Apply rule resolution logic
-            selected_rule = self.apply_resolution_logic(applicable_rules, user_context)
+            selected_rule = decision.rule
             if not selected_rule:
                 return self.get_fallback_response(offer, "Rule resolution failed")
             
-            # STEP 4: Check caps and limits
+            # STEP 3: Check caps against in-memory counters, falling back to backup rules
             if not self.check_rule_caps(selected_rule, offer_id):
-                # Try backup rules
-                backup_rule = self.get_backup_rule(applicable_rules, offer_id)
+                backup_rule = self.get_backup_rule(decision.backups, offer_id)
                 if backup_rule:
                     selected_rule = backup_rule
                     self.logger.info(f"Using backup rule for {offer_id}: cap reached on primary rule")
                 else:
                     return self.get_fallback_response(offer, "All rules at capacity")
+            self.cap_counters.record(offer_id, selected_rule)
             
-            # STEP 5: Track click and return URL
+            # STEP 4: Track click and return URL
             tracking_data = self.track_click(offer_id, selected_rule, user_context)
             
             # Calculate resolution time
@@ -94,100 +102,39 @@ class SmartRulesResolver:
     
     def get_active_offer(self, offer_id):
         """Get active offer with caching"""
+        offer, _ = self.get_compiled_offer(offer_id)
+        return offer
+    
+    def get_compiled_offer(self, offer_id):
+        """Get active offer and its compiled smart rules, cached for cache_ttl seconds"""
         
-        cache_key = f"offer_{offer_id}"
-        
-        # Check cache first
-        if cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if (datetime.utcnow() - timestamp).total_seconds() < self.cache_ttl:
-                return cached_data
+        cached = self.cache.get(offer_id)
+        if cached is not None:
+            return cached
         
         try:
             if not self.offer_model._check_db_connection():
-                return None
+                return None, None
             
             offer = self.offer_model.collection.find_one({
                 'offer_id': offer_id,
                 'is_active': True,
                 'status': {'$in': ['active', 'Active']}
             })
+            compiled = CompiledRuleSet(offer_id, offer.get('smartRules', [])) if offer else None
             
-            # Cache the result
-            self.cache[cache_key] = (offer, datetime.utcnow())
+            # Cache the result (misses too, so unknown IDs don't hit the DB every click)
+            self.cache.set(offer_id, (offer, compiled))
             
-            return offer
+            return offer, compiled
             
         except Exception as e:
             self.logger.error(f"Error fetching offer {offer_id}: {str(e)}")
-            return None
+            return None, None
     
-    def get_applicable_rules(self, offer, user_context):
-        """Filter rules based on user context"""
-        
-        smart_rules = offer.get('smartRules', [])
-        applicable_rules = []
-        
-        for rule in smart_rules:
-            # Skip inactive rules
-            if not rule.get('active', True):
-                continue
-            
-            # Check GEO targeting
-            rule_geo = rule.get('geo', [])
-            if rule_geo and user_context['geo'] not in rule_geo:
-                continue
-            
-            # Check time-based rules (if type is 'Time')
-            if rule.get('type') == 'Time':
-                if not self.check_time_constraints(rule, user_context['timestamp']):
-                    continue
-            
-            applicable_rules.append(rule)
-        
-        return applicable_rules
-    
-    def apply_resolution_logic(self, rules, user_context):
-        """Apply smart rules resolution logic"""
-        
-        # STEP 1: Sort by priority (1 = highest priority)
-        rules.sort(key=lambda x: x.get('priority', 999))
-        
-        # STEP 2: Apply rule type logic
-        for rule in rules:
-            rule_type = rule.get('type')
-            
-            if rule_type == 'GEO':
-                # Direct GEO match - highest priority
-                if user_context['geo'] in rule.get('geo', []):
-                    self.logger.debug(f"Selected GEO rule for {user_context['geo']}: Priority {rule.get('priority')}")
-                    return rule
-            
-            elif rule_type == 'Rotation':
-                # Percentage-based rotation
-                if self.check_rotation_percentage(rule, user_context):
-                    self.logger.debug(f"Selected Rotation rule: {rule.get('percentage')}% - Priority {rule.get('priority')}")
-                    return rule
-            
-            elif rule_type == 'Time':
-                # Time-based routing
-                if self.check_time_constraints(rule, user_context['timestamp']):
-                    self.logger.debug(f"Selected Time rule: Priority {rule.get('priority')}")
-                    return rule
-            
-            elif rule_type == 'Backup':
-                # Backup rules - process last
-                continue
-        
-        # STEP 3: If no specific rule matched, try backup rules
-        backup_rules = [r for r in rules if r.get('type') == 'Backup']
-        if backup_rules:
-            # Sort backup rules by priority
-            backup_rules.sort(key=lambda x: x.get('priority', 999))
-            self.logger.debug(f"Using backup rule: Priority {backup_rules[0].get('priority')}")
-            return backup_rules[0]
-        
-        return None
+    def invalidate_offer(self, offer_id):
+        """Drop the cached offer and compiled rules after a smart-rule write"""
+        self.cache.invalidate(offer_id)
     
     def check_rotation_percentage(self, rule, user_context):
         """Check if user falls within rotation percentage"""
@@ -233,68 +180,22 @@ class SmartRulesResolver:
     def check_rule_caps(self, rule, offer_id):
         """Check if rule has reached its cap limit"""
         
-        cap = rule.get('cap', 0)
-        if cap <= 0:  # No cap limit
-            return True
-        
         try:
-            # Get current click count for this rule today
-            today = datetime.utcnow().date()
-            clicks_today = self.get_rule_clicks_today(offer_id, str(rule['_id']), today)
-            
-            return clicks_today < cap
-            
+            return self.cap_counters.has_capacity(offer_id, rule)
         except Exception as e:
             self.logger.error(f"Error checking rule caps: {str(e)}")
             return True  # Allow traffic if cap check fails
     
-    def get_rule_clicks_today(self, offer_id, rule_id, date):
-        """Get click count for rule today (with caching)"""
-        
-        cache_key = f"clicks_{offer_id}_{rule_id}_{date}"
-        
-        # Check cache
-        if cache_key in self.cache:
-            cached_count, timestamp = self.cache[cache_key]
-            if (datetime.utcnow() - timestamp).total_seconds() < 300:  # 5 minute cache
-                return cached_count
-        
-        try:
-            # Query tracking service or database
-            if hasattr(self.tracking_service, 'get_rule_clicks_count'):
-                count = self.tracking_service.get_rule_clicks_count(offer_id, rule_id, date)
-            else:
-                # Fallback: query database directly
-                count = self.offer_model.collection.count_documents({
-                    'offer_id': offer_id,
-                    'smartRules._id': rule_id,
-                    'clicks.date': {
-                        '$gte': datetime.combine(date, datetime.min.time()),
-                        '$lt': datetime.combine(date + timedelta(days=1), datetime.min.time())
-                    }
-                })
-            
-            # Cache the result
-            self.cache[cache_key] = (count, datetime.utcnow())
-            return count
-            
-        except Exception as e:
-            self.logger.error(f"Error getting rule clicks: {str(e)}")
-            return 0
+    def get_rule_clicks_today(self, offer_id, rule_id, date=None):
+        """Get click count for rule today from the in-memory cap counters"""
+        return self.cap_counters.usage(offer_id, {'_id': rule_id})
     
-    def get_backup_rule(self, rules, offer_id):
-        """Get backup rule when primary rules fail"""
+    def get_backup_rule(self, backup_rules, offer_id):
+        """Get first backup rule (already priority-ordered) that still has capacity"""
         
-        backup_rules = [r for r in rules if r.get('type') == 'Backup' and r.get('active', True)]
-        
-        if backup_rules:
-            # Sort by priority and return first available
-            backup_rules.sort(key=lambda x: x.get('priority', 999))
-            
-            for backup in backup_rules:
-                # Check caps for backup rules too
-                if self.check_rule_caps(backup, offer_id):
-                    return backup
+        for backup in backup_rules:
+            if self.check_rule_caps(backup, offer_id):
+                return backup
         
         return None
     
@@ -364,14 +265,16 @@ class SmartRulesResolver:
     
     def clear_cache(self):
         """Clear resolver cache"""
-        self.cache.clear()
+        self.cache.invalidate()
         self.logger.info("Resolver cache cleared")
     
     def get_cache_stats(self):
         """Get cache statistics"""
         return {
-            'cache_size': len(self.cache),
-            'cache_ttl': self.cache_ttl
+            'cache_size': self.cache.size(),
+            'cache_max': self.cache_max,
+            'cache_ttl': self.cache_ttl,
+            'rule_caps': self.cap_counters.stats()
         }
 
 # Singleton instance
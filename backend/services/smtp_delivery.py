@@ -0,0 +1,353 @@
+"""
+SMTP Delivery Engine
+Pooled, concurrent SMTP delivery shared by EmailService,
+EmailVerificationService and the bulk / campaign mailers.
+
+- Connections stay open and authenticated between messages (TLS handshake and
+  login once per connection instead of once per email). A connection is
+  recycled after SMTP_MESSAGES_PER_CONNECTION messages or when it has been
+  idle longer than SMTP_CONNECTION_MAX_IDLE seconds.
+- The first port/method that works (SSL 465 / STARTTLS 587) is remembered, so
+  new connections do not walk the port list again.
+- send_many() runs SMTP_SENDERS concurrent senders behind one token bucket
+  (SMTP_RATE_PER_SECOND) to stay within the provider's sending limit.
+- Transient failures (dropped connections, timeouts, 4xx replies) go to a
+  retry queue with exponential backoff; permanent ones (5xx replies, refused
+  recipients) fail straight away.
+- Throughput metrics (sent, failed, retried, emails/second) are kept per
+  campaign label.
+"""
+
+import heapq
+import logging
+import os
+import smtplib
+import ssl
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.rate_limit import HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+SMTP_SENDERS = int(os.environ.get('SMTP_SENDERS', '4'))
+SMTP_RATE_PER_SECOND = float(os.environ.get('SMTP_RATE_PER_SECOND', '10'))
+SMTP_MAX_RETRIES = int(os.environ.get('SMTP_MAX_RETRIES', '3'))
+SMTP_MESSAGES_PER_CONNECTION = int(os.environ.get('SMTP_MESSAGES_PER_CONNECTION', '100'))
+SMTP_CONNECTION_MAX_IDLE = float(os.environ.get('SMTP_CONNECTION_MAX_IDLE', '30'))
+SMTP_TIMEOUT = 30
+RETRY_BACKOFF_SECONDS = 2
+MAX_RETRY_BACKOFF_SECONDS = 60
+METRICS_MAX_CAMPAIGNS = 50
+
+TRANSACTIONAL = 'transactional'
+
+
+def preferred_ports(smtp_host: str) -> List[Tuple[int, str]]:
+    """Hostinger works best with SSL 465 first; Gmail needs STARTTLS 587 first."""
+    if 'hostinger' in (smtp_host or '').lower():
+        return [(465, 'SSL'), (587, 'STARTTLS')]
+    return [(587, 'STARTTLS'), (465, 'SSL')]
+
+
+class _Connection:
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+        self.reused = False
+
+
+class SMTPConnectionPool:
+    """Idle authenticated SMTP connections, reused LIFO."""
+
+    def __init__(self, host: str, user: str, password: str, ports: List[Tuple[int, str]], max_idle: int):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.ports = ports
+        self.max_idle = max(1, max_idle)
+        self.working_port: Optional[Tuple[int, str]] = None
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+        self.connects = 0
+
+    def _open(self, port: int, method: str):
+        ctx = ssl.create_default_context()
+        if method == 'STARTTLS':
+            server = smtplib.SMTP(self.host, port, timeout=SMTP_TIMEOUT)
+            try:
+                server.starttls(context=ctx)
+                server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+        else:
+            server = smtplib.SMTP_SSL(self.host, port, context=ctx, timeout=SMTP_TIMEOUT)
+            try:
+                server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+        return server
+
+    def connect(self) -> _Connection:
+        """Open a new authenticated connection, remembered port first."""
+        ports = self.ports
+        if self.working_port:
+            ports = [self.working_port] + [p for p in self.ports if p != self.working_port]
+        last_error = None
+        for port, method in ports:
+            try:
+                server = self._open(port, method)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️ SMTP {method} {self.host}:{port} failed: {e}")
+                continue
+            if self.working_port != (port, method):
+                logger.info(f"📧 SMTP connected via {method} port {port}")
+                self.working_port = (port, method)
+            with self._lock:
+                self.connects += 1
+            return _Connection(server)
+        raise last_error or smtplib.SMTPConnectError(-1, 'No SMTP ports configured')
+
+    def acquire(self) -> _Connection:
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if now - conn.last_used < SMTP_CONNECTION_MAX_IDLE:
+                    conn.reused = True
+                    return conn
+                self._close(conn)
+        return self.connect()
+
+    def release(self, conn: _Connection):
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if conn.sent < SMTP_MESSAGES_PER_CONNECTION and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+
+    def discard(self, conn: _Connection):
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn: _Connection):
+        try:
+            conn.server.quit()
+        except Exception:
+            try:
+                conn.server.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+
+class SMTPDeliveryEngine:
+    def __init__(self, host: str, user: str, password: str, ports: List[Tuple[int, str]] = None,
+                 senders: int = SMTP_SENDERS, rate: float = SMTP_RATE_PER_SECOND, max_retries: int = SMTP_MAX_RETRIES):
+        self.host = host
+        self.senders = max(1, senders)
+        self.max_retries = max_retries
+        self.pool = SMTPConnectionPool(host, user, password, ports or preferred_ports(host), max_idle=self.senders)
+        self.rate_limiter = HostRateLimiter(rate, self.senders)
+        self._metrics: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._metrics_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    def _deliver(self, msg) -> Tuple[bool, Optional[str], bool]:
+        """One delivery attempt: (ok, error, transient). A stale pooled connection gets one fresh retry."""
+        self.rate_limiter.acquire(self.host)
+        for _ in range(2):
+            try:
+                conn = self.pool.acquire()
+            except Exception as e:
+                return False, f'SMTP connect failed: {e}', True
+            try:
+                conn.server.send_message(msg)
+            except smtplib.SMTPRecipientsRefused as e:
+                self.pool.release(conn)  # the session is still usable after RSET
+                return False, f'Recipients refused: {", ".join(e.recipients)}', False
+            except smtplib.SMTPResponseException as e:
+                self.pool.discard(conn)
+                return False, f'SMTP {e.smtp_code}: {e.smtp_error!r}', e.smtp_code < 500
+            except Exception as e:
+                self.pool.discard(conn)
+                if conn.reused:
+                    continue  # server closed an idle connection: reconnect once
+                return False, f'SMTP send failed: {e}', True
+            conn.sent += 1
+            self.pool.release(conn)
+            return True, None, False
+        return False, 'SMTP connection dropped', True
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)), MAX_RETRY_BACKOFF_SECONDS)
+
+    def send(self, msg, campaign: str = TRANSACTIONAL) -> bool:
+        """Send one message on the calling thread, retrying transient failures with backoff."""
+        started = time.monotonic()
+        retried = 0
+        for attempt in range(1, self.max_retries + 2):
+            ok, error, transient = self._deliver(msg)
+            if ok or not transient or attempt > self.max_retries:
+                break
+            retried += 1
+            logger.warning(f"⚠️ {error} — retrying in {self._backoff(attempt):.0f}s")
+            time.sleep(self._backoff(attempt))
+        if not ok:
+            logger.error(f"❌ SMTP delivery failed: {error}")
+        self._record(campaign, sent=int(ok), failed=int(not ok), retried=retried,
+                     seconds=time.monotonic() - started, error=error)
+        return ok
+
+    def send_many(self, messages: List, campaign: str = TRANSACTIONAL,
+                  on_result: Callable[[int, bool, Optional[str]], None] = None,
+                  senders: int = None) -> List[Tuple[bool, Optional[str]]]:
+        """Send messages on concurrent senders; returns [(ok, error)] in input order.
+
+        on_result(index, ok, error) is called from the sender threads as each
+        message settles (delivered, permanently failed or out of retries).
+        """
+        messages = list(messages)
+        total = len(messages)
+        results: List[Optional[Tuple[bool, Optional[str]]]] = [None] * total
+        if not total:
+            return []
+
+        fresh = deque(range(total))
+        retry_heap: List[Tuple[float, int]] = []  # (not_before, index)
+        attempts = [0] * total
+        remaining = [total]
+        counts = {'sent': 0, 'failed': 0, 'retried': 0}
+        cond = threading.Condition()
+        started = time.monotonic()
+
+        def next_index():
+            with cond:
+                while remaining[0]:
+                    now = time.monotonic()
+                    if retry_heap and retry_heap[0][0] <= now:
+                        return heapq.heappop(retry_heap)[1]
+                    if fresh:
+                        return fresh.popleft()
+                    cond.wait(timeout=retry_heap[0][0] - now if retry_heap else None)
+                return None
+
+        def sender():
+            while True:
+                index = next_index()
+                if index is None:
+                    return
+                try:
+                    ok, error, transient = self._deliver(messages[index])
+                except Exception as e:
+                    ok, error, transient = False, str(e), False
+                attempts[index] += 1
+                if not ok and transient and attempts[index] <= self.max_retries:
+                    with cond:
+                        counts['retried'] += 1
+                        heapq.heappush(retry_heap, (time.monotonic() + self._backoff(attempts[index]), index))
+                        cond.notify()
+                    continue
+
+                results[index] = (ok, error)
+                if on_result:
+                    try:
+                        on_result(index, ok, error)
+                    except Exception as e:
+                        logger.error(f"Delivery result handler failed: {e}")
+                with cond:
+                    counts['sent' if ok else 'failed'] += 1
+                    remaining[0] -= 1
+                    cond.notify_all()
+
+        threads = [
+            threading.Thread(target=sender, daemon=True, name=f"smtp-sender-{i}")
+            for i in range(min(senders or self.senders, total))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.monotonic() - started
+        failed_errors = [r[1] for r in results if r and not r[0]]
+        self._record(campaign, sent=counts['sent'], failed=counts['failed'], retried=counts['retried'],
+                     seconds=elapsed, error=failed_errors[-1] if failed_errors else None)
+        logger.info(
+            f"📧 [{campaign}] {counts['sent']}/{total} delivered, {counts['failed']} failed, "
+            f"{counts['retried']} retries in {elapsed:.1f}s ({counts['sent'] / elapsed if elapsed else 0:.1f}/s)"
+        )
+        return results
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _record(self, campaign: str, sent: int, failed: int, retried: int, seconds: float, error: Optional[str]):
+        with self._metrics_lock:
+            entry = self._metrics.pop(campaign, None) or {
+                'sent': 0, 'failed': 0, 'retried': 0, 'send_seconds': 0.0,
+                'first_sent_at': datetime.utcnow() - timedelta(seconds=seconds), 'last_error': None,
+            }
+            entry['sent'] += sent
+            entry['failed'] += failed
+            entry['retried'] += retried
+            entry['send_seconds'] += seconds
+            entry['last_activity_at'] = datetime.utcnow()
+            if error:
+                entry['last_error'] = error
+            self._metrics[campaign] = entry  # most recently active last
+            while len(self._metrics) > METRICS_MAX_CAMPAIGNS:
+                self._metrics.popitem(last=False)
+
+    def metrics(self, campaign: str = None) -> Dict:
+        """Per-campaign throughput, or one campaign's when given."""
+        with self._metrics_lock:
+            campaigns = {
+                name: dict(entry, per_second=round(entry['sent'] / entry['send_seconds'], 2)
+                           if entry['send_seconds'] else None)
+                for name, entry in self._metrics.items()
+                if campaign is None or name == campaign
+            }
+        if campaign is not None:
+            return campaigns.get(campaign, {})
+        working_port = self.pool.working_port
+        return {
+            'host': self.host,
+            'working_port': f"{working_port[1]} {working_port[0]}" if working_port else None,
+            'senders': self.senders,
+            'rate_per_second': self.rate_limiter.rate,
+            'connections_opened': self.pool.connects,
+            'campaigns': campaigns,
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_smtp_delivery_engine() -> SMTPDeliveryEngine:
+    """Process-wide engine for the SMTP_* settings (one pool shared by every mailer)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            host = os.getenv('SMTP_HOST', 'smtp.hostinger.com')
+            _engine = SMTPDeliveryEngine(host, os.getenv('SMTP_USER'), os.getenv('SMTP_PASS'), preferred_ports(host))
+        return _engine
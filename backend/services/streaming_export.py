@@ -0,0 +1,308 @@
+"""
+Streaming Export
+Row-at-a-time CSV / JSON / XLSX writers for large exports.
+
+Rows are pulled from MongoDB cursors in batches (with projections) and written
+as they arrive, so memory stays flat no matter how many rows are exported:
+- CSV / JSON: a generator yields encoded chunks into a streamed Flask response
+- XLSX: an openpyxl write-only workbook is spooled to a temp file and sent
+
+Every export registers an ExportProgress entry that clients can poll by the
+export id returned in the X-Export-Id response header.
+"""
+
+import csv
+import io
+import json
+import logging
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from bson import ObjectId
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 1000     # documents per cursor batch
+CHUNK_ROWS = 500             # rows per chunk yielded to the response
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+MAX_TRACKED_EXPORTS = 200
+
+
+# ----------------------------------------------------------------------
+# Progress tracking
+# ----------------------------------------------------------------------
+
+class ExportProgress:
+    """Rows written and state of one export."""
+
+    def __init__(self, name, total=None):
+        self.export_id = uuid.uuid4().hex
+        self.name = name
+        self.total = total
+        self.rows = 0
+        self.state = 'running'
+        self.error = None
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+
+    def advance(self, count=1):
+        self.rows += count
+
+    def finish(self):
+        self.state = 'done'
+        self.finished_at = datetime.utcnow()
+        logger.info(f"📤 Export {self.name} finished: {self.rows} rows")
+
+    def fail(self, error):
+        self.state = 'failed'
+        self.error = str(error)
+        self.finished_at = datetime.utcnow()
+        logger.error(f"❌ Export {self.name} failed after {self.rows} rows: {error}")
+
+    def to_dict(self):
+        return {
+            'export_id': self.export_id,
+            'name': self.name,
+            'state': self.state,
+            'rows': self.rows,
+            'total': self.total,
+            'percent': round(self.rows / self.total * 100, 1) if self.total else None,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() + 'Z',
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+        }
+
+
+_exports = OrderedDict()
+_exports_lock = threading.Lock()
+
+
+def start_export(name, total=None):
+    """Register a new export and return its progress tracker."""
+    progress = ExportProgress(name, total)
+    with _exports_lock:
+        _exports[progress.export_id] = progress
+        while len(_exports) > MAX_TRACKED_EXPORTS:
+            _exports.popitem(last=False)
+    return progress
+
+
+def get_export_progress(export_id):
+    with _exports_lock:
+        progress = _exports.get(export_id)
+    return progress.to_dict() if progress else None
+
+
+# ----------------------------------------------------------------------
+# Row sources
+# ----------------------------------------------------------------------
+
+def iter_documents(collection, query=None, projection=None, sort=None, batch_size=EXPORT_BATCH_SIZE):
+    """Iterate a collection in cursor batches without materializing the result."""
+    cursor = collection.find(query or {}, projection).batch_size(batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+    try:
+        for doc in cursor:
+            yield doc
+    finally:
+        cursor.close()
+
+
+def iter_batches(iterable, size=EXPORT_BATCH_SIZE):
+    """Group an iterable into lists of at most `size` items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def cell_value(value):
+    """Flatten a Mongo value into something a CSV/XLSX cell can hold."""
+    if value is None:
+        return ''
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def dict_rows(docs, sample_size=EXPORT_BATCH_SIZE):
+    """
+    Turn schemaless documents into (header, row iterator).
+
+    The header is the ordered union of keys over the first `sample_size`
+    documents; keys that only appear later are dropped rather than forcing a
+    second pass.
+    """
+    docs = iter(docs)
+    sample = []
+    for doc in docs:
+        sample.append(doc)
+        if len(sample) >= sample_size:
+            break
+
+    header = []
+    seen = set()
+    for doc in sample:
+        for key in doc:
+            if key not in seen:
+                seen.add(key)
+                header.append(key)
+
+    def rows():
+        for doc in sample:
+            yield [doc.get(key) for key in header]
+        for doc in docs:
+            yield [doc.get(key) for key in header]
+
+    return header, rows()
+
+
+# ----------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------
+
+def csv_chunks(header, rows, progress=None):
+    """Yield CSV text in chunks of CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    try:
+        writer.writerow(header)
+        pending = 0
+        for row in rows:
+            writer.writerow([cell_value(v) for v in row])
+            pending += 1
+            if pending >= CHUNK_ROWS:
+                if progress:
+                    progress.advance(pending)
+                pending = 0
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        if progress:
+            progress.advance(pending)
+        yield buffer.getvalue()
+        if progress:
+            progress.finish()
+    except Exception as e:
+        if progress:
+            progress.fail(e)
+        raise
+
+
+def json_chunks(docs, progress=None, prefix='{"success": true, "data": [', suffix=']}'):
+    """
+    Yield a JSON document whose array is written one record at a time.
+    suffix may be a callable taking the record count, for trailing totals.
+    """
+    from utils.json_serializer import MongoJSONEncoder
+    encoder = MongoJSONEncoder()
+    try:
+        yield prefix
+        parts = []
+        count = 0
+        for doc in docs:
+            parts.append((',' if count else '') + encoder.encode(doc))
+            count += 1
+            if len(parts) >= CHUNK_ROWS:
+                if progress:
+                    progress.advance(len(parts))
+                yield ''.join(parts)
+                parts = []
+        if progress:
+            progress.advance(len(parts))
+        yield ''.join(parts) + (suffix(count) if callable(suffix) else suffix)
+        if progress:
+            progress.finish()
+    except Exception as e:
+        if progress:
+            progress.fail(e)
+        raise
+
+
+def write_xlsx(sheets, progress=None):
+    """
+    Write an XLSX workbook in openpyxl write-only mode and spool it to a temp file.
+
+    sheets: iterable of (title, header, rows[, column_widths]). Rows may contain
+    plain values or openpyxl WriteOnlyCell objects (for styling).
+    Returns a file object positioned at the start.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    spool = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES)
+    try:
+        for sheet in sheets:
+            title, header, rows = sheet[:3]
+            widths = sheet[3] if len(sheet) > 3 else None
+            ws = wb.create_sheet(title=title)
+            if widths:
+                from openpyxl.utils import get_column_letter
+                for idx, width in enumerate(widths, 1):
+                    ws.column_dimensions[get_column_letter(idx)].width = width
+            if header:
+                ws.append(header)
+            for row in rows:
+                ws.append(row)
+                if progress:
+                    progress.advance()
+        wb.save(spool)
+        spool.seek(0)
+        if progress:
+            progress.finish()
+        return spool
+    except Exception as e:
+        spool.close()
+        if progress:
+            progress.fail(e)
+        raise
+
+
+# ----------------------------------------------------------------------
+# Flask responses
+# ----------------------------------------------------------------------
+
+def stream_response(chunks, filename, mimetype, progress=None):
+    """Wrap a chunk generator in a streamed response (an attachment when filename is given)."""
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Tell reverse proxies not to buffer the whole file before forwarding
+    response.headers['X-Accel-Buffering'] = 'no'
+    if progress:
+        response.headers['X-Export-Id'] = progress.export_id
+    return response
+
+
+def stream_csv(filename, header, rows, total=None):
+    """Stream rows as a CSV attachment with progress tracking."""
+    progress = start_export(filename, total)
+    return stream_response(csv_chunks(header, rows, progress), filename, 'text/csv', progress)
+
+
+def send_spooled_file(file_obj, filename, mimetype, progress=None):
+    """Send a spooled temp file in blocks and close it when the response ends."""
+    def blocks():
+        try:
+            while True:
+                block = file_obj.read(64 * 1024)
+                if not block:
+                    break
+                yield block
+        finally:
+            file_obj.close()
+
+    return stream_response(blocks(), filename, mimetype, progress)
@@ -1,7 +1,7 @@
 """
 Telegram Bot: Sends top picked offers every 12 hours.
 Run standalone: python -m services.telegram_trending_bot
-Or import schedule_trending_updates() to run in background.
+In the app it runs as the 'telegram_trending' job (services.background_jobs).
 
 Setup: pip install python-telegram-bot
 Add TELEGRAM_BOT_TOKEN to .env
@@ -121,35 +121,10 @@ def send_trending_to_telegram():
 
 
 def run_trending_update():
-    """Synchronous wrapper for the send function."""
+    """Synchronous wrapper for the send function (scheduled every 12 hours as 'telegram_trending')."""
     send_trending_to_telegram()
 
 
-def start_scheduler():
-    """Run the bot on a 7-hour loop as a background thread. Call from app.py."""
-    import threading
-    import time as _time
-    
-    def _loop():
-        logger.info("📡 Telegram trending bot scheduler started (every 12 hours)")
-        # Wait 5 minutes before first send (avoids duplicate sends on rapid restarts/deploys)
-        _time.sleep(300)
-        try:
-            run_trending_update()
-        except Exception as e:
-            logger.error(f"Scheduler initial run error: {e}")
-        
-        while True:
-            _time.sleep(12 * 3600)  # Wait 12 hours
-            try:
-                run_trending_update()
-            except Exception as e:
-                logger.error(f"Scheduler error: {e}")
-    
-    t = threading.Thread(target=_loop, daemon=True)
-    t.start()
-
-
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     
@@ -356,7 +356,7 @@ def inject_offer_url_params(offer_url: str, offer_url_params: List[Dict]) -> str
 
 
 
-def apply_network_offer_params(offer_data: dict) -> dict:
+def apply_network_offer_params(offer_data: dict, partner_cache: Optional[Dict] = None) -> dict:
     """
     Auto-detect the Upward Partner for an offer based on its target_url domain,
     then inject the configured offer_url_params into the target_url.
@@ -365,6 +365,8 @@ def apply_network_offer_params(offer_data: dict) -> dict:
 
     Args:
         offer_data: Offer dict with at least 'target_url'
+        partner_cache: Optional dict reused across calls (e.g. one network sync) so the
+            partner lookup runs once per (hostname, network) instead of once per offer
 
     Returns:
         Updated offer_data with modified target_url if a matching partner was found
@@ -382,15 +384,26 @@ def apply_network_offer_params(offer_data: dict) -> dict:
 
     logger.info(f"apply_network_offer_params: Processing target_url='{target_url}'")
 
-    # Try domain-based lookup first
-    partner = get_partner_by_domain(target_url)
+    network_name = offer_data.get('network', '')
+    cache_key = None
+    if partner_cache is not None:
+        try:
+            cache_key = ((urlparse(target_url).hostname or '').lower(), network_name)
+        except ValueError:
+            pass  # malformed URL: look it up uncached, get_partner_by_domain handles it
+    if cache_key is not None and cache_key in partner_cache:
+        partner = partner_cache[cache_key]
+    else:
+        # Try domain-based lookup first
+        partner = get_partner_by_domain(target_url)
 
-    # Fallback: if no domain match, try matching by network name
-    if not partner:
-        network_name = offer_data.get('network', '')
-        if network_name:
+        # Fallback: if no domain match, try matching by network name
+        if not partner and network_name:
             partner = get_partner_by_name(network_name)
 
+        if cache_key is not None:
+            partner_cache[cache_key] = partner
+
     if not partner:
         logger.info(f"apply_network_offer_params: No partner matched for URL '{target_url}'")
         return offer_data
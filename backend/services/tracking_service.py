@@ -7,9 +7,8 @@ import logging
 import requests
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import json
-from threading import Thread
-import time
 from models.tracking_events import TrackingEvents
+from models.click_events import record_click_event
 from services.bonus_calculation_service import BonusCalculationService
 
 class TrackingService:
@@ -185,6 +184,7 @@ class TrackingService:
             # Insert click record
             result = self.clicks_collection.insert_one(click_doc)
             click_doc['_id'] = str(result.inserted_id)
+            record_click_event('clicks', click_doc)
             
             # Log tracking event
             self.tracking_events.log_click_event(
@@ -601,38 +601,25 @@ class TrackingService:
             self.logger.error(f"Error validating traffic source: {str(e)}")
             return False, f"Traffic source validation error: {str(e)}"
     
-    def start_postback_processor(self):
-        """Start background postback processor
+    def run_postback_processor(self):
+        """Deliver pending postbacks — one pass (scheduled every 60 seconds as 'postback_processor').
         
         OPTIMIZED:
-        - Uses requests.Session for connection pooling (reuses TCP connections)
+        - Uses requests.Session for connection pooling (reuses TCP connections across runs)
         - Reduced HTTP timeout from 30s to 10s (prevents thread blocking)
-        - Processes every 60s instead of 30s to reduce DB polling
         """
-        # Create a session with connection pooling for postback HTTP requests
-        self._postback_session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=10,
-            pool_maxsize=20,
-            max_retries=0  # We handle retries ourselves
-        )
-        self._postback_session.mount('http://', adapter)
-        self._postback_session.mount('https://', adapter)
-        
-        def processor_loop():
-            while True:
-                try:
-                    self.process_postback_queue()
-                    time.sleep(60)  # Process every 60 seconds (was 30)
-                except Exception as e:
-                    self.logger.error(f"Error in postback processor: {str(e)}")
-                    time.sleep(120)  # Sleep 2 minutes on error
-        
-        processor_thread = Thread(target=processor_loop, daemon=True)
-        processor_thread.start()
-        self.logger.info("Postback processor started (optimized)")
+        if getattr(self, '_postback_session', None) is None:
+            # Create a session with connection pooling for postback HTTP requests
+            self._postback_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=20,
+                max_retries=0  # We handle retries ourselves
+            )
+            self._postback_session.mount('http://', adapter)
+            self._postback_session.mount('https://', adapter)
         
-        return processor_thread
+        self.process_postback_queue()
     
     def track_offer_completion(self, offer_id: str, user_id: str, external_data: dict = None) -> dict:
         """
@@ -674,6 +661,7 @@ class TrackingService:
                 }
                 
                 result = self.clicks_collection.insert_one(click_doc)
+                record_click_event('clicks', click_doc)
                 click_id = click_doc['click_id']
                 self.logger.info(f"Created synthetic click for direct completion: {click_id}")
                 
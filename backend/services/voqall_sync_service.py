@@ -13,15 +13,15 @@ The service runs as a daemon thread started once per worker process.
 
 import logging
 import threading
-import time
 import concurrent.futures
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+from utils.cache import cached
+
 logger = logging.getLogger(__name__)
 
-# ── Lookup cache (in-memory, shared across calls within the same process) ──────
-_LOOKUP_CACHE: Dict[str, dict] = {}       # key → {data, expires}
+# ── Lookup cache (per api_key, see utils.cache) ─────────────────────────────────
 _LOOKUP_CACHE_TTL = 24 * 3600             # 24 hours
 
 
@@ -51,6 +51,7 @@ class VoqallSyncService:
 
     _instance = None
     _lock = threading.Lock()
+    INTERVAL_SECONDS = 23 * 3600          # 23 hours in seconds
 
     def __new__(cls):
         if cls._instance is None:
@@ -64,39 +65,22 @@ class VoqallSyncService:
         if self._initialized:
             return
         self._initialized = True
-        self._running = False
-        self._thread = None
-        self._interval = 23 * 3600          # 23 hours in seconds
         self._last_run: Optional[datetime] = None
         self._last_result: Optional[dict] = None
         logger.info("VoqallSyncService initialized")
 
     # ── Public API ───────────────────────────────────────────────────────────────
 
-    def start(self):
-        if self._running:
-            logger.warning("VoqallSyncService is already running")
-            return
-        self._running = True
-        self._thread = threading.Thread(
-            target=self._loop, daemon=True, name='voqall-sync'
-        )
-        self._thread.start()
-        logger.info("✅ Voqall auto-sync service started (every 23 hours)")
-
-    def stop(self):
-        self._running = False
-        logger.info("VoqallSyncService stopped")
-
     def get_status(self) -> dict:
+        from services.job_scheduler import get_job_scheduler
+        job = get_job_scheduler().job_status('voqall_sync')
+        last_run = (job['cluster']['last_finished_at'] if job else None) or self._last_run
+        next_run = job['next_run_at'] if job else None
         return {
-            'running': self._running,
-            'interval_hours': self._interval / 3600,
-            'last_run': self._last_run.isoformat() + 'Z' if self._last_run else None,
-            'next_run': (
-                (self._last_run + timedelta(seconds=self._interval)).isoformat() + 'Z'
-                if self._last_run else 'on next loop'
-            ),
+            'running': job is not None,
+            'interval_hours': self.INTERVAL_SECONDS / 3600,
+            'last_run': last_run.isoformat() + 'Z' if last_run else None,
+            'next_run': next_run.isoformat() + 'Z' if next_run else 'not scheduled',
             'last_result': self._last_result,
         }
 
@@ -105,19 +89,13 @@ class VoqallSyncService:
         logger.info("🔄 Voqall sync triggered manually")
         return self._sync_all_voqall_presets()
 
-    # ── Background loop ──────────────────────────────────────────────────────────
+    # ── Scheduled job ────────────────────────────────────────────────────────────
 
-    def _loop(self):
-        logger.info("🔄 Voqall sync loop started")
-        while self._running:
-            try:
-                result = self._sync_all_voqall_presets()
-                self._last_run = datetime.utcnow()
-                self._last_result = result
-            except Exception as e:
-                logger.error(f"Voqall sync loop error: {e}", exc_info=True)
-            # Sleep for 23 hours before next run
-            time.sleep(self._interval)
+    def run_scheduled(self):
+        """Scheduled every INTERVAL_SECONDS as 'voqall_sync' (services.background_jobs)."""
+        result = self._sync_all_voqall_presets()
+        self._last_run = datetime.utcnow()
+        self._last_result = result
 
     # ── Core sync logic ──────────────────────────────────────────────────────────
 
@@ -295,20 +273,13 @@ class VoqallSyncService:
 
     # ── Lookup fetching with 24h cache ───────────────────────────────────────────
 
+    @cached('voqall_lookups', ttl=_LOOKUP_CACHE_TTL, max_size=32,
+            key=lambda self, api_key, network_id: f"voqall_lookups_{api_key[:12]}")
     def _fetch_lookups_cached(self, api_key: str, network_id: str) -> dict:
         """
         Fetch /collection/languages, /collection/industries, /collection/studytypes
         in parallel.  Results are cached for 24 hours per api_key.
         """
-        cache_key = f"voqall_lookups_{api_key[:12]}"
-        now = time.time()
-
-        if cache_key in _LOOKUP_CACHE:
-            entry = _LOOKUP_CACHE[cache_key]
-            if entry['expires'] > now:
-                logger.debug("Voqall lookups: using cached data")
-                return entry['data']
-
         from services.network_api_service import network_api_service
         base_url = network_api_service._voqall_resolve_base_url(network_id, api_key)
 
@@ -345,7 +316,6 @@ class VoqallSyncService:
             'studytype_map': self._build_studytype_map(raw.get('studytypes', {})),
         }
 
-        _LOOKUP_CACHE[cache_key] = {'data': lookups, 'expires': now + _LOOKUP_CACHE_TTL}
         logger.info(
             f"Voqall lookups fetched: "
             f"{len(lookups['language_map'])} languages, "
@@ -5,7 +5,7 @@ Supports Excel (.xlsx, .xls), CSV, and Google Sheets
 """
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Any, Optional
+from typing import List, Dict, Tuple, Any, Optional, Iterable, Iterator
 import csv
 import io
 import re
@@ -360,55 +360,57 @@ def normalize_column_name(column: str) -> str:
 
 
 
-def parse_excel_file(file_path: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+def iter_excel_rows(file_path: str) -> Iterator[Dict[str, Any]]:
     """
-    Parse Excel file (.xlsx, .xls) and return list of row dictionaries
+    Stream the rows of an Excel file (.xlsx, .xls) as row dictionaries.
     
-    Args:
-        file_path: Path to Excel file
-        
-    Returns:
-        Tuple of (list of row dicts, error message if any)
+    The workbook is opened read-only, so memory stays constant however many rows
+    the sheet has. Empty rows are skipped; each row carries its sheet row number
+    in '_row_number'. Parsing errors are raised.
     """
+    workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
     try:
-        workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
         sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
         
         # Get headers from first row
-        headers = []
-        first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
-        for cell in first_row:
-            if cell:
-                headers.append(normalize_column_name(str(cell)))
-            else:
-                headers.append(None)
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+        headers = [normalize_column_name(str(cell)) if cell else None for cell in first_row]
         
         # Parse data rows
-        rows = []
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+        for row_idx, row in enumerate(rows, start=2):
             row_data = {}
             has_data = False
             
             for idx, value in enumerate(row):
-                if idx < len(headers) and headers[idx]:
+                if idx < len(headers) and headers[idx] and value is not None:
                     # Convert value to string and clean it
-                    if value is not None:
-                        # Handle different data types
-                        if isinstance(value, (int, float)):
-                            row_data[headers[idx]] = str(value).strip()
-                        else:
-                            row_data[headers[idx]] = str(value).strip()
-                        
-                        if row_data[headers[idx]]:  # Check if not empty after stripping
-                            has_data = True
+                    row_data[headers[idx]] = str(value).strip()
+                    if row_data[headers[idx]]:  # Check if not empty after stripping
+                        has_data = True
             
-            # Only add row if it has at least one non-empty value
+            # Only yield row if it has at least one non-empty value
             if has_data:
                 row_data['_row_number'] = row_idx
-                rows.append(row_data)
-        
+                yield row_data
+    finally:
         workbook.close()
-        return rows, None
+
+
+def parse_excel_file(file_path: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Parse Excel file (.xlsx, .xls) and return list of row dictionaries
+    
+    Args:
+        file_path: Path to Excel file
+        
+    Returns:
+        Tuple of (list of row dicts, error message if any)
+    """
+    try:
+        return list(iter_excel_rows(file_path)), None
         
     except Exception as e:
         import logging
@@ -416,6 +418,39 @@ def parse_excel_file(file_path: str) -> Tuple[List[Dict[str, Any]], Optional[str
         return [], f"Error parsing Excel file: {str(e)}"
 
 
+def iter_csv_rows(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the rows of a CSV file as row dictionaries with normalized column names.
+    
+    Empty rows are skipped; each row carries its line-based row number in
+    '_row_number'. Parsing errors are raised.
+    """
+    with open(file_path, 'r', encoding='utf-8-sig') as csvfile:
+        # Try to detect delimiter
+        sample = csvfile.read(1024)
+        csvfile.seek(0)
+        
+        sniffer = csv.Sniffer()
+        try:
+            dialect = sniffer.sniff(sample)
+        except csv.Error:
+            dialect = csv.excel
+        
+        reader = csv.DictReader(csvfile, dialect=dialect)
+        
+        for row_idx, row in enumerate(reader, start=2):  # Start at 2 since row 1 is headers
+            normalized_row = {}
+            for original_key, value in row.items():
+                if original_key is None:
+                    continue  # values beyond the header row
+                normalized_row[normalize_column_name(original_key)] = value
+            
+            # Skip empty rows
+            if any(normalized_row.values()):
+                normalized_row['_row_number'] = row_idx
+                yield normalized_row
+
+
 def parse_csv_file(file_path: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
     Parse CSV file and return list of row dictionaries
@@ -427,40 +462,54 @@ def parse_csv_file(file_path: str) -> Tuple[List[Dict[str, Any]], Optional[str]]
         Tuple of (list of row dicts, error message if any)
     """
     try:
-        rows = []
-        with open(file_path, 'r', encoding='utf-8-sig') as csvfile:
-            # Try to detect delimiter
-            sample = csvfile.read(1024)
-            csvfile.seek(0)
-            
-            sniffer = csv.Sniffer()
-            try:
-                dialect = sniffer.sniff(sample)
-            except:
-                dialect = csv.excel
-            
-            reader = csv.DictReader(csvfile, dialect=dialect)
-            
-            # Normalize headers
-            normalized_fieldnames = [normalize_column_name(field) for field in reader.fieldnames]
-            
-            for row_idx, row in enumerate(reader, start=2):  # Start at 2 since row 1 is headers
-                normalized_row = {}
-                for original_key, value in row.items():
-                    normalized_key = normalize_column_name(original_key)
-                    normalized_row[normalized_key] = value
-                
-                # Skip empty rows
-                if any(normalized_row.values()):
-                    normalized_row['_row_number'] = row_idx
-                    rows.append(normalized_row)
-        
-        return rows, None
+        return list(iter_csv_rows(file_path)), None
         
     except Exception as e:
         return [], f"Error parsing CSV file: {str(e)}"
 
 
+def iter_spreadsheet_rows(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream rows from an Excel or CSV file, chosen by extension."""
+    if file_path.lower().endswith(('.xlsx', '.xls')):
+        return iter_excel_rows(file_path)
+    return iter_csv_rows(file_path)
+
+
+def estimate_spreadsheet_rows(file_path: str) -> int:
+    """
+    Cheap upper estimate of the data rows in a spreadsheet, for progress reporting
+    before the file has been read: the sheet dimension for Excel, the line count
+    for CSV. Returns 0 when unknown.
+    """
+    try:
+        if file_path.lower().endswith(('.xlsx', '.xls')):
+            workbook = load_workbook(filename=file_path, read_only=True)
+            try:
+                max_row = workbook.active.max_row
+            finally:
+                workbook.close()
+            return max(int(max_row or 0) - 1, 0)
+        lines = 0
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                lines += block.count(b'\n')
+        return max(lines - 1, 0)
+    except Exception:
+        return 0
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of up to size items without materializing it."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def fetch_google_sheet(sheet_url: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
     Fetch data from Google Sheets URL (public sheet export as CSV)
@@ -906,189 +955,226 @@ def validate_spreadsheet_data(rows: List[Dict[str, Any]], store_missing: bool =
     error_rows = []
     missing_offers_rows = []
     
+    for kind, entry in iter_validated_rows(rows, store_missing):
+        if kind == 'valid':
+            valid_rows.append(entry)
+        elif kind == 'missing':
+            missing_offers_rows.append(entry)
+        else:
+            error_rows.append(entry)
+    
+    return valid_rows, error_rows, missing_offers_rows
+
+
+def iter_validated_rows(rows: Iterable[Dict[str, Any]], store_missing: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Validate rows one at a time as they are read (see validate_spreadsheet_row).
+    
+    Yields:
+        ('valid' | 'error' | 'missing', entry) per row, in input order
+    """
     for row in rows:
-        row_number = row.get('_row_number', 'Unknown')
-        errors = []
-        missing_fields = []
-        warnings = []
-        
-        # Map spreadsheet columns to database fields
-        mapped_data = map_spreadsheet_to_db(row)
+        yield validate_spreadsheet_row(row, store_missing)
+
+
+def validate_spreadsheet_row(row: Dict[str, Any], store_missing: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """
+    Validate one raw spreadsheet row and apply field mapping and defaults.
+    
+    Returns:
+        ('valid', validated offer data), ('error', error row) or ('missing', missing offer row),
+        with the same entry formats validate_spreadsheet_data returns in its three lists
+    """
+    row_number = row.get('_row_number', 'Unknown')
+    errors = []
+    missing_fields = []
+    warnings = []
+    
+    # Map spreadsheet columns to database fields
+    mapped_data = map_spreadsheet_to_db(row)
+
+    # Check if this is a special network that can generate target_url
+    network = mapped_data.get('network', '').lower().strip().replace(' ', '').replace('_', '')
+    is_special_network = network in SPECIAL_NETWORKS
+    has_campaign_id = 'campaign_id' in mapped_data and mapped_data['campaign_id']
+    has_target_url = 'target_url' in mapped_data and mapped_data['target_url']
+    
+    # Check base required fields (ALWAYS required for ALL networks)
+    # This includes campaign_id which is MANDATORY for every platform
+    for required_field in BASE_REQUIRED_FIELDS:
+        if required_field not in mapped_data or not mapped_data[required_field]:
+            missing_fields.append(required_field)
+    
+    # Network-specific validation for target_url ONLY
+    if is_special_network:
+        # Special networks: target_url is OPTIONAL (will be auto-generated from campaign_id)
+        if has_campaign_id and not has_target_url:
+            warnings.append(f"target_url will be auto-generated for {network} network using campaign_id: {mapped_data.get('campaign_id')}")
+    else:
+        # Regular networks: target_url is REQUIRED
+        if not has_target_url:
+            missing_fields.append('target_url')
+    
+    # Special validation: Either 'payout' OR 'revenue_share_percent' must be present
+    has_payout = 'payout' in mapped_data and mapped_data['payout']
+    has_percent = 'revenue_share_percent' in mapped_data and mapped_data['revenue_share_percent']
+    
+    if not has_payout and not has_percent:
+        missing_fields.append('payout')
+    
+    # If only percent is provided, set payout to 0
+    if has_percent and not has_payout:
+        mapped_data['payout'] = 0
+        # Remove payout from missing fields if it was added
+        if 'payout' in missing_fields:
+            missing_fields.remove('payout')
 
-        # Check if this is a special network that can generate target_url
-        network = mapped_data.get('network', '').lower().strip().replace(' ', '').replace('_', '')
-        is_special_network = network in SPECIAL_NETWORKS
-        has_campaign_id = 'campaign_id' in mapped_data and mapped_data['campaign_id']
-        has_target_url = 'target_url' in mapped_data and mapped_data['target_url']
+    # Validate payout is numeric (handle percentage format like "50%" and currency symbols like "$42")
+    if 'payout' in mapped_data and mapped_data['payout']:
+        payout_str = str(mapped_data['payout']).strip()
+        try:
+            # Try to parse with currency detection
+            fixed_payout, revenue_share, currency = parse_payout_value(payout_str)
+            # If parsing succeeds, the value is valid
+        except (ValueError, TypeError):
+            errors.append(f"Invalid payout value: {mapped_data['payout']} (must be numeric, percentage like '50%', or with currency symbol like '$42')")
+    
+    # Validate vertical if provided
+    if 'vertical' in mapped_data and mapped_data['vertical']:
+        is_valid, result = validate_vertical(mapped_data['vertical'])
+        if not is_valid:
+            # Check if it can be mapped from old category
+            mapped_vertical = map_category_to_vertical(mapped_data['vertical'])
+            if mapped_vertical == 'Lifestyle' and mapped_data['vertical'].lower() not in ['lifestyle', 'general', '']:
+                errors.append(f"Invalid vertical '{mapped_data['vertical']}'. Must be one of: {', '.join(VALID_VERTICALS)}")
+    
+    # Validate revenue_share_percent if provided
+    if 'revenue_share_percent' in mapped_data and mapped_data['revenue_share_percent']:
+        percent_str = str(mapped_data['revenue_share_percent']).strip()
         
-        # Check base required fields (ALWAYS required for ALL networks)
-        # This includes campaign_id which is MANDATORY for every platform
-        for required_field in BASE_REQUIRED_FIELDS:
-            if required_field not in mapped_data or not mapped_data[required_field]:
-                missing_fields.append(required_field)
+        # Check if this looks like a payout value (has currency symbol like $, €, etc.)
+        is_currency_value = any(symbol in percent_str for symbol in CURRENCY_INDICATORS)
         
-        # Network-specific validation for target_url ONLY
-        if is_special_network:
-            # Special networks: target_url is OPTIONAL (will be auto-generated from campaign_id)
-            if has_campaign_id and not has_target_url:
-                warnings.append(f"target_url will be auto-generated for {network} network using campaign_id: {mapped_data.get('campaign_id')}")
+        if is_currency_value:
+            # This is actually a payout value, not a percentage - move it to payout
+            if not mapped_data.get('payout'):
+                mapped_data['payout'] = percent_str
+                # Remove payout from missing fields if it was added
+                if 'payout' in missing_fields:
+                    missing_fields.remove('payout')
+            mapped_data['revenue_share_percent'] = 0
         else:
-            # Regular networks: target_url is REQUIRED
-            if not has_target_url:
-                missing_fields.append('target_url')
-        
-        # Special validation: Either 'payout' OR 'revenue_share_percent' must be present
-        has_payout = 'payout' in mapped_data and mapped_data['payout']
-        has_percent = 'revenue_share_percent' in mapped_data and mapped_data['revenue_share_percent']
-        
-        if not has_payout and not has_percent:
-            missing_fields.append('payout')
-        
-        # If only percent is provided, set payout to 0
-        if has_percent and not has_payout:
-            mapped_data['payout'] = 0
-            # Remove payout from missing fields if it was added
-            if 'payout' in missing_fields:
-                missing_fields.remove('payout')
-
-        # Validate payout is numeric (handle percentage format like "50%" and currency symbols like "$42")
-        if 'payout' in mapped_data and mapped_data['payout']:
-            payout_str = str(mapped_data['payout']).strip()
             try:
-                # Try to parse with currency detection
-                fixed_payout, revenue_share, currency = parse_payout_value(payout_str)
-                # If parsing succeeds, the value is valid
+                # Remove % sign if present
+                percent = float(percent_str.replace('%', '').strip())
+                if percent < 0 or percent > 100:
+                    errors.append(f"Invalid revenue_share_percent: {mapped_data['revenue_share_percent']} (must be 0-100)")
             except (ValueError, TypeError):
-                errors.append(f"Invalid payout value: {mapped_data['payout']} (must be numeric, percentage like '50%', or with currency symbol like '$42')")
-        
-        # Validate vertical if provided
-        if 'vertical' in mapped_data and mapped_data['vertical']:
-            is_valid, result = validate_vertical(mapped_data['vertical'])
-            if not is_valid:
-                # Check if it can be mapped from old category
-                mapped_vertical = map_category_to_vertical(mapped_data['vertical'])
-                if mapped_vertical == 'Lifestyle' and mapped_data['vertical'].lower() not in ['lifestyle', 'general', '']:
-                    errors.append(f"Invalid vertical '{mapped_data['vertical']}'. Must be one of: {', '.join(VALID_VERTICALS)}")
-        
-        # Validate revenue_share_percent if provided
-        if 'revenue_share_percent' in mapped_data and mapped_data['revenue_share_percent']:
-            percent_str = str(mapped_data['revenue_share_percent']).strip()
-            
-            # Check if this looks like a payout value (has currency symbol like $, €, etc.)
-            is_currency_value = any(symbol in percent_str for symbol in CURRENCY_INDICATORS)
-            
-            if is_currency_value:
-                # This is actually a payout value, not a percentage - move it to payout
-                if not mapped_data.get('payout'):
-                    mapped_data['payout'] = percent_str
-                    # Remove payout from missing fields if it was added
-                    if 'payout' in missing_fields:
-                        missing_fields.remove('payout')
-                mapped_data['revenue_share_percent'] = 0
-            else:
-                try:
-                    # Remove % sign if present
-                    percent = float(percent_str.replace('%', '').strip())
-                    if percent < 0 or percent > 100:
-                        errors.append(f"Invalid revenue_share_percent: {mapped_data['revenue_share_percent']} (must be 0-100)")
-                except (ValueError, TypeError):
-                    errors.append(f"Invalid revenue_share_percent: {mapped_data['revenue_share_percent']} (must be numeric)")
-        
-        # Validate URL format (allow macros like {user_id})
-        if 'target_url' in mapped_data:
-            # First, temporarily replace macros with placeholder for validation
-            temp_url = str(mapped_data['target_url'])
-            import re as regex_module
-            # Replace all {macro} patterns with a valid placeholder
-            temp_url = regex_module.sub(r'\{[^}]+\}', 'MACRO_PLACEHOLDER', temp_url)
-            
-            url_pattern = re.compile(
-                r'^https?://'
-                r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
-                r'localhost|'
-                r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-                r'(?::\d+)?'
-                r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-            
-            if not url_pattern.match(temp_url):
-                errors.append(f"Invalid URL format: {mapped_data['target_url']}")
+                errors.append(f"Invalid revenue_share_percent: {mapped_data['revenue_share_percent']} (must be numeric)")
+    
+    # Validate URL format (allow macros like {user_id})
+    if 'target_url' in mapped_data:
+        # First, temporarily replace macros with placeholder for validation
+        temp_url = str(mapped_data['target_url'])
+        import re as regex_module
+        # Replace all {macro} patterns with a valid placeholder
+        temp_url = regex_module.sub(r'\{[^}]+\}', 'MACRO_PLACEHOLDER', temp_url)
         
-        # Validate fallback_redirect_url if provided
-        if 'fallback_redirect_url' in mapped_data and mapped_data['fallback_redirect_url']:
-            temp_url = str(mapped_data['fallback_redirect_url'])
-            import re as regex_module
-            temp_url = regex_module.sub(r'\{[^}]+\}', 'MACRO_PLACEHOLDER', temp_url)
-            
-            url_pattern = re.compile(
-                r'^https?://'
-                r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
-                r'localhost|'
-                r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-                r'(?::\d+)?'
-                r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-            
-            if not url_pattern.match(temp_url):
-                errors.append(f"Invalid fallback redirect URL format: {mapped_data['fallback_redirect_url']}")
+        url_pattern = re.compile(
+            r'^https?://'
+            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
+            r'localhost|'
+            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+            r'(?::\d+)?'
+            r'(?:/?|[/?]\S+)$', re.IGNORECASE)
         
-        # Validate fallback_redirect_timer if provided
-        if 'fallback_redirect_timer' in mapped_data and mapped_data['fallback_redirect_timer']:
-            try:
-                timer_str = str(mapped_data['fallback_redirect_timer']).lower().strip()
-                # Remove any unit suffixes for validation
-                timer_val = float(re.sub(r'[^\d.]', '', timer_str))
-                if timer_val < 0:
-                    errors.append(f"Invalid fallback redirect timer: {mapped_data['fallback_redirect_timer']} (must be positive)")
-            except (ValueError, TypeError):
-                errors.append(f"Invalid fallback redirect timer: {mapped_data['fallback_redirect_timer']} (must be numeric)")
+        if not url_pattern.match(temp_url):
+            errors.append(f"Invalid URL format: {mapped_data['target_url']}")
+    
+    # Validate fallback_redirect_url if provided
+    if 'fallback_redirect_url' in mapped_data and mapped_data['fallback_redirect_url']:
+        temp_url = str(mapped_data['fallback_redirect_url'])
+        import re as regex_module
+        temp_url = regex_module.sub(r'\{[^}]+\}', 'MACRO_PLACEHOLDER', temp_url)
         
-        # Determine where this row goes:
-        # 1. If critical errors (invalid format) -> error_rows
-        # 2. If missing required fields but no format errors -> missing_offers_rows
-        # 3. If all good -> valid_rows
+        url_pattern = re.compile(
+            r'^https?://'
+            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
+            r'localhost|'
+            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+            r'(?::\d+)?'
+            r'(?:/?|[/?]\S+)$', re.IGNORECASE)
         
-        if errors:
-            # Critical errors - invalid data format
-            error_rows.append({
-                'row': row_number,
-                'errors': errors,
-                'missing_fields': missing_fields,
-                'warnings': warnings,
-                'data': row
-            })
-        elif missing_fields and store_missing:
-            # Missing required fields - store in Missing Offers
-            missing_offers_rows.append({
-                'row': row_number,
-                'missing_fields': missing_fields,
-                'warnings': warnings,
-                'data': mapped_data,
-                'raw_data': row
-            })
-        elif missing_fields:
-            # Missing fields but store_missing=False - treat as error
-            error_rows.append({
-                'row': row_number,
-                'errors': [f"Missing required field: {f}" for f in missing_fields],
-                'missing_fields': missing_fields,
-                'warnings': warnings,
-                'data': row
-            })
-        else:
-            # Apply defaults and add to valid rows
-            validated_data = apply_default_values(mapped_data)
-            validated_data['_row_number'] = row_number
-            if warnings:
-                validated_data['_warnings'] = warnings
-            valid_rows.append(validated_data)
+        if not url_pattern.match(temp_url):
+            errors.append(f"Invalid fallback redirect URL format: {mapped_data['fallback_redirect_url']}")
     
-    return valid_rows, error_rows, missing_offers_rows
+    # Validate fallback_redirect_timer if provided
+    if 'fallback_redirect_timer' in mapped_data and mapped_data['fallback_redirect_timer']:
+        try:
+            timer_str = str(mapped_data['fallback_redirect_timer']).lower().strip()
+            # Remove any unit suffixes for validation
+            timer_val = float(re.sub(r'[^\d.]', '', timer_str))
+            if timer_val < 0:
+                errors.append(f"Invalid fallback redirect timer: {mapped_data['fallback_redirect_timer']} (must be positive)")
+        except (ValueError, TypeError):
+            errors.append(f"Invalid fallback redirect timer: {mapped_data['fallback_redirect_timer']} (must be numeric)")
+    
+    # Determine where this row goes:
+    # 1. If critical errors (invalid format) -> error_rows
+    # 2. If missing required fields but no format errors -> missing_offers_rows
+    # 3. If all good -> valid_rows
+    
+    if errors:
+        # Critical errors - invalid data format
+        return 'error', {
+            'row': row_number,
+            'errors': errors,
+            'missing_fields': missing_fields,
+            'warnings': warnings,
+            'data': row
+        }
+    elif missing_fields and store_missing:
+        # Missing required fields - store in Missing Offers
+        return 'missing', {
+            'row': row_number,
+            'missing_fields': missing_fields,
+            'warnings': warnings,
+            'data': mapped_data,
+            'raw_data': row
+        }
+    elif missing_fields:
+        # Missing fields but store_missing=False - treat as error
+        return 'error', {
+            'row': row_number,
+            'errors': [f"Missing required field: {f}" for f in missing_fields],
+            'missing_fields': missing_fields,
+            'warnings': warnings,
+            'data': row
+        }
+    else:
+        # Apply defaults and add to valid rows
+        validated_data = apply_default_values(mapped_data)
+        validated_data['_row_number'] = row_number
+        if warnings:
+            validated_data['_warnings'] = warnings
+        return 'valid', validated_data
+
 
+# Offers per insert_many / bulk_write round trip in bulk_create_offers
+BULK_CREATE_CHUNK_SIZE = 1000
+# Rows read, validated and inserted per step of a streamed (async) bulk upload
+BULK_UPLOAD_CHUNK_SIZE = 500
 
 
 def bulk_create_offers(validated_data: List[Dict[str, Any]], created_by: str, duplicate_strategy: str = 'skip') -> Tuple[List[str], List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
     Create multiple offers in the database with duplicate detection.
     
+    Duplicates are checked against existing offers loaded with a few set-based
+    queries (BatchDuplicateDetector), ML-XXXXX ids are reserved as one block,
+    and offers are written with insert_many / bulk_write in chunks, so the
+    number of database round trips no longer grows with the number of rows.
+    
     Args:
         validated_data: List of validated offer data dictionaries
         created_by: Username/ID of admin creating the offers
@@ -1098,28 +1184,44 @@ def bulk_create_offers(validated_data: List[Dict[str, Any]], created_by: str, du
         Tuple of (list of created offer IDs, list of errors, list of skipped duplicates)
     """
     from models.offer import Offer
-    from utils.duplicate_detection import create_duplicate_detector
+    from utils.duplicate_detection import BatchDuplicateDetector
     from database import db_instance
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+    from services.cache_invalidation_bus import invalidate_offer_caches
     import logging
+    import time
     
     logger = logging.getLogger(__name__)
+    started = time.time()
     offer_model = Offer()
-    duplicate_detector = create_duplicate_detector(db_instance)
     
     created_offer_ids = []
     creation_errors = []
     skipped_duplicates = []
     
+    if not offer_model._check_db_connection():
+        for offer_data in validated_data:
+            creation_errors.append({
+                'row': offer_data.pop('_row_number', 'Unknown'),
+                'error': 'Database connection not available',
+                'data': offer_data
+            })
+        return created_offer_ids, creation_errors, skipped_duplicates
+    
+    duplicate_detector = BatchDuplicateDetector(db_instance, validated_data)
+    
+    # Pass 1: duplicate handling and document building, all in memory
+    pending = []   # (row_number, offer_data, offer_doc)
+    updates = []   # (row_number, offer_data, offer_id)
     for offer_data in validated_data:
         row_number = offer_data.pop('_row_number', 'Unknown')
         
         try:
-            # Check for duplicates before creating
             is_duplicate, existing_offer_id, existing_offer = duplicate_detector.check_duplicate(offer_data, duplicate_strategy)
             
             if is_duplicate:
                 if duplicate_strategy == 'skip':
-                    logger.info(f"Row {row_number}: Skipping duplicate offer (existing: {existing_offer_id})")
                     skipped_duplicates.append({
                         'row': row_number,
                         'reason': 'duplicate',
@@ -1130,23 +1232,15 @@ def bulk_create_offers(validated_data: List[Dict[str, Any]], created_by: str, du
                     continue
                     
                 elif duplicate_strategy == 'update':
-                    # Update existing offer
-                    action, offer_id = duplicate_detector.handle_duplicate(offer_data, existing_offer, 'update')
-                    logger.info(f"Row {row_number}: Updated existing offer {offer_id}")
-                    created_offer_ids.append(offer_id)
+                    updates.append((row_number, offer_data, existing_offer_id))
+                    duplicate_detector.register({**existing_offer, **offer_data, 'offer_id': existing_offer_id})
                     continue
                     
                 elif duplicate_strategy == 'create_new':
                     # Modify name and create new
-                    action, _ = duplicate_detector.handle_duplicate(offer_data, existing_offer, 'create_new')
-                    logger.info(f"Row {row_number}: Creating new offer with modified name")
-                    # Fall through to create the offer with modified name
-            
-            logger.info(f"Creating offer for row {row_number}: {offer_data.get('name', 'Unknown')}")
-            
-            # Create offer using the existing create_offer method
-            created_offer, error = offer_model.create_offer(offer_data, created_by)
+                    duplicate_detector.handle_duplicate(offer_data, existing_offer, 'create_new')
             
+            offer_doc, error = offer_model.build_offer_document(offer_data, created_by, verbose=False)
             if error:
                 logger.error(f"Offer creation failed for row {row_number}: {error}")
                 creation_errors.append({
@@ -1154,9 +1248,15 @@ def bulk_create_offers(validated_data: List[Dict[str, Any]], created_by: str, du
                     'error': error,
                     'data': offer_data
                 })
-            else:
-                logger.info(f"Successfully created offer {created_offer['offer_id']} for row {row_number}")
-                created_offer_ids.append(created_offer['offer_id'])
+                continue
+            
+            # Keep row fields the offer schema does not map (upload options such as show_in_offerwall_source)
+            for field, value in offer_data.items():
+                if field not in offer_doc and field != '_warnings' and value is not None:
+                    offer_doc[field] = value
+            
+            pending.append((row_number, offer_data, offer_doc))
+            duplicate_detector.register(offer_doc)
                 
         except Exception as e:
             logger.error(f"Error processing row {row_number}: {str(e)}", exc_info=True)
@@ -1166,6 +1266,79 @@ def bulk_create_offers(validated_data: List[Dict[str, Any]], created_by: str, du
                 'data': offer_data
             })
     
+    # Pass 2: one counter update for the whole block of ids
+    if pending:
+        try:
+            offer_ids = offer_model.allocate_offer_ids(len(pending))
+        except Exception as e:
+            logger.error(f"Failed to allocate offer IDs: {str(e)}", exc_info=True)
+            for row_number, offer_data, _ in pending:
+                creation_errors.append({
+                    'row': row_number,
+                    'error': f"Error creating offer: {str(e)}",
+                    'data': offer_data
+                })
+            pending = []
+            offer_ids = []
+        for (_, _, offer_doc), offer_id in zip(pending, offer_ids):
+            offer_doc['offer_id'] = offer_id
+    
+    # Pass 3: chunked writes; unordered so one bad document does not stop the rest
+    for start in range(0, len(pending), BULK_CREATE_CHUNK_SIZE):
+        chunk = pending[start:start + BULK_CREATE_CHUNK_SIZE]
+        failed = {}
+        try:
+            offer_model.collection.insert_many([offer_doc for _, _, offer_doc in chunk], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                failed[write_error['index']] = write_error.get('errmsg', 'write error')
+        except Exception as e:
+            failed = {i: str(e) for i in range(len(chunk))}
+        for i, (row_number, offer_data, offer_doc) in enumerate(chunk):
+            if i in failed:
+                logger.error(f"Offer creation failed for row {row_number}: {failed[i]}")
+                creation_errors.append({
+                    'row': row_number,
+                    'error': f"Error creating offer: {failed[i]}",
+                    'data': offer_data
+                })
+            else:
+                created_offer_ids.append(offer_doc['offer_id'])
+    
+    updated_offer_ids = []
+    for start in range(0, len(updates), BULK_CREATE_CHUNK_SIZE):
+        chunk = updates[start:start + BULK_CREATE_CHUNK_SIZE]
+        try:
+            offer_model.collection.bulk_write(
+                [UpdateOne({'offer_id': offer_id}, {'$set': offer_data}) for _, offer_data, offer_id in chunk],
+                ordered=True
+            )
+            failed = {}
+        except BulkWriteError as e:
+            failed = {w['index']: w.get('errmsg', 'write error') for w in e.details.get('writeErrors', [])}
+            # An ordered bulk write stops at the first error; later operations were not applied
+            first = min(failed) if failed else len(chunk)
+            failed.update({i: 'not applied after an earlier write error' for i in range(first + 1, len(chunk))})
+        except Exception as e:
+            failed = {i: str(e) for i in range(len(chunk))}
+        for i, (row_number, offer_data, offer_id) in enumerate(chunk):
+            if i in failed:
+                creation_errors.append({
+                    'row': row_number,
+                    'error': f"Error updating offer {offer_id}: {failed[i]}",
+                    'data': offer_data
+                })
+            else:
+                updated_offer_ids.append(offer_id)
+    if updated_offer_ids:
+        created_offer_ids.extend(updated_offer_ids)
+        invalidate_offer_caches(updated_offer_ids)
+    
+    logger.info(
+        f"Bulk create: {len(created_offer_ids) - len(updated_offer_ids)} created, {len(updated_offer_ids)} updated, "
+        f"{len(skipped_duplicates)} skipped, {len(creation_errors)} errors "
+        f"from {len(validated_data)} rows in {time.time() - started:.1f}s"
+    )
     return created_offer_ids, creation_errors, skipped_duplicates
 
 
@@ -0,0 +1,460 @@
+"""
+Cache framework
+Named cache namespaces with TTL + LRU bounds, a decorator API, swappable
+backends and per-namespace hit/miss stats.
+
+    _offer_cache = get_cache('tracking_offers', ttl=300, max_size=500)
+    offer = _offer_cache.get_or_load(offer_id, lambda: fetch_offer(offer_id))
+
+    @cached('voqall_lookups', ttl=24 * 3600, key=lambda self, api_key, network_id: api_key[:12])
+    def _fetch_lookups_cached(self, api_key, network_id): ...
+
+Backends are picked per namespace (backend=...) or globally with the
+CACHE_BACKEND environment variable:
+
+- memory: per-process LRU dict (default). Values are returned as stored, so it
+  can also hold objects that cannot be pickled (e.g. compiled rule sets).
+- shared: a SQLite file on /dev/shm (CACHE_SHARED_PATH) shared by every
+  gunicorn worker on the host. Values are pickled.
+- server: a Redis-protocol cache server at CACHE_SERVER_URL. Needs the redis
+  package; falls back to memory when it is not installed or unreachable.
+
+Backend errors never propagate: a failing backend reads as a miss and the
+caller loads from the database as it would without a cache.
+
+cache.invalidate(key) evicts locally and, once services.cache_invalidation_bus
+is running, in every other worker process as well.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+
+_MISSING = object()
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+class CacheBackend:
+    """Storage for cache entries. Every method is scoped to one namespace."""
+
+    name = 'base'
+
+    def get(self, namespace: str, key) -> Tuple[bool, Any]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key, value, ttl: float, max_size: int) -> int:
+        """Store value; returns how many entries were evicted to respect max_size."""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key) -> bool:
+        raise NotImplementedError
+
+    def clear(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def size(self, namespace: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU dict: namespace -> OrderedDict(key -> (expires, value))."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._data: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entries = self._data.get(namespace)
+            if not entries:
+                return False, None
+            entry = entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return False, None
+            if entry[0] <= time.time():
+                del entries[key]
+                return False, None
+            entries.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, namespace, key, value, ttl, max_size):
+        with self._lock:
+            entries = self._data.setdefault(namespace, OrderedDict())
+            entries[key] = (time.time() + ttl, value)
+            entries.move_to_end(key)
+            evicted = 0
+            while max_size and len(entries) > max_size:
+                entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, namespace, key):
+        with self._lock:
+            entries = self._data.get(namespace)
+            return bool(entries) and entries.pop(key, _MISSING) is not _MISSING
+
+    def clear(self, namespace):
+        with self._lock:
+            entries = self._data.pop(namespace, None)
+            return len(entries) if entries else 0
+
+    def size(self, namespace):
+        with self._lock:
+            return len(self._data.get(namespace) or ())
+
+
+class SharedMemoryBackend(CacheBackend):
+    """SQLite file on tmpfs shared by all worker processes on the host."""
+
+    name = 'shared'
+
+    def __init__(self, path: Optional[str] = None):
+        default_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        self.path = path or os.environ.get('CACHE_SHARED_PATH') or os.path.join(default_dir, 'app_cache.sqlite3')
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB, expires REAL, accessed REAL,'
+            ' PRIMARY KEY (ns, key))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_lru ON cache (ns, accessed)')
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork (gunicorn preload)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key):
+        return key if isinstance(key, str) else repr(key)
+
+    def get(self, namespace, key):
+        conn = self._conn()
+        key = self._key(key)
+        row = conn.execute('SELECT value, expires FROM cache WHERE ns = ? AND key = ?', (namespace, key)).fetchone()
+        if row is None:
+            return False, None
+        now = time.time()
+        if row[1] <= now:
+            conn.execute('DELETE FROM cache WHERE ns = ? AND key = ?', (namespace, key))
+            return False, None
+        conn.execute('UPDATE cache SET accessed = ? WHERE ns = ? AND key = ?', (now, namespace, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, namespace, key, value, ttl, max_size):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (ns, key, value, expires, accessed) VALUES (?, ?, ?, ?, ?)',
+            (namespace, self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now)
+        )
+        if not max_size:
+            return 0
+        over = conn.execute('SELECT COUNT(*) FROM cache WHERE ns = ?', (namespace,)).fetchone()[0] - max_size
+        if over <= 0:
+            return 0
+        conn.execute(
+            'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE ns = ? ORDER BY accessed LIMIT ?)',
+            (namespace, over)
+        )
+        return over
+
+    def delete(self, namespace, key):
+        cur = self._conn().execute('DELETE FROM cache WHERE ns = ? AND key = ?', (namespace, self._key(key)))
+        return cur.rowcount > 0
+
+    def clear(self, namespace):
+        return self._conn().execute('DELETE FROM cache WHERE ns = ?', (namespace,)).rowcount
+
+    def size(self, namespace):
+        return self._conn().execute('SELECT COUNT(*) FROM cache WHERE ns = ?', (namespace,)).fetchone()[0]
+
+
+class ServerBackend(CacheBackend):
+    """Redis-protocol cache server. LRU bounds are left to the server's maxmemory policy."""
+
+    name = 'server'
+
+    def __init__(self, url: Optional[str] = None, prefix: str = 'cache:'):
+        import redis  # optional dependency
+        self.url = url or os.environ.get('CACHE_SERVER_URL', 'redis://localhost:6379/0')
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(self.url, socket_timeout=1, socket_connect_timeout=1)
+        self.client.ping()
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}{namespace}:{key if isinstance(key, str) else repr(key)}"
+
+    def get(self, namespace, key):
+        raw = self.client.get(self._key(namespace, key))
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, namespace, key, value, ttl, max_size):
+        self.client.set(self._key(namespace, key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), px=max(1, int(ttl * 1000)))
+        return 0
+
+    def delete(self, namespace, key):
+        return bool(self.client.delete(self._key(namespace, key)))
+
+    def clear(self, namespace):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{namespace}:*", count=500))
+        return self.client.delete(*keys) if keys else 0
+
+    def size(self, namespace):
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}{namespace}:*", count=500))
+
+
+_BACKEND_CLASSES = {
+    'memory': MemoryBackend,
+    'shared': SharedMemoryBackend,
+    'server': ServerBackend,
+}
+_backends: Dict[str, CacheBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None) -> CacheBackend:
+    """Shared backend instance by name; unknown or unavailable backends fall back to memory."""
+    name = name or DEFAULT_BACKEND
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is not None:
+            return backend
+        try:
+            backend = _BACKEND_CLASSES[name]()
+        except Exception as e:
+            logger.warning(f"⚠️ Cache backend '{name}' unavailable, using in-process memory: {e}")
+            backend = _backends.get('memory') or MemoryBackend()
+            _backends['memory'] = backend
+        _backends[name] = backend
+        return backend
+
+
+# ----------------------------------------------------------------------
+# Namespaces
+# ----------------------------------------------------------------------
+
+class Cache:
+    """One named namespace with its own TTL, size bound and stats."""
+
+    def __init__(self, name: str, ttl: float, max_size: int, backend: CacheBackend):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self._stats_lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'deletes': 0, 'errors': 0}
+
+    def _count(self, field, n=1):
+        with self._stats_lock:
+            self._counts[field] += n
+
+    def get(self, key, default=None):
+        try:
+            hit, value = self.backend.get(self.name, key)
+        except Exception as e:
+            logger.warning(f"Cache '{self.name}' read failed: {e}")
+            self._count('errors')
+            hit, value = False, None
+        self._count('hits' if hit else 'misses')
+        return value if hit else default
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        try:
+            evicted = self.backend.set(self.name, key, value, self.ttl if ttl is None else ttl, self.max_size)
+        except Exception as e:
+            logger.warning(f"Cache '{self.name}' write failed: {e}")
+            self._count('errors')
+            return
+        self._count('sets')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def delete(self, key) -> bool:
+        try:
+            deleted = self.backend.delete(self.name, key)
+        except Exception as e:
+            logger.warning(f"Cache '{self.name}' delete failed: {e}")
+            self._count('errors')
+            return False
+        if deleted:
+            self._count('deletes')
+        return deleted
+
+    def clear(self) -> int:
+        try:
+            cleared = self.backend.clear(self.name)
+        except Exception as e:
+            logger.warning(f"Cache '{self.name}' clear failed: {e}")
+            self._count('errors')
+            return 0
+        self._count('deletes', cleared)
+        return cleared
+
+    def invalidate(self, key=None):
+        """Evict key (the whole namespace when key is None) here and in every other worker."""
+        invalidate(self.name, key)
+
+    def get_or_load(self, key, loader: Callable[[], Any], ttl: Optional[float] = None, cache_none: bool = False):
+        """Return the cached value for key, calling loader() and caching its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None or cache_none:
+            self.set(key, value, ttl)
+        return value
+
+    def size(self) -> int:
+        try:
+            return self.backend.size(self.name)
+        except Exception:
+            return 0
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses']
+        return {
+            'namespace': self.name,
+            'backend': self.backend.name,
+            'ttl': self.ttl,
+            'max_size': self.max_size,
+            'size': self.size(),
+            **counts,
+            'hit_rate': round(counts['hits'] / lookups, 4) if lookups else None,
+        }
+
+
+_namespaces: Dict[str, Cache] = {}
+_namespaces_lock = threading.Lock()
+
+
+def get_cache(name: str, ttl: float = 300, max_size: int = 1000, backend: Optional[str] = None) -> Cache:
+    """Get (or register) a cache namespace. The first registration fixes its ttl/max_size/backend."""
+    with _namespaces_lock:
+        cache = _namespaces.get(name)
+        if cache is None:
+            cache = Cache(name, ttl, max_size, get_backend(backend))
+            _namespaces[name] = cache
+        return cache
+
+
+def cached(namespace: str, ttl: float = 300, max_size: int = 1000, key: Optional[Callable] = None,
+           backend: Optional[str] = None, cache_none: bool = False):
+    """Cache a function's results in a namespace.
+
+    key(*args, **kwargs) builds the cache key; by default the repr of the
+    arguments is used, so pass key= for methods (self) or unhashable args.
+    The wrapper exposes .cache and .invalidate(*args, **kwargs).
+    """
+    def decorator(func):
+        cache = get_cache(namespace, ttl=ttl, max_size=max_size, backend=backend)
+
+        def make_key(args, kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+            return repr((args, sorted(kwargs.items())))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache.get_or_load(make_key(args, kwargs), lambda: func(*args, **kwargs), cache_none=cache_none)
+
+        wrapper.cache = cache
+        wrapper.invalidate = lambda *args, **kwargs: cache.invalidate(make_key(args, kwargs))
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> List[Dict]:
+    with _namespaces_lock:
+        caches = list(_namespaces.values())
+    return [c.stats() for c in sorted(caches, key=lambda c: c.name)]
+
+
+def has_cache(name: str) -> bool:
+    with _namespaces_lock:
+        return name in _namespaces or name in _eviction_listeners
+
+
+# ----------------------------------------------------------------------
+# Invalidation
+# ----------------------------------------------------------------------
+
+_invalidation_publisher: Optional[Callable] = None
+# Non-Cache consumers of a namespace (e.g. in-memory indexes) notified on eviction
+_eviction_listeners: Dict[str, List[Callable]] = {}
+
+
+def set_invalidation_publisher(publisher: Optional[Callable]):
+    """Register publisher([(namespace, key), ...]) to broadcast invalidations to other processes."""
+    global _invalidation_publisher
+    _invalidation_publisher = publisher
+
+
+def add_eviction_listener(namespace: str, listener: Callable):
+    """Call listener(key) whenever namespace/key is evicted in this process (key None = everything)."""
+    with _namespaces_lock:
+        _eviction_listeners.setdefault(namespace, []).append(listener)
+
+
+def evict_local(namespace: str, key=None):
+    """Evict from this process only (used when applying a broadcast invalidation)."""
+    with _namespaces_lock:
+        cache = _namespaces.get(namespace)
+        listeners = list(_eviction_listeners.get(namespace, ()))
+    for listener in listeners:
+        try:
+            listener(key)
+        except Exception as e:
+            logger.warning(f"Eviction listener for '{namespace}' failed: {e}")
+    if cache is None:
+        return
+    if key is None:
+        cache.clear()
+    else:
+        cache.delete(key)
+
+
+def invalidate(namespace: str, key=None):
+    """Evict namespace/key locally and publish it to every other worker."""
+    invalidate_many([(namespace, key)])
+
+
+def invalidate_many(pairs: List[Tuple[str, Any]]):
+    """Evict several (namespace, key) pairs locally and publish them to every other worker at once."""
+    if not pairs:
+        return
+    for namespace, key in pairs:
+        evict_local(namespace, key)
+    publisher = _invalidation_publisher
+    if publisher is not None:
+        try:
+            publisher(pairs)
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed for {len(pairs)} key(s): {e}")
@@ -4,11 +4,21 @@ Checks if an offer already exists in the database
 """
 
 import logging
-from typing import Optional, Tuple
+import math
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
 from difflib import SequenceMatcher
 
 logger = logging.getLogger(__name__)
 
+# Fields BatchDuplicateDetector loads for existing offers
+CANDIDATE_PROJECTION = {'_id': 0, 'offer_id': 1, 'campaign_id': 1, 'name': 1, 'network': 1, 'target_url': 1}
+# Up to this many distinct URLs are looked up with one anchored-regex query; more load all target URLs once
+URL_QUERY_LIMIT = 200
+# Fuzzy candidates must share at least this fraction of the name's trigrams
+TRIGRAM_OVERLAP = 0.4
+
 
 class DuplicateDetector:
     """Detects duplicate offers in the database"""
@@ -67,6 +77,18 @@ class DuplicateDetector:
             logger.error(f"Error checking duplicate: {str(e)}", exc_info=True)
             return False, None, None
     
+    @staticmethod
+    def _similarity_index():
+        """The shared offer similarity index, or None until its first build finishes"""
+        try:
+            from services.offer_similarity_index import get_offer_similarity_index
+            index = get_offer_similarity_index()
+            index.start()
+            return index if index.is_ready() else None
+        except Exception as e:
+            logger.warning(f"Offer similarity index unavailable: {str(e)}")
+            return None
+    
     def _check_by_campaign_id(self, campaign_id: str) -> Optional[dict]:
         """Check for duplicate by campaign_id"""
         try:
@@ -89,6 +111,15 @@ class DuplicateDetector:
             if exact_match:
                 return exact_match
             
+            # Fuzzy match through the LSH index once it is built
+            index = self._similarity_index()
+            if index is not None:
+                offer_id = index.find_similar(name, network, self.similarity_threshold)
+                if offer_id:
+                    logger.info(f"Fuzzy match found: {offer_id}")
+                    return offers_collection.find_one({'offer_id': offer_id})
+                return None
+            
             # Try fuzzy match - get all offers from same network
             similar_offers = offers_collection.find({'network': network})
             
@@ -109,6 +140,12 @@ class DuplicateDetector:
         try:
             offers_collection = self.db_instance.get_collection('offers')
             
+            # Canonical URL lookup through the similarity index once it is built
+            index = self._similarity_index()
+            if index is not None:
+                offer_ids = index.offers_with_url(target_url)
+                return offers_collection.find_one({'offer_id': offer_ids[0]}) if offer_ids else None
+            
             # Clean URL for comparison (remove query params)
             clean_url = target_url.split('?')[0]
             
@@ -165,6 +202,181 @@ class DuplicateDetector:
             return 'error', None
 
 
+class BatchDuplicateDetector(DuplicateDetector):
+    """
+    DuplicateDetector for a whole upload.
+
+    The constructor loads every existing offer that could match any row with
+    a few queries (campaign_id $in, network $in, target URL prefixes) and
+    check_duplicate() then answers from memory with the same three strategies
+    and the same order as DuplicateDetector. Offers created or updated during
+    the upload are added with register(), so duplicates within the file are
+    caught as they were when rows were checked against the database one by one.
+
+    Fuzzy name matching only runs SequenceMatcher on names that share enough
+    trigrams with the new name (prefix filtering over a trigram index), instead
+    of on every offer of the network. Once the shared offer similarity index is
+    built, whole networks and URL prefixes are not loaded at all: rows that do
+    not match anything in memory are looked up in the index instead.
+    """
+    
+    def __init__(self, db_instance, offers_data: Iterable[dict]):
+        super().__init__(db_instance)
+        self._index = self._similarity_index()
+        self._offers: List[dict] = []
+        self._by_offer_id: Dict[str, int] = {}
+        self._name_grams: List[frozenset] = []
+        self._by_campaign: Dict = {}
+        self._by_name_network: Dict = {}
+        self._by_network: Dict[str, List[int]] = {}
+        self._grams: Dict[Tuple[str, str], List[int]] = {}
+        self._urls: List[Tuple[str, int]] = []
+        self._urls_sorted = True
+        self._load(list(offers_data))
+    
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    
+    def _load(self, offers_data: List[dict]):
+        offers_collection = self.db_instance.get_collection('offers')
+        if offers_collection is None:
+            return
+        campaign_ids = list({o['campaign_id'] for o in offers_data if o.get('campaign_id')})
+        networks = list({o['network'] for o in offers_data if o.get('name') and o.get('network')})
+        urls = list({o['target_url'].split('?')[0] for o in offers_data if o.get('target_url')})
+        names = list({o['name'] for o in offers_data if o.get('name') and o.get('network')})
+        
+        seen = set()
+        
+        def add_all(cursor):
+            for offer in cursor:
+                key = offer.get('offer_id')
+                if key not in seen:
+                    seen.add(key)
+                    self.register(offer)
+        
+        # Natural order within each query keeps "first match wins" close to find_one
+        if campaign_ids:
+            add_all(offers_collection.find({'campaign_id': {'$in': campaign_ids}}, CANDIDATE_PROJECTION))
+        if self._index is not None:
+            # Fuzzy and URL matches come from the similarity index; only exact names are loaded
+            if names:
+                add_all(offers_collection.find({'name': {'$in': names}, 'network': {'$in': networks}}, CANDIDATE_PROJECTION))
+            logger.info(f"Batch duplicate check: loaded {len(self._offers)} candidate offers for {len(offers_data)} rows (similarity index)")
+            return
+        if networks:
+            add_all(offers_collection.find({'network': {'$in': networks}}, CANDIDATE_PROJECTION))
+        if urls:
+            if len(urls) <= URL_QUERY_LIMIT:
+                pattern = '^(?:' + '|'.join(re.escape(u) for u in urls) + ')'
+                add_all(offers_collection.find({'target_url': {'$regex': pattern}}, CANDIDATE_PROJECTION))
+            else:
+                add_all(offers_collection.find({'target_url': {'$nin': [None, '']}}, CANDIDATE_PROJECTION))
+        logger.info(f"Batch duplicate check: loaded {len(self._offers)} candidate offers for {len(offers_data)} rows")
+    
+    @staticmethod
+    def _trigrams(name: str) -> frozenset:
+        text = f" {name.lower()} "
+        return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+    
+    def register(self, offer: dict):
+        """Add an existing, created or updated offer to the in-memory lookups."""
+        idx = len(self._offers)
+        self._offers.append(offer)
+        if offer.get('offer_id'):
+            self._by_offer_id.setdefault(offer['offer_id'], idx)
+        campaign_id = offer.get('campaign_id')
+        if campaign_id:
+            self._by_campaign.setdefault(campaign_id, idx)
+        name, network = offer.get('name'), offer.get('network')
+        self._name_grams.append(self._trigrams(name) if isinstance(name, str) else frozenset())
+        if isinstance(network, str) and network:
+            self._by_network.setdefault(network, []).append(idx)
+            if isinstance(name, str):
+                self._by_name_network.setdefault((name, network), idx)
+                for gram in self._name_grams[idx]:
+                    self._grams.setdefault((network, gram), []).append(idx)
+        target_url = offer.get('target_url')
+        if isinstance(target_url, str) and target_url:
+            if self._urls and target_url < self._urls[-1][0]:
+                self._urls_sorted = False
+            self._urls.append((target_url, idx))
+    
+    def _indexed_offer(self, offer_id: Optional[str]) -> Optional[dict]:
+        """Offer found through the similarity index, loaded once and kept for later rows."""
+        if not offer_id:
+            return None
+        idx = self._by_offer_id.get(offer_id)
+        if idx is not None:
+            return self._offers[idx]
+        offer = self.db_instance.get_collection('offers').find_one({'offer_id': offer_id}, CANDIDATE_PROJECTION)
+        if offer is not None:
+            self.register(offer)
+        return offer
+    
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+    
+    def _check_by_campaign_id(self, campaign_id: str) -> Optional[dict]:
+        idx = self._by_campaign.get(campaign_id)
+        return self._offers[idx] if idx is not None else None
+    
+    def _check_by_name_network(self, name: str, network: str) -> Optional[dict]:
+        idx = self._by_name_network.get((name, network))
+        if idx is not None:
+            return self._offers[idx]
+        
+        grams = self._trigrams(name)
+        if len(grams) < 3:
+            candidates = self._by_network.get(network, [])
+        else:
+            # Any name sharing TRIGRAM_OVERLAP of the grams shares one of the rarest `prefix` grams
+            postings = sorted((self._grams.get((network, g), []) for g in grams), key=len)
+            prefix = len(grams) - math.ceil(TRIGRAM_OVERLAP * len(grams)) + 1
+            shared = set()
+            for posting in postings[:prefix]:
+                shared.update(posting)
+            needed = math.ceil(TRIGRAM_OVERLAP * len(grams))
+            candidates = sorted(i for i in shared if len(grams & self._name_grams[i]) >= needed)
+        
+        name_lower = name.lower()
+        # ratio() <= 2 * min(len) / (len_a + len_b), so names outside this window can never match
+        min_len = len(name) * self.similarity_threshold / (2 - self.similarity_threshold)
+        max_len = len(name) * (2 - self.similarity_threshold) / self.similarity_threshold
+        for i in candidates:
+            other = self._offers[i].get('name') or ''
+            if not min_len <= len(other) <= max_len:
+                continue
+            matcher = SequenceMatcher(None, name_lower, other.lower())
+            if matcher.quick_ratio() < self.similarity_threshold:
+                continue
+            similarity = matcher.ratio()
+            if similarity >= self.similarity_threshold:
+                logger.info(f"Fuzzy match found: {similarity:.2%} similarity")
+                return self._offers[i]
+        if self._index is not None:
+            return self._indexed_offer(self._index.find_similar(name, network, self.similarity_threshold))
+        return None
+    
+    def _check_by_url(self, target_url: str) -> Optional[dict]:
+        if not self._urls_sorted:
+            self._urls.sort()
+            self._urls_sorted = True
+        clean_url = target_url.split('?')[0]
+        pos = bisect_left(self._urls, (clean_url, -1))
+        best = None
+        while pos < len(self._urls) and self._urls[pos][0].startswith(clean_url):
+            if best is None or self._urls[pos][1] < best:
+                best = self._urls[pos][1]
+            pos += 1
+        if best is None and self._index is not None:
+            offer_ids = self._index.offers_with_url(target_url)
+            return self._indexed_offer(offer_ids[0]) if offer_ids else None
+        return self._offers[best] if best is not None else None
+
+
 def create_duplicate_detector(db_instance):
     """Factory function to create DuplicateDetector instance"""
     return DuplicateDetector(db_instance)
@@ -5,12 +5,47 @@ import logging
 from database import db_instance
 from typing import List, Dict, Tuple
 
+# Duplicate documents are fetched with $in queries of this many ids
+FETCH_BATCH_SIZE = 1000
+# get_duplicate_summary lists at most this many near-duplicate name clusters
+MAX_NEAR_DUPLICATE_GROUPS = 500
+NOT_DELETED = {'$or': [{'deleted': {'$exists': False}}, {'deleted': False}]}
+
 class DuplicateOfferRemover:
     """Service to detect and remove duplicate offers"""
     
     def __init__(self):
         self.offers_collection = db_instance.get_collection('offers')
     
+    def _load_groups(self, groups: Dict[str, List], prefix: str) -> Dict[str, List[Dict]]:
+        """
+        Fetch the documents of each duplicate group. The aggregations only push
+        _ids, so the whole catalog is never materialized - just the duplicates.
+        """
+        all_ids = [doc_id for ids in groups.values() for doc_id in ids]
+        docs = {}
+        for start in range(0, len(all_ids), FETCH_BATCH_SIZE):
+            for doc in self.offers_collection.find({'_id': {'$in': all_ids[start:start + FETCH_BATCH_SIZE]}}):
+                docs[doc['_id']] = doc
+        loaded = {}
+        for key, ids in groups.items():
+            group_docs = [docs[doc_id] for doc_id in ids if doc_id in docs]
+            if len(group_docs) > 1:
+                loaded[f"{prefix}:{key}"] = group_docs
+        return loaded
+    
+    @staticmethod
+    def _similarity_index():
+        """The offer similarity index, built synchronously on first use; None if it cannot be built"""
+        try:
+            from services.offer_similarity_index import get_offer_similarity_index
+            index = get_offer_similarity_index()
+            index.ensure_built()
+            return index if index.is_ready() else None
+        except Exception as e:
+            logging.warning(f"Offer similarity index unavailable: {str(e)}")
+            return None
+    
     def find_duplicates_by_offer_id(self) -> Dict[str, List[Dict]]:
         """
         Find all duplicate offers grouped by offer_id
@@ -31,7 +66,7 @@ class DuplicateOfferRemover:
                     '$group': {
                         '_id': '$offer_id',
                         'count': {'$sum': 1},
-                        'docs': {'$push': '$$ROOT'}
+                        'ids': {'$push': '$_id'}
                     }
                 },
                 {
@@ -41,14 +76,14 @@ class DuplicateOfferRemover:
                 }
             ]
             
-            duplicates = {}
-            results = self.offers_collection.aggregate(pipeline)
+            groups = {}
+            results = self.offers_collection.aggregate(pipeline, allowDiskUse=True)
             
             for result in results:
                 offer_id = result['_id']
                 if offer_id:  # Skip null offer_ids
-                    docs = result['docs']
-                    duplicates[f"id:{offer_id}"] = docs
+                    groups[offer_id] = result['ids']
+            duplicates = self._load_groups(groups, 'id')
             
             logging.info(f"Found {len(duplicates)} offer_ids with duplicates")
             return duplicates
@@ -61,8 +96,28 @@ class DuplicateOfferRemover:
         """
         Find all duplicate offers grouped by name (case-insensitive)
         Returns a dictionary where keys are names and values are lists of duplicate documents
+        
+        Candidate groups come from the offer similarity index when it is available;
+        the fetched documents are regrouped by their current name, so a stale index
+        entry can only drop a group, never invent one.
         """
         try:
+            index = self._similarity_index()
+            if index is not None:
+                offer_ids = [offer_id for ids in index.name_groups().values() for offer_id in ids]
+                grouped = {}
+                for start in range(0, len(offer_ids), FETCH_BATCH_SIZE):
+                    for doc in self.offers_collection.find({
+                        'offer_id': {'$in': offer_ids[start:start + FETCH_BATCH_SIZE]},
+                        **NOT_DELETED
+                    }):
+                        name = doc.get('name')
+                        if isinstance(name, str) and name:
+                            grouped.setdefault(name.lower(), []).append(doc)
+                duplicates = {f"name:{name}": docs for name, docs in grouped.items() if len(docs) > 1}
+                logging.info(f"Found {len(duplicates)} names with duplicates (similarity index)")
+                return duplicates
+            
             # Aggregate to find names that appear more than once
             pipeline = [
                 {
@@ -78,7 +133,7 @@ class DuplicateOfferRemover:
                     '$group': {
                         '_id': {'$toLower': '$name'},
                         'count': {'$sum': 1},
-                        'docs': {'$push': '$$ROOT'}
+                        'ids': {'$push': '$_id'}
                     }
                 },
                 {
@@ -88,14 +143,14 @@ class DuplicateOfferRemover:
                 }
             ]
             
-            duplicates = {}
-            results = self.offers_collection.aggregate(pipeline)
+            groups = {}
+            results = self.offers_collection.aggregate(pipeline, allowDiskUse=True)
             
             for result in results:
                 name = result['_id']
                 if name:  # Skip null/empty names
-                    docs = result['docs']
-                    duplicates[f"name:{name}"] = docs
+                    groups[name] = result['ids']
+            duplicates = self._load_groups(groups, 'name')
             
             logging.info(f"Found {len(duplicates)} names with duplicates")
             return duplicates
@@ -124,7 +179,7 @@ class DuplicateOfferRemover:
                     '$group': {
                         '_id': '$campaign_id',
                         'count': {'$sum': 1},
-                        'docs': {'$push': '$$ROOT'}
+                        'ids': {'$push': '$_id'}
                     }
                 },
                 {
@@ -134,14 +189,14 @@ class DuplicateOfferRemover:
                 }
             ]
             
-            duplicates = {}
+            groups = {}
             results = self.offers_collection.aggregate(pipeline, allowDiskUse=True)
             
             for result in results:
                 campaign_id = result['_id']
                 if campaign_id:
-                    docs = result['docs']
-                    duplicates[f"campaign:{campaign_id}"] = docs
+                    groups[campaign_id] = result['ids']
+            duplicates = self._load_groups(groups, 'campaign')
             
             logging.info(f"Found {len(duplicates)} campaign_ids with duplicates")
             return duplicates
@@ -150,6 +205,38 @@ class DuplicateOfferRemover:
             logging.error(f"Error finding duplicates by campaign_id: {str(e)}", exc_info=True)
             return {}
 
+    def find_near_duplicates_by_name(self, threshold: float = 0.85) -> List[Dict]:
+        """
+        Clusters of offers whose names are near-duplicates but not identical
+        (e.g. "Royal Casino - US" / "Royal Casino US"), from the similarity index.
+        Reported for review only; remove_duplicates never deletes these.
+        """
+        try:
+            index = self._similarity_index()
+            if index is None:
+                return []
+            clusters = index.near_duplicate_groups(threshold)[:MAX_NEAR_DUPLICATE_GROUPS]
+            offer_ids = [offer_id for cluster in clusters for offer_id in cluster]
+            docs = {}
+            for start in range(0, len(offer_ids), FETCH_BATCH_SIZE):
+                for doc in self.offers_collection.find(
+                    {'offer_id': {'$in': offer_ids[start:start + FETCH_BATCH_SIZE]}, **NOT_DELETED},
+                    {'_id': 0, 'offer_id': 1, 'name': 1, 'network': 1, 'status': 1}
+                ):
+                    docs[doc['offer_id']] = doc
+            groups = []
+            for cluster in clusters:
+                members = [docs[offer_id] for offer_id in cluster if offer_id in docs]
+                if len({(doc.get('name') or '').lower() for doc in members}) > 1:
+                    groups.append({'count': len(members), 'offers': members})
+            
+            logging.info(f"Found {len(groups)} near-duplicate name clusters")
+            return groups
+            
+        except Exception as e:
+            logging.error(f"Error finding near-duplicate names: {str(e)}", exc_info=True)
+            return []
+
     def find_duplicates(self) -> Dict[str, List[Dict]]:
         """
         Find all duplicate offers grouped by offer_id AND name AND campaign_id
@@ -292,7 +379,8 @@ class DuplicateOfferRemover:
                 'total_duplicate_groups': len(duplicates),
                 'total_duplicate_documents': sum(len(docs) for docs in duplicates.values()),
                 'total_documents_to_remove': sum(len(docs) - 1 for docs in duplicates.values()),
-                'duplicate_groups': []
+                'duplicate_groups': [],
+                'near_duplicate_groups': self.find_near_duplicates_by_name()
             }
             
             for key, docs in duplicates.items():
@@ -335,5 +423,6 @@ class DuplicateOfferRemover:
                 'total_duplicate_groups': 0,
                 'total_duplicate_documents': 0,
                 'total_documents_to_remove': 0,
-                'duplicate_groups': []
+                'duplicate_groups': [],
+                'near_duplicate_groups': []
             }
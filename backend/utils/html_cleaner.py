@@ -6,6 +6,33 @@ Cleans HTML from descriptions and formats beautifully
 import re
 from html import unescape
 
+# 2-letter ISO country codes stripped from offer names by format_offer_name
+NAME_COUNTRY_CODES = [
+    'US', 'UK', 'GB', 'CA', 'AU', 'DE', 'FR', 'IT', 'ES', 'NL', 'BE', 'AT', 'CH',
+    'SE', 'NO', 'DK', 'FI', 'PL', 'IE', 'PT', 'GR', 'CZ', 'HU', 'RO', 'BG', 'HR',
+    'SK', 'SI', 'LT', 'LV', 'EE', 'JP', 'CN', 'KR', 'IN', 'SG', 'HK', 'TW', 'TH',
+    'MY', 'ID', 'PH', 'VN', 'NZ', 'BR', 'MX', 'AR', 'CL', 'CO', 'PE', 'ZA', 'IL',
+    'TR', 'AE', 'SA', 'EG', 'RU', 'UA'
+]
+
+# Patterns are compiled once: both functions run for every offer of every network import
+_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_P_CLOSE_RE = re.compile(r'</p>', re.IGNORECASE)
+_P_OPEN_RE = re.compile(r'<p[^>]*>', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_EXTRA_NEWLINES_RE = re.compile(r'\n\s*\n\s*\n+')
+_SPACES_RE = re.compile(r' +')
+_WHITESPACE_RE = re.compile(r'\s+')
+# One alternation instead of a pass per code; removing a standalone code never
+# creates a new standalone code, so a single pass strips the same set
+_NAME_COUNTRY_CODE_RE = re.compile(r'\b(?:' + '|'.join(NAME_COUNTRY_CODES) + r')\b[,/\s]*', re.IGNORECASE)
+_PAYOUT_SUFFIX_RE = re.compile(r'\b(CPL|CPA|CPI|CPS|CPM|CPC|DOI|SOI)\b[,/\s]*', re.IGNORECASE)
+_DOUBLE_DASH_RE = re.compile(r'\s*-\s*-\s*')
+_TRAILING_DASH_RE = re.compile(r'\s*-\s*$')
+_LEADING_DASH_RE = re.compile(r'^\s*-\s*')
+_INCENT_RE = re.compile(r'\s+(Incent|Non Incent|non incent)', re.IGNORECASE)
+_NON_INCENT_RE = re.compile(r'non incent', re.IGNORECASE)
+
 
 def clean_html_description(html_text):
     """
@@ -27,12 +54,12 @@ def clean_html_description(html_text):
         return ''
     
     # Convert <br> and <p> to newlines
-    text = re.sub(r'<br\s*/?>', '\n', html_text, flags=re.IGNORECASE)
-    text = re.sub(r'</p>', '\n\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'<p[^>]*>', '', text, flags=re.IGNORECASE)
+    text = _BR_RE.sub('\n', html_text)
+    text = _P_CLOSE_RE.sub('\n\n', text)
+    text = _P_OPEN_RE.sub('', text)
     
     # Remove all HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _TAG_RE.sub('', text)
     
     # Unescape HTML entities (&nbsp; → space, &amp; → &)
     text = unescape(text)
@@ -41,8 +68,8 @@ def clean_html_description(html_text):
     text = text.replace('\xa0', ' ')
     
     # Remove extra whitespace
-    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Max 2 newlines
-    text = re.sub(r' +', ' ', text)  # Multiple spaces to single
+    text = _EXTRA_NEWLINES_RE.sub('\n\n', text)  # Max 2 newlines
+    text = _SPACES_RE.sub(' ', text)  # Multiple spaces to single
     text = text.strip()
     
     return text
@@ -76,42 +103,31 @@ def format_offer_name(name):
     name = name.replace('_', ' ')
     
     # Remove extra spaces
-    name = re.sub(r'\s+', ' ', name)
-    
-    # List of country codes to remove (2-letter ISO codes)
-    country_codes = [
-        'US', 'UK', 'GB', 'CA', 'AU', 'DE', 'FR', 'IT', 'ES', 'NL', 'BE', 'AT', 'CH',
-        'SE', 'NO', 'DK', 'FI', 'PL', 'IE', 'PT', 'GR', 'CZ', 'HU', 'RO', 'BG', 'HR',
-        'SK', 'SI', 'LT', 'LV', 'EE', 'JP', 'CN', 'KR', 'IN', 'SG', 'HK', 'TW', 'TH',
-        'MY', 'ID', 'PH', 'VN', 'NZ', 'BR', 'MX', 'AR', 'CL', 'CO', 'PE', 'ZA', 'IL',
-        'TR', 'AE', 'SA', 'EG', 'RU', 'UA'
-    ]
+    name = _WHITESPACE_RE.sub(' ', name)
     
     # Remove country codes that appear as standalone words (with word boundaries)
     # This handles formats like "US CA", "US/CA", "US, CA", etc.
-    for code in country_codes:
-        # Remove country code with various separators
-        name = re.sub(rf'\b{code}\b[,/\s]*', '', name, flags=re.IGNORECASE)
+    name = _NAME_COUNTRY_CODE_RE.sub('', name)
     
     # Remove common payout type suffixes (CPL, CPA, CPI, CPS, CPM, CPC)
-    name = re.sub(r'\b(CPL|CPA|CPI|CPS|CPM|CPC|DOI|SOI)\b[,/\s]*', '', name, flags=re.IGNORECASE)
+    name = _PAYOUT_SUFFIX_RE.sub('', name)
     
     # Clean up multiple dashes and spaces
-    name = re.sub(r'\s*-\s*-\s*', ' - ', name)  # Multiple dashes to single
-    name = re.sub(r'\s+', ' ', name)  # Multiple spaces to single
-    name = re.sub(r'\s*-\s*$', '', name)  # Remove trailing dash
-    name = re.sub(r'^\s*-\s*', '', name)  # Remove leading dash
+    name = _DOUBLE_DASH_RE.sub(' - ', name)  # Multiple dashes to single
+    name = _WHITESPACE_RE.sub(' ', name)  # Multiple spaces to single
+    name = _TRAILING_DASH_RE.sub('', name)  # Remove trailing dash
+    name = _LEADING_DASH_RE.sub('', name)  # Remove leading dash
     
     # Replace space before Incent/Non with dash
-    name = re.sub(r'\s+(Incent|Non Incent|non incent)', r' - \1', name, flags=re.IGNORECASE)
+    name = _INCENT_RE.sub(r' - \1', name)
     
     # Capitalize "non incent" properly
-    name = re.sub(r'non incent', 'Non Incent', name, flags=re.IGNORECASE)
+    name = _NON_INCENT_RE.sub('Non Incent', name)
     
     # Clean up
     name = name.strip()
     
     # Remove trailing dash if present
-    name = re.sub(r'\s*-\s*$', '', name)
+    name = _TRAILING_DASH_RE.sub('', name)
     
     return name
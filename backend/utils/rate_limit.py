@@ -0,0 +1,34 @@
+"""
+Rate limiting
+Thread-safe token buckets keyed by host, shared by the outbound HTTP clients
+(network API syncs, link health sweeps) and the SMTP delivery engine.
+"""
+
+import threading
+import time
+from typing import Dict, Tuple
+
+
+class HostRateLimiter:
+    """Token bucket per API host (requests/second with a small burst), thread-safe."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Background worker entry point.
+
+Runs the scheduled background jobs (services/background_jobs.py) in a process
+of their own, without the Flask app and its route blueprints, so web workers
+only serve requests and the two can be scaled independently:
+
+    cd backend && python worker.py
+    python -m backend.worker            # from the repository root
+
+Start the web processes with RUN_BACKGROUND_SERVICES=0 to leave every job to
+the worker. Running several workers is safe: the per-job lease in
+scheduler_jobs keeps each run on exactly one process.
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+
+# Modules import each other as top-level packages (services.*, models.*)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import db_instance
+from services.background_jobs import register_background_jobs
+
+logger = logging.getLogger(__name__)
+
+_shutdown = threading.Event()
+
+
+def _handle_signal(sig, frame):
+    logger.info(f"Received signal {sig}, stopping background worker...")
+    _shutdown.set()
+
+
+def main():
+    """Main entry point for the background worker"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        force=True  # importing database may already have configured the root logger
+    )
+
+    if not db_instance.is_connected():
+        logger.error("Database connection failed - background worker not started")
+        return 1
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    # Jobs read settings through the snapshot and publish cache invalidations to
+    # the web workers, as they do when run inside the web process (app.py)
+    services = []
+    try:
+        from services.cache_invalidation_bus import get_cache_invalidation_bus
+        get_cache_invalidation_bus().start()
+        services.append(('Cache invalidation bus', get_cache_invalidation_bus()))
+    except Exception as e:
+        logger.warning(f"⚠️ Cache invalidation bus failed to start: {e}")
+    try:
+        from services.settings_snapshot_service import get_settings_snapshot_service
+        get_settings_snapshot_service().start()
+        services.append(('Settings snapshot service', get_settings_snapshot_service()))
+    except Exception as e:
+        logger.warning(f"⚠️ Settings snapshot service failed to start: {e}")
+
+    scheduler = register_background_jobs()
+    scheduler.start()
+    logger.info(f"✅ Background worker running {len(scheduler.job_names())} jobs ({scheduler.origin})")
+
+    while not _shutdown.wait(timeout=60):
+        pass
+
+    # Hand back the leases of jobs that are not running (running ones get a bounded wait)
+    scheduler.stop()
+    for label, service in reversed(services):
+        try:
+            service.stop()
+        except Exception as e:
+            logger.warning(f"⚠️ {label} failed to stop: {e}")
+    logger.info("Background worker stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
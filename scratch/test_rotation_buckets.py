@@ -0,0 +1,36 @@
+"""Check that equal-percentage Rotation rules split traffic like independent rolls"""
+import sys
+import os
+from collections import Counter
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from services.smart_rules_compiler import CompiledRuleSet
+
+rules = [
+    {'_id': 'A', 'type': 'Rotation', 'percentage': 50, 'priority': 1, 'active': True},
+    {'_id': 'B', 'type': 'Rotation', 'percentage': 50, 'priority': 2, 'active': True},
+    {'_id': 'C', 'type': 'Backup', 'priority': 3, 'active': True},
+]
+compiled = CompiledRuleSet('ML-TEST-ROTATION', rules)
+
+clicks = 20000
+counts = Counter()
+for i in range(clicks):
+    decision = compiled.decide({
+        'geo': 'US',
+        'subid': f"sub{i}",
+        'ip': f"10.0.{i // 256}.{i % 256}",
+        'timestamp': datetime.utcnow(),
+    })
+    counts[decision.rule['_id'] if decision and decision.rule else None] += 1
+
+print(f"Split over {clicks} clicks: A={counts['A']} B={counts['B']} C={counts['C']}")
+
+# Independent rolls: A gets 50%, B gets 50% of the rest, the backup takes what is left
+expected = {'A': 0.50, 'B': 0.25, 'C': 0.25}
+for rule_id, share in expected.items():
+    actual = counts[rule_id] / clicks
+    assert abs(actual - share) < 0.03, f"{rule_id}: expected ~{share:.0%}, got {actual:.1%}"
+print("OK")